@@ -2,7 +2,6 @@ from flask import Flask, redirect, url_for, render_template, session, jsonify, r
 from flask_cors import CORS
 from flask_login import LoginManager, current_user
 from flask_wtf.csrf import CSRFProtect, CSRFError
-from flask_caching import Cache
 from dotenv import load_dotenv
 import logging
 
@@ -11,20 +10,8 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
-from routes.inventory import inventory_bp
-from routes.auth import auth_bp
-from routes.tickets import tickets_bp
-from routes.shipments import shipments_bp
-from routes.users import users_bp
-from routes.admin import admin_bp
-from routes.api_simple import api_bp
-from routes.mobile_api import mobile_api_bp
-from routes.json_api import json_api_bp  # Re-enabled for Development Console mobile API
-from routes.inventory_api import inventory_api_bp
-from routes.search_api import search_api_bp
-from routes.assets import assets_bp
-from routes.documents import documents_bp
-from routes.debug_routes import debug_bp
+import importlib
+import time
 from utils.auth_decorators import login_required
 from utils.store_instances import (
     user_store,
@@ -41,33 +28,77 @@ from models.user import Country
 from models.permission import Permission
 from utils.db_manager import DatabaseManager
 from utils.email_sender import mail
+from utils.sql_instrumentation import init_sql_instrumentation
+from utils.api_responses import init_api_responses
+from utils.cache import init_cache
 # from utils.oauth2_email_sender import oauth2_mail
 import os
-from routes.main import main_bp
-from routes.development import development_bp
-from routes.action_items import action_items_bp
 from flask_wtf.csrf import CSRFProtect, CSRFError
 from database import init_db, engine, SessionLocal
 from werkzeug.security import generate_password_hash
 from werkzeug.middleware.proxy_fix import ProxyFix
 from sqlalchemy.orm import joinedload
-from flask_migrate import Migrate
-from routes.intake import intake_bp
-from routes.reports import reports_bp
-# Import category blueprints
-from routes.ticket_categories.asset_checkout_claw import asset_checkout_claw_bp
-from routes.ticket_categories.asset_return_claw import asset_return_claw_bp
-from routes.knowledge import knowledge_bp
-from routes.feedback import feedback_bp
-from routes.parcel_tracking import parcel_tracking_bp
-from routes.dashboard import dashboard_bp
-from routes.chatbot import chatbot_bp
-from routes.import_manager import import_manager_bp
-from routes.specs_api import specs_bp
-from routes.blog import blog_bp
-from routes.website import website_bp
-from routes.sla import sla_bp
-from routes.api_v2 import api_v2_bp
+
+# Blueprints in registration order: (module, attribute, url_prefix, csrf_exempt).
+# Imported by create_app() rather than at module import, so the route modules
+# (tickets/admin/inventory/mobile_api alone are ~40k lines) load once in the
+# gunicorn master under --preload and each import shows up in the boot log.
+BLUEPRINTS = [
+    ('routes.main', 'main_bp', '/', False),
+    ('routes.auth', 'auth_bp', '/auth', False),
+    ('routes.inventory', 'inventory_bp', '/inventory', False),
+    ('routes.tickets', 'tickets_bp', '/tickets', False),
+    ('routes.shipments', 'shipments_bp', '/shipments', False),
+    ('routes.users', 'users_bp', '/users', False),
+    ('routes.admin', 'admin_bp', '/admin', False),
+    ('routes.api_simple', 'api_bp', None, True),
+    ('routes.mobile_api', 'mobile_api_bp', None, True),
+    ('routes.inventory_api', 'inventory_api_bp', None, True),
+    ('routes.search_api', 'search_api_bp', None, True),
+    ('routes.json_api', 'json_api_bp', None, True),  # Development Console mobile API
+    ('routes.intake', 'intake_bp', None, False),
+    ('routes.assets', 'assets_bp', None, False),
+    ('routes.documents', 'documents_bp', None, False),
+    ('routes.debug_routes', 'debug_bp', None, False),
+    ('routes.reports', 'reports_bp', None, True),  # Reports API endpoints
+    ('routes.development', 'development_bp', '/development', False),
+    ('routes.action_items', 'action_items_bp', None, False),  # Weekly Meeting Action Items
+    # Category blueprints (prefix is defined in the blueprint file)
+    ('routes.ticket_categories.asset_checkout_claw', 'asset_checkout_claw_bp', None, False),
+    ('routes.ticket_categories.asset_return_claw', 'asset_return_claw_bp', None, False),
+    ('routes.knowledge', 'knowledge_bp', None, False),
+    ('routes.feedback', 'feedback_bp', None, False),
+    # Protected by developer_required decorator
+    ('routes.parcel_tracking', 'parcel_tracking_bp', None, True),
+    ('routes.dashboard', 'dashboard_bp', None, False),  # Customizable dashboard
+    ('routes.chatbot', 'chatbot_bp', None, True),  # Help assistant chatbot (uses JWT auth)
+    ('routes.import_manager', 'import_manager_bp', None, False),  # Import Manager dashboard
+    ('routes.exports', 'exports_bp', None, False),  # Background export downloads
+    # Device specs collector API (called from Recovery Mode without auth)
+    ('routes.specs_api', 'specs_bp', None, True),
+    ('routes.blog', 'blog_bp', None, True),  # Blog for TrueLog website (public API)
+    ('routes.website', 'website_bp', '/site', False),  # Public TrueLog website
+    ('routes.sla', 'sla_bp', None, False),  # SLA and Holiday management
+    ('routes.api_v2', 'api_v2_bp', None, True),  # API v2 endpoints (uses JWT auth)
+]
+
+
+def register_blueprints(app, csrf):
+    """
+    Import and register every blueprint in BLUEPRINTS.
+
+    Args:
+        app: Flask application
+        csrf: CSRFProtect instance used to exempt API blueprints
+    """
+    for module_name, attribute, url_prefix, csrf_exempt in BLUEPRINTS:
+        started = time.perf_counter()
+        blueprint = getattr(importlib.import_module(module_name), attribute)
+        options = {'url_prefix': url_prefix} if url_prefix else {}
+        app.register_blueprint(blueprint, **options)
+        if csrf_exempt:
+            csrf.exempt(blueprint)
+        logger.debug(f"Loaded blueprint {blueprint.name} in {(time.perf_counter() - started) * 1000:.0f} ms")
 
 # Add permissions property to User model for Flask-Login
 # User.permissions = property(lambda self: self.get_permissions)
@@ -103,6 +134,15 @@ def create_app():
         WTF_CSRF_TIME_LIMIT=None,  # Disable CSRF token expiration
         WTF_CSRF_CHECK_DEFAULT=True,  # Enable CSRF check by default
         WTF_CSRF_SSL_STRICT=False,  # Allow CSRF tokens over HTTP
+        # Protected file downloads (utils/file_delivery.py): '' / 'x-sendfile' / 'x-accel'
+        FILE_DELIVERY_OFFLOAD=os.environ.get('FILE_DELIVERY_OFFLOAD', ''),
+        FILE_DELIVERY_ACCEL_ROOT=os.environ.get('FILE_DELIVERY_ACCEL_ROOT'),  # Defaults to the app root
+        FILE_DELIVERY_ACCEL_PREFIX=os.environ.get('FILE_DELIVERY_ACCEL_PREFIX', '/_protected'),
+        # Per-request SQL instrumentation (utils/sql_instrumentation.py, /admin/performance)
+        SQL_INSTRUMENTATION_SAMPLE_RATE=float(os.environ.get('SQL_INSTRUMENTATION_SAMPLE_RATE', 0.1)),
+        SQL_N_PLUS_ONE_THRESHOLD=int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10)),
+        # ETag / 304, Cache-Control and gzip/brotli for the JSON APIs (utils/api_responses.py)
+        API_COMPRESS_MIN_BYTES=int(os.environ.get('API_COMPRESS_MIN_BYTES', 1024)),
         # Microsoft 365 OAuth2 configuration (Primary)
         MS_CLIENT_ID=os.environ.get('MS_CLIENT_ID'),
         MS_CLIENT_SECRET=os.environ.get('MS_CLIENT_SECRET'),
@@ -130,23 +170,19 @@ def create_app():
     CORS(app)
 
     # Initialize Flask-Caching
-    # Use simple in-memory cache for single-process deployments
-    # For multi-process (e.g., gunicorn workers), consider Redis or Memcached
-    cache_config = {
-        'CACHE_TYPE': 'SimpleCache',
-        'CACHE_DEFAULT_TIMEOUT': 60,  # Default 60 seconds
-    }
-    app.config.from_mapping(cache_config)
-    cache = Cache(app)
-    # Make cache available globally
-    app.cache = cache
+    # Shared by all workers on the host (file cache, optionally behind a
+    # per-worker L1); see utils/cache.py for the CACHE_* environment settings
+    init_cache(app)
+
+    # Record query counts / DB time for a sample of requests
+    init_sql_instrumentation(app)
+
+    # Conditional GET and compressed JSON for the API blueprints
+    init_api_responses(app)
 
     # Initialize CSRF protection
     csrf = CSRFProtect(app)
 
-    # Exempt parcel tracking API routes from CSRF (protected by developer_required decorator)
-    csrf.exempt(parcel_tracking_bp)
-
     @app.errorhandler(CSRFError)
     def handle_csrf_error(e):
         # Check if this is an API request (handles /api/ and /*/api/ patterns)
@@ -189,7 +225,11 @@ def create_app():
 
     # Initialize database
     db = SQLAlchemy(app)
-    migrate = Migrate(app, db)
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        # Only the `flask db ...` commands need Flask-Migrate (and Alembic);
+        # web workers skip the import
+        from flask_migrate import Migrate
+        migrate = Migrate(app, db)
 
     # Initialize Flask-Login
     login_manager = LoginManager()
@@ -209,51 +249,15 @@ def create_app():
             return None
 
     # Register blueprints with proper URL prefixes
-    app.register_blueprint(main_bp, url_prefix='/')
-    app.register_blueprint(auth_bp, url_prefix='/auth')
-    app.register_blueprint(inventory_bp, url_prefix='/inventory')
-    app.register_blueprint(tickets_bp, url_prefix='/tickets')
-    app.register_blueprint(shipments_bp, url_prefix='/shipments')
-    app.register_blueprint(users_bp, url_prefix='/users')
-    app.register_blueprint(admin_bp, url_prefix='/admin')
-    app.register_blueprint(api_bp)
-    app.register_blueprint(mobile_api_bp)
-    app.register_blueprint(inventory_api_bp)
-    app.register_blueprint(search_api_bp)
-    app.register_blueprint(json_api_bp)  # Development Console mobile API
-    
-    # Exempt API blueprints from CSRF protection
-    csrf.exempt(api_bp)
-    csrf.exempt(mobile_api_bp)
-    csrf.exempt(search_api_bp)
-    csrf.exempt(inventory_api_bp)
-    csrf.exempt(reports_bp)  # Exempt reports API endpoints
-    csrf.exempt(json_api_bp)  # Exempt from CSRF for mobile API
-    csrf.exempt(chatbot_bp)  # Exempt chatbot mobile API from CSRF (uses JWT auth)
-    csrf.exempt(specs_bp)  # Exempt device specs API (called from Recovery Mode without auth)
-    app.register_blueprint(intake_bp)
-    app.register_blueprint(assets_bp)
-    app.register_blueprint(documents_bp)
-    app.register_blueprint(debug_bp)
-    app.register_blueprint(reports_bp)
-    app.register_blueprint(development_bp, url_prefix='/development')
-    app.register_blueprint(action_items_bp)  # Weekly Meeting Action Items
-    # Register category blueprints
-    app.register_blueprint(asset_checkout_claw_bp) # Prefix is defined in the blueprint file
-    app.register_blueprint(asset_return_claw_bp)   # Prefix is defined in the blueprint file
-    app.register_blueprint(knowledge_bp)
-    app.register_blueprint(feedback_bp)
-    app.register_blueprint(parcel_tracking_bp)  # Prefix is defined in the blueprint file
-    app.register_blueprint(dashboard_bp)  # New customizable dashboard
-    app.register_blueprint(chatbot_bp)  # Help assistant chatbot
-    app.register_blueprint(import_manager_bp)  # Import Manager dashboard
-    app.register_blueprint(specs_bp)  # Device specs collector API
-    app.register_blueprint(blog_bp)  # Blog for TrueLog website
-    csrf.exempt(blog_bp)  # Exempt blog public API from CSRF
-    app.register_blueprint(website_bp, url_prefix='/site')  # Public TrueLog website
-    app.register_blueprint(sla_bp)  # SLA and Holiday management
-    app.register_blueprint(api_v2_bp)  # API v2 endpoints (admin, customers, etc.)
-    csrf.exempt(api_v2_bp)  # Exempt API v2 from CSRF (uses JWT auth)
+    register_blueprints(app, csrf)
+
+    # Command line: flask tracking scheduler / flask tracking staleness
+    from utils.tracking_scheduler import tracking_cli
+    app.cli.add_command(tracking_cli)
+
+    # Command line: flask ezy2ship sync
+    from utils.ezy2ship_sync import ezy2ship_cli
+    app.cli.add_command(ezy2ship_cli)
 
     # Track user activity on every request
     @app.before_request
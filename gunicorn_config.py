@@ -1,7 +1,16 @@
+import os
+
 bind = "0.0.0.0:10000"
 workers = 4
 threads = 2
 timeout = 120
 worker_class = "sync"
 accesslog = "-"
-errorlog = "-" 
\ No newline at end of file
+errorlog = "-"
+
+# Import the app once in the master and fork workers from it: boots and
+# max_requests restarts skip the route imports, and workers share those pages.
+# Pooled DB connections opened in the master are dropped in each child by
+# utils.db_manager.dispose_engines (registered with os.register_at_fork).
+# Set GUNICORN_PRELOAD=false to import the app in every worker instead.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Migration: Add stock ledger columns to accessory_transactions
+
+Adds the signed available_delta / total_delta columns used by
+utils.accessory_stock and an index for the per-accessory reconciler, then
+records an opening balance ("Stock Baseline") for every accessory.
+
+Run: python migrations/add_accessory_stock_ledger.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine, SessionLocal
+from sqlalchemy import inspect, text
+
+
+def run_migration():
+    inspector = inspect(engine)
+
+    existing_tables = inspector.get_table_names()
+    if 'accessory_transactions' not in existing_tables:
+        print("Error: accessory_transactions table does not exist")
+        return False
+
+    columns = [c['name'] for c in inspector.get_columns('accessory_transactions')]
+    indexes = [i['name'] for i in inspector.get_indexes('accessory_transactions')]
+
+    with engine.connect() as conn:
+        for column in ('available_delta', 'total_delta'):
+            if column not in columns:
+                print(f"Adding {column} column to accessory_transactions table...")
+                conn.execute(text(f"ALTER TABLE accessory_transactions ADD COLUMN {column} INTEGER NULL"))
+                conn.commit()
+                print(f"  ✓ Added {column} column")
+            else:
+                print(f"  - Column {column} already exists, skipping")
+
+        if 'ix_accessory_transactions_accessory_id' not in indexes:
+            print("Adding index on accessory_transactions.accessory_id...")
+            conn.execute(text(
+                "CREATE INDEX ix_accessory_transactions_accessory_id ON accessory_transactions (accessory_id)"
+            ))
+            conn.commit()
+            print("  ✓ Added index")
+        else:
+            print("  - Index already exists, skipping")
+
+    # Record opening balances so the ledger sums to the current quantities
+    from utils.accessory_stock import AccessoryStock
+    db_session = SessionLocal()
+    try:
+        report = AccessoryStock.reconcile(db_session, apply=True)
+        print(f"  ✓ Recorded opening balance for {report['adopted']} accessories")
+    finally:
+        db_session.close()
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Migration: Media renditions (thumbnails / PDF previews)
+
+Creates the media_renditions table and adds the content hash columns that
+link uploads to their renditions:
+  - ticket_attachments.content_sha256
+  - assets.image_sha256
+  - accessories.image_sha256
+
+Existing uploads get renditions with scripts/backfill_media_renditions.py.
+
+Run: python migrations/add_media_renditions.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.media_rendition import MediaRendition
+from sqlalchemy import inspect, text
+
+HASH_COLUMNS = [
+    ('ticket_attachments', 'content_sha256'),
+    ('assets', 'image_sha256'),
+    ('accessories', 'image_sha256'),
+]
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    if 'media_renditions' not in existing_tables:
+        print("Creating media_renditions table...")
+        MediaRendition.__table__.create(engine)
+        print("  ✓ Created media_renditions table")
+    else:
+        print("  - Table media_renditions already exists, skipping")
+
+    with engine.connect() as conn:
+        for table, column in HASH_COLUMNS:
+            if table not in existing_tables:
+                print(f"Error: {table} table does not exist")
+                return False
+
+            columns = [c['name'] for c in inspector.get_columns(table)]
+            if column in columns:
+                print(f"  - Column {table}.{column} already exists, skipping")
+                continue
+
+            print(f"Adding {column} column to {table} table...")
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR(64)"))
+            conn.execute(text(f"CREATE INDEX ix_{table}_{column} ON {table} ({column})"))
+            conn.commit()
+            print(f"  ✓ Added {column} column")
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
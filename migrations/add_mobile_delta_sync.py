@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Migration: Mobile delta sync
+
+Creates the sync_tombstones table, backfills updated_at on tickets, assets
+and accessories (new rows used to leave it NULL) and adds the
+(updated_at, id) keyset indexes used by /api/mobile/v1/sync/<entity>.
+Works for both SQLite and MySQL.
+
+Run: python migrations/add_mobile_delta_sync.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.sync_tombstone import SyncTombstone, SYNCED_TABLES
+from sqlalchemy import inspect, text
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    if 'sync_tombstones' not in existing_tables:
+        print("Creating 'sync_tombstones' table...")
+        SyncTombstone.__table__.create(engine)
+        print("  ✓ Created sync_tombstones")
+    else:
+        print("  - Table sync_tombstones already exists, skipping")
+
+    with engine.connect() as conn:
+        for table in SYNCED_TABLES:
+            if table not in existing_tables:
+                print(f"Error: {table} table does not exist")
+                return False
+
+            result = conn.execute(text(
+                f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"
+            ))
+            conn.commit()
+            print(f"  ✓ Backfilled updated_at on {result.rowcount} {table} rows")
+
+            index_name = f'ix_{table}_updated_at_id'
+            indexes = [i['name'] for i in inspector.get_indexes(table)]
+            if index_name not in indexes:
+                print(f"Adding index {index_name}...")
+                conn.execute(text(f"CREATE INDEX {index_name} ON {table} (updated_at, id)"))
+                conn.commit()
+                print("  ✓ Added index")
+            else:
+                print(f"  - Index {index_name} already exists, skipping")
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
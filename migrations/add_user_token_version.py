@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Migration: User token version
+
+Adds users.token_version. API tokens carry the version they were issued
+with; bumping it (password change, deactivation, role or company change)
+revokes them and retires the user's cached auth snapshot (utils/auth_cache.py).
+Existing users start at 0, which is also what tokens issued before this
+migration count as. Works for both SQLite and MySQL.
+
+Run: python migrations/add_user_token_version.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from sqlalchemy import inspect, text
+
+
+def run_migration():
+    inspector = inspect(engine)
+
+    if 'users' not in inspector.get_table_names():
+        print("Error: users table does not exist")
+        return False
+
+    columns = [c['name'] for c in inspector.get_columns('users')]
+    if 'token_version' in columns:
+        print("  - Column users.token_version already exists, skipping")
+    else:
+        print("Adding token_version column to users...")
+        with engine.connect() as conn:
+            conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+            conn.commit()
+        print("  ✓ Added token_version")
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Migration: Asset facet summary
+
+Creates asset_facet_counts and asset_facet_state (models/asset_facet.py) and
+counts the existing assets, so the inventory filter dropdowns read the
+summary instead of running DISTINCT queries over assets. Re-running it
+recounts from scratch. Works for both SQLite and MySQL.
+
+Run: python migrations/create_asset_facets.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.asset_facet import AssetFacetCount, AssetFacetState
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    if 'assets' not in existing_tables:
+        print("Error: assets table does not exist")
+        return False
+
+    for model in (AssetFacetCount, AssetFacetState):
+        table = model.__tablename__
+        if table not in existing_tables:
+            print(f"Creating '{table}' table...")
+            model.__table__.create(engine)
+            print(f"  ✓ Created {table}")
+        else:
+            print(f"  - Table {table} already exists, skipping")
+
+    from utils.asset_facets import rebuild
+    print("Counting assets...")
+    with Session(engine) as db_session:
+        cells = rebuild(db_session)
+    print(f"  ✓ Wrote {cells} facet cells")
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
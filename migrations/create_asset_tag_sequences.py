@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Migration to create asset_tag_sequences table and backfill it from existing tags.
+Works for both SQLite and MySQL.
+
+Usage:
+    python migrations/create_asset_tag_sequences.py [PREFIX ...]
+
+Prefixes default to the ones used by the app: "SG-" and "SG-R".
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.asset_tag_sequence import AssetTagSequence
+from utils.asset_tag_allocator import AssetTagAllocator
+from sqlalchemy import inspect
+
+DEFAULT_PREFIXES = ['SG-', 'SG-R']
+
+
+def run_migration(prefixes=None):
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    if 'asset_tag_sequences' in existing_tables:
+        print("Table 'asset_tag_sequences' already exists.")
+    else:
+        print("Creating 'asset_tag_sequences' table...")
+        AssetTagSequence.__table__.create(engine)
+        print("Table 'asset_tag_sequences' created successfully!")
+
+    for prefix in prefixes or DEFAULT_PREFIXES:
+        last_value = AssetTagAllocator.resync(engine, prefix)
+        print(f"Sequence {prefix}: last allocated number is {last_value}")
+
+
+if __name__ == '__main__':
+    run_migration(sys.argv[1:])
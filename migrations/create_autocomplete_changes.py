@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migration: Autocomplete change log
+
+Creates autocomplete_changes (models/autocomplete_change.py), the log each
+process polls to keep its in-memory autocomplete index (utils/autocomplete.py)
+current. Works for both SQLite and MySQL.
+
+Run: python migrations/create_autocomplete_changes.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.autocomplete_change import AutocompleteChange
+from sqlalchemy import inspect
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    table = AutocompleteChange.__tablename__
+    if table not in existing_tables:
+        print(f"Creating '{table}' table...")
+        AutocompleteChange.__table__.create(engine)
+        print(f"  ✓ Created {table}")
+    else:
+        print(f"  - Table {table} already exists, skipping")
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Migration to create export_jobs table for background exports.
+Works for both SQLite and MySQL.
+
+Usage:
+    python migrations/create_export_jobs.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.export_job import ExportJob
+from sqlalchemy import inspect
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    if 'export_jobs' in existing_tables:
+        print("Table 'export_jobs' already exists.")
+        return
+
+    print("Creating 'export_jobs' table...")
+    ExportJob.__table__.create(engine)
+    print("Table 'export_jobs' created successfully!")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Migration: SingPost Ezy2ship mirror
+
+Creates ezy2ship_manifests and ezy2ship_shipments
+(models/ezy2ship_shipment.py), the local copies of the Ezy2ship manifests
+kept current by `flask ezy2ship sync` (utils/ezy2ship_sync.py). Works for
+both SQLite and MySQL.
+
+Run: python migrations/create_ezy2ship_mirror.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.ezy2ship_shipment import Ezy2shipManifest, Ezy2shipShipment
+from sqlalchemy import inspect
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    for model in (Ezy2shipManifest, Ezy2shipShipment):
+        table = model.__tablename__
+        if table not in existing_tables:
+            print(f"Creating '{table}' table...")
+            model.__table__.create(engine)
+            print(f"  ✓ Created {table}")
+        else:
+            print(f"  - Table {table} already exists, skipping")
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Migration to create pdf_extraction_results table (cached PDF text/asset extraction).
+Works for both SQLite and MySQL.
+
+Usage:
+    python migrations/create_pdf_extraction_results.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.pdf_extraction_result import PdfExtractionResult
+from sqlalchemy import inspect
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    if 'pdf_extraction_results' in existing_tables:
+        print("Table 'pdf_extraction_results' already exists.")
+        return
+
+    print("Creating 'pdf_extraction_results' table...")
+    PdfExtractionResult.__table__.create(engine)
+    print("Table 'pdf_extraction_results' created successfully!")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Migration: Ticket counts summary
+
+Creates ticket_counts and ticket_count_state (models/ticket_count.py) and
+counts the existing tickets, so the dashboard counters and queue cards read
+the summary instead of running COUNT queries over tickets. Re-running it
+recounts from scratch. Works for both SQLite and MySQL.
+
+Run: python migrations/create_ticket_counts.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.ticket_count import TicketCount, TicketCountState
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    if 'tickets' not in existing_tables:
+        print("Error: tickets table does not exist")
+        return False
+
+    for model in (TicketCount, TicketCountState):
+        table = model.__tablename__
+        if table not in existing_tables:
+            print(f"Creating '{table}' table...")
+            model.__table__.create(engine)
+            print(f"  ✓ Created {table}")
+        else:
+            print(f"  - Table {table} already exists, skipping")
+
+    from utils.ticket_counters import rebuild
+    print("Counting tickets...")
+    with Session(engine) as db_session:
+        cells = rebuild(db_session)
+    print(f"  ✓ Wrote {cells} ticket count cells")
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Migration: Ticket status change audit
+
+Creates ticket_status_changes (models/ticket_status_change.py), where the
+automatic status rules (utils/ticket_rules.py) record every ticket they
+progress or close. Works for both SQLite and MySQL.
+
+Run: python migrations/create_ticket_status_changes.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.ticket_status_change import TicketStatusChange
+from sqlalchemy import inspect
+
+
+def run_migration():
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    if 'tickets' not in existing_tables:
+        print("Error: tickets table does not exist")
+        return False
+
+    table = TicketStatusChange.__tablename__
+    if table not in existing_tables:
+        print(f"Creating '{table}' table...")
+        TicketStatusChange.__table__.create(engine)
+        print(f"  ✓ Created {table}")
+    else:
+        print(f"  - Table {table} already exists, skipping")
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Migration: Move media renditions out of the static folder
+
+Renditions used to be written to static/uploads/renditions and linked
+directly, which made previews of ticket attachments public. They now live in
+uploads/renditions and are served by routes that check the owner. This moves
+the existing files and rewrites media_renditions.file_path / url.
+
+Renditions whose file is missing are deleted; re-run
+scripts/backfill_media_renditions.py to render them again.
+
+Run: python migrations/move_media_renditions.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.media_rendition import MediaRendition
+from utils.media_pipeline import PROJECT_ROOT, rendition_path, rendition_url
+from sqlalchemy import inspect, select, update, delete
+
+OLD_FOLDER = os.path.join(PROJECT_ROOT, 'static', 'uploads', 'renditions')
+
+
+def run_migration():
+    if 'media_renditions' not in inspect(engine).get_table_names():
+        print("Error: media_renditions table does not exist")
+        return False
+
+    table = MediaRendition.__table__
+    moved = missing = 0
+    with engine.begin() as conn:
+        rows = conn.execute(select(table.c.id, table.c.content_sha256, table.c.size_name, table.c.file_path)).all()
+        for rendition_id, sha256, size_name, file_path in rows:
+            new_path = rendition_path(sha256, size_name)
+            if os.path.abspath(file_path) == new_path:
+                continue
+
+            if os.path.exists(file_path):
+                os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                os.replace(file_path, new_path)
+            elif not os.path.exists(new_path):
+                conn.execute(delete(table).where(table.c.id == rendition_id))
+                missing += 1
+                continue
+
+            conn.execute(
+                update(table)
+                .where(table.c.id == rendition_id)
+                .values(file_path=new_path, url=rendition_url(sha256, size_name))
+            )
+            moved += 1
+
+    print(f"  ✓ Moved {moved} renditions")
+    if missing:
+        print(f"  - Deleted {missing} renditions without a file (run scripts/backfill_media_renditions.py)")
+
+    if os.path.isdir(OLD_FOLDER):
+        for folder, _, files in os.walk(OLD_FOLDER, topdown=False):
+            if not files and not os.listdir(folder):
+                os.rmdir(folder)
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    success = run_migration()
+    sys.exit(0 if success else 1)
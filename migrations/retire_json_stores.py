@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Migration: Retire the JSON-file stores
+
+The stores in utils/store_instances.py no longer read data/*.json at
+import. This one-time migration moves what those files held into the
+database:
+
+- data/activities.json -> activities (rows whose id is not there yet),
+  plus the (user_id, created_at) index used by the activity feed
+- data/templates.json -> ticket_templates (new table, composer templates)
+- data/tickets.json is only checked: tickets have been written to the
+  tickets table by TicketStore.create_ticket all along, so entries missing
+  from the table are reported, not imported
+
+The JSON files are left in place. Running it again imports nothing twice.
+Works for both SQLite and MySQL.
+
+Run: python migrations/retire_json_stores.py [--data-dir data]
+"""
+
+import sys
+import os
+import json
+import argparse
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from models.activity import Activity
+from models.ticket_template import TicketTemplate
+from sqlalchemy import inspect, insert, select, text
+
+ACTIVITY_INDEX = 'ix_activities_user_id_created_at'
+
+
+def _load(data_dir, name):
+    path = os.path.join(data_dir, name)
+    if not os.path.exists(path):
+        print(f"  - {path} not found, skipping")
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _import_activities(conn, rows):
+    existing = {row[0] for row in conn.execute(select(Activity.__table__.c.id))}
+    users = {row[0] for row in conn.execute(text("SELECT id FROM users"))}
+    new_rows = []
+    skipped = 0
+    for row in rows:
+        if row['id'] in existing:
+            continue
+        if row['user_id'] not in users:
+            skipped += 1
+            continue
+        new_rows.append({
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'type': row['type'],
+            'content': row['content'][:500],
+            'reference_id': row.get('reference_id'),
+            'created_at': datetime.fromisoformat(row['created_at']),
+            'is_read': bool(row.get('is_read', False)),
+        })
+    if new_rows:
+        conn.execute(insert(Activity.__table__), new_rows)
+    print(f"  ✓ Imported {len(new_rows)} activities ({len(rows) - len(new_rows) - skipped} already present, "
+          f"{skipped} skipped for unknown users)")
+
+
+def _import_templates(conn, rows):
+    existing = {row[0] for row in conn.execute(select(TicketTemplate.__table__.c.name))}
+    now = datetime.utcnow()
+    new_rows = [{
+        'name': row.get('name') or 'Untitled',
+        'subject': row.get('subject'),
+        'description': row.get('description'),
+        'category': row.get('category'),
+        'priority': row.get('priority'),
+        'required_fields': row.get('required_fields') or [],
+        'created_at': now,
+        'updated_at': now,
+    } for row in rows if (row.get('name') or 'Untitled') not in existing]
+    if new_rows:
+        conn.execute(insert(TicketTemplate.__table__), new_rows)
+    print(f"  ✓ Imported {len(new_rows)} ticket templates ({len(rows) - len(new_rows)} already present)")
+
+
+def _check_tickets(conn, rows):
+    ids = {row['id'] for row in rows if 'id' in row}
+    if not ids:
+        print("  ✓ data/tickets.json holds no tickets")
+        return
+    existing = {row[0] for row in conn.execute(text("SELECT id FROM tickets"))}
+    missing = sorted(ids - existing)
+    if missing:
+        print(f"  ! {len(missing)} tickets in tickets.json are not in the tickets table (not imported): {missing[:20]}")
+    else:
+        print(f"  ✓ All {len(ids)} tickets in tickets.json are in the tickets table")
+
+
+def run_migration(data_dir='data'):
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    for table in ('users', 'tickets', 'activities'):
+        if table not in existing_tables:
+            print(f"Error: {table} table does not exist")
+            return False
+
+    if TicketTemplate.__tablename__ not in existing_tables:
+        print("Creating 'ticket_templates' table...")
+        TicketTemplate.__table__.create(engine)
+        print("  ✓ Created ticket_templates")
+    else:
+        print("  - Table ticket_templates already exists, skipping")
+
+    indexes = [i['name'] for i in inspector.get_indexes('activities')]
+    with engine.connect() as conn:
+        if ACTIVITY_INDEX not in indexes:
+            print(f"Adding index {ACTIVITY_INDEX}...")
+            conn.execute(text(f"CREATE INDEX {ACTIVITY_INDEX} ON activities (user_id, created_at)"))
+            conn.commit()
+            print("  ✓ Added index")
+        else:
+            print(f"  - Index {ACTIVITY_INDEX} already exists, skipping")
+
+        print(f"Importing JSON stores from {data_dir}/...")
+        activities = _load(data_dir, 'activities.json')
+        if activities:
+            _import_activities(conn, activities)
+        templates = _load(data_dir, 'templates.json')
+        if templates:
+            _import_templates(conn, templates)
+        tickets = _load(data_dir, 'tickets.json')
+        if tickets is not None:
+            _check_tickets(conn, tickets)
+        conn.commit()
+
+    print("\nMigration completed successfully!")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move the data/*.json stores into the database')
+    parser.add_argument('--data-dir', default='data', help='Directory holding the JSON files (default: data)')
+    args = parser.parse_args()
+    success = run_migration(args.data_dir)
+    sys.exit(0 if success else 1)
@@ -4,6 +4,10 @@ from models.user import User
 from models.enums import UserType, Country
 from models.company import Company
 from models.asset import Asset, AssetStatus
+from models.asset_tag_sequence import AssetTagSequence
+from models.export_job import ExportJob
+from models.pdf_extraction_result import PdfExtractionResult
+from models.media_rendition import MediaRendition
 from models.accessory import Accessory
 from models.accessory_alias import AccessoryAlias
 from models.customer_user import CustomerUser
@@ -27,6 +31,13 @@ from models.user_category_permission import UserCategoryPermission
 from models.import_session import ImportSession
 from models.company_customer_permission import CompanyCustomerPermission
 from models.tracking_history import TrackingHistory
+from models.sync_tombstone import SyncTombstone
+from models.asset_facet import AssetFacetCount, AssetFacetState
+from models.ticket_count import TicketCount, TicketCountState
+from models.ticket_status_change import TicketStatusChange
+from models.ticket_template import TicketTemplate
+from models.autocomplete_change import AutocompleteChange
+from models.ezy2ship_shipment import Ezy2shipManifest, Ezy2shipShipment
 from models.asset_history import AssetHistory
 from models.accessory_history import AccessoryHistory
 from models.asset_transaction import AssetTransaction
@@ -71,6 +82,10 @@ __all__ = [
     "Company",
     "Asset",
     "AssetStatus",
+    "AssetTagSequence",
+    "ExportJob",
+    "PdfExtractionResult",
+    "MediaRendition",
     "Accessory",
     "AccessoryAlias",
     "Country",
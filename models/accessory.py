@@ -1,10 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
+from models.media_rendition import MediaRendition, rendition_urls
 
 class Accessory(Base):
     __tablename__ = 'accessories'
+    __table_args__ = (
+        Index('ix_accessories_updated_at_id', 'updated_at', 'id'),  # Mobile delta sync keyset
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)  # Item Name
@@ -17,10 +21,11 @@ class Accessory(Base):
     status = Column(String(50), default='Available')  # Status
     notes = Column(String(1000))  # Notes
     image_url = Column(String(500), nullable=True)  # Product image URL
+    image_sha256 = Column(String(64), nullable=True, index=True)  # Uploaded image content hash (media pipeline)
     checkout_date = Column(DateTime)
     return_date = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     customer_id = Column(Integer, ForeignKey('customer_users.id'), nullable=True)
     company_id = Column(Integer, ForeignKey('companies.id'), nullable=True)
 
@@ -31,6 +36,17 @@ class Accessory(Base):
     history = relationship("AccessoryHistory", back_populates="accessory", order_by="desc(AccessoryHistory.created_at)")
     transactions = relationship("AccessoryTransaction", back_populates="accessory", order_by="desc(AccessoryTransaction.transaction_date)")
     aliases = relationship("AccessoryAlias", back_populates="accessory", cascade="all, delete-orphan")
+    image_renditions = relationship(
+        MediaRendition,
+        primaryjoin=lambda: Accessory.image_sha256 == MediaRendition.content_sha256,
+        foreign_keys=lambda: [MediaRendition.content_sha256],
+        viewonly=True
+    )
+
+    @property
+    def image_thumbnails(self):
+        """Rendition URLs of the uploaded image by size name ({} if none rendered)"""
+        return rendition_urls(self.image_renditions) if self.image_sha256 else {}
     
     def track_change(self, user_id, action, changes, notes=None):
         """Create a history entry for accessory changes
@@ -17,6 +17,11 @@ class AccessoryTransaction(Base):
     transaction_date = Column(DateTime, default=datetime.utcnow)
     transaction_number = Column(String(100))
     quantity = Column(Integer, default=1)
+
+    # Signed stock movements applied by utils.accessory_stock (NULL on legacy rows).
+    # Summing them per accessory reproduces the materialized quantities.
+    available_delta = Column(Integer, nullable=True)
+    total_delta = Column(Integer, nullable=True)
     
     # Relationships
     accessory = relationship("Accessory", back_populates="transactions")
@@ -24,10 +29,13 @@ class AccessoryTransaction(Base):
     user = relationship("User")
     
     def __init__(self, accessory_id, transaction_type, quantity=1, transaction_number=None, 
-                 customer_id=None, user_id=None, notes=None, transaction_date=None):
+                 customer_id=None, user_id=None, notes=None, transaction_date=None,
+                 available_delta=None, total_delta=None):
         self.accessory_id = accessory_id
         self.transaction_type = transaction_type
         self.quantity = quantity
+        self.available_delta = available_delta
+        self.total_delta = total_delta
         self.customer_id = customer_id
         self.user_id = user_id
         self.notes = notes
@@ -1,11 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from models.base import Base
 
 class Activity(Base):
     __tablename__ = 'activities'
-    
+    __table_args__ = (
+        Index('ix_activities_user_id_created_at', 'user_id', 'created_at'),  # Append-only feed per user
+    )
+
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     type = Column(String(50), nullable=False)  # e.g., 'mention', 'ticket_assigned', etc.
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, JSON, Float, Boolean, Table
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, JSON, Float, Boolean, Table, Index
 from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 import enum
 from models.base import Base
 from models.intake_ticket import IntakeTicket
+from models.media_rendition import MediaRendition, rendition_urls
 
 class AssetStatus(enum.Enum):
     IN_STOCK = "In Stock"
@@ -28,6 +29,9 @@ ticket_assets = Table(
 
 class Asset(Base):
     __tablename__ = 'assets'
+    __table_args__ = (
+        Index('ix_assets_updated_at_id', 'updated_at', 'id'),  # Mobile delta sync keyset
+    )
     
     id = Column(Integer, primary_key=True)
     asset_tag = Column(String(50), unique=True, nullable=False)
@@ -45,8 +49,9 @@ class Asset(Base):
     notes = Column(String(1000))
     tech_notes = Column(String(2000))  # Longer length for detailed technical notes
     image_url = Column(String(500), nullable=True)  # Product image URL
+    image_sha256 = Column(String(64), nullable=True, index=True)  # Uploaded image content hash (media pipeline)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     assigned_to_id = Column(Integer, ForeignKey('users.id'))
     customer_id = Column(Integer, ForeignKey('customer_users.id'), nullable=True)
     
@@ -85,6 +90,17 @@ class Asset(Base):
     transactions = relationship("AssetTransaction", back_populates="asset", order_by="desc(AssetTransaction.transaction_date)")
     checkins = relationship("TicketAssetCheckin", back_populates="asset", cascade="all, delete-orphan")
     service_records = relationship("ServiceRecord", back_populates="asset", order_by="desc(ServiceRecord.performed_at)")
+    image_renditions = relationship(
+        MediaRendition,
+        primaryjoin=lambda: Asset.image_sha256 == MediaRendition.content_sha256,
+        foreign_keys=lambda: [MediaRendition.content_sha256],
+        viewonly=True
+    )
+
+    @property
+    def image_thumbnails(self):
+        """Rendition URLs of the uploaded image by size name ({} if none rendered)"""
+        return rendition_urls(self.image_renditions) if self.image_sha256 else {}
 
     def track_change(self, user_id, action, changes, notes=None):
         """Create a history entry for asset changes
@@ -0,0 +1,248 @@
+"""
+Asset Facet Models
+Per-value asset counts behind the inventory filter dropdowns, kept up to date
+on every asset insert, update and delete (read side: utils/asset_facets.py)
+
+A cell counts the assets with one value of one facet column within one
+(country, company_id, customer) combination - the columns the inventory
+permission filters look at - so a user's dropdowns are a sum over the cells
+their filter admits instead of a DISTINCT over their assets.
+
+Writers only touch the cells they change. The version stamp that readers use
+to invalidate their cache is bumped after the writing transaction commits, on
+a connection of its own, so concurrent asset writes never queue on the
+single asset_facet_state row.
+"""
+import logging
+from collections import Counter
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, event, inspect, select
+from sqlalchemy.orm import Session
+from models.base import Base
+from models.summary_counts import cell_text, upsert_counts
+from models.asset import Asset
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Facet name -> Asset attribute
+FACET_COLUMNS = {
+    'customer': 'customer',
+    'model': 'model',
+    'country': 'country',
+    'status': 'status',
+    'asset_type': 'asset_type',
+    'manufacturer': 'manufacturer',
+    'condition': 'condition',
+    'location': 'location_id',
+}
+SCOPE_COLUMNS = ('country', 'company_id', 'customer')
+TRACKED_COLUMNS = tuple(sorted(set(FACET_COLUMNS.values()) | set(SCOPE_COLUMNS)))
+KEY_COLUMNS = ('facet', 'value', 'country', 'company_id', 'customer')
+
+STATE_ID = 1
+
+# Session.info key of sessions that changed facet counts in the open transaction
+CHANGED_KEY = 'asset_facets_changed'
+
+
+def _source_length(column):
+    """Length of a string column of Asset (0 for other types)"""
+    return getattr(Asset.__table__.c[column].type, 'length', None) or 0
+
+
+# Cell values are never narrower than the Asset columns they come from
+VALUE_LENGTH = max([255] + [_source_length(column) for column in FACET_COLUMNS.values()])
+
+
+class AssetFacetCount(Base):
+    """Assets with value in facet, within one (country, company_id, customer) cell"""
+    __tablename__ = 'asset_facet_counts'
+    __table_args__ = (
+        Index('ux_asset_facet_counts_key', *KEY_COLUMNS, unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    facet = Column(String(30), nullable=False)
+    value = Column(String(VALUE_LENGTH), nullable=False, default='')  # '' for NULL; enum name; location id
+    country = Column(String(_source_length('country')), nullable=False, default='')
+    company_id = Column(Integer, nullable=False, default=0)  # 0 for NULL
+    customer = Column(String(_source_length('customer')), nullable=False, default='')
+    asset_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<AssetFacetCount {self.facet}={self.value!r}: {self.asset_count}>'
+
+
+class AssetFacetState(Base):
+    """Single row: version stamp of asset_facet_counts and whether it needs a rebuild"""
+    __tablename__ = 'asset_facet_state'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    stale = Column(Boolean, nullable=False, default=True)
+    rebuilt_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<AssetFacetState v{self.version}{" stale" if self.stale else ""}>'
+
+
+def asset_cells(values):
+    """
+    Facet cells of one asset.
+
+    Args:
+        values: Mapping with the TRACKED_COLUMNS of the asset
+
+    Returns:
+        list: (facet, value, country, company_id, customer) keys
+    """
+    scope = (cell_text(values.get('country')), values.get('company_id') or 0, cell_text(values.get('customer')))
+    return [(facet, cell_text(values.get(column))) + scope for facet, column in FACET_COLUMNS.items()]
+
+
+def apply_deltas(connection, deltas):
+    """
+    Add deltas ({cell key: +n/-n}) to the counts.
+
+    The version is not bumped here: call bump_version once the transaction
+    has committed (sessions do it in an after_commit listener). While the
+    summary is stale or not built yet the deltas are harmless, the next
+    rebuild replaces every cell.
+
+    Returns:
+        bool: True if any count changed
+    """
+    deltas = Counter({key: delta for key, delta in deltas.items() if delta})
+    if not deltas:
+        return False
+    upsert_counts(connection, AssetFacetCount.__table__, KEY_COLUMNS, deltas)
+    return True
+
+
+def bump_version(bind):
+    """
+    Move the version stamp so every process re-reads the cells.
+
+    Runs in a short transaction on a connection of its own, after the counts
+    were committed, so the row lock is held for one UPDATE only.
+
+    Args:
+        bind: Engine (or Session) of the committed counts
+    """
+    engine = bind.get_bind() if isinstance(bind, Session) else bind
+    state = AssetFacetState.__table__
+    try:
+        with engine.begin() as conn:
+            conn.execute(state.update().where(state.c.id == STATE_ID).values(version=state.c.version + 1))
+    except Exception as e:
+        # Readers keep their cached cells until the next bump
+        logger.warning(f"Could not bump the asset facet version: {str(e)}")
+
+
+def mark_stale(connection):
+    """Changes the listeners cannot see the old values of force a rebuild on the next read"""
+    state = AssetFacetState.__table__
+    connection.execute(
+        state.update().where(state.c.id == STATE_ID).values(stale=True, version=state.c.version + 1)
+    )
+
+
+def record_inserted(connection, records):
+    """
+    Count assets inserted with Core insert(Asset.__table__) (importers).
+
+    Call bump_version after the transaction commits.
+    """
+    return apply_deltas(connection, Counter(cell for record in records for cell in asset_cells(record)))
+
+
+def _old_values(state):
+    """Pre-flush values of the tracked columns, or None if one was never loaded"""
+    values = {}
+    for column in TRACKED_COLUMNS:
+        history = state.attrs[column].history
+        if history.deleted:
+            values[column] = history.deleted[0]
+        elif history.unchanged:
+            values[column] = history.unchanged[0]
+        else:
+            return None
+    return values
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the previous value when an expired tracked column is assigned, so the
+# flush can move the asset out of its old cells instead of forcing a rebuild
+for _column in TRACKED_COLUMNS:
+    event.listen(getattr(Asset, _column), 'set', _keep_old_value, active_history=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_flushed_assets(session, flush_context):
+    """session.add(asset), edits and session.delete(asset)"""
+    deltas = Counter()
+    stale = False
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if getattr(obj, '__tablename__', None) != 'assets':
+            continue
+        state = inspect(obj)
+        if obj in session.new:
+            deltas.update(asset_cells({column: state.dict.get(column) for column in TRACKED_COLUMNS}))
+            continue
+        if obj in session.dirty and not any(state.attrs[column].history.has_changes() for column in TRACKED_COLUMNS):
+            continue
+
+        old = _old_values(state)
+        if old is None:
+            stale = True
+            continue
+        deltas.subtract(asset_cells(old))
+        if obj not in session.deleted:
+            deltas.update(asset_cells({column: state.dict.get(column) for column in TRACKED_COLUMNS}))
+
+    if stale:
+        mark_stale(session.connection())
+    elif apply_deltas(session.connection(), deltas):
+        session.info[CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _count_bulk_asset_changes(orm_execute_state):
+    """query(Asset).filter(...).delete()/.update() bypass the flush"""
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update) or orm_execute_state.bind_mapper is None:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper.local_table.name != 'assets':
+        return
+
+    session = orm_execute_state.session
+    if orm_execute_state.is_update:
+        mark_stale(session.connection())
+        return
+
+    table = mapper.local_table
+    query = select(*[table.c[column] for column in TRACKED_COLUMNS])
+    whereclause = orm_execute_state.statement.whereclause
+    if whereclause is not None:
+        query = query.where(whereclause)
+    deltas = Counter()
+    for row in session.execute(query).mappings():
+        deltas.subtract(asset_cells(row))
+    if apply_deltas(session.connection(), deltas):
+        session.info[CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_version_after_commit(session):
+    if session.info.pop(CHANGED_KEY, False):
+        bump_version(session.get_bind())
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_changes(session, previous_transaction):
+    # A rolled back savepoint leaves the outer transaction's changes to commit
+    if previous_transaction.parent is None:
+        session.info.pop(CHANGED_KEY, None)
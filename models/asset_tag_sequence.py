@@ -0,0 +1,28 @@
+"""
+Asset Tag Sequence Model
+Stores the last allocated number for each asset tag prefix (e.g. "SG-", "SG-R")
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from models.base import Base
+
+
+class AssetTagSequence(Base):
+    """One row per tag prefix; last_value is the highest number handed out"""
+    __tablename__ = 'asset_tag_sequences'
+
+    prefix = Column(String(20), primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AssetTagSequence {self.prefix}: {self.last_value}>'
+
+    def to_dict(self):
+        return {
+            'prefix': self.prefix,
+            'last_value': self.last_value,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,90 @@
+"""
+Autocomplete Change Model
+Change log polled by the per-process autocomplete index (utils/autocomplete.py)
+
+Listeners add one row per changed user, group, customer or asset on every
+flush. Each process applies the rows after the last id it has seen, so
+its index follows the database without rebuilding. A row without row_id
+means "reload the whole table" (bulk updates and core inserts).
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, event, inspect
+from sqlalchemy.orm import Session
+from models.base import Base
+
+# Table -> columns the index uses (None: any change counts)
+TRACKED_TABLES = {
+    'users': ('username', 'email', 'is_deleted', 'mention_filter_enabled', 'user_type', 'company_id',
+              'assigned_country'),
+    'groups': ('name', 'description', 'is_active'),
+    'group_memberships': None,
+    'customer_users': ('name', 'email', 'contact_number', 'address', 'company_id'),
+    'companies': ('name', 'parent_company_id'),
+    'assets': ('asset_tag', 'serial_num', 'name', 'model', 'company_id', 'customer_id', 'customer', 'country'),
+    'user_mention_permissions': None,
+    'user_company_permissions': None,
+    'user_country_permissions': None,
+    'company_customer_permissions': None,
+}
+
+
+class AutocompleteChange(Base):
+    """One changed row (or table, if row_id is NULL); id is the change version"""
+    __tablename__ = 'autocomplete_changes'
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    row_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<AutocompleteChange {self.id} {self.table_name}:{self.row_id}>'
+
+
+def record_changes(connection, table_name, row_ids=None):
+    """
+    Log changed rows of a tracked table (for writes that bypass the ORM).
+
+    Args:
+        connection: Connection of the writing transaction
+        table_name: Key of TRACKED_TABLES
+        row_ids: Changed primary keys, or None for "reload the whole table"
+    """
+    now = datetime.utcnow()
+    rows = [{'table_name': table_name, 'row_id': row_id, 'created_at': now}
+            for row_id in (row_ids if row_ids is not None else [None])]
+    if rows:
+        connection.execute(AutocompleteChange.__table__.insert(), rows)
+
+
+def _changed(obj, session):
+    table_name = getattr(obj, '__tablename__', None)
+    if table_name not in TRACKED_TABLES:
+        return None
+    columns = TRACKED_TABLES[table_name]
+    if obj in session.dirty and columns is not None:
+        state = inspect(obj)
+        if not any(column in state.attrs and state.attrs[column].history.has_changes() for column in columns):
+            return None
+    return table_name
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed_changes(session, flush_context):
+    changed = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table_name = _changed(obj, session)
+        if table_name is not None and getattr(obj, 'id', None) is not None:
+            changed.setdefault(table_name, set()).add(obj.id)
+    for table_name, row_ids in changed.items():
+        record_changes(session.connection(), table_name, sorted(row_ids))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk_changes(orm_execute_state):
+    """query(Model).update()/.delete() and session.execute(insert(Model)) bypass the flush"""
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    table_name = orm_execute_state.bind_mapper.local_table.name
+    if table_name in TRACKED_TABLES:
+        record_changes(orm_execute_state.session.connection(), table_name)
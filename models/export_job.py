@@ -0,0 +1,49 @@
+"""
+Export Job Model
+Tracks large exports that are generated in the background and downloaded later
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from models.base import Base
+
+
+class ExportJob(Base):
+    """One row per background export; file_path points at the finished file"""
+    __tablename__ = 'export_jobs'
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    export_type = Column(String(50), nullable=False)  # 'assets', 'accessories', 'customer_users', 'tickets'
+    file_format = Column(String(10), default='csv')  # 'csv' or 'xlsx'
+    status = Column(String(20), default=STATUS_PENDING)
+    file_name = Column(String(255), nullable=True)
+    file_path = Column(String(500), nullable=True)
+    row_count = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<ExportJob {self.id}: {self.export_type} {self.status}>'
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_COMPLETED, self.STATUS_FAILED)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'export_type': self.export_type,
+            'file_format': self.file_format,
+            'status': self.status,
+            'file_name': self.file_name,
+            'row_count': self.row_count,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
@@ -0,0 +1,79 @@
+"""
+SingPost Ezy2ship Mirror Models
+Local copies of the account's Ezy2ship manifests and their shipments,
+kept current by the sync job in utils/ezy2ship_sync.py so ticket views and
+reconciliation screens query indexed tables instead of the SOAP service.
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey
+from models.base import Base
+
+
+class Ezy2shipManifest(Base):
+    """An Ezy2ship manifest, as last returned by getManifests"""
+    __tablename__ = 'ezy2ship_manifests'
+
+    id = Column(Integer, primary_key=True)
+    manifest_number = Column(String(50), nullable=False, unique=True)
+    manifest_date = Column(Date, nullable=True, index=True)
+    carrier_code = Column(String(10))
+    shipment_count = Column(Integer, default=0)
+    status = Column(String(50))
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    # When the shipments were last fetched with getManifest (NULL: still to fetch)
+    shipments_synced_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Ezy2shipManifest {self.manifest_number}: {self.shipment_count} shipments>'
+
+
+class Ezy2shipShipment(Base):
+    """A shipment of a mirrored manifest, with its latest tracking status"""
+    __tablename__ = 'ezy2ship_shipments'
+
+    id = Column(Integer, primary_key=True)
+    tracking_number = Column(String(100), nullable=False, unique=True)
+    manifest_number = Column(String(50), nullable=False, index=True)
+    manifest_date = Column(Date, nullable=True, index=True)
+    docket_number = Column(String(100))
+    service_code = Column(String(50))
+    carrier_code = Column(String(10), index=True)
+    weight = Column(Float, default=0)
+    receiver_name = Column(String(200))
+    receiver_address = Column(String(255))
+    receiver_city = Column(String(100))
+    receiver_postcode = Column(String(20))
+    receiver_country = Column(String(10))
+    status = Column(String(100))
+    last_event = Column(String(255))
+    events_count = Column(Integer, default=0)
+    # Ticket carrying this tracking number in any of its package slots
+    ticket_id = Column(Integer, ForeignKey('tickets.id'), nullable=True, index=True)
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    status_checked_at = Column(DateTime, nullable=True)
+
+    def to_dict(self):
+        """Shape of the shipment dictionaries of SingPostEzy2shipClient, plus the mirror fields"""
+        return {
+            'tracking_number': self.tracking_number,
+            'docket_number': self.docket_number,
+            'manifest_number': self.manifest_number,
+            'manifest_date': self.manifest_date.isoformat() if self.manifest_date else None,
+            'service_code': self.service_code,
+            'carrier_code': self.carrier_code,
+            'weight': self.weight,
+            'receiver_name': self.receiver_name,
+            'receiver_address': self.receiver_address,
+            'receiver_city': self.receiver_city,
+            'receiver_postcode': self.receiver_postcode,
+            'receiver_country': self.receiver_country,
+            'status': self.status,
+            'last_event': self.last_event,
+            'events_count': self.events_count,
+            'ticket_id': self.ticket_id,
+            'synced_at': self.synced_at.isoformat() if self.synced_at else None,
+            'status_checked_at': self.status_checked_at.isoformat() if self.status_checked_at else None,
+        }
+
+    def __repr__(self):
+        return f'<Ezy2shipShipment {self.tracking_number} ({self.manifest_number}): {self.status}>'
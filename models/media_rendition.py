@@ -0,0 +1,53 @@
+"""
+Media Rendition Model
+Resized JPEG renditions (thumbnails / PDF first-page previews) of uploaded files.
+
+Renditions are keyed by the SHA-256 of the source file, so identical uploads
+share one set of renditions. Owners (ticket attachments, asset and accessory
+images) store the hash and load their renditions through a view-only
+relationship on it.
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from models.base import Base
+
+# Rendition name -> longest edge in pixels
+RENDITION_SIZES = {
+    'list': 200,     # Lists / gallery grids
+    'detail': 800,   # Detail views and PDF previews
+    'retina': 1600,  # 2x detail for high-density screens
+}
+
+
+class MediaRendition(Base):
+    """One resized JPEG of a source file"""
+    __tablename__ = 'media_renditions'
+    __table_args__ = (
+        UniqueConstraint('content_sha256', 'size_name', name='uq_media_rendition_sha256_size'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    content_sha256 = Column(String(64), nullable=False, index=True)
+    size_name = Column(String(20), nullable=False)  # Key of RENDITION_SIZES
+    source_type = Column(String(10), nullable=False)  # 'image' or 'pdf'
+    width = Column(Integer)
+    height = Column(Integer)
+    file_size = Column(Integer)
+    file_path = Column(String(512), nullable=False)
+    url = Column(String(500), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<MediaRendition {self.content_sha256[:12]} {self.size_name}>'
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'width': self.width,
+            'height': self.height
+        }
+
+
+def rendition_urls(renditions):
+    """Map size name -> URL for a list of renditions, e.g. {'list': '/static/...'}"""
+    return {rendition.size_name: rendition.url for rendition in renditions or []}
@@ -0,0 +1,46 @@
+"""
+PDF Extraction Result Model
+Caches text, assets and shipping info extracted from PDFs, keyed by file content
+"""
+import json
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, UniqueConstraint
+from models.base import Base
+
+# Large enough for OCR text of long packing lists (MEDIUMTEXT on MySQL)
+LARGE_TEXT = Text(length=16777215)
+
+
+class PdfExtractionResult(Base):
+    """One row per (file SHA-256, extractor version); fields are filled as they are extracted"""
+    __tablename__ = 'pdf_extraction_results'
+    __table_args__ = (
+        UniqueConstraint('sha256', 'extractor_version', name='uq_pdf_extraction_sha256_version'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    extractor_version = Column(String(20), nullable=False)
+    file_size = Column(Integer, nullable=True)
+
+    text = Column(LARGE_TEXT, nullable=True)  # Full document text (text layer or OCR)
+    assets_json = Column(LARGE_TEXT, nullable=True)  # extract_assets_from_pdf() result
+    shipping_json = Column(Text, nullable=True)  # extract_shipping_info_from_pdf() result
+
+    assets_seconds = Column(Float, nullable=True)  # Time the uncached extraction took
+    shipping_seconds = Column(Float, nullable=True)
+    hit_count = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PdfExtractionResult {self.sha256[:12]} v{self.extractor_version}>'
+
+    @property
+    def assets(self):
+        return json.loads(self.assets_json) if self.assets_json else None
+
+    @property
+    def shipping_info(self):
+        return json.loads(self.shipping_json) if self.shipping_json else None
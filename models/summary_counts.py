@@ -0,0 +1,53 @@
+"""
+Helpers of the count summary tables (models/asset_facet.py,
+models/ticket_count.py): listeners add +n/-n deltas to one row per key
+instead of the readers running COUNT queries.
+"""
+from enum import Enum as PyEnum
+
+
+def cell_text(value):
+    """Cell value of a column: '' for NULL, the name of an enum member"""
+    if value is None:
+        return ''
+    if isinstance(value, PyEnum):
+        return value.name
+    return str(value)
+
+
+def upsert_counts(connection, table, key_columns, deltas, count_column='asset_count'):
+    """
+    Add deltas to the count column of a summary table, inserting missing keys.
+
+    Args:
+        connection: Connection of the flushing session
+        table: Summary Table with a unique index on key_columns
+        key_columns: Names of the key columns
+        deltas: {key tuple: +n/-n}
+        count_column: Name of the counter column
+    """
+    rows = [dict(zip(key_columns, key), **{count_column: delta}) for key, delta in deltas.items()]
+    count = table.c[count_column]
+
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={count_column: count + stmt.excluded[count_column]}
+        )
+        connection.execute(stmt, rows)
+    elif dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_duplicate_key_update({count_column: count + stmt.inserted[count_column]})
+        connection.execute(stmt, rows)
+    else:
+        for row in rows:
+            key = [table.c[column] == row[column] for column in key_columns]
+            result = connection.execute(
+                table.update().where(*key).values({count_column: count + row[count_column]})
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert(), row)
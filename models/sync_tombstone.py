@@ -0,0 +1,68 @@
+"""
+Sync Tombstone Model
+Records deleted tickets, assets and accessories so mobile delta sync can tell
+clients which cached rows to drop
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Index, event, select
+from sqlalchemy.orm import Session
+from models.base import Base
+
+# Tables whose deletes are synced to the mobile app
+SYNCED_TABLES = ('tickets', 'assets', 'accessories')
+
+
+class SyncTombstone(Base):
+    """One row per deleted synced row; id is the delta sync cursor for deletes"""
+    __tablename__ = 'sync_tombstones'
+    __table_args__ = (
+        Index('ix_sync_tombstones_entity_id', 'entity_type', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    entity_type = Column(String(50), nullable=False)  # Table name, e.g. 'tickets'
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<SyncTombstone {self.entity_type}:{self.entity_id}>'
+
+
+def _insert_tombstones(connection, entity_type, entity_ids):
+    if entity_ids:
+        now = datetime.utcnow()
+        connection.execute(SyncTombstone.__table__.insert(), [
+            {'entity_type': entity_type, 'entity_id': entity_id, 'deleted_at': now}
+            for entity_id in entity_ids
+        ])
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_deleted_objects(session, flush_context):
+    """session.delete(ticket) and cascaded deletes"""
+    deleted = {}
+    for obj in session.deleted:
+        table = getattr(obj, '__tablename__', None)
+        if table in SYNCED_TABLES and obj.id is not None:
+            deleted.setdefault(table, []).append(obj.id)
+    for table, entity_ids in deleted.items():
+        _insert_tombstones(session.connection(), table, entity_ids)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk_deletes(orm_execute_state):
+    """query(Asset).filter(...).delete() bypasses the flush, so read the ids first"""
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is None:
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = mapper.local_table.name
+    if table not in SYNCED_TABLES:
+        return
+
+    query = select(mapper.primary_key[0])
+    whereclause = orm_execute_state.statement.whereclause
+    if whereclause is not None:
+        query = query.where(whereclause)
+    session = orm_execute_state.session
+    entity_ids = session.execute(query).scalars().all()
+    _insert_tombstones(session.connection(), table, entity_ids)
@@ -69,6 +69,7 @@ class Ticket(Base):
         Index('ix_tickets_status', 'status'),
         Index('ix_tickets_assigned_to_id', 'assigned_to_id'),
         Index('ix_tickets_requester_id', 'requester_id'),
+        Index('ix_tickets_updated_at_id', 'updated_at', 'id'),  # Mobile delta sync keyset
     )
 
     id = Column(Integer, primary_key=True)
@@ -110,7 +111,7 @@ class Ticket(Base):
 
     firstbaseorderid = Column(String(100), nullable=True)  # Store order ID for duplicate prevention
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Add tracking status fields
     shipping_status = Column(String(100), default='Pending')
@@ -2,6 +2,7 @@ from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, BigInteger
 from sqlalchemy.orm import relationship
 from models.base import Base
+from models.media_rendition import MediaRendition
 
 class TicketAttachment(Base):
     __tablename__ = 'ticket_attachments'
@@ -14,7 +15,30 @@ class TicketAttachment(Base):
     file_size = Column(BigInteger, nullable=True)
     uploaded_by = Column(Integer, ForeignKey('users.id'), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    content_sha256 = Column(String(64), nullable=True, index=True)  # Set by the media pipeline
 
     # Relationships
     ticket = relationship('Ticket', back_populates='attachments')
-    uploader = relationship('User', back_populates='uploaded_attachments') 
\ No newline at end of file
+    uploader = relationship('User', back_populates='uploaded_attachments')
+    renditions = relationship(
+        MediaRendition,
+        primaryjoin=lambda: TicketAttachment.content_sha256 == MediaRendition.content_sha256,
+        foreign_keys=lambda: [MediaRendition.content_sha256],
+        viewonly=True
+    )
+
+    @property
+    def thumbnails(self):
+        """Rendition URLs by size name ({} until the background worker has rendered them)"""
+        return self.thumbnail_urls(f"/tickets/{self.ticket_id}/attachment/{self.id}/rendition")
+
+    def thumbnail_urls(self, url_prefix):
+        """
+        Rendition URLs by size name, as <url_prefix>/<size name>.
+
+        The shared MediaRendition.url is not used: attachment previews are
+        served by the attachment routes, which check access to the ticket.
+        """
+        if not self.content_sha256:
+            return {}
+        return {rendition.size_name: f"{url_prefix}/{rendition.size_name}" for rendition in self.renditions}
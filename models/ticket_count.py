@@ -0,0 +1,230 @@
+"""
+Ticket Count Models
+Ticket counts per (queue, assignee, status) kept up to date on every ticket
+insert, update and delete (read side: utils/ticket_counters.py)
+
+A cell counts the tickets of one queue, assigned to one user, with one
+status and one status text (the lowercased custom status, or the status
+name), which is everything the dashboard counters and the queue
+breakdowns group or filter on. Counts for "all tickets in my queues" and
+"assigned to me" are then a pass over a few hundred cells instead of
+COUNT queries over the tickets table.
+
+Writers only touch the cells they change. The version stamp (and the stale
+flag) that readers use to invalidate their cache is written after the writing
+transaction commits, on a connection of its own, so concurrent ticket writes
+never queue on the single ticket_count_state row.
+"""
+import logging
+from collections import Counter
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, event, inspect, select
+from sqlalchemy.orm import Session
+from models.base import Base
+from models.summary_counts import cell_text, upsert_counts
+from models.ticket import Ticket
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+TRACKED_COLUMNS = ('assigned_to_id', 'custom_status', 'queue_id', 'status')
+KEY_COLUMNS = ('queue_id', 'assigned_to_id', 'status', 'status_text')
+
+STATE_ID = 1
+
+# session.info flags set while flushing, acted on after the commit
+CHANGED_KEY = 'ticket_counts_changed'
+STALE_KEY = 'ticket_counts_stale'
+
+
+class TicketCount(Base):
+    """Tickets in one (queue, assignee, status, status text) cell"""
+    __tablename__ = 'ticket_counts'
+    __table_args__ = (
+        Index('ux_ticket_counts_key', *KEY_COLUMNS, unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    queue_id = Column(Integer, nullable=False, default=0)  # 0 for NULL
+    assigned_to_id = Column(Integer, nullable=False, default=0)  # 0 for NULL
+    status = Column(String(30), nullable=False, default='')  # TicketStatus name, '' for NULL
+    status_text = Column(String(100), nullable=False, default='')  # lower(custom_status or status)
+    ticket_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<TicketCount queue={self.queue_id} user={self.assigned_to_id} {self.status_text!r}: {self.ticket_count}>'
+
+
+class TicketCountState(Base):
+    """Single row: version stamp of ticket_counts and whether it needs a rebuild"""
+    __tablename__ = 'ticket_count_state'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    stale = Column(Boolean, nullable=False, default=True)
+    rebuilt_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<TicketCountState v{self.version}{" stale" if self.stale else ""}>'
+
+
+def status_text(status, custom_status):
+    """What the status buckets match on: the custom status if set, else the status name"""
+    if custom_status is not None:
+        return custom_status.lower()
+    return cell_text(status).lower()
+
+
+def ticket_cell(values):
+    """
+    Count cell of one ticket.
+
+    Args:
+        values: Mapping with the TRACKED_COLUMNS of the ticket
+
+    Returns:
+        tuple: (queue_id, assigned_to_id, status, status_text) key
+    """
+    return (
+        values.get('queue_id') or 0,
+        values.get('assigned_to_id') or 0,
+        cell_text(values.get('status')),
+        status_text(values.get('status'), values.get('custom_status')),
+    )
+
+
+def apply_deltas(connection, deltas):
+    """
+    Add deltas ({cell key: +n/-n}) to the counts.
+
+    The version is not bumped here: call bump_version once the transaction
+    has committed (sessions do it in an after_commit listener). While the
+    table is stale or not built yet the deltas are harmless, the next
+    rebuild replaces every cell.
+
+    Returns:
+        bool: True if any count changed
+    """
+    deltas = Counter({key: delta for key, delta in deltas.items() if delta})
+    if not deltas:
+        return False
+    upsert_counts(connection, TicketCount.__table__, KEY_COLUMNS, deltas, count_column='ticket_count')
+    return True
+
+
+def bump_version(bind, stale=False):
+    """
+    Move the version stamp so every process re-reads the cells.
+
+    Runs in a short transaction on a connection of its own, after the counts
+    were committed, so the row lock is held for one UPDATE only.
+
+    Args:
+        bind: Engine (or Session) of the committed changes
+        stale: Also force a rebuild on the next read (for changes the
+            listeners cannot see the old values of)
+    """
+    engine = bind.get_bind() if isinstance(bind, Session) else bind
+    state = TicketCountState.__table__
+    values = {'version': state.c.version + 1}
+    if stale:
+        values['stale'] = True
+    try:
+        with engine.begin() as conn:
+            conn.execute(state.update().where(state.c.id == STATE_ID).values(**values))
+    except Exception as e:
+        # Readers keep their cached cells until the next bump
+        logger.warning(f"Could not bump the ticket count version: {str(e)}")
+
+
+def _old_values(state):
+    """Pre-flush values of the tracked columns, or None if one was never loaded"""
+    values = {}
+    for column in TRACKED_COLUMNS:
+        history = state.attrs[column].history
+        if history.deleted:
+            values[column] = history.deleted[0]
+        elif history.unchanged:
+            values[column] = history.unchanged[0]
+        else:
+            return None
+    return values
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the previous value when an expired tracked column is assigned, so the
+# flush can move the ticket out of its old cell instead of forcing a rebuild
+for _column in TRACKED_COLUMNS:
+    event.listen(getattr(Ticket, _column), 'set', _keep_old_value, active_history=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_flushed_tickets(session, flush_context):
+    """session.add(ticket), status/assignee/queue edits and session.delete(ticket)"""
+    deltas = Counter()
+    stale = False
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if getattr(obj, '__tablename__', None) != 'tickets':
+            continue
+        state = inspect(obj)
+        if obj in session.new:
+            deltas[ticket_cell(state.dict)] += 1
+            continue
+        if obj in session.dirty and not any(state.attrs[column].history.has_changes() for column in TRACKED_COLUMNS):
+            continue
+
+        old = _old_values(state)
+        if old is None:
+            stale = True
+            continue
+        deltas[ticket_cell(old)] -= 1
+        if obj not in session.deleted:
+            deltas[ticket_cell(state.dict)] += 1
+
+    if stale:
+        session.info[STALE_KEY] = True
+    elif apply_deltas(session.connection(), deltas):
+        session.info[CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _count_bulk_ticket_changes(orm_execute_state):
+    """query(Ticket).filter(...).delete()/.update() bypass the flush"""
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update) or orm_execute_state.bind_mapper is None:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper.local_table.name != 'tickets':
+        return
+
+    session = orm_execute_state.session
+    if orm_execute_state.is_update:
+        session.info[STALE_KEY] = True
+        return
+
+    table = mapper.local_table
+    query = select(*[table.c[column] for column in TRACKED_COLUMNS])
+    whereclause = orm_execute_state.statement.whereclause
+    if whereclause is not None:
+        query = query.where(whereclause)
+    deltas = Counter()
+    for row in session.execute(query).mappings():
+        deltas[ticket_cell(row)] -= 1
+    if apply_deltas(session.connection(), deltas):
+        session.info[CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_version_after_commit(session):
+    stale = session.info.pop(STALE_KEY, False)
+    if session.info.pop(CHANGED_KEY, False) or stale:
+        bump_version(session.get_bind(), stale=stale)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_changes(session, previous_transaction):
+    # A rolled back savepoint leaves the outer transaction's changes to commit
+    if previous_transaction.parent is None:
+        session.info.pop(CHANGED_KEY, None)
+        session.info.pop(STALE_KEY, None)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from models.base import Base
+
+
+class TicketStatusChange(Base):
+    """Audit row of a ticket status set by an automatic rule (utils/ticket_rules.py)"""
+    __tablename__ = 'ticket_status_changes'
+    __table_args__ = (
+        Index('ix_ticket_status_changes_ticket_id', 'ticket_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, ForeignKey('tickets.id'), nullable=False)
+    rule = Column(String(50), nullable=False)
+    old_status = Column(String(30))  # TicketStatus names
+    new_status = Column(String(30), nullable=False)
+    trigger = Column(String(30), nullable=False)  # 'tracking', 'bulk_refresh'
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TicketStatusChange ticket={self.ticket_id} {self.old_status}->{self.new_status} ({self.rule})>'
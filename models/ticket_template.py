@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from datetime import datetime
+from models.base import Base
+
+
+class TicketTemplate(Base):
+    """Ticket composer template (used to be data/templates.json)"""
+    __tablename__ = 'ticket_templates'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(200), nullable=False)
+    subject = Column(String(200))
+    description = Column(Text)
+    category = Column(String(100))
+    priority = Column(String(50))
+    required_fields = Column(JSON)  # Field ids, e.g. ['serial_number', 'due_date']
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Same shape as the old templates.json entries (string id)"""
+        return {
+            'id': str(self.id),
+            'name': self.name,
+            'subject': self.subject,
+            'description': self.description,
+            'category': self.category,
+            'priority': self.priority,
+            'required_fields': self.required_fields or [],
+        }
+
+    def __repr__(self):
+        return f'<TicketTemplate {self.id} {self.name}>'
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, func, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, func, JSON, Boolean, event, inspect
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum as PyEnum
@@ -25,6 +25,7 @@ class User(Base, UserMixin):
     mention_filter_enabled = Column(Boolean, default=False)  # If True, user can only see allowed mentions
     is_deleted = Column(Boolean, default=False)  # Soft delete flag
     deleted_at = Column(DateTime, nullable=True)  # When the user was deleted
+    token_version = Column(Integer, default=0, server_default='0', nullable=False)  # Bumped to revoke API tokens
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
     
@@ -375,4 +376,16 @@ class User(Base, UserMixin):
     
     def get_group_names(self):
         """Get list of group names this user belongs to"""
-        return [group.name for group in self.active_groups]
\ No newline at end of file
+        return [group.name for group in self.active_groups]
+
+
+# Changes that revoke every API token issued to the user (see utils/auth_cache.py)
+TOKEN_REVOKING_ATTRIBUTES = ('password_hash', 'is_deleted', 'user_type', 'company_id')
+
+
+@event.listens_for(User, 'before_update')
+def _bump_token_version(mapper, connection, target):
+    """Password change, deactivation, role or company change -> new token version"""
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in TOKEN_REVOKING_ATTRIBUTES):
+        target.token_version = (target.token_version or 0) + 1
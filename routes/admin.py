@@ -25,13 +25,13 @@ from database import SessionLocal
 from models.activity import Activity
 from models.asset_history import AssetHistory
 from models.accessory_history import AccessoryHistory
+from utils.accessory_stock import AccessoryStock, InsufficientStockError
 import traceback
 from models.firecrawl_key import FirecrawlKey
 from models.ticket_category_config import TicketCategoryConfig, CategoryDisplayConfig
 import tempfile
 import sqlite3
 import subprocess
-import pandas as pd
 import csv
 import io
 import json
@@ -2274,6 +2274,40 @@ def get_notification_user_group_members(group_id):
         db_session.close()
 
 
+@admin_bp.route('/performance')
+@super_admin_required
+def performance():
+    """Worst endpoints by DB time / query count from sampled requests (this worker only)"""
+    from utils.sql_instrumentation import performance_stats
+
+    sort = request.args.get('sort', 'db_ms')
+    endpoints = performance_stats.worst(sort=sort, limit=request.args.get('limit', 50, type=int))
+    settings = {
+        'sample_rate': current_app.config.get('SQL_INSTRUMENTATION_SAMPLE_RATE'),
+        'n_plus_one_threshold': current_app.config.get('SQL_N_PLUS_ONE_THRESHOLD'),
+        'since': performance_stats.since,
+        'pid': os.getpid(),
+    }
+    if request.args.get('format') == 'json':
+        settings['since'] = settings['since'].isoformat()
+        for endpoint in endpoints:
+            if endpoint['worst']:
+                endpoint['worst']['at'] = endpoint['worst']['at'].isoformat()
+        return jsonify({'settings': settings, 'endpoints': endpoints})
+    return render_template('admin/performance.html', endpoints=endpoints, settings=settings, sort=sort)
+
+
+@admin_bp.route('/performance/reset', methods=['POST'])
+@super_admin_required
+def reset_performance():
+    """Clear the collected endpoint stats of this worker"""
+    from utils.sql_instrumentation import performance_stats
+
+    performance_stats.reset()
+    flash('Performance stats cleared', 'success')
+    return redirect(url_for('admin.performance'))
+
+
 @admin_bp.route('/system-config')
 @super_admin_required
 def system_config():
@@ -3652,11 +3686,8 @@ def get_billing_tickets():
 def generate_billing_report():
     """Generate billing report for selected tickets"""
     try:
-        from models.ticket import Ticket
-        from models.user import User
-        from models.company import Company
-        import json
-        
+        from utils.billing_report import billing_breakdown, billing_data, load_billing_frame, price_tickets
+
         db_session = db_manager.get_session()
         
         # Get parameters
@@ -3670,65 +3701,14 @@ def generate_billing_report():
                 'error': 'No tickets selected'
             })
         
-        # Get tickets
-        tickets = db_session.query(Ticket).filter(Ticket.id.in_(ticket_ids)).all()
-        
-        # Group tickets by country
-        billing_data = {}
-        
-        for ticket in tickets:
-            country = ticket.requester.assigned_country if ticket.requester and ticket.requester.assigned_country else 'Unknown'
-            
-            if country not in billing_data:
-                billing_data[country] = {
-                    'tickets': [],
-                    'fees': {
-                        'receiving_fee': 0,
-                        'warehouse_storage_fee': 0,
-                        'order_fee': 0,
-                        'return_fee': 0,
-                        'intake_fee': 0,
-                        'management_fee': 0,
-                        'cancelled_returns': 0,
-                        'signature_fee': 0
-                    },
-                    'total_amount': 0,
-                    'quantity': 0
-                }
-            
-            billing_data[country]['tickets'].append({
-                'id': ticket.id,
-                'subject': ticket.subject,
-                'status': ticket.status.value if hasattr(ticket.status, 'value') else str(ticket.status),
-                'category': ticket.category.name if ticket.category else 'Unknown',
-                'created_at': ticket.created_at.strftime('%Y-%m-%d')
-            })
-            
-            billing_data[country]['quantity'] += 1
-            
-            # Calculate fees based on ticket category and type
-            category_name = ticket.category.name if ticket.category else 'Unknown'
-            
-            if 'CHECKOUT' in category_name.upper():
-                billing_data[country]['fees']['order_fee'] += 500  # Example fee
-            elif 'RETURN' in category_name.upper():
-                billing_data[country]['fees']['return_fee'] += 240
-            elif 'INTAKE' in category_name.upper():
-                billing_data[country]['fees']['intake_fee'] += 1100
-            
-            # Add receiving fee for all tickets
-            billing_data[country]['fees']['receiving_fee'] += 80
-            
-            # Calculate warehouse storage fee (monthly)
-            billing_data[country]['fees']['warehouse_storage_fee'] += 10
-        
-        # Calculate totals
-        for country_data in billing_data.values():
-            country_data['total_amount'] = sum(country_data['fees'].values())
+        # One projected query, then fees for all tickets at once, summed per country
+        frame = price_tickets(load_billing_frame(db_session, ticket_ids))
         
         return jsonify({
             'success': True,
-            'billing_data': billing_data,
+            'billing_data': billing_data(frame),
+            'breakdown': billing_breakdown(frame),
+            'ticket_ids': frame['id'].tolist(),
             'year': year,
             'month': month,
             'month_name': datetime(int(year), int(month), 1).strftime('%B') if year and month else None
@@ -3747,57 +3727,31 @@ def generate_billing_report():
 def export_billing_report():
     """Export billing report to Excel"""
     try:
-        import pandas as pd
-        from io import BytesIO
+        from utils.billing_report import billing_sheets, load_billing_frame, price_tickets
+        from utils.streaming_export import xlsx_sheets_response
         
-        # Get the billing data from the request
-        billing_data = request.json.get('billing_data', {})
         year = request.json.get('year')
         month = request.json.get('month')
         
-        # Create Excel file in memory
-        output = BytesIO()
-        
-        # Create a workbook and add worksheets
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            
-            # Summary sheet
-            summary_data = []
-            for country, data in billing_data.items():
-                row = {
-                    'Country': country,
-                    'Total Tickets': data['quantity'],
-                    'Receiving Fee': data['fees']['receiving_fee'],
-                    'Warehouse/Storage Fee': data['fees']['warehouse_storage_fee'],
-                    'Order Fee': data['fees']['order_fee'],
-                    'Return Fee': data['fees']['return_fee'],
-                    'Intake Fee': data['fees']['intake_fee'],
-                    'Management Fee': data['fees']['management_fee'],
-                    'Total Amount': data['total_amount']
-                }
-                summary_data.append(row)
-            
-            summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name='Billing Summary', index=False)
-            
-            # Detailed sheets for each country
-            for country, data in billing_data.items():
-                if data['tickets']:
-                    tickets_df = pd.DataFrame(data['tickets'])
-                    sheet_name = f"{country} Details"[:31]  # Excel sheet name limit
-                    tickets_df.to_excel(writer, sheet_name=sheet_name, index=False)
+        # The billed tickets are read again rather than taken from the posted
+        # report; pages that only post billing_data still list their IDs there
+        ticket_ids = request.json.get('ticket_ids') or [
+            ticket['id']
+            for data in request.json.get('billing_data', {}).values()
+            for ticket in data['tickets']
+        ]
         
-        output.seek(0)
+        db_session = db_manager.get_session()
+        try:
+            frame = price_tickets(load_billing_frame(db_session, ticket_ids))
+        finally:
+            db_session.close()
         
         # Create filename
-        filename = f"billing_report_{year}_{month:02d}.xlsx" if year and month else "billing_report.xlsx"
+        filename = f"billing_report_{year}_{int(month):02d}.xlsx" if year and month else "billing_report.xlsx"
         
-        return send_file(
-            BytesIO(output.read()),
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        # Summary, breakdown and per-country sheets, streamed to a temp file
+        return xlsx_sheets_response(billing_sheets(frame), filename)
         
     except Exception as e:
         flash(f'Error exporting billing report: {str(e)}', 'error')
@@ -5363,6 +5317,16 @@ Imported from CSV on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
                         # Get the accessory from database
                         accessory = db_session.query(Accessory).filter(Accessory.id == accessory_id).first()
                         if accessory and accessory.available_quantity > 0:
+                            # Take the stock first (conditional - never oversells)
+                            try:
+                                AccessoryStock.checkout(
+                                    db_session, accessory.id, 1,
+                                    transaction_type='Checkout',
+                                    notes=f'Assigned to ticket #{ticket.display_id} from CSV import'
+                                )
+                            except InsufficientStockError:
+                                continue
+
                             # Create ticket-accessory assignment
                             ticket_accessory = TicketAccessory(
                                 ticket_id=ticket.id,
@@ -5375,11 +5339,6 @@ Imported from CSV on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
                             )
                             db_session.add(ticket_accessory)
                             
-                            # Update accessory quantity (decrease available)
-                            accessory.available_quantity -= 1
-                            if accessory.available_quantity == 0:
-                                accessory.status = 'Out of Stock'
-                            
                             assigned_accessories.append(accessory.name)
                             
                             # Create activity log for accessory assignment
@@ -5877,6 +5836,16 @@ Imported from CSV on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
                     # Get the accessory from database
                     accessory = db_session.query(Accessory).filter(Accessory.id == accessory_id).first()
                     if accessory and accessory.available_quantity > 0:
+                        # Take the stock first (conditional - never oversells)
+                        try:
+                            AccessoryStock.checkout(
+                                db_session, accessory.id, 1,
+                                transaction_type='Checkout',
+                                notes=f'Assigned to ticket #{ticket.display_id} from CSV import'
+                            )
+                        except InsufficientStockError:
+                            continue
+
                         # Create ticket-accessory assignment
                         ticket_accessory = TicketAccessory(
                             ticket_id=ticket.id,
@@ -5889,11 +5858,6 @@ Imported from CSV on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
                         )
                         db_session.add(ticket_accessory)
                         
-                        # Update accessory quantity (decrease available)
-                        accessory.available_quantity -= 1
-                        if accessory.available_quantity == 0:
-                            accessory.status = 'Out of Stock'
-                        
                         assigned_accessories.append(accessory.name)
                         
                         # Create activity log for accessory assignment
@@ -6433,6 +6397,10 @@ def get_mention_suggestions():
     try:
         from models.group import Group
         from models.user_mention_permission import UserMentionPermission
+        from utils.autocomplete import USE_INDEX, mention_suggestions
+
+        if USE_INDEX:
+            return jsonify({'suggestions': mention_suggestions(db_session, current_user.id, query)})
 
         suggestions = []
 
@@ -9703,6 +9671,16 @@ Imported from CSV on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
                         # Get the accessory from database
                         accessory = db_session.query(Accessory).filter(Accessory.id == accessory_id).first()
                         if accessory and accessory.available_quantity > 0:
+                            # Take the stock first (conditional - never oversells)
+                            try:
+                                AccessoryStock.checkout(
+                                    db_session, accessory.id, 1,
+                                    transaction_type='Checkout',
+                                    notes=f'Assigned to ticket #{ticket.display_id} from CSV import'
+                                )
+                            except InsufficientStockError:
+                                continue
+
                             # Create ticket-accessory assignment
                             ticket_accessory = TicketAccessory(
                                 ticket_id=ticket.id,
@@ -9715,11 +9693,6 @@ Imported from CSV on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"""
                             )
                             db_session.add(ticket_accessory)
                             
-                            # Update accessory quantity (decrease available)
-                            accessory.available_quantity -= 1
-                            if accessory.available_quantity == 0:
-                                accessory.status = 'Out of Stock'
-                            
                             assigned_accessories.append(accessory.name)
                             
                             # Create activity log for accessory assignment
@@ -8,6 +8,7 @@ from utils.api_auth import require_api_key, create_success_response, create_erro
 from routes.inventory_api import dual_auth_required
 from utils.store_instances import ticket_store, user_store, inventory_store
 from utils.db_manager import DatabaseManager
+from utils.api_responses import cache_policy
 from models.user import User
 from models.ticket import Ticket
 from models.asset import Asset
@@ -109,6 +110,7 @@ api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 db_manager = DatabaseManager()
 
 @api_bp.route('/health', methods=['GET'])
+@cache_policy('no-store')
 def health_check():
     """API health check endpoint (no authentication required)"""
     return jsonify({
@@ -2167,6 +2169,7 @@ def get_accessory_item(accessory_id):
 # ============================================================
 
 @api_bp.route('/assets/next-tag', methods=['GET'])
+@cache_policy('no-store')
 def get_next_asset_tag():
     """
     Get next available asset tag for a given prefix
@@ -2174,28 +2177,15 @@ def get_next_asset_tag():
     GET /api/v1/assets/next-tag?prefix=SG-
     """
     try:
-        import re
+        from utils.asset_tag_allocator import AssetTagAllocator
 
         prefix = request.args.get('prefix', 'SG-')
         clean_prefix = prefix.rstrip('-')
 
         db_session = db_manager.get_session()
         try:
-            # Find highest existing tag with this prefix
-            existing_tags = db_session.query(Asset.asset_tag).filter(
-                Asset.asset_tag.like(f'{clean_prefix}-%')
-            ).all()
-
-            max_num = 0
-            for (tag,) in existing_tags:
-                if tag:
-                    match = re.match(rf'{re.escape(clean_prefix)}-(\d+)', tag)
-                    if match:
-                        num = int(match.group(1))
-                        if num > max_num:
-                            max_num = num
-
-            next_num = max_num + 1
+            # Informational only - the number is not reserved
+            next_num = AssetTagAllocator.peek(db_session, f'{clean_prefix}-')
 
             return jsonify(create_success_response(
                 {
@@ -2253,76 +2243,46 @@ def bulk_create_assets():
 
         db_session = db_manager.get_session()
         try:
+            from utils.asset_ingest import AssetIngest
+
             # Get ticket if provided
             ticket = None
             if ticket_id:
                 ticket = db_session.query(Ticket).filter(Ticket.id == ticket_id).first()
 
-            created_ids = []
-            errors = []
-
-            for asset_data in assets_data:
-                try:
-                    # Check for duplicate serial number
-                    serial = asset_data.get('serial_number') or asset_data.get('serial_num')
-                    if serial:
-                        existing = db_session.query(Asset).filter(Asset.serial_num == serial).first()
-                        if existing:
-                            errors.append({
-                                'serial_number': serial,
-                                'error': f'Duplicate serial number (exists as {existing.asset_tag})'
-                            })
-                            continue
-
-                    # Check for duplicate asset tag
-                    asset_tag = asset_data.get('asset_tag')
-                    if asset_tag:
-                        existing = db_session.query(Asset).filter(Asset.asset_tag == asset_tag).first()
-                        if existing:
-                            errors.append({
-                                'serial_number': serial,
-                                'asset_tag': asset_tag,
-                                'error': 'Duplicate asset tag'
-                            })
-                            continue
-
-                    # Create asset
-                    asset = Asset(
-                        serial_num=serial,
-                        asset_tag=asset_tag,
-                        name=asset_data.get('name'),
-                        model=asset_data.get('model_identifier') or asset_data.get('model'),
-                        part_number=asset_data.get('part_number'),
-                        hardware_type=asset_data.get('hardware_type'),
-                        cpu_type=asset_data.get('cpu_type'),
-                        cpu_cores=asset_data.get('cpu_cores'),
-                        gpu_cores=asset_data.get('gpu_cores'),
-                        memory=asset_data.get('memory'),
-                        harddrive=asset_data.get('storage') or asset_data.get('harddrive'),
-                        condition=asset_data.get('condition', 'New'),
-                        status=AssetStatus.IN_STOCK,
-                        manufacturer=asset_data.get('manufacturer', 'Apple'),
-                        category=asset_data.get('category', 'APPLE'),
-                        company_id=asset_data.get('company_id'),
-                        country=asset_data.get('country', 'Singapore')
-                    )
-
-                    db_session.add(asset)
-                    db_session.flush()  # Get the ID
-
-                    created_ids.append(asset.id)
-
-                    # Link to ticket if provided
-                    if ticket:
-                        ticket.assets.append(asset)
-
-                except Exception as e:
-                    errors.append({
-                        'serial_number': asset_data.get('serial_number', 'unknown'),
-                        'error': str(e)
-                    })
-
-            db_session.commit()
+            records = [{
+                'serial_num': asset_data.get('serial_number') or asset_data.get('serial_num'),
+                'asset_tag': asset_data.get('asset_tag'),
+                'name': asset_data.get('name'),
+                'model': asset_data.get('model_identifier') or asset_data.get('model'),
+                'hardware_type': asset_data.get('hardware_type'),
+                'cpu_type': asset_data.get('cpu_type'),
+                'cpu_cores': asset_data.get('cpu_cores'),
+                'gpu_cores': asset_data.get('gpu_cores'),
+                'memory': asset_data.get('memory'),
+                'harddrive': asset_data.get('storage') or asset_data.get('harddrive'),
+                'condition': asset_data.get('condition', 'New'),
+                'status': AssetStatus.IN_STOCK,
+                'manufacturer': asset_data.get('manufacturer', 'Apple'),
+                'category': asset_data.get('category', 'APPLE'),
+                'company_id': asset_data.get('company_id'),
+                'country': asset_data.get('country', 'Singapore')
+            } for asset_data in assets_data]
+
+            # Duplicates are checked per batch, missing tags are allocated as a block
+            result = AssetIngest(
+                db_session,
+                ticket_id=ticket.id if ticket else None,
+                tag_prefix='SG-',
+                history_notes='Created via bulk asset API'
+            ).ingest(records)
+
+            created_ids = [created['id'] for created in result['created']]
+            errors = [{
+                'serial_number': error['serial_num'],
+                'asset_tag': error['asset_tag'],
+                'error': error['error']
+            } for error in result['errors']]
 
             result_data = {
                 'created_count': len(created_ids),
@@ -2417,6 +2377,7 @@ def get_authenticated_user_for_tickets():
 
 
 @api_bp.route('/tickets/categories', methods=['GET'])
+@cache_policy('private, max-age=300')
 def get_ticket_categories():
     """
     Get available ticket categories for mobile app
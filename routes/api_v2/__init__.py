@@ -43,6 +43,7 @@ Response Format:
 """
 
 from flask import Blueprint
+from utils.api_responses import cache_policy
 
 # Create the v2 API blueprint
 api_v2_bp = Blueprint('api_v2', __name__, url_prefix='/api/v2')
@@ -102,6 +103,7 @@ from .utils import (
 
 # Health check endpoint (no auth required)
 @api_v2_bp.route('/health', methods=['GET'])
+@cache_policy('no-store')
 def health_check():
     """
     API v2 Health Check
@@ -31,9 +31,11 @@ from .utils import (
 from models.accessory import Accessory
 from models.accessory_history import AccessoryHistory
 from models.accessory_transaction import AccessoryTransaction
+from utils.accessory_stock import AccessoryStock
 from models.activity import Activity
 from models.user import UserType
 from utils.db_manager import DatabaseManager
+from utils.api_responses import cache_policy
 
 logger = logging.getLogger(__name__)
 db_manager = DatabaseManager()
@@ -207,6 +209,7 @@ def get_accessory(accessory_id):
 
 @api_v2_bp.route('/accessories/filter-options', methods=['GET'])
 @dual_auth_required
+@cache_policy('private, max-age=300')
 @handle_exceptions
 def get_accessory_filter_options():
     """
@@ -485,7 +488,6 @@ def update_accessory(accessory_id):
 
                     # Update total quantity
                     changes['total_quantity'] = {'old': old_total, 'new': new_total}
-                    accessory.total_quantity = new_total
 
                     # Adjust available quantity by the same difference
                     old_available = accessory.available_quantity or 0
@@ -495,7 +497,14 @@ def update_accessory(accessory_id):
 
                     if old_available != new_available:
                         changes['available_quantity'] = {'old': old_available, 'new': new_available}
-                        accessory.available_quantity = new_available
+
+                    AccessoryStock.set_quantities(
+                        db_session, accessory.id,
+                        available=new_available,
+                        total=new_total,
+                        user_id=user.id,
+                        notes='Quantity updated via API v2'
+                    )
 
             except (ValueError, TypeError):
                 return api_error(
@@ -765,8 +774,16 @@ def return_accessory(accessory_id):
         old_available = accessory.available_quantity
         old_status = accessory.status
 
-        # Process the return
-        accessory.available_quantity = (accessory.available_quantity or 0) + quantity
+        # Process the return (atomic increment + ledger entry)
+        AccessoryStock.adjust(
+            db_session, accessory.id,
+            available_delta=quantity,
+            transaction_type='Return',
+            user_id=user.id,
+            customer_id=data.get('customer_id') or accessory.customer_id,
+            notes=data.get('notes', f'Returned via API by {user.username}'),
+            update_status=False
+        )
         accessory.return_date = datetime.utcnow()
 
         # Update status if all items are back
@@ -774,20 +791,6 @@ def return_accessory(accessory_id):
             accessory.status = 'Available'
             accessory.customer_id = None
 
-        accessory.updated_at = datetime.utcnow()
-
-        # Create transaction record
-        transaction = AccessoryTransaction(
-            accessory_id=accessory.id,
-            transaction_type='Return',
-            quantity=quantity,
-            customer_id=data.get('customer_id') or accessory.customer_id,
-            notes=data.get('notes', f'Returned via API by {user.username}'),
-            transaction_date=datetime.utcnow()
-        )
-        transaction.user_id = user.id
-        db_session.add(transaction)
-
         # Create history entry
         changes = {
             'available_quantity': {'old': old_available, 'new': accessory.available_quantity}
@@ -982,27 +985,22 @@ def checkin_accessory(accessory_id):
         old_available = accessory.available_quantity
         old_status = accessory.status
 
-        # Process the check-in: increase available quantity
-        accessory.available_quantity = (accessory.available_quantity or 0) + quantity
+        # Process the check-in: increase available quantity (atomic increment + ledger entry)
+        transaction = AccessoryStock.adjust(
+            db_session, accessory.id,
+            available_delta=quantity,
+            transaction_type='Checkin',
+            user_id=user.id,
+            customer_id=customer_id,
+            notes=notes or f'Checked in via API by {user.username}. Condition: {condition}',
+            update_status=False
+        )
         accessory.return_date = datetime.utcnow()
-        accessory.updated_at = datetime.utcnow()
 
         # Update status if all items are back
         if accessory.available_quantity >= accessory.total_quantity:
             accessory.status = 'Available'
             accessory.customer_id = None
-
-        # Create transaction record
-        transaction = AccessoryTransaction(
-            accessory_id=accessory.id,
-            transaction_type='Checkin',
-            quantity=quantity,
-            customer_id=customer_id,
-            notes=notes or f'Checked in via API by {user.username}. Condition: {condition}',
-            transaction_date=datetime.utcnow()
-        )
-        transaction.user_id = user.id
-        db_session.add(transaction)
         db_session.flush()  # Get the transaction ID
 
         # Create history entry
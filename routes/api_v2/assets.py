@@ -15,7 +15,6 @@ from flask import request
 from datetime import datetime
 import logging
 import os
-import uuid
 
 from . import api_v2_bp
 from .utils import (
@@ -36,6 +35,7 @@ from models.asset_history import AssetHistory
 from models.activity import Activity
 from models.user import UserType
 from utils.db_manager import DatabaseManager
+from utils.api_responses import cache_policy
 
 logger = logging.getLogger(__name__)
 db_manager = DatabaseManager()
@@ -251,6 +251,7 @@ def get_asset(asset_id):
 
 @api_v2_bp.route('/assets/filter-options', methods=['GET'])
 @dual_auth_required
+@cache_policy('private, max-age=300')
 @handle_exceptions
 def get_asset_filter_options():
     """
@@ -879,6 +880,8 @@ def upload_asset_image(asset_id):
 
         old_image_url = asset.image_url
         new_image_url = None
+        new_image_sha256 = None
+        rendition_source = None
 
         # Check if JSON body with image_url
         if request.is_json:
@@ -916,20 +919,12 @@ def upload_asset_image(asset_id):
                     status_code=400
                 )
 
-            # Ensure upload directory exists
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-            # Generate unique filename
-            from werkzeug.utils import secure_filename
+            # Store by content hash so identical photos are kept once
+            from utils.media_pipeline import store_content_addressed
             ext = file.filename.rsplit('.', 1)[1].lower()
-            filename = f"asset_{asset_id}_{uuid.uuid4().hex[:8]}.{ext}"
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-
-            # Save file
-            file.save(filepath)
-
-            # Set URL path
-            new_image_url = f'/static/uploads/assets/{filename}'
+            new_image_url, new_image_sha256, rendition_source, _ = store_content_addressed(
+                file.read(), UPLOAD_FOLDER, ext, '/static/uploads/assets'
+            )
 
         else:
             return api_error(
@@ -940,6 +935,7 @@ def upload_asset_image(asset_id):
 
         # Update asset
         asset.image_url = new_image_url
+        asset.image_sha256 = new_image_sha256
         asset.updated_at = datetime.utcnow()
 
         # Create history entry
@@ -962,6 +958,11 @@ def upload_asset_image(asset_id):
 
         db_session.commit()
 
+        if rendition_source:
+            # Thumbnails are rendered by the background media worker
+            from utils.media_pipeline import queue_renditions
+            queue_renditions(db_session, rendition_source, new_image_sha256, 'image')
+
         logger.info(f"Asset {asset_id} image updated via API by user {user.username}")
 
         return api_response(
@@ -10,7 +10,7 @@ This module provides file upload operations for ticket attachments:
 All endpoints require dual authentication (JWT token or API key).
 """
 
-from flask import request, send_file, current_app
+from flask import request, current_app
 from werkzeug.utils import secure_filename
 import os
 import uuid
@@ -31,6 +31,8 @@ from models.ticket import Ticket
 from models.ticket_attachment import TicketAttachment
 from models.user import UserType
 from utils.db_manager import DatabaseManager
+from utils.file_delivery import send_protected_file
+from utils.media_pipeline import stream_to_file, queue_renditions, source_type_for
 
 logger = logging.getLogger(__name__)
 db_manager = DatabaseManager()
@@ -246,6 +248,7 @@ def upload_attachment(ticket_id):
         os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
         uploaded_attachments = []
+        rendition_jobs = []
         errors = []
 
         for file in files:
@@ -279,9 +282,9 @@ def upload_attachment(ticket_id):
                 file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else 'bin'
                 unique_filename = f"{ticket_id}_{timestamp}_{unique_id}.{file_extension}"
 
-                # Save file
+                # Save file, hashing it for the download ETag and thumbnails
                 file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-                file.save(file_path)
+                file_size, content_sha256 = stream_to_file(file.stream, file_path)
 
                 # Create attachment record
                 attachment = TicketAttachment(
@@ -290,6 +293,7 @@ def upload_attachment(ticket_id):
                     file_path=file_path,
                     file_type=file.content_type or 'application/octet-stream',
                     file_size=file_size,
+                    content_sha256=content_sha256,
                     uploaded_by=user.id,
                     created_at=datetime.utcnow()
                 )
@@ -298,6 +302,7 @@ def upload_attachment(ticket_id):
                 db_session.flush()  # Get attachment ID
 
                 uploaded_attachments.append(format_attachment(attachment))
+                rendition_jobs.append((file_path, content_sha256, source_type_for(file_extension)))
 
                 logger.info(f"Attachment uploaded: {original_filename} to ticket {ticket_id} by user {user.username}")
 
@@ -318,6 +323,10 @@ def upload_attachment(ticket_id):
 
         db_session.commit()
 
+        # Thumbnails / PDF previews are rendered in the background
+        for file_path, content_sha256, source_type in rendition_jobs:
+            queue_renditions(db_session, file_path, content_sha256, source_type)
+
         response_data = {
             'uploaded': uploaded_attachments,
             'count': len(uploaded_attachments)
@@ -463,11 +472,11 @@ def download_attachment(ticket_id, attachment_id):
 
         logger.info(f"Attachment downloaded: {attachment.filename} from ticket {ticket_id} by user {user.username}")
 
-        return send_file(
+        return send_protected_file(
             attachment.file_path,
-            as_attachment=as_attachment,
             download_name=attachment.filename,
-            mimetype=attachment.file_type
+            as_attachment=as_attachment,
+            etag=attachment.content_sha256
         )
 
     finally:
@@ -44,6 +44,7 @@ def create_jwt_token(user, remember_me=False):
         'user_id': user.id,
         'username': user.username,
         'user_type': user.user_type.value,
+        'tv': user.token_version or 0,  # Revoked when the user's token_version moves on
         'exp': datetime.utcnow() + timedelta(days=expiry_days),
         'iat': datetime.utcnow()
     }
@@ -265,6 +266,14 @@ def api_refresh_token():
                     status_code=401
                 )
 
+            # A password change or deactivation revokes tokens; don't renew them
+            if user.is_deleted or (user.token_version or 0) != payload.get('tv', 0):
+                return api_error(
+                    code=ErrorCodes.INVALID_TOKEN,
+                    message='Token has been revoked. Please login again.',
+                    status_code=401
+                )
+
             # Create new token (default 24 hours)
             new_token = create_jwt_token(user, remember_me=False)
             expires_at = datetime.utcnow() + timedelta(days=1)
@@ -459,37 +459,16 @@ def _load_ticket_stats(user: User, config: dict, db) -> dict:
 
     date_filter = datetime.utcnow() - timedelta(days=days)
 
+    from utils.ticket_counters import count_tickets
     if user.user_type == UserType.COUNTRY_ADMIN:
-        base_query = db.query(Ticket)
-        if user.assigned_countries:
-            base_query = base_query.filter(Ticket.country.in_(user.assigned_countries))
-
-        total = base_query.filter(Ticket.created_at >= date_filter).count()
-        open_tickets = base_query.filter(
-            Ticket.status != TicketStatus.RESOLVED,
-            Ticket.status != TicketStatus.RESOLVED_DELIVERED,
-            Ticket.created_at >= date_filter
-        ).count()
-        in_progress = base_query.filter(
-            Ticket.status == TicketStatus.IN_PROGRESS,
-            Ticket.created_at >= date_filter
-        ).count()
-        resolved = total - open_tickets
+        counts = count_tickets(db, countries=user.assigned_countries or None, since=date_filter)
+        resolved = counts['total'] - counts['unresolved']
     else:
-        total = db.query(Ticket).filter(Ticket.created_at >= date_filter).count()
-        open_tickets = db.query(Ticket).filter(
-            Ticket.status != TicketStatus.RESOLVED,
-            Ticket.status != TicketStatus.RESOLVED_DELIVERED,
-            Ticket.created_at >= date_filter
-        ).count()
-        in_progress = db.query(Ticket).filter(
-            Ticket.status == TicketStatus.IN_PROGRESS,
-            Ticket.created_at >= date_filter
-        ).count()
-        resolved = db.query(Ticket).filter(
-            Ticket.status.in_([TicketStatus.RESOLVED, TicketStatus.RESOLVED_DELIVERED]),
-            Ticket.created_at >= date_filter
-        ).count()
+        counts = count_tickets(db, since=date_filter)
+        resolved = counts['statuses']['RESOLVED'] + counts['statuses']['RESOLVED_DELIVERED']
+    total = counts['total']
+    open_tickets = counts['unresolved']
+    in_progress = counts['statuses']['IN_PROGRESS']
 
     values = {
         'total': total,
@@ -548,19 +527,16 @@ def _load_queue_stats(user: User, db) -> dict:
         all_queues = db.query(Queue).all()
         queues = [queue for queue in all_queues if queue.id in accessible_queue_ids]
 
+    from utils.ticket_counters import queue_totals
+    totals = queue_totals(db, [queue.id for queue in queues])
     queue_data = []
     for queue in queues:
-        total_count = db.query(Ticket).filter(Ticket.queue_id == queue.id).count()
-        open_count = db.query(Ticket).filter(
-            Ticket.queue_id == queue.id,
-            Ticket.status != TicketStatus.RESOLVED,
-            Ticket.status != TicketStatus.RESOLVED_DELIVERED
-        ).count()
+        counts = totals.get(queue.id, {'total': 0, 'open': 0})
         queue_data.append({
             'id': queue.id,
             'name': queue.name,
-            'total_count': total_count,
-            'open_count': open_count
+            'total_count': counts['total'],
+            'open_count': counts['open']
         })
 
     return {
@@ -15,6 +15,7 @@ from functools import wraps
 from datetime import datetime
 import logging
 import uuid
+from utils.api_responses import body_etag
 
 logger = logging.getLogger(__name__)
 
@@ -90,7 +91,14 @@ def api_response(data=None, message=None, meta=None, status_code=200):
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         }
 
-    return jsonify(response), status_code
+    json_response = jsonify(response)
+    # The request id and timestamp differ on every call; keep them out of the ETag
+    # so an unchanged payload is answered with 304 (utils/api_responses.py)
+    json_response.set_etag(
+        body_etag(json_response.get_data(), ignore=(response['meta'].get('request_id'), response['meta'].get('timestamp'))),
+        weak=True
+    )
+    return json_response, status_code
 
 
 def api_error(code, message, status_code=400, details=None):
@@ -373,15 +381,13 @@ def dual_auth_required(f):
     2. JSON API key + JWT authentication (backward compatibility)
     3. Session-based authentication for web users
 
+    Token users come from the shared auth cache (utils.auth_cache).
     Sets request.current_api_user to the authenticated user
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        from sqlalchemy.orm import joinedload
-        from utils.db_manager import DatabaseManager
-        from models.user import User
+        from utils.auth_cache import get_auth_user
 
-        db_manager = DatabaseManager()
         user = None
 
         # Support for JSON API key system
@@ -393,20 +399,13 @@ def dual_auth_required(f):
             auth_header = request.headers.get('Authorization')
             if auth_header and auth_header.startswith('Bearer '):
                 token = auth_header.split(' ')[1]
-                from routes.json_api import verify_jwt_token
-                user_id = verify_jwt_token(token)
-
-                if user_id:
-                    db_session = db_manager.get_session()
-                    try:
-                        user = db_session.query(User).options(
-                            joinedload(User.company)
-                        ).filter(User.id == user_id).first()
-                        if user:
-                            _ = user.company  # Force load company
-                            logger.info(f"JSON API authentication successful for user: {user.username}")
-                    finally:
-                        db_session.close()
+                from routes.json_api import verify_jwt_claims
+                payload = verify_jwt_claims(token)
+
+                if payload:
+                    user = get_auth_user(payload.get('user_id'), payload.get('tv', 0))
+                    if user:
+                        logger.info(f"JSON API authentication successful for user: {user.username}")
 
         # Method 2: Try mobile JWT authentication (no API key needed)
         if not user:
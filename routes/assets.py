@@ -7,10 +7,12 @@ from models.ticket import Ticket
 from flask_login import current_user
 from utils.db_manager import DatabaseManager
 from models.company import Company
-from utils.barcode_generator import barcode_generator
+from utils.barcode_generator import barcode_generator, label_fields, render_labels, render_label_sheet
 from database import SessionLocal
 import io
+import base64
 from sqlalchemy import text
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 import logging
 
@@ -506,19 +508,18 @@ def bulk_labels():
                 return redirect(url_for('assets.bulk_labels'))
             
             # Get selected assets
-            assets = db_session.query(Asset).filter(Asset.id.in_(asset_ids)).all()
+            assets = db_session.query(Asset).options(
+                selectinload(Asset.company)
+            ).filter(Asset.id.in_(asset_ids)).all()
             labels = []
             
-            for asset in assets:
-                # Load company relationship if not already loaded
-                if not asset.company and asset.company_id:
-                    asset.company = db_session.query(Company).filter_by(id=asset.company_id).first()
-                
-                label_base64 = barcode_generator.generate_label_base64(asset)
-                if label_base64:
+            # Rendered as one batch (cached labels are reused, the rest in parallel)
+            label_pngs = render_labels([label_fields(asset) for asset in assets])
+            for asset, label_png in zip(assets, label_pngs):
+                if label_png:
                     labels.append({
                         'asset': asset,
-                        'label': label_base64
+                        'label': f"data:image/png;base64,{base64.b64encode(label_png).decode()}"
                     })
             
             if not labels:
@@ -546,19 +547,14 @@ def download_label(asset_id):
             asset.company = db_session.query(Company).filter_by(id=asset.company_id).first()
         
         # Generate label image
-        label_image = barcode_generator.generate_asset_label(asset)
+        label_png = barcode_generator.generate_label_png(asset)
         
-        if not label_image:
+        if not label_png:
             flash('Failed to generate label', 'error')
             return redirect(url_for('inventory.view'))
         
-        # Convert to bytes
-        img_buffer = io.BytesIO()
-        label_image.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-        
         # Create response
-        response = make_response(img_buffer.getvalue())
+        response = make_response(label_png)
         response.headers['Content-Type'] = 'image/png'
         response.headers['Content-Disposition'] = f'attachment; filename=asset_label_{asset.serial_num}.png'
         
@@ -567,6 +563,64 @@ def download_label(asset_id):
     finally:
         db_session.close()
 
+@assets_bp.route('/label-sheet', methods=['POST'])
+@login_required
+def label_sheet():
+    """
+    Download labels for many assets laid out on printable A4 sheets
+
+    Form or JSON body:
+        asset_ids: Assets to print, in print order
+        format: 'pdf' (default) or 'png'
+        page: Sheet number for 'png' (1-based, default 1)
+    """
+    data = request.get_json(silent=True) or {}
+    asset_ids = data.get('asset_ids') or request.form.getlist('asset_ids')
+    output_format = (data.get('format') or request.form.get('format') or 'pdf').lower()
+    if output_format not in ('pdf', 'png'):
+        return jsonify({'success': False, 'error': 'format must be pdf or png'}), 400
+    try:
+        asset_ids = [int(asset_id) for asset_id in asset_ids]
+        page = int(data.get('page') or request.form.get('page') or 1)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'asset_ids and page must be integers'}), 400
+    if not asset_ids:
+        return jsonify({'success': False, 'error': 'No assets selected'}), 400
+
+    db_session = SessionLocal()
+    try:
+        assets = db_session.query(Asset).options(
+            selectinload(Asset.company)
+        ).filter(Asset.id.in_(asset_ids), Asset.serial_num.isnot(None)).all()
+        by_id = {asset.id: asset for asset in assets}
+        fields = [label_fields(by_id[asset_id]) for asset_id in asset_ids if asset_id in by_id]
+    finally:
+        db_session.close()
+
+    if not fields:
+        return jsonify({'success': False, 'error': 'None of the selected assets have a serial number'}), 404
+
+    sheet, failed = render_label_sheet(fields, output_format=output_format)
+    if failed:
+        logger.warning(f"Label sheet: {len(failed)} of {len(fields)} labels could not be rendered")
+    if not sheet:
+        return jsonify({'success': False, 'error': 'Failed to generate labels'}), 500
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if output_format == 'png':
+        if not 1 <= page <= len(sheet):
+            return jsonify({'success': False, 'error': f'Page must be between 1 and {len(sheet)}'}), 400
+        response = make_response(sheet[page - 1])
+        response.headers['Content-Type'] = 'image/png'
+        response.headers['Content-Disposition'] = f'attachment; filename=asset_labels_{timestamp}_p{page}.png'
+        response.headers['X-Page-Count'] = str(len(sheet))
+    else:
+        response = make_response(sheet)
+        response.headers['Content-Type'] = 'application/pdf'
+        response.headers['Content-Disposition'] = f'attachment; filename=asset_labels_{timestamp}.pdf'
+    response.headers['X-Label-Count'] = str(len(fields) - len(failed))
+    return response
+
 @assets_bp.route('/labels')
 @login_required
 def labels_dashboard():
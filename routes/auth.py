@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from utils.user_store import UserStore
+from utils.store_instances import user_store
 from utils.auth_decorators import admin_required
 from utils.snipeit_client import SnipeITClient
 from utils.db_manager import DatabaseManager
@@ -17,7 +17,6 @@ logger = logging.getLogger(__name__)
 
 
 auth_bp = Blueprint('auth', __name__)
-user_store = UserStore()
 snipe_client = SnipeITClient()
 db_manager = DatabaseManager()
 
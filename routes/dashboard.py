@@ -22,6 +22,7 @@ from models.dashboard_widget import (
 from sqlalchemy import func, or_
 from datetime import datetime, timedelta
 from database import SessionLocal
+from utils.cache import cached_view
 import json
 import logging
 
@@ -29,6 +30,29 @@ logger = logging.getLogger(__name__)
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 db_manager = DatabaseManager()
 
+# Data each widget reads, for the widget data cache; widgets not listed here
+# are rendered fresh on every request
+WIDGET_CACHE_TAGS = {
+    'inventory_stats': ('assets', 'accessories', 'companies', 'permissions'),
+    'ticket_stats': ('tickets',),
+    'customer_stats': ('customers',),
+    'queue_stats': ('tickets', 'queues', 'permissions'),
+    'weekly_tickets_chart': ('tickets',),
+    'asset_status_chart': ('assets',),
+    'recent_activities': ('activities',),
+    'shipments_list': ('tickets', 'customers', 'permissions'),
+    'inventory_audit': ('audits',),
+}
+
+
+def widget_cache_tags(widget_id):
+    """Cache tags of a widget's data, None if the widget is not cacheable"""
+    tags = WIDGET_CACHE_TAGS.get(widget_id)
+    if tags is None:
+        return None
+    # The user's row holds their widget config
+    return tags + (f"users:{session['user_id']}",)
+
 
 def load_widget_data(user, layout):
     """Load data for all widgets in the layout"""
@@ -93,28 +117,16 @@ def load_widget_data(user, layout):
 
         # Load ticket stats
         if 'ticket_stats' in widget_ids:
+            from utils.ticket_counters import count_tickets
             if user.user_type == UserType.COUNTRY_ADMIN:
-                base_query = db.query(Ticket)
-                if user.assigned_countries:
-                    base_query = base_query.filter(Ticket.country.in_(user.assigned_countries))
-                total = base_query.count()
-                open_tickets = base_query.filter(
-                    Ticket.status != TicketStatus.RESOLVED,
-                    Ticket.status != TicketStatus.RESOLVED_DELIVERED
-                ).count()
-                resolved = total - open_tickets
+                counts = count_tickets(db, countries=user.assigned_countries or None)
+                resolved = counts['total'] - counts['unresolved']
             else:
-                total = db.query(Ticket).count()
-                open_tickets = db.query(Ticket).filter(
-                    Ticket.status != TicketStatus.RESOLVED,
-                    Ticket.status != TicketStatus.RESOLVED_DELIVERED
-                ).count()
-                resolved = db.query(Ticket).filter(
-                    Ticket.status.in_([TicketStatus.RESOLVED, TicketStatus.RESOLVED_DELIVERED])
-                ).count()
+                counts = count_tickets(db)
+                resolved = counts['statuses']['RESOLVED'] + counts['statuses']['RESOLVED_DELIVERED']
             widget_data['ticket_stats'] = {
-                'total': total,
-                'open': open_tickets,
+                'total': counts['total'],
+                'open': counts['unresolved'],
                 'resolved': resolved
             }
 
@@ -141,19 +153,16 @@ def load_widget_data(user, layout):
                 all_queues = db.query(Queue).all()
                 queues = [queue for queue in all_queues if queue.id in accessible_queue_ids]
 
+            from utils.ticket_counters import queue_totals
+            totals = queue_totals(db, [queue.id for queue in queues])
             queue_data = []
             for queue in queues:
-                total_count = db.query(Ticket).filter(Ticket.queue_id == queue.id).count()
-                open_count = db.query(Ticket).filter(
-                    Ticket.queue_id == queue.id,
-                    Ticket.status != TicketStatus.RESOLVED,
-                    Ticket.status != TicketStatus.RESOLVED_DELIVERED
-                ).count()
+                counts = totals.get(queue.id, {'total': 0, 'open': 0})
                 queue_data.append({
                     'id': queue.id,
                     'name': queue.name,
-                    'total_count': total_count,
-                    'open_count': open_count
+                    'total_count': counts['total'],
+                    'open_count': counts['open']
                 })
             widget_data['queue_stats'] = {'queues': queue_data}
 
@@ -518,6 +527,7 @@ def save_layout():
 
 @dashboard_bp.route('/api/widget/<widget_id>/data')
 @login_required
+@cached_view(tags=widget_cache_tags)
 def get_widget_data(widget_id):
     """Get data for a specific widget"""
     user_id = session['user_id']
@@ -0,0 +1,66 @@
+"""
+Export Job Routes
+Status polling and downloads for exports generated in the background
+"""
+import os
+import logging
+
+from flask import Blueprint, jsonify, abort, url_for
+from flask_login import login_required, current_user
+
+from database import SessionLocal
+from models.export_job import ExportJob
+from utils.streaming_export import XLSX_MIMETYPE, fail_stale_jobs, is_stale_job
+from utils.file_delivery import send_protected_file
+
+logger = logging.getLogger(__name__)
+
+exports_bp = Blueprint('exports', __name__, url_prefix='/exports')
+
+
+def _get_user_job(db_session, job_id):
+    """Load a job owned by the current user (super admins can see every job)"""
+    job = db_session.query(ExportJob).get(job_id)
+    if not job:
+        abort(404)
+    if job.user_id != current_user.id and not current_user.is_super_admin:
+        abort(403)
+    # Only writes when this job was lost; new exports fail the others
+    if is_stale_job(job):
+        fail_stale_jobs(db_session)
+        db_session.refresh(job)
+    return job
+
+
+@exports_bp.route('/<int:job_id>')
+@login_required
+def export_status(job_id):
+    """Poll the status of a background export"""
+    db_session = SessionLocal()
+    try:
+        job = _get_user_job(db_session, job_id)
+        data = job.to_dict()
+        if job.status == ExportJob.STATUS_COMPLETED:
+            data['download_url'] = url_for('exports.download_export', job_id=job.id)
+        return jsonify({'success': True, 'job': data})
+    finally:
+        db_session.close()
+
+
+@exports_bp.route('/<int:job_id>/download')
+@login_required
+def download_export(job_id):
+    """Download a finished background export"""
+    db_session = SessionLocal()
+    try:
+        job = _get_user_job(db_session, job_id)
+        if job.status != ExportJob.STATUS_COMPLETED:
+            return jsonify({'success': False, 'job': job.to_dict(),
+                            'error': 'Export is not ready yet'}), 409
+        if not job.file_path or not os.path.exists(job.file_path):
+            return jsonify({'success': False, 'error': 'Export file is no longer available'}), 410
+
+        mimetype = XLSX_MIMETYPE if job.file_format == 'xlsx' else 'text/csv'
+        return send_protected_file(job.file_path, download_name=job.file_name, mimetype=mimetype)
+    finally:
+        db_session.close()
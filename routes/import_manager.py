@@ -252,6 +252,38 @@ def view_session(session_id):
         db_session.close()
 
 
+@import_manager_bp.route('/api/session/<int:session_id>/progress')
+@login_required
+def api_session_progress(session_id):
+    """API to poll the progress of a running import"""
+    if not can_access_import_manager(current_user):
+        return jsonify({'success': False, 'error': 'Permission denied'}), 403
+
+    db_session = SessionLocal()
+    try:
+        import_session = db_session.query(ImportSession).get(session_id)
+
+        if not import_session:
+            return jsonify({'success': False, 'error': 'Session not found'}), 404
+
+        if current_user.user_type in [UserType.COUNTRY_ADMIN, UserType.SUPERVISOR]:
+            if import_session.user_id != current_user.id:
+                return jsonify({'success': False, 'error': 'Permission denied'}), 403
+
+        processed = (import_session.success_count or 0) + (import_session.fail_count or 0)
+        return jsonify({
+            'success': True,
+            'status': import_session.status,
+            'total_rows': import_session.total_rows,
+            'processed_rows': processed,
+            'success_count': import_session.success_count,
+            'fail_count': import_session.fail_count,
+            'completed_at': import_session.completed_at.isoformat() if import_session.completed_at else None
+        })
+    finally:
+        db_session.close()
+
+
 # API Endpoints for creating/updating import sessions
 
 @import_manager_bp.route('/api/create-session', methods=['POST'])
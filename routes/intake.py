@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, send_file, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify
 from werkzeug.utils import secure_filename
 import os
 from datetime import datetime
@@ -7,7 +7,8 @@ from models.asset import Asset, AssetStatus
 from models.company import Company
 from utils.auth_decorators import login_required
 from utils.store_instances import db_manager
-from utils.pdf_extractor import extract_assets_from_pdf
+from utils.pdf_extraction_cache import PdfExtractionCache
+from utils.file_delivery import send_protected_file
 from flask_login import current_user
 import logging
 
@@ -165,11 +166,7 @@ def download_attachment(attachment_id):
             flash('Attachment not found', 'error')
             return redirect(url_for('intake.list_tickets'))
             
-        return send_file(
-            attachment.file_path,
-            as_attachment=True,
-            download_name=attachment.filename
-        )
+        return send_protected_file(attachment.file_path, download_name=attachment.filename)
     finally:
         db_session.close()
 
@@ -196,7 +193,7 @@ def preview_assets(ticket_id):
 
         for attachment in pdf_attachments:
             try:
-                result = extract_assets_from_pdf(attachment.file_path)
+                result = PdfExtractionCache.get_assets(db_session, attachment.file_path)
                 if result:
                     result['attachment_id'] = attachment.id
                     result['filename'] = attachment.filename
@@ -261,7 +258,7 @@ def import_assets(ticket_id):
         all_assets = []
         for attachment in pdf_attachments:
             try:
-                result = extract_assets_from_pdf(attachment.file_path)
+                result = PdfExtractionCache.get_assets(db_session, attachment.file_path)
                 if result and result.get('assets'):
                     for asset_data in result['assets']:
                         asset_data['po_number'] = result.get('po_number')
@@ -369,7 +366,7 @@ def api_extract_pdf(attachment_id):
         if not attachment.filename.lower().endswith('.pdf'):
             return jsonify({'success': False, 'error': 'Not a PDF file'}), 400
 
-        result = extract_assets_from_pdf(attachment.file_path)
+        result = PdfExtractionCache.get_assets(db_session, attachment.file_path)
         if result:
             return jsonify({
                 'success': True,
@@ -16,9 +16,10 @@ from models.activity import Activity
 from models.ticket import Ticket
 from models.accessory_transaction import AccessoryTransaction
 from models.audit_session import AuditSession
+from utils.accessory_stock import AccessoryStock, InsufficientStockError
+from utils.asset_facets import AssetScope, company_options, facet_counts
 import os
 from werkzeug.utils import secure_filename
-import pandas as pd
 from sqlalchemy import func, case, or_, and_, text, false as sa_false
 from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.orm import joinedload
@@ -33,6 +34,7 @@ from io import StringIO, BytesIO
 import logging
 import random
 import traceback
+from collections import Counter
 from utils.countries import COUNTRIES
 
 # Set up logging for this module
@@ -295,8 +297,9 @@ def view_inventory():
         logger.info(f"DEBUG: user.user_type == UserType.SUPERVISOR: {user.user_type == UserType.SUPERVISOR}")
         logger.info(f"DEBUG: user.user_type == UserType.COUNTRY_ADMIN: {user.user_type == UserType.COUNTRY_ADMIN}")
 
-        # Base query for tech assets
+        # Base query for tech assets, and the same filter for the facet summary
         tech_assets_query = db_session.query(Asset)
+        facet_scope = None
 
         # Apply filtering for COUNTRY_ADMIN and SUPERVISOR users
         is_restricted_user = (user.user_type == UserType.COUNTRY_ADMIN or user.user_type == UserType.SUPERVISOR)
@@ -355,10 +358,17 @@ def view_inventory():
                     )
                 )
                 logger.info(f"DEBUG: {user.user_type.value} filtering by {len(all_company_ids)} company IDs (including children): {all_company_ids} and names: {all_company_names}")
+                facet_scope = AssetScope(
+                    countries=frozenset(c.lower() for c in user.assigned_countries) if user.assigned_countries else None,
+                    company_ids=frozenset(all_company_ids),
+                    company_names=tuple(name.lower() for name in all_company_names),
+                    require_company=True
+                )
             else:
                 # No company permissions assigned - show NO assets
                 # This forces admin to explicitly assign companies through the UI
                 tech_assets_query = tech_assets_query.filter(Asset.id == -1)  # Impossible condition = no results
+                facet_scope = AssetScope.nothing()
                 logger.info(f"DEBUG: {user.user_type.value} has NO company permissions - showing 0 assets")
 
         # Filter by company if user is a client (can only see their company's assets)
@@ -371,9 +381,13 @@ def view_inventory():
                 )
             )
             logger.info("DEBUG: Filtering assets for client user. Company ID: {user.company_id}, Company Name: {user.company.name}")
-        
+            facet_scope = AssetScope(company_ids=frozenset([user.company_id]), customers=(user.company.name,))
+
+        # Dropdown values and counts from the facet summary (utils/asset_facets.py)
+        facets = facet_counts(db_session, facet_scope, facets=('customer', 'model', 'status', 'country'))
+
         # Get counts
-        tech_assets_count = tech_assets_query.count()
+        tech_assets_count = sum(facets['status'].values())
         logger.info(f"DEBUG: Final tech_assets_count = {tech_assets_count}")
         accessories_count = db_session.query(func.sum(Accessory.total_quantity)).scalar() or 0
 
@@ -388,10 +402,9 @@ def view_inventory():
         maintenance_assets_count = maintenance_query.count()
 
         # Get unique values for filters from filtered assets only
-        company_names_raw = tech_assets_query.with_entities(Asset.customer).distinct().all()
         # Check if there are assets with no company (empty or null)
-        has_unknown_company = any(not c[0] or (c[0] and c[0].strip() == '') for c in company_names_raw)
-        company_names = sorted(list(set([c[0] for c in company_names_raw if c[0] and c[0].strip()])))
+        has_unknown_company = any(not name.strip() for name in facets['customer'])
+        company_names = sorted(name for name in facets['customer'] if name.strip())
 
         # Build company list with grouped display names for the filter dropdown
         companies = []
@@ -404,63 +417,30 @@ def view_inventory():
                 'is_parent': False
             })
 
+        grouping = company_options(db_session, company_names)
         for company_name in company_names:
-            company_obj = db_session.query(Company).filter(Company.name == company_name).first()
-            if company_obj:
-                companies.append({
-                    'value': company_name,
-                    'label': company_obj.grouped_display_name,
-                    'is_parent': company_obj.is_parent_company or company_obj.child_companies.count() > 0
-                })
-            else:
-                companies.append({
-                    'value': company_name,
-                    'label': company_name,
-                    'is_parent': False
-                })
+            option = grouping.get(company_name)
+            companies.append({
+                'value': company_name,
+                'label': option['label'] if option else company_name,
+                'is_parent': option['is_parent'] if option else False
+            })
 
-        models = tech_assets_query.with_entities(Asset.model).distinct().all()
-        models = sorted(list(set([m[0] for m in models if m[0]])))
+        models = sorted(value for value in facets['model'] if value)
 
         # Get unique status values for the status filter
-        statuses = tech_assets_query.with_entities(Asset.status).distinct().all()
-        statuses = sorted(list(set([s[0].value for s in statuses if s[0]])))
-
-        # For Country Admin or Supervisor, show actual countries from assets (not just assigned country)
-        if (user.user_type == UserType.COUNTRY_ADMIN or user.user_type == UserType.SUPERVISOR) and user.assigned_countries:
-            countries_raw = tech_assets_query.with_entities(Asset.country).distinct().all()
-            # Use case-insensitive deduplication and proper capitalization
-            countries_seen = set()
-            countries = []
-            for c in sorted([c[0] for c in countries_raw if c[0]]):
-                country_lower = c.lower()
-                if country_lower not in countries_seen:
-                    countries_seen.add(country_lower)
-                    # Use proper case format
-                    countries.append(c.title())
-        # For Client users, only show countries relevant to their company's assets
-        elif user.user_type == UserType.CLIENT and user.company:
-            countries_raw = tech_assets_query.with_entities(Asset.country).distinct().all()
-            # Use case-insensitive deduplication and proper capitalization
-            countries_seen = set()
-            countries = []
-            for c in sorted([c[0] for c in countries_raw if c[0]]):
-                country_lower = c.lower()
-                if country_lower not in countries_seen:
-                    countries_seen.add(country_lower)
-                    # Use proper case format
-                    countries.append(c.title())
-        else:
-            countries_raw = tech_assets_query.with_entities(Asset.country).distinct().all()
-            # Use case-insensitive deduplication and proper capitalization
-            countries_seen = set()
-            countries = []
-            for c in sorted([c[0] for c in countries_raw if c[0]]):
-                country_lower = c.lower()
-                if country_lower not in countries_seen:
-                    countries_seen.add(country_lower)
-                    # Use proper case format
-                    countries.append(c.title())
+        statuses = sorted(AssetStatus[name].value for name in facets['status'] if name)
+
+        # Show actual countries from the user's assets (not just assigned country)
+        # Use case-insensitive deduplication and proper capitalization
+        countries_seen = set()
+        countries = []
+        for c in sorted(value for value in facets['country'] if value):
+            country_lower = c.lower()
+            if country_lower not in countries_seen:
+                countries_seen.add(country_lower)
+                # Use proper case format
+                countries.append(c.title())
 
         # Get accessories with counts
         accessories = db_session.query(
@@ -549,8 +529,8 @@ def api_sf_filters():
 
         db_session = db_manager.get_session()
         try:
-            # Build base query with filtering for SUPERVISOR and COUNTRY_ADMIN
-            base_query = db_session.query(Asset)
+            # Asset filter for SUPERVISOR and COUNTRY_ADMIN, applied to the facet summary
+            facet_scope = None
 
             # Apply filtering for SUPERVISOR and COUNTRY_ADMIN users
             if user_type in ['SUPERVISOR', 'COUNTRY_ADMIN']:
@@ -558,8 +538,9 @@ def api_sf_filters():
                 user = db_manager.get_user(user_id)
 
                 # Filter by assigned countries
+                countries_filter = None
                 if user.assigned_countries:
-                    base_query = base_query.filter(Asset.country.in_(user.assigned_countries))
+                    countries_filter = frozenset(c.lower() for c in user.assigned_countries)
                     logger.info(f"SF Filters API: Filtering by countries: {user.assigned_countries}")
 
                 # Filter by company permissions
@@ -583,40 +564,28 @@ def api_sf_filters():
                             all_company_names.extend([c.name.strip() for c in child_companies])
 
                     # Filter by company_id or customer name
-                    name_conditions = [func.lower(Asset.customer).like(f"%{name.lower()}%") for name in all_company_names]
-                    base_query = base_query.filter(
-                        or_(
-                            Asset.company_id.in_(all_company_ids),
-                            *name_conditions
-                        )
+                    facet_scope = AssetScope(
+                        countries=countries_filter,
+                        company_ids=frozenset(all_company_ids),
+                        company_names=tuple(name.lower() for name in all_company_names)
                     )
                     logger.info(f"SF Filters API: Filtering by {len(all_company_ids)} company IDs")
                 else:
                     # No permissions - show no assets
-                    base_query = base_query.filter(Asset.id == -1)
+                    facet_scope = AssetScope.nothing()
                     logger.info(f"SF Filters API: No company permissions - showing 0 assets")
 
-            # Get filtered asset IDs for subqueries
-            filtered_asset_ids = base_query.with_entities(Asset.id).subquery()
-
-            # Get status counts from filtered assets
-            status_counts = db_session.query(
-                Asset.status, func.count(Asset.id)
-            ).filter(Asset.id.in_(filtered_asset_ids)).group_by(Asset.status).all()
+            # Counts per value from the facet summary (utils/asset_facets.py)
+            facets = facet_counts(db_session, facet_scope, facets=('status', 'asset_type', 'customer', 'country', 'location'))
 
             statuses = [
-                {'value': s[0].value if s[0] else 'Unknown', 'label': s[0].value if s[0] else 'Unknown', 'count': s[1]}
-                for s in status_counts if s[0]
+                {'value': AssetStatus[name].value, 'label': AssetStatus[name].value, 'count': count}
+                for name, count in facets['status'].items() if name
             ]
 
-            # Get tech asset category counts from filtered assets
-            asset_category_counts = db_session.query(
-                Asset.asset_type, func.count(Asset.id)
-            ).filter(Asset.id.in_(filtered_asset_ids)).group_by(Asset.asset_type).all()
-
             asset_categories = [
-                {'value': c[0] or 'Unknown', 'label': c[0] or 'Unknown', 'count': c[1]}
-                for c in asset_category_counts if c[0]
+                {'value': value, 'label': value, 'count': count}
+                for value, count in facets['asset_type'].items() if value
             ]
 
             # Get accessory category counts with filtering for SUPERVISOR and COUNTRY_ADMIN
@@ -667,18 +636,14 @@ def api_sf_filters():
             # Combined categories (for backward compatibility)
             categories = asset_categories
 
-            # Get company counts from filtered assets
-            company_counts = db_session.query(
-                Asset.customer, func.count(Asset.id)
-            ).filter(Asset.id.in_(filtered_asset_ids)).group_by(Asset.customer).all()
-
             # Build company list with parent/child relationship info
             companies = []
             company_grouping = {}  # Maps company name to parent company name
+            grouping = company_options(db_session, [name for name in facets['customer'] if name.strip()])
 
-            for company_name, count in company_counts:
+            for company_name, count in facets['customer'].items():
                 # Handle empty/null company names as "Unknown"
-                if not company_name or company_name.strip() == '':
+                if not company_name.strip():
                     companies.append({
                         'value': '',  # Empty value to match assets with no company
                         'label': 'Unknown',
@@ -689,53 +654,35 @@ def api_sf_filters():
                     })
                     continue
 
-                # Look up company to get grouping info
-                company_obj = db_session.query(Company).filter(Company.name == company_name).first()
-
-                parent_company_name = None
-                is_parent = False
-                child_companies = []
-
-                if company_obj:
-                    # Check if this company has a parent
-                    if company_obj.parent_company_id and company_obj.parent_company:
-                        parent_company_name = company_obj.parent_company.name
-                        company_grouping[company_name] = parent_company_name
-
-                    # Check if this company is a parent (has children)
-                    if company_obj.is_parent_company or company_obj.child_companies.count() > 0:
-                        is_parent = True
-                        child_companies = [c.name for c in company_obj.child_companies.all()]
+                option = grouping.get(company_name)
+                if option and option['parent_company']:
+                    company_grouping[company_name] = option['parent_company']
 
                 companies.append({
                     'value': company_name,
-                    'label': company_obj.grouped_display_name if company_obj else company_name,
+                    'label': option['label'] if option else company_name,
                     'count': count,
-                    'parent_company': parent_company_name,
-                    'is_parent': is_parent,
-                    'child_companies': child_companies
+                    'parent_company': option['parent_company'] if option else None,
+                    'is_parent': option['is_parent'] if option else False,
+                    'child_companies': option['child_companies'] if option and option['is_parent'] else []
                 })
 
-            # Get country counts from filtered assets
-            country_counts = db_session.query(
-                Asset.country, func.count(Asset.id)
-            ).filter(Asset.id.in_(filtered_asset_ids)).group_by(Asset.country).all()
-
             countries = [
-                {'value': c[0] or 'Unknown', 'label': c[0] or 'Unknown', 'count': c[1]}
-                for c in country_counts if c[0]
+                {'value': value, 'label': value, 'count': count}
+                for value, count in facets['country'].items() if value
             ]
 
-            # Get location counts from filtered assets
-            location_counts = db_session.query(
-                Location.name, func.count(Asset.id)
-            ).outerjoin(Asset, Asset.location_id == Location.id
-            ).filter(Asset.id.in_(filtered_asset_ids)
-            ).group_by(Location.name).all()
+            # Location facet values are location ids
+            location_names = dict(db_session.query(Location.id, Location.name).all())
+            location_counts = Counter()
+            for location_id, count in facets['location'].items():
+                name = location_names.get(int(location_id)) if location_id else None
+                if name:
+                    location_counts[name] += count
 
             locations = [
-                {'value': l[0] or 'Unknown', 'label': l[0] or 'Unknown', 'count': l[1]}
-                for l in location_counts if l[0]
+                {'value': name, 'label': name, 'count': count}
+                for name, count in location_counts.items()
             ]
 
             return jsonify({
@@ -1407,6 +1354,37 @@ def api_bulk_update_individual():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@inventory_bp.route('/image-renditions/<sha256>/<size_name>.jpg')
+def image_rendition(sha256, size_name):
+    """
+    Thumbnail of an asset or accessory image.
+
+    No login: the original image is public under /static and mobile clients
+    load these URLs directly. Only hashes of asset/accessory images are
+    served, never previews of ticket attachments with the same content.
+    """
+    from utils.file_delivery import send_protected_file
+    from utils.media_pipeline import find_rendition
+
+    db_session = db_manager.get_session()
+    try:
+        in_use = (
+            db_session.query(Asset.id).filter(Asset.image_sha256 == sha256).first() or
+            db_session.query(Accessory.id).filter(Accessory.image_sha256 == sha256).first()
+        )
+        rendition = find_rendition(db_session, sha256, size_name) if in_use else None
+        if not rendition:
+            abort(404)
+        return send_protected_file(
+            rendition.file_path,
+            as_attachment=False,
+            mimetype='image/jpeg',
+            etag=f"{sha256}-{size_name}"
+        )
+    finally:
+        db_session.close()
+
+
 @inventory_bp.route('/api/asset/<int:asset_id>/image', methods=['POST'])
 @login_required
 def api_update_asset_image(asset_id):
@@ -1436,6 +1414,7 @@ def api_update_asset_image(asset_id):
 
             # Update the image URL
             asset.image_url = image_url if image_url else None
+            asset.image_sha256 = None  # Manually set URL, not an uploaded file
             db_session.commit()
 
             logger.info(f"Updated asset {asset_id} image_url to: {image_url[:50] if image_url else 'None'}...")
@@ -2027,6 +2006,7 @@ def update_accessory_image(accessory_id):
             return jsonify({'success': False, 'error': 'Accessory not found'}), 404
 
         accessory.image_url = image_url if image_url else None
+        accessory.image_sha256 = None  # Manually set URL, not an uploaded file
         db_session.commit()
 
         return jsonify({'success': True, 'image_url': accessory.image_url})
@@ -2382,12 +2362,13 @@ def add_accessory_stock(id):
                 }
 
                 # Update quantities
-                accessory.total_quantity += additional_quantity
-                accessory.available_quantity += additional_quantity
-
-                # Update status based on available quantity
-                if accessory.available_quantity > 0 and accessory.status == 'Out of Stock':
-                    accessory.status = 'Available'
+                AccessoryStock.restock(
+                    db_session, accessory.id, additional_quantity,
+                    transaction_type='Inventory Addition',
+                    user_id=current_user.id,
+                    notes=request.form.get('notes'),
+                    add_to_total=True
+                )
 
                 # Track changes
                 changes = {
@@ -2630,11 +2611,6 @@ def checkout_accessory(id):
             flash('Customer not found', 'error')
             return redirect(url_for('inventory.view_accessory', id=id))
 
-        # Check if enough quantity is available
-        if accessory.available_quantity < quantity:
-            flash(f'Only {accessory.available_quantity} items available', 'error')
-            return redirect(url_for('inventory.view_accessory', id=id))
-
         # Store old values for history tracking
         old_values = {
             'available_quantity': accessory.available_quantity,
@@ -2642,30 +2618,23 @@ def checkout_accessory(id):
             'customer_id': accessory.customer_id
         }
 
-        # Update accessory quantities and assign to customer
-        accessory.available_quantity -= quantity
-        
-        # Update status based on available quantity
-        if accessory.available_quantity == 0:
-            accessory.status = 'Out of Stock'
-        else:
-            accessory.status = 'Available'
-            
+        # Conditionally decrement stock and record the ledger entry
+        try:
+            AccessoryStock.checkout(
+                db_session, id, quantity,
+                transaction_type='Checkout',
+                user_id=current_user.id,
+                customer_id=customer_id,
+                notes=f"Checked out {quantity} item(s) to {customer.name}"
+            )
+        except InsufficientStockError as e:
+            flash(f'Only {e.available} items available', 'error')
+            return redirect(url_for('inventory.view_accessory', id=id))
+
         accessory.checkout_date = singapore_now_as_utc()
         accessory.customer_id = customer_id
         accessory.customer_user = customer
 
-        # Create transaction record
-        transaction = AccessoryTransaction(
-            accessory_id=id,
-            customer_id=customer_id,
-            transaction_date=singapore_now_as_utc(),
-            transaction_type='Checkout',
-            quantity=quantity,
-            notes=f"Checked out {quantity} item(s) to {customer.name}"
-        )
-        db_session.add(transaction)
-        
         # Create history record with proper changes format
         changes = {
             'available_quantity': {
@@ -2805,6 +2774,8 @@ def unassign_item(item_id):
 @inventory_bp.route('/import', methods=['GET', 'POST'])
 @login_required
 def import_inventory():
+    import pandas as pd
+
     if request.method == 'POST':
         db_session = db_manager.get_session()
         try:
@@ -2880,23 +2851,25 @@ def import_inventory():
                             # Create a case-insensitive column mapping
                             column_mapping = {col.lower(): col for col in df.columns}
 
+                            # Look up duplicates for the whole file with batched IN queries
+                            from utils.inventory_import import clean_strings, find_existing
+                            tag_column = column_mapping.get('asset tag')
+                            serial_column = column_mapping.get('serial number')
+                            file_tags = clean_strings(df[tag_column]).dropna().tolist() if tag_column else []
+                            file_serials = clean_strings(df[serial_column]).dropna().tolist() if serial_column else []
+                            existing_serials, existing_tags = find_existing(db_session, file_serials, file_tags)
+
                             for _, row in df.iterrows():
                                 asset_tag = clean_value(row.get(column_mapping.get('asset tag', 'ASSET TAG'), ''))
                                 serial_number = clean_value(row.get(column_mapping.get('serial number', 'SERIAL NUMBER'), ''))
 
                                 # Check for duplicates in database
                                 duplicate_warning = None
-                                existing_asset = None
-
-                                if serial_number:
-                                    existing_asset = db_session.query(Asset).filter_by(serial_num=serial_number).first()
-                                    if existing_asset:
-                                        duplicate_warning = f"Serial number already exists (Asset Tag: {existing_asset.asset_tag})"
 
-                                if not duplicate_warning and asset_tag:
-                                    existing_asset = db_session.query(Asset).filter_by(asset_tag=asset_tag).first()
-                                    if existing_asset:
-                                        duplicate_warning = f"Asset tag already exists (Serial: {existing_asset.serial_num or 'N/A'})"
+                                if serial_number and serial_number in existing_serials:
+                                    duplicate_warning = f"Serial number already exists (Asset Tag: {existing_serials[serial_number]})"
+                                elif asset_tag and asset_tag in existing_tags:
+                                    duplicate_warning = f"Asset tag already exists (Serial: {existing_tags[asset_tag] or 'N/A'})"
 
                                 preview_row = {
                                     'Asset Type': clean_value(row.get(column_mapping.get('asset type', 'Asset Type'), '')),
@@ -3016,25 +2989,6 @@ def confirm_import():
         val = str(val).strip()
         return val if val else None
 
-    def validate_erased(val):
-        if not val:
-            return 'Not completed'
-        return str(val).strip()
-
-    def parse_date(date_str):
-        if not date_str:
-            return None
-        try:
-            # Try to parse DD/MM/YYYY format
-            from datetime import datetime
-            return datetime.strptime(str(date_str).strip(), '%d/%m/%Y')
-        except ValueError:
-            try:
-                # Try to parse YYYY-MM-DD format
-                return datetime.strptime(str(date_str).strip(), '%Y-%m-%d')
-            except ValueError:
-                return None
-
     db_session = db_manager.get_session()
     import_session_id = None  # Track import session
     try:
@@ -3077,161 +3031,111 @@ def confirm_import():
             flash('Invalid preview data format. Please upload a file again.', 'error')
             return redirect(url_for('inventory.import_inventory'))
             
-        for index, row in enumerate(preview_data['data'], start=1):
+        if preview_data['import_type'] == 'tech_assets':
+            from utils.inventory_import import InventoryImporter, PREVIEW_COLUMNS
+
+            # Apply the values filled in on the preview page
+            rows = []
+            for index, row in enumerate(preview_data['data'], start=1):
+                asset_type = request.form.get(f'asset_type_{index}')
+                asset_tag = request.form.get(f'asset_tag_{index}')
+                if asset_type:
+                    row['Asset Type'] = asset_type
+                if asset_tag:
+                    row['Asset Tag'] = asset_tag
+                rows.append(row)
+
+            # Link asset to ticket if ticket_id is provided (via many-to-many relationship)
+            link_ticket_id = None
+            ticket_id = session.get('import_ticket_id')
+            if ticket_id:
+                from models.ticket import Ticket  # Import Ticket model
+                if db_session.query(Ticket.id).filter(Ticket.id == int(ticket_id)).first():
+                    link_ticket_id = int(ticket_id)
+                else:
+                    logger.error(f"Import ticket {ticket_id} not found, assets will not be linked")
+
+            importer = InventoryImporter(
+                db_session,
+                column_map=PREVIEW_COLUMNS,
+                required=('asset_type', 'asset_tag'),
+                defaults={'erased': 'Not completed'},
+                import_session_id=import_session_id,
+                ticket_id=link_ticket_id
+            )
+            result = importer.import_records(rows)
+            successful = result['success']
+            failed = result['failed']
+            errors = result['errors']
+            successful_imports = result['imported']
+            rows = []
+        else:
+            rows = preview_data['data']
+
+        # Accessories are imported one by one
+        for index, row in enumerate(rows, start=1):
             try:
-                if preview_data['import_type'] == 'tech_assets':
-                    # Check for missing required fields in form data
-                    asset_type = request.form.get(f'asset_type_{index}')
-                    asset_tag = request.form.get(f'asset_tag_{index}')
-                    
-                    # Update row data with form inputs if they exist
-                    if asset_type:
-                        row['Asset Type'] = asset_type
-                    if asset_tag:
-                        row['Asset Tag'] = asset_tag
-
-                    # Validate required fields
-                    if not row.get('Asset Type'):
-                        raise ValueError(f"Missing required field: Asset Type")
-                    if not row.get('Asset Tag'):
-                        raise ValueError(f"Missing required field: Asset Tag")
-
-                    # Get and validate serial number and asset tag
-                    serial_num = clean_value(row.get('Serial Number', ''))
-                    asset_tag = clean_value(row.get('Asset Tag', ''))
-                    erased_value = validate_erased(row.get('Erased', ''))
-                    receiving_date = parse_date(row.get('Receiving Date', ''))
-
-                    # Create new asset
-                    new_asset = Asset(
-                        asset_tag=asset_tag,
-                        serial_num=serial_num,
-                        name=clean_value(row.get('Product', '')),
-                        model=clean_value(row.get('Model', '')),
-                        manufacturer=clean_value(row.get('Manufacturer', '')),
-                        category=clean_value(row.get('Category', '')),
-                        status=AssetStatus.IN_STOCK,
-                        hardware_type=clean_value(row.get('Hardware Type', '')),
-                        inventory=clean_value(row.get('INVENTORY', '')),
-                        customer=clean_value(row.get('Customer', '')),
-                        country=clean_value(row.get('Country', '')),
-                        asset_type=clean_value(row.get('Asset Type', '')),
-                        erased=erased_value,
-                        condition=clean_value(row.get('Condition', '')),
-                        receiving_date=receiving_date,
-                        keyboard=clean_value(row.get('Keyboard', '')),
-                        charger=clean_value(row.get('Charger', '')),
-                        po=clean_value(row.get('PO', '')),
-                        notes=clean_value(row.get('Notes', '')),
-                        tech_notes=clean_value(row.get('Tech Notes', '')),
-                        diag=clean_value(row.get('Diagnostic', '')),
-                        cpu_type=clean_value(row.get('CPU Type', '')),
-                        cpu_cores=clean_value(row.get('CPU Cores', '')),
-                        gpu_cores=clean_value(row.get('GPU Cores', '')),
-                        memory=clean_value(row.get('Memory', '')),
-                        harddrive=clean_value(row.get('Hard Drive', ''))
-                    )
-                    db_session.add(new_asset)
-                    db_session.commit()
-                    
-                    # Link asset to ticket if ticket_id is provided (via many-to-many relationship)
-                    ticket_id = session.get('import_ticket_id')
-                    if ticket_id:
-                        try:
-                            from models.ticket import Ticket  # Import Ticket model
-                            ticket = db_session.query(Ticket).get(int(ticket_id))
-                            if ticket:
-                                # Use many-to-many relationship, not intake_ticket_id (which is for IntakeTicket)
-                                if hasattr(ticket, 'assets'):
-                                    _safely_assign_asset_to_ticket(ticket, new_asset, db_session)
-
-                                db_session.commit()
-                                logger.info(f"Linked asset {new_asset.asset_tag} to ticket {ticket.id}")
-                        except Exception as e:
-                            logger.error(f"Error linking asset to ticket: {str(e)}")
-                            # Don't fail the import if ticket linking fails
-
-                    successful += 1
-                    # Track successful import
-                    successful_imports.append({
-                        'row': index,
-                        'type': 'asset',
-                        'asset_id': new_asset.id,
-                        'asset_tag': new_asset.asset_tag,
-                        'serial': new_asset.serial_num,
-                        'product': new_asset.name
-                    })
-                    print(f"[INVENTORY_DEBUG] Added asset to successful_imports, now has {len(successful_imports)} items")
-                else:  # accessories
-                    # Check for missing required fields in form data
-                    name = request.form.get(f'name_{index}')
-                    category = request.form.get(f'category_{index}')
-                    
-                    # Update row data with form inputs if they exist
-                    if name:
-                        row['Name'] = name
-                    if category:
-                        row['Category'] = category
-
-                    # Validate required fields
-                    if not row.get('Name'):
-                        raise ValueError(f"Missing required field: Name")
-                    if not row.get('Category'):
-                        raise ValueError(f"Missing required field: Category")
+                # Check for missing required fields in form data
+                name = request.form.get(f'name_{index}')
+                category = request.form.get(f'category_{index}')
+                
+                # Update row data with form inputs if they exist
+                if name:
+                    row['Name'] = name
+                if category:
+                    row['Category'] = category
 
-                    try:
-                        quantity = str(row.get('Total Quantity', '')).strip()
-                        quantity = int(quantity) if quantity else 0
-                    except (ValueError, KeyError):
-                        quantity = 0
-
-                    accessory = Accessory(
-                        name=clean_value(row.get('Name', '')),
-                        category=clean_value(row.get('Category', '')),
-                        manufacturer=clean_value(row.get('Manufacturer', '')),
-                        model_no=clean_value(row.get('Model Number', '')),
-                        total_quantity=quantity,
-                        available_quantity=quantity,  # Initially set to total quantity
-                        country=clean_value(row.get('Country', '')),
-                        status=clean_value(row.get('Status', 'Available')),
-                        notes=clean_value(row.get('Notes', ''))
-                    )
-                    db_session.add(accessory)
-                    db_session.commit()
-                    successful += 1
-                    # Track successful import
-                    successful_imports.append({
-                        'row': index,
-                        'type': 'accessory',
-                        'accessory_id': accessory.id,
-                        'name': accessory.name,
-                        'category': accessory.category,
-                        'quantity': accessory.total_quantity
-                    })
+                # Validate required fields
+                if not row.get('Name'):
+                    raise ValueError(f"Missing required field: Name")
+                if not row.get('Category'):
+                    raise ValueError(f"Missing required field: Category")
 
-                    # Add activity tracking
-                    activity = Activity(
-                        user_id=current_user.id,
-                        type='accessory_created',
-                        content=f'Created new accessory: {accessory.name} (Quantity: {accessory.total_quantity})',
-                        reference_id=accessory.id
-                    )
-                    db_session.add(activity)
-                    db_session.commit()
+                try:
+                    quantity = str(row.get('Total Quantity', '')).strip()
+                    quantity = int(quantity) if quantity else 0
+                except (ValueError, KeyError):
+                    quantity = 0
+
+                accessory = Accessory(
+                    name=clean_value(row.get('Name', '')),
+                    category=clean_value(row.get('Category', '')),
+                    manufacturer=clean_value(row.get('Manufacturer', '')),
+                    model_no=clean_value(row.get('Model Number', '')),
+                    total_quantity=quantity,
+                    available_quantity=quantity,  # Initially set to total quantity
+                    country=clean_value(row.get('Country', '')),
+                    status=clean_value(row.get('Status', 'Available')),
+                    notes=clean_value(row.get('Notes', ''))
+                )
+                db_session.add(accessory)
+                db_session.commit()
+                successful += 1
+                # Track successful import
+                successful_imports.append({
+                    'row': index,
+                    'type': 'accessory',
+                    'accessory_id': accessory.id,
+                    'name': accessory.name,
+                    'category': accessory.category,
+                    'quantity': accessory.total_quantity
+                })
+
+                # Add activity tracking
+                activity = Activity(
+                    user_id=current_user.id,
+                    type='accessory_created',
+                    content=f'Created new accessory: {accessory.name} (Quantity: {accessory.total_quantity})',
+                    reference_id=accessory.id
+                )
+                db_session.add(activity)
+                db_session.commit()
             except Exception as e:
                 # Parse the error to make it user-friendly
                 error_str = str(e)
 
-                # Check for duplicate serial number
-                if 'UNIQUE constraint failed: assets.serial_num' in error_str:
-                    serial = clean_value(row.get('Serial Number', 'Unknown'))
-                    error_msg = f"Row {index}: Duplicate serial number '{serial}' - this asset already exists in the system"
-                # Check for duplicate asset tag
-                elif 'UNIQUE constraint failed: assets.asset_tag' in error_str:
-                    tag = clean_value(row.get('Asset Tag', 'Unknown'))
-                    error_msg = f"Row {index}: Duplicate asset tag '{tag}' - this tag is already in use"
                 # Check for duplicate accessory name
-                elif 'UNIQUE constraint failed: accessories.name' in error_str:
+                if 'UNIQUE constraint failed: accessories.name' in error_str:
                     name = clean_value(row.get('Name', 'Unknown'))
                     error_msg = f"Row {index}: Duplicate accessory name '{name}' - this accessory already exists"
                 # Other errors
@@ -3634,12 +3538,18 @@ def edit_accessory(id):
                 # Update available quantity proportionally
                 if accessory.total_quantity > 0:
                     ratio = accessory.available_quantity / accessory.total_quantity
-                    accessory.available_quantity = int(new_total * ratio)
+                    new_available = int(new_total * ratio)
                 else:
-                    accessory.available_quantity = new_total
+                    new_available = new_total
 
-                accessory.total_quantity = new_total
                 accessory.notes = request.form.get('notes', '')
+                AccessoryStock.set_quantities(
+                    db_session, accessory.id,
+                    available=new_available,
+                    total=new_total,
+                    user_id=current_user.id,
+                    notes='Quantity edited on accessory form'
+                )
 
                 # Handle aliases - get comma-separated string and split into individual aliases
                 from models.accessory_alias import AccessoryAlias
@@ -3756,38 +3666,14 @@ def delete_accessory(id):
 @inventory_bp.route('/api/generate-asset-tag', methods=['GET'])
 @login_required
 def generate_asset_tag():
-    """Generate the next available asset tag in format SG-R###"""
+    """Suggest the next available asset tag in format SG-R###"""
+    from utils.asset_tag_allocator import AssetTagAllocator, AssetTagAllocationError
+
     db_session = db_manager.get_session()
     try:
-        import re
-
-        # Get all existing asset tags matching the pattern SG-R###
-        existing_tags = db_session.query(Asset.asset_tag).filter(
-            Asset.asset_tag.ilike('SG-R%')
-        ).all()
-
-        # Extract numbers from existing tags
-        max_number = 0
-        pattern = re.compile(r'^SG-R(\d+)$', re.IGNORECASE)
-
-        for (tag,) in existing_tags:
-            if tag:
-                match = pattern.match(tag.strip())
-                if match:
-                    num = int(match.group(1))
-                    if num > max_number:
-                        max_number = num
-
-        # Generate next tag
-        next_number = max_number + 1
-        next_tag = f"SG-R{next_number:03d}"
-
-        # Double-check it doesn't exist (case-insensitive)
-        while db_session.query(Asset).filter(
-            func.lower(Asset.asset_tag) == next_tag.lower()
-        ).first():
-            next_number += 1
-            next_tag = f"SG-R{next_number:03d}"
+        # Only a suggestion: the number is claimed when the asset is saved
+        next_tag = AssetTagAllocator.peek_tags(db_session, 'SG-R', 1, width=3)[0]
+        next_number = int(next_tag[len('SG-R'):])
 
         return jsonify({
             'success': True,
@@ -3795,6 +3681,9 @@ def generate_asset_tag():
             'next_number': next_number
         })
 
+    except AssetTagAllocationError as e:
+        logger.warning(f"Error generating asset tag: {str(e)}")
+        return jsonify({'success': False, 'error': 'No free asset tag found. Please enter the tag manually.'}), 409
     except Exception as e:
         logger.error(f"Error generating asset tag: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -4042,7 +3931,12 @@ def add_asset():
                     reference_id=new_asset.id
                 )
                 db_session.add(activity)
-                
+
+                # A tag suggested by /api/generate-asset-tag is claimed only now
+                if new_asset.asset_tag:
+                    from utils.asset_tag_allocator import AssetTagAllocator
+                    AssetTagAllocator.claim(db_session.connection(), [new_asset.asset_tag])
+
                 # Commit asset and activity
                 db_session.commit()
 
@@ -5319,6 +5213,7 @@ def search_suggestions():
     from flask import jsonify
     from models.ticket import Ticket
     from models.customer_user import CustomerUser
+    from utils.autocomplete import USE_INDEX, autocomplete, query_ids
 
     search_term = request.args.get('q', '').strip()
     if not search_term or len(search_term) < 2:
@@ -5383,22 +5278,30 @@ def search_suggestions():
             else:
                 asset_query = asset_query.filter(Asset.id == -1)
 
-        assets = asset_query.filter(
-            or_(
-                Asset.serial_num.ilike(f'%{search_term}%'),
-                Asset.asset_tag.ilike(f'%{search_term}%'),
-                Asset.name.ilike(f'%{search_term}%'),
-                Asset.model.ilike(f'%{search_term}%')
-            )
-        ).limit(5).all()
+        if USE_INDEX:
+            allowed = None
+            if asset_query.whereclause is not None:
+                allowed = autocomplete.scope(('assets', user.id), query_ids(asset_query.with_entities(Asset.id)))
+            assets = autocomplete.search(db_session, 'assets', search_term, limit=5, allowed=allowed)
+        else:
+            assets = [{'id': asset.id, 'asset_tag': asset.asset_tag, 'serial_num': asset.serial_num,
+                       'name': asset.name, 'model': asset.model}
+                      for asset in asset_query.filter(
+                          or_(
+                              Asset.serial_num.ilike(f'%{search_term}%'),
+                              Asset.asset_tag.ilike(f'%{search_term}%'),
+                              Asset.name.ilike(f'%{search_term}%'),
+                              Asset.model.ilike(f'%{search_term}%')
+                          )
+                      ).limit(5).all()]
 
         for asset in assets:
             suggestions.append({
                 'type': 'asset',
                 'icon': 'laptop',
-                'title': asset.asset_tag or asset.serial_num or asset.name,
-                'subtitle': f"{asset.name} • {asset.model or 'No model'}",
-                'url': url_for('inventory.view_asset', asset_id=asset.id)
+                'title': asset['asset_tag'] or asset['serial_num'] or asset['name'],
+                'subtitle': f"{asset['name']} • {asset['model'] or 'No model'}",
+                'url': url_for('inventory.view_asset', asset_id=asset['id'])
             })
 
         # Search tickets (limit 5)
@@ -5488,32 +5391,42 @@ def search_suggestions():
         if user.user_type in [UserType.SUPER_ADMIN, UserType.DEVELOPER, UserType.SUPERVISOR, UserType.COUNTRY_ADMIN]:
             from models.company import Company
 
-            # Build customer query with company join for company name search
-            customer_query = db_session.query(CustomerUser).outerjoin(
-                Company, CustomerUser.company_id == Company.id
-            ).filter(
-                or_(
-                    CustomerUser.name.ilike(f'%{search_term}%'),
-                    CustomerUser.email.ilike(f'%{search_term}%'),
-                    CustomerUser.contact_number.ilike(f'%{search_term}%'),
-                    Company.name.ilike(f'%{search_term}%')
+            if USE_INDEX:
+                allowed = None
+                # Filter by company for non-super admin users
+                if user.user_type != UserType.SUPER_ADMIN and user.company_id:
+                    allowed = autocomplete.scope(('company_customers', user.company_id), query_ids(
+                        db_session.query(CustomerUser.id).filter(CustomerUser.company_id == user.company_id)
+                    ))
+                customers = autocomplete.search(db_session, 'customers', search_term, limit=5, allowed=allowed)
+            else:
+                # Build customer query with company join for company name search
+                customer_query = db_session.query(CustomerUser).outerjoin(
+                    Company, CustomerUser.company_id == Company.id
+                ).filter(
+                    or_(
+                        CustomerUser.name.ilike(f'%{search_term}%'),
+                        CustomerUser.email.ilike(f'%{search_term}%'),
+                        CustomerUser.contact_number.ilike(f'%{search_term}%'),
+                        Company.name.ilike(f'%{search_term}%')
+                    )
                 )
-            )
 
-            # Filter by company for non-super admin users
-            if user.user_type != UserType.SUPER_ADMIN and user.company_id:
-                customer_query = customer_query.filter(CustomerUser.company_id == user.company_id)
+                # Filter by company for non-super admin users
+                if user.user_type != UserType.SUPER_ADMIN and user.company_id:
+                    customer_query = customer_query.filter(CustomerUser.company_id == user.company_id)
 
-            customers = customer_query.limit(5).all()
+                customers = [{'id': cust.id, 'name': cust.name, 'email': cust.email,
+                              'company': cust.company.name if cust.company else None}
+                             for cust in customer_query.limit(5).all()]
 
             for cust in customers:
-                company_name = cust.company.name if cust.company else ''
                 suggestions.append({
                     'type': 'customer',
                     'icon': 'user',
-                    'title': cust.name,
-                    'subtitle': f"{company_name} • {cust.email or 'No email'}",
-                    'url': url_for('inventory.view_customer_user', id=cust.id)
+                    'title': cust['name'],
+                    'subtitle': f"{cust['company'] or ''} • {cust['email'] or 'No email'}",
+                    'url': url_for('inventory.view_customer_user', id=cust['id'])
                 })
 
         return jsonify({'suggestions': suggestions})
@@ -5521,268 +5434,235 @@ def search_suggestions():
         db_session.close()
 
 
-@inventory_bp.route('/export/<string:item_type>', methods=['GET', 'POST'])
-@login_required
-def export_inventory(item_type):
-    # Ensure user has permission to export data - allow SUPER_ADMIN, DEVELOPER, SUPERVISOR, and COUNTRY_ADMIN
-    if not (current_user.is_super_admin or current_user.is_developer or current_user.is_supervisor or current_user.is_country_admin):
-        flash('You do not have permission to export data', 'error')
-        return redirect(url_for('inventory.view_inventory'))
+ASSET_EXPORT_HEADER = [
+    'Package Number', 'Asset Type', 'Product', 'ASSET TAG', 'Receiving date', 'Keyboard',
+    'SERIAL NUMBER', 'PO', 'MODEL', 'ERASED', 'CUSTOMER', 'CONDITION',
+    'DIAG', 'HARDWARE TYPE', 'CPU TYPE', 'CPU CORES', 'GPU', 'GPU CORES',
+    'MEMORY', 'MEMORY TYPE', 'HARDDRIVE', 'STORAGE TYPE', 'STATUS', 'CHARGER', 'INCLUDED', 'INVENTORY',
+    'country', 'OS', 'OS VERSION', 'BATTERY CYCLES', 'BATTERY HEALTH', 'WIFI MAC', 'ETHERNET MAC'
+]
+
+ACCESSORY_EXPORT_HEADER = [
+    'Name', 'Category', 'Manufacturer', 'Model No',
+    'Total Quantity', 'Available Quantity', 'Country',
+    'Status', 'Notes', 'Created At'
+]
+
+
+def _export_params():
+    """Capture export selection/filters from the request so the export can also run in the background"""
+    selected_ids = None
+    if request.method == 'POST' and request.form.get('selected_ids'):
+        selected_ids = json.loads(request.form.get('selected_ids')) or None
+    return {
+        'selected_ids': selected_ids,
+        'status': request.args.get('status'),
+        'model': request.args.get('model'),
+        'company': request.args.get('company'),
+        'country': request.args.get('country'),
+        'search': request.args.get('search')
+    }
 
-    db_session = db_manager.get_session()
-    try:
-        # Create a string buffer to write CSV data
-        si = StringIO()
-        writer = csv.writer(si)
 
-        if item_type == 'assets':
-            # Get assets based on user permissions and selection
-            query = db_session.query(Asset)
+def _asset_export_query(db_session, user, params):
+    """Assets visible to the user that match the export filters"""
+    query = db_session.query(Asset)
 
-            # Handle selected assets if POST request
-            if request.method == 'POST' and request.form.get('selected_ids'):
-                try:
-                    selected_ids = json.loads(request.form.get('selected_ids'))
-                    if selected_ids:
-                        query = query.filter(Asset.id.in_(selected_ids))
-                except json.JSONDecodeError:
-                    flash('Invalid selection data', 'error')
-                    return redirect(url_for('inventory.view_inventory'))
+    if params.get('selected_ids'):
+        query = query.filter(Asset.id.in_(params['selected_ids']))
 
-            # Apply user permission filters for SUPERVISOR and COUNTRY_ADMIN
-            if current_user.is_supervisor or current_user.is_country_admin:
-                from models.user_company_permission import UserCompanyPermission
+    # Apply user permission filters for SUPERVISOR and COUNTRY_ADMIN
+    if user.is_supervisor or user.is_country_admin:
+        from models.user_company_permission import UserCompanyPermission
 
-                # Filter by assigned countries
-                if current_user.assigned_countries:
-                    query = query.filter(Asset.country.in_(current_user.assigned_countries))
+        # Filter by assigned countries
+        if user.assigned_countries:
+            query = query.filter(Asset.country.in_(user.assigned_countries))
 
-                # Filter by company permissions
-                company_permissions = db_session.query(UserCompanyPermission).filter_by(
-                    user_id=current_user.id,
-                    can_view=True
-                ).all()
+        # Filter by company permissions
+        company_permissions = db_session.query(UserCompanyPermission).filter_by(
+            user_id=user.id,
+            can_view=True
+        ).all()
 
-                if company_permissions:
-                    permitted_company_ids = [perm.company_id for perm in company_permissions]
-                    permitted_companies = db_session.query(Company).filter(Company.id.in_(permitted_company_ids)).all()
+        if company_permissions:
+            permitted_company_ids = [perm.company_id for perm in company_permissions]
+            permitted_companies = db_session.query(Company).filter(Company.id.in_(permitted_company_ids)).all()
 
-                    # Include child company IDs
-                    all_company_ids = list(permitted_company_ids)
-                    all_company_names = [c.name.strip() for c in permitted_companies]
+            # Include child company IDs
+            all_company_ids = list(permitted_company_ids)
+            all_company_names = [c.name.strip() for c in permitted_companies]
 
-                    for company in permitted_companies:
-                        if company.is_parent_company or company.child_companies.count() > 0:
-                            child_companies = company.child_companies.all()
-                            all_company_ids.extend([c.id for c in child_companies])
-                            all_company_names.extend([c.name.strip() for c in child_companies])
+            for company in permitted_companies:
+                if company.is_parent_company or company.child_companies.count() > 0:
+                    child_companies = company.child_companies.all()
+                    all_company_ids.extend([c.id for c in child_companies])
+                    all_company_names.extend([c.name.strip() for c in child_companies])
 
-                    # Filter by company_id or customer name
-                    name_conditions = [func.lower(Asset.customer).like(f"%{name.lower()}%") for name in all_company_names]
-                    query = query.filter(
-                        or_(
-                            Asset.company_id.in_(all_company_ids),
-                            *name_conditions
-                        )
-                    )
-                else:
-                    # No permissions - export nothing
-                    query = query.filter(Asset.id == -1)
+            # Filter by company_id or customer name
+            name_conditions = [func.lower(Asset.customer).like(f"%{name.lower()}%") for name in all_company_names]
+            query = query.filter(
+                or_(
+                    Asset.company_id.in_(all_company_ids),
+                    *name_conditions
+                )
+            )
+        else:
+            # No permissions - export nothing
+            query = query.filter(Asset.id == -1)
 
-            # Apply filters from query parameters (from inventory view)
-            status_filter = request.args.get('status')
-            if status_filter and status_filter != 'all':
-                from models.enums import AssetStatus
-                try:
-                    status_enum = AssetStatus(status_filter)
-                    query = query.filter(Asset.status == status_enum)
-                except ValueError:
-                    pass
+    # Apply filters from query parameters (from inventory view)
+    status_filter = params.get('status')
+    if status_filter and status_filter != 'all':
+        from models.enums import AssetStatus
+        try:
+            status_enum = AssetStatus(status_filter)
+            query = query.filter(Asset.status == status_enum)
+        except ValueError:
+            pass
+
+    model_filter = params.get('model')
+    if model_filter and model_filter != 'all':
+        query = query.filter(Asset.model == model_filter)
+
+    company_filter = params.get('company')
+    if company_filter and company_filter != 'all':
+        if company_filter == '__unknown__' or company_filter == '':
+            # Filter for assets with empty/null company
+            query = query.filter(or_(
+                Asset.customer.is_(None),
+                Asset.customer == '',
+                func.trim(Asset.customer) == ''
+            ))
+        else:
+            query = query.filter(Asset.customer == company_filter)
 
-            model_filter = request.args.get('model')
-            if model_filter and model_filter != 'all':
-                query = query.filter(Asset.model == model_filter)
-
-            company_filter = request.args.get('company')
-            if company_filter and company_filter != 'all':
-                if company_filter == '__unknown__' or company_filter == '':
-                    # Filter for assets with empty/null company
-                    query = query.filter(or_(
-                        Asset.customer.is_(None),
-                        Asset.customer == '',
-                        func.trim(Asset.customer) == ''
-                    ))
-                else:
-                    query = query.filter(Asset.customer == company_filter)
+    country_filter = params.get('country')
+    if country_filter and country_filter != 'all':
+        query = query.filter(Asset.country == country_filter)
 
-            country_filter = request.args.get('country')
-            if country_filter and country_filter != 'all':
-                query = query.filter(Asset.country == country_filter)
+    search_filter = params.get('search')
+    if search_filter:
+        search_term = f"%{search_filter}%"
+        query = query.filter(
+            or_(
+                Asset.serial_num.ilike(search_term),
+                Asset.asset_tag.ilike(search_term),
+                Asset.model.ilike(search_term),
+                Asset.name.ilike(search_term)
+            )
+        )
 
-            search_filter = request.args.get('search')
-            if search_filter:
-                search_term = f"%{search_filter}%"
-                query = query.filter(
-                    or_(
-                        Asset.serial_num.ilike(search_term),
-                        Asset.asset_tag.ilike(search_term),
-                        Asset.model.ilike(search_term),
-                        Asset.name.ilike(search_term)
-                    )
-                )
+    return query
 
-            assets = query.all()
 
-            if not assets:
-                flash('No assets selected for export', 'error')
-                return redirect(url_for('inventory.view_inventory'))
+def _asset_export_rows(db_session, user, params):
+    """Header and lazily generated rows for the tech asset export"""
+    from models.device_spec import DeviceSpec
+    from models.package_item import PackageItem
+    from utils.streaming_export import iter_batches
 
-            # Import DeviceSpec to get additional tech specs
-            from models.device_spec import DeviceSpec
+    # Only the columns written to the file
+    query = _asset_export_query(db_session, user, params).with_entities(
+        Asset.id, Asset.asset_type, Asset.name, Asset.asset_tag, Asset.receiving_date,
+        Asset.keyboard, Asset.serial_num, Asset.po, Asset.model, Asset.erased, Asset.customer,
+        Asset.condition, Asset.diag, Asset.hardware_type, Asset.cpu_type, Asset.cpu_cores,
+        Asset.gpu_cores, Asset.memory, Asset.harddrive, Asset.status, Asset.charger,
+        Asset.inventory, Asset.country
+    )
 
-            # Build a dictionary of device specs by serial number for quick lookup
-            asset_serial_nums = [a.serial_num for a in assets if a.serial_num]
+    def rows():
+        for batch in iter_batches(query, Asset.id):
+            # Device specs and package items for the whole batch in two queries
+            serial_nums = [a.serial_num for a in batch if a.serial_num]
             device_specs = {}
-            if asset_serial_nums:
-                specs = db_session.query(DeviceSpec).filter(
-                    DeviceSpec.serial_number.in_(asset_serial_nums)
-                ).all()
-                for spec in specs:
+            if serial_nums:
+                for spec in db_session.query(DeviceSpec).filter(DeviceSpec.serial_number.in_(serial_nums)):
                     device_specs[spec.serial_number] = spec
 
-            # Write header with tech asset spec columns
-            writer.writerow([
-                'Package Number', 'Asset Type', 'Product', 'ASSET TAG', 'Receiving date', 'Keyboard',
-                'SERIAL NUMBER', 'PO', 'MODEL', 'ERASED', 'CUSTOMER', 'CONDITION',
-                'DIAG', 'HARDWARE TYPE', 'CPU TYPE', 'CPU CORES', 'GPU', 'GPU CORES',
-                'MEMORY', 'MEMORY TYPE', 'HARDDRIVE', 'STORAGE TYPE', 'STATUS', 'CHARGER', 'INCLUDED', 'INVENTORY',
-                'country', 'OS', 'OS VERSION', 'BATTERY CYCLES', 'BATTERY HEALTH', 'WIFI MAC', 'ETHERNET MAC'
-            ])
-
-            # Import PackageItem model
-            from models.package_item import PackageItem
+            package_numbers = {}
+            package_rows = db_session.query(PackageItem.asset_id, PackageItem.package_number).filter(
+                PackageItem.asset_id.in_([a.id for a in batch])
+            ).order_by(PackageItem.package_number)
+            for asset_id, package_number in package_rows:
+                package_numbers.setdefault(asset_id, []).append(package_number)
 
-            # Write data
-            for asset in assets:
-                # Get device spec for this asset if available
+            for asset in batch:
                 spec = device_specs.get(asset.serial_num) if asset.serial_num else None
+                values = [
+                    asset.asset_type or '',
+                    asset.name or '',
+                    asset.asset_tag or '',
+                    asset.receiving_date.strftime('%Y-%m-%d') if asset.receiving_date else '',
+                    asset.keyboard or '',
+                    asset.serial_num or '',
+                    asset.po or '',
+                    asset.model or '',
+                    asset.erased or '',
+                    asset.customer or '',
+                    asset.condition or '',
+                    asset.diag or '',
+                    asset.hardware_type or '',
+                    spec.cpu if spec and spec.cpu else (asset.cpu_type or ''),
+                    spec.cpu_cores if spec and spec.cpu_cores else (asset.cpu_cores or ''),
+                    spec.gpu if spec else '',
+                    spec.gpu_cores if spec and spec.gpu_cores else (asset.gpu_cores or ''),
+                    spec.ram_gb if spec and spec.ram_gb else (asset.memory or ''),
+                    spec.memory_type if spec else '',
+                    spec.storage_gb if spec and spec.storage_gb else (asset.harddrive or ''),
+                    spec.storage_type if spec else '',
+                    asset.status.value if asset.status else '',
+                    asset.charger or '',
+                    '',  # INCLUDED field (empty for now)
+                    asset.inventory or '',
+                    asset.country or '',
+                    spec.os_name if spec else '',
+                    spec.os_version if spec else '',
+                    spec.battery_cycles if spec else '',
+                    spec.battery_health if spec else '',
+                    spec.wifi_mac if spec else '',
+                    spec.ethernet_mac if spec else ''
+                ]
+
+                # One row per package item, or a single row without a package number
+                for package_number in package_numbers.get(asset.id, [None]):
+                    yield [f'Package {package_number}' if package_number is not None else ''] + values
+
+            # Specs are only needed for this batch
+            db_session.expunge_all()
+
+    return ASSET_EXPORT_HEADER, rows()
+
+
+def _accessory_export_query(db_session, user, params):
+    """Accessories visible to the user that match the export selection"""
+    query = db_session.query(Accessory)
+
+    if params.get('selected_ids'):
+        query = query.filter(Accessory.id.in_(params['selected_ids']))
+
+    # Apply user permission filters
+    if not user.is_super_admin:
+        if user.is_country_admin and user.assigned_countries:
+            query = query.filter(Accessory.country == user.assigned_country)
+
+    return query
+
+
+def _accessory_export_rows(db_session, user, params):
+    """Header and lazily generated rows for the accessory export"""
+    from utils.streaming_export import iter_batches
+
+    query = _accessory_export_query(db_session, user, params).with_entities(
+        Accessory.id, Accessory.name, Accessory.category, Accessory.manufacturer, Accessory.model_no,
+        Accessory.total_quantity, Accessory.available_quantity, Accessory.country,
+        Accessory.status, Accessory.notes, Accessory.created_at
+    )
 
-                # Check if this asset has package items
-                package_items = db_session.query(PackageItem).filter(
-                    PackageItem.asset_id == asset.id
-                ).order_by(PackageItem.package_number).all()
-
-                if package_items:
-                    # Create one row per package item
-                    for pkg_item in package_items:
-                        writer.writerow([
-                            f'Package {pkg_item.package_number}',
-                            asset.asset_type or '',
-                            asset.name or '',
-                            asset.asset_tag or '',
-                            asset.receiving_date.strftime('%Y-%m-%d') if asset.receiving_date else '',
-                            asset.keyboard or '',
-                            asset.serial_num or '',
-                            asset.po or '',
-                            asset.model or '',
-                            asset.erased or '',
-                            asset.customer or '',
-                            asset.condition or '',
-                            asset.diag or '',
-                            asset.hardware_type or '',
-                            spec.cpu if spec and spec.cpu else (asset.cpu_type or ''),
-                            spec.cpu_cores if spec and spec.cpu_cores else (asset.cpu_cores or ''),
-                            spec.gpu if spec else '',
-                            spec.gpu_cores if spec and spec.gpu_cores else (asset.gpu_cores or ''),
-                            spec.ram_gb if spec and spec.ram_gb else (asset.memory or ''),
-                            spec.memory_type if spec else '',
-                            spec.storage_gb if spec and spec.storage_gb else (asset.harddrive or ''),
-                            spec.storage_type if spec else '',
-                            asset.status.value if asset.status else '',
-                            asset.charger or '',
-                            '',  # INCLUDED field (empty for now)
-                            asset.inventory or '',
-                            asset.country or '',
-                            spec.os_name if spec else '',
-                            spec.os_version if spec else '',
-                            spec.battery_cycles if spec else '',
-                            spec.battery_health if spec else '',
-                            spec.wifi_mac if spec else '',
-                            spec.ethernet_mac if spec else ''
-                        ])
-                else:
-                    # No package items, create one row as normal
-                    writer.writerow([
-                        '',  # No package number
-                        asset.asset_type or '',
-                        asset.name or '',
-                        asset.asset_tag or '',
-                        asset.receiving_date.strftime('%Y-%m-%d') if asset.receiving_date else '',
-                        asset.keyboard or '',
-                        asset.serial_num or '',
-                        asset.po or '',
-                        asset.model or '',
-                        asset.erased or '',
-                        asset.customer or '',
-                        asset.condition or '',
-                        asset.diag or '',
-                        asset.hardware_type or '',
-                        spec.cpu if spec and spec.cpu else (asset.cpu_type or ''),
-                        spec.cpu_cores if spec and spec.cpu_cores else (asset.cpu_cores or ''),
-                        spec.gpu if spec else '',
-                        spec.gpu_cores if spec and spec.gpu_cores else (asset.gpu_cores or ''),
-                        spec.ram_gb if spec and spec.ram_gb else (asset.memory or ''),
-                        spec.memory_type if spec else '',
-                        spec.storage_gb if spec and spec.storage_gb else (asset.harddrive or ''),
-                        spec.storage_type if spec else '',
-                        asset.status.value if asset.status else '',
-                        asset.charger or '',
-                        '',  # INCLUDED field (empty for now)
-                        asset.inventory or '',
-                        asset.country or '',
-                        spec.os_name if spec else '',
-                        spec.os_version if spec else '',
-                        spec.battery_cycles if spec else '',
-                        spec.battery_health if spec else '',
-                        spec.wifi_mac if spec else '',
-                        spec.ethernet_mac if spec else ''
-                    ])
-        
-        elif item_type == 'accessories':
-            # Get accessories based on user permissions and selection
-            query = db_session.query(Accessory)
-
-            # Handle selected accessories if POST request
-            if request.method == 'POST' and request.form.get('selected_ids'):
-                try:
-                    selected_ids = json.loads(request.form.get('selected_ids'))
-                    if selected_ids:
-                        query = query.filter(Accessory.id.in_(selected_ids))
-                except json.JSONDecodeError:
-                    flash('Invalid selection data', 'error')
-                    return redirect(url_for('inventory.view_accessories'))
-
-            # Apply user permission filters
-            if not current_user.is_super_admin:
-                if current_user.is_country_admin and current_user.assigned_countries:
-                    query = query.filter(Accessory.country == current_user.assigned_country)
-
-            accessories = query.all()
-
-            if not accessories:
-                flash('No accessories selected for export', 'error')
-                return redirect(url_for('inventory.view_accessories'))
-            
-            # Write header
-            writer.writerow([
-                'Name', 'Category', 'Manufacturer', 'Model No',
-                'Total Quantity', 'Available Quantity', 'Country',
-                'Status', 'Notes', 'Created At'
-            ])
-            
-            # Write data
-            for accessory in accessories:
-                writer.writerow([
+    def rows():
+        for batch in iter_batches(query, Accessory.id):
+            for accessory in batch:
+                yield [
                     accessory.name,
                     accessory.category,
                     accessory.manufacturer,
@@ -5793,26 +5673,71 @@ def export_inventory(item_type):
                     accessory.status,
                     accessory.notes,
                     accessory.created_at.strftime('%Y-%m-%d %H:%M:%S') if accessory.created_at else ''
-                ])
-        
-        # Get the string data and convert to bytes
-        output = si.getvalue().encode('utf-8')
-        si.close()
-        
-        # Create a BytesIO object
-        bio = BytesIO()
-        bio.write(output)
-        bio.seek(0)
-        
-        return send_file(
-            bio,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'inventory_{item_type}_{singapore_now_as_utc().strftime("%Y%m%d_%H%M%S")}.csv'
-        )
-    
+                ]
+
+    return ACCESSORY_EXPORT_HEADER, rows()
+
+
+@inventory_bp.route('/export/<string:item_type>', methods=['GET', 'POST'])
+@login_required
+def export_inventory(item_type):
+    from functools import partial
+    from utils.streaming_export import (
+        background_export_message, csv_response, xlsx_response, should_run_in_background,
+        start_background_export
+    )
+
+    # Ensure user has permission to export data - allow SUPER_ADMIN, DEVELOPER, SUPERVISOR, and COUNTRY_ADMIN
+    if not (current_user.is_super_admin or current_user.is_developer or current_user.is_supervisor or current_user.is_country_admin):
+        flash('You do not have permission to export data', 'error')
+        return redirect(url_for('inventory.view_inventory'))
+
+    if item_type == 'assets':
+        list_view = 'inventory.view_inventory'
+        count_query, build_rows = _asset_export_query, _asset_export_rows
+    elif item_type == 'accessories':
+        list_view = 'inventory.view_accessories'
+        count_query, build_rows = _accessory_export_query, _accessory_export_rows
+    else:
+        abort(404)
+
+    try:
+        params = _export_params()
+    except json.JSONDecodeError:
+        flash('Invalid selection data', 'error')
+        return redirect(url_for(list_view))
+
+    file_format = 'xlsx' if request.args.get('format') == 'xlsx' else 'csv'
+    filename = f'inventory_{item_type}_{singapore_now_as_utc().strftime("%Y%m%d_%H%M%S")}.{file_format}'
+
+    db_session = db_manager.get_session()
+    streaming = False
+    try:
+        total = count_query(db_session, current_user, params).count()
+        if not total:
+            flash(f'No {item_type} selected for export', 'error')
+            return redirect(url_for(list_view))
+
+        # Very large exports are written to a file in the background
+        if should_run_in_background(total, request.args.get('background')):
+            job_id = start_background_export(
+                item_type, current_user.id, filename,
+                partial(build_rows, params=params), db_manager.get_session, file_format=file_format
+            )
+            flash(background_export_message(total, item_type, job_id), 'info')
+            return redirect(url_for(list_view))
+
+        header, rows = build_rows(db_session, current_user, params)
+        if file_format == 'xlsx':
+            return xlsx_response(header, rows, filename, sheet_name=item_type.title())
+
+        # The session stays open until the last row has been streamed
+        streaming = True
+        return csv_response(header, rows, filename, on_close=db_session.close)
+
     finally:
-        db_session.close()
+        if not streaming:
+            db_session.close()
 
 @inventory_bp.after_request
 def add_csrf_token_to_response(response):
@@ -5899,56 +5824,63 @@ def bulk_checkout():
                 continue
 
         # Process accessories
+        accessories = {}
         for accessory_data in selected_accessories:
-            try:
-                accessory_id = accessory_data.get('id')
-                quantity = accessory_data.get('quantity', 1)
-                
-                accessory = db_session.query(Accessory).get(accessory_id)
-                if not accessory:
-                    errors.append(f"Accessory {accessory_id} not found")
-                    continue
-
-                if accessory.available_quantity < quantity:
-                    errors.append(f"Accessory {accessory.name} does not have enough quantity available")
-                    continue
-
-                # Generate unique transaction number with random component
-                random_component = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', k=4))
-                transaction_number = f"TRX-{datetime.now().strftime('%Y%m%d%H%M%S')}-{random_component}-{accessory_id}"
+            accessory_id = accessory_data.get('id')
+            accessory = db_session.query(Accessory).get(accessory_id)
+            if not accessory:
+                errors.append(f"Accessory {accessory_id} not found")
+                continue
+            accessories[accessory.id] = (accessory, accessory_data.get('quantity', 1))
 
-                # Create transaction
-                transaction = AccessoryTransaction(
-                    transaction_number=transaction_number,
-                    accessory_id=accessory_id,
-                    customer_id=customer_id,
+        notes = f"Bulk checkout to {customer.name}"
+        reserved = []
+        if accessories:
+            try:
+                # Fast path: reserve every accessory in one conditional UPDATE
+                entries = AccessoryStock.reserve_many(
+                    db_session,
+                    [(accessory_id, quantity) for accessory_id, (_, quantity) in accessories.items()],
                     transaction_type='checkout',
-                    quantity=quantity,
-                    notes=f"Bulk checkout to {customer.name}"
+                    user_id=current_user.id,
+                    customer_id=customer_id,
+                    notes=notes,
+                    consume_total=True,
+                    status='Checked Out'
                 )
-                db_session.add(transaction)
-
-                # Update accessory quantity
-                accessory.available_quantity -= quantity
-                accessory.total_quantity -= quantity
-                
-                # Update the customer_id field for the accessory to link it to this customer
-                accessory.customer_id = customer_id
-                accessory.checkout_date = datetime.now()
-                accessory.status = 'Checked Out'
+                reserved = [(accessories[entry.accessory_id][0], entry) for entry in entries]
+            except InsufficientStockError:
+                # Some items are short - reserve item by item so the rest still go through
+                for accessory_id, (accessory, quantity) in accessories.items():
+                    try:
+                        entry = AccessoryStock.checkout(
+                            db_session, accessory_id, quantity,
+                            transaction_type='checkout',
+                            user_id=current_user.id,
+                            customer_id=customer_id,
+                            notes=notes,
+                            consume_total=True,
+                            status='Checked Out'
+                        )
+                        reserved.append((accessory, entry))
+                    except InsufficientStockError:
+                        errors.append(f"Accessory {accessory.name} does not have enough quantity available")
+                    except Exception as e:
+                        errors.append(f"Error processing accessory {accessory_id}: {str(e)}")
 
-                processed_items.append({
-                    'type': 'accessory',
-                    'id': accessory_id,
-                    'name': accessory.name,
-                    'quantity': quantity,
-                    'transaction_number': transaction_number
-                })
-                processed_accessories += 1
+        for accessory, entry in reserved:
+            # Update the customer_id field for the accessory to link it to this customer
+            accessory.customer_id = customer_id
+            accessory.checkout_date = datetime.now()
 
-            except Exception as e:
-                errors.append(f"Error processing accessory {accessory_id}: {str(e)}")
-                continue
+            processed_items.append({
+                'type': 'accessory',
+                'id': accessory.id,
+                'name': accessory.name,
+                'quantity': entry.quantity,
+                'transaction_number': entry.transaction_number
+            })
+            processed_accessories += 1
 
         # Commit the transaction
         db_session.commit()
@@ -6420,70 +6352,106 @@ def remove_serial_prefix():
     finally:
         db_session.close()
 
+CUSTOMER_USER_EXPORT_HEADER = [
+    'Name',
+    'Company',
+    'Country',
+    'Contact Number',
+    'Email',
+    'Address',
+    'Number of Assigned Assets',
+    'Number of Assigned Accessories',
+    'Created At'
+]
+
+
+def _customer_user_export_query(db_session, user):
+    """Customer users visible to the user"""
+    query = db_session.query(CustomerUser)
+
+    # Apply company filtering for non-SUPER_ADMIN users
+    if user.user_type != UserType.SUPER_ADMIN and user.company_id:
+        query = query.filter(CustomerUser.company_id == user.company_id)
+
+    return query
+
+
+def _customer_user_export_rows(db_session, user):
+    """Header and lazily generated rows for the customer user export"""
+    from utils.streaming_export import iter_batches
+
+    # Assignment counts as correlated subqueries instead of loading every asset/accessory
+    asset_count = db_session.query(func.count(Asset.id)).filter(
+        Asset.customer_id == CustomerUser.id
+    ).correlate(CustomerUser).scalar_subquery()
+    accessory_count = db_session.query(func.count(Accessory.id)).filter(
+        Accessory.customer_id == CustomerUser.id
+    ).correlate(CustomerUser).scalar_subquery()
+
+    query = _customer_user_export_query(db_session, user).outerjoin(
+        Company, CustomerUser.company_id == Company.id
+    ).with_entities(
+        CustomerUser.id, CustomerUser.name, Company.name.label('company_name'), CustomerUser.country,
+        CustomerUser.contact_number, CustomerUser.email, CustomerUser.address,
+        asset_count.label('asset_count'), accessory_count.label('accessory_count'),
+        CustomerUser.created_at
+    )
+
+    def rows():
+        for batch in iter_batches(query, CustomerUser.id, sort_column=CustomerUser.name):
+            for customer in batch:
+                yield [
+                    customer.name,
+                    customer.company_name if customer.company_name else 'N/A',
+                    customer.country or 'N/A',
+                    customer.contact_number,
+                    customer.email if customer.email else 'N/A',
+                    customer.address,
+                    customer.asset_count,
+                    customer.accessory_count,
+                    customer.created_at.strftime('%Y-%m-%d %H:%M:%S') if customer.created_at else 'N/A'
+                ]
+
+    return CUSTOMER_USER_EXPORT_HEADER, rows()
+
+
 @inventory_bp.route('/customer-users/export')
 @login_required
 def export_customer_users():
-    """Export customer users to CSV"""
+    """Export customer users to CSV (or XLSX with ?format=xlsx)"""
+    from utils.streaming_export import (
+        background_export_message, csv_response, xlsx_response, should_run_in_background,
+        start_background_export
+    )
+
+    file_format = 'xlsx' if request.args.get('format') == 'xlsx' else 'csv'
+    filename = f'customer_users.{file_format}'
+
     db_session = db_manager.get_session()
+    streaming = False
     try:
         # Get current user
-        user = db_manager.get_user(session['user_id'])
-        
-        # Base query for customers
-        customers_query = db_session.query(CustomerUser)\
-            .options(joinedload(CustomerUser.company))\
-            .options(joinedload(CustomerUser.assigned_assets))\
-            .options(joinedload(CustomerUser.assigned_accessories))
-        
-        # Apply company filtering for non-SUPER_ADMIN users
-        if user.user_type != UserType.SUPER_ADMIN and user.company_id:
-            customers_query = customers_query.filter(CustomerUser.company_id == user.company_id)
-        
-        customers = customers_query.order_by(CustomerUser.name).all()
-        
-        # Create a string buffer to write CSV data
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header row
-        writer.writerow([
-            'Name', 
-            'Company', 
-            'Country', 
-            'Contact Number', 
-            'Email', 
-            'Address',
-            'Number of Assigned Assets',
-            'Number of Assigned Accessories',
-            'Created At'
-        ])
-        
-        # Write data rows
-        for customer in customers:
-            writer.writerow([
-                customer.name,
-                customer.company.name if customer.company else 'N/A',
-                customer.country.value if customer.country else 'N/A',
-                customer.contact_number,
-                customer.email if customer.email else 'N/A',
-                customer.address,
-                len(customer.assigned_assets),
-                len(customer.assigned_accessories),
-                customer.created_at.strftime('%Y-%m-%d %H:%M:%S') if customer.created_at else 'N/A'
-            ])
-        
-        # Create the response
-        output.seek(0)
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': 'attachment; filename=customer_users.csv',
-                'Content-Type': 'text/csv'
-            }
-        )
+        user = db_session.query(User).get(session['user_id'])
+
+        total = _customer_user_export_query(db_session, user).count()
+        if should_run_in_background(total, request.args.get('background')):
+            job_id = start_background_export(
+                'customer_users', user.id, filename, _customer_user_export_rows,
+                db_manager.get_session, file_format=file_format
+            )
+            flash(background_export_message(total, 'customer users', job_id), 'info')
+            return redirect(url_for('inventory.list_customer_users'))
+
+        header, rows = _customer_user_export_rows(db_session, user)
+        if file_format == 'xlsx':
+            return xlsx_response(header, rows, filename, sheet_name='Customer Users')
+
+        # The session stays open until the last row has been streamed
+        streaming = True
+        return csv_response(header, rows, filename, on_close=db_session.close)
     finally:
-        db_session.close()
+        if not streaming:
+            db_session.close()
 
 @inventory_bp.route('/asset/<int:asset_id>/transactions')
 @login_required
@@ -6699,6 +6667,7 @@ def download_customer_template():
 @admin_required
 def import_customers():
     """Import customer users from a CSV file"""
+    import pandas as pd
     from routes.import_manager import create_import_session, update_import_session
 
     if request.method == 'POST':
@@ -6991,7 +6960,9 @@ def get_customer_transactions(id):
 @login_required
 @admin_required
 def delete_accessory_transaction():
-    """Delete an accessory transaction and update inventory counts"""
+    """Undo an accessory transaction with a compensating ledger entry"""
+    from utils.accessory_stock import AccessoryStock, InsufficientStockError
+
     db_session = db_manager.get_session()
     try:
         data = request.get_json()
@@ -7001,7 +6972,7 @@ def delete_accessory_transaction():
             return jsonify({'success': False, 'error': 'Transaction ID is required'}), 400
         
         # Get the transaction
-        transaction = db_session.query(AccessoryTransaction).filter_by(transaction_id=transaction_id).first()
+        transaction = db_session.query(AccessoryTransaction).filter_by(id=transaction_id).first()
         
         if not transaction:
             return jsonify({'success': False, 'error': 'Transaction not found'}), 404
@@ -7012,28 +6983,28 @@ def delete_accessory_transaction():
         if not accessory:
             return jsonify({'success': False, 'error': 'Associated accessory not found'}), 404
         
-        # Update accessory quantity if it was a checkout
-        if transaction.transaction_type == 'Checkout':
-            # Increase available quantity
-            accessory.available_quantity += transaction.quantity
-            db_session.add(accessory)
-            
-            # Create activity log
-            activity = Activity(
-                user_id=current_user.id,
-                type='transaction_deleted',
-                content=f'Deleted checkout transaction {transaction_id} for {accessory.name} (Quantity: {transaction.quantity})',
-                reference_id=transaction.accessory_id
+        # The ledger keeps the entry; a reversal puts the stock back
+        try:
+            AccessoryStock.reverse(
+                db_session, transaction, user_id=current_user.id,
+                notes=f'Reversal of transaction {transaction.transaction_number}'
             )
-            db_session.add(activity)
-        
-        # Delete the transaction
-        db_session.delete(transaction)
+        except (ValueError, InsufficientStockError) as e:
+            db_session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        activity = Activity(
+            user_id=current_user.id,
+            type='transaction_deleted',
+            content=f'Reversed {transaction.transaction_type.lower()} transaction {transaction_id} for {accessory.name} (Quantity: {transaction.quantity})',
+            reference_id=transaction.accessory_id
+        )
+        db_session.add(activity)
         db_session.commit()
         
         return jsonify({
             'success': True, 
-            'message': f'Transaction {transaction_id} deleted successfully',
+            'message': f'Transaction {transaction_id} reversed successfully',
             'transaction_type': transaction.transaction_type,
             'accessory_name': accessory.name,
             'quantity': transaction.quantity
@@ -78,7 +78,6 @@ def dual_auth_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        from sqlalchemy.orm import joinedload
         user = None
 
         # Method 1: Try JSON API key + JWT authentication first
@@ -88,23 +87,15 @@ def dual_auth_required(f):
             auth_header = request.headers.get('Authorization')
             if auth_header and auth_header.startswith('Bearer '):
                 token = auth_header.split(' ')[1]
-                from routes.json_api import verify_jwt_token
-                user_id = verify_jwt_token(token)
-
-                if user_id:
-                    # Get user from database with eager loading
-                    db_session = db_manager.get_session()
-                    try:
-                        # Note: permissions is a @property, not a relationship
-                        user = db_session.query(User).options(
-                            joinedload(User.company)
-                        ).filter(User.id == user_id).first()
-                        if user:
-                            # Force load company before session closes
-                            _ = user.company
-                            logger.info(f"JSON API authentication successful for user: {user.username}")
-                    finally:
-                        db_session.close()
+                from routes.json_api import verify_jwt_claims
+                from utils.auth_cache import get_auth_user
+                payload = verify_jwt_claims(token)
+
+                if payload:
+                    # Cached user snapshot shared with the mobile and v2 decorators
+                    user = get_auth_user(payload.get('user_id'), payload.get('tv', 0))
+                    if user:
+                        logger.info(f"JSON API authentication successful for user: {user.username}")
 
         # Method 2: Try mobile JWT authentication (no API key needed)
         if not user:
@@ -42,10 +42,11 @@ def require_api_key(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def generate_access_token(user_id):
+def generate_access_token(user_id, token_version=0):
     """Generate JWT access token"""
     payload = {
         'user_id': user_id,
+        'tv': token_version,  # Revoked when the user's token_version moves on
         'exp': datetime.utcnow() + timedelta(hours=1),  # 1 hour expiry
         'iat': datetime.utcnow()
     }
@@ -56,10 +57,11 @@ def generate_access_token(user_id):
         logger.error(f"Error generating access token: {str(e)}")
         return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
 
-def generate_refresh_token(user_id):
+def generate_refresh_token(user_id, token_version=0):
     """Generate JWT refresh token"""
     payload = {
         'user_id': user_id,
+        'tv': token_version,  # Revoked when the user's token_version moves on
         'exp': datetime.utcnow() + timedelta(days=30),  # 30 day expiry
         'iat': datetime.utcnow()
     }
@@ -72,10 +74,14 @@ def generate_refresh_token(user_id):
 
 def verify_jwt_token(token):
     """Verify JWT token and return user_id"""
+    payload = verify_jwt_claims(token)
+    return payload.get('user_id') if payload else None
+
+def verify_jwt_claims(token):
+    """Verify JWT token and return its payload"""
     try:
         secret_key = current_app.config.get('SECRET_KEY', JWT_SECRET)
-        payload = jwt.decode(token, secret_key, algorithms=['HS256'])
-        return payload['user_id']
+        return jwt.decode(token, secret_key, algorithms=['HS256'])
     except jwt.ExpiredSignatureError:
         logger.warning("JWT token expired")
         return None
@@ -86,8 +92,7 @@ def verify_jwt_token(token):
         logger.error(f"Error verifying JWT token: {str(e)}")
         try:
             # Fallback to default secret
-            payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-            return payload['user_id']
+            return jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
         except:
             return None
 
@@ -106,23 +111,20 @@ def require_jwt_auth(f):
             return jsonify({'error': 'Missing or invalid token'}), 401
         
         token = auth_header.split(' ')[1]
-        user_id = verify_jwt_token(token)
+        payload = verify_jwt_claims(token)
         
-        if not user_id:
+        if not payload:
             return jsonify({'error': 'Invalid or expired token'}), 401
         
-        # Get user from database
-        db_session = db_manager.get_session()
-        try:
-            user = db_session.query(User).filter(User.id == user_id).first()
-            if not user:
-                return jsonify({'error': 'User not found'}), 401
-            
-            # Make user available in request context
-            request.current_user = user
-            return f(*args, **kwargs)
-        finally:
-            db_session.close()
+        # Cached user snapshot; revoked tokens and deleted users get None
+        from utils.auth_cache import get_auth_user
+        user = get_auth_user(payload['user_id'], payload.get('tv', 0))
+        if not user:
+            return jsonify({'error': 'User not found'}), 401
+        
+        # Make user available in request context
+        request.current_user = user
+        return f(*args, **kwargs)
     
     decorated_function.__name__ = f.__name__
     return decorated_function
@@ -163,8 +165,8 @@ def mobile_login():
             db_session.commit()
             
             # Generate tokens
-            access_token = generate_access_token(user.id)
-            refresh_token = generate_refresh_token(user.id)
+            access_token = generate_access_token(user.id, user.token_version or 0)
+            refresh_token = generate_refresh_token(user.id, user.token_version or 0)
             
             # Return user data and tokens
             return jsonify({
@@ -1240,7 +1240,12 @@ def upload_image():
 @knowledge_bp.route('/images/<filename>')
 def serve_image(filename):
     """Serve uploaded images"""
-    from flask import current_app, send_from_directory
+    from flask import current_app, abort
+    from werkzeug.security import safe_join
+    from utils.file_delivery import send_protected_file
     import os
     upload_dir = os.path.join(current_app.root_path, 'static', 'uploads', 'knowledge', 'images')
-    return send_from_directory(upload_dir, filename)
\ No newline at end of file
+    path = safe_join(upload_dir, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    return send_protected_file(path, as_attachment=False)
\ No newline at end of file
@@ -175,12 +175,15 @@ def index():
                 
                 if import_type == 'asset':
                     # Handle asset import
-                    if inventory_store.import_from_excel(filepath):
-                        flash('Inventory imported successfully')
-                        os.remove(filepath)
-                    else:
+                    result = inventory_store.import_from_excel(filepath)
+                    if result is None:
                         flash('Error importing inventory')
-                        os.remove(filepath)
+                    elif result['failed']:
+                        flash(f"Imported {result['success']} assets; {result['failed']} rows were skipped "
+                              f"(first: {result['errors'][0]})")
+                    else:
+                        flash(f"Inventory imported successfully ({result['success']} assets)")
+                    os.remove(filepath)
                 elif import_type == 'ticket':
                     # Handle ticket import - redirect to preview
                     return redirect(url_for('main.preview_ticket_import', filename=filename))
@@ -994,8 +997,19 @@ def search_customers():
                 )
             )
         
-        # Apply search filter if provided
-        if search_term:
+        # Apply search filter if provided (prefix search on the in-memory index)
+        from utils.autocomplete import USE_INDEX, autocomplete, query_ids
+        if search_term and USE_INDEX:
+            allowed = None
+            if customers_query.whereclause is not None:
+                allowed = autocomplete.scope(('customers', user.id), query_ids(
+                    customers_query.with_entities(CustomerUser.id)
+                ))
+            matches = autocomplete.search(db_session, 'customers', search_term, limit=50, allowed=allowed)
+            customers_query = db_session.query(CustomerUser).filter(
+                CustomerUser.id.in_([match['id'] for match in matches])
+            )
+        elif search_term:
             search_filter = or_(
                 CustomerUser.name.ilike(f'%{search_term}%'),
                 CustomerUser.email.ilike(f'%{search_term}%'),
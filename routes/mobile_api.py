@@ -15,6 +15,7 @@ from datetime import datetime, timedelta
 import jwt
 import logging
 import os
+from sqlalchemy.orm import selectinload
 
 from models.user import User, UserType
 from models.ticket import Ticket, TicketStatus, TicketPriority, TicketCategory
@@ -23,6 +24,10 @@ from models.accessory import Accessory
 from models.queue import Queue
 from utils.db_manager import DatabaseManager
 from utils.auth_decorators import login_required
+from utils.api_responses import cache_policy
+from utils.media_pipeline import (
+    stream_to_file, store_content_addressed, queue_renditions, source_type_for, UploadTooLargeError
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -38,6 +43,7 @@ def create_mobile_token(user):
         'user_id': user.id,
         'username': user.username,
         'user_type': user.user_type.value,
+        'tv': user.token_version or 0,  # Revoked when the user's token_version moves on
         'exp': datetime.utcnow() + timedelta(days=30),  # 30 day expiry
         'iat': datetime.utcnow()
     }
@@ -49,30 +55,14 @@ def create_mobile_token(user):
     return jwt.encode(payload, secret_key, algorithm='HS256')
 
 def verify_mobile_token(token):
-    """Verify JWT token and return user"""
+    """Verify JWT token and return the user (an AuthUser from utils.auth_cache)"""
     try:
         from flask import current_app
-        from sqlalchemy.orm import joinedload
+        from utils.auth_cache import get_auth_user
         secret_key = current_app.config.get('SECRET_KEY', 'fallback-secret-key')
 
         payload = jwt.decode(token, secret_key, algorithms=['HS256'])
-        user_id = payload['user_id']
-
-        db_session = db_manager.get_session()
-        try:
-            # Eagerly load company relationship
-            # Note: permissions is a @property, not a relationship - it queries its own session
-            user = db_session.query(User).options(
-                joinedload(User.company)
-            ).filter(User.id == user_id).first()
-
-            # Force load the company before session closes
-            if user:
-                _ = user.company
-
-            return user
-        finally:
-            db_session.close()
+        return get_auth_user(payload['user_id'], payload.get('tv', 0))
 
     except jwt.ExpiredSignatureError:
         return None
@@ -124,6 +114,64 @@ def get_asset_image_url(asset):
     return None
 
 
+def get_image_thumbnails(owner):
+    """Full rendition URLs of an asset/accessory's uploaded image ({} until rendered)"""
+    return {name: get_full_image_url(url) for name, url in owner.image_thumbnails.items()}
+
+
+def save_uploaded_image(db_session, owner, image_data, extension, folder_name):
+    """
+    Store an uploaded asset/accessory image and queue its thumbnails.
+
+    Images are stored by content hash, so the same photo uploaded for many
+    items is kept (and thumbnailed) once.
+
+    Args:
+        db_session: Session the owner belongs to
+        owner: Asset or Accessory
+        image_data: Image bytes
+        extension: File extension without the dot
+        folder_name: 'assets' or 'accessories' under static/uploads
+
+    Returns:
+        str: Relative image URL
+    """
+    from flask import current_app
+
+    folder = os.path.join(current_app.root_path, 'static', 'uploads', folder_name)
+    image_url, sha256, path, _ = store_content_addressed(
+        image_data, folder, extension, f"/static/uploads/{folder_name}"
+    )
+    if owner.image_url != image_url:
+        release_uploaded_image(db_session, owner)
+    owner.image_url = image_url
+    owner.image_sha256 = sha256
+    queue_renditions(db_session, path, sha256, 'image')
+    return image_url
+
+
+def release_uploaded_image(db_session, owner):
+    """Delete the owner's uploaded image file unless another asset/accessory still uses it"""
+    from flask import current_app
+
+    if not owner.image_url or not owner.image_url.startswith('/static/uploads/'):
+        return  # Default product images are shared and never deleted
+
+    references = (
+        db_session.query(Asset.id).filter(Asset.image_url == owner.image_url).count() +
+        db_session.query(Accessory.id).filter(Accessory.image_url == owner.image_url).count()
+    )
+    if references > 1:
+        return
+
+    path = os.path.join(current_app.root_path, owner.image_url.lstrip('/'))
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except Exception as e:
+            logger.warning(f"Failed to delete image file {path}: {e}")
+
+
 def can_view_all_tickets(user):
     """
     Check if user can view all tickets (not just their own).
@@ -142,6 +190,109 @@ def can_view_all_tickets(user):
     return False
 
 
+def serialize_ticket_summary(ticket):
+    """Ticket fields shown in the mobile ticket list"""
+    return {
+        'id': ticket.id,
+        'display_id': ticket.display_id,
+        'subject': ticket.subject,
+        'description': ticket.description[:200] + '...' if ticket.description and len(ticket.description) > 200 else ticket.description,
+        'status': ticket.status.value if ticket.status else None,
+        'priority': ticket.priority.value if ticket.priority else None,
+        'category': ticket.category.value if ticket.category else None,
+        'created_at': ticket.created_at.isoformat() if ticket.created_at else None,
+        'updated_at': ticket.updated_at.isoformat() if ticket.updated_at else None,
+        'requester': {
+            'id': ticket.requester.id,
+            'name': ticket.requester.username,  # Use username as display name
+            'email': ticket.requester.email
+        } if ticket.requester else None,
+        'assigned_to': {
+            'id': ticket.assigned_to.id,
+            'name': ticket.assigned_to.username,  # Use username as display name
+            'email': ticket.assigned_to.email
+        } if ticket.assigned_to else None,
+        'queue': {
+            'id': ticket.queue.id,
+            'name': ticket.queue.name
+        } if ticket.queue else None,
+        # Basic progress info for list view
+        'has_assets': bool(ticket.assets and len(ticket.assets) > 0),
+        'has_tracking': bool(ticket.shipping_tracking),
+        'customer_name': ticket.customer.name if ticket.customer else None
+    }
+
+
+def get_outbound_tracking_numbers(ticket):
+    """Filled shipping tracking slots (1-5) of a ticket"""
+    tracking_numbers = []
+    for slot, suffix in enumerate(['', '_2', '_3', '_4', '_5'], start=1):
+        tracking_number = getattr(ticket, f'shipping_tracking{suffix}')
+        if not tracking_number:
+            continue
+        status = getattr(ticket, f'shipping_status{suffix}')
+        tracking_numbers.append({
+            'slot': slot,
+            'tracking_number': tracking_number,
+            'carrier': getattr(ticket, f'shipping_carrier{suffix}', None),
+            'status': status or 'Pending',
+            'is_delivered': 'delivered' in (status or '').lower() or 'received' in (status or '').lower()
+        })
+    return tracking_numbers
+
+
+def serialize_asset_summary(asset):
+    """Asset fields shown in the mobile inventory list"""
+    return {
+        'id': asset.id,
+        'asset_tag': asset.asset_tag,
+        'name': asset.name,
+        'model': asset.model,
+        'serial_num': asset.serial_num,
+        'status': asset.status.value if asset.status else None,
+        'asset_type': asset.asset_type,
+        'manufacturer': asset.manufacturer,
+        'location': asset.location.name if asset.location else None,
+        'country': asset.country,
+        'image_url': get_asset_image_url(asset),
+        'thumbnails': get_image_thumbnails(asset),
+        'assigned_to': {
+            'id': asset.assigned_to.id,
+            'name': f"{asset.assigned_to.first_name} {asset.assigned_to.last_name}",
+            'email': asset.assigned_to.email
+        } if asset.assigned_to else None,
+        'customer_user': {
+            'id': asset.customer_user.id,
+            'name': asset.customer_user.name,
+            'email': asset.customer_user.email
+        } if asset.customer_user else None
+    }
+
+
+def serialize_accessory_summary(accessory):
+    """Accessory fields shown in the mobile accessories list"""
+    return {
+        'id': accessory.id,
+        'name': accessory.name,
+        'category': accessory.category,
+        'manufacturer': accessory.manufacturer,
+        'model_no': accessory.model_no,
+        'total_quantity': accessory.total_quantity,
+        'available_quantity': accessory.available_quantity,
+        'country': accessory.country,
+        'status': accessory.status,
+        'notes': accessory.notes,
+        'image_url': get_full_image_url(accessory.image_url),
+        'thumbnails': get_image_thumbnails(accessory),
+        'company': {
+            'id': accessory.company.id,
+            'name': accessory.company.name
+        } if accessory.company else None,
+        'created_at': accessory.created_at.isoformat() if accessory.created_at else None,
+        'updated_at': accessory.updated_at.isoformat() if accessory.updated_at else None
+    }
+
+
 # Authentication decorator for mobile API
 def mobile_auth_required(f):
     """Decorator to require mobile authentication"""
@@ -354,36 +505,7 @@ def get_tickets():
             # Format tickets for mobile
             ticket_list = []
             for ticket in tickets:
-                ticket_data = {
-                    'id': ticket.id,
-                    'display_id': ticket.display_id,
-                    'subject': ticket.subject,
-                    'description': ticket.description[:200] + '...' if len(ticket.description) > 200 else ticket.description,
-                    'status': ticket.status.value if ticket.status else None,
-                    'priority': ticket.priority.value if ticket.priority else None,
-                    'category': ticket.category.value if ticket.category else None,
-                    'created_at': ticket.created_at.isoformat() if ticket.created_at else None,
-                    'updated_at': ticket.updated_at.isoformat() if ticket.updated_at else None,
-                    'requester': {
-                        'id': ticket.requester.id,
-                        'name': ticket.requester.username,  # Use username as display name
-                        'email': ticket.requester.email
-                    } if ticket.requester else None,
-                    'assigned_to': {
-                        'id': ticket.assigned_to.id,
-                        'name': ticket.assigned_to.username,  # Use username as display name
-                        'email': ticket.assigned_to.email
-                    } if ticket.assigned_to else None,
-                    'queue': {
-                        'id': ticket.queue.id,
-                        'name': ticket.queue.name
-                    } if ticket.queue else None,
-                    # Basic progress info for list view
-                    'has_assets': bool(ticket.assets and len(ticket.assets) > 0),
-                    'has_tracking': bool(ticket.shipping_tracking),
-                    'customer_name': ticket.customer.name if ticket.customer else None
-                }
-                ticket_list.append(ticket_data)
+                ticket_list.append(serialize_ticket_summary(ticket))
             
             pages = (total + limit - 1) // limit  # Ceiling division
             
@@ -744,35 +866,14 @@ def get_inventory():
             
             # Apply pagination
             offset = (page - 1) * limit
-            assets = query.order_by(Asset.created_at.desc()).offset(offset).limit(limit).all()
+            assets = query.options(
+                selectinload(Asset.image_renditions)
+            ).order_by(Asset.created_at.desc()).offset(offset).limit(limit).all()
             
             # Format assets for mobile
             asset_list = []
             for asset in assets:
-                asset_data = {
-                    'id': asset.id,
-                    'asset_tag': asset.asset_tag,
-                    'name': asset.name,
-                    'model': asset.model,
-                    'serial_num': asset.serial_num,
-                    'status': asset.status.value if asset.status else None,
-                    'asset_type': asset.asset_type,
-                    'manufacturer': asset.manufacturer,
-                    'location': asset.location,
-                    'country': asset.country,
-                    'image_url': get_asset_image_url(asset),
-                    'assigned_to': {
-                        'id': asset.assigned_to.id,
-                        'name': f"{asset.assigned_to.first_name} {asset.assigned_to.last_name}",
-                        'email': asset.assigned_to.email
-                    } if asset.assigned_to else None,
-                    'customer_user': {
-                        'id': asset.customer_user.id,
-                        'name': asset.customer_user.name,
-                        'email': asset.customer_user.email
-                    } if asset.customer_user else None
-                }
-                asset_list.append(asset_data)
+                asset_list.append(serialize_asset_summary(asset))
             
             pages = (total + limit - 1) // limit
             
@@ -824,24 +925,17 @@ def get_dashboard():
         try:
             stats = {}
             
-            # Ticket statistics
+            # Ticket statistics (one aggregate, "assigned to me" included)
+            from utils.ticket_counters import count_tickets
             if can_view_all_tickets(user):
-                total_tickets = db_session.query(Ticket).count()
-                open_tickets = db_session.query(Ticket).filter(
-                    Ticket.status.notin_([TicketStatus.RESOLVED, TicketStatus.RESOLVED_DELIVERED])
-                ).count()
+                counts = count_tickets(db_session, user_id=user.id)
             else:
                 # CLIENT users see only their tickets
-                user_tickets_query = db_session.query(Ticket).filter(
-                    (Ticket.requester_id == user.id) | (Ticket.assigned_to_id == user.id)
-                )
-                total_tickets = user_tickets_query.count()
-                open_tickets = user_tickets_query.filter(
-                    Ticket.status.notin_([TicketStatus.RESOLVED, TicketStatus.RESOLVED_DELIVERED])
-                ).count()
-            
-            assigned_tickets = db_session.query(Ticket).filter(Ticket.assigned_to_id == user.id).count()
-            
+                counts = count_tickets(db_session, user_id=user.id, visible_to=user.id)
+            total_tickets = counts['total']
+            open_tickets = counts['unresolved']
+            assigned_tickets = counts['mine']['total']
+
             stats.update({
                 'total_tickets': total_tickets,
                 'open_tickets': open_tickets,
@@ -880,6 +974,7 @@ def get_dashboard():
         }), 500
 
 @mobile_api_bp.route('/health', methods=['GET'])
+@cache_policy('no-store')
 def health_check():
     """
     Health check endpoint
@@ -1078,13 +1173,7 @@ def add_tech_asset():
             # Handle image upload if provided
             image_url = None
             if data.get('image'):
-                import os
                 import base64
-                import uuid
-                from flask import current_app
-
-                upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'assets')
-                os.makedirs(upload_folder, exist_ok=True)
 
                 image_str = data['image']
                 filename_ext = 'jpg'
@@ -1098,16 +1187,7 @@ def add_tech_asset():
                 try:
                     image_data = base64.b64decode(image_str)
                     if len(image_data) <= 10 * 1024 * 1024:  # Max 10MB
-                        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                        unique_id = str(uuid.uuid4())[:8]
-                        filename = f"asset_{new_asset.id}_{timestamp}_{unique_id}.{filename_ext}"
-                        filepath = os.path.join(upload_folder, filename)
-
-                        with open(filepath, 'wb') as f:
-                            f.write(image_data)
-
-                        image_url = f"/static/uploads/assets/{filename}"
-                        new_asset.image_url = image_url
+                        image_url = save_uploaded_image(db_session, new_asset, image_data, filename_ext, 'assets')
                         db_session.commit()
                 except Exception as img_err:
                     logger.warning(f"Failed to save asset image: {str(img_err)}")
@@ -1237,54 +1317,6 @@ def get_outbound_tracking():
             # Format tracking items
             tracking_items = []
             for ticket in tickets:
-                # Collect all shipping tracking numbers
-                tracking_numbers = []
-
-                if ticket.shipping_tracking:
-                    tracking_numbers.append({
-                        'slot': 1,
-                        'tracking_number': ticket.shipping_tracking,
-                        'carrier': ticket.shipping_carrier,
-                        'status': ticket.shipping_status or 'Pending',
-                        'is_delivered': 'delivered' in (ticket.shipping_status or '').lower() or 'received' in (ticket.shipping_status or '').lower()
-                    })
-
-                if ticket.shipping_tracking_2:
-                    tracking_numbers.append({
-                        'slot': 2,
-                        'tracking_number': ticket.shipping_tracking_2,
-                        'carrier': ticket.shipping_carrier_2 if hasattr(ticket, 'shipping_carrier_2') else None,
-                        'status': ticket.shipping_status_2 or 'Pending',
-                        'is_delivered': 'delivered' in (ticket.shipping_status_2 or '').lower() or 'received' in (ticket.shipping_status_2 or '').lower()
-                    })
-
-                if ticket.shipping_tracking_3:
-                    tracking_numbers.append({
-                        'slot': 3,
-                        'tracking_number': ticket.shipping_tracking_3,
-                        'carrier': ticket.shipping_carrier_3 if hasattr(ticket, 'shipping_carrier_3') else None,
-                        'status': ticket.shipping_status_3 or 'Pending',
-                        'is_delivered': 'delivered' in (ticket.shipping_status_3 or '').lower() or 'received' in (ticket.shipping_status_3 or '').lower()
-                    })
-
-                if ticket.shipping_tracking_4:
-                    tracking_numbers.append({
-                        'slot': 4,
-                        'tracking_number': ticket.shipping_tracking_4,
-                        'carrier': ticket.shipping_carrier_4 if hasattr(ticket, 'shipping_carrier_4') else None,
-                        'status': ticket.shipping_status_4 or 'Pending',
-                        'is_delivered': 'delivered' in (ticket.shipping_status_4 or '').lower() or 'received' in (ticket.shipping_status_4 or '').lower()
-                    })
-
-                if ticket.shipping_tracking_5:
-                    tracking_numbers.append({
-                        'slot': 5,
-                        'tracking_number': ticket.shipping_tracking_5,
-                        'carrier': ticket.shipping_carrier_5 if hasattr(ticket, 'shipping_carrier_5') else None,
-                        'status': ticket.shipping_status_5 or 'Pending',
-                        'is_delivered': 'delivered' in (ticket.shipping_status_5 or '').lower() or 'received' in (ticket.shipping_status_5 or '').lower()
-                    })
-
                 tracking_items.append({
                     'ticket_id': ticket.id,
                     'display_id': ticket.display_id,
@@ -1292,7 +1324,7 @@ def get_outbound_tracking():
                     'category': ticket.category.value if ticket.category else None,
                     'customer_name': ticket.customer.name if ticket.customer else None,
                     'shipping_address': ticket.shipping_address,
-                    'tracking_numbers': tracking_numbers,
+                    'tracking_numbers': get_outbound_tracking_numbers(ticket),
                     'created_at': ticket.created_at.isoformat() if ticket.created_at else None,
                     'updated_at': ticket.updated_at.isoformat() if ticket.updated_at else None
                 })
@@ -2670,14 +2702,14 @@ def upload_asset_image(asset_id):
     Returns:
         {
             "success": true,
-            "image_url": "/static/uploads/assets/asset_123_timestamp.jpg",
+            "image_url": "/static/uploads/assets/<sha256>.jpg",
+            "thumbnails": {"list": "...", "detail": "...", "retina": "..."},
             "message": "Image uploaded successfully"
         }
     """
     try:
         import os
         import base64
-        import uuid
 
         user = request.current_mobile_user
 
@@ -2691,11 +2723,6 @@ def upload_asset_image(asset_id):
                     'error': 'Asset not found'
                 }), 404
 
-            # Determine upload directory
-            from flask import current_app
-            upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'assets')
-            os.makedirs(upload_folder, exist_ok=True)
-
             image_data = None
             content_type = 'image/jpeg'
             filename_ext = 'jpg'
@@ -2754,28 +2781,9 @@ def upload_asset_image(asset_id):
                     'error': 'Image too large (max 10MB)'
                 }), 400
 
-            # Generate unique filename
-            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"asset_{asset_id}_{timestamp}_{unique_id}.{filename_ext}"
-            filepath = os.path.join(upload_folder, filename)
-
-            # Delete old image if exists
-            if asset.image_url:
-                old_path = os.path.join(current_app.root_path, asset.image_url.lstrip('/'))
-                if os.path.exists(old_path):
-                    try:
-                        os.remove(old_path)
-                    except Exception:
-                        pass
-
-            # Save new image
-            with open(filepath, 'wb') as f:
-                f.write(image_data)
-
-            # Update asset with image URL
-            image_url = f"/static/uploads/assets/{filename}"
-            asset.image_url = image_url
+            # Store by content hash (identical photos are kept once) and
+            # render thumbnails in the background
+            image_url = save_uploaded_image(db_session, asset, image_data, filename_ext, 'assets')
             asset.updated_at = datetime.utcnow()
             db_session.commit()
 
@@ -2785,6 +2793,7 @@ def upload_asset_image(asset_id):
                 'success': True,
                 'message': 'Image uploaded successfully',
                 'image_url': get_full_image_url(image_url),
+                'thumbnails': get_image_thumbnails(asset),  # {} while the worker renders them
                 'asset_id': asset_id
             })
 
@@ -2834,6 +2843,7 @@ def get_asset_image(asset_id):
             return jsonify({
                 'success': True,
                 'image_url': get_asset_image_url(asset),
+                'thumbnails': get_image_thumbnails(asset),
                 'has_image': bool(asset.image_url or get_asset_image_url(asset)),
                 'asset_id': asset_id
             })
@@ -2885,17 +2895,12 @@ def delete_asset_image(asset_id):
                     'error': 'Asset has no image'
                 }), 400
 
-            # Delete file from disk
-            from flask import current_app
-            filepath = os.path.join(current_app.root_path, asset.image_url.lstrip('/'))
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception:
-                    pass
+            # Delete file from disk (kept while other items share the same image)
+            release_uploaded_image(db_session, asset)
 
             # Clear image URL in database
             asset.image_url = None
+            asset.image_sha256 = None
             asset.updated_at = datetime.utcnow()
             db_session.commit()
 
@@ -2993,31 +2998,14 @@ def get_accessories():
 
             # Apply pagination
             offset = (page - 1) * limit
-            accessories = query.order_by(Accessory.created_at.desc()).offset(offset).limit(limit).all()
+            accessories = query.options(
+                selectinload(Accessory.image_renditions)
+            ).order_by(Accessory.created_at.desc()).offset(offset).limit(limit).all()
 
             # Format accessories for mobile
             accessory_list = []
             for accessory in accessories:
-                accessory_data = {
-                    'id': accessory.id,
-                    'name': accessory.name,
-                    'category': accessory.category,
-                    'manufacturer': accessory.manufacturer,
-                    'model_no': accessory.model_no,
-                    'total_quantity': accessory.total_quantity,
-                    'available_quantity': accessory.available_quantity,
-                    'country': accessory.country,
-                    'status': accessory.status,
-                    'notes': accessory.notes,
-                    'image_url': get_full_image_url(accessory.image_url),
-                    'company': {
-                        'id': accessory.company.id,
-                        'name': accessory.company.name
-                    } if accessory.company else None,
-                    'created_at': accessory.created_at.isoformat() if accessory.created_at else None,
-                    'updated_at': accessory.updated_at.isoformat() if accessory.updated_at else None
-                }
-                accessory_list.append(accessory_data)
+                accessory_list.append(serialize_accessory_summary(accessory))
 
             pages = (total + limit - 1) // limit
 
@@ -3207,14 +3195,14 @@ def upload_accessory_image(accessory_id):
     Returns:
         {
             "success": true,
-            "image_url": "/static/uploads/accessories/accessory_123_timestamp.jpg",
+            "image_url": "/static/uploads/accessories/<sha256>.jpg",
+            "thumbnails": {"list": "...", "detail": "...", "retina": "..."},
             "message": "Image uploaded successfully"
         }
     """
     try:
         import os
         import base64
-        import uuid
 
         user = request.current_mobile_user
 
@@ -3228,11 +3216,6 @@ def upload_accessory_image(accessory_id):
                     'error': 'Accessory not found'
                 }), 404
 
-            # Determine upload directory
-            from flask import current_app
-            upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'accessories')
-            os.makedirs(upload_folder, exist_ok=True)
-
             image_data = None
             content_type = 'image/jpeg'
             filename_ext = 'jpg'
@@ -3289,28 +3272,9 @@ def upload_accessory_image(accessory_id):
                     'error': 'Image too large (max 10MB)'
                 }), 400
 
-            # Generate unique filename
-            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"accessory_{accessory_id}_{timestamp}_{unique_id}.{filename_ext}"
-            filepath = os.path.join(upload_folder, filename)
-
-            # Delete old image if exists
-            if accessory.image_url:
-                old_path = os.path.join(current_app.root_path, accessory.image_url.lstrip('/'))
-                if os.path.exists(old_path):
-                    try:
-                        os.remove(old_path)
-                    except Exception:
-                        pass
-
-            # Save new image
-            with open(filepath, 'wb') as f:
-                f.write(image_data)
-
-            # Update accessory with image URL
-            image_url = f"/static/uploads/accessories/{filename}"
-            accessory.image_url = image_url
+            # Store by content hash (identical photos are kept once) and
+            # render thumbnails in the background
+            image_url = save_uploaded_image(db_session, accessory, image_data, filename_ext, 'accessories')
             accessory.updated_at = datetime.utcnow()
             db_session.commit()
 
@@ -3320,6 +3284,7 @@ def upload_accessory_image(accessory_id):
                 'success': True,
                 'message': 'Image uploaded successfully',
                 'image_url': get_full_image_url(image_url),
+                'thumbnails': get_image_thumbnails(accessory),  # {} while the worker renders them
                 'accessory_id': accessory_id
             })
 
@@ -3369,6 +3334,7 @@ def get_accessory_image(accessory_id):
             return jsonify({
                 'success': True,
                 'image_url': get_full_image_url(accessory.image_url),
+                'thumbnails': get_image_thumbnails(accessory),
                 'has_image': bool(accessory.image_url),
                 'accessory_id': accessory_id
             })
@@ -3420,17 +3386,12 @@ def delete_accessory_image(accessory_id):
                     'error': 'Accessory has no image'
                 }), 400
 
-            # Delete file from disk
-            from flask import current_app
-            filepath = os.path.join(current_app.root_path, accessory.image_url.lstrip('/'))
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception:
-                    pass
+            # Delete file from disk (kept while other items share the same image)
+            release_uploaded_image(db_session, accessory)
 
             # Clear image URL in database
             accessory.image_url = None
+            accessory.image_sha256 = None
             accessory.updated_at = datetime.utcnow()
             db_session.commit()
 
@@ -4066,58 +4027,6 @@ def get_attachment_url(attachment):
     return f"{base_url}/tickets/{attachment.ticket_id}/attachments/{attachment.id}/download"
 
 
-def generate_thumbnail(image_path, thumbnail_path, size=(200, 200)):
-    """Generate a thumbnail for an image"""
-    try:
-        from PIL import Image
-
-        with Image.open(image_path) as img:
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-
-            img.thumbnail(size, Image.Resampling.LANCZOS)
-            img.save(thumbnail_path, 'JPEG', quality=85)
-            return True
-    except Exception as e:
-        logger.warning(f"Failed to generate thumbnail: {e}")
-        return False
-
-
-def generate_pdf_thumbnail(pdf_path, thumbnail_path, size=(200, 200)):
-    """Generate a thumbnail from the first page of a PDF"""
-    try:
-        from PIL import Image
-        import fitz  # PyMuPDF
-
-        # Open PDF and get first page
-        doc = fitz.open(pdf_path)
-        if len(doc) == 0:
-            return False
-
-        page = doc[0]
-
-        # Render page to image (72 dpi is default, use higher for better quality)
-        mat = fitz.Matrix(2, 2)  # 2x zoom for better quality
-        pix = page.get_pixmap(matrix=mat)
-
-        # Convert to PIL Image
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-        # Create thumbnail
-        img.thumbnail(size, Image.Resampling.LANCZOS)
-        img.save(thumbnail_path, 'JPEG', quality=85)
-
-        doc.close()
-        return True
-    except ImportError:
-        logger.warning("PyMuPDF (fitz) not installed, skipping PDF thumbnail generation")
-        return False
-    except Exception as e:
-        logger.warning(f"Failed to generate PDF thumbnail: {e}")
-        return False
-
-
 def validate_pdf_magic_bytes(file_data):
     """Validate that file data starts with PDF magic bytes"""
     return file_data[:5] == b'%PDF-'
@@ -4189,14 +4098,6 @@ def upload_ticket_attachment(ticket_id):
                     'error': f'Unsupported file type. Allowed: {", ".join(ALLOWED_ATTACHMENT_EXTENSIONS).upper()}'
                 }), 415
 
-            # Read file data and check size
-            file_data = file.read()
-            if len(file_data) > MAX_ATTACHMENT_SIZE:
-                return jsonify({
-                    'success': False,
-                    'error': 'File too large. Maximum size is 10MB.'
-                }), 413
-
             # Determine file extension and content type
             original_filename = secure_filename(file.filename)
             file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else 'bin'
@@ -4204,7 +4105,9 @@ def upload_ticket_attachment(ticket_id):
 
             # Validate PDF magic bytes if file claims to be PDF
             if file_extension == 'pdf' or content_type == 'application/pdf':
-                if not validate_pdf_magic_bytes(file_data):
+                header = file.stream.read(5)
+                file.stream.seek(0)
+                if not validate_pdf_magic_bytes(header):
                     return jsonify({
                         'success': False,
                         'error': 'Invalid or corrupted PDF file'
@@ -4215,7 +4118,6 @@ def upload_ticket_attachment(ticket_id):
             # Create upload directory
             from flask import current_app
             upload_folder = os.path.join(current_app.root_path, 'uploads', 'tickets', str(ticket_id))
-            os.makedirs(upload_folder, exist_ok=True)
 
             # Generate unique filename
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
@@ -4223,22 +4125,14 @@ def upload_ticket_attachment(ticket_id):
             filename = f"{ticket_id}_{timestamp}_{unique_id}.{file_extension}"
             file_path = os.path.join(upload_folder, filename)
 
-            # Save file
-            with open(file_path, 'wb') as f:
-                f.write(file_data)
-
-            # Generate thumbnail for images and PDFs
-            thumbnail_path = None
-            thumbnail_url = None
-            thumb_filename = f"thumb_{filename.rsplit('.', 1)[0]}.jpg"  # Always save as jpg
-            thumbnail_path = os.path.join(upload_folder, thumb_filename)
-
-            if file_extension.lower() in ('jpg', 'jpeg', 'png', 'gif'):
-                if generate_thumbnail(file_path, thumbnail_path):
-                    thumbnail_url = f"/uploads/tickets/{ticket_id}/{thumb_filename}"
-            elif file_extension.lower() == 'pdf':
-                if generate_pdf_thumbnail(file_path, thumbnail_path):
-                    thumbnail_url = f"/uploads/tickets/{ticket_id}/{thumb_filename}"
+            # Stream to disk in chunks, hashing as we go
+            try:
+                file_size, content_sha256 = stream_to_file(file.stream, file_path, max_bytes=MAX_ATTACHMENT_SIZE)
+            except UploadTooLargeError:
+                return jsonify({
+                    'success': False,
+                    'error': 'File too large. Maximum size is 10MB.'
+                }), 413
 
             # Create attachment record
             attachment = TicketAttachment(
@@ -4246,12 +4140,18 @@ def upload_ticket_attachment(ticket_id):
                 filename=original_filename,
                 file_path=file_path,
                 file_type=file_extension,
-                file_size=len(file_data),
+                file_size=file_size,
+                content_sha256=content_sha256,
                 uploaded_by=user.id
             )
             db_session.add(attachment)
             db_session.commit()
 
+            # Thumbnails / PDF preview are rendered in the background; identical
+            # content uploaded before already has them
+            queue_renditions(db_session, file_path, content_sha256, source_type_for(file_extension))
+            thumbnails = attachment.thumbnail_urls(attachment_rendition_prefix(attachment))
+
             # Build response
             attachment_url = f"/uploads/tickets/{ticket_id}/{filename}"
             base_url = request.host_url.rstrip('/')
@@ -4268,7 +4168,9 @@ def upload_ticket_attachment(ticket_id):
                     'content_type': content_type,
                     'size': attachment.file_size,
                     'url': f"{base_url}{attachment_url}",
-                    'thumbnail_url': f"{base_url}{thumbnail_url}" if thumbnail_url else None,
+                    'thumbnail_url': f"{base_url}{thumbnails['list']}" if 'list' in thumbnails else None,
+                    'thumbnails': {name: f"{base_url}{url}" for name, url in thumbnails.items()},
+                    'thumbnails_pending': not thumbnails and source_type_for(file_extension) is not None,
                     'created_at': attachment.created_at.isoformat() + 'Z' if attachment.created_at else None
                 }
             }), 201
@@ -4322,9 +4224,10 @@ def get_ticket_attachments(ticket_id):
                     'error': 'Ticket not found'
                 }), 404
 
-            # Get attachments with uploader info
+            # Get attachments with uploader info and renditions
             attachments = db_session.query(TicketAttachment).options(
-                joinedload(TicketAttachment.uploader)
+                joinedload(TicketAttachment.uploader),
+                selectinload(TicketAttachment.renditions)
             ).filter(
                 TicketAttachment.ticket_id == ticket_id
             ).order_by(TicketAttachment.created_at.desc()).all()
@@ -4338,16 +4241,9 @@ def get_ticket_attachments(ticket_id):
                     filename = os.path.basename(att.file_path) if att.file_path else None
                     attachment_url = f"/uploads/tickets/{ticket_id}/{filename}" if filename else None
 
-                    # Check for thumbnail (images and PDFs)
-                    thumbnail_url = None
+                    # Thumbnails come from the rendition rows, no filesystem checks
+                    thumbnails = att.thumbnail_urls(attachment_rendition_prefix(att))
                     file_type_lower = att.file_type.lower() if att.file_type else None
-                    if file_type_lower in ('jpg', 'jpeg', 'png', 'gif', 'pdf') and filename:
-                        # Thumbnail is always .jpg
-                        base_filename = filename.rsplit('.', 1)[0] if '.' in filename else filename
-                        thumb_filename = f"thumb_{base_filename}.jpg"
-                        thumb_path = os.path.join(os.path.dirname(att.file_path), thumb_filename) if att.file_path else None
-                        if thumb_path and os.path.exists(thumb_path):
-                            thumbnail_url = f"/uploads/tickets/{ticket_id}/{thumb_filename}"
 
                     # Determine content type
                     content_type_map = {
@@ -4371,7 +4267,8 @@ def get_ticket_attachments(ticket_id):
                         'content_type': content_type,
                         'size': att.file_size,
                         'url': f"{base_url}{attachment_url}" if attachment_url else None,
-                        'thumbnail_url': f"{base_url}{thumbnail_url}" if thumbnail_url else None,
+                        'thumbnail_url': f"{base_url}{thumbnails['list']}" if 'list' in thumbnails else None,
+                        'thumbnails': {name: f"{base_url}{url}" for name, url in thumbnails.items()},
                         'created_at': att.created_at.isoformat() + 'Z' if att.created_at else None,
                         'uploaded_by': {
                             'id': att.uploader.id,
@@ -4516,7 +4413,7 @@ def download_ticket_attachment(ticket_id, attachment_id):
         - 404: Ticket or attachment not found
         - 500: Server error
     """
-    from flask import send_file
+    from utils.file_delivery import send_protected_file
     from models.ticket_attachment import TicketAttachment
     from models.intake_ticket import IntakeAttachment
     from models.ticket import Ticket
@@ -4571,11 +4468,11 @@ def download_ticket_attachment(ticket_id, attachment_id):
 
             logger.info(f"Serving attachment {attachment_id} for ticket {ticket_id}: {attachment.filename}")
 
-            return send_file(
+            return send_protected_file(
                 attachment.file_path,
+                download_name=attachment.filename,
                 mimetype=content_type,
-                as_attachment=True,
-                download_name=attachment.filename
+                etag=getattr(attachment, 'content_sha256', None)  # Intake attachments have no hash
             )
 
         finally:
@@ -4591,6 +4488,54 @@ def download_ticket_attachment(ticket_id, attachment_id):
         }), 500
 
 
+def attachment_rendition_prefix(attachment):
+    """URL prefix of the mobile rendition endpoint for a ticket attachment"""
+    return f"{mobile_api_bp.url_prefix}/tickets/{attachment.ticket_id}/attachments/{attachment.id}/renditions"
+
+
+@mobile_api_bp.route('/tickets/<int:ticket_id>/attachments/<int:attachment_id>/renditions/<size_name>', methods=['GET'])
+@mobile_auth_required
+def get_ticket_attachment_rendition(ticket_id, attachment_id, size_name):
+    """
+    Thumbnail / PDF preview of a ticket attachment (JPEG).
+
+    GET /api/mobile/v1/tickets/<ticket_id>/attachments/<attachment_id>/renditions/<list|detail|retina>
+    Headers: Authorization: Bearer <token>
+
+    Error responses:
+        - 403: The user cannot see the ticket
+        - 404: Attachment or rendition not found (not rendered yet)
+    """
+    from utils.file_delivery import send_protected_file
+    from utils.media_pipeline import find_rendition
+    from utils.ticket_grid import can_view_ticket
+    from models.ticket_attachment import TicketAttachment
+
+    db_session = db_manager.get_session()
+    try:
+        attachment = db_session.query(TicketAttachment).filter(
+            TicketAttachment.id == attachment_id,
+            TicketAttachment.ticket_id == ticket_id
+        ).first()
+        if not attachment or not attachment.content_sha256:
+            return jsonify({'success': False, 'error': 'Attachment not found'}), 404
+        user = db_session.query(User).get(request.current_mobile_user.id)
+        if not can_view_all_tickets(user) and not can_view_ticket(db_session, user, ticket_id):
+            return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+        rendition = find_rendition(db_session, attachment.content_sha256, size_name)
+        if not rendition:
+            return jsonify({'success': False, 'error': 'Preview not found'}), 404
+        return send_protected_file(
+            rendition.file_path,
+            as_attachment=False,
+            mimetype='image/jpeg',
+            etag=f"{rendition.content_sha256}-{size_name}"
+        )
+    finally:
+        db_session.close()
+
+
 # =============================================================================
 # Asset Intake Check-in Endpoints
 # =============================================================================
@@ -5317,9 +5262,9 @@ def mobile_create_assets_from_text(ticket_id):
             if not ticket:
                 return jsonify({'success': False, 'error': 'Ticket not found'}), 404
 
-            # Use ticket's company if not provided
-            if not company_id:
-                company_id = ticket.company_id
+            # Use the ticket customer's company if not provided
+            if not company_id and ticket.customer:
+                company_id = ticket.customer.company_id
 
             # Extract assets from text
             from utils.pdf_extractor import extract_assets_from_text
@@ -5331,70 +5276,42 @@ def mobile_create_assets_from_text(ticket_id):
                     'error': 'No assets could be extracted from the provided text'
                 }), 400
 
-            # Generate asset tags if not provided
-            import re
-            if not provided_tags or len(provided_tags) < len(assets_data):
-                # Find highest existing SG-XXXX tag
-                existing_tags = db_session.query(Asset.asset_tag).filter(
-                    Asset.asset_tag.like('SG-%')
-                ).all()
-
-                max_num = 0
-                for (tag,) in existing_tags:
-                    if tag:
-                        match = re.match(r'SG-(\d+)', tag)
-                        if match:
-                            num = int(match.group(1))
-                            if num > max_num:
-                                max_num = num
-
-                # Generate sequential tags starting from max + 1
-                generated_tags = []
-                current_num = max_num + 1
-                for i in range(len(assets_data)):
-                    if i < len(provided_tags):
-                        generated_tags.append(provided_tags[i])
-                    else:
-                        generated_tags.append(f"SG-{current_num}")
-                        current_num += 1
-                provided_tags = generated_tags
-
-            # Create assets
-            created_assets = []
-            for i, asset_data in enumerate(assets_data):
-                asset = Asset(
-                    name=asset_data.get('name', 'MacBook'),
-                    model=asset_data.get('model', ''),
-                    manufacturer=asset_data.get('manufacturer', 'Apple'),
-                    serial_num=asset_data.get('serial_num', ''),
-                    asset_tag=provided_tags[i] if i < len(provided_tags) else f"SG-{max_num + i + 1}",
-                    category=asset_data.get('category', 'Laptop'),
-                    cpu_type=asset_data.get('cpu_type', ''),
-                    cpu_cores=asset_data.get('cpu_cores', ''),
-                    gpu_cores=asset_data.get('gpu_cores', ''),
-                    memory=asset_data.get('memory', ''),
-                    harddrive=asset_data.get('harddrive', ''),
-                    hardware_type=asset_data.get('hardware_type', 'Laptop'),
-                    condition=asset_data.get('condition', 'New'),
-                    company_id=company_id,
-                    status=AssetStatus.AVAILABLE,
-                    created_by_id=user.id
-                )
-                db_session.add(asset)
-                db_session.flush()  # Get the asset ID
-
-                # Link asset to ticket
-                ticket.assets.append(asset)
-
-                created_assets.append({
-                    'id': asset.id,
-                    'serial_num': asset.serial_num,
-                    'name': asset.name,
-                    'model': asset.model,
-                    'asset_tag': asset.asset_tag
-                })
-
-            db_session.commit()
+            # Provided tags are used in order; the rest are allocated as one block
+            records = [{
+                'name': asset_data.get('name', 'MacBook'),
+                'model': asset_data.get('model', ''),
+                'manufacturer': asset_data.get('manufacturer', 'Apple'),
+                'serial_num': asset_data.get('serial_num', ''),
+                'asset_tag': provided_tags[i] if i < len(provided_tags) else None,
+                'category': asset_data.get('category', 'Laptop'),
+                'cpu_type': asset_data.get('cpu_type', ''),
+                'cpu_cores': asset_data.get('cpu_cores', ''),
+                'gpu_cores': asset_data.get('gpu_cores', ''),
+                'memory': asset_data.get('memory', ''),
+                'harddrive': asset_data.get('harddrive', ''),
+                'hardware_type': asset_data.get('hardware_type', 'Laptop'),
+                'condition': asset_data.get('condition', 'New'),
+                'company_id': company_id,
+                'status': AssetStatus.IN_STOCK
+            } for i, asset_data in enumerate(assets_data)]
+
+            from utils.asset_ingest import AssetIngest
+            result = AssetIngest(
+                db_session,
+                user_id=user.id,
+                ticket_id=ticket.id,
+                tag_prefix='SG-',
+                history_notes=f"Created from mobile OCR text by {user.username}"
+            ).ingest(records)
+
+            created_assets = [{
+                'id': created['id'],
+                'serial_num': created['serial_num'],
+                'name': created['name'],
+                'model': created['model'],
+                'asset_tag': created['asset_tag']
+            } for created in result['created']]
+            errors = result['errors']
 
             logger.info(f"Mobile API: User {user.username} created {len(created_assets)} assets from OCR text for ticket {ticket_id}")
 
@@ -5402,6 +5319,8 @@ def mobile_create_assets_from_text(ticket_id):
                 'success': True,
                 'created_assets': created_assets,
                 'count': len(created_assets),
+                'error_count': len(errors),
+                'errors': errors,
                 'ticket_id': ticket_id,
                 'ticket_display_id': ticket.display_id,
                 'message': f'Successfully created {len(created_assets)} asset{"s" if len(created_assets) != 1 else ""} and linked to ticket {ticket.display_id}'
@@ -5502,31 +5421,20 @@ def mobile_get_next_asset_tag():
         prefix = request.args.get('prefix', 'SG-')
         count = min(int(request.args.get('count', 1)), 200)  # Max 200 tags
 
-        import re
+        from utils.asset_tag_allocator import AssetTagAllocator, AssetTagAllocationError
 
         db_session = db_manager.get_session()
         try:
-            # Find highest existing tag with this prefix
             # Handle both "SG-" and "SG" prefixes
             clean_prefix = prefix.rstrip('-')
 
-            existing_tags = db_session.query(Asset.asset_tag).filter(
-                Asset.asset_tag.like(f'{clean_prefix}-%')
-            ).all()
-
-            max_num = 0
-            for (tag,) in existing_tags:
-                if tag:
-                    match = re.match(rf'{re.escape(clean_prefix)}-(\d+)', tag)
-                    if match:
-                        num = int(match.group(1))
-                        if num > max_num:
-                            max_num = num
-
-            next_number = max_num + 1
-
-            # Generate the requested number of tags
-            tags = [f"{clean_prefix}-{next_number + i}" for i in range(count)]
+            # Suggestions only: the tags are claimed when the assets are created
+            try:
+                tags = AssetTagAllocator.peek_tags(db_session, f"{clean_prefix}-", max(count, 1))
+            except AssetTagAllocationError as e:
+                logger.warning(f"Error getting next asset tag for mobile: {str(e)}")
+                return jsonify({'success': False, 'error': 'No free asset tags found. Please enter the tags manually.'}), 409
+            next_number = int(tags[0][len(clean_prefix) + 1:])
 
             return jsonify({
                 'success': True,
@@ -5614,82 +5522,47 @@ def mobile_create_assets_bulk():
                 if not ticket:
                     return jsonify({'success': False, 'error': f'Ticket {ticket_id} not found'}), 404
 
-            created_assets = []
-            errors = []
-
-            for asset_data in assets_data:
-                try:
-                    serial_num = asset_data.get('serial_num', '').strip()
-                    asset_tag = asset_data.get('asset_tag', '').strip()
-
-                    if not serial_num:
-                        errors.append({'error': 'Missing serial number', 'data': asset_data})
-                        continue
-
-                    # Check for duplicate serial
-                    existing_serial = db_session.query(Asset).filter(Asset.serial_num == serial_num).first()
-                    if existing_serial:
-                        errors.append({
-                            'error': f'Serial {serial_num} already exists (Asset #{existing_serial.id})',
-                            'serial_num': serial_num
-                        })
-                        continue
-
-                    # Check for duplicate asset tag
-                    if asset_tag:
-                        existing_tag = db_session.query(Asset).filter(Asset.asset_tag == asset_tag).first()
-                        if existing_tag:
-                            errors.append({
-                                'error': f'Asset tag {asset_tag} already exists (Asset #{existing_tag.id})',
-                                'asset_tag': asset_tag
-                            })
-                            continue
-
-                    # Create the asset
-                    asset = Asset(
-                        serial_num=serial_num,
-                        asset_tag=asset_tag,
-                        name=asset_data.get('name', ''),
-                        model=asset_data.get('model', ''),
-                        manufacturer=asset_data.get('manufacturer', 'Apple'),
-                        category=asset_data.get('category', 'APPLE'),
-                        asset_type=asset_data.get('category', 'APPLE'),
-                        cpu_type=asset_data.get('cpu_type', ''),
-                        cpu_cores=asset_data.get('cpu_cores', ''),
-                        gpu_cores=asset_data.get('gpu_cores', ''),
-                        memory=asset_data.get('memory', ''),
-                        harddrive=asset_data.get('harddrive', ''),
-                        hardware_type=asset_data.get('hardware_type', ''),
-                        condition=asset_data.get('condition', 'New'),
-                        country=asset_data.get('country', 'Singapore'),
-                        company_id=company_id,
-                        status=AssetStatus.IN_STOCK,
-                        receiving_date=datetime.utcnow(),
-                        notes=f"Created via mobile app by {user.username}"
-                    )
-
-                    db_session.add(asset)
-                    db_session.flush()  # Get the asset ID
-
-                    # Link to ticket if provided
-                    if ticket:
-                        ticket.assets.append(asset)
-
-                    created_assets.append({
-                        'id': asset.id,
-                        'serial_num': asset.serial_num,
-                        'asset_tag': asset.asset_tag,
-                        'name': asset.name,
-                        'model': asset.model
-                    })
-
-                except Exception as e:
-                    errors.append({
-                        'error': str(e),
-                        'serial_num': asset_data.get('serial_num', 'unknown')
-                    })
-
-            db_session.commit()
+            records = [{
+                'serial_num': asset_data.get('serial_num', ''),
+                'asset_tag': asset_data.get('asset_tag', ''),
+                'name': asset_data.get('name', ''),
+                'model': asset_data.get('model', ''),
+                'manufacturer': asset_data.get('manufacturer', 'Apple'),
+                'category': asset_data.get('category', 'APPLE'),
+                'asset_type': asset_data.get('category', 'APPLE'),
+                'cpu_type': asset_data.get('cpu_type', ''),
+                'cpu_cores': asset_data.get('cpu_cores', ''),
+                'gpu_cores': asset_data.get('gpu_cores', ''),
+                'memory': asset_data.get('memory', ''),
+                'harddrive': asset_data.get('harddrive', ''),
+                'hardware_type': asset_data.get('hardware_type', ''),
+                'condition': asset_data.get('condition', 'New'),
+                'country': asset_data.get('country', 'Singapore'),
+                'company_id': company_id,
+                'status': AssetStatus.IN_STOCK,
+                'receiving_date': datetime.utcnow(),
+                'notes': f"Created via mobile app by {user.username}"
+            } for asset_data in assets_data]
+
+            # One duplicate lookup and one INSERT per batch; assets without a tag get SG- tags
+            from utils.asset_ingest import AssetIngest
+            result = AssetIngest(
+                db_session,
+                user_id=user.id,
+                ticket_id=ticket.id if ticket else None,
+                tag_prefix='SG-',
+                require_serial=True,
+                history_notes=f"Created via mobile app by {user.username}"
+            ).ingest(records)
+
+            created_assets = [{
+                'id': created['id'],
+                'serial_num': created['serial_num'],
+                'asset_tag': created['asset_tag'],
+                'name': created['name'],
+                'model': created['model']
+            } for created in result['created']]
+            errors = result['errors']
 
             logger.info(f"Mobile API: User {user.username} created {len(created_assets)} assets" +
                        (f" for ticket {ticket_id}" if ticket_id else ""))
@@ -5844,7 +5717,7 @@ def mobile_extract_assets_from_pdfs(ticket_id):
     from models.intake_ticket import IntakeTicket
     from models.ticket import Ticket
     from models.ticket_attachment import TicketAttachment
-    from utils.pdf_extractor import extract_assets_from_pdf
+    from utils.pdf_extraction_cache import PdfExtractionCache
 
     try:
         db_session = db_manager.get_session()
@@ -5883,7 +5756,7 @@ def mobile_extract_assets_from_pdfs(ticket_id):
 
             for attachment in pdf_attachments:
                 try:
-                    result = extract_assets_from_pdf(attachment.file_path)
+                    result = PdfExtractionCache.get_assets(db_session, attachment.file_path)
                     if result:
                         assets_data = []
                         for asset in result.get('assets', []):
@@ -6123,7 +5996,7 @@ def mobile_extract_single_pdf(attachment_id):
     """
     from models.intake_ticket import IntakeAttachment, IntakeTicket
     from models.ticket_attachment import TicketAttachment
-    from utils.pdf_extractor import extract_assets_from_pdf
+    from utils.pdf_extraction_cache import PdfExtractionCache
     from sqlalchemy.orm import joinedload
     import os
 
@@ -6180,7 +6053,7 @@ def mobile_extract_single_pdf(attachment_id):
 
             try:
                 with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(extract_assets_from_pdf, attachment.file_path)
+                    future = executor.submit(PdfExtractionCache.get_assets, db_session, attachment.file_path)
                     result = future.result(timeout=timeout_seconds)
             except FuturesTimeoutError:
                 logger.error(f"PDF extraction timed out after {timeout_seconds}s for {attachment.filename}")
@@ -6666,4 +6539,120 @@ def mobile_get_asset_service_records(asset_id):
         logger.error(f"Error getting asset service records via mobile API: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ============================================================
+# DELTA SYNC ENDPOINTS
+# ============================================================
+
+def serialize_ticket_sync(ticket):
+    """Ticket list fields plus the tracking the outbound/return screens show"""
+    data = serialize_ticket_summary(ticket)
+    data.update({
+        'shipping_address': ticket.shipping_address,
+        'tracking_numbers': get_outbound_tracking_numbers(ticket),
+        'return_tracking': ticket.return_tracking,
+        'return_status': ticket.return_status,
+    })
+    return data
+
+
+@mobile_api_bp.route('/sync/<entity>', methods=['GET'])
+@mobile_auth_required
+def sync_changes(entity):
+    """
+    Rows changed or deleted since a cursor
+
+    GET /api/mobile/v1/sync/tickets?cursor=<cursor>&limit=200
+    GET /api/mobile/v1/sync/assets?cursor=<cursor>
+    GET /api/mobile/v1/sync/accessories?cursor=<cursor>
+    Headers: Authorization: Bearer <token>
+
+    Omit cursor for a full sync. Upsert "changed" rows by id, then drop
+    "deleted" ids; keep requesting with the returned cursor while has_more
+    is true, and store the last cursor for the next pull-to-refresh.
+
+    Response: {
+        "success": true,
+        "entity": "tickets",
+        "changed": [...],
+        "deleted": [12, 15],
+        "cursor": "eyJ1Ijo...",
+        "has_more": false
+    }
+
+    Errors: 400 invalid_cursor; 410 cursor_expired (discard local data and
+    start a full sync)
+    """
+    from utils.delta_sync import sync_page, InvalidCursor, ExpiredCursor, DEFAULT_PAGE_SIZE
+
+    try:
+        user = request.current_mobile_user
+        cursor = request.args.get('cursor') or None
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+
+        db_session = db_manager.get_session()
+        try:
+            if entity == 'tickets':
+                model, serialize = Ticket, serialize_ticket_sync
+                query = db_session.query(Ticket).options(
+                    selectinload(Ticket.requester),
+                    selectinload(Ticket.assigned_to),
+                    selectinload(Ticket.queue),
+                    selectinload(Ticket.customer),
+                    selectinload(Ticket.assets)
+                )
+                if not can_view_all_tickets(user):
+                    query = query.filter(
+                        (Ticket.requester_id == user.id) |
+                        (Ticket.assigned_to_id == user.id)
+                    )
+            elif entity == 'assets':
+                if not user.permissions or not user.permissions.can_view_assets:
+                    return jsonify({
+                        'success': False,
+                        'error': 'No permission to view inventory'
+                    }), 403
+                model, serialize = Asset, serialize_asset_summary
+                query = db_session.query(Asset).options(
+                    selectinload(Asset.image_renditions),
+                    selectinload(Asset.location),
+                    selectinload(Asset.assigned_to),
+                    selectinload(Asset.customer_user)
+                )
+                if user.user_type == UserType.COUNTRY_ADMIN and user.assigned_countries:
+                    query = query.filter(Asset.country.in_(user.assigned_countries))
+            elif entity == 'accessories':
+                model, serialize = Accessory, serialize_accessory_summary
+                query = db_session.query(Accessory).options(
+                    selectinload(Accessory.image_renditions),
+                    selectinload(Accessory.company)
+                )
+            else:
+                return jsonify({'success': False, 'error': f'Unknown sync entity: {entity}'}), 404
+
+            try:
+                page = sync_page(db_session, query, model, cursor=cursor, limit=limit)
+            except ExpiredCursor:
+                return jsonify({'success': False, 'error': 'cursor_expired'}), 410
+            except InvalidCursor:
+                return jsonify({'success': False, 'error': 'invalid_cursor'}), 400
+
+            return jsonify({
+                'success': True,
+                'entity': entity,
+                'changed': [serialize(row) for row in page['changed']],
+                'deleted': page['deleted'],
+                'cursor': page['cursor'],
+                'has_more': page['has_more']
+            })
+
+        finally:
+            db_session.close()
+
+    except Exception as e:
+        logger.error(f"Delta sync error ({entity}): {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to sync changes'
+        }), 500
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 import json
 import logging
 from database import SessionLocal
+from utils.cache import cached_view
 from models import (
     Ticket, Asset, AssetTransaction, AccessoryTransaction,
     User, Company, CustomerUser, TicketStatus, TicketPriority,
@@ -473,6 +474,7 @@ def case_reports_builder():
 @reports_bp.route('/api/filters')
 @login_required
 @permission_required('can_view_reports')
+@cached_view(tags=('tickets', 'customers', 'users'))
 def get_available_filters():
     """Get all available filter options with counts"""
     db = SessionLocal()
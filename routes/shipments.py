@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from utils.shipment_store import ShipmentStore
+from utils.store_instances import shipment_store
 from utils.shipment_tracker import ShipmentTracker
 from utils.singpost_tracking import get_singpost_tracking_client
 from utils.auth_decorators import login_required, admin_required
@@ -15,7 +15,6 @@ logger = logging.getLogger(__name__)
 
 
 shipments_bp = Blueprint('shipments', __name__, url_prefix='/shipments')
-shipment_store = ShipmentStore()
 shipment_tracker = ShipmentTracker()
 
 # Initialize SingPost Tracking API client
@@ -24,7 +24,6 @@ from werkzeug.utils import secure_filename
 from models.customer_user import CustomerUser
 from models.ticket_attachment import TicketAttachment as Attachment
 import requests
-from bs4 import BeautifulSoup
 import sys
 import uuid
 from config import TRACKINGMORE_API_KEY
@@ -42,7 +41,7 @@ from utils.tracking_cache import TrackingCache
 import re
 from models.tracking_history import TrackingHistory
 from models.tracking_refresh_log import TrackingRefreshLog
-from utils.singpost_tracking import get_singpost_tracking_client
+from utils.singpost_tracking import get_singpost_tracking_client, is_singpost_tracking_number
 
 # Initialize SingPost Tracking client
 singpost_client = get_singpost_tracking_client()
@@ -52,6 +51,9 @@ from models.company import Company
 from models.activity import Activity
 from models.accessory import Accessory
 from models.accessory_transaction import AccessoryTransaction
+from utils.accessory_stock import AccessoryStock, InsufficientStockError
+from utils.file_delivery import send_protected_file
+from utils.ticket_rules import apply_rules
 from models.queue import Queue
 import time
 import csv
@@ -249,48 +251,11 @@ def list_tickets():
     user_id = session['user_id']
     user = db_manager.get_user(user_id)
 
-    # Get date filter parameters
-    from datetime import datetime
+    # Rows are fetched in windows from /tickets/grid (utils/ticket_grid.py);
+    # the date filter is passed through to it
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
 
-    # Get queue IDs for filtering (for COUNTRY_ADMIN/SUPERVISOR)
-    queue_ids = None
-    if not user.is_super_admin and not user.is_developer:
-        accessible_queue_ids = user.get_accessible_queue_ids()
-        queue_ids = accessible_queue_ids
-        logging.info(f"Will filter by {len(queue_ids) if queue_ids else 0} queue IDs in database query")
-
-    # Get tickets based on user type with queue filter applied in database (MUCH faster!)
-    tickets = ticket_store.get_user_tickets(user_id, user.user_type, queue_ids=queue_ids)
-    logging.info(f"Got {len(tickets)} tickets from get_user_tickets (already filtered by queue in database)")
-
-    # Apply date filtering if date parameters are provided
-    if date_from or date_to:
-        filtered_by_date = []
-        for ticket in tickets:
-            # Parse dates
-            if date_from:
-                try:
-                    from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-                    if ticket.created_at.date() < from_date:
-                        continue
-                except ValueError:
-                    pass  # Invalid date format, skip filter
-
-            if date_to:
-                try:
-                    to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-                    if ticket.created_at.date() > to_date:
-                        continue
-                except ValueError:
-                    pass  # Invalid date format, skip filter
-
-            filtered_by_date.append(ticket)
-
-        tickets = filtered_by_date
-        logging.info(f"Applied date filter: {date_from} to {date_to}, {len(tickets)} tickets match")
-
     # Get queues for the filter dropdown, filtered by user permissions
     from models.queue import Queue
     from models.ticket import Ticket
@@ -310,18 +275,13 @@ def list_tickets():
             accessible_queue_ids = [q[0] for q in queue_permissions]
             logging.info(f"User {user.id} has access to {len(accessible_queue_ids)} queues")
 
-        # Query queues with ticket count, sorted by count descending
-        queues_with_counts = db_session.query(
-            Queue,
-            func.count(Ticket.id).label('ticket_count')
-        ).outerjoin(
-            Ticket, Queue.id == Ticket.queue_id
-        ).group_by(
-            Queue.id
-        ).order_by(
-            func.count(Ticket.id).desc(),
-            Queue.name
-        ).all()
+        # Queues sorted by ticket count descending (counts from the ticket_counts summary)
+        from utils.ticket_counters import queue_totals
+        totals = queue_totals(db_session)
+        queues_with_counts = sorted(
+            ((queue, totals.get(queue.id, {}).get('total', 0)) for queue in db_session.query(Queue).all()),
+            key=lambda item: (-item[1], item[0].name or '')
+        )
 
         # Filter queues based on user permissions
         if user.is_super_admin or user.is_developer:
@@ -348,25 +308,11 @@ def list_tickets():
 
     # Calculate queue ticket counts (show all tickets in queue, not filtered by user)
     # This matches the behavior of the home page queue cards
+    from utils.ticket_counters import queue_totals
     db_session = db_manager.get_session()
-    queue_ticket_counts = {}
     try:
-        for queue in queues:
-            # Count ALL tickets for this queue
-            total_count = db_session.query(Ticket).filter(Ticket.queue_id == queue.id).count()
-
-            # Count OPEN tickets (non-resolved)
-            from models.ticket import TicketStatus
-            open_count = db_session.query(Ticket).filter(
-                Ticket.queue_id == queue.id,
-                Ticket.status != TicketStatus.RESOLVED,
-                Ticket.status != TicketStatus.RESOLVED_DELIVERED
-            ).count()
-
-            queue_ticket_counts[queue.id] = {
-                'total': total_count,
-                'open': open_count
-            }
+        totals = queue_totals(db_session, [queue.id for queue in queues])
+        queue_ticket_counts = {queue.id: totals.get(queue.id, {'total': 0, 'open': 0}) for queue in queues}
     finally:
         db_session.close()
 
@@ -383,7 +329,7 @@ def list_tickets():
     finally:
         db_session.close()
 
-    return render_template('tickets/list.html', tickets=tickets, user=user, queues=queues, queue_ticket_counts=queue_ticket_counts, custom_statuses=custom_statuses_list)
+    return render_template('tickets/list.html', user=user, queues=queues, queue_ticket_counts=queue_ticket_counts, custom_statuses=custom_statuses_list, export_filter_options=_export_filter_options(queues), date_from=date_from, date_to=date_to)
 
 
 @tickets_bp.route('/sf')
@@ -393,58 +339,17 @@ def list_tickets_sf():
     user_id = session['user_id']
     user = db_manager.get_user(user_id)
 
-    # Get date filter parameters
-    from datetime import datetime
+    # Rows are fetched in windows from /tickets/grid (utils/ticket_grid.py);
+    # the date filter is passed through to it
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
 
-    # Get tickets based on user type (use enum, not session string value)
-    logging.info(f"DEBUG SF - user_id: {user_id}, user.user_type: {user.user_type}, type: {type(user.user_type)}")
-    logging.info(f"DEBUG SF - is_super_admin: {user.is_super_admin}, is_developer: {user.is_developer}")
-
-    # Get queue IDs for filtering (for COUNTRY_ADMIN/SUPERVISOR)
     queue_ids = None
     if not user.is_super_admin and not user.is_developer:
-        accessible_queue_ids = user.get_accessible_queue_ids()
-        queue_ids = accessible_queue_ids
-        logging.info(f"DEBUG SF - Will filter by {len(queue_ids) if queue_ids else 0} queue IDs in database query")
-
-    # Get tickets with queue filter applied in database (MUCH faster!)
-    # Default: load latest 500 tickets for fast page load. Use show_all=true to load all.
-    show_all = request.args.get('show_all', 'false').lower() == 'true'
-    ticket_limit = None if show_all else 500
-    tickets = ticket_store.get_user_tickets(user_id, user.user_type, queue_ids=queue_ids, limit=ticket_limit)
-    tickets_capped = not show_all and len(tickets) >= 500
-    logging.info(f"DEBUG SF - got {len(tickets)} tickets from get_user_tickets (limit={ticket_limit}, capped={tickets_capped})")
-
-    # Get actual total counts (for summary cards - should show real totals even when capped)
-    ticket_counts = ticket_store.get_user_ticket_counts(user_id, user.user_type, queue_ids=queue_ids)
-    logging.info(f"DEBUG SF - actual totals: {ticket_counts['total']} tickets, {ticket_counts['open']} open, {ticket_counts['in_progress']} in progress")
-
-    # Apply date filtering if date parameters are provided
-    if date_from or date_to:
-        filtered_by_date = []
-        for ticket in tickets:
-            if date_from:
-                try:
-                    from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-                    if ticket.created_at.date() < from_date:
-                        continue
-                except ValueError:
-                    pass
-
-            if date_to:
-                try:
-                    to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-                    if ticket.created_at.date() > to_date:
-                        continue
-                except ValueError:
-                    pass
+        queue_ids = user.get_accessible_queue_ids()
 
-            filtered_by_date.append(ticket)
-        tickets = filtered_by_date
-
-    logging.info(f"DEBUG SF - final ticket count: {len(tickets)}")
+    # Actual totals for the summary cards
+    ticket_counts = ticket_store.get_user_ticket_counts(user_id, user.user_type, queue_ids=queue_ids)
 
     # Get queues for the filter dropdown
     from models.queue import Queue
@@ -465,17 +370,13 @@ def list_tickets_sf():
             accessible_queue_ids = [q[0] for q in queue_permissions]
             logging.info(f"DEBUG SF - User {user.id} has access to {len(accessible_queue_ids)} queues: {accessible_queue_ids}")
 
-        queues_with_counts = db_session.query(
-            Queue,
-            func.count(Ticket.id).label('ticket_count')
-        ).outerjoin(
-            Ticket, Queue.id == Ticket.queue_id
-        ).group_by(
-            Queue.id
-        ).order_by(
-            func.count(Ticket.id).desc(),
-            Queue.name
-        ).all()
+        # Queues sorted by ticket count descending (counts from the ticket_counts summary)
+        from utils.ticket_counters import queue_totals
+        totals = queue_totals(db_session)
+        queues_with_counts = sorted(
+            ((queue, totals.get(queue.id, {}).get('total', 0)) for queue in db_session.query(Queue).all()),
+            key=lambda item: (-item[1], item[0].name or '')
+        )
 
         if user.is_super_admin or user.is_developer:
             queues = [queue for queue, count in queues_with_counts]
@@ -495,38 +396,16 @@ def list_tickets_sf():
     finally:
         db_session.close()
 
-    # Calculate queue ticket counts in batch (single query instead of 2 per queue)
+    # Calculate queue ticket counts in batch (one aggregate for every queue)
+    from utils.ticket_counters import queue_totals
     db_session = db_manager.get_session()
     queue_ticket_counts = {}
     try:
         queue_ids_list = [q.id for q in queues]
         if queue_ids_list:
-            # Get total counts per queue in one query
-            total_counts = db_session.query(
-                Ticket.queue_id,
-                func.count(Ticket.id)
-            ).filter(
-                Ticket.queue_id.in_(queue_ids_list)
-            ).group_by(Ticket.queue_id).all()
-
-            # Get open counts per queue in one query
-            open_counts = db_session.query(
-                Ticket.queue_id,
-                func.count(Ticket.id)
-            ).filter(
-                Ticket.queue_id.in_(queue_ids_list),
-                Ticket.status != TicketStatus.RESOLVED,
-                Ticket.status != TicketStatus.RESOLVED_DELIVERED
-            ).group_by(Ticket.queue_id).all()
-
-            total_map = {qid: cnt for qid, cnt in total_counts}
-            open_map = {qid: cnt for qid, cnt in open_counts}
-
+            totals = queue_totals(db_session, queue_ids_list)
             for qid in queue_ids_list:
-                queue_ticket_counts[qid] = {
-                    'total': total_map.get(qid, 0),
-                    'open': open_map.get(qid, 0)
-                }
+                queue_ticket_counts[qid] = totals.get(qid, {'total': 0, 'open': 0})
     finally:
         db_session.close()
 
@@ -575,10 +454,6 @@ def list_tickets_sf():
     finally:
         db_session.close()
 
-    # Calculate SLA status for all tickets in batch (few queries instead of N+1)
-    from utils.sla_calculator import get_batch_sla_status
-    ticket_sla_data = get_batch_sla_status(tickets)
-
     # Get all users for bulk assign dropdown
     from models.user import User
     users_db = db_manager.get_session()
@@ -607,88 +482,109 @@ def list_tickets_sf():
     finally:
         users_db.close()
 
-    return render_template('tickets/list_sf.html', tickets=tickets, user=user, users=users, queues=queues, queue_ticket_counts=queue_ticket_counts, custom_statuses=custom_statuses_list, folders_data=folders_data, ticket_sla_data=ticket_sla_data, user_has_firstbase_access=user_has_firstbase_access, tickets_capped=tickets_capped, ticket_counts=ticket_counts)
+    # Filter sidebar options (filtering happens in /tickets/grid, not on loaded rows)
+    from models.ticket import TicketStatus, TicketPriority, TicketCategory
+    from utils.ticket_grid import KNOWN_CARRIERS
+    filter_options = {
+        'statuses': [status.value for status in TicketStatus],
+        'priorities': [priority.value for priority in TicketPriority],
+        'categories': [category.value.replace(' (claw)', '') for category in TicketCategory
+                       if category != TicketCategory.PIN_REQUEST],
+        'carriers': list(KNOWN_CARRIERS) + ['other'],
+    }
 
+    return render_template('tickets/list_sf.html', user=user, users=users, queues=queues, queue_ticket_counts=queue_ticket_counts, custom_statuses=custom_statuses_list, folders_data=folders_data, user_has_firstbase_access=user_has_firstbase_access, ticket_counts=ticket_counts, filter_options=filter_options, export_filter_options=_export_filter_options(queues), date_from=date_from, date_to=date_to)
 
-@tickets_bp.route('/refresh-all-statuses', methods=['POST'])
+
+@tickets_bp.route('/grid')
 @login_required
-def refresh_all_statuses():
+def ticket_grid():
     """
-    Refresh all ticket statuses based on their current shipment/return status.
-    This applies the same auto-update logic that runs when viewing individual tickets.
-    """
-    db_session = None
-    try:
-        db_session = db_manager.get_session()
+    One window of the ticket list grid (see utils/ticket_grid.py)
 
-        # Get all non-resolved tickets that might need status updates
-        tickets = db_session.query(Ticket).filter(
-            Ticket.status.in_([TicketStatus.NEW, TicketStatus.IN_PROGRESS, TicketStatus.ON_HOLD])
-        ).all()
+    GET /tickets/grid?sort=created&dir=desc&limit=100&status=New&queue_id=3&q=macbook
+    GET /tickets/grid?<same filters>&cursor=<cursor from the previous window>
 
-        updated_count = 0
-        closed_count = 0
-        errors = []
+    Returns {"success": true, "tickets": [...], "cursor": "..." or null,
+    "has_more": bool, "total": int (first window only)}.
+    """
+    from utils.ticket_grid import DEFAULT_WINDOW_SIZE, InvalidGridRequest, grid_window, parse_filters
 
-        for ticket in tickets:
-            try:
-                original_status = ticket.status
+    user = db_manager.get_user(session['user_id'])
+    db_session = db_manager.get_session()
+    try:
+        window = grid_window(
+            db_session, user,
+            sort=request.args.get('sort', 'created'),
+            direction=request.args.get('dir', 'desc'),
+            cursor=request.args.get('cursor') or None,
+            limit=request.args.get('limit', DEFAULT_WINDOW_SIZE, type=int),
+            **parse_filters(request.args)
+        )
+        return jsonify(dict(window, success=True))
+    except InvalidGridRequest as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error loading ticket grid: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        db_session.close()
 
-                # Auto-update status for Asset Return (Claw) tickets based on progress
-                if ticket.category == TicketCategory.ASSET_RETURN_CLAW:
-                    # Check for "received" or "delivered" (case-insensitive)
-                    return_received = ticket.shipping_status and ("received" in ticket.shipping_status.lower() or "delivered" in ticket.shipping_status.lower())
-                    replacement_received = ticket.replacement_status and ("received" in ticket.replacement_status.lower() or "delivered" in ticket.replacement_status.lower())
 
-                    # Check if there's a replacement tracking
-                    has_replacement = ticket.replacement_tracking and ticket.replacement_tracking.strip()
+@tickets_bp.route('/grid/summary')
+@login_required
+def ticket_grid_summary():
+    """
+    Counts over every ticket matching the grid filters, for the charts and
+    the board (see utils/ticket_grid.grid_summary)
 
-                    # Auto-close logic
-                    should_close = False
-                    if return_received:
-                        if not has_replacement:
-                            should_close = True
-                        elif replacement_received:
-                            should_close = True
+    GET /tickets/grid/summary?<same filters as /tickets/grid>
+    """
+    from utils.ticket_grid import InvalidGridRequest, grid_summary, parse_filters
 
-                    if should_close and ticket.status not in [TicketStatus.RESOLVED, TicketStatus.RESOLVED_DELIVERED]:
-                        ticket.status = TicketStatus.RESOLVED
-                        ticket.custom_status = None
-                        ticket.notes = (ticket.notes or "") + f"\n[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}] Ticket auto-closed via bulk refresh: Return received at warehouse. Case completed!"
-                        logger.info(f"Bulk refresh: Auto-closed ticket {ticket.id}")
-                    # Set to IN_PROGRESS if any progress has been made and status is still NEW
-                    elif ticket.status == TicketStatus.NEW:
-                        has_progress = (
-                            ticket.shipping_tracking or
-                            (ticket.shipping_status and ticket.shipping_status not in ['Pending', 'Information Received']) or
-                            return_received or
-                            replacement_received
-                        )
-                        if has_progress:
-                            ticket.status = TicketStatus.IN_PROGRESS
-                            ticket.custom_status = None
-                            logger.info(f"Bulk refresh: Updated ticket {ticket.id} to IN_PROGRESS")
-
-                # Track if status changed (after all the logic above)
-                if original_status != ticket.status:
-                    if ticket.status == TicketStatus.RESOLVED:
-                        closed_count += 1
-                    else:
-                        updated_count += 1
+    user = db_manager.get_user(session['user_id'])
+    db_session = db_manager.get_session()
+    try:
+        summary = grid_summary(db_session, user, **parse_filters(request.args))
+        return jsonify(dict(summary, success=True))
+    except InvalidGridRequest as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error summarising ticket grid: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        db_session.close()
 
-            except Exception as e:
-                errors.append(f"Ticket {ticket.id}: {str(e)}")
-                logger.error(f"Error refreshing ticket {ticket.id}: {str(e)}")
-                continue
 
-        db_session.commit()
+@tickets_bp.route('/refresh-all-statuses', methods=['POST'])
+@login_required
+def refresh_all_statuses():
+    """
+    Refresh all ticket statuses based on their current shipment/return status.
+    Applies the automatic status rules (utils/ticket_rules.py) to every ticket
+    with bulk updates. Pass dry_run=true to only list the tickets that would change.
+    """
+    db_session = None
+    try:
+        db_session = db_manager.get_session()
+        payload = request.get_json(silent=True) or {}
+        dry_run = str(payload.get('dry_run', request.args.get('dry_run', 'false'))).lower() == 'true'
 
+        changes = apply_rules(db_session, dry_run=dry_run, trigger='bulk_refresh', user_id=session.get('user_id'))
+        if dry_run:
+            db_session.rollback()
+        else:
+            db_session.commit()
+
+        closed_count = sum(1 for change in changes if change['new_status'] == TicketStatus.RESOLVED.name)
         return jsonify({
             'success': True,
-            'message': f'Refreshed {len(tickets)} tickets',
-            'updated': updated_count,
+            'dry_run': dry_run,
+            'message': f"{'Would change' if dry_run else 'Changed'} {len(changes)} ticket statuses",
+            'updated': len(changes) - closed_count,
             'closed': closed_count,
-            'errors': errors
+            'changes': changes,
+            'errors': []
         })
 
     except Exception as e:
@@ -706,632 +602,736 @@ def refresh_all_statuses():
             db_session.close()
 
 
-@tickets_bp.route('/export/csv')
-@login_required
-def export_tickets_csv():
-    """Export tickets to CSV format with filtering support"""
-    user_id = session['user_id']
-    user = db_manager.get_user(user_id)
-    user_type = session['user_type']
+TICKET_EXPORT_HEADER = [
+    'Ticket ID',
+    'Display ID',
+    'Order ID',
+    'Subject',
+    'Description',
+    'Status',
+    'Priority',
+    'Category',
+    'Assigned To',
+    'Customer',
+    'Customer Email',
+    'Customer Phone',
+    'Customer Company',
+    'Customer Parent Company',
+    'Customer Address',
+    'Customer Timezone',
+    'Customer Department',
+    'Country',
+    'Created Date',
+    'Updated Date',
+    'Package Number',
+    'Package Tracking Number',
+    'Item Type',
+    'Item Name',
+    'Legacy Assets',
+    'Return Shipping Tracking',
+    'Outbound Shipping Tracking',
+    'Queue',
+    'Package Journey - Latest Status',
+    'Package Journey - Carrier',
+    'Package Journey - Last Update',
+    'Package Journey - Full History',
+    'Comments Count',
+    'Comments'
+]
+
+# Tickets loaded (with their relationships) per batch
+TICKET_EXPORT_BATCH_SIZE = 200
+
+# Tickets listed in the export wizard preview
+TICKET_EXPORT_PREVIEW_SIZE = 50
+
+
+def _export_filter_options(queues):
+    """Options of the export wizard filters, as the export matches them (not from the loaded rows)"""
+    return {
+        'categories': [[category.value, category.value.replace(' (claw)', '')] for category in TicketCategory],
+        'priorities': [priority.value for priority in TicketPriority],
+        'queues': [queue.name for queue in queues],
+    }
 
-    # Get filter parameters from request
-    export_mode = request.args.get('mode', 'all')  # all, filtered, selected
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    category_filter = request.args.get('category')
-    priority_filter = request.args.get('priority')
-    status_filter = request.args.get('status')
-    queue_filter = request.args.get('queue')  # Changed from country_filter
-    company_filter = request.args.get('company')
-    ticket_ids = request.args.get('ticket_ids')
 
-    # Create a new database session for this operation
-    db_session = db_manager.get_session()
+def _ticket_export_params():
+    """Capture the export filters from the request so the export can also run in the background"""
+    return {
+        'mode': request.args.get('mode', 'all'),  # all, filtered, selected
+        'date_from': request.args.get('date_from'),
+        'date_to': request.args.get('date_to'),
+        'category': request.args.get('category'),
+        'priority': request.args.get('priority'),
+        'status': request.args.get('status'),
+        'queue': request.args.get('queue'),  # Changed from country_filter
+        'company': request.args.get('company'),
+        'ticket_ids': request.args.get('ticket_ids')
+    }
 
-    try:
-        # Build query with eager loading to avoid DetachedInstanceError
-        query = db_session.query(Ticket).options(
-            joinedload(Ticket.customer)
-                .joinedload(CustomerUser.company)
-                .joinedload(Company.parent_company),
-            joinedload(Ticket.assigned_to),
-            joinedload(Ticket.queue),
-            joinedload(Ticket.assets),
-            joinedload(Ticket.accessories),
-            joinedload(Ticket.accessory),
-            joinedload(Ticket.tracking_histories),
-            joinedload(Ticket.comments).joinedload(Comment.user)
-        )
 
-        # Apply user permission filters
-        if user.user_type == UserType.CLIENT:
-            # For CLIENT users, only show tickets related to their company
-            query = query.filter(Ticket.requester_id == user_id)
-        elif user.user_type in [UserType.COUNTRY_ADMIN, UserType.SUPERVISOR]:
-            # COUNTRY_ADMIN and SUPERVISOR can only see tickets from queues they have access to
-            # Get queue IDs the user has permission to access
-            from models.user_queue_permission import UserQueuePermission
-            accessible_queue_ids = db_session.query(UserQueuePermission.queue_id).filter(
-                UserQueuePermission.user_id == user_id,
-                UserQueuePermission.can_view == True
-            ).all()
-            accessible_queue_ids = [q[0] for q in accessible_queue_ids]
+def _ticket_export_query(db_session, user, params):
+    """Tickets visible to the user that match the export filters"""
+    user_id = user.id
+    export_mode = params.get('mode', 'all')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
+    category_filter = params.get('category')
+    priority_filter = params.get('priority')
+    status_filter = params.get('status')
+    queue_filter = params.get('queue')
+    company_filter = params.get('company')
+    ticket_ids = params.get('ticket_ids')
 
-            if accessible_queue_ids:
-                # Only include tickets from accessible queues
-                query = query.filter(Ticket.queue_id.in_(accessible_queue_ids))
-            else:
-                # No queue permissions - return no tickets
-                query = query.filter(Ticket.id == -1)  # Impossible condition
-
-        # Apply export mode filters
-        if export_mode == 'selected' and ticket_ids:
-            # Export only selected tickets
-            id_list = [int(tid.strip()) for tid in ticket_ids.split(',') if tid.strip().isdigit()]
-            if id_list:  # Only apply filter if we have valid IDs
-                query = query.filter(Ticket.id.in_(id_list))
-        elif export_mode == 'filtered':
-            # Apply date range filter
-            if date_from:
-                try:
-                    from_date = datetime.datetime.strptime(date_from, '%Y-%m-%d')
-                    query = query.filter(Ticket.created_at >= from_date)
-                except ValueError:
-                    pass
+    query = db_session.query(Ticket)
 
-            if date_to:
-                try:
-                    to_date = datetime.datetime.strptime(date_to, '%Y-%m-%d')
-                    # Add 23:59:59 to include the entire day
-                    to_date = to_date.replace(hour=23, minute=59, second=59)
-                    query = query.filter(Ticket.created_at <= to_date)
-                except ValueError:
-                    pass
+    # Apply user permission filters
+    if user.user_type == UserType.CLIENT:
+        # For CLIENT users, only show tickets related to their company
+        query = query.filter(Ticket.requester_id == user_id)
+    elif user.user_type in [UserType.COUNTRY_ADMIN, UserType.SUPERVISOR]:
+        # COUNTRY_ADMIN and SUPERVISOR can only see tickets from queues they have access to
+        # Get queue IDs the user has permission to access
+        from models.user_queue_permission import UserQueuePermission
+        accessible_queue_ids = db_session.query(UserQueuePermission.queue_id).filter(
+            UserQueuePermission.user_id == user_id,
+            UserQueuePermission.can_view == True
+        ).all()
+        accessible_queue_ids = [q[0] for q in accessible_queue_ids]
 
-            # Apply category filter
-            if category_filter and category_filter != 'all':
-                try:
-                    category_enum = TicketCategory(category_filter)
-                    query = query.filter(Ticket.category == category_enum)
-                except ValueError:
-                    pass
+        if accessible_queue_ids:
+            # Only include tickets from accessible queues
+            query = query.filter(Ticket.queue_id.in_(accessible_queue_ids))
+        else:
+            # No queue permissions - return no tickets
+            query = query.filter(Ticket.id == -1)  # Impossible condition
+
+    # Apply export mode filters
+    if export_mode == 'selected' and ticket_ids:
+        # Export only selected tickets
+        id_list = [int(tid.strip()) for tid in ticket_ids.split(',') if tid.strip().isdigit()]
+        if id_list:  # Only apply filter if we have valid IDs
+            query = query.filter(Ticket.id.in_(id_list))
+    elif export_mode == 'filtered':
+        # Apply date range filter
+        if date_from:
+            try:
+                from_date = datetime.datetime.strptime(date_from, '%Y-%m-%d')
+                query = query.filter(Ticket.created_at >= from_date)
+            except ValueError:
+                pass
 
-            # Apply priority filter
-            if priority_filter and priority_filter != 'all':
-                from models.ticket import TicketPriority
-                try:
-                    priority_enum = TicketPriority(priority_filter)
-                    query = query.filter(Ticket.priority == priority_enum)
-                except ValueError:
-                    pass
+        if date_to:
+            try:
+                to_date = datetime.datetime.strptime(date_to, '%Y-%m-%d')
+                # Add 23:59:59 to include the entire day
+                to_date = to_date.replace(hour=23, minute=59, second=59)
+                query = query.filter(Ticket.created_at <= to_date)
+            except ValueError:
+                pass
 
-            # Apply status filter
-            if status_filter and status_filter != 'all':
-                from models.ticket import TicketStatus
-                try:
-                    status_enum = TicketStatus(status_filter)
-                    query = query.filter(Ticket.status == status_enum, Ticket.custom_status == None)
-                except ValueError:
-                    # Not a standard status - filter by custom_status
-                    query = query.filter(Ticket.custom_status == status_filter)
+        # Apply category filter
+        if category_filter and category_filter != 'all':
+            try:
+                category_enum = TicketCategory(category_filter)
+                query = query.filter(Ticket.category == category_enum)
+            except ValueError:
+                pass
 
-            # Apply queue filter
-            if queue_filter and queue_filter != 'all':
-                # Filter by queue name
-                from models.queue import Queue
-                queue_obj = db_session.query(Queue).filter(Queue.name == queue_filter).first()
-                if queue_obj:
-                    query = query.filter(Ticket.queue_id == queue_obj.id)
+        # Apply priority filter
+        if priority_filter and priority_filter != 'all':
+            from models.ticket import TicketPriority
+            try:
+                priority_enum = TicketPriority(priority_filter)
+                query = query.filter(Ticket.priority == priority_enum)
+            except ValueError:
+                pass
 
-            # Apply company filter
-            if company_filter and company_filter != 'all':
-                try:
-                    company_id = int(company_filter)
-                    # Get the company to check if it's a parent
-                    company = db_session.query(Company).get(company_id)
-
-                    if company:
-                        if company.is_parent_company:
-                            # If parent company is selected, include all child companies
-                            child_company_ids = [c.id for c in company.child_companies.all()]
-                            all_company_ids = [company_id] + child_company_ids
-
-                            # Filter tickets where customer's company is parent or any child
-                            query = query.join(CustomerUser, Ticket.customer_id == CustomerUser.id, isouter=True).filter(
-                                CustomerUser.company_id.in_(all_company_ids)
-                            )
-                        else:
-                            # If child or standalone company, just filter by that company
-                            query = query.join(CustomerUser, Ticket.customer_id == CustomerUser.id, isouter=True).filter(
-                                CustomerUser.company_id == company_id
-                            )
-                except (ValueError, TypeError):
-                    pass
+        # Apply status filter
+        if status_filter and status_filter != 'all':
+            from models.ticket import TicketStatus
+            try:
+                status_enum = TicketStatus(status_filter)
+                query = query.filter(Ticket.status == status_enum, Ticket.custom_status == None)
+            except ValueError:
+                # Not a standard status - filter by custom_status
+                query = query.filter(Ticket.custom_status == status_filter)
+
+        # Apply queue filter
+        if queue_filter and queue_filter != 'all':
+            # Filter by queue name
+            from models.queue import Queue
+            queue_obj = db_session.query(Queue).filter(Queue.name == queue_filter).first()
+            if queue_obj:
+                query = query.filter(Ticket.queue_id == queue_obj.id)
 
-        tickets = query.all()
+        # Apply company filter
+        if company_filter and company_filter != 'all':
+            try:
+                company_id = int(company_filter)
+                # Get the company to check if it's a parent
+                company = db_session.query(Company).get(company_id)
+
+                if company:
+                    if company.is_parent_company:
+                        # If parent company is selected, include all child companies
+                        child_company_ids = [c.id for c in company.child_companies.all()]
+                        all_company_ids = [company_id] + child_company_ids
+
+                        # Filter tickets where customer's company is parent or any child
+                        query = query.join(CustomerUser, Ticket.customer_id == CustomerUser.id, isouter=True).filter(
+                            CustomerUser.company_id.in_(all_company_ids)
+                        )
+                    else:
+                        # If child or standalone company, just filter by that company
+                        query = query.join(CustomerUser, Ticket.customer_id == CustomerUser.id, isouter=True).filter(
+                            CustomerUser.company_id == company_id
+                        )
+            except (ValueError, TypeError):
+                pass
+
+    # Filter tickets based on queue access permissions (same as list_tickets)
+    if not user.is_super_admin and not user.is_developer:
+        accessible_queue_ids = user.get_accessible_queue_ids(db_session)
+        if accessible_queue_ids:
+            query = query.filter(or_(Ticket.queue_id.in_(accessible_queue_ids), Ticket.queue_id.is_(None)))
+        else:
+            query = query.filter(Ticket.queue_id.is_(None))
+
+    return query
+
+
+def _ticket_export_rows(db_session, user, params):
+    """Header and lazily generated rows for the ticket export"""
+    from sqlalchemy.orm import selectinload
+    from models.package_item import PackageItem
+    from utils.streaming_export import iter_batches
+
+    id_query = _ticket_export_query(db_session, user, params).with_entities(Ticket.id)
+
+    def rows():
+        for id_batch in iter_batches(id_query, Ticket.id, batch_size=TICKET_EXPORT_BATCH_SIZE):
+            ticket_ids = [row.id for row in id_batch]
+
+            # Load this batch with one query per relationship
+            tickets = db_session.query(Ticket).options(
+                joinedload(Ticket.customer)
+                    .joinedload(CustomerUser.company)
+                    .joinedload(Company.parent_company),
+                joinedload(Ticket.assigned_to),
+                joinedload(Ticket.queue),
+                joinedload(Ticket.accessory),
+                selectinload(Ticket.assets),
+                selectinload(Ticket.accessories),
+                selectinload(Ticket.tracking_histories),
+                selectinload(Ticket.comments).joinedload(Comment.user)
+            ).filter(Ticket.id.in_(ticket_ids)).order_by(Ticket.id).all()
+
+            # Package items plus the assets/accessories they reference
+            package_items = {}
+            for item in db_session.query(PackageItem).filter(PackageItem.ticket_id.in_(ticket_ids)):
+                package_items.setdefault((item.ticket_id, item.package_number), []).append(item)
+            item_asset_ids = {i.asset_id for items in package_items.values() for i in items if i.asset_id}
+            item_accessory_ids = {i.accessory_id for items in package_items.values() for i in items if i.accessory_id}
+            assets_by_id = {a.id: a for a in db_session.query(Asset).filter(Asset.id.in_(item_asset_ids))} if item_asset_ids else {}
+            accessories_by_id = {a.id: a for a in db_session.query(Accessory).filter(Accessory.id.in_(item_accessory_ids))} if item_accessory_ids else {}
 
-        # Filter tickets based on queue access permissions (same as list_tickets)
-        if not user.is_super_admin and not user.is_developer:
-            # Batch-load accessible queue IDs to avoid N+1 queries
-            accessible_queue_ids = user.get_accessible_queue_ids()
-            filtered_tickets = []
             for ticket in tickets:
-                if ticket.queue_id and ticket.queue_id in accessible_queue_ids:
-                    filtered_tickets.append(ticket)
-                elif not ticket.queue_id:
-                    filtered_tickets.append(ticket)
-            tickets = filtered_tickets
+                yield from _ticket_export_ticket_rows(ticket, package_items, assets_by_id, accessories_by_id)
 
-        # Create CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
+            # Drop the batch from the identity map so memory stays flat
+            db_session.expunge_all()
 
-        # CSV headers
-        headers = [
-            'Ticket ID',
-            'Display ID',
-            'Order ID',
-            'Subject',
-            'Description',
-            'Status',
-            'Priority',
-            'Category',
-            'Assigned To',
-            'Customer',
-            'Customer Email',
-            'Customer Phone',
-            'Customer Company',
-            'Customer Parent Company',
-            'Customer Address',
-            'Customer Timezone',
-            'Customer Department',
-            'Country',
-            'Created Date',
-            'Updated Date',
-            'Package Number',
-            'Package Tracking Number',
-            'Item Type',
-            'Item Name',
-            'Legacy Assets',
-            'Return Shipping Tracking',
-            'Outbound Shipping Tracking',
-            'Queue',
-            'Package Journey - Latest Status',
-            'Package Journey - Carrier',
-            'Package Journey - Last Update',
-            'Package Journey - Full History',
-            'Comments Count',
-            'Comments'
-        ]
-        writer.writerow(headers)
+    return TICKET_EXPORT_HEADER, rows()
 
-        # Write ticket data
-        for ticket in tickets:
-            # Get asset info (now safely loaded with joinedload)
-            assets_info = []
-            try:
-                if ticket.assets:
-                    for asset in ticket.assets:
-                        if asset.model:
-                            assets_info.append(f"{asset.serial_num} ({asset.model})")
-                        else:
-                            assets_info.append(asset.serial_num)
-            except Exception as e:
-                logger.warning(f"Error accessing assets for ticket {ticket.id}: {e}")
-            assets_str = '; '.join(assets_info) if assets_info else ''
-
-            # Get customer info safely
-            customer_name = ''
-            customer_email = ''
-            customer_phone = ''
-            customer_company = ''
-            customer_parent_company = ''
-            customer_address = ''
-            customer_timezone = ''
-            customer_department = ''
-            customer_country = ''
 
-            try:
-                if ticket.customer:
-                    customer = ticket.customer
-                    if hasattr(customer, 'name'):
-                        customer_name = customer.name or ''
-                    else:
-                        customer_name = str(customer)
-                    customer_email = getattr(customer, 'email', '') or ''
-                    customer_phone = (
-                        getattr(customer, 'contact_number', None)
-                        or getattr(customer, 'phone', None)
-                        or ''
-                    )
-                    customer_timezone = getattr(customer, 'timezone', '') or ''
-                    customer_department = getattr(customer, 'department', '') or ''
-                    country_attr = getattr(customer, 'country', None)
-                    if hasattr(country_attr, 'value'):
-                        customer_country = country_attr.value or ''
-                    elif country_attr:
-                        customer_country = str(country_attr)
-                    company = getattr(customer, 'company', None)
-                    if company:
-                        customer_company = getattr(company, 'grouped_display_name', None) or getattr(company, 'display_name', None) or company.name or ''
-                        parent_company = getattr(company, 'parent_company', None)
-                        if parent_company:
-                            parent_display = getattr(parent_company, 'effective_display_name', None)
-                            customer_parent_company = parent_display or getattr(parent_company, 'display_name', None) or parent_company.name or ''
-                    raw_address = ''
-                    if getattr(ticket, 'shipping_address', None):
-                        raw_address = ticket.shipping_address
-                    elif getattr(customer, 'address', None):
-                        raw_address = customer.address
-                    if raw_address:
-                        address_lines = [line.strip() for line in raw_address.splitlines() if line.strip()]
-                        customer_address = ', '.join(address_lines)
-            except Exception as e:
-                logger.warning(f"Error accessing customer for ticket {ticket.id}: {e}")
+def _ticket_export_ticket_rows(ticket, package_items, assets_by_id, accessories_by_id):
+    """Export rows for one ticket: one per package item, asset or accessory"""
+    # Get asset info (now safely loaded with joinedload)
+    assets_info = []
+    try:
+        if ticket.assets:
+            for asset in ticket.assets:
+                if asset.model:
+                    assets_info.append(f"{asset.serial_num} ({asset.model})")
+                else:
+                    assets_info.append(asset.serial_num)
+    except Exception as e:
+        logger.warning(f"Error accessing assets for ticket {ticket.id}: {e}")
+    assets_str = '; '.join(assets_info) if assets_info else ''
+
+    # Get customer info safely
+    customer_name = ''
+    customer_email = ''
+    customer_phone = ''
+    customer_company = ''
+    customer_parent_company = ''
+    customer_address = ''
+    customer_timezone = ''
+    customer_department = ''
+    customer_country = ''
+
+    try:
+        if ticket.customer:
+            customer = ticket.customer
+            if hasattr(customer, 'name'):
+                customer_name = customer.name or ''
+            else:
+                customer_name = str(customer)
+            customer_email = getattr(customer, 'email', '') or ''
+            customer_phone = (
+                getattr(customer, 'contact_number', None)
+                or getattr(customer, 'phone', None)
+                or ''
+            )
+            customer_timezone = getattr(customer, 'timezone', '') or ''
+            customer_department = getattr(customer, 'department', '') or ''
+            country_attr = getattr(customer, 'country', None)
+            if hasattr(country_attr, 'value'):
+                customer_country = country_attr.value or ''
+            elif country_attr:
+                customer_country = str(country_attr)
+            company = getattr(customer, 'company', None)
+            if company:
+                customer_company = getattr(company, 'grouped_display_name', None) or getattr(company, 'display_name', None) or company.name or ''
+                parent_company = getattr(company, 'parent_company', None)
+                if parent_company:
+                    parent_display = getattr(parent_company, 'effective_display_name', None)
+                    customer_parent_company = parent_display or getattr(parent_company, 'display_name', None) or parent_company.name or ''
+            raw_address = ''
+            if getattr(ticket, 'shipping_address', None):
+                raw_address = ticket.shipping_address
+            elif getattr(customer, 'address', None):
+                raw_address = customer.address
+            if raw_address:
+                address_lines = [line.strip() for line in raw_address.splitlines() if line.strip()]
+                customer_address = ', '.join(address_lines)
+    except Exception as e:
+        logger.warning(f"Error accessing customer for ticket {ticket.id}: {e}")
+
+    # Get assigned user info safely
+    assigned_to = 'Unassigned'
+    try:
+        if ticket.assigned_to:
+            assigned_to = ticket.assigned_to.username
+    except Exception as e:
+        logger.warning(f"Error accessing assigned_to for ticket {ticket.id}: {e}")
 
-            # Get assigned user info safely
-            assigned_to = 'Unassigned'
-            try:
-                if ticket.assigned_to:
-                    assigned_to = ticket.assigned_to.username
-            except Exception as e:
-                logger.warning(f"Error accessing assigned_to for ticket {ticket.id}: {e}")
+    # Get queue name safely
+    queue_name = ''
+    try:
+        if ticket.queue:
+            queue_name = ticket.queue.name
+    except Exception as e:
+        logger.warning(f"Error accessing queue for ticket {ticket.id}: {e}")
 
-            # Get queue name safely
-            queue_name = ''
-            try:
-                if ticket.queue:
-                    queue_name = ticket.queue.name
-            except Exception as e:
-                logger.warning(f"Error accessing queue for ticket {ticket.id}: {e}")
+    # Get tracking information safely (bulk export)
+    latest_status = ''
+    latest_carrier = ''
+    latest_update = ''
+    full_history = ''
+
+    try:
+        if ticket.tracking_histories:
+            # Get the most recent tracking history
+            latest_tracking = max(ticket.tracking_histories, key=lambda t: t.last_updated or dt.min)
 
-            # Get tracking information safely (bulk export)
-            latest_status = ''
-            latest_carrier = ''
-            latest_update = ''
-            full_history = ''
+            if latest_tracking:
+                latest_status = latest_tracking.status or ''
+                latest_carrier = latest_tracking.carrier or ''
+                latest_update = latest_tracking.last_updated.strftime('%Y-%m-%d %H:%M:%S') if latest_tracking.last_updated else ''
 
+                # Build full history from tracking events
+                history_entries = []
+                for tracking in ticket.tracking_histories:
+                    # Only the first 10 entries are exported; skip parsing the rest
+                    if len(history_entries) >= 10:
+                        break
+                    tracking_events = tracking.events
+                    if tracking_events:
+                        for event in tracking_events:
+                            # Extract event information
+                            event_date = event.get('date', '')
+                            event_status = event.get('status', '')
+                            event_location = event.get('location', '')
+                            event_description = event.get('description', '')
+
+                            if event_date or event_status:
+                                history_entries.append(f"{event_date} - {event_status}")
+                                if event_location:
+                                    history_entries[-1] += f" ({event_location})"
+                                if event_description:
+                                    history_entries[-1] += f" - {event_description}"
+
+                # If no events found, show basic tracking info
+                if not history_entries and latest_tracking:
+                    basic_info = f"{latest_update} - {latest_status}"
+                    if latest_carrier:
+                        basic_info += f" via {latest_carrier}"
+                    history_entries.append(basic_info)
+
+                full_history = ' | '.join(history_entries[:10])  # Limit to 10 most recent events
+    except Exception as e:
+        logger.warning(f"Error accessing tracking histories for ticket {ticket.id}: {e}")
+
+    # Get comments information safely (bulk export)
+    comments_count = 0
+    comments_text = ''
+
+    try:
+        if ticket.comments:
+            comments_count = len(ticket.comments)
+            # Sort comments by creation date
+            sorted_comments = sorted(ticket.comments, key=lambda c: c.created_at or dt.min)
+
+            comment_entries = []
+            for comment in sorted_comments:
+                # Format: [Date] Username: Comment text
+                comment_date = comment.created_at.strftime('%Y-%m-%d %H:%M') if comment.created_at else 'Unknown date'
+                username = comment.user.username if comment.user else 'Unknown user'
+                content = comment.content or ''
+
+                # Clean content (remove newlines and extra spaces for CSV)
+                cleaned_content = ' '.join(content.strip().split())
+                if len(cleaned_content) > 100:  # Limit comment length in CSV
+                    cleaned_content = cleaned_content[:97] + '...'
+
+                comment_entries.append(f"[{comment_date}] {username}: {cleaned_content}")
+
+            comments_text = ' | '.join(comment_entries)
+    except Exception as e:
+        logger.warning(f"Error accessing comments for ticket {ticket.id}: {e}")
+
+    # Check if ticket has multiple packages (Asset Checkout/Return claw categories)
+    packages = []
+    if ticket.category and ticket.category.name in ['ASSET_CHECKOUT_CLAW', 'ASSET_RETURN_CLAW']:
+        packages = ticket.get_all_packages()
+
+    # If ticket has packages, create one row per item in each package
+    if packages:
+        for package in packages:
+            # Get items for this package
             try:
-                if ticket.tracking_histories:
-                    # Get the most recent tracking history
-                    latest_tracking = max(ticket.tracking_histories, key=lambda t: t.last_updated or dt.min)
-
-                    if latest_tracking:
-                        latest_status = latest_tracking.status or ''
-                        latest_carrier = latest_tracking.carrier or ''
-                        latest_update = latest_tracking.last_updated.strftime('%Y-%m-%d %H:%M:%S') if latest_tracking.last_updated else ''
-
-                        # Build full history from tracking events
-                        history_entries = []
-                        for tracking in ticket.tracking_histories:
-                            tracking_events = tracking.events
-                            if tracking_events:
-                                for event in tracking_events:
-                                    # Extract event information
-                                    event_date = event.get('date', '')
-                                    event_status = event.get('status', '')
-                                    event_location = event.get('location', '')
-                                    event_description = event.get('description', '')
-
-                                    if event_date or event_status:
-                                        history_entries.append(f"{event_date} - {event_status}")
-                                        if event_location:
-                                            history_entries[-1] += f" ({event_location})"
-                                        if event_description:
-                                            history_entries[-1] += f" - {event_description}"
-
-                        # If no events found, show basic tracking info
-                        if not history_entries and latest_tracking:
-                            basic_info = f"{latest_update} - {latest_status}"
-                            if latest_carrier:
-                                basic_info += f" via {latest_carrier}"
-                            history_entries.append(basic_info)
-
-                        full_history = ' | '.join(history_entries[:10])  # Limit to 10 most recent events
-            except Exception as e:
-                logger.warning(f"Error accessing tracking histories for ticket {ticket.id}: {e}")
+                items = package_items.get((ticket.id, package['package_number']), [])
 
-            # Get comments information safely (bulk export)
-            comments_count = 0
-            comments_text = ''
+                # Get tracking info for this specific package
+                pkg_tracking_number = package.get('tracking_number', '')
+                pkg_status = package.get('status', '')
+                pkg_carrier = package.get('carrier', '')
 
-            try:
-                if ticket.comments:
-                    comments_count = len(ticket.comments)
-                    # Sort comments by creation date
-                    sorted_comments = sorted(ticket.comments, key=lambda c: c.created_at or dt.min)
-
-                    comment_entries = []
-                    for comment in sorted_comments:
-                        # Format: [Date] Username: Comment text
-                        comment_date = comment.created_at.strftime('%Y-%m-%d %H:%M') if comment.created_at else 'Unknown date'
-                        username = comment.user.username if comment.user else 'Unknown user'
-                        content = comment.content or ''
-
-                        # Clean content (remove newlines and extra spaces for CSV)
-                        cleaned_content = ' '.join(content.strip().split())
-                        if len(cleaned_content) > 100:  # Limit comment length in CSV
-                            cleaned_content = cleaned_content[:97] + '...'
-
-                        comment_entries.append(f"[{comment_date}] {username}: {cleaned_content}")
-
-                    comments_text = ' | '.join(comment_entries)
+                # Get return and outbound shipping tracking
+                return_shipping = getattr(ticket, 'return_tracking', '') or ''
+                outbound_shipping = pkg_tracking_number  # For Asset Checkout, outbound is the package tracking
+
+                # If package has items, create one row per item
+                if items:
+                    for item in items:
+                        item_description = ''
+                        item_type = ''
+                        if item.asset_id:
+                            asset = assets_by_id.get(item.asset_id)
+                            if asset:
+                                # Format: MacBook Air 13" Apple Tag: O.783 SN: KMJL90245Q
+                                asset_name = asset.name or 'Asset'
+                                asset_tag = asset.asset_tag or 'N/A'
+                                asset_sn = asset.serial_num or 'N/A'
+                                item_description = f"{asset_name} Tag: {asset_tag} SN: {asset_sn}"
+                                item_type = 'Asset'
+                        elif item.accessory_id:
+                            accessory = accessories_by_id.get(item.accessory_id)
+                            if accessory:
+                                item_description = f"Accessory: {accessory.name} (x{item.quantity})"
+                                item_type = 'Accessory'
+
+                        row = [
+                            ticket.id,
+                            getattr(ticket, 'display_id', ticket.id) if hasattr(ticket, 'display_id') else ticket.id,
+                            getattr(ticket, 'firstbaseorderid', '') or '',
+                            ticket.subject or '',
+                            ticket.description or '',
+                            ticket.status.value if ticket.status else '',
+                            ticket.priority.value if ticket.priority else '',
+                            ticket.get_category_display_name() if ticket.category else '',
+                            assigned_to,
+                            customer_name,
+                            customer_email,
+                            customer_phone,
+                            customer_company,
+                            customer_parent_company,
+                            customer_address,
+                            customer_timezone,
+                            customer_department,
+                            customer_country,
+                            ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else '',
+                            ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
+                            package['package_number'],
+                            pkg_tracking_number,
+                            item_type,  # Asset or Accessory
+                            item_description,  # Single item description instead of all items
+                            '',  # Empty Assets column for package items (item is in Package Items column)
+                            return_shipping,
+                            outbound_shipping,
+                            queue_name,
+                            pkg_status,
+                            pkg_carrier,
+                            '',  # Latest update
+                            '',  # Full history
+                            comments_count,
+                            comments_text
+                        ]
+                        yield row
+                else:
+                    # Package has no items, create one row for the package anyway
+                    row = [
+                        ticket.id,
+                        getattr(ticket, 'display_id', ticket.id) if hasattr(ticket, 'display_id') else ticket.id,
+                        getattr(ticket, 'firstbaseorderid', '') or '',
+                        ticket.subject or '',
+                        ticket.description or '',
+                        ticket.status.value if ticket.status else '',
+                        ticket.priority.value if ticket.priority else '',
+                        ticket.get_category_display_name() if ticket.category else '',
+                        assigned_to,
+                        customer_name,
+                        customer_email,
+                        customer_phone,
+                        customer_company,
+                        customer_parent_company,
+                        customer_address,
+                        customer_timezone,
+                        customer_department,
+                        customer_country,
+                        ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else '',
+                        ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
+                        package['package_number'],
+                        pkg_tracking_number,
+                        '',  # No item type
+                        '',  # No items
+                        '',  # Empty Assets column for package rows
+                        return_shipping,
+                        outbound_shipping,
+                        queue_name,
+                        pkg_status,
+                        pkg_carrier,
+                        '',  # Latest update
+                        '',  # Full history
+                        comments_count,
+                        comments_text
+                    ]
+                    yield row
             except Exception as e:
-                logger.warning(f"Error accessing comments for ticket {ticket.id}: {e}")
+                logger.warning(f"Error loading package items: {e}")
+    else:
+        # For tickets without packages, export each asset and accessory as a separate row
+        # For Asset Return (claw), get both return and outbound tracking
+        return_shipping = getattr(ticket, 'return_tracking', '') or ''
+        outbound_shipping = getattr(ticket, 'shipping_tracking', '') or ''
 
-            # Check if ticket has multiple packages (Asset Checkout/Return claw categories)
-            packages = []
-            if ticket.category and ticket.category.name in ['ASSET_CHECKOUT_CLAW', 'ASSET_RETURN_CLAW']:
-                packages = ticket.get_all_packages()
+        # Collect all items (assets and accessories) for this ticket
+        ticket_items = []
 
-            # If ticket has packages, create one row per item in each package
-            if packages:
-                from models.package_item import PackageItem
-                for package in packages:
-                    # Get items for this package
-                    try:
-                        items = db_session.query(PackageItem).filter_by(
-                            ticket_id=ticket.id,
-                            package_number=package['package_number']
-                        ).all()
+        # Add assets
+        try:
+            if ticket.assets:
+                for asset in ticket.assets:
+                    asset_name = asset.name or 'Asset'
+                    asset_tag = asset.asset_tag or 'N/A'
+                    asset_sn = asset.serial_num or 'N/A'
+                    item_description = f"{asset_name} Tag: {asset_tag} SN: {asset_sn}"
+                    ticket_items.append({
+                        'type': 'Tech Asset',
+                        'description': item_description,
+                        'quantity': 1
+                    })
+        except Exception as e:
+            logger.warning(f"Error accessing assets for ticket {ticket.id}: {e}")
 
-                        # Get tracking info for this specific package
-                        pkg_tracking_number = package.get('tracking_number', '')
-                        pkg_status = package.get('status', '')
-                        pkg_carrier = package.get('carrier', '')
-
-                        # Get return and outbound shipping tracking
-                        return_shipping = getattr(ticket, 'return_tracking', '') or ''
-                        outbound_shipping = pkg_tracking_number  # For Asset Checkout, outbound is the package tracking
-
-                        # If package has items, create one row per item
-                        if items:
-                            for item in items:
-                                item_description = ''
-                                item_type = ''
-                                if item.asset_id:
-                                    asset = db_session.query(Asset).get(item.asset_id)
-                                    if asset:
-                                        # Format: MacBook Air 13" Apple Tag: O.783 SN: KMJL90245Q
-                                        asset_name = asset.name or 'Asset'
-                                        asset_tag = asset.asset_tag or 'N/A'
-                                        asset_sn = asset.serial_num or 'N/A'
-                                        item_description = f"{asset_name} Tag: {asset_tag} SN: {asset_sn}"
-                                        item_type = 'Asset'
-                                elif item.accessory_id:
-                                    accessory = db_session.query(Accessory).get(item.accessory_id)
-                                    if accessory:
-                                        item_description = f"Accessory: {accessory.name} (x{item.quantity})"
-                                        item_type = 'Accessory'
-
-                                row = [
-                                    ticket.id,
-                                    getattr(ticket, 'display_id', ticket.id) if hasattr(ticket, 'display_id') else ticket.id,
-                                    getattr(ticket, 'firstbaseorderid', '') or '',
-                                    ticket.subject or '',
-                                    ticket.description or '',
-                                    ticket.status.value if ticket.status else '',
-                                    ticket.priority.value if ticket.priority else '',
-                                    ticket.get_category_display_name() if ticket.category else '',
-                                    assigned_to,
-                                    customer_name,
-                                    customer_email,
-                                    customer_phone,
-                                    customer_company,
-                                    customer_parent_company,
-                                    customer_address,
-                                    customer_timezone,
-                                    customer_department,
-                                    customer_country,
-                                    ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else '',
-                                    ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
-                                    package['package_number'],
-                                    pkg_tracking_number,
-                                    item_type,  # Asset or Accessory
-                                    item_description,  # Single item description instead of all items
-                                    '',  # Empty Assets column for package items (item is in Package Items column)
-                                    return_shipping,
-                                    outbound_shipping,
-                                    queue_name,
-                                    pkg_status,
-                                    pkg_carrier,
-                                    '',  # Latest update
-                                    '',  # Full history
-                                    comments_count,
-                                    comments_text
-                                ]
-                                writer.writerow(row)
-                        else:
-                            # Package has no items, create one row for the package anyway
-                            row = [
-                                ticket.id,
-                                getattr(ticket, 'display_id', ticket.id) if hasattr(ticket, 'display_id') else ticket.id,
-                                getattr(ticket, 'firstbaseorderid', '') or '',
-                                ticket.subject or '',
-                                ticket.description or '',
-                                ticket.status.value if ticket.status else '',
-                                ticket.priority.value if ticket.priority else '',
-                                ticket.get_category_display_name() if ticket.category else '',
-                                assigned_to,
-                                customer_name,
-                                customer_email,
-                                customer_phone,
-                                customer_company,
-                                customer_parent_company,
-                                customer_address,
-                                customer_timezone,
-                                customer_department,
-                                customer_country,
-                                ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else '',
-                                ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
-                                package['package_number'],
-                                pkg_tracking_number,
-                                '',  # No item type
-                                '',  # No items
-                                '',  # Empty Assets column for package rows
-                                return_shipping,
-                                outbound_shipping,
-                                queue_name,
-                                pkg_status,
-                                pkg_carrier,
-                                '',  # Latest update
-                                '',  # Full history
-                                comments_count,
-                                comments_text
-                            ]
-                            writer.writerow(row)
-                    except Exception as e:
-                        logger.warning(f"Error loading package items: {e}")
-            else:
-                # For tickets without packages, export each asset and accessory as a separate row
-                # For Asset Return (claw), get both return and outbound tracking
-                return_shipping = getattr(ticket, 'return_tracking', '') or ''
-                outbound_shipping = getattr(ticket, 'shipping_tracking', '') or ''
+        # Add accessories from TicketAccessory relationship
+        try:
+            if ticket.accessories:
+                for ticket_accessory in ticket.accessories:
+                    accessory_name = ticket_accessory.accessory_name or 'Unknown Accessory'
+                    qty = ticket_accessory.quantity or 1
+                    ticket_items.append({
+                        'type': 'Accessory',
+                        'description': accessory_name,
+                        'quantity': qty
+                    })
+        except Exception as e:
+            logger.warning(f"Error accessing ticket accessories for ticket {ticket.id}: {e}")
+
+        # Add single accessory if set (accessory_id field)
+        try:
+            if ticket.accessory_id and ticket.accessory:
+                accessory = ticket.accessory
+                accessory_name = accessory.name or 'Accessory'
+                accessory_qty = getattr(ticket, 'accessory_quantity', 1) or 1
+                # Don't add if already added from ticket.accessories
+                already_added = any(
+                    item['description'] == accessory_name and item['type'] == 'Accessory'
+                    for item in ticket_items
+                )
+                if not already_added:
+                    ticket_items.append({
+                        'type': 'Accessory',
+                        'description': accessory_name,
+                        'quantity': accessory_qty
+                    })
+        except Exception as e:
+            logger.warning(f"Error accessing single accessory for ticket {ticket.id}: {e}")
+
+        # If ticket has items, create one row per item
+        if ticket_items:
+            for item in ticket_items:
+                item_description = item['description']
+                if item['quantity'] > 1:
+                    item_description = f"{item['description']} (x{item['quantity']})"
+
+                row = [
+                    ticket.id,
+                    getattr(ticket, 'display_id', ticket.id) if hasattr(ticket, 'display_id') else ticket.id,
+                    getattr(ticket, 'firstbaseorderid', '') or '',
+                    ticket.subject or '',
+                    ticket.description or '',
+                    ticket.status.value if ticket.status else '',
+                    ticket.priority.value if ticket.priority else '',
+                    ticket.get_category_display_name() if ticket.category else '',
+                    assigned_to,
+                    customer_name,
+                    customer_email,
+                    customer_phone,
+                    customer_company,
+                    customer_parent_company,
+                    customer_address,
+                    customer_timezone,
+                    customer_department,
+                    customer_country,
+                    ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else '',
+                    ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
+                    '',  # Package number
+                    '',  # Package tracking number
+                    item['type'],  # Item type (Tech Asset or Accessory)
+                    item_description,  # Item description with quantity
+                    '',  # Assets column (item is in Package Items column)
+                    return_shipping,
+                    outbound_shipping,
+                    queue_name,
+                    latest_status,
+                    latest_carrier,
+                    latest_update,
+                    full_history,
+                    comments_count,
+                    comments_text
+                ]
+                yield row
+        else:
+            # Ticket has no items, create single row
+            row = [
+                ticket.id,
+                getattr(ticket, 'display_id', ticket.id) if hasattr(ticket, 'display_id') else ticket.id,
+                getattr(ticket, 'firstbaseorderid', '') or '',
+                ticket.subject or '',
+                ticket.description or '',
+                ticket.status.value if ticket.status else '',
+                ticket.priority.value if ticket.priority else '',
+                ticket.get_category_display_name() if ticket.category else '',
+                assigned_to,
+                customer_name,
+                customer_email,
+                customer_phone,
+                customer_company,
+                customer_parent_company,
+                customer_address,
+                customer_timezone,
+                customer_department,
+                customer_country,
+                ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else '',
+                ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
+                '',  # Package number
+                '',  # Package tracking number
+                '',  # Item type
+                '',  # Package items
+                '',  # Assets
+                return_shipping,
+                outbound_shipping,
+                queue_name,
+                latest_status,
+                latest_carrier,
+                latest_update,
+                full_history,
+                comments_count,
+                comments_text
+            ]
+            yield row
 
-                # Collect all items (assets and accessories) for this ticket
-                ticket_items = []
 
-                # Add assets
-                try:
-                    if ticket.assets:
-                        for asset in ticket.assets:
-                            asset_name = asset.name or 'Asset'
-                            asset_tag = asset.asset_tag or 'N/A'
-                            asset_sn = asset.serial_num or 'N/A'
-                            item_description = f"{asset_name} Tag: {asset_tag} SN: {asset_sn}"
-                            ticket_items.append({
-                                'type': 'Tech Asset',
-                                'description': item_description,
-                                'quantity': 1
-                            })
-                except Exception as e:
-                    logger.warning(f"Error accessing assets for ticket {ticket.id}: {e}")
+@tickets_bp.route('/export/preview')
+@login_required
+def export_tickets_preview():
+    """
+    Count and first rows of what /export/csv would export with the same parameters
 
-                # Add accessories from TicketAccessory relationship
-                try:
-                    if ticket.accessories:
-                        for ticket_accessory in ticket.accessories:
-                            accessory_name = ticket_accessory.accessory_name or 'Unknown Accessory'
-                            qty = ticket_accessory.quantity or 1
-                            ticket_items.append({
-                                'type': 'Accessory',
-                                'description': accessory_name,
-                                'quantity': qty
-                            })
-                except Exception as e:
-                    logger.warning(f"Error accessing ticket accessories for ticket {ticket.id}: {e}")
+    Returns {"success": true, "total": int, "tickets": [{"id", "display_id",
+    "subject", "status", "priority", "category", "created_at"}]}.
+    """
+    db_session = db_manager.get_session()
+    try:
+        user = db_session.query(User).get(session['user_id'])
+        query = _ticket_export_query(db_session, user, _ticket_export_params())
+        tickets = query.order_by(Ticket.id.desc()).limit(TICKET_EXPORT_PREVIEW_SIZE).all()
+        return jsonify({
+            'success': True,
+            'total': query.count(),
+            'tickets': [{
+                'id': ticket.id,
+                'display_id': f'TICK-{ticket.id:04d}',
+                'subject': (ticket.subject or '').replace(' (claw)', ''),
+                'status': ticket.custom_status or (ticket.status.value if ticket.status else 'NEW'),
+                'priority': ticket.priority.value if ticket.priority else 'Medium',
+                'category': ticket.category.value.replace(' (claw)', '') if ticket.category else 'Custom',
+                'created_at': ticket.created_at.isoformat() if ticket.created_at else None,
+            } for ticket in tickets],
+        })
+    except Exception as e:
+        logger.error(f"Error previewing ticket export: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        db_session.close()
 
-                # Add single accessory if set (accessory_id field)
-                try:
-                    if ticket.accessory_id and ticket.accessory:
-                        accessory = ticket.accessory
-                        accessory_name = accessory.name or 'Accessory'
-                        accessory_qty = getattr(ticket, 'accessory_quantity', 1) or 1
-                        # Don't add if already added from ticket.accessories
-                        already_added = any(
-                            item['description'] == accessory_name and item['type'] == 'Accessory'
-                            for item in ticket_items
-                        )
-                        if not already_added:
-                            ticket_items.append({
-                                'type': 'Accessory',
-                                'description': accessory_name,
-                                'quantity': accessory_qty
-                            })
-                except Exception as e:
-                    logger.warning(f"Error accessing single accessory for ticket {ticket.id}: {e}")
 
-                # If ticket has items, create one row per item
-                if ticket_items:
-                    for item in ticket_items:
-                        item_description = item['description']
-                        if item['quantity'] > 1:
-                            item_description = f"{item['description']} (x{item['quantity']})"
+@tickets_bp.route('/export/csv')
+@login_required
+def export_tickets_csv():
+    """Export tickets to CSV format with filtering support (XLSX with ?format=xlsx)"""
+    from utils.streaming_export import (
+        background_export_message, csv_response, xlsx_response, should_run_in_background,
+        start_background_export
+    )
+    from functools import partial
+
+    params = _ticket_export_params()
+    export_mode = params['mode']
+    date_from = params['date_from']
+    date_to = params['date_to']
+    category_filter = params['category']
+    priority_filter = params['priority']
+    status_filter = params['status']
+    queue_filter = params['queue']
+    company_filter = params['company']
+    file_format = 'xlsx' if request.args.get('format') == 'xlsx' else 'csv'
 
-                        row = [
-                            ticket.id,
-                            getattr(ticket, 'display_id', ticket.id) if hasattr(ticket, 'display_id') else ticket.id,
-                            getattr(ticket, 'firstbaseorderid', '') or '',
-                            ticket.subject or '',
-                            ticket.description or '',
-                            ticket.status.value if ticket.status else '',
-                            ticket.priority.value if ticket.priority else '',
-                            ticket.get_category_display_name() if ticket.category else '',
-                            assigned_to,
-                            customer_name,
-                            customer_email,
-                            customer_phone,
-                            customer_company,
-                            customer_parent_company,
-                            customer_address,
-                            customer_timezone,
-                            customer_department,
-                            customer_country,
-                            ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else '',
-                            ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
-                            '',  # Package number
-                            '',  # Package tracking number
-                            item['type'],  # Item type (Tech Asset or Accessory)
-                            item_description,  # Item description with quantity
-                            '',  # Assets column (item is in Package Items column)
-                            return_shipping,
-                            outbound_shipping,
-                            queue_name,
-                            latest_status,
-                            latest_carrier,
-                            latest_update,
-                            full_history,
-                            comments_count,
-                            comments_text
-                        ]
-                        writer.writerow(row)
-                else:
-                    # Ticket has no items, create single row
-                    row = [
-                        ticket.id,
-                        getattr(ticket, 'display_id', ticket.id) if hasattr(ticket, 'display_id') else ticket.id,
-                        getattr(ticket, 'firstbaseorderid', '') or '',
-                        ticket.subject or '',
-                        ticket.description or '',
-                        ticket.status.value if ticket.status else '',
-                        ticket.priority.value if ticket.priority else '',
-                        ticket.get_category_display_name() if ticket.category else '',
-                        assigned_to,
-                        customer_name,
-                        customer_email,
-                        customer_phone,
-                        customer_company,
-                        customer_parent_company,
-                        customer_address,
-                        customer_timezone,
-                        customer_department,
-                        customer_country,
-                        ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else '',
-                        ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
-                        '',  # Package number
-                        '',  # Package tracking number
-                        '',  # Item type
-                        '',  # Package items
-                        '',  # Assets
-                        return_shipping,
-                        outbound_shipping,
-                        queue_name,
-                        latest_status,
-                        latest_carrier,
-                        latest_update,
-                        full_history,
-                        comments_count,
-                        comments_text
-                    ]
-                    writer.writerow(row)
+    # Create a new database session for this operation
+    db_session = db_manager.get_session()
+    streaming = False
 
-        # Create response with CSV file
-        output.seek(0)
+    try:
+        user = db_session.query(User).get(session['user_id'])
+        total = _ticket_export_query(db_session, user, params).count()
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
 
         # Generate descriptive filename based on export mode
         if export_mode == 'selected':
-            filename = f'tickets_selected_{len(tickets)}tickets_{timestamp}.csv'
+            filename = f'tickets_selected_{total}tickets_{timestamp}.{file_format}'
         elif export_mode == 'filtered':
             filter_parts = []
             if date_from or date_to:
@@ -1351,18 +1351,30 @@ def export_tickets_csv():
                 filter_parts.append(f"company{company_filter}")
 
             filter_desc = "_".join(filter_parts) if filter_parts else "filtered"
-            filename = f'tickets_{filter_desc}_{len(tickets)}results_{timestamp}.csv'
+            filename = f'tickets_{filter_desc}_{total}results_{timestamp}.{file_format}'
         else:
-            filename = f'tickets_all_{len(tickets)}tickets_{timestamp}.csv'
+            filename = f'tickets_all_{total}tickets_{timestamp}.{file_format}'
 
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+        # Very large exports are written to a file in the background
+        if should_run_in_background(total, request.args.get('background')):
+            job_id = start_background_export(
+                'tickets', user.id, filename, partial(_ticket_export_rows, params=params),
+                db_manager.get_session, file_format=file_format
+            )
+            flash(background_export_message(total, 'tickets', job_id), 'info')
+            return redirect(url_for('tickets.list_tickets'))
 
-        return response
+        header, rows = _ticket_export_rows(db_session, user, params)
+        if file_format == 'xlsx':
+            return xlsx_response(header, rows, filename, sheet_name='Tickets')
+
+        # The session stays open until the last row has been streamed
+        streaming = True
+        return csv_response(header, rows, filename, on_close=db_session.close)
 
     finally:
-        db_session.close()
+        if not streaming:
+            db_session.close()
 
 @tickets_bp.route('/<int:ticket_id>/export/csv')
 @login_required
@@ -2505,6 +2517,18 @@ Additional Notes:
                                     # Assign from inventory
                                     accessory = db_session.query(Accessory).filter(Accessory.id == acc_data['id']).first()
                                     if accessory and accessory.available_quantity > 0:
+                                        # Take the stock first (conditional - never oversells)
+                                        try:
+                                            AccessoryStock.checkout(
+                                                db_session, accessory.id, acc_data['quantity'],
+                                                transaction_type='Checkout',
+                                                user_id=user_id,
+                                                notes=f'Assigned to ticket #{ticket.display_id} from CSV import'
+                                            )
+                                        except InsufficientStockError as e:
+                                            logger.warning(f"Skipping accessory {accessory.name} for ticket {ticket.display_id}: {e}")
+                                            continue
+
                                         # Create ticket-accessory assignment
                                         ticket_accessory = TicketAccessory(
                                             ticket_id=ticket.id,
@@ -2517,11 +2541,6 @@ Additional Notes:
                                         )
                                         db_session.add(ticket_accessory)
                                         
-                                        # Update accessory quantity
-                                        accessory.available_quantity -= acc_data['quantity']
-                                        if accessory.available_quantity == 0:
-                                            accessory.status = 'Out of Stock'
-                                        
                                         actual_assigned.append(f"{accessory.name} (x{acc_data['quantity']})")
                                         
                                         # Create activity log
@@ -3137,48 +3156,6 @@ def view_ticket(ticket_id):
                 flash(error_message or 'You do not have permission to view this ticket', 'error')
                 return redirect(url_for('tickets.list_tickets'))
 
-        # Auto-update status for Asset Return (Claw) tickets based on progress
-        if ticket.category == TicketCategory.ASSET_RETURN_CLAW:
-            # Match template logic: check for "received" or "delivered" (case-insensitive)
-            return_received = ticket.shipping_status and ("received" in ticket.shipping_status.lower() or "delivered" in ticket.shipping_status.lower())
-            replacement_received = ticket.replacement_status and ("received" in ticket.replacement_status.lower() or "delivered" in ticket.replacement_status.lower())
-
-            # Check if there's a replacement tracking (some returns have replacement, some don't)
-            has_replacement = ticket.replacement_tracking and ticket.replacement_tracking.strip()
-
-            # Auto-close logic:
-            # - If NO replacement tracking: Close when return is received
-            # - If HAS replacement tracking: Close when both return AND replacement are received
-            should_close = False
-            if return_received:
-                if not has_replacement:
-                    # No replacement - just a return, close when return received
-                    should_close = True
-                elif replacement_received:
-                    # Has replacement and both are received - close
-                    should_close = True
-
-            if should_close and ticket.status not in [TicketStatus.RESOLVED, TicketStatus.RESOLVED_DELIVERED]:
-                ticket.status = TicketStatus.RESOLVED
-                ticket.custom_status = None  # Clear custom status when setting system status
-                ticket.notes = (ticket.notes or "") + f"\n[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}] Ticket auto-closed: Return received at warehouse. Case completed!"
-                db_session.commit()
-                logger.info(f"Auto-closed ticket {ticket_id} on view - return received at warehouse")
-            # Set to IN_PROGRESS if any progress has been made and status is still NEW
-            elif ticket.status == TicketStatus.NEW:
-                # Check if any progress has been made
-                has_progress = (
-                    ticket.shipping_tracking or  # Return label sent
-                    (ticket.shipping_status and ticket.shipping_status not in ['Pending', 'Information Received']) or  # Customer shipped
-                    return_received or  # Return received
-                    replacement_received  # Replacement received
-                )
-                if has_progress:
-                    ticket.status = TicketStatus.IN_PROGRESS
-                    ticket.custom_status = None  # Clear custom status when setting system status
-                    db_session.commit()
-                    logger.info(f"Auto-updated ticket {ticket_id} status to IN_PROGRESS based on case progress")
-
         logger.info("Loading additional data...")
         # Load additional data needed for the template
         # Filter users based on current user's country permissions
@@ -3696,25 +3673,12 @@ def list_queues():
             all_queues = db_session.query(Queue).all()
             queues = [q for q in all_queues if q.id in accessible_queue_ids]
         
-        # Get ticket counts for each queue to avoid detached session issues
-        queue_ticket_counts = {}
-        for queue in queues:
-            # Count ALL tickets for this queue
-            total_count = db_session.query(Ticket).filter(Ticket.queue_id == queue.id).count()
-            
-            # Count OPEN tickets for this queue (exclude resolved tickets)
-            open_count = db_session.query(Ticket).filter(
-                Ticket.queue_id == queue.id,
-                Ticket.status != TicketStatus.RESOLVED,
-                Ticket.status != TicketStatus.RESOLVED_DELIVERED
-            ).count()
-            
-            queue_ticket_counts[queue.id] = {
-                'total': total_count,
-                'open': open_count
-            }
-            
-        return render_template('tickets/queues.html', queues=queues, queue_ticket_counts=queue_ticket_counts, user=user)
+        # Ticket counts of every queue, shared through the cache
+        from utils.queue_store import queue_ticket_counts
+        counts = queue_ticket_counts()
+        counts = {queue.id: counts.get(queue.id, {'total': 0, 'open': 0}) for queue in queues}
+
+        return render_template('tickets/queues.html', queues=queues, queue_ticket_counts=counts, user=user)
     finally:
         db_session.close()
 
@@ -4326,7 +4290,13 @@ def update_ticket(ticket_id):
                                 if accessory_assignment.original_accessory:
                                     accessory = accessory_assignment.original_accessory
                                     logger.info(f"DEBUG - Returning {quantity} of accessory {accessory.id} ({accessory.name}) to stock")
-                                    accessory.available_quantity += quantity
+                                    if quantity and quantity > 0:
+                                        AccessoryStock.restock(
+                                            db_session, accessory.id, quantity,
+                                            transaction_type='Auto-Return',
+                                            user_id=current_user.id,
+                                            notes=f"Auto-returned from ticket #{ticket.id} on status {status_value}"
+                                        )
                                 else:
                                     logger.info(f"DEBUG - Accessory '{accessory_assignment.name}' has no inventory link, skipping stock return")
 
@@ -4427,28 +4397,18 @@ def update_ticket(ticket_id):
                         Accessory.id == ticket_acc.original_accessory_id
                     ).first()
 
-                    if original_accessory:
-                        # Return to inventory
+                    if original_accessory and ticket_acc.quantity and ticket_acc.quantity > 0:
+                        # Return to inventory and record the ledger entry
                         quantity = ticket_acc.quantity
-                        original_accessory.available_quantity += quantity
-
-                        # Update status if needed
-                        if original_accessory.available_quantity > 0:
-                            original_accessory.status = 'Available'
-
-                        logger.info(f"Returned {quantity}x {original_accessory.name} to inventory")
-
-                        # Create transaction record
-                        from models.accessory_transaction import AccessoryTransaction
-                        transaction = AccessoryTransaction(
-                            accessory_id=original_accessory.id,
+                        AccessoryStock.restock(
+                            db_session, original_accessory.id, quantity,
                             transaction_type="Auto-Return (Closed-Duplicated)",
-                            quantity=quantity,
                             transaction_number=f"AUTORET-{ticket_id}-{original_accessory.id}-{int(datetime.datetime.now().timestamp())}",
                             user_id=current_user.id,
                             notes=f"Auto-returned from ticket #{ticket_id} when status changed to Closed-Duplicated"
                         )
-                        db_session.add(transaction)
+
+                        logger.info(f"Returned {quantity}x {original_accessory.name} to inventory")
 
             # Return asset if assigned
             if ticket.asset_id:
@@ -4698,7 +4658,7 @@ def add_rma_pickup(ticket_id):
             description=description
         )
         ticket.update_rma_status('Item Shipped')
-        ticket_store.save_tickets()
+        ticket_store.save_ticket(ticket)
         flash('Pickup tracking added successfully')
     else:
         flash('Tracking number is required')
@@ -4723,7 +4683,7 @@ def add_rma_replacement(ticket_id):
             description=description
         )
         ticket.update_rma_status('Replacement Shipped')
-        ticket_store.save_tickets()
+        ticket_store.save_ticket(ticket)
         flash('Replacement tracking added successfully')
     else:
         flash('Tracking number is required')
@@ -4847,7 +4807,7 @@ def update_tracking_status(ticket_id, tracking_type):
                     ticket.status = 'Resolved'
                     ticket.custom_status = None  # Clear custom status when setting system status
             
-            ticket_store.save_tickets()
+            ticket_store.save_ticket(ticket)
             return jsonify({
                 'success': True,
                 'status': status,
@@ -5164,7 +5124,10 @@ def upload_attachment(ticket_id):
                 flash('No files selected', 'error')
                 return redirect(url_for('tickets.view_ticket', ticket_id=ticket_id))
 
+        from utils.media_pipeline import stream_to_file, queue_renditions, source_type_for
+
         uploaded_files = []
+        rendition_jobs = []
         base_upload_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads', 'tickets')
         os.makedirs(base_upload_path, exist_ok=True)
         logger.info(f"Upload path: {base_upload_path}")
@@ -5191,10 +5154,7 @@ def upload_attachment(ticket_id):
                 file_path = os.path.join(base_upload_path, unique_filename)
                 
                 logger.info(f"Saving file to: {file_path}")
-                file.save(file_path)
-                
-                # Get file size after saving
-                file_size = os.path.getsize(file_path) if os.path.exists(file_path) else None
+                file_size, content_sha256 = stream_to_file(file.stream, file_path)
                 
                 # Determine file type from extension for consistent checking
                 file_extension = filename.lower().split('.')[-1] if '.' in filename else ''
@@ -5205,10 +5165,12 @@ def upload_attachment(ticket_id):
                     file_path=file_path,
                     file_type=file_extension,  # Use extension instead of content_type
                     file_size=file_size,  # Add file size
+                    content_sha256=content_sha256,
                     uploaded_by=session['user_id']
                 )
                 db_session.add(attachment)
                 uploaded_files.append(filename)
+                rendition_jobs.append((file_path, content_sha256, source_type_for(file_extension)))
                 logger.info(f"Successfully saved file: {filename}")
                 
             except Exception as e:
@@ -5223,6 +5185,10 @@ def upload_attachment(ticket_id):
                 return redirect(url_for('tickets.view_ticket', ticket_id=ticket_id))
         
         db_session.commit()
+
+        # Previews / thumbnails are rendered in the background
+        for file_path, content_sha256, source_type in rendition_jobs:
+            queue_renditions(db_session, file_path, content_sha256, source_type)
         
         # Return JSON for AJAX requests, otherwise redirect
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -5290,11 +5256,12 @@ def download_attachment(ticket_id, attachment_id):
         is_pdf = attachment.filename.lower().endswith('.pdf')
         as_attachment = not is_pdf or request.args.get('download') == 'true'
 
-        return send_file(
+        return send_protected_file(
             attachment.file_path,
-            as_attachment=as_attachment,
             download_name=attachment.filename,
-            mimetype='application/pdf' if is_pdf else None
+            as_attachment=as_attachment,
+            mimetype='application/pdf' if is_pdf else None,
+            etag=attachment.content_sha256
         )
 
     except Exception as e:
@@ -5407,23 +5374,6 @@ def track_debug(ticket_id):
     
     return jsonify(debug_info)
 
-def is_singpost_tracking_number(tracking_number: str) -> bool:
-    """Check if a tracking number is a SingPost tracking number"""
-    if not tracking_number:
-        return False
-    upper_tn = tracking_number.upper()
-    # XZ prefixes (XZB, XZD, etc.)
-    if upper_tn.startswith('XZ'):
-        return True
-    # New SPNDD and SPPSD formats
-    if upper_tn.startswith('SPNDD') or upper_tn.startswith('SPPSD'):
-        return True
-    # Other SP prefixes
-    if upper_tn.startswith('SP') or upper_tn.startswith('SG'):
-        return True
-    return False
-
-
 @tickets_bp.route('/<int:ticket_id>/track_singpost', methods=['GET'])
 @login_required
 def track_singpost(ticket_id):
@@ -6744,8 +6694,7 @@ def download_intake_document(ticket_id, doc_type):
         
         # If file exists, send it
         if file_path and os.path.exists(file_path):
-            directory = os.path.dirname(file_path)
-            return send_file(file_path, as_attachment=True, download_name=filename)
+            return send_protected_file(file_path, download_name=filename)
         else:
             flash('File not found on server')
             return redirect(url_for('tickets.view_ticket', ticket_id=ticket_id))
@@ -8669,11 +8618,15 @@ def get_mention_suggestions():
     """Get users and groups for @mention autocomplete"""
     from models.group import Group
     from models.user_mention_permission import UserMentionPermission
+    from utils.autocomplete import USE_INDEX, mention_suggestions
 
     query = request.args.get('q', '').lower().strip()
     db_session = db_manager.get_session()
 
     try:
+        if USE_INDEX:
+            return jsonify({'suggestions': mention_suggestions(db_session, current_user.id, query)})
+
         suggestions = []
 
         # Check if current user has mention filtering enabled
@@ -9542,18 +9495,19 @@ def get_attachment(ticket_id, attachment_id):
         
         if is_pdf and not download_requested:
             # Serve PDF for inline viewing
-            return send_file(
+            return send_protected_file(
                 attachment.file_path,
-                mimetype='application/pdf',
+                download_name=attachment.filename,
                 as_attachment=False,
-                download_name=attachment.filename
+                mimetype='application/pdf',
+                etag=attachment.content_sha256
             )
         else:
             # Serve as download
-            return send_file(
+            return send_protected_file(
                 attachment.file_path,
-                as_attachment=True,
-                download_name=attachment.filename
+                download_name=attachment.filename,
+                etag=attachment.content_sha256
             )
         
     except Exception as e:
@@ -9564,6 +9518,34 @@ def get_attachment(ticket_id, attachment_id):
     finally:
         db_session.close()
 
+@tickets_bp.route('/<int:ticket_id>/attachment/<int:attachment_id>/rendition/<size_name>')
+@login_required
+def attachment_rendition(ticket_id, attachment_id, size_name):
+    """Thumbnail / PDF preview of an attachment, for users who can see the ticket"""
+    from utils.media_pipeline import find_rendition
+    from utils.ticket_grid import can_view_ticket
+
+    db_session = db_manager.get_session()
+    try:
+        attachment = db_session.query(Attachment).filter_by(id=attachment_id, ticket_id=ticket_id).first()
+        if not attachment or not attachment.content_sha256:
+            abort(404)
+        user = db_session.query(User).get(current_user.id)
+        if not can_view_ticket(db_session, user, ticket_id):
+            abort(403)
+
+        rendition = find_rendition(db_session, attachment.content_sha256, size_name)
+        if not rendition:
+            abort(404)
+        return send_protected_file(
+            rendition.file_path,
+            as_attachment=False,
+            mimetype='image/jpeg',
+            etag=f"{rendition.content_sha256}-{size_name}"
+        )
+    finally:
+        db_session.close()
+
 @tickets_bp.route('/cleanup-comments', methods=['POST'])
 @admin_required
 def cleanup_orphaned_comments():
@@ -9634,59 +9616,43 @@ def add_accessory(ticket_id):
                 
                 # For Asset Checkout categories, deduct from inventory (checkout)
                 # For Asset Return and Asset Intake categories, add to inventory (return/intake)
+                # Each movement is applied atomically and recorded in the stock ledger
                 if ticket.category and (ticket.category.name in ['ASSET_CHECKOUT', 'ASSET_CHECKOUT1', 'ASSET_CHECKOUT_CLAW', 'ASSET_CHECKOUT_MAIN', 'ASSET_CHECKOUT_SINGPOST', 'ASSET_CHECKOUT_DHL', 'ASSET_CHECKOUT_UPS', 'ASSET_CHECKOUT_BLUEDART', 'ASSET_CHECKOUT_DTDC', 'ASSET_CHECKOUT_AUTO']):
-                    # Checkout: deduct from inventory
-                    if accessory.available_quantity < quantity:
-                        return jsonify({'success': False, 'message': f'Not enough quantity available. Only {accessory.available_quantity} units available.'}), 400
-                    accessory.available_quantity -= quantity
+                    # Checkout: conditionally deduct from inventory
+                    try:
+                        AccessoryStock.checkout(
+                            db_session, accessory.id, quantity,
+                            transaction_type='Checkout',
+                            user_id=current_user.id,
+                            notes=f'Accessory checked out via ticket #{ticket_id} - inventory decreased'
+                        )
+                    except InsufficientStockError as e:
+                        db_session.rollback()
+                        return jsonify({'success': False, 'message': f'Not enough quantity available. Only {e.available} units available.'}), 400
                     logger.info(f"CHECKOUT: Decreasing inventory by {quantity}")
-
-                    # Update status based on quantity
-                    if accessory.available_quantity == 0:
-                        accessory.status = 'Out of Stock'
-                    else:
-                        accessory.status = 'Available'
                 elif ticket.category and ticket.category.name == 'ASSET_INTAKE':
                     # Intake: add NEW stock to inventory (increase both total and available)
-                    accessory.total_quantity += quantity
-                    accessory.available_quantity += quantity
+                    AccessoryStock.restock(
+                        db_session, accessory.id, quantity,
+                        transaction_type='Intake',
+                        user_id=current_user.id,
+                        notes=f'Accessory received via asset intake ticket #{ticket_id} - inventory increased',
+                        add_to_total=True
+                    )
                     logger.info(f"INTAKE: Increasing total and available inventory by {quantity}")
-
-                    # Update status - if we have stock, it's available
-                    if accessory.available_quantity > 0:
-                        accessory.status = 'Available'
                 else:
                     # Return: add back to available inventory (total stays same)
-                    accessory.available_quantity += quantity
+                    AccessoryStock.restock(
+                        db_session, accessory.id, quantity,
+                        transaction_type='Return',
+                        user_id=current_user.id,
+                        notes=f'Accessory returned via ticket #{ticket_id} - inventory increased'
+                    )
                     logger.info(f"RETURN: Increasing available inventory by {quantity}")
 
-                    # Update status - if we have stock, it's available
-                    if accessory.available_quantity > 0:
-                        accessory.status = 'Available'
-
                 logger.info(f"New available quantity: {accessory.available_quantity}")
                 logger.info("=== INVENTORY UPDATE END ===")
 
-                # Create transaction record
-                if ticket.category and (ticket.category.name in ['ASSET_CHECKOUT', 'ASSET_CHECKOUT1', 'ASSET_CHECKOUT_CLAW', 'ASSET_CHECKOUT_MAIN', 'ASSET_CHECKOUT_SINGPOST', 'ASSET_CHECKOUT_DHL', 'ASSET_CHECKOUT_UPS', 'ASSET_CHECKOUT_BLUEDART', 'ASSET_CHECKOUT_DTDC', 'ASSET_CHECKOUT_AUTO']):
-                    transaction_type = 'Checkout'
-                    transaction_notes = f'Accessory checked out via ticket #{ticket_id} - inventory decreased'
-                elif ticket.category and ticket.category.name == 'ASSET_INTAKE':
-                    transaction_type = 'Intake'
-                    transaction_notes = f'Accessory received via asset intake ticket #{ticket_id} - inventory increased'
-                else:
-                    transaction_type = 'Return'
-                    transaction_notes = f'Accessory returned via ticket #{ticket_id} - inventory increased'
-                
-                transaction = AccessoryTransaction(
-                    accessory_id=accessory.id,
-                    transaction_type=transaction_type,
-                    quantity=quantity,  # Use the quantity from the form
-                    user_id=current_user.id,
-                    notes=transaction_notes
-                )
-                db_session.add(transaction)
-
                 db_session.commit()
 
                 return jsonify({
@@ -9974,7 +9940,7 @@ def update_accessory(ticket_id, accessory_id):
             # Get the original accessory from inventory
             original_accessory = db_session.query(Accessory).filter(
                 Accessory.id == accessory.original_accessory_id
-            ).with_for_update().first()
+            ).first()
             
             if original_accessory:
                 logger.info("=== INVENTORY UPDATE START ===")
@@ -9999,33 +9965,32 @@ def update_accessory(ticket_id, accessory_id):
                 
                 if is_asset_intake or is_return_ticket:
                     # Asset Intake/Return: more quantity in ticket = more inventory available
-                    original_accessory.available_quantity += quantity_difference
+                    available_delta = quantity_difference
                     operation = "increased" if quantity_difference > 0 else "decreased"
                     logger.info(f"ASSET INTAKE/RETURN: Adding {quantity_difference} to inventory")
                 else:
                     # Asset Checkout: more quantity in ticket = less inventory available
-                    original_accessory.available_quantity -= quantity_difference
+                    available_delta = -quantity_difference
                     operation = "decreased" if quantity_difference > 0 else "increased"
                     logger.info(f"ASSET CHECKOUT: Subtracting {quantity_difference} from inventory")
-                
-                logger.info(f"New inventory available_quantity: {original_accessory.available_quantity}")
-                logger.info(f"Inventory {operation} by {abs(quantity_difference)}")
-                logger.info("=== INVENTORY UPDATE END ===")
-                
-                # Create a transaction record
+
+                # Apply atomically (a decrease never takes stock below zero) and record it in the ledger
                 try:
-                    transaction = AccessoryTransaction(
-                        accessory_id=original_accessory.id,
+                    AccessoryStock.adjust(
+                        db_session, original_accessory.id,
+                        available_delta=available_delta,
                         transaction_type="Ticket Update",
-                        quantity=abs(quantity_difference),
                         transaction_number=f"UPD-{ticket_id}-{original_accessory.id}-{int(datetime.datetime.now().timestamp())}",
                         user_id=current_user.id,
                         notes=f"Quantity updated from {old_quantity} to {new_quantity} in ticket #{ticket_id} - inventory {operation}"
                     )
-                    db_session.add(transaction)
-                except Exception as tx_error:
-                    logger.info(f"Error creating transaction: {str(tx_error)}")
-                    # Don't fail the whole operation for transaction error
+                except InsufficientStockError as e:
+                    db_session.rollback()
+                    return jsonify({'success': False, 'message': f'Not enough quantity available. Only {e.available} units available.'}), 400
+
+                logger.info(f"New inventory available_quantity: {original_accessory.available_quantity}")
+                logger.info(f"Inventory {operation} by {abs(quantity_difference)}")
+                logger.info("=== INVENTORY UPDATE END ===")
         
         # Add a comment to the ticket
         if quantity_difference != 0:
@@ -10090,8 +10055,8 @@ def remove_accessory(ticket_id, accessory_id):
         
         # Check if this accessory was taken from inventory
         if original_id:
-            # Get the original accessory from inventory with a fresh query
-            original_accessory = db_session.query(Accessory).filter(Accessory.id == original_id).with_for_update().first()
+            # Get the original accessory from inventory (the stock update itself is atomic)
+            original_accessory = db_session.query(Accessory).filter(Accessory.id == original_id).first()
             
             if original_accessory:
                 # Increase inventory quantity when removing from ticket (returning to stock)
@@ -10099,30 +10064,18 @@ def remove_accessory(ticket_id, accessory_id):
                 logger.info(f"REMOVING ACCESSORY FROM TICKET: {quantity} {accessory_name}")
                 logger.info(f"Previous inventory quantity: {original_accessory.available_quantity}")
 
-                # Increase the available quantity to return to inventory
-                original_accessory.available_quantity += quantity
-                logger.info(f"New inventory quantity: {original_accessory.available_quantity}")
-
-                # Update status - if we have stock, it's available
-                if original_accessory.available_quantity > 0:
-                    original_accessory.status = 'Available'
-
-                logger.info("=== INVENTORY UPDATE END ===")
-
-                # Create a transaction record
-                try:
-                    transaction = AccessoryTransaction(
-                        accessory_id=original_id,
+                # Return the quantity to inventory and record the ledger entry
+                if quantity and quantity > 0:
+                    AccessoryStock.restock(
+                        db_session, original_id, quantity,
                         transaction_type="Ticket Removal",
-                        quantity=quantity,
                         transaction_number=f"IN-{ticket_id}-{original_id}-{int(datetime.datetime.now().timestamp())}",
                         user_id=current_user.id,
                         notes=f"Accessory removed from ticket #{ticket_id} - inventory increased (returned to stock)"
                     )
-                    db_session.add(transaction)
-                except Exception as tx_error:
-                    logger.info(f"Error creating transaction: {str(tx_error)}")
-                    raise tx_error
+                logger.info(f"New inventory quantity: {original_accessory.available_quantity}")
+
+                logger.info("=== INVENTORY UPDATE END ===")
         
         # Create a comment about the removal
         comment = Comment(
@@ -10248,22 +10201,19 @@ def fix_accessory_inventory(accessory_id):
         old_quantity = accessory.available_quantity
         difference = new_quantity - old_quantity
         
-        # Update the accessory quantity
-        accessory.available_quantity = new_quantity
-        
-        # Create a transaction record
+        # Update the accessory quantity and record the correction in the ledger
         timestamp = int(time.time())
         tx_number = f"FIX-{accessory.id}-{timestamp}"
-        
-        transaction = AccessoryTransaction(
-            accessory_id=accessory.id,
+
+        AccessoryStock.adjust(
+            db_session, accessory.id,
+            available_delta=difference,
             transaction_type="Manual Fix",
-            quantity=abs(difference),
             transaction_number=tx_number,
             user_id=current_user.id,
-            notes=f"Manual inventory correction from {old_quantity} to {new_quantity} ({'+' if difference >= 0 else '-'}{abs(difference)})"
+            notes=f"Manual inventory correction from {old_quantity} to {new_quantity} ({'+' if difference >= 0 else '-'}{abs(difference)})",
+            update_status=False
         )
-        db_session.add(transaction)
         
         # Commit changes
         db_session.commit()
@@ -11048,24 +10998,30 @@ def search_users():
         
         db_session = db_manager.get_session()
         try:
-            # Search users by username or email
-            # Exclude deactivated/deleted users
-            users = db_session.query(User).filter(
-                or_(
-                    User.username.ilike(f'%{query}%'),
-                    User.email.ilike(f'%{query}%')
-                ),
-                or_(User.is_deleted == False, User.is_deleted == None)
-            ).all()
+            from utils.autocomplete import USE_INDEX, autocomplete
+
+            if USE_INDEX:
+                users = autocomplete.search(db_session, 'users', query, limit=50)
+            else:
+                # Search users by username or email
+                # Exclude deactivated/deleted users
+                users = [{'id': user.id, 'username': user.username, 'email': user.email}
+                         for user in db_session.query(User).filter(
+                             or_(
+                                 User.username.ilike(f'%{query}%'),
+                                 User.email.ilike(f'%{query}%')
+                             ),
+                             or_(User.is_deleted == False, User.is_deleted == None)
+                         ).all()]
             
             # Convert to dict for JSON response
             users_data = []
             for user in users:
                 users_data.append({
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'display_name': f"{user.username} ({user.email})" if user.email != user.username else user.username
+                    'id': user['id'],
+                    'username': user['username'],
+                    'email': user['email'],
+                    'display_name': f"{user['username']} ({user['email']})" if user['email'] != user['username'] else user['username']
                 })
             
             return jsonify({
@@ -13132,7 +13088,7 @@ def extract_assets_page(ticket_id):
 @login_required
 def process_pdf_extraction(ticket_id):
     """Process PDF and extract asset information"""
-    from utils.pdf_extractor import extract_from_attachment
+    from utils.pdf_extraction_cache import PdfExtractionCache
 
     db_session = db_manager.get_session()
     try:
@@ -13157,7 +13113,7 @@ def process_pdf_extraction(ticket_id):
             return jsonify({'success': False, 'error': 'Attachment is not a PDF'}), 400
 
         # Extract assets from PDF
-        result = extract_from_attachment(attachment.file_path)
+        result = PdfExtractionCache.get_assets(db_session, attachment.file_path)
 
         if not result:
             return jsonify({'success': False, 'error': 'Failed to extract data from PDF'}), 500
@@ -13237,11 +13193,11 @@ def process_text_extraction(ticket_id):
 def get_next_asset_tag():
     """Get the next available asset tag number
 
-    Finds the highest SG-XXXX numeric asset tag and returns the next number.
-    Also accepts a 'count' parameter to reserve multiple sequential numbers.
+    Suggests the next unused SG-XXXX numeric asset tags without reserving
+    them; the numbers are claimed when the assets are created.
+    Also accepts a 'count' parameter to suggest multiple sequential numbers.
     """
-    from models.asset import Asset
-    import re
+    from utils.asset_tag_allocator import AssetTagAllocator, AssetTagAllocationError
 
     db_session = db_manager.get_session()
     try:
@@ -13251,51 +13207,20 @@ def get_next_asset_tag():
         if count > 1000:
             count = 1000  # Safety limit
 
-        # Find all SG-XXXX asset tags and extract the numeric portion
-        # Pattern: SG- followed by digits
-        assets = db_session.query(Asset.asset_tag).filter(
-            Asset.asset_tag.like('SG-%')
-        ).all()
-
-        max_num = 0
-        for (tag,) in assets:
-            if tag:
-                # Extract numeric portion after SG-
-                match = re.match(r'SG-(\d+)$', tag)
-                if match:
-                    num = int(match.group(1))
-                    if num > max_num:
-                        max_num = num
-
-        # Generate the next available numbers
-        next_tags = []
-        for i in range(count):
-            next_num = max_num + 1 + i
-            next_tags.append(f"SG-{next_num}")
-
-        # Verify these tags don't already exist (in case of non-sequential tags)
-        existing = db_session.query(Asset.asset_tag).filter(
-            Asset.asset_tag.in_(next_tags)
-        ).all()
-        existing_set = {t[0] for t in existing}
-
-        # If any exist, find alternatives
-        final_tags = []
-        current_num = max_num + 1
-        while len(final_tags) < count:
-            tag = f"SG-{current_num}"
-            if tag not in existing_set:
-                final_tags.append(tag)
-            current_num += 1
+        final_tags = AssetTagAllocator.peek_tags(db_session, 'SG-', count)
+        next_number = int(final_tags[0][len('SG-'):])
 
         return jsonify({
             'success': True,
-            'next_number': max_num + 1,
-            'next_tag': final_tags[0] if final_tags else f"SG-{max_num + 1}",
+            'next_number': next_number,
+            'next_tag': final_tags[0],
             'tags': final_tags,
             'count': len(final_tags)
         })
 
+    except AssetTagAllocationError as e:
+        logger.warning(f"Error getting next asset tag: {str(e)}")
+        return jsonify({'success': False, 'error': 'No free asset tags found. Please enter the tags manually.'}), 409
     except Exception as e:
         logger.error(f"Error getting next asset tag: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -13307,9 +13232,8 @@ def get_next_asset_tag():
 @login_required
 def create_extracted_assets(ticket_id):
     """Create assets from extracted PDF data"""
-    from models.asset import Asset, AssetStatus
-    from sqlalchemy import text
-    import uuid
+    from models.asset import AssetStatus
+    from utils.asset_ingest import AssetIngest
 
     db_session = db_manager.get_session()
     try:
@@ -13351,90 +13275,60 @@ def create_extracted_assets(ticket_id):
             'US': 'United States'
         }
 
-        created_assets = []
-        errors = []
-
+        records = []
         for asset_data in assets_data:
-            try:
-                serial_num = asset_data.get('serial_num', '').strip()
-
-                if not serial_num:
-                    continue
-
-                # Check if serial already exists
-                existing = db_session.query(Asset).filter(Asset.serial_num == serial_num).first()
-                if existing:
-                    errors.append(f"Serial {serial_num} already exists (Asset #{existing.id})")
-                    continue
-
-                # Get asset tag from frontend (user-provided) or generate one
-                asset_tag = asset_data.get('asset_tag', '').strip()
-                if not asset_tag:
-                    # Generate asset tag if not provided
-                    asset_tag = f"AST-{uuid.uuid4().hex[:8].upper()}"
-
-                # Check asset tag uniqueness
-                existing_tag = db_session.query(Asset).filter(Asset.asset_tag == asset_tag).first()
-                if existing_tag:
-                    errors.append(f"Asset tag {asset_tag} already exists (Asset #{existing_tag.id})")
-                    continue
-
-                # Get country from frontend and convert to full name
-                country_code = asset_data.get('country', 'SG')
-                country = country_names.get(country_code, country_code)
-
-                # Remove leading 'S' from serial number if present
-                if serial_num and serial_num.startswith('S'):
-                    serial_num = serial_num[1:]
-
-                # Create asset
-                new_asset = Asset(
-                    asset_tag=asset_tag,
-                    serial_num=serial_num,
-                    name=asset_data.get('name', ''),
-                    model=asset_data.get('model', ''),
-                    manufacturer=asset_data.get('manufacturer', 'Apple'),
-                    category='APPLE',
-                    asset_type='APPLE',  # Set asset_type for UI display
-                    status=AssetStatus.IN_STOCK,
-                    po=po_number,
-                    cpu_type=asset_data.get('cpu_type', ''),
-                    cpu_cores=asset_data.get('cpu_cores', ''),
-                    gpu_cores=asset_data.get('gpu_cores', ''),
-                    memory=asset_data.get('memory', ''),
-                    harddrive=asset_data.get('harddrive', ''),
-                    hardware_type=asset_data.get('hardware_type', 'Laptop'),
-                    condition=asset_data.get('condition', 'New'),
-                    erased='COMPLETED',  # New assets from delivery orders are factory fresh
-                    company_id=company_id,
-                    customer=customer_name,  # Set customer string field for display
-                    country=country,
-                    receiving_date=datetime.datetime.utcnow(),
-                    notes=f"Imported from packing list PDF - Ticket #{ticket_id}"
-                )
-
-                db_session.add(new_asset)
-                db_session.flush()
+            serial_num = asset_data.get('serial_num', '').strip()
+            if not serial_num:
+                continue
 
-                # Link asset to ticket
-                try:
-                    stmt = text("""
-                        INSERT INTO ticket_assets (ticket_id, asset_id)
-                        VALUES (:ticket_id, :asset_id)
-                    """)
-                    db_session.execute(stmt, {"ticket_id": ticket_id, "asset_id": new_asset.id})
-                except Exception as link_error:
-                    logger.warning(f"Error linking asset to ticket: {link_error}")
-
-                created_assets.append({
-                    'id': new_asset.id,
-                    'asset_tag': new_asset.asset_tag,
-                    'serial_num': new_asset.serial_num,
-                    'name': new_asset.name
-                })
+            # Remove leading 'S' from serial number if present
+            if serial_num.startswith('S'):
+                serial_num = serial_num[1:]
+
+            # Get country from frontend and convert to full name
+            country_code = asset_data.get('country', 'SG')
+
+            records.append({
+                'asset_tag': asset_data.get('asset_tag', ''),  # Missing tags are allocated below
+                'serial_num': serial_num,
+                'name': asset_data.get('name', ''),
+                'model': asset_data.get('model', ''),
+                'manufacturer': asset_data.get('manufacturer', 'Apple'),
+                'category': 'APPLE',
+                'asset_type': 'APPLE',  # Set asset_type for UI display
+                'status': AssetStatus.IN_STOCK,
+                'po': po_number,
+                'cpu_type': asset_data.get('cpu_type', ''),
+                'cpu_cores': asset_data.get('cpu_cores', ''),
+                'gpu_cores': asset_data.get('gpu_cores', ''),
+                'memory': asset_data.get('memory', ''),
+                'harddrive': asset_data.get('harddrive', ''),
+                'hardware_type': asset_data.get('hardware_type', 'Laptop'),
+                'condition': asset_data.get('condition', 'New'),
+                'erased': 'COMPLETED',  # New assets from delivery orders are factory fresh
+                'company_id': company_id,
+                'customer': customer_name,  # Set customer string field for display
+                'country': country_names.get(country_code, country_code),
+                'receiving_date': datetime.datetime.utcnow(),
+                'notes': f"Imported from packing list PDF - Ticket #{ticket_id}"
+            })
 
-            except Exception as e:
-                errors.append(f"Error creating asset {asset_data.get('serial_num', 'unknown')}: {str(e)}")
+        # Set-based duplicate checks, block tag allocation, bulk insert + ticket links
+        result = AssetIngest(
+            db_session,
+            user_id=current_user.id,
+            ticket_id=ticket_id,
+            tag_prefix='AST-',
+            history_notes=f"Imported from packing list PDF - Ticket #{ticket_id}"
+        ).ingest(records)
+
+        created_assets = [{
+            'id': created['id'],
+            'asset_tag': created['asset_tag'],
+            'serial_num': created['serial_num'],
+            'name': created['name']
+        } for created in result['created']]
+        errors = [error['error'] for error in result['errors']]
 
         db_session.commit()
 
@@ -13458,7 +13352,8 @@ def create_extracted_assets(ticket_id):
 @login_required
 def extract_shipping_info(ticket_id):
     """Extract shipping info from PDF and update ticket description"""
-    from utils.pdf_extractor import extract_shipping_info_from_pdf, format_shipping_info_for_description
+    from utils.pdf_extractor import format_shipping_info_for_description
+    from utils.pdf_extraction_cache import PdfExtractionCache
 
     db_session = db_manager.get_session()
     try:
@@ -13483,7 +13378,7 @@ def extract_shipping_info(ticket_id):
             return jsonify({'success': False, 'error': 'Attachment is not a PDF'}), 400
 
         # Extract shipping info from first page
-        info = extract_shipping_info_from_pdf(attachment.file_path)
+        info = PdfExtractionCache.get_shipping_info(db_session, attachment.file_path)
 
         if not info:
             return jsonify({'success': False, 'error': 'Failed to extract shipping info from PDF'}), 500
@@ -14001,7 +13896,7 @@ def remediate_assets_page(ticket_id):
 @login_required
 def remediate_assets_match(ticket_id):
     """Extract from PDF and match to existing assets by serial number"""
-    from utils.pdf_extractor import extract_from_attachment
+    from utils.pdf_extraction_cache import PdfExtractionCache
     from models.asset import Asset
 
     db_session = db_manager.get_session()
@@ -14030,7 +13925,7 @@ def remediate_assets_match(ticket_id):
             return jsonify({'success': False, 'error': 'Attachment is not a PDF'}), 400
 
         # Extract assets from PDF using the corrected logic
-        result = extract_from_attachment(attachment.file_path)
+        result = PdfExtractionCache.get_assets(db_session, attachment.file_path)
 
         if not result:
             return jsonify({'success': False, 'error': 'Failed to extract data from PDF'}), 500
@@ -14949,9 +14844,14 @@ def get_tracking_refresh_status():
 
         count = query.count()
 
+        # Hours since each open package was last checked (tracking scheduler metric)
+        from utils.tracking_scheduler import load_packages, staleness_report
+        staleness = staleness_report(load_packages(db_session))
+
         return jsonify({
             'success': True,
             'tickets_with_tracking': count,
+            'staleness': staleness,
             'filters': {
                 'carrier': filter_carrier,
                 'category': filter_category
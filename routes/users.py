@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, session, request, jsonify
 from utils.auth_decorators import login_required, admin_required, super_admin_required
-from utils.user_store import UserStore
-from utils.ticket_store import TicketStore
+from utils.store_instances import user_store, ticket_store
 from utils.snipeit_api import get_all_assets
 from forms.user_form import UserCreateForm
 from models.user import UserType, Country
@@ -14,8 +13,6 @@ logger = logging.getLogger(__name__)
 
 
 users_bp = Blueprint('users', __name__, url_prefix='/users')
-user_store = UserStore()
-ticket_store = TicketStore()
 
 @users_bp.route('/profile/<int:user_id>')
 @login_required
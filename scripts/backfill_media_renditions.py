@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Hash existing uploads and render their thumbnails / PDF previews.
+
+Uploads made before the media pipeline have no content hash, so listings
+show them without thumbnails. Run once after migrations/add_media_renditions.py:
+    cd /home/ainventory/inventory && python scripts/backfill_media_renditions.py
+
+Safe to re-run; files that already have renditions are skipped.
+"""
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal
+from models.accessory import Accessory
+from models.asset import Asset
+from models.ticket_attachment import TicketAttachment
+from utils.media_pipeline import PROJECT_ROOT, render_renditions, source_type_for
+from utils.pdf_extraction_cache import file_sha256
+
+
+def backfill(db, limit=None):
+    """
+    Set missing content hashes and render missing renditions.
+
+    Returns:
+        dict: {'hashed': int, 'rendered': int, 'missing_files': int, 'failed': int}
+    """
+    stats = {'hashed': 0, 'rendered': 0, 'missing_files': 0, 'failed': 0}
+
+    attachments = db.query(TicketAttachment).filter(TicketAttachment.content_sha256.is_(None))
+    images = [
+        db.query(model).filter(model.image_sha256.is_(None), model.image_url.like('/static/uploads/%'))
+        for model in (Asset, Accessory)
+    ]
+
+    jobs = []
+    for attachment in attachments.limit(limit).all() if limit else attachments.all():
+        jobs.append((attachment, 'content_sha256', attachment.file_path, attachment.file_type))
+    for query in images:
+        for owner in query.limit(limit).all() if limit else query.all():
+            path = os.path.join(PROJECT_ROOT, owner.image_url.lstrip('/'))
+            jobs.append((owner, 'image_sha256', path, owner.image_url.rsplit('.', 1)[-1]))
+
+    for owner, column, path, extension in jobs:
+        if not path or not os.path.exists(path):
+            stats['missing_files'] += 1
+            continue
+
+        sha256 = file_sha256(path)
+        setattr(owner, column, sha256)
+        stats['hashed'] += 1
+
+        source_type = source_type_for(extension)
+        if not source_type:
+            continue
+        try:
+            if render_renditions(db, path, sha256, source_type):
+                stats['rendered'] += 1
+        except Exception as e:
+            stats['failed'] += 1
+            print(f"  Failed to render {path}: {str(e)}")
+
+    db.commit()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill media renditions for existing uploads')
+    parser.add_argument('--limit', type=int, default=None, help='Process at most this many rows per table')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = backfill(db, limit=args.limit)
+    finally:
+        db.close()
+
+    print(f"Hashed {stats['hashed']} files, rendered {stats['rendered']}")
+    print(f"Missing files: {stats['missing_files']}, render failures: {stats['failed']}")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark the autocomplete index against the ILIKE queries it replaced.
+
+Seeds (or reuses) the synthetic database of benchmark_endpoints.py, then
+"types" names, emails, asset tags and serials one keystroke at a time and
+runs every prefix through the in-memory index (utils/autocomplete.py) and
+through the old ILIKE '%term%' query of the same endpoint. Reports index
+build time and p50/p95/max latency per source:
+
+    cd /home/ainventory/inventory
+    python scripts/benchmark_autocomplete.py --scale 0.1 --keystrokes 10000
+
+Pass --no-sql to time the index alone.
+"""
+import sys
+import os
+import argparse
+import random
+import time
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'scripts'))
+
+from benchmark_endpoints import DEFAULT_DB, ensure_database, percentile  # noqa: E402
+
+
+def typed_prefixes(values, keystrokes, rng):
+    """Prefixes of random values, as typed one character at a time"""
+    prefixes = []
+    while len(prefixes) < keystrokes:
+        value = rng.choice(values).lower()
+        prefixes += [value[:length] for length in range(1, len(value) + 1)]
+    return prefixes[:keystrokes]
+
+
+def timed(function, prefixes):
+    samples = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        function(prefix)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summary(samples):
+    return (f"p50 {percentile(samples, 0.50):7.3f} ms  p95 {percentile(samples, 0.95):7.3f} ms  "
+            f"max {max(samples):7.2f} ms")
+
+
+def run(db_path, keystrokes, seed, compare_sql=True):
+    from sqlalchemy import create_engine, or_
+    from sqlalchemy.orm import sessionmaker
+    from models.asset import Asset
+    from models.customer_user import CustomerUser
+    from models.user import User
+    from utils.autocomplete import AutocompleteIndex
+
+    rng = random.Random(seed)
+    db_session = sessionmaker(bind=create_engine(f'sqlite:///{db_path}'))()
+    index = AutocompleteIndex()
+
+    started = time.perf_counter()
+    index.refresh(db_session)
+    print(f"Index built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # Source -> (typed values, old ILIKE query)
+    cases = {
+        'users': (
+            [value for row in db_session.query(User.username, User.email) for value in row if value],
+            lambda term: db_session.query(User).filter(
+                or_(User.username.ilike(f'%{term}%'), User.email.ilike(f'%{term}%'))
+            ).limit(50).all()
+        ),
+        'customers': (
+            [value for row in db_session.query(CustomerUser.name, CustomerUser.email) for value in row if value],
+            lambda term: db_session.query(CustomerUser).filter(
+                or_(CustomerUser.name.ilike(f'%{term}%'), CustomerUser.email.ilike(f'%{term}%'),
+                    CustomerUser.contact_number.ilike(f'%{term}%'))
+            ).limit(50).all()
+        ),
+        'assets': (
+            [value for row in db_session.query(Asset.asset_tag, Asset.serial_num) for value in row if value],
+            lambda term: db_session.query(Asset).filter(
+                or_(Asset.serial_num.ilike(f'%{term}%'), Asset.asset_tag.ilike(f'%{term}%'),
+                    Asset.name.ilike(f'%{term}%'), Asset.model.ilike(f'%{term}%'))
+            ).limit(5).all()
+        ),
+    }
+
+    per_source = max(1, keystrokes // len(cases))
+    print(f"{per_source * len(cases)} keystroke queries:")
+    for source, (values, sql) in cases.items():
+        prefixes = typed_prefixes(values, per_source, rng)
+        samples = timed(lambda term: index.search(db_session, source, term, limit=50), prefixes)
+        print(f"  {source:<10} index  {summary(samples)}")
+        if compare_sql:
+            samples = timed(sql, prefixes)
+            print(f"  {source:<10} ILIKE  {summary(samples)}")
+    db_session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the autocomplete index on synthetic data')
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file for the synthetic data')
+    parser.add_argument('--scale', type=float, default=1.0, help='Fraction of the full data volume')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and typed values')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the database even if it exists')
+    parser.add_argument('--keystrokes', type=int, default=10_000, help='Prefix queries to run')
+    parser.add_argument('--no-sql', action='store_true', help='Skip the ILIKE comparison')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    ensure_database(db_path, args.scale, args.seed, reseed=args.reseed)
+    run(db_path, args.keystrokes, args.seed, compare_sql=not args.no_sql)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
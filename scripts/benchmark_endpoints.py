@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Benchmark the hot endpoints against a seeded synthetic database.
+
+Seeds a SQLite database with production-like volumes (100k assets, 200k
+tickets with tracking histories and comments, 5k customers, grouped
+companies, queues), then drives the Flask test client through the ticket
+list/view, SF inventory, global search, dashboard widgets, reports, /api/v2
+lists and the mobile API. Reports p50/p95 latency, queries and DB time per
+request (from the Server-Timing header) and peak RSS, and compares them
+with a stored baseline so regressions fail the run. Response size before
+and after compression, and whether an If-None-Match re-fetch gets a 304,
+are reported too:
+
+    cd /home/ainventory/inventory
+    python scripts/benchmark_endpoints.py --update-baseline   # on main, once
+    python scripts/benchmark_endpoints.py                     # on a branch; exits 1 on regressions
+
+The database is reused between runs with the same --scale/--seed
+(--reseed forces a rebuild). Use a smaller --scale for quick local checks;
+a baseline is only comparable at the scale it was recorded with.
+Logging below ERROR is disabled while measuring.
+"""
+import sys
+import os
+import argparse
+import json
+import logging
+import random
+import resource
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+DEFAULT_DB = os.path.join(tempfile.gettempdir(), 'inventory_benchmark.db')
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, 'scripts', 'benchmark_baseline.json')
+
+# Row counts at --scale 1.0 (minimums keep tiny scales usable)
+VOLUMES = {
+    'parent_companies': (10, 2),
+    'child_companies': (50, 2),
+    'queues': (12, 3),
+    'users': (500, 5),
+    'customers': (5000, 20),
+    'accessories': (500, 10),
+    'assets': (100_000, 100),
+    'tickets': (200_000, 200),
+}
+INSERT_BATCH = 5000
+
+COUNTRIES = ['Singapore', 'Malaysia', 'Philippines', 'Japan', 'Australia', 'India', 'Hong Kong', 'USA']
+MODELS = [('MacBook Pro 14', 'Apple', 'A2442'), ('MacBook Air 13', 'Apple', 'A2337'),
+          ('ThinkPad X1 Carbon', 'Lenovo', '20XW'), ('Latitude 7440', 'Dell', 'P161G'),
+          ('EliteBook 840', 'HP', 'G9'), ('iPad Pro 11', 'Apple', 'A2759')]
+CARRIERS = ['singpost', 'dhl', 'ups', 'fedex']
+SEARCH_TERMS = ['MacBook', 'Lenovo', 'SN00012', 'Singapore', 'customer 42', 'AT-0001']
+DASHBOARD_WIDGETS = ['inventory_stats', 'ticket_stats', 'customer_stats', 'queue_stats',
+                     'weekly_tickets_chart', 'asset_status_chart']
+
+# (name, path, auth) - {ticket_id} and {term} are filled per request;
+# auth is 'session' (web login) or 'token' (mobile JWT)
+ENDPOINTS = [
+    ('tickets.list_tickets', '/tickets/', 'session'),
+    ('tickets.view_ticket', '/tickets/{ticket_id}', 'session'),
+    ('inventory.view_inventory', '/inventory/?use_classic=1', 'session'),
+    ('inventory.api_sf_filters', '/inventory/api/sf/filters', 'session'),
+    ('inventory.api_sf_assets', '/inventory/api/sf/assets', 'session'),
+    ('search_api.global_search', '/api/v1/search/global?q={term}', 'token'),
+] + [
+    (f'dashboard.widget.{widget}', f'/dashboard/api/widget/{widget}/data', 'session')
+    for widget in DASHBOARD_WIDGETS
+] + [
+    ('reports.cases', '/reports/cases', 'session'),
+    ('reports.assets', '/reports/assets', 'session'),
+    ('api_v2.tickets', '/api/v2/tickets', 'token'),
+    ('api_v2.assets', '/api/v2/assets', 'token'),
+    ('api_v2.customers', '/api/v2/customers', 'token'),
+    ('api_v2.accessories', '/api/v2/accessories', 'token'),
+    ('mobile_api.tickets', '/api/mobile/v1/tickets', 'token'),
+    ('mobile_api.ticket_detail', '/api/mobile/v1/tickets/{ticket_id}', 'token'),
+    ('mobile_api.inventory', '/api/mobile/v1/inventory', 'token'),
+    ('mobile_api.dashboard', '/api/mobile/v1/dashboard', 'token'),
+    ('mobile_api.sync_tickets', '/api/mobile/v1/sync/tickets', 'token'),
+]
+
+
+def volumes_for(scale):
+    return {name: max(minimum, int(count * scale)) for name, (count, minimum) in VOLUMES.items()}
+
+
+def seed_database(db_url, scale=1.0, seed=42):
+    """
+    Create the schema and insert synthetic rows with bulk inserts.
+
+    Returns:
+        dict: Row counts per table
+    """
+    import importlib
+    import pkgutil
+    from sqlalchemy import create_engine, event
+    import models
+    from models.base import Base
+    from models.accessory import Accessory
+    from models.asset import Asset, AssetStatus, ticket_assets
+    from models.comment import Comment
+    from models.company import Company
+    from models.customer_user import CustomerUser
+    from models.queue import Queue
+    from models.ticket import Ticket, TicketCategory, TicketPriority, TicketStatus
+    from models.tracking_history import TrackingHistory
+    from models.user import User, UserType
+
+    rng = random.Random(seed)
+    counts = volumes_for(scale)
+    now = datetime(2026, 1, 1)
+
+    engine = create_engine(db_url)
+
+    @event.listens_for(engine, 'connect')
+    def _fast_sqlite(dbapi_connection, _):
+        dbapi_connection.execute('PRAGMA journal_mode=WAL')
+        dbapi_connection.execute('PRAGMA synchronous=OFF')
+
+    # Register every table, including models not imported by models/__init__
+    for module in pkgutil.iter_modules(models.__path__):
+        importlib.import_module(f'models.{module.name}')
+    Base.metadata.create_all(engine)
+
+    def insert(conn, model_or_table, rows):
+        table = getattr(model_or_table, '__table__', model_or_table)
+        # executemany needs the same keys in every row; absent means NULL
+        columns = {key for row in rows for key in row}
+        rows = [{column: row.get(column) for column in columns} for row in rows]
+        for start in range(0, len(rows), INSERT_BATCH):
+            conn.execute(table.insert(), rows[start:start + INSERT_BATCH])
+        return len(rows)
+
+    def when(days_back):
+        return now - timedelta(days=rng.uniform(0, days_back), seconds=rng.randint(0, 86400))
+
+    inserted = {}
+    with engine.begin() as conn:
+        # Companies: parents with child companies (company grouping)
+        parents = counts['parent_companies']
+        companies = [{'id': i, 'name': f'Group {i}', 'display_name': f'Group {i}', 'is_parent_company': True,
+                      'created_at': when(900)} for i in range(1, parents + 1)]
+        for i in range(parents + 1, parents + counts['child_companies'] + 1):
+            companies.append({'id': i, 'name': f'Company {i}', 'parent_company_id': rng.randint(1, parents),
+                              'is_parent_company': False, 'created_at': when(900)})
+        inserted['companies'] = insert(conn, Company, companies)
+        company_ids = [company['id'] for company in companies]
+
+        inserted['queues'] = insert(conn, Queue, [
+            {'id': i, 'name': f'Queue {i}', 'description': f'Benchmark queue {i}', 'display_order': i}
+            for i in range(1, counts['queues'] + 1)
+        ])
+
+        user_types = [UserType.SUPER_ADMIN] * 2 + [UserType.SUPERVISOR] * 4 + [UserType.COUNTRY_ADMIN] * 3 + [UserType.CLIENT]
+        users = [{'id': 1, 'username': 'bench_admin', 'email': 'bench_admin@example.com', 'password_hash': 'x',
+                  'user_type': UserType.SUPER_ADMIN, 'created_at': now}]
+        for i in range(2, counts['users'] + 1):
+            users.append({'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+                          'user_type': rng.choice(user_types), 'company_id': rng.choice(company_ids),
+                          'assigned_country': rng.choice(COUNTRIES), 'created_at': when(900)})
+        inserted['users'] = insert(conn, User, users)
+
+        inserted['customer_users'] = insert(conn, CustomerUser, [
+            {'id': i, 'name': f'Customer {i}', 'contact_number': f'+65 9{i:07d}', 'email': f'customer{i}@example.com',
+             'address': f'{i} Benchmark Road', 'company_id': rng.choice(company_ids),
+             'country': rng.choice(COUNTRIES), 'created_at': when(900)}
+            for i in range(1, counts['customers'] + 1)
+        ])
+
+        inserted['accessories'] = insert(conn, Accessory, [
+            {'id': i, 'name': f'Accessory {i}', 'category': rng.choice(['Charger', 'Mouse', 'Keyboard', 'Dock']),
+             'manufacturer': rng.choice(['Apple', 'Logitech', 'Dell']), 'total_quantity': 50,
+             'available_quantity': rng.randint(0, 50), 'country': rng.choice(COUNTRIES), 'status': 'Available'}
+            for i in range(1, counts['accessories'] + 1)
+        ])
+
+        statuses = list(AssetStatus)
+        assets = []
+        for i in range(1, counts['assets'] + 1):
+            name, manufacturer, model = rng.choice(MODELS)
+            assets.append({
+                'id': i, 'asset_tag': f'AT-{i:07d}', 'serial_num': f'SN{i:09d}', 'name': name,
+                'model': model, 'manufacturer': manufacturer, 'category': 'Laptop', 'asset_type': 'Laptop',
+                'hardware_type': name, 'status': rng.choice(statuses), 'company_id': rng.choice(company_ids),
+                'customer_id': rng.randint(1, counts['customers']) if rng.random() < 0.6 else None,
+                'country': rng.choice(COUNTRIES), 'inventory': 'Benchmark', 'receiving_date': when(900),
+                'created_at': when(900),
+            })
+        inserted['assets'] = insert(conn, Asset, assets)
+        del assets
+
+        categories = list(TicketCategory)
+        ticket_statuses = list(TicketStatus)
+        priorities = list(TicketPriority)
+        tickets, histories, comments, links = [], [], [], []
+        for i in range(1, counts['tickets'] + 1):
+            created = when(720)
+            tracking = f'SG{i:010d}' if rng.random() < 0.3 else None
+            tickets.append({
+                'id': i, 'subject': f'Ticket {i}', 'description': f'Synthetic ticket {i}',
+                'requester_id': rng.randint(1, counts['users']), 'assigned_to_id': rng.randint(1, counts['users']),
+                'status': rng.choice(ticket_statuses), 'priority': rng.choice(priorities),
+                'category': rng.choice(categories), 'queue_id': rng.randint(1, counts['queues']),
+                'customer_id': rng.randint(1, counts['customers']), 'country': rng.choice(COUNTRIES),
+                'asset_id': rng.randint(1, counts['assets']) if rng.random() < 0.5 else None,
+                'shipping_tracking': tracking, 'shipping_carrier': rng.choice(CARRIERS) if tracking else None,
+                'created_at': created, 'updated_at': created + timedelta(hours=rng.randint(1, 400)),
+            })
+            if tracking:
+                for event_number in range(rng.randint(1, 3)):
+                    histories.append({
+                        'tracking_number': tracking, 'carrier': tickets[-1]['shipping_carrier'],
+                        'status': rng.choice(['In Transit', 'Out for Delivery', 'Delivered']),
+                        'last_updated': created + timedelta(days=event_number + 1), 'ticket_id': i,
+                        'tracking_type': 'primary',
+                        'tracking_data': json.dumps([{'date': str(created.date()), 'status': 'Picked up',
+                                                      'location': 'Singapore'}] * (event_number + 1)),
+                    })
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                author = rng.randint(1, counts['users'])
+                mention = f"@user{rng.randint(2, counts['users'])} " if rng.random() < 0.2 else ''
+                comments.append({'content': f'{mention}Update on ticket {i}', 'ticket_id': i, 'user_id': author,
+                                  'created_at': created + timedelta(hours=rng.randint(1, 200))})
+            if rng.random() < 0.25:
+                links.append({'ticket_id': i, 'asset_id': rng.randint(1, counts['assets'])})
+
+            if len(tickets) >= INSERT_BATCH:
+                inserted['tickets'] = inserted.get('tickets', 0) + insert(conn, Ticket, tickets)
+                tickets = []
+        inserted['tickets'] = inserted.get('tickets', 0) + insert(conn, Ticket, tickets)
+        inserted['tracking_history'] = insert(conn, TrackingHistory, histories)
+        inserted['comments'] = insert(conn, Comment, comments)
+        inserted['ticket_assets'] = insert(conn, ticket_assets, links)
+
+    engine.dispose()
+    return inserted
+
+
+def ensure_database(db_path, scale, seed, reseed=False):
+    """Seed db_path unless it already holds data for the same scale/seed"""
+    meta_path = f'{db_path}.json'
+    expected = {'scale': scale, 'seed': seed}
+    if not reseed and os.path.exists(db_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f).get('params') == expected:
+                return False
+
+    for path in (db_path, f'{db_path}-wal', f'{db_path}-shm', meta_path):
+        if os.path.exists(path):
+            os.remove(path)
+    started = time.perf_counter()
+    counts = seed_database(f'sqlite:///{db_path}', scale=scale, seed=seed)
+    with open(meta_path, 'w') as f:
+        json.dump({'params': expected, 'counts': counts}, f, indent=2)
+    print(f"Seeded {db_path} in {time.perf_counter() - started:.0f}s: "
+          + ', '.join(f'{table}={count}' for table, count in counts.items()))
+    return True
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    return statistics.quantiles(ordered, n=100, method='inclusive')[int(fraction * 100) - 1]
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+def response_sizes(response):
+    """(bytes on the wire, uncompressed bytes) of a test client response"""
+    data = response.get_data()
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        import gzip
+        return len(data), len(gzip.decompress(data))
+    if encoding == 'br':
+        import brotli
+        return len(data), len(brotli.decompress(data))
+    return len(data), len(data)
+
+
+def parse_server_timing(header):
+    """(queries, db_ms) from the Server-Timing header set by utils.sql_instrumentation"""
+    queries, db_ms = None, None
+    for metric in (header or '').split(','):
+        parts = [part.strip() for part in metric.split(';')]
+        if parts[0] != 'db':
+            continue
+        for part in parts[1:]:
+            if part.startswith('dur='):
+                db_ms = float(part[4:])
+            elif part.startswith('desc='):
+                queries = int(part[5:].strip('"').split()[0])
+    return queries, db_ms
+
+
+def run_benchmarks(db_path, iterations=20, only=None, seed=42):
+    """
+    Drive every endpoint through the Flask test client.
+
+    DATABASE_URL must point at db_path before the first app import.
+
+    Returns:
+        dict: {'endpoints': {name: stats}, 'peak_rss_mb': float}
+    """
+    import jwt
+    import app as app_module
+
+    # N+1 warnings are reported through the query column instead
+    logging.disable(logging.WARNING)
+    app = app_module.app
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    with open(f'{db_path}.json') as f:
+        ticket_count = json.load(f)['counts']['tickets']
+    rng = random.Random(seed)
+    token = jwt.encode({'user_id': 1}, app.config['SECRET_KEY'], algorithm='HS256')
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['user_id'] = 1
+        session['user_type'] = 'SUPER_ADMIN'
+
+    results = {}
+    for name, path, auth in ENDPOINTS:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        headers = {'Accept-Encoding': 'gzip, br'}
+        if auth == 'token':
+            headers['Authorization'] = f'Bearer {token}'
+        latencies, queries, db_times, statuses = [], [], [], set()
+        for iteration in range(iterations + 1):
+            url = path.format(ticket_id=rng.randint(1, ticket_count), term=rng.choice(SEARCH_TERMS))
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            wire_bytes, raw_bytes = response_sizes(response)
+            response.close()
+            statuses.add(response.status_code)
+            if iteration == 0:
+                continue  # warm-up: template compilation, first-use caches
+            latencies.append(elapsed_ms)
+            query_count, db_ms = parse_server_timing(response.headers.get('Server-Timing'))
+            if query_count is not None:
+                queries.append(query_count)
+                db_times.append(db_ms)
+
+        # Re-fetch the last URL with its ETag: 304 when the API layer validates it
+        etag = response.headers.get('ETag')
+        revalidate_status = None
+        if etag:
+            revalidated = client.get(url, headers=dict(headers, **{'If-None-Match': etag}))
+            revalidate_status = revalidated.status_code
+            revalidated.close()
+
+        results[name] = {
+            'p50_ms': round(percentile(latencies, 0.5), 1),
+            'p95_ms': round(percentile(latencies, 0.95), 1),
+            'queries': max(queries) if queries else None,
+            'db_ms_p50': round(percentile(db_times, 0.5), 1) if db_times else None,
+            'status': sorted(statuses),
+            'bytes': wire_bytes,
+            'raw_bytes': raw_bytes,
+            'revalidate_status': revalidate_status,
+        }
+        print(f"  {name:34s} p50 {results[name]['p50_ms']:8.1f} ms  p95 {results[name]['p95_ms']:8.1f} ms  "
+              f"queries {results[name]['queries']!s:>5}  {raw_bytes / 1024:8.1f} -> {wire_bytes / 1024:7.1f} kB  "
+              f"status {results[name]['status']}{' 304' if revalidate_status == 304 else ''}")
+
+    logging.disable(logging.NOTSET)
+    return {'endpoints': results, 'peak_rss_mb': round(peak_rss_mb(), 1)}
+
+
+def compare_to_baseline(report, baseline, latency_tolerance=0.25, min_latency_ms=5.0,
+                        query_tolerance=0, rss_tolerance=0.2):
+    """
+    List regressions of report against baseline.
+
+    Latency regresses when p95 grows by more than latency_tolerance and by at
+    least min_latency_ms (noise floor); query counts are deterministic, so any
+    growth beyond query_tolerance regresses.
+
+    Returns:
+        list of str
+    """
+    problems = []
+    if baseline.get('meta', {}).get('scale') != report.get('meta', {}).get('scale'):
+        return [f"baseline was recorded at scale {baseline.get('meta', {}).get('scale')}, "
+                f"this run used {report.get('meta', {}).get('scale')}"]
+
+    for name, current in report['endpoints'].items():
+        if any(status >= 400 for status in current['status']):
+            problems.append(f"{name}: HTTP {current['status']}")
+        previous = baseline['endpoints'].get(name)
+        if not previous:
+            continue
+        growth = current['p95_ms'] - previous['p95_ms']
+        if growth > min_latency_ms and current['p95_ms'] > previous['p95_ms'] * (1 + latency_tolerance):
+            problems.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current['queries'] is not None and previous.get('queries') is not None \
+                and current['queries'] > previous['queries'] + query_tolerance:
+            problems.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+
+    if baseline.get('peak_rss_mb') and report['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + rss_tolerance):
+        problems.append(f"peak RSS {baseline['peak_rss_mb']} -> {report['peak_rss_mb']} MB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark hot endpoints on synthetic data')
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file for the synthetic data')
+    parser.add_argument('--scale', type=float, default=1.0, help='Fraction of the full data volume')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and request order')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the database even if it exists')
+    parser.add_argument('--iterations', type=int, default=20, help='Measured requests per endpoint')
+    parser.add_argument('--only', action='append', help='Run endpoints whose name contains this (repeatable)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare with')
+    parser.add_argument('--update-baseline', action='store_true', help='Write this run as the new baseline')
+    parser.add_argument('--output', help='Also write this run\'s report to a JSON file')
+    parser.add_argument('--latency-tolerance', type=float, default=0.25, help='Allowed relative p95 growth')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    # Set before anything imports database.py, which binds its engine at import
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['SQL_INSTRUMENTATION_SAMPLE_RATE'] = '1'
+    ensure_database(db_path, args.scale, args.seed, reseed=args.reseed)
+
+    print(f"Benchmarking {args.iterations} requests per endpoint:")
+    report = run_benchmarks(db_path, iterations=args.iterations, only=args.only, seed=args.seed)
+    report['meta'] = {
+        'scale': args.scale,
+        'seed': args.seed,
+        'iterations': args.iterations,
+        'python': sys.version.split()[0],
+        'recorded_at': datetime.utcnow().isoformat(timespec='seconds'),
+    }
+    print(f"Peak RSS: {report['peak_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    problems = compare_to_baseline(report, baseline, latency_tolerance=args.latency_tolerance)
+    if problems:
+        print(f"\nREGRESSIONS against {args.baseline}:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
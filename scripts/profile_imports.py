@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the app (a digest of `python -X importtime`).
+
+Shows where worker boot time goes: slowest modules by cumulative and self
+time, and self time rolled up per top-level package. Run after adding a
+top-level import to a route or util module:
+    cd /home/ainventory/inventory && python scripts/profile_imports.py
+
+With --budget-ms it exits 1 when the import is slower than the budget, and
+--forbid lists modules that must stay out of the boot path (heavy optional
+libraries belong inside the functions that use them):
+    python scripts/profile_imports.py --budget-ms 4000 --forbid pandas,fitz,alembic
+"""
+import sys
+import os
+import argparse
+import subprocess
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_PACKAGES = {'app', 'database', 'config', 'models', 'routes', 'utils', 'forms'}
+
+
+def run_importtime(module):
+    """
+    Import module in a fresh interpreter with -X importtime.
+
+    Returns:
+        list: (depth, module_name, self_us, cumulative_us) in import order
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    """Parse `-X importtime` stderr into (depth, name, self_us, cumulative_us) rows"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            depth = (len(name) - len(name.lstrip(' '))) // 2
+            rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def summarize(rows, top=20):
+    """
+    Build the report from parsed rows.
+
+    Returns:
+        dict: {'total_ms', 'by_cumulative', 'by_self', 'by_package', 'modules'}
+    """
+    total_us = sum(cumulative for depth, _, _, cumulative in rows if depth == 0)
+    by_package = defaultdict(int)
+    for _, name, self_us, _ in rows:
+        by_package[name.split('.')[0]] += self_us
+
+    return {
+        'total_ms': total_us / 1000,
+        'by_cumulative': sorted(rows, key=lambda row: row[3], reverse=True)[:top],
+        'by_self': sorted(rows, key=lambda row: row[2], reverse=True)[:top],
+        'by_package': sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top],
+        'modules': {name for _, name, _, _ in rows},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile module import time')
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--top', type=int, default=20, help='Rows per table')
+    parser.add_argument('--budget-ms', type=float, default=None, help='Fail if the import takes longer')
+    parser.add_argument('--forbid', default='', help='Comma-separated modules that must not be imported')
+    args = parser.parse_args()
+
+    report = summarize(run_importtime(args.module), top=args.top)
+
+    print(f"import {args.module}: {report['total_ms']:.0f} ms\n")
+    print("Slowest by cumulative time (ms):")
+    for depth, name, _, cumulative in report['by_cumulative']:
+        marker = '*' if name.split('.')[0] in PROJECT_PACKAGES else ' '
+        print(f"  {cumulative / 1000:8.1f} {marker} {'  ' * min(depth, 6)}{name}")
+    print("\nSlowest by self time (ms):")
+    for _, name, self_us, _ in report['by_self']:
+        print(f"  {self_us / 1000:8.1f}   {name}")
+    print("\nSelf time per top-level package (ms):")
+    for package, self_us in report['by_package']:
+        print(f"  {self_us / 1000:8.1f}   {package}")
+
+    failed = False
+    forbidden = [name for name in args.forbid.split(',') if name and name in report['modules']]
+    if forbidden:
+        print(f"\nFAIL: imported at boot: {', '.join(forbidden)}")
+        failed = True
+    if args.budget_ms is not None and report['total_ms'] > args.budget_ms:
+        print(f"\nFAIL: {report['total_ms']:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Recompute accessory quantities from the stock ledger and report drift.
+
+Schedule it periodically (e.g. a PythonAnywhere scheduled task):
+    cd /home/ainventory/inventory && python scripts/reconcile_accessory_stock.py --apply
+
+Without --apply it only reports what it would change.
+"""
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal
+from utils.accessory_stock import AccessoryStock
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcile accessory stock against the ledger')
+    parser.add_argument('--apply', action='store_true', help='Record baselines and repair drift')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = AccessoryStock.reconcile(db, apply=args.apply)
+    finally:
+        db.close()
+
+    prefix = '' if args.apply else '[DRY RUN] '
+    print(f"{prefix}Checked {report['checked']} accessories")
+    print(f"{prefix}Opening balances {'recorded' if args.apply else 'needed'}: {report['adopted']}")
+    print(f"{prefix}Drifted: {report['drifted']}, repaired: {report['repaired']}")
+    for detail in report['details']:
+        print(f"  Accessory #{detail['accessory_id']}: "
+              f"available {detail['available_quantity']} (ledger {detail['ledger_available']}), "
+              f"total {detail['total_quantity']} (ledger {detail['ledger_total']})"
+              f"{' - repaired' if detail['repaired'] else ''}")
+
+    return 1 if report['drifted'] and not args.apply else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
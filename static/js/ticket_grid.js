@@ -0,0 +1,200 @@
+/**
+ * Ticket Grid - virtual-scrolling ticket list
+ * Fetches windows of rows from /tickets/grid (server-side filter, sort and
+ * keyset cursor) as the user scrolls, and keeps only the rows in view in
+ * the DOM. Used by tickets/list.html and tickets/list_sf.html.
+ *
+ * Charts and other summaries must not be computed from `rows` (only the
+ * windows loaded so far): summary() returns counts over the whole filtered
+ * set from /tickets/grid/summary.
+ */
+
+class TicketGrid {
+    /**
+     * @param {Object} options
+     * @param {HTMLElement} options.scroller - Scrolling container of the table
+     * @param {HTMLElement} options.tbody - Table body the rows are rendered into
+     * @param {number} options.columns - Column count (for the spacer rows)
+     * @param {Function} options.renderRow - (ticket, index) => '<tr>...</tr>'
+     * @param {Function} [options.onLoad] - Called after each window arrives
+     * @param {Function} [options.onError] - Called with the error message
+     * @param {string} [options.url] - Grid endpoint
+     * @param {number} [options.rowHeight] - Initial row height estimate (px)
+     * @param {number} [options.windowSize] - Rows per request
+     */
+    constructor(options) {
+        this.scroller = options.scroller;
+        this.tbody = options.tbody;
+        this.columns = options.columns;
+        this.renderRow = options.renderRow;
+        this.onLoad = options.onLoad || (() => {});
+        this.onError = options.onError || ((message) => console.error('[TicketGrid]', message));
+        this.url = options.url || '/tickets/grid';
+        this.rowHeight = options.rowHeight || 48;
+        this.windowSize = options.windowSize || 100;
+        this.overscan = 10;
+
+        // State
+        this.params = {};
+        this.sort = 'created';
+        this.direction = 'desc';
+        this.rows = [];
+        this.total = null;
+        this.cursor = null;
+        this.hasMore = true;
+        this.loading = false;
+        this.generation = 0;
+        this.renderedRange = null;
+
+        let frame = null;
+        this.scroller.addEventListener('scroll', () => {
+            if (frame) return;
+            frame = requestAnimationFrame(() => {
+                frame = null;
+                this.render();
+            });
+        });
+        window.addEventListener('resize', () => this.render(true));
+    }
+
+    // Replace the filters and start again from the first window
+    load(params) {
+        if (params !== undefined) this.params = params;
+        this.generation++;
+        this.rows = [];
+        this.total = null;
+        this.cursor = null;
+        this.hasMore = true;
+        this.loading = false;
+        this.scroller.scrollTop = 0;
+        this.render(true);
+        return this.fetchNext();
+    }
+
+    // Sort by a /tickets/grid sort key; the same key again flips the direction
+    sortBy(key, direction) {
+        if (direction) {
+            this.direction = direction;
+        } else if (this.sort === key) {
+            this.direction = this.direction === 'asc' ? 'desc' : 'asc';
+        } else {
+            this.direction = key === 'created' || key === 'updated' ? 'desc' : 'asc';
+        }
+        this.sort = key;
+        return this.load();
+    }
+
+    query() {
+        const query = new URLSearchParams();
+        Object.entries(this.params).forEach(([key, value]) => {
+            if (value === null || value === undefined || value === '' || value === false) return;
+            (Array.isArray(value) ? value : [value]).forEach(item => query.append(key, item));
+        });
+        query.set('sort', this.sort);
+        query.set('dir', this.direction);
+        query.set('limit', this.windowSize);
+        return query;
+    }
+
+    async fetchNext() {
+        if (this.loading || !this.hasMore) return;
+        this.loading = true;
+        const generation = this.generation;
+        const query = this.query();
+        if (this.cursor) query.set('cursor', this.cursor);
+
+        try {
+            const response = await fetch(`${this.url}?${query.toString()}`, {
+                headers: { 'Accept': 'application/json' },
+                credentials: 'same-origin'
+            });
+            const data = await response.json();
+            if (generation !== this.generation) return;  // Filters changed meanwhile
+            if (!response.ok || !data.success) {
+                this.hasMore = false;
+                this.onError(data.error || `HTTP error! status: ${response.status}`);
+                return;
+            }
+            this.rows.push(...data.tickets);
+            if (data.total !== null && data.total !== undefined) this.total = data.total;
+            this.cursor = data.cursor;
+            this.hasMore = data.has_more;
+        } catch (error) {
+            if (generation === this.generation) {
+                this.hasMore = false;
+                this.onError(error.message);
+            }
+        } finally {
+            if (generation === this.generation) {
+                this.loading = false;
+                this.render(true);
+                this.onLoad(this);
+            }
+        }
+    }
+
+    // Counts over every ticket matching the current filters, or null if the
+    // filters changed before they arrived
+    async summary() {
+        const generation = this.generation;
+        const query = this.query();
+        ['sort', 'dir', 'limit'].forEach(key => query.delete(key));
+        const response = await fetch(`${this.url}/summary?${query.toString()}`, {
+            headers: { 'Accept': 'application/json' },
+            credentials: 'same-origin'
+        });
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+        }
+        return generation === this.generation ? data : null;
+    }
+
+    // Rows the scrollbar is sized for: the filtered total once known
+    get size() {
+        return Math.max(this.total === null ? 0 : this.total, this.rows.length);
+    }
+
+    spacer(height) {
+        return `<tr class="ticket-grid-spacer" aria-hidden="true"><td colspan="${this.columns}" style="height: ${height}px; padding: 0; border: 0;"></td></tr>`;
+    }
+
+    render(force = false) {
+        const viewport = this.scroller.clientHeight || 600;
+        const first = Math.max(0, Math.floor(this.scroller.scrollTop / this.rowHeight) - this.overscan);
+        const last = Math.min(this.rows.length, first + Math.ceil(viewport / this.rowHeight) + 2 * this.overscan);
+
+        if (force || !this.renderedRange || this.renderedRange[0] !== first || this.renderedRange[1] !== last) {
+            this.renderedRange = [first, last];
+            const html = [];
+            if (first > 0) html.push(this.spacer(first * this.rowHeight));
+            for (let i = first; i < last; i++) {
+                html.push(this.renderRow(this.rows[i], i));
+            }
+            const below = this.size - last;
+            if (below > 0) html.push(this.spacer(below * this.rowHeight));
+            this.tbody.innerHTML = html.join('');
+            this.measure(last - first);
+        }
+
+        // Fetch the next window before the user reaches the end of what is loaded
+        const wanted = Math.floor(this.scroller.scrollTop / this.rowHeight) + Math.ceil(viewport / this.rowHeight) + this.overscan;
+        if (this.hasMore && !this.loading && wanted >= this.rows.length) {
+            this.fetchNext();
+        }
+    }
+
+    // Calibrate the row height estimate from the rows on screen
+    measure(count) {
+        if (count <= 0) return;
+        const rows = this.tbody.querySelectorAll('tr:not(.ticket-grid-spacer)');
+        if (!rows.length) return;
+        const height = Array.from(rows).reduce((sum, row) => sum + row.offsetHeight, 0) / rows.length;
+        if (height > 0 && Math.abs(height - this.rowHeight) > 1) {
+            this.rowHeight = height;
+            this.renderedRange = null;
+        }
+    }
+}
+
+window.TicketGrid = TicketGrid;
@@ -37,3 +37,54 @@ def pytest_configure(config):
     """Configure pytest."""
     # Create screenshots directory
     os.makedirs("tests/screenshots", exist_ok=True)
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """File-backed SQLite engine with the full schema (file so threads share it)."""
+    from sqlalchemy import create_engine
+    import models  # noqa: F401 - registers every table on Base.metadata
+    from models.base import Base
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(db_engine):
+    """Session bound to the throwaway test database."""
+    from sqlalchemy.orm import sessionmaker
+
+    session = sessionmaker(bind=db_engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def inventory_csv_factory(tmp_path):
+    """Build an inventory CSV of any size by repeating the rows of sample_inventory.csv.
+
+    Asset tags and serial numbers get a running suffix so every row is unique.
+    """
+    import pandas as pd
+
+    sample_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_inventory.csv")
+    sample = pd.read_csv(sample_path, dtype=str)
+
+    def build(rows, name="inventory.csv"):
+        repeats = -(-rows // len(sample))
+        df = pd.concat([sample] * repeats, ignore_index=True).iloc[:rows].copy()
+        suffix = pd.Series(range(rows), dtype=str)
+        df["ASSET TAG"] = "BENCH-" + suffix
+        df["SERIAL NUMBER"] = df["SERIAL NUMBER"].str.slice(0, 8) + "-" + suffix
+        df["#"] = range(1, rows + 1)
+        path = tmp_path / name
+        df.to_csv(path, index=False)
+        return str(path)
+
+    return build
@@ -0,0 +1,228 @@
+"""
+Tests for the accessory stock ledger (conditional decrements + reconciler).
+
+Usage:
+    pytest tests/test_accessory_stock.py -v
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from models.accessory import Accessory
+from models.accessory_transaction import AccessoryTransaction
+from utils.accessory_stock import AccessoryStock, InsufficientStockError, TYPE_BASELINE, TYPE_REVERSAL
+
+
+def _make_accessory(session, quantity, name="USB-C Charger"):
+    accessory = Accessory(name=name, category="Charger", total_quantity=quantity, available_quantity=quantity)
+    session.add(accessory)
+    session.commit()
+    AccessoryStock.reconcile(session, apply=True)  # record the opening balance
+    return accessory.id
+
+
+def test_checkout_decrements_and_writes_ledger(db_session):
+    accessory_id = _make_accessory(db_session, 5)
+    accessory = db_session.get(Accessory, accessory_id)
+
+    entry = AccessoryStock.checkout(db_session, accessory_id, 3, user_id=None, notes="test")
+    db_session.commit()
+
+    assert accessory.available_quantity == 2
+    assert accessory.total_quantity == 5
+    assert accessory.status == "Available"
+    assert entry.available_delta == -3 and entry.total_delta == 0
+
+    AccessoryStock.checkout(db_session, accessory_id, 2)
+    db_session.commit()
+    assert accessory.available_quantity == 0
+    assert accessory.status == "Out of Stock"
+
+
+def test_checkout_refuses_oversell(db_session):
+    accessory_id = _make_accessory(db_session, 2)
+
+    with pytest.raises(InsufficientStockError) as excinfo:
+        AccessoryStock.checkout(db_session, accessory_id, 3)
+    assert excinfo.value.available == 2
+    db_session.commit()
+
+    assert db_session.get(Accessory, accessory_id).available_quantity == 2
+    assert db_session.query(AccessoryTransaction).filter(
+        AccessoryTransaction.transaction_type == "Checkout").count() == 0
+
+
+def test_reserve_many_is_all_or_nothing(db_session):
+    first = _make_accessory(db_session, 5, "Mouse")
+    second = _make_accessory(db_session, 1, "Keyboard")
+
+    with pytest.raises(InsufficientStockError) as excinfo:
+        AccessoryStock.reserve_many(db_session, [(first, 2), (second, 2)])
+    assert list(excinfo.value.shortages) == [second]
+    db_session.commit()
+    assert db_session.get(Accessory, first).available_quantity == 5
+
+    entries = AccessoryStock.reserve_many(db_session, [(first, 2), (second, 1), (first, 1)])
+    db_session.commit()
+    assert len(entries) == 2
+    assert db_session.get(Accessory, first).available_quantity == 2
+    assert db_session.get(Accessory, second).available_quantity == 0
+
+
+def test_rollback_discards_movement(db_session):
+    accessory_id = _make_accessory(db_session, 4)
+    AccessoryStock.checkout(db_session, accessory_id, 4)
+    db_session.rollback()
+    assert db_session.get(Accessory, accessory_id).available_quantity == 4
+
+
+def test_restock_and_set_quantities(db_session):
+    accessory_id = _make_accessory(db_session, 3)
+    AccessoryStock.checkout(db_session, accessory_id, 3)
+    AccessoryStock.restock(db_session, accessory_id, 1)
+    AccessoryStock.restock(db_session, accessory_id, 10, add_to_total=True)
+    AccessoryStock.set_quantities(db_session, accessory_id, total=20)
+    db_session.commit()
+
+    accessory = db_session.get(Accessory, accessory_id)
+    assert (accessory.available_quantity, accessory.total_quantity) == (11, 20)
+    assert AccessoryStock.reconcile(db_session)["drifted"] == 0
+
+
+def test_reverse_appends_a_compensating_entry(db_session):
+    accessory_id = _make_accessory(db_session, 5)
+    checkout = AccessoryStock.checkout(db_session, accessory_id, 3)
+    db_session.commit()
+    # A concurrent movement between the checkout and its reversal is kept
+    AccessoryStock.checkout(db_session, accessory_id, 1)
+    db_session.commit()
+
+    reversal = AccessoryStock.reverse(db_session, checkout)
+    db_session.commit()
+
+    assert reversal.transaction_type == TYPE_REVERSAL and reversal.available_delta == 3
+    assert db_session.get(AccessoryTransaction, checkout.id) is not None
+    assert db_session.get(Accessory, accessory_id).available_quantity == 4
+    assert AccessoryStock.reconcile(db_session)["drifted"] == 0
+    with pytest.raises(ValueError):
+        AccessoryStock.reverse(db_session, checkout)
+    with pytest.raises(ValueError):
+        AccessoryStock.reverse(db_session, reversal)
+
+    legacy = AccessoryTransaction(accessory_id=accessory_id, transaction_type="Checkout", quantity=2)
+    db_session.add(legacy)
+    db_session.commit()
+    assert AccessoryStock.reverse(db_session, legacy).available_delta == 2
+
+
+def test_reconciler_adopts_and_repairs_drift(db_session):
+    accessory = Accessory(name="Adapter", category="Adapter", total_quantity=10, available_quantity=7)
+    db_session.add(accessory)
+    db_session.commit()
+
+    report = AccessoryStock.reconcile(db_session)
+    assert report["adopted"] == 1
+    assert db_session.query(AccessoryTransaction).count() == 0  # dry run writes nothing
+
+    AccessoryStock.reconcile(db_session, apply=True)
+    baseline = db_session.query(AccessoryTransaction).one()
+    assert baseline.transaction_type == TYPE_BASELINE
+    assert (baseline.available_delta, baseline.total_delta) == (7, 10)
+
+    # Someone writes the materialized value directly, bypassing the ledger
+    accessory.available_quantity = 1
+    db_session.commit()
+
+    report = AccessoryStock.reconcile(db_session, apply=True)
+    assert report["drifted"] == 1 and report["repaired"] == 1
+    db_session.refresh(accessory)
+    assert accessory.available_quantity == 7
+
+
+def test_concurrent_checkouts_never_oversell(db_engine):
+    Session = sessionmaker(bind=db_engine)
+    setup = Session()
+    accessory_id = _make_accessory(setup, 50)
+    setup.close()
+
+    successes = []
+    refusals = []
+    errors = []
+    lock = threading.Lock()
+    start = threading.Barrier(10)
+
+    def worker():
+        session = Session()
+        try:
+            start.wait()
+            for _ in range(10):
+                try:
+                    AccessoryStock.checkout(session, accessory_id, 1)
+                    session.commit()
+                    with lock:
+                        successes.append(1)
+                except InsufficientStockError:
+                    session.rollback()
+                    with lock:
+                        refusals.append(1)
+        except Exception as e:  # pragma: no cover - surfaced by the assertion below
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(successes) == 50
+    assert len(refusals) == 50
+
+    check = Session()
+    assert check.get(Accessory, accessory_id).available_quantity == 0
+    assert AccessoryStock.reconcile(check)["drifted"] == 0
+    check.close()
+
+
+def test_csv_import_skips_accessories_out_of_stock(db_session, db_engine, monkeypatch):
+    import routes.admin as admin
+    from models.ticket import TicketAccessory
+    from models.user import User
+
+    mouse = _make_accessory(db_session, 5, "Mouse")
+    keyboard = _make_accessory(db_session, 5, "Keyboard")
+    user = User(username="importer", email="importer@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+
+    # The keyboards are taken by someone else between the check and the checkout
+    checkout = AccessoryStock.checkout
+
+    def racing_checkout(session, accessory_id, quantity, **kwargs):
+        if accessory_id == keyboard:
+            session.execute(update(Accessory.__table__).where(Accessory.id == keyboard).values(available_quantity=0))
+        return checkout(session, accessory_id, quantity, **kwargs)
+
+    monkeypatch.setattr(AccessoryStock, "checkout", staticmethod(racing_checkout))
+    monkeypatch.setattr(admin, "db_manager", type("Manager", (), {"get_session": sessionmaker(bind=db_engine)})())
+
+    fields = ("person_name", "org_name", "primary_email", "phone_number", "product_title", "brand", "serial_number",
+              "category_code", "preferred_condition", "office_name", "address_line1", "address_line2", "city",
+              "state", "postal_code", "country_code", "carrier", "tracking_link", "order_id", "order_item_id",
+              "organization_id", "start_date", "shipped_date", "delivery_date", "priority")
+    row = {field: "" for field in fields}
+    row.update(person_name="Ada", org_name="Acme", primary_email="ada@example.com", status="SHIPPED")
+
+    result = admin.csv_import_import_ticket_internal(
+        row, selected_accessories=[{"accessoryId": keyboard}, {"accessoryId": mouse}], user_id=user.id)
+
+    assert result["success"] and result["assigned_accessories"] == ["Mouse"]
+    db_session.expire_all()
+    assert [a.name for a in db_session.query(TicketAccessory)] == ["Mouse"]
+    assert db_session.get(Accessory, mouse).available_quantity == 4
+    assert db_session.get(Accessory, keyboard).available_quantity == 0
@@ -0,0 +1,100 @@
+"""
+Tests for the API response layer (ETag / 304, Cache-Control, compression).
+
+Usage:
+    pytest tests/test_api_responses.py -v
+"""
+
+import gzip
+
+import pytest
+from flask import Blueprint, Flask, jsonify
+
+from utils import api_responses
+from utils.api_responses import body_etag, cache_policy, choose_encoding, init_api_responses
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(API_RESPONSE_BLUEPRINTS=('api',), API_COMPRESS_MIN_BYTES=200)
+    api = Blueprint('api', __name__)
+
+    @api.route('/api/items')
+    def items():
+        return jsonify({'items': [{'id': i, 'name': f'Item {i}'} for i in range(50)]})
+
+    @api.route('/api/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @api.route('/api/token')
+    @cache_policy('no-store')
+    def token():
+        return jsonify({'token': 'x' * 500})
+
+    @app.route('/page')
+    def page():
+        return jsonify({'items': list(range(500))})
+
+    app.register_blueprint(api)
+    init_api_responses(app)
+    return app.test_client()
+
+
+def test_unchanged_payload_is_answered_with_304(client):
+    first = client.get('/api/items')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"')
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    again = client.get('/api/items', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+    assert again.headers['ETag'] == etag
+    assert 'Accept-Encoding' in again.headers['Vary']
+
+
+def test_large_bodies_are_gzipped_when_accepted(client):
+    plain = client.get('/api/items')
+    compressed = client.get('/api/items', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert len(compressed.data) < len(plain.data) / 3
+    # The weak ETag is the same for both codings
+    assert compressed.headers['ETag'] == plain.headers['ETag']
+
+    small = client.get('/api/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+
+def test_cache_policy_overrides_default_and_no_store_skips_etag(client):
+    response = client.get('/api/token')
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert 'ETag' not in response.headers
+
+
+def test_other_blueprints_are_untouched(client):
+    response = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    assert 'ETag' not in response.headers and 'Content-Encoding' not in response.headers
+
+
+def test_choose_encoding_honors_quality_values(monkeypatch):
+    monkeypatch.setattr(api_responses, 'BROTLI_AVAILABLE', True)
+    assert choose_encoding('gzip, br') == 'br'
+    assert choose_encoding('br;q=0.5, gzip') == 'gzip'
+    assert choose_encoding('gzip;q=0, br;q=0') is None
+    assert choose_encoding('*') == 'br'
+    assert choose_encoding('') is None
+
+    monkeypatch.setattr(api_responses, 'BROTLI_AVAILABLE', False)
+    assert choose_encoding('br, gzip;q=0.1') == 'gzip'
+
+
+def test_body_etag_ignores_per_request_values():
+    first = b'{"data":[1,2],"meta":{"request_id":"ab12cd34","timestamp":"2026-01-01T00:00:00Z"}}'
+    second = b'{"data":[1,2],"meta":{"request_id":"ff00ee11","timestamp":"2026-01-01T00:00:05Z"}}'
+    assert body_etag(first) != body_etag(second)
+    assert body_etag(first, ignore=('ab12cd34', '2026-01-01T00:00:00Z')) == \
+        body_etag(second, ignore=('ff00ee11', '2026-01-01T00:00:05Z'))
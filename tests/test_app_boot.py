@@ -0,0 +1,84 @@
+"""
+Boot-time regression tests: a cold create_app() must stay within budget and
+keep heavy optional libraries out of the import path.
+
+Usage:
+    pytest tests/test_app_boot.py -v
+    APP_BOOT_BUDGET_SECONDS=3 pytest tests/test_app_boot.py -v
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOT_BUDGET_SECONDS = float(os.environ.get('APP_BOOT_BUDGET_SECONDS', 6))
+# Loaded by the functions that use them, never at boot
+DEFERRED_MODULES = ['pandas', 'bs4', 'alembic', 'flask_migrate', 'fitz', 'anthropic', 'zeep']
+
+BOOT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+cold = time.perf_counter() - started
+from utils import db_manager
+print(json.dumps({
+    'cold': cold,
+    'engines': len(db_manager._engines),
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+@pytest.fixture(scope="module")
+def boot(tmp_path_factory):
+    database = tmp_path_factory.mktemp("boot") / "boot.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    # First run creates the schema; the measured run boots against it
+    for _ in range(2):
+        result = subprocess.run(
+            [sys.executable, '-c', BOOT_PROBE % DEFERRED_MODULES],
+            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=300
+        )
+        assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_cold_create_app_within_budget(boot):
+    assert boot['cold'] < BOOT_BUDGET_SECONDS, (
+        f"Cold boot took {boot['cold']:.2f}s (budget {BOOT_BUDGET_SECONDS}s); "
+        f"run scripts/profile_imports.py to see which imports grew"
+    )
+
+
+def test_heavy_libraries_are_not_imported_at_boot(boot):
+    assert boot['loaded'] == []
+
+
+def test_database_managers_share_one_engine(boot):
+    assert boot['engines'] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="fork is POSIX only")
+def test_forked_worker_drops_inherited_connections(tmp_path):
+    from utils.db_manager import DatabaseManager
+
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'fork.db'}")
+    with manager.engine.connect():
+        pass
+    assert manager.engine.pool.checkedin() == 1
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # Worker: the master's pooled connection must not be reused
+        os.write(write_fd, str(manager.engine.pool.checkedin()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 16) == b"0"
+    os.close(read_fd)
+    assert manager.engine.pool.checkedin() == 1  # the master keeps its own
@@ -0,0 +1,151 @@
+"""
+Tests for the inventory facet summary (incremental counts, scopes, cache).
+
+Usage:
+    pytest tests/test_asset_facets.py -v
+"""
+
+import pytest
+from sqlalchemy import event, insert
+
+from models.asset import Asset, AssetStatus
+from models.asset_facet import (
+    AssetFacetCount, AssetFacetState, FACET_COLUMNS, VALUE_LENGTH, bump_version, record_inserted,
+)
+from utils import asset_facets
+from utils.asset_facets import AssetScope, facet_counts, rebuild
+
+
+@pytest.fixture(autouse=True)
+def no_cached_cells(monkeypatch):
+    monkeypatch.setattr(asset_facets, "_cached", None)
+
+
+def _asset(tag, **values):
+    defaults = dict(asset_tag=tag, model="A2338", country="SINGAPORE", customer="WISE",
+                    company_id=1, status=AssetStatus.IN_STOCK)
+    defaults.update(values)
+    return Asset(**defaults)
+
+
+def _recounted(db_session):
+    incremental = facet_counts(db_session)
+    rebuild(db_session)
+    asset_facets._cached = None
+    return incremental, facet_counts(db_session)
+
+
+def test_incremental_counts_match_a_rebuild(db_session):
+    rebuild(db_session)  # empty summary, listeners apply deltas from here on
+    db_session.add_all([
+        _asset("T1"), _asset("T2", model="A2442"), _asset("T3", customer=None, company_id=None),
+        _asset("T4", country="JAPAN", status=AssetStatus.DEPLOYED), _asset("T5"),
+    ])
+    db_session.commit()
+
+    t2 = db_session.query(Asset).filter_by(asset_tag="T2").one()
+    t2.status = AssetStatus.DEPLOYED
+    t2.country = "JAPAN"
+    db_session.commit()
+    t2.model = "A2681"  # assigned while expired after the commit
+    db_session.delete(db_session.query(Asset).filter_by(asset_tag="T1").one())
+    db_session.commit()
+    db_session.query(Asset).filter(Asset.asset_tag == "T5").delete(synchronize_session=False)
+    db_session.commit()
+    records = [dict(asset_tag="T6", model="A2338", country="SINGAPORE", status=AssetStatus.IN_STOCK)]
+    db_session.connection().execute(insert(Asset.__table__), records)
+    record_inserted(db_session.connection(), records)  # what the importers do
+    db_session.commit()
+    bump_version(db_session)
+
+    assert db_session.get(AssetFacetState, 1).stale is False  # no fallback rebuild
+    incremental, rebuilt = _recounted(db_session)
+    assert incremental == rebuilt
+    assert rebuilt["model"] == {"A2338": 3, "A2681": 1}
+    assert rebuilt["status"] == {"IN_STOCK": 2, "DEPLOYED": 2}
+    assert rebuilt["customer"] == {"WISE": 2, "": 2}
+
+
+def test_scope_admits_only_permitted_cells(db_session):
+    db_session.add_all([
+        _asset("T1"), _asset("T2", country="JAPAN"), _asset("T3", customer="WISE APAC", company_id=7),
+        _asset("T4", customer="ACME", company_id=2), _asset("T5", customer=None, company_id=None),
+    ])
+    db_session.commit()
+
+    scope = AssetScope(countries=frozenset(["singapore"]), company_ids=frozenset([1]),
+                       company_names=("wise",), require_company=True)
+    assert facet_counts(db_session, scope, facets=("customer",)) == {"customer": {"WISE": 1, "WISE APAC": 1}}
+    assert facet_counts(db_session, AssetScope.nothing(), facets=("model",)) == {"model": {}}
+    client = AssetScope(company_ids=frozenset([2]), customers=("ACME",))
+    assert sum(facet_counts(db_session, client)["status"].values()) == 1
+
+
+def test_cells_are_served_from_memory_until_the_version_moves(db_session, db_engine):
+    db_session.add(_asset("T1"))
+    db_session.commit()
+    facet_counts(db_session)  # first read builds the summary
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    facet_counts(db_session)
+    assert len(statements) == 1 and "asset_facet_state" in statements[0]
+
+    db_session.add(_asset("T2"))
+    db_session.commit()
+    statements.clear()
+    assert facet_counts(db_session)["model"] == {"A2338": 2}
+    assert any("asset_facet_counts" in sql for sql in statements)
+
+
+def test_bulk_update_marks_the_summary_stale(db_session):
+    db_session.add_all([_asset("T1"), _asset("T2")])
+    db_session.commit()
+    facet_counts(db_session)
+
+    db_session.query(Asset).update({Asset.model: "A2681"}, synchronize_session=False)
+    db_session.commit()
+
+    assert facet_counts(db_session)["model"] == {"A2681": 2}
+    assert db_session.query(AssetFacetCount).filter_by(facet="model", value="A2338").count() == 0
+
+
+def test_version_moves_after_commit_not_inside_the_transaction(db_session, db_engine):
+    rebuild(db_session)
+    version = db_session.get(AssetFacetState, 1).version
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    db_session.add(_asset("T1"))
+    db_session.flush()
+    assert not any("asset_facet_state" in sql for sql in statements)  # writers don't queue on the state row
+    db_session.commit()
+    assert db_session.get(AssetFacetState, 1).version == version + 1
+
+    db_session.add(_asset("T2"))
+    db_session.flush()
+    db_session.rollback()
+    db_session.add(_asset("T3", country="JAPAN"))
+    db_session.commit()
+    assert db_session.get(AssetFacetState, 1).version == version + 2
+    assert facet_counts(db_session)["country"] == {"SINGAPORE": 1, "JAPAN": 1}
+
+
+def test_savepoint_rollback_does_not_lose_the_version_bump(db_session):
+    rebuild(db_session)
+    version = db_session.get(AssetFacetState, 1).version
+
+    db_session.add(_asset("T1"))
+    db_session.flush()
+    db_session.begin_nested().rollback()  # e.g. a failed stock reservation
+    db_session.commit()
+
+    assert db_session.get(AssetFacetState, 1).version == version + 1
+
+
+def test_cell_columns_are_as_wide_as_the_asset_columns():
+    cells, assets = AssetFacetCount.__table__.c, Asset.__table__.c
+    for column in FACET_COLUMNS.values():
+        assert VALUE_LENGTH >= (getattr(assets[column].type, "length", None) or 0)
+    assert cells.country.type.length >= assets.country.type.length
+    assert cells.customer.type.length >= assets.customer.type.length
@@ -0,0 +1,190 @@
+"""
+Tests for the set-based bulk asset ingest engine.
+
+Usage:
+    pytest tests/test_asset_ingest.py -v
+    pytest tests/test_asset_ingest.py -v -m "not slow"   # skip the 500-asset benchmark
+"""
+
+import time
+
+import pytest
+from sqlalchemy import event
+
+from models.asset import Asset, AssetStatus, ticket_assets
+from models.asset_history import AssetHistory
+from models.ticket import Ticket
+from models.user import User
+from utils.asset_ingest import AssetIngest
+
+
+def _setup(db_session):
+    user = User(username="ingest", email="ingest@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    ticket = Ticket(subject="Delivery", description="Packing list", requester_id=user.id)
+    db_session.add(ticket)
+    db_session.add(Asset(asset_tag="SG-1000", serial_num="EXISTING1", name="Old"))
+    db_session.commit()
+    return user.id, ticket.id
+
+
+def _payload(count, start=0):
+    return [
+        {"serial_num": f" C02BENCH{start + i:05d} ", "name": "MacBook Air", "model": "A3240", "status": AssetStatus.IN_STOCK}
+        for i in range(count)
+    ]
+
+
+def _count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_ingest_reports_errors_per_row(db_session):
+    user_id, ticket_id = _setup(db_session)
+    records = [
+        {"serial_num": "NEW1", "asset_tag": "SG-2000", "name": "A", "not_a_column": "ignored"},
+        {"serial_num": "EXISTING1", "asset_tag": "SG-2001"},   # serial already in the system
+        {"serial_num": "NEW2", "asset_tag": "SG-1000"},        # tag already in the system
+        {"serial_num": "NEW1", "asset_tag": "SG-2002"},        # repeated in the request
+        {"serial_num": "", "asset_tag": "SG-2003"},            # no serial
+        {"serial_num": "NEW3", "customer": " acme "},         # tag allocated
+    ]
+
+    result = AssetIngest(db_session, user_id=user_id, ticket_id=ticket_id, tag_prefix="SG-",
+                         require_serial=True, history_notes="test").ingest(records)
+
+    assert [c["row"] for c in result["created"]] == [1, 6]
+    errors = {e["row"]: e["error"] for e in result["errors"]}
+    assert errors[2].startswith("Serial EXISTING1 already exists (Asset #")
+    assert errors[3].startswith("Asset tag SG-1000 already exists (Asset #")
+    assert errors[4] == "Serial NEW1 appears more than once in this request"
+    assert errors[5] == "Missing serial number"
+
+    allocated = result["created"][1]["asset_tag"]
+    assert allocated == "SG-1001"  # next after the highest existing SG- tag
+
+    db_session.expire_all()
+    new3 = db_session.query(Asset).filter_by(serial_num="NEW3").one()
+    assert new3.customer == "ACME"
+    assert new3.status == AssetStatus.IN_STOCK
+    assert new3.created_at is not None
+
+    linked = {row.asset_id for row in db_session.query(ticket_assets).filter_by(ticket_id=ticket_id)}
+    assert linked == {c["id"] for c in result["created"]}
+
+    history = db_session.query(AssetHistory).filter_by(asset_id=new3.id).one()
+    assert history.action == "CREATE" and history.user_id == user_id and history.notes == "test"
+    assert history.changes["serial_num"] == {"old": None, "new": "NEW3"}
+    assert history.changes["status"] == {"old": None, "new": "In Stock"}
+
+
+def test_ingest_invalidates_cached_asset_views(db_session, monkeypatch):
+    from utils import inventory_import
+
+    invalidated = []
+    monkeypatch.setattr(inventory_import, "invalidate", lambda *tags: invalidated.append(tags))
+    _setup(db_session)
+
+    AssetIngest(db_session).ingest([{"serial_num": "NEW1", "asset_tag": "SG-3000"}])
+
+    assert invalidated == [("assets",)]
+
+
+def test_missing_tag_without_prefix_is_an_error(db_session):
+    _setup(db_session)
+    result = AssetIngest(db_session).ingest([{"serial_num": "NOTAG"}])
+    assert result["created"] == []
+    assert result["errors"][0]["error"] == "Missing asset tag"
+
+
+def test_explicit_tags_are_claimed_from_the_sequence(db_session):
+    from utils.asset_tag_allocator import AssetTagAllocator
+    user_id, _ = _setup(db_session)
+    suggested = AssetTagAllocator.peek_tags(db_session, "SG-", 2)
+    assert suggested == ["SG-1001", "SG-1002"]
+
+    result = AssetIngest(db_session, user_id=user_id, tag_prefix="SG-").ingest(
+        [{"serial_num": "S1", "asset_tag": suggested[0]}, {"serial_num": "S2", "asset_tag": suggested[1]}]
+    )
+
+    assert not result["errors"]
+    assert AssetTagAllocator.peek_tags(db_session, "SG-", 1) == ["SG-1003"]
+
+
+def test_tag_allocation_failure_fails_untagged_rows(db_session, monkeypatch):
+    from utils.asset_tag_allocator import AssetTagAllocator, AssetTagAllocationError
+    user_id, _ = _setup(db_session)
+
+    def fail(*args, **kwargs):
+        raise AssetTagAllocationError("no free tags")
+    monkeypatch.setattr(AssetTagAllocator, "reserve", staticmethod(fail))
+
+    result = AssetIngest(db_session, user_id=user_id, tag_prefix="SG-").ingest(
+        [{"serial_num": "S1"}, {"serial_num": "S2", "asset_tag": "SG-5000"}]
+    )
+
+    assert [c["asset_tag"] for c in result["created"]] == ["SG-5000"]
+    assert [(e["row"], e["serial_num"]) for e in result["errors"]] == [(1, "S1")]
+
+
+def test_statement_count_does_not_grow_with_batch(db_session, db_engine):
+    user_id, ticket_id = _setup(db_session)
+    statements, stop = _count_statements(db_engine)
+    try:
+        result = AssetIngest(db_session, user_id=user_id, ticket_id=ticket_id, tag_prefix="SG-").ingest(_payload(500))
+    finally:
+        stop()
+
+    assert len(result["created"]) == 500 and not result["errors"]
+    # lookup + tag reservation + asset/link/history executemany, independent of row count
+    assert len(statements) < 20
+    assert db_session.query(ticket_assets).filter_by(ticket_id=ticket_id).count() == 500
+    assert db_session.query(AssetHistory).count() == 500
+    tags = sorted(int(c["asset_tag"].split("-")[1]) for c in result["created"])
+    assert tags == list(range(1001, 1501))
+
+
+def test_conflicting_insert_falls_back_to_row_by_row(db_session, monkeypatch):
+    _setup(db_session)
+    ingest = AssetIngest(db_session, tag_prefix="SG-")
+    # Simulate a concurrent insert that the batch lookup did not see
+    monkeypatch.setattr(ingest, "_dedupe", lambda rows: rows)
+
+    result = ingest.ingest([{"serial_num": "RACE1"}, {"serial_num": "EXISTING1"}, {"serial_num": "RACE2"}])
+
+    assert [c["serial_num"] for c in result["created"]] == ["RACE1", "RACE2"]
+    assert result["errors"][0]["row"] == 2
+    assert result["errors"][0]["error"].startswith("Could not create asset")
+
+
+@pytest.mark.slow
+def test_benchmark_500_assets_per_request(db_session):
+    """Per-row ORM create (old endpoints) vs AssetIngest for a 500-asset request"""
+    user_id, ticket_id = _setup(db_session)
+    start = time.perf_counter()
+    for record in _payload(500, start=10000):
+        serial = record["serial_num"].strip()
+        db_session.query(Asset).filter(Asset.serial_num == serial).first()
+        db_session.query(Asset).filter(Asset.asset_tag == f"OLD-{serial}").first()
+        asset = Asset(asset_tag=f"OLD-{serial}", serial_num=serial, name=record["name"], model=record["model"])
+        db_session.add(asset)
+        db_session.flush()
+        db_session.execute(ticket_assets.insert().values(ticket_id=ticket_id, asset_id=asset.id))
+    db_session.commit()
+    per_row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = AssetIngest(db_session, user_id=user_id, ticket_id=ticket_id, tag_prefix="SG-").ingest(_payload(500))
+    bulk_seconds = time.perf_counter() - start
+
+    print(f"\n500 assets: per-row {per_row_seconds:.2f}s, bulk ingest {bulk_seconds:.2f}s "
+          f"({per_row_seconds / bulk_seconds:.1f}x)")
+    assert len(result["created"]) == 500
+    assert bulk_seconds < per_row_seconds
@@ -0,0 +1,103 @@
+"""
+Tests for the shared API auth context cache.
+
+Usage:
+    pytest tests/test_auth_cache.py -v
+"""
+
+import pytest
+from sqlalchemy import event
+
+from models.enums import UserType
+from models.permission import Permission
+from models.user import User
+from models.user_country_permission import UserCountryPermission
+from utils import auth_cache
+from utils.auth_cache import get_auth_user
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    auth_cache.clear()
+    yield
+    auth_cache.clear()
+
+
+@pytest.fixture
+def user(db_session):
+    db_session.add(Permission(user_type=UserType.SUPERVISOR,
+                              **Permission.get_default_permissions(UserType.SUPERVISOR)))
+    user = User(username="sup", email="sup@example.com", user_type=UserType.SUPERVISOR)
+    user.set_password("old-password")
+    db_session.add(user)
+    db_session.flush()
+    db_session.add(UserCountryPermission(user_id=user.id, country="SINGAPORE"))
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def statements(db_engine):
+    executed = []
+    event.listen(db_engine, "before_cursor_execute", lambda *args: executed.append(args[2]))
+    return executed
+
+
+def test_snapshot_is_cached_between_requests(db_session, user, statements):
+    first = get_auth_user(user.id, 0, db_session=db_session)
+    queries = len(statements)
+    second = get_auth_user(user.id, 0, db_session=db_session)
+
+    assert queries > 0 and len(statements) == queries
+    assert second.snapshot is first.snapshot
+    assert second.username == "sup" and second.is_supervisor and not second.is_admin
+    assert second.assigned_countries == ("SINGAPORE",)
+    assert second.permissions.can_view_assets == Permission.get_default_permissions(UserType.SUPERVISOR)["can_view_assets"]
+    assert "can_view_assets" in dir(second.permissions)
+    with pytest.raises(AttributeError):
+        second.permissions.can_view_assets = True
+
+
+def test_password_change_revokes_issued_tokens(db_session, user):
+    assert get_auth_user(user.id, 0, db_session=db_session) is not None
+
+    user.set_password("new-password")
+    db_session.commit()
+
+    assert user.token_version == 1
+    assert get_auth_user(user.id, 0, db_session=db_session) is None
+    assert get_auth_user(user.id, 1, db_session=db_session) is not None
+
+
+def test_unrelated_edits_keep_tokens_but_refresh_the_snapshot(db_session, user):
+    assert get_auth_user(user.id, 0, db_session=db_session).assigned_countries == ("SINGAPORE",)
+
+    user.theme_preference = "dark"
+    db_session.add(UserCountryPermission(user_id=user.id, country="JAPAN"))
+    db_session.commit()
+
+    assert user.token_version == 0
+    snapshot = get_auth_user(user.id, 0, db_session=db_session).snapshot
+    assert sorted(snapshot.assigned_countries) == ["JAPAN", "SINGAPORE"]
+
+
+def test_deactivated_users_are_rejected(db_session, user):
+    get_auth_user(user.id, 0, db_session=db_session)
+
+    user.is_deleted = True
+    db_session.commit()
+
+    assert get_auth_user(user.id, 0, db_session=db_session) is None
+    assert get_auth_user(user.id, user.token_version, db_session=db_session) is None
+
+
+def test_savepoint_rollback_keeps_earlier_changes_pending(db_session, user):
+    get_auth_user(user.id, 0, db_session=db_session)
+
+    db_session.add(UserCountryPermission(user_id=user.id, country="JAPAN"))
+    db_session.flush()
+    db_session.begin_nested().rollback()
+    db_session.commit()
+
+    snapshot = get_auth_user(user.id, 0, db_session=db_session).snapshot
+    assert sorted(snapshot.assigned_countries) == ["JAPAN", "SINGAPORE"]
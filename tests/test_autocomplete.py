@@ -0,0 +1,175 @@
+"""
+Tests for the in-memory autocomplete index (prefix search, change log polling).
+
+Usage:
+    pytest tests/test_autocomplete.py -v
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models.asset import Asset, AssetStatus
+from models.autocomplete_change import AutocompleteChange, record_changes
+from models.customer_user import CustomerUser
+from models.group import Group
+from models.group_membership import GroupMembership
+from models.user import User
+from models.user_mention_permission import UserMentionPermission
+from utils import autocomplete as autocomplete_module
+from utils.autocomplete import AutocompleteIndex, PrefixIndex, mention_suggestions
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = AutocompleteIndex()
+    monkeypatch.setattr(autocomplete_module, "autocomplete", index)
+    monkeypatch.setattr(autocomplete_module, "POLL_SECONDS", 0)
+    return index
+
+
+@pytest.fixture
+def people(db_session):
+    admin = User(username="admin", email="admin@example.com", password_hash="x")
+    alice = User(username="alice.tan", email="alice@example.com", password_hash="x")
+    bob = User(username="bob", email="bob@example.com", password_hash="x", is_deleted=True)
+    db_session.add_all([admin, alice, bob])
+    db_session.flush()
+    group = Group(name="alpha-team", created_by_id=admin.id)
+    db_session.add(group)
+    db_session.flush()
+    db_session.add(GroupMembership(group_id=group.id, user_id=alice.id))
+    db_session.commit()
+    return admin, alice, bob, group
+
+
+def _ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_prefix_index_matches_words_in_key_order():
+    index = PrefixIndex()
+    index.load([(1, {"alice tan", "alice", "tan"}), (2, {"tanya"}), (3, {"bob"})])
+
+    assert index.search("tan", 10) == [1, 2]
+    assert index.search("tan", 10, allowed={2, 3}) == [2]
+    assert index.search("tan", 1) == [1]
+    assert index.search("", 10) == [1, 3, 2]
+
+    index.put(3, {"tango"})
+    index.remove(1)
+    assert index.search("tan", 10) == [3, 2]
+    assert index.search("alice", 10) == []
+
+
+def test_search_covers_every_source(db_session, index, people):
+    admin, alice, bob, group = people
+    db_session.add(CustomerUser(name="Maria Lopez", email="maria@acme.test", contact_number="+65 9123",
+                                address="1 Main St", country="SINGAPORE"))
+    db_session.add(Asset(asset_tag="SG-0001", serial_num="C02XK1", name="MacBook Pro", model="A2338",
+                         status=AssetStatus.IN_STOCK))
+    db_session.commit()
+
+    assert _ids(index.search(db_session, "users", "ali")) == [alice.id]
+    assert _ids(index.search(db_session, "users", "bob")) == []  # Deleted
+    assert _ids(index.search(db_session, "usernames", "tan")) == [alice.id]
+    assert index.search(db_session, "groups", "alp")[0]["member_count"] == 1
+    assert index.search(db_session, "customers", "LOPEZ")[0]["name"] == "Maria Lopez"
+    assert index.search(db_session, "customers", "maria@")[0]["email"] == "maria@acme.test"
+    assert index.search(db_session, "assets", "c02x")[0]["asset_tag"] == "SG-0001"
+    assert index.search(db_session, "assets", "macb")[0]["model"] == "A2338"
+
+
+def test_changes_are_applied_incrementally(db_session, index, people):
+    admin, alice, bob, group = people
+    index.refresh(db_session)
+    version = index.version
+
+    alice.username = "alicia"
+    carol = User(username="carol", email="carol@example.com", password_hash="x")
+    db_session.add(carol)
+    db_session.delete(bob)
+    db_session.commit()
+    assert db_session.query(AutocompleteChange).filter(AutocompleteChange.id > version).count() == 3
+
+    assert _ids(index.search(db_session, "users", "alice")) == [alice.id]  # Via the email
+    assert index.search(db_session, "usernames", "alicia")[0]["id"] == alice.id
+    assert index.search(db_session, "usernames", "alice") == []
+    assert _ids(index.search(db_session, "usernames", "carol")) == [carol.id]
+    assert index.search(db_session, "usernames", "bob") == []
+    assert index.version > version
+
+
+def test_unrelated_updates_are_not_logged(db_session, index, people):
+    admin = people[0]
+    count = db_session.query(AutocompleteChange).count()
+
+    admin.theme_preference = "dark"
+    db_session.commit()
+
+    assert db_session.query(AutocompleteChange).count() == count
+
+
+def test_bulk_and_core_writes_reload_the_source(db_session, db_engine, index, people):
+    index.refresh(db_session)
+
+    db_session.query(Group).update({Group.name: "omega-team"}, synchronize_session=False)
+    db_session.commit()
+    with db_engine.begin() as conn:
+        conn.execute(insert(Asset.__table__), [{"asset_tag": "SG-0002", "name": "ThinkPad",
+                                                "status": AssetStatus.IN_STOCK.name}])
+        record_changes(conn, "assets")
+
+    assert index.search(db_session, "groups", "alpha") == []
+    assert index.search(db_session, "groups", "omega")[0]["id"] == people[3].id
+    assert index.search(db_session, "assets", "think")[0]["asset_tag"] == "SG-0002"
+
+
+def test_mention_suggestions_apply_the_mention_filter(db_session, index, people):
+    admin, alice, bob, group = people
+    names = [s["name"] for s in mention_suggestions(db_session, admin.id, "a")]
+    assert names == ["admin", "alice.tan", "alpha-team"]
+
+    admin.mention_filter_enabled = True
+    db_session.add(UserMentionPermission(user_id=admin.id, target_type="group", target_id=group.id))
+    db_session.commit()
+
+    suggestions = mention_suggestions(db_session, admin.id, "a")
+    assert [(s["type"], s["display_name"]) for s in suggestions] == [("group", "@alpha-team")]
+    assert suggestions[0]["description"] == "Group with 1 members"
+
+
+def test_periodic_reload_prunes_old_changes(db_session, index, people, monkeypatch):
+    index.refresh(db_session)
+    db_session.add(AutocompleteChange(table_name="users", row_id=people[0].id,
+                                      created_at=datetime.utcnow() - timedelta(days=2)))
+    db_session.commit()
+    count = db_session.query(AutocompleteChange).count()
+
+    monkeypatch.setattr(autocomplete_module, "FULL_RELOAD_SECONDS", 0)
+    index.refresh(db_session, force=True)
+
+    assert db_session.query(AutocompleteChange).count() == count - 1
+
+
+def test_scopes_are_reloaded_only_when_their_tables_change(db_session, index, people):
+    admin, alice, bob, group = people
+    index.refresh(db_session)
+    loads = []
+
+    def scope():
+        return index.scope(("mention_users", admin.id), lambda: loads.append(1) or {alice.id})
+
+    scope()
+    alice.email = "alicia@example.com"  # Logged, but no mention permission changed
+    db_session.commit()
+    index.refresh(db_session, force=True)
+    scope()
+    assert len(loads) == 1
+
+    db_session.add(UserMentionPermission(user_id=admin.id, target_type="user", target_id=bob.id))
+    db_session.commit()
+    index.refresh(db_session, force=True)
+    scope()
+    assert len(loads) == 2
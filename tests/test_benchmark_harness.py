@@ -0,0 +1,78 @@
+"""
+Tests for the endpoint benchmark harness (scripts/benchmark_endpoints.py).
+
+Usage:
+    pytest tests/test_benchmark_harness.py -v
+    pytest tests/test_benchmark_harness.py -v -m slow   # seeds and runs a tiny benchmark
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(PROJECT_ROOT, 'scripts', 'benchmark_endpoints.py')
+
+spec = importlib.util.spec_from_file_location('benchmark_endpoints', SCRIPT)
+benchmark = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(benchmark)
+
+
+def make_report(p95_ms=10.0, queries=5, status=(200,), rss=150.0, scale=0.01):
+    return {
+        'meta': {'scale': scale},
+        'peak_rss_mb': rss,
+        'endpoints': {'api_v2.tickets': {'p50_ms': p95_ms / 2, 'p95_ms': p95_ms, 'queries': queries,
+                                         'db_ms_p50': 1.0, 'status': list(status)}},
+    }
+
+
+def test_parse_server_timing():
+    header = 'db;dur=12.5;desc="7 queries", app;dur=30.1'
+    assert benchmark.parse_server_timing(header) == (7, 12.5)
+    assert benchmark.parse_server_timing(None) == (None, None)
+
+
+def test_identical_run_has_no_regressions():
+    assert benchmark.compare_to_baseline(make_report(), make_report()) == []
+
+
+def test_query_growth_and_errors_regress():
+    problems = benchmark.compare_to_baseline(make_report(queries=6, status=(200, 500)), make_report())
+    assert problems == ['api_v2.tickets: HTTP [200, 500]', 'api_v2.tickets: queries 5 -> 6']
+
+
+def test_latency_growth_below_noise_floor_is_ignored():
+    # +40% but only 4 ms: noise
+    assert benchmark.compare_to_baseline(make_report(p95_ms=14.0), make_report()) == []
+    problems = benchmark.compare_to_baseline(make_report(p95_ms=40.0), make_report())
+    assert problems == ['api_v2.tickets: p95 10.0 -> 40.0 ms']
+
+
+def test_scale_mismatch_is_reported():
+    [problem] = benchmark.compare_to_baseline(make_report(scale=0.1), make_report())
+    assert 'scale 0.01' in problem
+
+
+@pytest.mark.slow
+def test_seed_and_benchmark_round_trip(tmp_path):
+    db_path = tmp_path / 'bench.db'
+    baseline = tmp_path / 'baseline.json'
+    command = [sys.executable, SCRIPT, '--db', str(db_path), '--scale', '0.001', '--iterations', '2',
+               '--only', 'api_v2', '--only', 'mobile_api', '--baseline', str(baseline)]
+
+    recorded = subprocess.run(command + ['--update-baseline'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=600)
+    assert recorded.returncode == 0, recorded.stderr[-2000:]
+    report = json.loads(baseline.read_text())
+    assert all(result['status'] == [200] for result in report['endpoints'].values())
+    assert all(result['queries'] for result in report['endpoints'].values())
+
+    compared = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=600)
+    assert 'Seeded' not in compared.stdout  # database reused
+    # Query counts are deterministic; latency at this size is too noisy to assert on
+    assert ': queries' not in compared.stdout and ': HTTP' not in compared.stdout
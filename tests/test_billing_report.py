@@ -0,0 +1,118 @@
+"""
+Tests for the billing report engine (fees per country, XLSX export).
+
+tests/golden/billing_report.json holds the billing_data the original
+per-ticket loop of /admin/billing-generator/generate returned for the
+dataset built by _add_tickets(); the engine must reproduce it exactly.
+
+Usage:
+    pytest tests/test_billing_report.py -v
+"""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from openpyxl import load_workbook
+
+from models.company import Company
+from models.ticket import Ticket, TicketCategory, TicketStatus
+from models.user import User
+from utils.billing_report import billing_breakdown, billing_data, billing_sheets, load_billing_frame, price_tickets
+from utils.streaming_export import write_xlsx_sheets
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden", "billing_report.json")
+
+
+def _add_tickets(db_session, count=240, seed=7):
+    """Tickets of requesters in several countries and companies, with every category"""
+    rng = random.Random(seed)
+    acme, globex = Company(name="Acme"), Company(name="Globex")
+    db_session.add_all([acme, globex])
+    db_session.flush()
+
+    users = []
+    for i, (country, company) in enumerate([("SINGAPORE", acme), ("SINGAPORE", globex), ("JAPAN", acme),
+                                            ("PHILIPPINES", None), (None, globex), ("", acme)]):
+        user = User(username=f"requester{i}", email=f"requester{i}@example.com", password_hash="x",
+                    assigned_country=country, company_id=company.id if company else None)
+        db_session.add(user)
+        users.append(user)
+    db_session.flush()
+
+    categories = list(TicketCategory) + [None]
+    for i in range(count):
+        db_session.add(Ticket(
+            subject=f"Billing ticket {i}",
+            description="-",
+            requester_id=rng.choice(users).id,
+            category=rng.choice(categories),
+            status=rng.choice(list(TicketStatus)),
+            created_at=datetime(2026, 3, 1) + timedelta(hours=3 * i)
+        ))
+    db_session.commit()
+    return [ticket_id for (ticket_id,) in db_session.query(Ticket.id).order_by(Ticket.id)]
+
+
+def _golden():
+    with open(GOLDEN_PATH) as f:
+        return json.load(f)
+
+
+def test_report_matches_the_golden_file(db_session):
+    ticket_ids = _add_tickets(db_session)
+
+    frame = price_tickets(load_billing_frame(db_session, list(reversed(ticket_ids))))
+    report = billing_data(frame)
+
+    assert json.loads(json.dumps(report)) == _golden()
+    assert list(report) == list(_golden())  # Countries in order of first ticket
+
+
+def test_breakdown_adds_up_to_the_country_totals(db_session):
+    ticket_ids = _add_tickets(db_session)
+
+    frame = price_tickets(load_billing_frame(db_session, ticket_ids))
+    breakdown = billing_breakdown(frame)
+
+    golden = _golden()
+    for country, data in golden.items():
+        rows = [row for row in breakdown if row["country"] == country]
+        assert sum(row["quantity"] for row in rows) == data["quantity"]
+        assert sum(row["total_amount"] for row in rows) == data["total_amount"]
+        for fee, amount in data["fees"].items():
+            assert sum(row[fee] for row in rows) == amount
+    intake = next(row for row in breakdown if row["category"] == "ASSET_INTAKE")
+    assert intake["intake_fee"] == 1100 * intake["quantity"]
+    assert intake["total_amount"] == 1190 * intake["quantity"]
+
+
+def test_unselected_and_missing_tickets_are_not_billed(db_session):
+    ticket_ids = _add_tickets(db_session, count=20)
+
+    frame = price_tickets(load_billing_frame(db_session, ticket_ids[:5] + [9999]))
+
+    assert frame["id"].tolist() == ticket_ids[:5]
+    assert sum(data["quantity"] for data in billing_data(frame).values()) == 5
+    assert billing_data(price_tickets(load_billing_frame(db_session, [9999]))) == {}
+
+
+def test_workbook_totals_match_the_golden_file(db_session, tmp_path):
+    ticket_ids = _add_tickets(db_session)
+    path = tmp_path / "billing.xlsx"
+
+    write_xlsx_sheets(str(path), billing_sheets(price_tickets(load_billing_frame(db_session, ticket_ids))))
+
+    golden = _golden()
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Billing Summary", "Billing Breakdown"] + [f"{c} Details" for c in golden]
+    summary = list(workbook["Billing Summary"].iter_rows(values_only=True))
+    assert summary[0] == ("Country", "Total Tickets", "Receiving Fee", "Warehouse/Storage Fee", "Order Fee",
+                          "Return Fee", "Intake Fee", "Management Fee", "Total Amount")
+    assert {row[0]: (row[1], row[-1]) for row in summary[1:]} == {
+        country: (data["quantity"], data["total_amount"]) for country, data in golden.items()
+    }
+    details = list(workbook["JAPAN Details"].iter_rows(values_only=True))
+    assert details[0] == ("id", "subject", "status", "category", "created_at")
+    assert [list(row) for row in details[1:]] == [list(t.values()) for t in golden["JAPAN"]["tickets"]]
@@ -0,0 +1,143 @@
+"""
+Tests for the shared cache (tag invalidation, view/query decorators, L1/L2).
+
+Usage:
+    pytest tests/test_cache.py -v
+"""
+
+import pytest
+from flask import Flask, jsonify, session
+
+from models.asset import Asset, AssetStatus
+from utils import cache as cache_module
+from utils.cache import TwoLevelCache, cached_query, cached_view, init_cache, invalidate
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', CACHE_TYPE='FileSystemCache', CACHE_DIR=str(tmp_path / 'cache'))
+    init_cache(app)
+    yield app
+    cache_module.cache.app = None
+
+
+def test_invalidation_follows_the_tag_hierarchy(app):
+    calls = []
+
+    @cached_query(tags=lambda name, tag: (tag,))
+    def read(name, tag):
+        calls.append(name)
+        return name
+
+    tags = {'all': 'assets', 'c12': 'assets:company:12', 'c5': 'assets:company:5'}
+    with app.app_context():
+        for name, tag in tags.items():
+            read(name, tag)
+        assert len(calls) == 3
+        for name, tag in tags.items():
+            read(name, tag)
+        assert len(calls) == 3
+
+        invalidate('assets:company:12')
+        for name, tag in tags.items():
+            read(name, tag)
+        assert calls[3:] == ['all', 'c12']
+
+        invalidate('assets')
+        for name, tag in tags.items():
+            read(name, tag)
+        assert sorted(calls[5:]) == ['all', 'c12', 'c5']
+
+
+def test_views_are_cached_per_user_and_only_when_successful(app):
+    calls = []
+
+    @app.route('/stats')
+    @cached_view(tags=('tickets',))
+    def stats():
+        calls.append(session['user_id'])
+        return jsonify({'success': True, 'user': session['user_id']})
+
+    @app.route('/broken')
+    @cached_view(tags=('tickets',))
+    def broken():
+        calls.append('broken')
+        return jsonify({'success': False, 'error': 'database unavailable'})
+
+    client = app.test_client()
+    for user_id in (1, 2, 1, 2):
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        assert client.get('/stats').get_json()['user'] == user_id
+    assert calls == [1, 2]
+
+    client.get('/broken')
+    client.get('/broken')
+    assert calls.count('broken') == 2
+
+    with client.session_transaction() as sess:
+        sess.clear()
+    client.get('/broken')
+    with app.app_context():
+        invalidate('tickets')
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    client.get('/stats')
+    assert calls[-1] == 1
+
+
+def test_commits_invalidate_the_tags_of_changed_rows(app, db_session):
+    counted = []
+
+    @cached_query(tags=lambda company_id: (f'assets:company:{company_id}',))
+    def company_assets(company_id):
+        counted.append(company_id)
+        return db_session.query(Asset).filter_by(company_id=company_id).count()
+
+    with app.app_context():
+        assert company_assets(1) == 0 and company_assets(2) == 0
+        db_session.add(Asset(asset_tag='T1', company_id=1, status=AssetStatus.IN_STOCK))
+        db_session.commit()
+        assert company_assets(1) == 1 and company_assets(2) == 0
+        assert counted == [1, 2, 1]
+
+        asset = db_session.query(Asset).filter_by(asset_tag='T1').one()
+        asset.company_id = 2  # Leaves company 1 and joins company 2
+        db_session.commit()
+        assert company_assets(1) == 0 and company_assets(2) == 1
+
+        db_session.query(Asset).update({Asset.model: 'A2338'}, synchronize_session=False)
+        db_session.rollback()
+        assert counted == [1, 2, 1, 1, 2]
+
+
+def test_savepoint_rollback_keeps_the_outer_changes_pending(app, db_session):
+    counted = []
+
+    @cached_query(tags=('assets',))
+    def asset_count():
+        counted.append(1)
+        return db_session.query(Asset).count()
+
+    with app.app_context():
+        assert asset_count() == 0
+        db_session.add(Asset(asset_tag='T1', status=AssetStatus.IN_STOCK))
+        db_session.flush()
+        db_session.begin_nested().rollback()
+        db_session.commit()
+        assert asset_count() == 1 and len(counted) == 2
+
+
+def test_two_level_cache_shares_values_between_workers(tmp_path):
+    first = TwoLevelCache(str(tmp_path), l1_timeout=5)
+    second = TwoLevelCache(str(tmp_path), l1_timeout=5)
+
+    first.set('grid', 'v1', timeout=60)
+    assert second.get('grid') == 'v1'  # Read from the shared file cache
+
+    first.set('grid', 'v2', timeout=60)
+    assert second.get('grid') == 'v1'  # Local copy until it expires
+    second.l1.clear()
+    assert second.get('grid') == 'v2'
+    assert second.add('grid', 'v3') is False
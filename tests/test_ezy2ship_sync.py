@@ -0,0 +1,385 @@
+"""
+Tests for the SingPost Ezy2ship mirror, against a local stub of the SOAP service.
+
+The stub serves a WSDL with the getManifests, getManifest and
+getShipmentsInfo operations and answers them from in-memory manifests, so
+the real zeep client and SingPostEzy2shipClient are exercised end to end.
+
+Usage:
+    pytest tests/test_ezy2ship_sync.py -v
+"""
+
+import base64
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import pytest
+
+from models.ezy2ship_shipment import Ezy2shipManifest, Ezy2shipShipment
+from models.ticket import Ticket
+from models.user import User
+from utils.singpost_ezy2ship import ZEEP_AVAILABLE, SingPostEzy2shipClient
+from utils.ezy2ship_sync import Ezy2shipSync, search_shipments, ticket_shipments, watermark
+
+pytestmark = pytest.mark.skipif(not ZEEP_AVAILABLE, reason="zeep not installed")
+
+TODAY = date(2026, 3, 31)
+NS = "http://ezy2ship.stub/api"
+
+WSDL = f"""<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+             xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:tns="{NS}" targetNamespace="{NS}">
+  <types>
+    <xsd:schema targetNamespace="{NS}" elementFormDefault="qualified">
+      <xsd:complexType name="ArrayOfString">
+        <xsd:sequence><xsd:element name="string" type="xsd:string" minOccurs="0" maxOccurs="unbounded"/></xsd:sequence>
+      </xsd:complexType>
+      <xsd:complexType name="Manifest">
+        <xsd:sequence>
+          <xsd:element name="ManifestNumber" type="xsd:string"/>
+          <xsd:element name="ManifestDate" type="xsd:string"/>
+          <xsd:element name="CarrierCode" type="xsd:string"/>
+          <xsd:element name="ShipmentCount" type="xsd:int"/>
+          <xsd:element name="Status" type="xsd:string"/>
+        </xsd:sequence>
+      </xsd:complexType>
+      <xsd:complexType name="Shipment">
+        <xsd:sequence>
+          <xsd:element name="TrackingNumber" type="xsd:string"/>
+          <xsd:element name="DocketNumber" type="xsd:string"/>
+          <xsd:element name="ServiceCode" type="xsd:string"/>
+          <xsd:element name="CarrierCode" type="xsd:string"/>
+          <xsd:element name="Weight" type="xsd:decimal"/>
+          <xsd:element name="ReceiverName" type="xsd:string"/>
+          <xsd:element name="ReceiverAddress1" type="xsd:string"/>
+          <xsd:element name="ReceiverCity" type="xsd:string"/>
+          <xsd:element name="ReceiverPostcode" type="xsd:string"/>
+          <xsd:element name="ReceiverCountryCode" type="xsd:string"/>
+          <xsd:element name="Status" type="xsd:string"/>
+        </xsd:sequence>
+      </xsd:complexType>
+      <xsd:complexType name="TrackTraceEvent">
+        <xsd:sequence>
+          <xsd:element name="EventCode" type="xsd:string"/>
+          <xsd:element name="EventName" type="xsd:string"/>
+          <xsd:element name="EventDate" type="xsd:string"/>
+          <xsd:element name="EventTime" type="xsd:string"/>
+          <xsd:element name="EventSignatoryName" type="xsd:string" minOccurs="0"/>
+        </xsd:sequence>
+      </xsd:complexType>
+      <xsd:complexType name="ShipmentInfo">
+        <xsd:sequence>
+          <xsd:element name="TrackingNumber" type="xsd:string"/>
+          <xsd:element name="CarrierCode" type="xsd:string"/>
+          <xsd:element name="CarrierTrackingNumber" type="xsd:string" minOccurs="0"/>
+          <xsd:element name="TrackTrace" type="tns:TrackTraceEvent" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence>
+      </xsd:complexType>
+      <xsd:element name="getManifests">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="ticket" type="xsd:string"/>
+          <xsd:element name="dateFrom" type="xsd:string"/>
+          <xsd:element name="dateTo" type="xsd:string"/>
+          <xsd:element name="carrierCode" type="xsd:string" minOccurs="0"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="getManifestsResponse">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="Manifest" type="tns:Manifest" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="getManifest">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="ticket" type="xsd:string"/>
+          <xsd:element name="manifestNumber" type="xsd:string"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="getManifestResponse">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="ManifestNumber" type="xsd:string"/>
+          <xsd:element name="ManifestDate" type="xsd:string"/>
+          <xsd:element name="Shipments" type="tns:Shipment" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="getShipmentsInfo">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="ticket" type="xsd:string"/>
+          <xsd:element name="trackingNumbers" type="tns:ArrayOfString"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="getShipmentsInfoResponse">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="ShipmentInfo" type="tns:ShipmentInfo" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+    </xsd:schema>
+  </types>
+  {"".join(f'''
+  <message name="{op}Request"><part name="parameters" element="tns:{op}"/></message>
+  <message name="{op}Response"><part name="parameters" element="tns:{op}Response"/></message>'''
+           for op in ("getManifests", "getManifest", "getShipmentsInfo"))}
+  <portType name="Ezy2shipPort">{"".join(f'''
+    <operation name="{op}"><input message="tns:{op}Request"/><output message="tns:{op}Response"/></operation>'''
+                                         for op in ("getManifests", "getManifest", "getShipmentsInfo"))}
+  </portType>
+  <binding name="Ezy2shipBinding" type="tns:Ezy2shipPort">
+    <soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>{"".join(f'''
+    <operation name="{op}"><soap:operation soapAction="{op}"/>
+      <input><soap:body use="literal"/></input><output><soap:body use="literal"/></output></operation>'''
+                                                                               for op in ("getManifests", "getManifest",
+                                                                                          "getShipmentsInfo"))}
+  </binding>
+  <service name="Ezy2shipService">
+    <port name="Ezy2shipPort" binding="tns:Ezy2shipBinding"><soap:address location="ADDRESS"/></port>
+  </service>
+</definitions>
+"""
+
+
+def _xml(tag, fields):
+    return f"<{tag}>" + "".join(f"<{name}>{escape(str(value))}</{name}>" for name, value in fields) + f"</{tag}>"
+
+
+class StubService:
+    """The Ezy2ship API, served from memory on a local port"""
+
+    def __init__(self):
+        self.manifests = {}  # number -> {date, carrier, status, shipments: [tracking numbers]}
+        self.events = {}  # tracking number -> [event names], newest first
+        self.failing = set()  # manifest numbers whose getManifest faults
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def add_manifest(self, number, manifest_date, shipments, status="Closed"):
+        self.manifests[number] = {"date": manifest_date.isoformat(), "status": status, "shipments": list(shipments)}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._send(200, WSDL.replace("ADDRESS", stub.url + "/soap"))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                request = ElementTree.fromstring(body).find("{http://schemas.xmlsoap.org/soap/envelope/}Body")[0]
+                operation = request.tag.split("}")[1]
+                args = {child.tag.split("}")[1]: child for child in request}
+                with stub.lock:
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(0.02)
+                    status, payload = stub.respond(operation, args)
+                finally:
+                    with stub.lock:
+                        stub.active -= 1
+                self._send(status, '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+                                   f'<soap:Body>{payload}</soap:Body></soap:Envelope>')
+
+            def _send(self, status, text):
+                data = text.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def respond(self, operation, args):
+        with self.lock:
+            self.calls.append((operation, {name: element.text for name, element in args.items()}))
+        if operation == "getManifests":
+            date_from, date_to = args["dateFrom"].text, args["dateTo"].text
+            manifests = "".join(
+                _xml("Manifest", [("ManifestNumber", number), ("ManifestDate", m["date"]), ("CarrierCode", "LOG"),
+                                  ("ShipmentCount", len(m["shipments"])), ("Status", m["status"])])
+                for number, m in self.manifests.items() if date_from <= m["date"] <= date_to
+            )
+            return 200, f'<getManifestsResponse xmlns="{NS}">{manifests}</getManifestsResponse>'
+        if operation == "getManifest":
+            number = args["manifestNumber"].text
+            if number in self.failing:
+                return 500, ("<soap:Fault><faultcode>soap:Server</faultcode>"
+                             "<faultstring>Service unavailable</faultstring></soap:Fault>")
+            manifest = self.manifests[number]
+            shipments = "".join(
+                _xml("Shipments", [("TrackingNumber", tn), ("DocketNumber", f"D-{tn}"), ("ServiceCode", "IWCNDD"),
+                                   ("CarrierCode", "LOG"), ("Weight", "1.25"), ("ReceiverName", f"Receiver {tn}"),
+                                   ("ReceiverAddress1", "1 Main St"), ("ReceiverCity", "Singapore"),
+                                   ("ReceiverPostcode", "123456"), ("ReceiverCountryCode", "SG"),
+                                   ("Status", "Manifested")])
+                for tn in manifest["shipments"]
+            )
+            return 200, (f'<getManifestResponse xmlns="{NS}"><ManifestNumber>{number}</ManifestNumber>'
+                         f'<ManifestDate>{manifest["date"]}</ManifestDate>{shipments}</getManifestResponse>')
+        if operation == "getShipmentsInfo":
+            infos = ""
+            for element in args["trackingNumbers"]:
+                tn = element.text
+                if tn not in self.events:
+                    continue
+                events = "".join(_xml("TrackTrace", [("EventCode", "E"), ("EventName", name),
+                                                     ("EventDate", "2026-03-30"), ("EventTime", "10:00")])
+                                 for name in self.events[tn])
+                infos += (f"<ShipmentInfo><TrackingNumber>{tn}</TrackingNumber>"
+                          f"<CarrierCode>LOG</CarrierCode>{events}</ShipmentInfo>")
+            return 200, f'<getShipmentsInfoResponse xmlns="{NS}">{infos}</getShipmentsInfoResponse>'
+        raise AssertionError(operation)
+
+    def count(self, operation):
+        return sum(1 for name, _ in self.calls if name == operation)
+
+
+@pytest.fixture
+def stub():
+    service = StubService()
+    yield service
+    service.server.shutdown()
+    service.server.server_close()
+
+
+@pytest.fixture
+def client(stub):
+    client = SingPostEzy2shipClient(customer_id=1001, username="api", password="secret",
+                                    aes_key=base64.b64encode(b"k" * 32).decode())
+    client.wsdl_url = stub.url + "/api.wsdl"
+    return client
+
+
+def _sync(db_session, client, **kwargs):
+    return Ezy2shipSync(db_session, client=client, workers=4, today=TODAY, **kwargs).run()
+
+
+def test_first_sync_mirrors_manifests_concurrently(db_session, stub, client):
+    for day in range(6):
+        stub.add_manifest(f"M{day}", TODAY - timedelta(days=day * 20), [f"SP{day}A", f"SP{day}B"])
+    stub.events = {"SP0A": ["Item delivered", "Out for delivery"], "SP1A": ["In transit"]}
+
+    stats = _sync(db_session, client)
+
+    # 90 days back in 30 day windows; the manifest of 100 days ago is outside
+    assert stub.count("getManifests") == 4
+    assert stats["manifests"] == 5 and stats["manifests_fetched"] == 5 and stats["shipments"] == 10
+    assert stub.max_active > 1
+    shipments = {s.tracking_number: s for s in db_session.query(Ezy2shipShipment)}
+    assert set(shipments) == {f"SP{day}{x}" for day in range(5) for x in "AB"}
+    assert shipments["SP0A"].status == "Item delivered" and shipments["SP0A"].events_count == 2
+    assert shipments["SP1A"].last_event == "In transit"
+    assert shipments["SP2B"].status == "Manifested" and shipments["SP2B"].weight == 1.25
+    assert shipments["SP2B"].manifest_date == TODAY - timedelta(days=40)
+    assert watermark(db_session, TODAY) == TODAY - timedelta(days=3)
+
+
+def test_incremental_sync_refetches_only_new_and_changed_manifests(db_session, stub, client):
+    stub.add_manifest("OLD", TODAY - timedelta(days=10), ["SP1"])
+    stub.add_manifest("OPEN", TODAY - timedelta(days=1), ["SP2"], status="Open")
+    stub.events = {"SP1": ["Item delivered"]}
+    _sync(db_session, client)
+    stub.calls.clear()
+
+    stub.add_manifest("OPEN", TODAY - timedelta(days=1), ["SP2", "SP3"], status="Closed")
+    stub.add_manifest("NEW", TODAY, ["SP4"])
+    stats = _sync(db_session, client)
+
+    assert stub.calls[0] == ("getManifests", {"ticket": stub.calls[0][1]["ticket"],
+                                              "dateFrom": (TODAY - timedelta(days=4)).isoformat(),
+                                              "dateTo": TODAY.isoformat()})
+    assert sorted(args["manifestNumber"] for name, args in stub.calls if name == "getManifest") == ["NEW", "OPEN"]
+    assert stats["manifests"] == 2 and stats["shipments"] == 3
+    assert db_session.query(Ezy2shipShipment).count() == 4
+    assert db_session.query(Ezy2shipManifest).filter_by(manifest_number="OPEN").one().shipment_count == 2
+
+
+def test_failed_manifest_is_fetched_again(db_session, stub, client):
+    stub.add_manifest("M1", TODAY, ["SP1"])
+    stub.add_manifest("M2", TODAY, ["SP2"])
+    stub.failing = {"M2"}
+
+    stats = _sync(db_session, client)
+    assert stats["manifests_fetched"] == 1 and stats["manifests_failed"] == 1
+    assert db_session.query(Ezy2shipManifest).filter_by(manifest_number="M2").one().shipments_synced_at is None
+
+    stub.failing = set()
+    stub.calls.clear()
+    stats = _sync(db_session, client)
+    assert [args["manifestNumber"] for name, args in stub.calls if name == "getManifest"] == ["M2"]
+    assert db_session.query(Ezy2shipShipment).count() == 2
+
+
+def test_local_queries_link_tickets(db_session, stub, client):
+    user = User(username="ops", email="ops@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    ticket = Ticket(subject="Ship laptop", description="-", requester_id=user.id,
+                    shipping_tracking="SP1", return_tracking="SP2")
+    db_session.add(ticket)
+    db_session.commit()
+    stub.add_manifest("M1", TODAY, ["SP1", "SP2", "SP3"])
+    stub.events = {"SP1": ["In transit"]}
+
+    stats = _sync(db_session, client)
+
+    assert stats["matched"] == 2
+    assert [s["tracking_number"] for s in ticket_shipments(db_session, ticket)] == ["SP1", "SP2"]
+    assert [s["tracking_number"] for s in search_shipments(db_session, unmatched=True)] == ["SP3"]
+    assert [s["tracking_number"] for s in search_shipments(db_session, status="transit")] == ["SP1"]
+    assert [s["tracking_number"] for s in search_shipments(db_session, query="receiver sp2")] == ["SP2"]
+    assert search_shipments(db_session, date_to=TODAY - timedelta(days=1)) == []
+
+
+def test_statuses_and_matches_are_not_limited_to_the_run_window(db_session, stub, client):
+    stub.add_manifest("OLD", TODAY - timedelta(days=20), ["SP1", "SP2"])
+    stub.add_manifest("NEW", TODAY, ["SP3"])
+    stub.events = {"SP1": ["In transit"], "SP2": ["In transit"], "SP3": ["In transit"]}
+    _sync(db_session, client)
+    user = User(username="ops", email="ops@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    ticket = Ticket(subject="Ship laptop", description="-", requester_id=user.id, shipping_tracking="SP2")
+    db_session.add(ticket)
+    stale = db_session.query(Ezy2shipShipment).filter_by(tracking_number="SP1").one()
+    stale.status_checked_at = datetime.utcnow() - timedelta(hours=7)
+    db_session.commit()
+
+    stub.events = {name: ["Item delivered"] for name in ("SP1", "SP2", "SP3")}
+    stats = _sync(db_session, client)
+
+    # The run only reads the manifests from the watermark (3 days ago)
+    assert stats["manifests"] == 1
+    db_session.expire_all()
+    shipments = {s.tracking_number: s for s in db_session.query(Ezy2shipShipment)}
+    assert shipments["SP1"].status == "Item delivered"
+    assert shipments["SP2"].status == "In transit"  # Checked less than STATUS_INTERVAL_HOURS ago
+    assert shipments["SP2"].ticket_id == ticket.id and stats["matched"] == 1
+
+
+
+def test_failed_deliveries_keep_being_tracked(db_session, stub, client):
+    stub.add_manifest("M", TODAY, ["SP1", "SP2", "SP3"])
+    stub.events = {"SP1": ["Item could not be delivered"], "SP2": ["Delivery failed"], "SP3": ["Item delivered"]}
+    _sync(db_session, client)
+    for shipment in db_session.query(Ezy2shipShipment):
+        shipment.status_checked_at = datetime.utcnow() - timedelta(hours=7)
+    db_session.commit()
+
+    stub.events = {name: ["Item delivered"] for name in ("SP1", "SP2", "SP3")}
+    _sync(db_session, client)
+
+    db_session.expire_all()
+    shipments = {s.tracking_number: s for s in db_session.query(Ezy2shipShipment)}
+    assert shipments["SP1"].status == "Item delivered" and shipments["SP2"].status == "Item delivered"
+    assert shipments["SP3"].status_checked_at < datetime.utcnow() - timedelta(hours=6)  # Final, not asked again
@@ -0,0 +1,104 @@
+"""
+Tests for protected file delivery (ETag / Range / proxy offload).
+
+Usage:
+    pytest tests/test_file_delivery.py -v
+"""
+
+import os
+
+import pytest
+from flask import Flask
+
+from utils.file_delivery import send_protected_file
+
+
+@pytest.fixture
+def delivery(tmp_path):
+    root = tmp_path / "app"
+    (root / "uploads").mkdir(parents=True)
+    data = bytes(range(256)) * 400  # ~100KB
+    path = root / "uploads" / "packing list.pdf"
+    path.write_bytes(data)
+
+    app = Flask(__name__, root_path=str(root))
+    options = {}
+
+    @app.route("/file")
+    def download():
+        return send_protected_file(str(path), download_name="packing list.pdf", **options)
+
+    return app, app.test_client(), data, options
+
+
+def test_full_download_carries_validators(delivery):
+    app, client, data, _ = delivery
+    response = client.get("/file")
+
+    assert response.status_code == 200
+    assert response.data == data
+    assert response.headers["Content-Type"] == "application/pdf"
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["ETag"] and not response.headers["ETag"].startswith("W/")
+    assert response.headers["Last-Modified"]
+    assert "private" in response.headers["Cache-Control"]
+    assert "no-cache" in response.headers["Cache-Control"]
+    assert "public" not in response.headers["Cache-Control"]
+
+
+def test_if_none_match_returns_304(delivery):
+    _, client, _, options = delivery
+    options["etag"] = "a" * 64
+    etag = client.get("/file").headers["ETag"]
+    assert etag == f'"{"a" * 64}"'
+
+    response = client.get("/file", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_byte_ranges(delivery):
+    _, client, data, _ = delivery
+
+    response = client.get("/file", headers={"Range": "bytes=1000-1999"})
+    assert response.status_code == 206
+    assert response.data == data[1000:2000]
+    assert response.headers["Content-Range"] == f"bytes 1000-1999/{len(data)}"
+
+    response = client.get("/file", headers={"Range": "bytes=-100"})
+    assert response.data == data[-100:]
+
+    response = client.get("/file", headers={"Range": f"bytes={len(data) + 10}-"})
+    assert response.status_code == 416
+
+
+def test_x_sendfile_offload(delivery):
+    app, client, _, _ = delivery
+    app.config["FILE_DELIVERY_OFFLOAD"] = "x-sendfile"
+
+    response = client.get("/file", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 200  # the proxy answers the range
+    assert response.data == b""
+    assert response.headers["X-Sendfile"] == os.path.join(app.root_path, "uploads", "packing list.pdf")
+
+    response = client.get("/file", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert "X-Sendfile" not in response.headers
+
+
+def test_x_accel_redirect_offload(delivery):
+    app, client, _, _ = delivery
+    app.config["FILE_DELIVERY_OFFLOAD"] = "x-accel"
+    app.config["FILE_DELIVERY_ACCEL_PREFIX"] = "/_protected/"
+
+    response = client.get("/file")
+    assert response.data == b""
+    assert "X-Sendfile" not in response.headers
+    assert response.headers["X-Accel-Redirect"] == "/_protected/uploads/packing%20list.pdf"
+    assert "attachment" in response.headers["Content-Disposition"]
+
+    # Files outside the aliased root fall back to Python
+    app.config["FILE_DELIVERY_ACCEL_ROOT"] = os.path.join(app.root_path, "uploads", "tickets")
+    response = client.get("/file")
+    assert "X-Accel-Redirect" not in response.headers
+    assert len(response.data) > 0
@@ -0,0 +1,154 @@
+"""
+Tests for the chunked inventory import pipeline.
+
+Usage:
+    pytest tests/test_inventory_import.py -v
+    pytest tests/test_inventory_import.py -v -m "not slow"   # skip the 50k-row benchmark
+"""
+
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from models.asset import Asset, ticket_assets
+from models.import_session import ImportSession
+from models.user import User
+from utils.inventory_import import (
+    InventoryImporter, PREVIEW_COLUMNS, SPREADSHEET_COLUMNS,
+    parse_dates, parse_prices, parse_flags,
+)
+
+
+def _make_session(db_session):
+    user = User(username="importer", email="importer@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    import_session = ImportSession.create(db_session, ImportSession.TYPE_INVENTORY, user.id, file_name="inventory.csv")
+    db_session.commit()
+    return import_session.id
+
+
+def test_vectorized_normalizers():
+    dates = parse_dates(pd.Series(["25-Jul-24", "03/02/2024", "2024-02-03", "not a date", None]))
+    assert dates.iloc[0] == datetime(2024, 7, 25)
+    assert dates.iloc[1] == datetime(2024, 2, 3)  # day first
+    assert dates.iloc[2] == datetime(2024, 2, 3)
+    assert pd.isna(dates.iloc[3]) and pd.isna(dates.iloc[4])
+
+    prices = parse_prices(pd.Series(["$1,299.50", "800", "", None, "n/a"]))
+    assert prices.iloc[0] == 1299.5 and prices.iloc[1] == 800
+    assert prices.iloc[2:].isna().all()
+
+    flags = parse_flags(pd.Series(["Yes", "no", "TRUE", None, "1"]))
+    assert flags.tolist() == [True, False, True, False, True]
+
+
+def test_import_file_inserts_chunks_and_reports_progress(db_engine, db_session, inventory_csv_factory):
+    session_id = _make_session(db_session)
+    path = inventory_csv_factory(25)
+
+    importer = InventoryImporter(db_engine, chunk_size=10, specifications=True, import_session_id=session_id)
+    result = importer.import_file(path)
+
+    assert result["success"] == 25 and result["failed"] == 0
+    assert db_session.query(Asset).count() == 25
+
+    asset = db_session.query(Asset).filter_by(asset_tag="BENCH-0").one()
+    assert asset.receiving_date == datetime(2024, 7, 25)
+    assert asset.category == "APPLE"
+    assert asset.specifications["cpu_type"] == "M3 Pro"
+    assert asset.po is None  # blank cells become NULL, not "nan"
+
+    db_session.expire_all()
+    progress = db_session.get(ImportSession, session_id)
+    assert progress.status == "processing"
+    assert (progress.success_count, progress.fail_count) == (25, 0)
+
+
+def test_duplicates_are_reported_per_row(db_engine, db_session, inventory_csv_factory):
+    path = inventory_csv_factory(6)
+    InventoryImporter(db_engine, column_map=SPREADSHEET_COLUMNS).import_file(inventory_csv_factory(2, "first.csv"))
+
+    df = pd.read_csv(path, dtype=str)
+    df.loc[5, "ASSET TAG"] = "BENCH-4"  # repeated inside the file
+    df.to_csv(path, index=False)
+
+    result = InventoryImporter(db_engine, chunk_size=4).import_file(path)
+
+    assert result["success"] == 3
+    assert result["failed"] == 3
+    assert any(e.startswith("Row 1: Duplicate serial number") for e in result["errors"])
+    assert any(e.startswith("Row 2: Duplicate") and "already" in e for e in result["errors"])
+    assert "Row 6: Duplicate asset tag 'BENCH-4' - repeated in this file" in result["errors"]
+    assert db_session.query(Asset).count() == 5
+
+
+def test_failed_rows_do_not_claim_their_serial(db_engine, db_session):
+    rows = [
+        {"Asset Tag": "SG-9101", "Asset Type": "", "Serial Number": "SN9101"},  # missing type
+        {"Asset Tag": "SG-9101", "Asset Type": "Laptop", "Serial Number": "SN9101"},  # corrected row
+        {"Asset Tag": "SG-9102", "Asset Type": "Laptop", "Serial Number": "SN9101"},  # real repeat
+        {"Asset Tag": "SG-9103", "Asset Type": "", "Serial Number": "SN9103"},
+        {"Asset Tag": "SG-9103", "Asset Type": "Laptop", "Serial Number": "SN9103"},  # next chunk
+    ]
+    importer = InventoryImporter(db_engine, column_map=PREVIEW_COLUMNS, required=("asset_type",), chunk_size=4)
+    result = importer.import_records(rows)
+
+    assert (result["success"], result["failed"]) == (2, 3)
+    assert "Row 3: Duplicate serial number 'SN9101' - repeated in this file" in result["errors"]
+    assert sorted(a.asset_tag for a in db_session.query(Asset)) == ["SG-9101", "SG-9103"]
+
+
+def test_import_records_from_preview_links_ticket(db_engine, db_session, monkeypatch):
+    from models.ticket import Ticket
+    from utils import inventory_import
+
+    invalidated = []
+    monkeypatch.setattr(inventory_import, "invalidate", lambda *tags: invalidated.append(tags))
+
+    rows = [
+        {"Asset Tag": "SG-9001", "Asset Type": "Laptop", "Serial Number": "SN9001", "Receiving Date": "01/02/2024"},
+        {"Asset Tag": "SG-9002", "Asset Type": "", "Serial Number": "SN9002"},
+    ]
+    user = User(username="requester", email="requester@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    ticket = Ticket(subject="Intake", description="", requester_id=user.id)
+    db_session.add(ticket)
+    db_session.commit()
+
+    importer = InventoryImporter(
+        db_engine,
+        column_map=PREVIEW_COLUMNS,
+        required=("asset_type", "asset_tag"),
+        defaults={"erased": "Not completed"},
+        ticket_id=ticket.id,
+    )
+    result = importer.import_records(rows)
+
+    assert result["success"] == 1
+    assert result["errors"] == ["Row 2: Missing required field: Asset Type"]
+    assert result["imported"][0]["asset_tag"] == "SG-9001"
+
+    asset = db_session.query(Asset).filter_by(asset_tag="SG-9001").one()
+    assert asset.erased == "Not completed"
+    assert asset.receiving_date == datetime(2024, 2, 1)
+    linked = db_session.execute(ticket_assets.select()).all()
+    assert [(r.ticket_id, r.asset_id) for r in linked] == [(ticket.id, asset.id)]
+    assert invalidated == [("assets", "tickets")]  # Core inserts bypass the cache listeners
+
+
+@pytest.mark.slow
+def test_benchmark_50k_rows(db_engine, db_session, inventory_csv_factory):
+    path = inventory_csv_factory(50000)
+
+    started = time.perf_counter()
+    result = InventoryImporter(db_engine, specifications=True).import_file(path)
+    elapsed = time.perf_counter() - started
+
+    print(f"\nImported {result['success']} rows in {elapsed:.2f}s ({result['success'] / elapsed:.0f} rows/s)")
+    assert result["success"] == 50000
+    assert db_session.query(Asset).count() == 50000
+    assert elapsed < 60
@@ -0,0 +1,104 @@
+"""
+Tests for asset label rendering and printable label sheets.
+
+Usage:
+    pytest tests/test_label_rendering.py -v
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from utils import barcode_generator
+from utils.barcode_generator import (
+    LABEL_HEIGHT,
+    LABEL_WIDTH,
+    SHEET_COLUMNS,
+    SHEET_ROWS,
+    barcode_raster,
+    cached_label_png,
+    label_cache_key,
+    render_label_sheet,
+    render_labels,
+)
+
+
+@pytest.fixture(autouse=True)
+def label_cache(tmp_path, monkeypatch):
+    folder = tmp_path / "labels"
+    monkeypatch.setattr(barcode_generator, "LABEL_CACHE_FOLDER", str(folder))
+    return folder
+
+
+def _fields(number):
+    return {
+        'company_name': 'Acme Logistics',
+        'asset_tag': f'AT-{number:05d}',
+        'serial_num': f'SN{number:08d}',
+        'name': f'MacBook Pro 14 #{number}',
+    }
+
+
+def test_cache_key_follows_printed_fields():
+    fields = _fields(1)
+    assert label_cache_key(fields) == label_cache_key(dict(fields))
+    assert label_cache_key(fields) != label_cache_key({**fields, 'name': 'Renamed'})
+
+
+def test_label_is_cached_on_disk(label_cache, monkeypatch):
+    fields = _fields(2)
+    first = cached_label_png(fields)
+
+    with Image.open(io.BytesIO(first)) as image:
+        assert image.size == (LABEL_WIDTH, LABEL_HEIGHT)
+    assert len(list(label_cache.rglob("*.png"))) == 1
+
+    # A second request is served from the file, not re-rendered
+    monkeypatch.setattr(barcode_generator, "render_label", lambda fields: pytest.fail("re-rendered"))
+    assert cached_label_png(fields) == first
+    assert render_labels([fields]) == [first]
+
+
+def test_barcode_raster_is_memoized():
+    barcode_raster.cache_clear()
+    first = barcode_raster('SN-CACHE-1')
+    assert barcode_raster('SN-CACHE-1') is first
+    assert barcode_raster.cache_info().hits == 1
+
+
+def test_sheet_pages_hold_a_full_grid():
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+    fields = [_fields(n) for n in range(per_page + 1)]
+
+    pdf, failed = render_label_sheet(fields, output_format='pdf', workers=1)
+    assert failed == []
+    assert pdf.startswith(b'%PDF')
+    fitz = pytest.importorskip("fitz")
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        assert doc.page_count == 2
+
+    pages, failed = render_label_sheet(fields, output_format='png', workers=1)
+    assert len(pages) == 2
+    with Image.open(io.BytesIO(pages[0])) as image:
+        assert image.size == (barcode_generator.SHEET_WIDTH, barcode_generator.SHEET_HEIGHT)
+
+
+def test_unrenderable_labels_are_reported():
+    fields = [_fields(1), {**_fields(2), 'serial_num': ''}]
+    pages, failed = render_label_sheet(fields, output_format='png', workers=1)
+    assert failed == [1]
+    assert len(pages) == 1
+
+
+@pytest.mark.slow
+def test_parallel_rendering_matches_serial(label_cache, tmp_path, monkeypatch):
+    fields = [_fields(n) for n in range(barcode_generator.PARALLEL_THRESHOLD)]
+    parallel = render_labels(fields, workers=2)
+
+    monkeypatch.setattr(barcode_generator, "LABEL_CACHE_FOLDER", str(tmp_path / "serial"))
+    serial = render_labels(fields, workers=1)
+
+    assert parallel == serial
+    assert all(parallel)
+    assert len(list(label_cache.rglob("*.png"))) == len(fields)
@@ -0,0 +1,83 @@
+"""
+Tests for the retired JSON-file stores (database-backed, nothing loaded at import).
+
+Usage:
+    pytest tests/test_legacy_stores.py -v
+"""
+
+import importlib.util
+import json
+import os
+
+import pytest
+
+from models.activity import Activity
+from models.ticket_template import TicketTemplate
+from models.user import User
+from utils.activity_store import ActivityStore
+from utils.db_manager import DatabaseManager
+from utils.queue_store import QueueStore
+from utils.ticket_store import TicketStore
+
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations", "retire_json_stores.py")
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / "data"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def store(db_engine):
+    ticket_store = TicketStore()
+    ticket_store.db_manager = DatabaseManager(str(db_engine.url))
+    return ticket_store
+
+
+def test_stores_read_nothing_when_constructed(data_dir, monkeypatch):
+    for name in ("tickets.json", "activities.json", "templates.json"):
+        (data_dir / name).write_text("not json")
+    monkeypatch.chdir(data_dir.parent)
+
+    TicketStore()
+    ActivityStore()
+    assert QueueStore()._queues is None
+
+
+def test_templates_are_stored_in_the_database(store, db_session):
+    template = {"name": "RMA", "subject": "Repair", "priority": "High", "required_fields": ["serial_number"]}
+    store.save_template(dict(template))
+    store.save_template(dict(template, subject="Warranty repair"))  # New template, same name
+
+    templates = store.get_templates()
+    assert [t["subject"] for t in templates] == ["Repair", "Warranty repair"]
+    assert templates[0]["id"].isdigit() and templates[0]["required_fields"] == ["serial_number"]
+
+    store.save_template(dict(templates[0], subject="Screen repair"))
+    store.delete_template(templates[1]["id"])
+    assert [t["subject"] for t in store.get_templates()] == ["Screen repair"]
+    assert db_session.query(TicketTemplate).count() == 1
+
+
+def test_migration_imports_the_json_files_once(db_engine, db_session, data_dir, monkeypatch):
+    db_session.add(User(id=2, username="tom", email="tom@example.com", password_hash="x"))
+    db_session.commit()
+    activity = {"id": 40, "user_id": 2, "type": "mention", "content": "admin mentioned you",
+                "reference_id": 7, "created_at": "2025-01-12T03:06:09.549263", "is_read": True}
+    (data_dir / "activities.json").write_text(json.dumps([activity, dict(activity, id=41, user_id=99)]))
+    (data_dir / "templates.json").write_text(json.dumps([{"id": "1", "name": "RMA", "priority": "High"}]))
+    (data_dir / "tickets.json").write_text("[]")
+
+    spec = importlib.util.spec_from_file_location("retire_json_stores", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    monkeypatch.setattr(migration, "engine", db_engine)
+
+    assert migration.run_migration(str(data_dir))
+    assert migration.run_migration(str(data_dir))
+
+    rows = db_session.query(Activity).all()
+    assert [(row.id, row.user_id, row.is_read) for row in rows] == [(40, 2, True)]
+    assert [row.name for row in db_session.query(TicketTemplate)] == ["RMA"]
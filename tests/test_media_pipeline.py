@@ -0,0 +1,194 @@
+"""
+Tests for the upload / thumbnail media pipeline.
+
+Usage:
+    pytest tests/test_media_pipeline.py -v
+"""
+
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from models.media_rendition import MediaRendition, RENDITION_SIZES
+from models.ticket import Ticket
+from models.ticket_attachment import TicketAttachment
+from models.user import User
+from utils import media_pipeline
+from utils.media_pipeline import (
+    UploadTooLargeError,
+    queue_renditions,
+    render_renditions,
+    store_content_addressed,
+    stream_to_file,
+    wait_for_renditions,
+)
+
+
+@pytest.fixture(autouse=True)
+def rendition_folder(tmp_path, monkeypatch):
+    folder = tmp_path / "renditions"
+    monkeypatch.setattr(media_pipeline, "RENDITION_FOLDER", str(folder))
+    return folder
+
+
+def _png(path, size=(2400, 1200)):
+    Image.new("RGBA", size, (200, 30, 30, 128)).save(path, "PNG")
+    return str(path)
+
+
+def _pdf(path):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Delivery order 4500153441")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_stream_to_file_hashes_while_writing(tmp_path):
+    data = os.urandom(300 * 1024)
+    path = tmp_path / "uploads" / "file.bin"
+
+    size, sha256 = stream_to_file(io.BytesIO(data), str(path))
+
+    assert size == len(data)
+    assert sha256 == hashlib.sha256(data).hexdigest()
+    assert path.read_bytes() == data
+
+
+def test_stream_to_file_rejects_oversized_upload_without_leftovers(tmp_path):
+    folder = tmp_path / "uploads"
+    with pytest.raises(UploadTooLargeError):
+        stream_to_file(io.BytesIO(b"x" * 200 * 1024), str(folder / "big.bin"), max_bytes=100 * 1024)
+    assert os.listdir(folder) == []
+
+
+def test_identical_images_are_stored_once(tmp_path):
+    data = b"same photo bytes"
+    first = store_content_addressed(data, str(tmp_path), "jpg", "/static/uploads/assets")
+    second = store_content_addressed(data, str(tmp_path), "jpg", "/static/uploads/assets")
+
+    assert first[0] == second[0] == f"/static/uploads/assets/{hashlib.sha256(data).hexdigest()}.jpg"
+    assert (first[3], second[3]) == (False, True)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_failed_store_leaves_no_temp_file(tmp_path, monkeypatch):
+    folder = tmp_path / "assets"
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(media_pipeline.os, "replace", fail)
+    with pytest.raises(OSError):
+        store_content_addressed(b"photo", str(folder), "jpg", "/static/uploads/assets")
+    assert os.listdir(folder) == []
+
+
+def test_render_image_renditions(tmp_path, db_engine, db_session):
+    source = _png(tmp_path / "photo.png")
+    sha256 = "a" * 64
+
+    assert sorted(render_renditions(db_engine, source, sha256, "image")) == sorted(RENDITION_SIZES)
+    assert render_renditions(db_engine, source, sha256, "image") == []  # already rendered
+
+    rows = {row.size_name: row for row in db_session.query(MediaRendition)}
+    assert set(rows) == set(RENDITION_SIZES)
+    for name, edge in RENDITION_SIZES.items():
+        assert (rows[name].width, rows[name].height) == (edge, edge // 2)
+        assert rows[name].url == f"/inventory/image-renditions/{sha256}/{name}.jpg"
+        with Image.open(rows[name].file_path) as image:
+            assert image.format == "JPEG" and image.width == edge
+
+
+def test_pdf_first_page_preview(tmp_path, db_engine, db_session):
+    source = _pdf(tmp_path / "delivery.pdf")
+
+    render_renditions(db_engine, source, "b" * 64, "pdf")
+
+    detail = db_session.query(MediaRendition).filter_by(size_name="detail").one()
+    assert detail.source_type == "pdf"
+    assert max(detail.width, detail.height) == RENDITION_SIZES["detail"]
+
+
+def test_attachments_share_renditions_by_content(tmp_path, db_engine, db_session):
+    user = User(username="media", email="media@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    ticket = Ticket(subject="Photos", description="Damage photos", requester_id=user.id)
+    db_session.add(ticket)
+    db_session.flush()
+
+    source = _png(tmp_path / "damage.png", size=(640, 480))
+    with open(source, "rb") as f:
+        _, sha256 = stream_to_file(f, str(tmp_path / "stored.png"))
+    for name in ("damage.png", "damage-copy.png"):
+        db_session.add(TicketAttachment(ticket_id=ticket.id, filename=name, file_path=source,
+                                        file_type="png", content_sha256=sha256, uploaded_by=user.id))
+    db_session.commit()
+
+    assert queue_renditions(db_engine, source, sha256, "image") is True
+    assert wait_for_renditions(timeout=30)
+    # Second upload of the same content has nothing left to render
+    assert queue_renditions(db_engine, source, sha256, "image") is False
+
+    db_session.expire_all()
+    attachments = db_session.query(TicketAttachment).all()
+    # Same files, but each attachment links to its own access-checked route
+    assert attachments[0].thumbnails["list"] == f"/tickets/{ticket.id}/attachment/{attachments[0].id}/rendition/list"
+    assert set(attachments[1].thumbnails) == set(RENDITION_SIZES)
+    # Sources smaller than a size are not upscaled
+    list_rendition = [r for r in attachments[0].renditions if r.size_name == "list"][0]
+    assert (list_rendition.width, list_rendition.height) == (200, 150)
+    retina = [r for r in attachments[0].renditions if r.size_name == "retina"][0]
+    assert (retina.width, retina.height) == (640, 480)
+    assert db_session.query(MediaRendition).count() == len(RENDITION_SIZES)
+
+
+def test_unrenderable_types_are_not_queued(db_engine):
+    assert queue_renditions(db_engine, "/tmp/report.xlsx", "c" * 64, media_pipeline.source_type_for("xlsx")) is False
+
+
+def test_attachment_previews_require_ticket_access(tmp_path, db_engine, db_session, monkeypatch):
+    from types import SimpleNamespace
+
+    from flask import Flask
+    from sqlalchemy.orm import sessionmaker
+    from werkzeug.exceptions import Forbidden
+
+    import routes.tickets as tickets
+    from models.user import UserType
+
+    owner = User(username="owner", email="owner@example.com", password_hash="x", user_type=UserType.CLIENT)
+    other = User(username="other", email="other@example.com", password_hash="x", user_type=UserType.CLIENT)
+    db_session.add_all([owner, other])
+    db_session.flush()
+    ticket = Ticket(subject="Private", description="-", requester_id=owner.id)
+    db_session.add(ticket)
+    db_session.flush()
+    source = _png(tmp_path / "passport.png", size=(300, 200))
+    sha256 = "d" * 64
+    attachment = TicketAttachment(ticket_id=ticket.id, filename="passport.png", file_path=source,
+                                  file_type="png", content_sha256=sha256, uploaded_by=owner.id)
+    db_session.add(attachment)
+    db_session.commit()
+    render_renditions(db_engine, source, sha256, "image")
+
+    monkeypatch.setattr(tickets, "db_manager", SimpleNamespace(get_session=sessionmaker(bind=db_engine)))
+    view = tickets.attachment_rendition.__wrapped__  # Without login_required
+    app = Flask(__name__)
+
+    for user, allowed in ((owner, True), (other, False)):
+        monkeypatch.setattr(tickets, "current_user", SimpleNamespace(id=user.id))
+        with app.test_request_context():
+            if allowed:
+                response = view(ticket.id, attachment.id, "list")
+                assert response.status_code == 200 and response.mimetype == "image/jpeg"
+                response.close()
+            else:
+                with pytest.raises(Forbidden):
+                    view(ticket.id, attachment.id, "list")
@@ -0,0 +1,100 @@
+"""
+Tests for mobile delta sync (keyset change feed + delete tombstones).
+
+Usage:
+    pytest tests/test_mobile_delta_sync.py -v
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.accessory import Accessory
+from models.sync_tombstone import SyncTombstone
+from utils import delta_sync
+from utils.delta_sync import (
+    ExpiredCursor, InvalidCursor, decode_cursor, encode_cursor, sync_page,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_safety_window(monkeypatch):
+    monkeypatch.setattr(delta_sync, "SAFETY_WINDOW_SECONDS", 0)
+
+
+def _add_accessories(db_session, count):
+    base = datetime.utcnow() - timedelta(hours=1)
+    db_session.add_all(
+        Accessory(name=f"Cable {i}", category="Cable", updated_at=base + timedelta(seconds=i // 3))
+        for i in range(count)
+    )
+    db_session.commit()
+
+
+def _sync_all(db_session, cursor=None, limit=10):
+    changed, deleted, pages = [], [], 0
+    while True:
+        page = sync_page(db_session, db_session.query(Accessory), Accessory, cursor=cursor, limit=limit)
+        changed += [row.id for row in page["changed"]]
+        deleted += page["deleted"]
+        cursor, pages = page["cursor"], pages + 1
+        if not page["has_more"]:
+            return changed, deleted, cursor, pages
+
+
+def test_full_sync_pages_through_every_row_once(db_session):
+    _add_accessories(db_session, 25)  # shared updated_at values across page boundaries
+
+    changed, deleted, _, pages = _sync_all(db_session)
+
+    assert sorted(changed) == list(range(1, 26)) and len(changed) == 25
+    assert deleted == [] and pages == 3
+
+
+def test_delta_returns_only_edited_rows(db_session):
+    _add_accessories(db_session, 25)
+    _, _, cursor, _ = _sync_all(db_session)
+
+    for accessory in db_session.query(Accessory).filter(Accessory.id.in_([4, 17])):
+        accessory.available_quantity = 3  # onupdate bumps updated_at
+    db_session.commit()
+
+    changed, deleted, cursor, pages = _sync_all(db_session, cursor)
+    assert sorted(changed) == [4, 17] and deleted == [] and pages == 1
+    assert _sync_all(db_session, cursor)[:2] == ([], [])
+
+
+def test_deletes_are_sent_as_tombstones(db_session):
+    _add_accessories(db_session, 10)
+    db_session.delete(db_session.get(Accessory, 2))  # before the first sync: never sent
+    db_session.commit()
+    _, _, cursor, _ = _sync_all(db_session)
+
+    db_session.delete(db_session.get(Accessory, 5))
+    db_session.commit()
+    db_session.query(Accessory).filter(Accessory.id.in_([7, 8])).delete(synchronize_session=False)
+    db_session.commit()
+
+    changed, deleted, _, _ = _sync_all(db_session, cursor)
+    assert changed == [] and deleted == [5, 7, 8]
+    assert db_session.query(SyncTombstone).filter_by(entity_type="accessories").count() == 4
+
+
+def test_recent_changes_are_resent_inside_safety_window(db_session, monkeypatch):
+    monkeypatch.setattr(delta_sync, "SAFETY_WINDOW_SECONDS", 60)
+    db_session.add(Accessory(name="Dock", category="Dock"))
+    db_session.commit()
+
+    first = sync_page(db_session, db_session.query(Accessory), Accessory)
+    second = sync_page(db_session, db_session.query(Accessory), Accessory, cursor=first["cursor"])
+
+    assert [row.name for row in second["changed"]] == ["Dock"]
+
+
+def test_bad_cursors_are_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+    old = encode_cursor(None, 0, 0, issued_at=datetime.utcnow() - timedelta(days=365))
+    with pytest.raises(ExpiredCursor):
+        decode_cursor(old)
@@ -0,0 +1,155 @@
+"""
+Tests for cached PDF extraction and page-level OCR.
+
+Usage:
+    pytest tests/test_pdf_extraction_cache.py -v
+    pytest tests/test_pdf_extraction_cache.py -v -m "not slow"   # skip the SOPHOS benchmark
+"""
+
+import os
+import shutil
+import time
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from models.pdf_extraction_result import PdfExtractionResult
+from utils import pdf_extractor
+from utils.pdf_extraction_cache import PdfExtractionCache, file_sha256
+
+DOCS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "docs")
+SOPHOS_PDFS = [
+    os.path.join(DOCS_DIR, "4500153441 SOPHOS.pdf"),
+    os.path.join(DOCS_DIR, "4500153449 SOPHOS.pdf"),
+]
+
+
+def _text_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def _image_pdf(path, page_count):
+    """Pages with only a drawn rectangle and no text layer, like a scan"""
+    doc = fitz.open()
+    for _ in range(page_count):
+        page = doc.new_page()
+        page.draw_rect(fitz.Rect(50, 50, 200, 200), color=(0, 0, 0), fill=(0.5, 0.5, 0.5))
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_text_layer_pages_skip_ocr(tmp_path, monkeypatch):
+    path = _text_pdf(tmp_path / "mixed.pdf", ["PACKING LIST serial C02XK1ABCDEF", "", "Total quantity: 1 unit shipped"])
+    requested = []
+
+    def fake_ocr(pdf_path, page_numbers, workers=None, dpi=200):
+        requested.extend(page_numbers)
+        return {num: f"OCR page {num}" for num in page_numbers}
+
+    monkeypatch.setattr(pdf_extractor, "ocr_pages_parallel", fake_ocr)
+    text = pdf_extractor.extract_text_with_ocr(path)
+
+    assert requested == [1]  # only the blank page is OCRed
+    assert "C02XK1ABCDEF" in text and "OCR page 1" in text and "Total quantity" in text
+    assert text.index("C02XK1ABCDEF") < text.index("OCR page 1") < text.index("Total quantity")
+
+
+def test_ocr_pages_parallel_returns_every_page(tmp_path):
+    path = _image_pdf(tmp_path / "scan.pdf", 3)
+    results = pdf_extractor.ocr_pages_parallel(path, [0, 2], workers=2)
+    assert set(results) == {0, 2}
+
+
+def test_assets_are_cached_by_content(tmp_path, db_session, monkeypatch):
+    path = _text_pdf(tmp_path / "packing.pdf", ["anything"])
+    calls = []
+
+    def fake_extract(pdf_path):
+        calls.append(pdf_path)
+        return {"po_number": "4500153441", "assets": [{"serial_num": "SN1"}]}, "PO 4500153441 SN1"
+
+    monkeypatch.setattr(pdf_extractor, "extract_assets_and_text_from_pdf", fake_extract)
+
+    first = PdfExtractionCache.get_assets(db_session, path)
+    # Same bytes under another name is still a hit
+    copy = shutil.copy(path, tmp_path / "renamed.pdf")
+    second = PdfExtractionCache.get_assets(db_session, copy)
+
+    assert first == second == {"po_number": "4500153441", "assets": [{"serial_num": "SN1"}]}
+    assert len(calls) == 1
+
+    row = db_session.query(PdfExtractionResult).one()
+    assert row.sha256 == file_sha256(path)
+    assert row.extractor_version == pdf_extractor.EXTRACTOR_VERSION
+    assert row.text == "PO 4500153441 SN1"
+    assert row.hit_count == 1
+
+    # A new extractor version ignores the old row
+    monkeypatch.setattr(pdf_extractor, "EXTRACTOR_VERSION", "test-next")
+    PdfExtractionCache.get_assets(db_session, path)
+    assert len(calls) == 2
+    assert db_session.query(PdfExtractionResult).count() == 2
+
+    PdfExtractionCache.get_assets(db_session, path, refresh=True)
+    assert len(calls) == 3
+
+
+def test_failed_extractions_are_not_cached(tmp_path, db_session, monkeypatch):
+    path = _image_pdf(tmp_path / "scan.pdf", 1)
+    results = iter([(None, None), ({"assets": []}, "\n"), ({"assets": [{"serial_num": "SN2"}]}, "SN2")])
+    monkeypatch.setattr(pdf_extractor, "extract_assets_and_text_from_pdf", lambda pdf_path: next(results))
+
+    assert PdfExtractionCache.get_assets(db_session, path) is None
+    assert PdfExtractionCache.get_assets(db_session, path) == {"assets": []}  # OCR produced no text
+    assert db_session.query(PdfExtractionResult).count() == 0
+    assert PdfExtractionCache.get_assets(db_session, path)["assets"][0]["serial_num"] == "SN2"
+    assert db_session.query(PdfExtractionResult).count() == 1
+
+
+def test_shipping_info_shares_the_row(tmp_path, db_session, monkeypatch):
+    path = _text_pdf(tmp_path / "waybill.pdf", ["REFERENCE# 4500153449\nPIECES: 3\nFROM (SHIPPER): Acme"])
+    monkeypatch.setattr(
+        pdf_extractor, "extract_assets_and_text_from_pdf",
+        lambda pdf_path: ({"assets": [{"serial_num": "SN3"}]}, "text")
+    )
+
+    PdfExtractionCache.get_assets(db_session, path)
+    info = PdfExtractionCache.get_shipping_info(db_session, path)
+    assert info["reference"] == "4500153449"
+    assert info["pieces"] == "3"
+
+    monkeypatch.setattr(pdf_extractor, "extract_shipping_info_from_pdf", lambda pdf_path: pytest.fail("not cached"))
+    assert PdfExtractionCache.get_shipping_info(db_session, path) == info
+
+    row = db_session.query(PdfExtractionResult).one()
+    assert row.assets["assets"][0]["serial_num"] == "SN3"
+    assert row.shipping_info["reference"] == "4500153449"
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not shutil.which("tesseract"), reason="tesseract binary not installed")
+def test_benchmark_sophos_pdfs(db_session, monkeypatch):
+    """Cold OCR extraction vs cached lookup on the scanned SOPHOS delivery orders in docs/"""
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)  # measure OCR, not the AI path
+
+    for path in SOPHOS_PDFS:
+        start = time.perf_counter()
+        cold = PdfExtractionCache.get_assets(db_session, path)
+        cold_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm = PdfExtractionCache.get_assets(db_session, path)
+        warm_seconds = time.perf_counter() - start
+
+        print(f"\n{os.path.basename(path)}: cold {cold_seconds:.2f}s, cached {warm_seconds * 1000:.1f}ms, "
+              f"{len((cold or {}).get('assets', []))} assets")
+        assert warm == cold
+        assert warm_seconds < cold_seconds / 10
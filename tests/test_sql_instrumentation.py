@@ -0,0 +1,101 @@
+"""
+Tests for per-request SQL instrumentation (Server-Timing, N+1 detection).
+
+Usage:
+    pytest tests/test_sql_instrumentation.py -v
+"""
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from utils.sql_instrumentation import (
+    init_sql_instrumentation,
+    install_engine_listeners,
+    performance_stats,
+    start_recording,
+    statement_shape,
+    stop_recording,
+)
+
+
+@pytest.fixture
+def instrumented(db_engine):
+    app = Flask(__name__)
+    app.config.update(SQL_INSTRUMENTATION_SAMPLE_RATE=1.0, SQL_N_PLUS_ONE_THRESHOLD=10)
+    init_sql_instrumentation(app)
+
+    @app.route("/loop/<int:n>")
+    def loop(n):
+        with db_engine.connect() as conn:
+            conn.execute(text("SELECT id FROM users"))
+            for i in range(n):
+                conn.execute(text("SELECT id FROM tickets WHERE requester_id = :id"), {"id": i})
+        return "ok"
+
+    performance_stats.reset()
+    yield app, app.test_client()
+    performance_stats.reset()
+
+
+def test_statement_shape_ignores_values():
+    assert statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?, ?) LIMIT 20") == \
+        statement_shape("SELECT * FROM t WHERE id IN (?,?) LIMIT 50")
+    assert statement_shape("SELECT * FROM t WHERE a = ?") != statement_shape("SELECT * FROM t WHERE b = ?")
+
+
+def test_server_timing_reports_query_count(instrumented):
+    _, client = instrumented
+    response = client.get("/loop/3")
+
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert 'desc="4 queries"' in timing
+    assert "app;dur=" in timing
+
+    [row] = performance_stats.worst()
+    assert row["endpoint"] == "GET loop"
+    assert (row["requests"], row["max_queries"], row["n_plus_one_requests"]) == (1, 4, 0)
+
+
+def test_repeated_statement_is_flagged_as_n_plus_one(instrumented, caplog):
+    _, client = instrumented
+    client.get("/loop/2")
+    client.get("/loop/12")
+
+    [row] = performance_stats.worst(sort="n_plus_one")
+    assert row["requests"] == 2
+    assert row["n_plus_one_requests"] == 1
+    [(shape, count)] = row["repeated"]
+    assert count == 12 and "FROM tickets WHERE requester_id" in shape
+    assert row["worst"]["path"] == "/loop/12"
+    assert any("Possible N+1" in message for message in caplog.messages)
+
+
+def test_unsampled_requests_are_not_recorded(instrumented):
+    app, client = instrumented
+    app.config["SQL_INSTRUMENTATION_SAMPLE_RATE"] = 0
+
+    response = client.get("/loop/3")
+
+    assert "Server-Timing" not in response.headers
+    assert performance_stats.worst() == []
+
+
+def test_histogram_percentiles(instrumented):
+    _, client = instrumented
+    for n in (0, 0, 0, 30):
+        client.get(f"/loop/{n}")
+
+    [row] = performance_stats.worst()
+    assert row["p95_queries"] == 50  # 31 queries falls in the <=50 bucket
+    assert dict(row["query_histogram"])["<=1"] == 3
+
+
+def test_recording_outside_requests(db_engine):
+    install_engine_listeners()
+    recorder = start_recording()
+    with db_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert stop_recording() is recorder
+    assert recorder.query_count == 1 and recorder.slowest()[0][1] == "SELECT ?"
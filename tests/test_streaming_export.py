@@ -0,0 +1,186 @@
+"""
+Tests for the streaming export helpers.
+
+Usage:
+    pytest tests/test_streaming_export.py -v
+"""
+
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from openpyxl import load_workbook
+from sqlalchemy.orm import sessionmaker
+
+from models.asset import Asset
+from models.export_job import ExportJob
+from models.user import User
+from utils import streaming_export
+from utils.streaming_export import (
+    iter_batches, iter_csv, write_xlsx, should_run_in_background, start_background_export, fail_stale_jobs,
+    background_export_message, is_stale_job, remove_expired_exports,
+)
+
+
+def _add_assets(db_session, count):
+    db_session.add_all(Asset(asset_tag=f"EXP-{i:05d}", serial_num=f"SN{i:05d}") for i in range(count))
+    db_session.commit()
+
+
+def _asset_rows(db_session, user):
+    query = db_session.query(Asset).with_entities(Asset.id, Asset.asset_tag)
+
+    def rows():
+        for batch in iter_batches(query, Asset.id, batch_size=7):
+            for asset in batch:
+                yield [asset.id, asset.asset_tag]
+
+    return ["ID", "Tag"], rows()
+
+
+def test_iter_batches_walks_every_row_once_in_key_order(db_session):
+    _add_assets(db_session, 23)
+
+    batches = list(iter_batches(db_session.query(Asset.id, Asset.asset_tag), Asset.id, batch_size=10))
+
+    assert [len(b) for b in batches] == [10, 10, 3]
+    ids = [row.id for batch in batches for row in batch]
+    assert ids == sorted(ids) and len(set(ids)) == 23
+
+
+def test_iter_batches_orders_by_sort_column_across_batches(db_session):
+    db_session.add_all(Asset(asset_tag=f"EXP-{i:05d}", serial_num=f"SN{i:05d}", name=f"Name {i % 4}")
+                       for i in range(23))
+    db_session.commit()
+
+    query = db_session.query(Asset.id, Asset.name)
+    rows = [row for batch in iter_batches(query, Asset.id, batch_size=5, sort_column=Asset.name) for row in batch]
+
+    assert [(row.name, row.id) for row in rows] == sorted((row.name, row.id) for row in rows)
+    assert len({row.id for row in rows}) == 23
+
+
+def test_iter_csv_flushes_in_chunks():
+    chunks = list(iter_csv(["a", "b"], ([i, i * 2] for i in range(1200)), flush_rows=500))
+
+    assert len(chunks) == 3
+    text = "".join(chunks)
+    assert text.startswith("a,b\r\n0,0\r\n")
+    assert text.count("\r\n") == 1201
+
+
+def test_csv_stream_memory_is_flat():
+    rows = ([i, "x" * 50, "y" * 50] for i in range(200000))
+
+    tracemalloc.start()
+    total = sum(len(chunk) for chunk in iter_csv(["id", "x", "y"], rows))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert total > 20_000_000
+    assert peak < 2_000_000  # a few hundred rows buffered, never the whole file
+
+
+def test_write_xlsx_constant_memory(tmp_path):
+    path = tmp_path / "out.xlsx"
+
+    count = write_xlsx(str(path), ["Name", "Qty"], (["item", i] for i in range(5000)), sheet_name="Items")
+
+    assert count == 5000
+    sheet = load_workbook(path, read_only=True)["Items"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ("Name", "Qty")
+    assert rows[-1] == ("item", 4999)
+
+
+def test_background_threshold(monkeypatch):
+    monkeypatch.setattr(streaming_export, "BACKGROUND_THRESHOLD", 100)
+    assert not should_run_in_background(100)
+    assert should_run_in_background(101)
+    assert should_run_in_background(1, requested="1")
+
+
+def test_background_export_writes_downloadable_file(db_engine, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(streaming_export, "get_export_folder", lambda: str(tmp_path))
+    user = User(username="exporter", email="exporter@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    _add_assets(db_session, 30)
+
+    job_id = start_background_export(
+        "assets", user.id, "assets.csv", _asset_rows, sessionmaker(bind=db_engine)
+    )
+
+    deadline = time.time() + 10
+    while True:
+        db_session.expire_all()
+        job = db_session.get(ExportJob, job_id)
+        if job.is_finished or time.time() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert job.status == ExportJob.STATUS_COMPLETED, job.error
+    assert job.row_count == 30
+    with open(job.file_path) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "ID,Tag"
+    assert len(lines) == 31
+
+
+def test_stale_jobs_are_marked_failed(db_session):
+    user = User(username="exporter", email="exporter@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    old = datetime.utcnow() - timedelta(hours=3)
+    db_session.add_all([
+        ExportJob(user_id=user.id, export_type="assets", status=ExportJob.STATUS_PROCESSING, created_at=old),
+        ExportJob(user_id=user.id, export_type="assets", status=ExportJob.STATUS_COMPLETED, created_at=old),
+        ExportJob(user_id=user.id, export_type="assets", status=ExportJob.STATUS_PROCESSING),
+    ])
+    db_session.commit()
+
+    assert [is_stale_job(job) for job in db_session.query(ExportJob).order_by(ExportJob.id)] == [True, False, False]
+    assert fail_stale_jobs(db_session) == 1
+
+    db_session.expire_all()
+    statuses = [job.status for job in db_session.query(ExportJob).order_by(ExportJob.id)]
+    assert statuses == [ExportJob.STATUS_FAILED, ExportJob.STATUS_COMPLETED, ExportJob.STATUS_PROCESSING]
+
+
+def test_expired_export_files_are_removed(db_session, tmp_path, monkeypatch):
+    folder = tmp_path / "exports"
+    folder.mkdir()
+    monkeypatch.setattr(streaming_export, "get_export_folder", lambda: str(folder))
+    user = User(username="exporter", email="exporter@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    old = datetime.utcnow() - timedelta(hours=streaming_export.EXPORT_RETENTION_HOURS + 1)
+    paths = {name: folder / name for name in ("export_1.csv", "export_2.csv", "export_9.csv", "export_10.csv")}
+    for path in paths.values():
+        path.write_text("ID\n")
+    os.utime(paths["export_9.csv"], (old.timestamp(), old.timestamp()))  # Orphaned by a crash
+    expired = ExportJob(user_id=user.id, export_type="assets", status=ExportJob.STATUS_COMPLETED,
+                        file_path=str(paths["export_1.csv"]), created_at=old, completed_at=old)
+    recent = ExportJob(user_id=user.id, export_type="assets", status=ExportJob.STATUS_COMPLETED,
+                       file_path=str(paths["export_2.csv"]), completed_at=datetime.utcnow())
+    db_session.add_all([expired, recent])
+    db_session.commit()
+
+    assert remove_expired_exports(db_session) == 2
+
+    assert sorted(path.name for path in folder.iterdir()) == ["export_10.csv", "export_2.csv"]
+    db_session.expire_all()
+    assert expired.file_path is None and recent.file_path == str(paths["export_2.csv"])
+
+
+def test_background_message_links_to_the_download():
+    from flask import Flask, render_template_string
+
+    app = Flask(__name__)
+    app.add_url_rule("/exports/<int:job_id>/download", "exports.download_export", lambda job_id: "")
+    with app.test_request_context():
+        html = render_template_string("{{ message }}", message=background_export_message(5, "<assets>", 7))
+
+    assert '<a href="/exports/7/download">' in html
+    assert "&lt;assets&gt;" in html
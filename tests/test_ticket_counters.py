@@ -0,0 +1,125 @@
+"""
+Tests for the ticket counters (one aggregate, incremental counts table).
+
+Usage:
+    pytest tests/test_ticket_counters.py -v
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+from models.ticket import Ticket, TicketStatus
+from models.ticket_count import TicketCountState
+from utils import ticket_counters
+from utils.ticket_counters import count_tickets, rebuild
+
+
+@pytest.fixture(autouse=True)
+def no_cached_cells(monkeypatch):
+    monkeypatch.setattr(ticket_counters, "_cached", None)
+
+
+@pytest.fixture
+def tickets(db_session):
+    rows = [
+        dict(status=TicketStatus.NEW, queue_id=1, assigned_to_id=7),
+        dict(status=TicketStatus.IN_PROGRESS, queue_id=1, assigned_to_id=7, country="SINGAPORE"),
+        dict(status=TicketStatus.PROCESSING, queue_id=2, assigned_to_id=8),
+        dict(status=TicketStatus.RESOLVED_DELIVERED, queue_id=2, assigned_to_id=7),
+        dict(status=TicketStatus.ON_HOLD, queue_id=None, requester_id=7),
+        dict(status=TicketStatus.NEW, custom_status="Awaiting Delivered Parts", queue_id=1),
+        dict(status=TicketStatus.RESOLVED, custom_status="Cancelled", queue_id=2, assigned_to_id=7),
+        dict(status=TicketStatus.NEW, queue_id=3),  # status cleared below
+    ]
+    for number, values in enumerate(rows):
+        values.setdefault("requester_id", 1)
+        db_session.add(Ticket(subject=f"Ticket {number}", **values))
+    db_session.commit()
+    # Written before the counts table exists (first read builds it)
+    db_session.execute(text("UPDATE tickets SET status = NULL WHERE subject = 'Ticket 7'"))
+    db_session.commit()
+    return rows
+
+
+def _sql(monkeypatch, func, *args, **kwargs):
+    monkeypatch.setattr(ticket_counters, "USE_COUNTS_TABLE", False)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        monkeypatch.setattr(ticket_counters, "USE_COUNTS_TABLE", True)
+
+
+def test_buckets_for_everyone_and_for_me(db_session, tickets, monkeypatch):
+    counts = count_tickets(db_session, user_id=7, by_queue=True)
+
+    assert counts["total"] == 8
+    assert (counts["open"], counts["in_progress"], counts["resolved"], counts["on_hold"]) == (1, 2, 2, 2)
+    assert counts["unresolved"] == 5  # NULL status is neither resolved nor unresolved
+    assert counts["statuses"]["NEW"] == 2
+    assert counts["mine"]["total"] == 4 and counts["mine"]["open"] == 1 and counts["mine"]["on_hold"] == 1
+    assert counts["queues"][1]["total"] == 3 and counts["queues"][None]["on_hold"] == 1
+    assert _sql(monkeypatch, count_tickets, db_session, user_id=7, by_queue=True) == counts
+
+
+def test_the_aggregate_is_one_query(db_session, db_engine, tickets, monkeypatch):
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    counts = _sql(monkeypatch, count_tickets, db_session, user_id=7, visible_to=7)
+
+    assert len(statements) == 1
+    assert counts["total"] == 5 and counts["mine"]["total"] == 4
+    since = _sql(monkeypatch, count_tickets, db_session, since=datetime.utcnow() + timedelta(days=1))
+    assert since["total"] == 0
+    assert count_tickets(db_session, countries=["SINGAPORE"])["in_progress"] == 1
+
+
+def test_counts_table_follows_ticket_changes(db_session, tickets, monkeypatch):
+    rebuild(db_session)
+
+    moved = db_session.query(Ticket).filter_by(subject="Ticket 0").one()
+    moved.status = TicketStatus.RESOLVED
+    moved.queue_id = 2
+    db_session.commit()
+    moved.assigned_to_id = 8  # assigned while expired after the commit
+    db_session.delete(db_session.query(Ticket).filter_by(subject="Ticket 2").one())
+    db_session.commit()
+    db_session.query(Ticket).filter(Ticket.subject == "Ticket 7").delete(synchronize_session=False)
+    db_session.add(Ticket(subject="New", requester_id=1, queue_id=3, assigned_to_id=7))
+    db_session.commit()
+
+    assert db_session.get(TicketCountState, 1).stale is False
+    incremental = count_tickets(db_session, user_id=7, queue_ids=[1, 2, 3], by_queue=True)
+    assert incremental == _sql(monkeypatch, count_tickets, db_session, user_id=7, queue_ids=[1, 2, 3], by_queue=True)
+    assert incremental["queues"][3]["statuses"]["NEW"] == 1
+    assert incremental["mine"]["total"] == 4
+
+
+def test_version_moves_after_commit_not_inside_the_transaction(db_session, db_engine, tickets):
+    rebuild(db_session)
+    version = db_session.get(TicketCountState, 1).version
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    db_session.add(Ticket(subject="New", requester_id=1, queue_id=1))
+    db_session.flush()
+    assert not any("ticket_count_state" in sql for sql in statements)  # writers don't queue on the state row
+    db_session.commit()
+    assert db_session.get(TicketCountState, 1).version == version + 1
+
+    db_session.add(Ticket(subject="Rolled back", requester_id=1, queue_id=1))
+    db_session.flush()
+    db_session.rollback()
+    assert db_session.get(TicketCountState, 1).version == version + 1
+
+
+def test_bulk_update_marks_the_table_stale(db_session, tickets):
+    assert count_tickets(db_session)["statuses"]["NEW"] == 2
+
+    db_session.query(Ticket).update({Ticket.status: TicketStatus.ON_HOLD}, synchronize_session=False)
+    db_session.commit()
+    assert db_session.get(TicketCountState, 1).stale is True
+
+    assert count_tickets(db_session)["statuses"]["ON_HOLD"] == 8
@@ -0,0 +1,127 @@
+"""
+Tests for the ticket list grid (server-side filter/sort, keyset windows).
+
+Usage:
+    pytest tests/test_ticket_grid.py -v
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from models.ticket import Ticket, TicketCategory, TicketPriority, TicketStatus
+from models.user import User, UserType
+from utils.ticket_grid import InvalidGridRequest, grid_summary, grid_window, parse_filters
+
+
+@pytest.fixture
+def users(db_session):
+    admin = User(username="admin", email="admin@example.com", password_hash="x", user_type=UserType.SUPER_ADMIN)
+    client = User(username="client", email="client@example.com", password_hash="x", user_type=UserType.CLIENT)
+    db_session.add_all([admin, client])
+    db_session.commit()
+    return admin, client
+
+
+@pytest.fixture
+def tickets(db_session, users):
+    admin, client = users
+    start = datetime(2024, 1, 1)
+    for number in range(25):
+        db_session.add(Ticket(
+            subject=f"Ticket {number}",
+            description="Replace MacBook screen" if number % 5 == 0 else "Routine request",
+            status=TicketStatus.RESOLVED if number % 3 == 0 else TicketStatus.NEW,
+            priority=TicketPriority.HIGH if number % 2 else TicketPriority.LOW,
+            category=TicketCategory.PIN_REQUEST if number == 24 else TicketCategory.ASSET_REPAIR,
+            requester_id=client.id if number < 4 else admin.id,
+            assigned_to_id=admin.id if number % 4 == 0 else None,
+            # Pairs share a timestamp so the id tie-break is exercised
+            created_at=start + timedelta(hours=number // 2),
+        ))
+    db_session.commit()
+
+
+def _all_windows(db_session, user, limit, **kwargs):
+    ids, window = [], grid_window(db_session, user, limit=limit, **kwargs)
+    total = window["total"]
+    ids += [row["id"] for row in window["tickets"]]
+    while window["has_more"]:
+        window = grid_window(db_session, user, limit=limit, cursor=window["cursor"], **kwargs)
+        assert window["total"] is None
+        ids += [row["id"] for row in window["tickets"]]
+    return ids, total
+
+
+@pytest.mark.parametrize("sort,direction", [("created", "desc"), ("created", "asc"), ("subject", "asc"),
+                                            ("priority", "desc"), ("status", "asc")])
+def test_windows_cover_every_ticket_once_in_order(db_session, users, tickets, sort, direction):
+    ids, total = _all_windows(db_session, users[0], 7, sort=sort, direction=direction)
+
+    assert total == 25 and len(ids) == 25 and len(set(ids)) == 25
+    single, _ = _all_windows(db_session, users[0], 100, sort=sort, direction=direction)
+    assert ids == single
+
+
+def test_filters_are_applied_in_sql(db_session, users, tickets):
+    admin = users[0]
+
+    def ids(**args):
+        window = grid_window(db_session, admin, limit=100, **parse_filters(MultiDict(args)))
+        assert window["total"] == len(window["tickets"])
+        return {row["id"] for row in window["tickets"]}
+
+    every = ids()
+    assert len(ids(status="Resolved")) == 9
+    assert len(ids(bucket="open")) == 16
+    assert len(ids(q="macbook")) == 5
+    assert len(ids(exclude_category="PIN_REQUEST")) == 24
+    assert len(ids(mine="assigned")) == 7
+    assert len(ids(priority=["High", "Low"])) == 25
+    assert ids(q=f"TICK-{min(every):04d}") == {min(every)}
+
+
+def test_rows_carry_display_fields(db_session, users, tickets):
+    row = grid_window(db_session, users[0], sort="id", direction="asc", limit=1)["tickets"][0]
+
+    assert row["display_id"] == f"TICK-{row['id']:04d}"
+    assert row["status"] == "Resolved" and row["category"] == "Asset Repair"
+    assert "sla_status" in row and row["created_at"].startswith("2024-01-01")
+
+
+def test_summary_counts_every_matching_ticket_not_one_window(db_session, users, tickets):
+    admin = users[0]
+    recent = Ticket(subject="Today", description="-", status=TicketStatus.NEW, priority=TicketPriority.LOW,
+                    requester_id=admin.id, created_at=datetime.utcnow())
+    db_session.add(recent)
+    db_session.commit()
+
+    window = grid_window(db_session, admin, limit=5, **parse_filters(MultiDict({"exclude_category": "PIN_REQUEST"})))
+    summary = grid_summary(db_session, admin, **parse_filters(MultiDict({"exclude_category": "PIN_REQUEST"})))
+
+    assert len(window["tickets"]) == 5
+    assert summary["total"] == window["total"] == 25
+    assert summary["statuses"] == {"Resolved": 8, "New": 17}
+    assert summary["categories"] == {"Asset Repair": 24, "Custom": 1}
+    assert summary["queues"] == {"": 25}
+    assert len(summary["created_per_day"]) == 7 and list(summary["created_per_day"].values())[-1] == 1
+    assert grid_summary(db_session, users[1])["total"] == 4  # same scope as the grid
+
+
+def test_clients_only_see_their_own_tickets(db_session, users, tickets):
+    window = grid_window(db_session, users[1], limit=100)
+
+    assert window["total"] == 4
+    assert {row["requester_id"] for row in window["tickets"]} == {users[1].id}
+
+
+def test_bad_requests_are_rejected(db_session, users, tickets):
+    window = grid_window(db_session, users[0], sort="created", limit=5)
+
+    with pytest.raises(InvalidGridRequest):
+        grid_window(db_session, users[0], sort="subject", cursor=window["cursor"])
+    with pytest.raises(InvalidGridRequest):
+        grid_window(db_session, users[0], sort="sla")
+    with pytest.raises(InvalidGridRequest):
+        parse_filters(MultiDict({"bucket": "everything"}))
@@ -0,0 +1,103 @@
+"""
+Tests for the automatic ticket status rules (bulk UPDATEs, audit rows, dry run).
+
+Usage:
+    pytest tests/test_ticket_rules.py -v
+"""
+
+import pytest
+from sqlalchemy import insert
+
+from models.ticket import Ticket, TicketCategory, TicketStatus
+from models.ticket_status_change import TicketStatusChange
+from utils import ticket_counters
+from utils.ticket_counters import count_tickets, rebuild
+from utils.ticket_rules import apply_rules
+
+
+@pytest.fixture(autouse=True)
+def no_cached_cells(monkeypatch):
+    monkeypatch.setattr(ticket_counters, "_cached", None)
+
+
+@pytest.fixture
+def tickets(db_session):
+    claw = TicketCategory.ASSET_RETURN_CLAW
+    rows = {
+        "returned": dict(category=claw, status=TicketStatus.IN_PROGRESS, shipping_status="Delivered"),
+        "label_sent": dict(category=claw, status=TicketStatus.NEW, shipping_tracking="XZ123"),
+        "waiting_replacement": dict(category=claw, status=TicketStatus.NEW, shipping_status="Received",
+                                    replacement_tracking="RP1", replacement_status="In transit"),
+        "untouched": dict(category=claw, status=TicketStatus.NEW),
+        "other_category": dict(category=TicketCategory.ASSET_REPAIR, status=TicketStatus.NEW,
+                               shipping_status="Delivered"),
+    }
+    # Inserted with a core statement (no flush), as if they predate the rules
+    for subject, values in rows.items():
+        db_session.execute(insert(Ticket.__table__).values(subject=subject, requester_id=1, queue_id=1, **values))
+    db_session.commit()
+    return rows
+
+
+def _statuses(db_session):
+    db_session.expire_all()
+    return {ticket.subject: ticket.status for ticket in db_session.query(Ticket)}
+
+
+def test_dry_run_reports_without_changing(db_session, tickets):
+    before = _statuses(db_session)
+
+    changes = apply_rules(db_session, dry_run=True)
+    db_session.commit()
+
+    assert {(change["rule"], change["new_status"]) for change in changes} == {
+        ("claw_return_closed", "RESOLVED"), ("claw_return_in_progress", "IN_PROGRESS")
+    }
+    assert _statuses(db_session) == before
+    assert db_session.query(TicketStatusChange).count() == 0
+
+
+def test_bulk_apply_updates_audits_and_counts(db_session, tickets, monkeypatch):
+    rebuild(db_session)
+
+    changes = apply_rules(db_session, user_id=1)
+    db_session.commit()
+
+    statuses = _statuses(db_session)
+    assert statuses["returned"] == TicketStatus.RESOLVED
+    assert statuses["label_sent"] == TicketStatus.IN_PROGRESS
+    assert statuses["waiting_replacement"] == TicketStatus.IN_PROGRESS
+    assert statuses["untouched"] == TicketStatus.NEW
+    assert statuses["other_category"] == TicketStatus.NEW
+    returned = db_session.query(Ticket).filter_by(subject="returned").one()
+    assert "Ticket auto-closed" in returned.notes and returned.custom_status is None
+
+    audit = db_session.query(TicketStatusChange).all()
+    assert len(audit) == len(changes) == 3
+    assert {row.trigger for row in audit} == {"bulk_refresh"} and {row.user_id for row in audit} == {1}
+    assert apply_rules(db_session) == []  # nothing left to change
+
+    counts = count_tickets(db_session, by_queue=True)
+    monkeypatch.setattr(ticket_counters, "USE_COUNTS_TABLE", False)
+    assert count_tickets(db_session, by_queue=True) == counts
+
+
+def test_tracking_update_triggers_rules(db_session, tickets):
+    ticket = db_session.query(Ticket).filter_by(subject="untouched").one()
+
+    ticket.shipping_status = "Delivered"
+    db_session.flush()
+
+    assert ticket.status == TicketStatus.RESOLVED
+    db_session.commit()
+    change = db_session.query(TicketStatusChange).filter_by(ticket_id=ticket.id).one()
+    assert (change.old_status, change.new_status, change.trigger) == ("NEW", "RESOLVED", "tracking")
+
+
+def test_new_tickets_pick_up_rules(db_session):
+    ticket = Ticket(subject="new", requester_id=1, category=TicketCategory.ASSET_RETURN_CLAW,
+                    shipping_tracking="XZ9")
+    db_session.add(ticket)
+    db_session.commit()
+
+    assert ticket.status == TicketStatus.IN_PROGRESS
@@ -0,0 +1,208 @@
+"""
+Tests for the background tracking scheduler (priorities, budgets, TrackingCache writes).
+
+Usage:
+    pytest tests/test_tracking_scheduler.py -v
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy.orm import sessionmaker
+
+from models.ticket import Ticket, TicketCategory, TicketStatus
+from models.tracking_history import TrackingHistory
+from models.user import User
+from utils.singpost_tracking import SingPostTrackingClient, TrackingEvent, TrackingResult
+import utils.tracking_scheduler as tracking_scheduler
+from utils.tracking_scheduler import (ProviderBudget, TrackingScheduler, is_done, load_packages,
+                                      normalize_status, staleness_report, status_class, tracking_cli)
+
+
+class FakeSingPost(SingPostTrackingClient):
+    def __init__(self, statuses):
+        super().__init__(api_key="test")
+        self.statuses = statuses
+        self.requests = []
+
+    def track(self, tracking_numbers, bypass_rate_limit=False):
+        self.requests.append(list(tracking_numbers))
+        return [TrackingResult(tracking_number=tn, found=tn in self.statuses,
+                               events=[TrackingEvent(self.statuses[tn], "2026-01-02", "10:00", "DF")]
+                               if tn in self.statuses else [])
+                for tn in tracking_numbers]
+
+
+class FakeTracker:
+    def __init__(self, status):
+        self.status = status
+        self.requests = []
+
+    def track_parcel_sync(self, tracking_number, carrier=None, method=None, provider=None):
+        self.requests.append(tracking_number)
+        return {"status": self.status, "events": [{"status": self.status}]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def tickets(db_session):
+    user = User(username="ops", email="ops@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    now = datetime.utcnow()
+
+    def ticket(**fields):
+        fields.setdefault("status", TicketStatus.IN_PROGRESS)
+        fields.setdefault("category", TicketCategory.ASSET_CHECKOUT_CLAW)
+        fields.setdefault("created_at", now - timedelta(days=2))
+        record = Ticket(subject="Ship laptop", description="-", requester_id=user.id, **fields)
+        db_session.add(record)
+        return record
+
+    records = {
+        "transit": ticket(shipping_tracking="XZD0000001", shipping_carrier="singpost", shipping_status="In Transit",
+                          shipping_tracking_2="1Z999AA10123456784", shipping_carrier_2="ups",
+                          shipping_status_2="Pending"),
+        "pending": ticket(shipping_tracking="XZD0000002", shipping_carrier="singpost", shipping_status="Pending",
+                          created_at=now - timedelta(days=20)),
+        "delivered": ticket(shipping_tracking="XZD0000003", shipping_carrier="singpost", shipping_status="Delivered"),
+        "resolved": ticket(shipping_tracking="XZD0000004", status=TicketStatus.RESOLVED),
+        "no_tracking": ticket(return_tracking="N/A", return_carrier="no_tracking"),
+    }
+    db_session.commit()
+    # Checked an hour ago: in transit is not due again before 3 hours
+    db_session.add(TrackingHistory("XZD0000001", [], status="In Transit", ticket_id=records["transit"].id))
+    db_session.query(TrackingHistory).update({TrackingHistory.last_updated: now - timedelta(hours=1)})
+    db_session.commit()
+    return records
+
+
+def test_only_open_undelivered_packages_are_scored(db_session, tickets):
+    packages = load_packages(db_session)
+
+    assert [(p.tracking_number, p.due) for p in packages] == [
+        ("XZD0000002", True), ("1Z999AA10123456784", True), ("XZD0000001", False)
+    ]
+    assert [p.provider for p in packages] == ["singpost", "oxylabs", "singpost"]
+    assert packages[0].score > packages[1].score  # Older ticket, never checked
+
+    report = staleness_report(packages)
+    assert report["packages"] == 3 and report["due"] == 2 and report["never_checked"] == 2
+    assert report["p50_hours"] == 48.0 and report["max_hours"] == 480.0
+    assert report["providers"]["singpost"]["packages"] == 2
+
+
+def test_due_packages_are_refreshed_within_budgets(db_session, db_engine, tickets):
+    singpost = FakeSingPost({"XZD0000002": "Item in transit"})
+    tracker = FakeTracker("Delivered to recipient")
+    clock = Clock()
+    budgets = {"singpost": ProviderBudget(3600), "oxylabs": ProviderBudget(60)}
+    scheduler = TrackingScheduler(sessionmaker(bind=db_engine), singpost_client=singpost, tracker=tracker,
+                                  budgets=budgets, clock=clock)
+
+    wait = scheduler.run_once()
+
+    assert singpost.requests == [["XZD0000002"]] and tracker.requests == ["1Z999AA10123456784"]
+    assert scheduler.stats == {"refreshed": 2, "failed": 0, "changed": 2}
+    assert wait <= 60
+    db_session.expire_all()
+    # The carrier's own wording, as the bulk refresh writes it
+    assert db_session.get(Ticket, tickets["pending"].id).shipping_status == "Item in transit"
+    assert db_session.get(Ticket, tickets["transit"].id).shipping_status_2 == "Delivered to recipient"
+    history = db_session.query(TrackingHistory).filter_by(tracking_number="XZD0000002").one()
+    assert history.ticket_id == tickets["pending"].id and history.events[0]["status"] == "Item in transit"
+
+    # Nothing is due any more; delivered packages drop out
+    assert [p.due for p in load_packages(db_session)] == [False, False]
+
+
+@pytest.mark.parametrize("status,done,hours", [
+    ("Delivered", True, 6),
+    ("Delivered to recipient", True, 6),
+    ("Received", True, 6),
+    ("Information Received", False, 12),
+    ("Shipment information received", False, 12),
+    ("Info Received", False, 12),
+    ("Not Delivered", False, 6),
+    ("Undelivered - address incomplete", False, 6),
+    ("Item could not be delivered", False, 6),
+    ("Out for Delivery", False, 1),
+])
+def test_final_states_are_matched_explicitly(status, done, hours):
+    assert is_done(status) is done
+    assert normalize_status(status) == status
+    if not done:
+        assert status_class(status)[1] == hours
+
+
+def test_undelivered_packages_keep_being_polled(db_session, db_engine, tickets):
+    tracker = FakeTracker("Undelivered")
+    scheduler = TrackingScheduler(sessionmaker(bind=db_engine), singpost_client=FakeSingPost({}), tracker=tracker,
+                                  budgets={"oxylabs": ProviderBudget(3600)}, clock=Clock())
+
+    scheduler.run_once()
+
+    db_session.expire_all()
+    assert db_session.get(Ticket, tickets["transit"].id).shipping_status_2 == "Undelivered"
+    assert "1Z999AA10123456784" in [p.tracking_number for p in load_packages(db_session)]
+    assert normalize_status("Check Links Below") is None and normalize_status("  ") is None
+
+
+def test_failed_lookups_back_off(db_session, db_engine, tickets):
+    tracker = FakeTracker("Check Links Below")
+    clock = Clock()
+    scheduler = TrackingScheduler(sessionmaker(bind=db_engine), singpost_client=FakeSingPost({}), tracker=tracker,
+                                  budgets={"oxylabs": ProviderBudget(3600)}, clock=clock)
+
+    scheduler.run_once()
+    assert tracker.requests == ["1Z999AA10123456784"] and scheduler.stats["failed"] == 1
+
+    clock.now += 60
+    scheduler.replan(db_session)
+    scheduler.run_once()
+    assert tracker.requests == ["1Z999AA10123456784"]  # Still backing off
+
+    clock.now += 15 * 60
+    scheduler.replan(db_session)
+    scheduler.run_once()
+    assert len(tracker.requests) == 2
+
+
+def test_hung_lookups_are_abandoned_after_the_timeout(db_engine, tickets, monkeypatch):
+    class HungTracker(FakeTracker):
+        def track_parcel_sync(self, tracking_number, carrier=None, method=None, provider=None):
+            self.requests.append(tracking_number)
+            time.sleep(2)
+            return {"status": "Delivered", "events": []}
+
+    monkeypatch.setattr(tracking_scheduler, "OXYLABS_TIMEOUT", 0.2)
+    tracker = HungTracker(None)
+    scheduler = TrackingScheduler(sessionmaker(bind=db_engine), singpost_client=FakeSingPost({}), tracker=tracker,
+                                  budgets={"oxylabs": ProviderBudget(3600)}, clock=Clock())
+
+    started = time.monotonic()
+    scheduler.run_once()
+    assert time.monotonic() - started < 1.5
+    assert tracker.requests == ["1Z999AA10123456784"] and scheduler.stats["failed"] == 1
+
+
+def test_staleness_command(db_engine, tickets, monkeypatch):
+    import database
+
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=db_engine))
+    app = Flask(__name__)
+    app.cli.add_command(tracking_cli)
+
+    result = app.test_cli_runner().invoke(args=["tracking", "staleness"])
+
+    assert result.exit_code == 0
+    assert result.output.startswith("all       packages=3 due=2 never_checked=2 p50=48.0h")
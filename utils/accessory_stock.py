@@ -0,0 +1,449 @@
+"""
+Accessory stock ledger.
+
+Every stock movement is appended to accessory_transactions with signed
+available_delta / total_delta values and applied to the materialized
+quantities on the accessories row with a single conditional UPDATE:
+
+    UPDATE accessories
+       SET available_quantity = available_quantity - :n
+     WHERE id = :id AND available_quantity >= :n
+
+so concurrent checkouts from the web UI and the mobile app can never
+oversell, and no row is read-then-written in Python. Several accessories can
+be reserved in one statement (all-or-nothing).
+
+The materialized quantities can always be recomputed from the ledger;
+AccessoryStock.reconcile() does that and reports or repairs drift.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import update, case, func, literal, or_, and_, select
+from sqlalchemy.orm.util import identity_key
+
+from models.accessory import Accessory
+from models.accessory_transaction import AccessoryTransaction
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Ledger entry written once per accessory to capture its opening balance
+TYPE_BASELINE = 'Stock Baseline'
+TYPE_ADJUSTMENT = 'Stock Adjustment'
+# Compensating entry for a ledger entry that was undone; the original is kept
+TYPE_REVERSAL = 'Reversal'
+
+_QUANTITY_ATTRS = ['available_quantity', 'total_quantity', 'status', 'updated_at']
+
+
+class InsufficientStockError(Exception):
+    """Raised when a reservation would take available_quantity below zero"""
+
+    def __init__(self, shortages):
+        # shortages: {accessory_id: (requested, available)}
+        self.shortages = shortages
+        parts = [
+            f"accessory {accessory_id}: requested {requested}, available {available}"
+            for accessory_id, (requested, available) in shortages.items()
+        ]
+        super().__init__("Not enough stock (" + "; ".join(parts) + ")")
+
+    @property
+    def available(self):
+        """Available quantity for a single-item reservation"""
+        if len(self.shortages) == 1:
+            return next(iter(self.shortages.values()))[1]
+        return None
+
+
+class AccessoryStock:
+    """Utility class for applying accessory stock movements"""
+
+    @staticmethod
+    def checkout(db_session, accessory_id, quantity, transaction_type='Checkout', user_id=None,
+                 customer_id=None, notes=None, consume_total=False, status=None, transaction_number=None):
+        """
+        Take `quantity` units out of available stock.
+
+        Args:
+            db_session: SQLAlchemy session; the caller commits
+            accessory_id: Accessory to decrement
+            quantity: Units to take (must be positive)
+            transaction_type: Ledger transaction type
+            user_id: User performing the movement
+            customer_id: Customer receiving the stock, if any
+            notes: Ledger notes
+            consume_total: Also decrement total_quantity (stock leaves inventory)
+            status: Status to set; defaults to 'Out of Stock' at zero, else 'Available'
+            transaction_number: Optional explicit transaction number
+
+        Returns:
+            AccessoryTransaction: The ledger entry (added to the session)
+
+        Raises:
+            InsufficientStockError: if fewer than `quantity` units are available
+        """
+        return AccessoryStock.reserve_many(
+            db_session, [(accessory_id, quantity)], transaction_type=transaction_type,
+            user_id=user_id, customer_id=customer_id, notes=notes,
+            consume_total=consume_total, status=status, transaction_number=transaction_number
+        )[0]
+
+    @staticmethod
+    def reserve_many(db_session, items, transaction_type='Checkout', user_id=None, customer_id=None,
+                     notes=None, consume_total=False, status=None, transaction_number=None):
+        """
+        Reserve several accessories in one conditional UPDATE (all-or-nothing).
+
+        Args:
+            items: Iterable of (accessory_id, quantity); repeated ids are merged
+            (remaining arguments as for checkout)
+
+        Returns:
+            list: Ledger entries, one per distinct accessory
+
+        Raises:
+            InsufficientStockError: if any item is short; nothing is applied
+        """
+        wanted = _merge_items(items)
+        for accessory_id, quantity in wanted.items():
+            if quantity < 1:
+                raise ValueError(f"Quantity for accessory {accessory_id} must be at least 1")
+
+        moves = {
+            accessory_id: (-quantity, -quantity if consume_total else 0)
+            for accessory_id, quantity in wanted.items()
+        }
+        _apply_moves(db_session, moves, status=status)
+
+        return _add_ledger_entries(
+            db_session, moves, transaction_type, user_id=user_id, customer_id=customer_id,
+            notes=notes, transaction_number=transaction_number
+        )
+
+    @staticmethod
+    def restock(db_session, accessory_id, quantity, transaction_type='Checkin', user_id=None,
+                customer_id=None, notes=None, add_to_total=False, status=None, transaction_number=None):
+        """
+        Put `quantity` units back into available stock.
+
+        Args:
+            add_to_total: Also increment total_quantity (new stock received)
+            (remaining arguments as for checkout)
+
+        Returns:
+            AccessoryTransaction: The ledger entry (added to the session)
+        """
+        quantity = int(quantity)
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+
+        moves = {accessory_id: (quantity, quantity if add_to_total else 0)}
+        _apply_moves(db_session, moves, status=status)
+        return _add_ledger_entries(
+            db_session, moves, transaction_type, user_id=user_id, customer_id=customer_id,
+            notes=notes, transaction_number=transaction_number
+        )[0]
+
+    @staticmethod
+    def adjust(db_session, accessory_id, available_delta=0, total_delta=0, transaction_type=TYPE_ADJUSTMENT,
+               user_id=None, customer_id=None, notes=None, update_status=True, transaction_number=None):
+        """
+        Apply an arbitrary signed movement (e.g. a ticket quantity edit).
+
+        A negative available_delta is conditional like a checkout.
+
+        Returns:
+            AccessoryTransaction or None if both deltas are zero
+        """
+        if not available_delta and not total_delta:
+            return None
+        moves = {accessory_id: (int(available_delta), int(total_delta))}
+        _apply_moves(db_session, moves, update_status=update_status)
+        return _add_ledger_entries(
+            db_session, moves, transaction_type, user_id=user_id, customer_id=customer_id,
+            notes=notes, transaction_number=transaction_number
+        )[0]
+
+    @staticmethod
+    def reverse(db_session, transaction, user_id=None, notes=None):
+        """
+        Undo a ledger entry by appending the opposite movement.
+
+        The entry stays in the ledger; the reversal is numbered
+        "REV-<transaction number>" so an entry can only be reversed once.
+        Legacy entries without deltas are reversed from their type (a
+        checkout puts its quantity back).
+
+        Args:
+            db_session: SQLAlchemy session; the caller commits
+            transaction: AccessoryTransaction to undo
+            user_id: User performing the reversal
+            notes: Ledger notes
+
+        Returns:
+            AccessoryTransaction or None if the entry moved no stock
+
+        Raises:
+            ValueError: if the entry is a reversal or was already reversed
+            InsufficientStockError: if undoing a restock would take stock below zero
+        """
+        if transaction.transaction_type == TYPE_REVERSAL:
+            raise ValueError("A reversal cannot be reversed")
+        transaction_number = f"REV-{transaction.transaction_number}"[:100]
+        reversed_already = db_session.query(AccessoryTransaction.id).filter(
+            AccessoryTransaction.transaction_type == TYPE_REVERSAL,
+            AccessoryTransaction.transaction_number == transaction_number
+        ).first()
+        if reversed_already:
+            raise ValueError(f"Transaction {transaction.transaction_number} was already reversed")
+
+        available_delta, total_delta = transaction.available_delta or 0, transaction.total_delta or 0
+        if transaction.available_delta is None and transaction.total_delta is None \
+                and transaction.transaction_type == 'Checkout':
+            available_delta = -(transaction.quantity or 0)
+        return AccessoryStock.adjust(
+            db_session, transaction.accessory_id, available_delta=-available_delta, total_delta=-total_delta,
+            transaction_type=TYPE_REVERSAL, user_id=user_id, notes=notes, transaction_number=transaction_number
+        )
+
+    @staticmethod
+    def set_quantities(db_session, accessory_id, available=None, total=None, user_id=None, notes=None,
+                       transaction_type=TYPE_ADJUSTMENT):
+        """
+        Set absolute quantities (edit forms) and record the difference in the ledger.
+
+        The row is locked while the difference is computed so concurrent
+        movements are not lost.
+
+        Returns:
+            AccessoryTransaction or None if nothing changed
+        """
+        db_session.flush()
+        current = db_session.execute(
+            select(Accessory.available_quantity, Accessory.total_quantity)
+            .where(Accessory.id == accessory_id)
+            .with_for_update()
+        ).first()
+        if current is None:
+            raise ValueError(f"Accessory {accessory_id} not found")
+
+        available_delta = 0 if available is None else int(available) - (current.available_quantity or 0)
+        total_delta = 0 if total is None else int(total) - (current.total_quantity or 0)
+        if not available_delta and not total_delta:
+            return None
+
+        moves = {accessory_id: (available_delta, total_delta)}
+        _apply_moves(db_session, moves, update_status=False, conditional=False)
+        return _add_ledger_entries(db_session, moves, transaction_type, user_id=user_id, notes=notes)[0]
+
+    @staticmethod
+    def reconcile(db_session, apply=False):
+        """
+        Recompute materialized quantities from the ledger.
+
+        Accessories without a baseline entry (created before the ledger, or
+        through code paths that set quantities directly) are adopted: a
+        baseline is written so the ledger sums to the current quantities.
+        Drifted accessories are repaired with a compare-and-set UPDATE, so a
+        movement committed while reconciling is never overwritten.
+
+        Args:
+            db_session: SQLAlchemy session; committed when apply=True
+            apply: Write baselines and repair drift; otherwise report only
+
+        Returns:
+            dict: {'checked', 'adopted', 'drifted', 'repaired', 'details'}
+        """
+        txn = AccessoryTransaction.__table__
+        ledger = (
+            select(
+                txn.c.accessory_id,
+                func.coalesce(func.sum(txn.c.available_delta), 0).label('available_sum'),
+                func.coalesce(func.sum(txn.c.total_delta), 0).label('total_sum'),
+                func.sum(case((txn.c.transaction_type == TYPE_BASELINE, 1), else_=0)).label('baselines'),
+            )
+            .where(or_(txn.c.available_delta.isnot(None), txn.c.total_delta.isnot(None)))
+            .group_by(txn.c.accessory_id)
+            .subquery()
+        )
+
+        # Materialized values and ledger sums come from one statement so they
+        # describe the same snapshot.
+        acc = Accessory.__table__
+        rows = db_session.execute(
+            select(
+                acc.c.id,
+                acc.c.available_quantity,
+                acc.c.total_quantity,
+                ledger.c.available_sum,
+                ledger.c.total_sum,
+                ledger.c.baselines,
+            ).select_from(acc.outerjoin(ledger, ledger.c.accessory_id == acc.c.id))
+        ).all()
+
+        report = {'checked': len(rows), 'adopted': 0, 'drifted': 0, 'repaired': 0, 'details': []}
+        baselines = []
+        for row in rows:
+            available = row.available_quantity or 0
+            total = row.total_quantity or 0
+            available_sum = row.available_sum or 0
+            total_sum = row.total_sum or 0
+
+            if not row.baselines:
+                report['adopted'] += 1
+                baselines.append(AccessoryTransaction(
+                    accessory_id=row.id,
+                    transaction_type=TYPE_BASELINE,
+                    quantity=available,
+                    available_delta=available - available_sum,
+                    total_delta=total - total_sum,
+                    notes='Opening balance recorded by stock reconciler'
+                ))
+                continue
+
+            if available == available_sum and total == total_sum:
+                continue
+
+            report['drifted'] += 1
+            detail = {
+                'accessory_id': row.id,
+                'available_quantity': available,
+                'ledger_available': available_sum,
+                'total_quantity': total,
+                'ledger_total': total_sum,
+                'repaired': False
+            }
+            if apply:
+                result = db_session.execute(
+                    update(acc)
+                    .where(
+                        acc.c.id == row.id,
+                        _null_safe_eq(acc.c.available_quantity, row.available_quantity),
+                        _null_safe_eq(acc.c.total_quantity, row.total_quantity),
+                    )
+                    .values(available_quantity=available_sum, total_quantity=total_sum)
+                )
+                detail['repaired'] = result.rowcount == 1
+                report['repaired'] += result.rowcount
+            report['details'].append(detail)
+
+        if apply:
+            db_session.add_all(baselines)
+            db_session.commit()
+            _expire_accessories(db_session, [row.id for row in rows])
+
+        if report['drifted']:
+            logger.warning(f"Accessory stock reconciler found {report['drifted']} drifted accessories "
+                           f"({report['repaired']} repaired)")
+        return report
+
+
+def _merge_items(items):
+    merged = {}
+    for accessory_id, quantity in items:
+        merged[int(accessory_id)] = merged.get(int(accessory_id), 0) + int(quantity)
+    return merged
+
+
+def _null_safe_eq(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _apply_moves(db_session, moves, status=None, update_status=True, conditional=True):
+    """
+    Apply {accessory_id: (available_delta, total_delta)} in one UPDATE.
+
+    Decrements only apply when enough stock is available; if any row fails
+    the condition the savepoint is rolled back and InsufficientStockError is
+    raised, leaving the session as it was.
+    """
+    # Push pending ORM changes first so they are not lost when we expire below
+    db_session.flush()
+
+    table = Accessory.__table__
+    ids = list(moves)
+    available_delta = case({i: moves[i][0] for i in ids}, value=table.c.id, else_=0)
+    new_available = func.coalesce(table.c.available_quantity, 0) + available_delta
+
+    # Status is assigned before available_quantity: MySQL evaluates SET
+    # clauses left to right, so this keeps it reading the old value.
+    values = []
+    if status is not None:
+        values.append((table.c.status, literal(status)))
+    elif update_status:
+        values.append((table.c.status, case(
+            (new_available <= 0, 'Out of Stock'),
+            else_='Available'
+        )))
+    values.append((table.c.available_quantity, new_available))
+    if any(total for _, total in moves.values()):
+        total_delta = case({i: moves[i][1] for i in ids}, value=table.c.id, else_=0)
+        values.append((table.c.total_quantity, func.coalesce(table.c.total_quantity, 0) + total_delta))
+    values.append((table.c.updated_at, literal(datetime.utcnow())))
+
+    where = [table.c.id.in_(ids)]
+    if conditional:
+        where.append(or_(available_delta >= 0, new_available >= 0))
+
+    _ensure_transaction(db_session)
+    savepoint = db_session.begin_nested()
+    result = db_session.execute(update(table).where(and_(*where)).ordered_values(*values))
+    if result.rowcount != len(ids):
+        savepoint.rollback()
+        current = dict(db_session.execute(
+            select(table.c.id, table.c.available_quantity).where(table.c.id.in_(ids))
+        ).all())
+        shortages = {
+            accessory_id: (-delta, current.get(accessory_id) or 0)
+            for accessory_id, (delta, _) in moves.items()
+            if accessory_id not in current or (current.get(accessory_id) or 0) + delta < 0
+        }
+        raise InsufficientStockError(shortages or {i: (-moves[i][0], current.get(i) or 0) for i in ids})
+    savepoint.commit()
+
+    _expire_accessories(db_session, ids)
+
+
+def _ensure_transaction(db_session):
+    """
+    Make sure a real transaction is open before taking a savepoint.
+
+    pysqlite only issues BEGIN in front of DML, and releasing an outermost
+    SAVEPOINT commits in SQLite, which would detach the stock update from
+    the caller's transaction.
+    """
+    connection = db_session.connection()
+    if connection.dialect.name != 'sqlite':
+        return
+    dbapi_connection = connection.connection.dbapi_connection
+    if not dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
+
+
+def _expire_accessories(db_session, ids):
+    """Make loaded Accessory objects re-read their quantities"""
+    for accessory_id in ids:
+        obj = db_session.identity_map.get(identity_key(Accessory, accessory_id))
+        if obj is not None:
+            db_session.expire(obj, _QUANTITY_ATTRS)
+
+
+def _add_ledger_entries(db_session, moves, transaction_type, user_id=None, customer_id=None,
+                        notes=None, transaction_number=None):
+    entries = []
+    for accessory_id, (available_delta, total_delta) in moves.items():
+        entries.append(AccessoryTransaction(
+            accessory_id=accessory_id,
+            transaction_type=transaction_type,
+            quantity=abs(available_delta) or abs(total_delta),
+            transaction_number=transaction_number if len(moves) == 1 else None,
+            customer_id=customer_id,
+            user_id=user_id,
+            notes=notes,
+            available_delta=available_delta,
+            total_delta=total_delta
+        ))
+    db_session.add_all(entries)
+    return entries
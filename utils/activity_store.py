@@ -1,47 +1,16 @@
-import json
-import os
 from datetime import datetime
 from utils.db_manager import DatabaseManager
 from models.activity import Activity
 
+
 class ActivityStore:
+    """
+    Activities in the activities table. Nothing is loaded up front; each
+    new activity is one INSERT (data/activities.json is imported once by
+    migrations/retire_json_stores.py).
+    """
     def __init__(self):
         self.db_manager = DatabaseManager()
-        self.activities = {}
-        self.ACTIVITIES_FILE = 'data/activities.json'
-        self.load_activities()
-
-    def load_activities(self):
-        if os.path.exists(self.ACTIVITIES_FILE):
-            with open(self.ACTIVITIES_FILE, 'r') as f:
-                activities_data = json.load(f)
-                for activity_data in activities_data:
-                    activity = Activity(
-                        id=activity_data['id'],
-                        user_id=activity_data['user_id'],
-                        type=activity_data['type'],
-                        content=activity_data['content'],
-                        reference_id=activity_data['reference_id'],
-                        created_at=datetime.fromisoformat(activity_data['created_at'])
-                    )
-                    activity.is_read = activity_data.get('is_read', False)
-                    self.activities[activity.id] = activity
-
-    def save_activities(self):
-        os.makedirs(os.path.dirname(self.ACTIVITIES_FILE), exist_ok=True)
-        activities_data = []
-        for activity in self.activities.values():
-            activities_data.append({
-                'id': activity.id,
-                'user_id': activity.user_id,
-                'type': activity.type,
-                'content': activity.content,
-                'reference_id': activity.reference_id,
-                'created_at': activity.created_at.isoformat(),
-                'is_read': activity.is_read
-            })
-        with open(self.ACTIVITIES_FILE, 'w') as f:
-            json.dump(activities_data, f, indent=2)
 
     def get_user_activities(self, user_id, limit=50):
         """Get activities for a specific user"""
@@ -97,19 +66,3 @@ class ActivityStore:
             return count
         finally:
             db_session.close()
-
-    def save_activities(self):
-        os.makedirs(os.path.dirname(self.ACTIVITIES_FILE), exist_ok=True)
-        activities_data = []
-        for activity in self.activities.values():
-            activities_data.append({
-                'id': activity.id,
-                'user_id': activity.user_id,
-                'type': activity.type,
-                'content': activity.content,
-                'reference_id': activity.reference_id,
-                'created_at': activity.created_at.isoformat(),
-                'is_read': activity.is_read
-            })
-        with open(self.ACTIVITIES_FILE, 'w') as f:
-            json.dump(activities_data, f, indent=2) 
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Conditional GET and compression for the JSON APIs.
+
+GET responses from the API blueprints (API_RESPONSE_BLUEPRINTS: the mobile
+API, /api/v1, the development console /mobile API and /api/v2) get:
+
+- A weak ETag hashed from the JSON body. A request whose If-None-Match
+  matches is answered with 304 and no body, so the app re-validates a
+  ticket list instead of downloading it again.
+- A Cache-Control policy: 'private, no-cache' (cache, but revalidate every
+  time) unless the view sets its own with @cache_policy.
+- gzip or brotli (when the brotli package is installed) for bodies of at
+  least API_COMPRESS_MIN_BYTES, negotiated from Accept-Encoding.
+
+The ETag is computed from the body rather than row versions: list payloads
+embed related rows (requester, queue, linked assets, thumbnails) whose
+changes do not touch the parent row's updated_at, so a row-version
+validator would answer 304 for stale data. Hashing is a small fraction of
+the cost of serializing the page.
+"""
+import gzip
+import hashlib
+import logging
+from functools import wraps
+
+from flask import current_app, request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLUEPRINTS = ('mobile_api', 'api', 'json_api', 'api_v2')
+DEFAULT_CACHE_POLICY = 'private, no-cache'
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Quality 11 is several times slower for a few % smaller output
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'text/html')
+
+
+def cache_policy(value):
+    """
+    Set the Cache-Control header of an API view.
+
+    Args:
+        value: Header value, e.g. 'private, max-age=60' or 'no-store'
+
+    Usage:
+        @mobile_api_bp.route('/health')
+        @cache_policy('public, max-age=30')
+        def health_check(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            response = current_app.make_response(f(*args, **kwargs))
+            response.headers['Cache-Control'] = value
+            return response
+        return decorated_function
+    return decorator
+
+
+def body_etag(data, ignore=()):
+    """
+    Weak validator for a response body.
+
+    Args:
+        data: Body bytes
+        ignore: Per-request values embedded in the body (request ids,
+            timestamps) that must not change the validator
+    """
+    for value in ignore:
+        if value:
+            data = data.replace(str(value).encode(), b'')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def choose_encoding(accept_encoding):
+    """
+    Preferred supported content coding from an Accept-Encoding header.
+
+    Returns:
+        str: 'br', 'gzip' or None
+    """
+    offered = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            offered[coding] = quality
+
+    wildcard = offered.get('*', 0.0)
+    candidates = (['br'] if BROTLI_AVAILABLE else []) + ['gzip']
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = offered.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _vary(response, header):
+    if header.lower() not in (value.lower() for value in response.vary):
+        response.vary.add(header)
+
+
+def finalize_api_response(response):
+    """ETag / 304, Cache-Control and compression for one API response"""
+    if response.direct_passthrough or response.is_streamed:
+        return response  # files and streamed exports handle their own headers
+
+    compressible = response.mimetype in COMPRESSIBLE_MIMETYPES
+    if compressible:
+        _vary(response, 'Accept-Encoding')  # also on a 304, for shared caches
+
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = DEFAULT_CACHE_POLICY
+        if 'no-store' not in response.headers['Cache-Control']:
+            if not response.get_etag()[0]:
+                response.set_etag(body_etag(response.get_data()), weak=True)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+    if not compressible or response.status_code in (204, 304) or 'Content-Encoding' in response.headers:
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config['API_COMPRESS_MIN_BYTES']:
+        return response
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_api_responses(app):
+    """
+    Apply finalize_api_response to the API blueprints of app.
+
+    Config:
+        API_RESPONSE_BLUEPRINTS: Blueprint names to handle
+        API_COMPRESS_MIN_BYTES: Smallest body that is compressed
+    """
+    app.config.setdefault('API_RESPONSE_BLUEPRINTS', DEFAULT_BLUEPRINTS)
+    app.config.setdefault('API_COMPRESS_MIN_BYTES', DEFAULT_COMPRESS_MIN_BYTES)
+    if not BROTLI_AVAILABLE:
+        logger.debug("brotli not installed - API responses are gzip-compressed only")
+
+    @app.after_request
+    def _finalize_api_response(response):
+        if request.blueprint not in app.config['API_RESPONSE_BLUEPRINTS']:
+            return response
+        return finalize_api_response(response)
@@ -0,0 +1,209 @@
+"""
+Facet service for the inventory filter dropdowns.
+
+The classic inventory page and /inventory/api/sf/filters used to run a
+SELECT DISTINCT / GROUP BY per column over the permission-filtered assets,
+plus a Company lookup per customer name. They now read the asset_facet_counts
+summary (models/asset_facet.py), which listeners keep current on every asset
+insert, update and delete:
+
+    counts = facet_counts(db_session, scope)   # {'model': {'MacBook Pro': 12}, ...}
+
+The cells are cached in memory per process and re-read only when the
+version stamp in asset_facet_state moves, so a request costs one primary key
+lookup plus a pass over the cells; neither grows with the number of assets.
+A stale summary (bulk UPDATE on assets, a fresh install) is rebuilt with
+GROUP BY queries on the next read.
+"""
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from models.asset import Asset
+from models.asset_facet import AssetFacetCount, AssetFacetState, FACET_COLUMNS, STATE_ID
+from models.summary_counts import cell_text
+from models.company import Company
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+FACETS = tuple(FACET_COLUMNS)
+
+_cached = None  # (version, cells)
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class AssetScope:
+    """
+    The inventory permission filter, evaluated on the (country, company_id,
+    customer) key of a facet cell instead of on asset rows.
+
+    Args:
+        countries: Asset.country IN countries (case-insensitive, like MySQL)
+        company_ids: Enables the company filter: Asset.company_id IN
+            company_ids OR one of the customer matches below
+        company_names: ... OR lower(Asset.customer) LIKE '%name%'
+        customers: ... OR Asset.customer == customer
+        require_company: Asset.company_id IS NOT NULL
+    """
+    countries: frozenset = None
+    company_ids: frozenset = None
+    company_names: tuple = ()
+    customers: tuple = ()
+    require_company: bool = False
+
+    @classmethod
+    def nothing(cls):
+        return cls(company_ids=frozenset(), require_company=True)
+
+    def __call__(self, country, company_id, customer):
+        if self.countries is not None and country.lower() not in self.countries:
+            return False
+        if self.require_company and not company_id:
+            return False
+        if self.company_ids is None:
+            return True
+        return (
+            company_id in self.company_ids
+            or customer in self.customers
+            or any(name in customer.lower() for name in self.company_names)
+        )
+
+
+def rebuild(db_session):
+    """
+    Recount every facet from the assets table and commit.
+
+    Returns:
+        int: Number of cells written
+    """
+    state = db_session.get(AssetFacetState, STATE_ID)
+    if state is None:
+        state = AssetFacetState(id=STATE_ID, version=0)
+        db_session.add(state)
+
+    cells = Counter()
+    for facet, column in FACET_COLUMNS.items():
+        value_column = getattr(Asset, column)
+        rows = db_session.query(
+            value_column, Asset.country, Asset.company_id, Asset.customer, func.count(Asset.id)
+        ).group_by(value_column, Asset.country, Asset.company_id, Asset.customer).all()
+        for value, country, company_id, customer, count in rows:
+            cells[(facet, cell_text(value), cell_text(country), company_id or 0, cell_text(customer))] += count
+
+    db_session.query(AssetFacetCount).delete(synchronize_session=False)
+    db_session.bulk_insert_mappings(AssetFacetCount, [
+        {'facet': facet, 'value': value, 'country': country, 'company_id': company_id,
+         'customer': customer, 'asset_count': count}
+        for (facet, value, country, company_id, customer), count in cells.items()
+    ])
+    state.version = (state.version or 0) + 1
+    state.stale = False
+    state.rebuilt_at = datetime.utcnow()
+    db_session.commit()
+    logger.info(f"Rebuilt asset facets: {len(cells)} cells, version {state.version}")
+    return len(cells)
+
+
+def load_cells(db_session):
+    """
+    The current facet cells, from memory unless the version moved.
+
+    Returns:
+        tuple: (facet, value, country, company_id, customer, count) rows
+    """
+    global _cached
+    state = db_session.query(AssetFacetState.version, AssetFacetState.stale).filter(
+        AssetFacetState.id == STATE_ID
+    ).first()
+    if state is None or state.stale:
+        try:
+            rebuild(db_session)
+        except IntegrityError:
+            db_session.rollback()  # Another request rebuilt it first
+        return load_cells(db_session)
+
+    with _lock:
+        if _cached and _cached[0] == state.version:
+            return _cached[1]
+
+    cells = tuple(db_session.query(
+        AssetFacetCount.facet, AssetFacetCount.value, AssetFacetCount.country,
+        AssetFacetCount.company_id, AssetFacetCount.customer, AssetFacetCount.asset_count
+    ).filter(AssetFacetCount.asset_count > 0).all())
+    with _lock:
+        _cached = (state.version, cells)
+    logger.debug(f"Loaded {len(cells)} asset facet cells (version {state.version})")
+    return cells
+
+
+def facet_counts(db_session, scope=None, facets=FACETS):
+    """
+    Asset counts per facet value within a permission scope.
+
+    Args:
+        db_session: Database session
+        scope: AssetScope (or any callable(country, company_id, customer)),
+            None for every asset
+        facets: Facet names to return
+
+    Returns:
+        dict: {facet: {value: count}}; '' is the NULL/empty value, status
+        values are AssetStatus names and location values are location ids
+    """
+    counts = {facet: Counter() for facet in facets}
+    admitted = {}
+    for facet, value, country, company_id, customer, count in load_cells(db_session):
+        if facet not in counts:
+            continue
+        if scope is not None:
+            key = (country, company_id, customer)
+            if key not in admitted:
+                admitted[key] = scope(country, company_id, customer)
+            if not admitted[key]:
+                continue
+        counts[facet][value] += count
+    return {facet: dict(values) for facet, values in counts.items()}
+
+
+def company_options(db_session, names):
+    """
+    Grouping info for customer names in one query instead of one per name.
+
+    Returns:
+        dict: {name: {'label', 'is_parent', 'parent_company', 'child_companies'}}
+        for the names that match a Company
+    """
+    if not names:
+        return {}
+    companies = db_session.query(Company).filter(Company.name.in_(list(names))).all()
+    ids = [c.id for c in companies]
+    parent_ids = [c.parent_company_id for c in companies if c.parent_company_id]
+    children = {}
+    for child_id, child_name, parent_id in db_session.query(
+        Company.id, Company.name, Company.parent_company_id
+    ).filter(Company.parent_company_id.in_(ids)).all():
+        children.setdefault(parent_id, []).append(child_name)
+    parents = dict(db_session.query(Company.id, Company.name).filter(Company.id.in_(parent_ids)).all()) if parent_ids else {}
+
+    options = {}
+    for company in companies:
+        parent_name = parents.get(company.parent_company_id)
+        child_names = children.get(company.id, [])
+        if parent_name:
+            label = f"{company.name} ({parent_name})"  # Company.grouped_display_name
+        else:
+            label = company.display_name or company.name
+        options.setdefault(company.name, {
+            'label': label,
+            'is_parent': bool(company.is_parent_company or child_names),
+            'parent_company': parent_name,
+            'child_companies': child_names,
+        })
+    return options
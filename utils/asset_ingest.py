@@ -0,0 +1,275 @@
+"""
+Set-based bulk asset creation for JSON payloads.
+
+Used by the API / mobile bulk-create endpoints and the packing list
+(PDF extraction) flows. Incoming assets are handled a batch at a time:
+
+1. Validate  - required fields and repeats within the request
+2. Dedupe    - one IN query per batch against existing serials/tags
+3. Tags      - assets without a tag get a contiguous block from AssetTagAllocator
+4. Insert    - one executemany INSERT for the assets, then one each for the
+               ticket_assets links and the AssetHistory "CREATE" rows
+
+Failures are reported per row ({'row', 'serial_num', 'asset_tag', 'error'});
+valid rows in the same request are still created.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import select, insert, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.asset import Asset, AssetStatus, ticket_assets
+from models.asset_facet import record_inserted
+from models.autocomplete_change import record_changes
+from models.asset_history import AssetHistory
+from utils.asset_tag_allocator import AssetTagAllocator, AssetTagAllocationError
+from utils.inventory_import import LOOKUP_BATCH_SIZE, announce_inserted, ids_by_tag
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+ASSET_COLUMNS = frozenset(column.name for column in Asset.__table__.columns) - {'id'}
+
+# Asset fields recorded in the CREATE history entry
+HISTORY_FIELDS = ('asset_tag', 'serial_num', 'name', 'model', 'status', 'company_id')
+
+
+class AssetIngest:
+    """Bulk creator for asset dicts keyed by Asset column names"""
+
+    def __init__(self, bind, user_id=None, ticket_id=None, tag_prefix=None,
+                 require_serial=False, history_notes=None, batch_size=LOOKUP_BATCH_SIZE):
+        """
+        Args:
+            bind: Engine or Session for the inventory database. Inserts run in
+                their own transaction per batch, so call this before the
+                caller's session has written anything (SQLite locks)
+            user_id: User recorded on the AssetHistory rows
+            ticket_id: Link every created asset to this ticket
+            tag_prefix: Allocate tags with this prefix (e.g. "SG-") for assets
+                without one; without a prefix a missing tag is an error
+            require_serial: Reject assets without a serial number
+            history_notes: Notes stored on the AssetHistory rows
+            batch_size: Assets per lookup / INSERT
+        """
+        self.engine = bind if isinstance(bind, Engine) else bind.get_bind()
+        self.user_id = user_id
+        self.ticket_id = ticket_id
+        self.tag_prefix = tag_prefix
+        self.require_serial = require_serial
+        self.history_notes = history_notes
+        self.batch_size = max(1, int(batch_size))
+
+        self.created = []
+        self.errors = []
+        self._seen_serials = set()
+        self._seen_tags = set()
+
+    def ingest(self, records):
+        """
+        Create assets from a list of dicts.
+
+        Keys that are not Asset columns are ignored; string values are
+        stripped and empty strings treated as missing.
+
+        Returns:
+            dict: {'created': [{'row', 'id', 'asset_tag', 'serial_num', 'name', 'model'}],
+                   'errors': [{'row', 'serial_num', 'asset_tag', 'error'}]}
+            where row is the 1-based position in records
+        """
+        records = list(records)
+        for start in range(0, len(records), self.batch_size):
+            batch = records[start:start + self.batch_size]
+            self._ingest_batch([(start + offset + 1, _clean(record)) for offset, record in enumerate(batch)])
+
+        logger.info(f"Asset ingest: {len(self.created)} created, {len(self.errors)} failed")
+        return {'created': self.created, 'errors': self.errors}
+
+    # ------------------------------------------------------------------
+    # Pipeline stages
+    # ------------------------------------------------------------------
+
+    def _ingest_batch(self, rows):
+        rows = self._validate(rows)
+        rows = self._dedupe(rows)
+        rows = self._assign_tags(rows)
+        if not rows:
+            return
+
+        try:
+            self._insert(rows)
+        except IntegrityError:
+            # A conflicting asset was created between the lookup and the
+            # insert; retry row by row so only the offending rows fail
+            logger.warning("Bulk asset insert hit a constraint, retrying batch row by row")
+            for row in rows:
+                try:
+                    self._insert([row])
+                except IntegrityError as e:
+                    self._fail(row, f"Could not create asset: {str(e.orig)}")
+
+    def _validate(self, rows):
+        valid = []
+        for row in rows:
+            _, record = row
+            serial = record.get('serial_num')
+            tag = record.get('asset_tag')
+
+            if self.require_serial and not serial:
+                self._fail(row, 'Missing serial number')
+            elif serial and serial in self._seen_serials:
+                self._fail(row, f'Serial {serial} appears more than once in this request')
+            elif tag and tag in self._seen_tags:
+                self._fail(row, f'Asset tag {tag} appears more than once in this request')
+            else:
+                valid.append(row)
+
+            if serial:
+                self._seen_serials.add(serial)
+            if tag:
+                self._seen_tags.add(tag)
+        return valid
+
+    def _dedupe(self, rows):
+        serials = [record['serial_num'] for _, record in rows if record.get('serial_num')]
+        tags = [record['asset_tag'] for _, record in rows if record.get('asset_tag')]
+        if not serials and not tags:
+            return rows
+
+        assets = Asset.__table__
+        conditions = []
+        if serials:
+            conditions.append(assets.c.serial_num.in_(serials))
+        if tags:
+            conditions.append(assets.c.asset_tag.in_(tags))
+        with self.engine.connect() as conn:
+            existing = conn.execute(
+                select(assets.c.id, assets.c.serial_num, assets.c.asset_tag).where(or_(*conditions))
+            ).all()
+        by_serial = {serial: asset_id for asset_id, serial, _ in existing if serial}
+        by_tag = {tag: asset_id for asset_id, _, tag in existing if tag}
+
+        valid = []
+        for row in rows:
+            _, record = row
+            serial = record.get('serial_num')
+            tag = record.get('asset_tag')
+            if serial and serial in by_serial:
+                self._fail(row, f'Serial {serial} already exists (Asset #{by_serial[serial]})')
+            elif tag and tag in by_tag:
+                self._fail(row, f'Asset tag {tag} already exists (Asset #{by_tag[tag]})')
+            else:
+                valid.append(row)
+        return valid
+
+    def _assign_tags(self, rows):
+        untagged = [row for row in rows if not row[1].get('asset_tag')]
+        if not untagged:
+            return rows
+
+        if not self.tag_prefix:
+            for row in untagged:
+                self._fail(row, 'Missing asset tag')
+            return [row for row in rows if row[1].get('asset_tag')]
+
+        # Skip numbers that were typed in by hand elsewhere in this request
+        tags = []
+        try:
+            with Session(bind=self.engine) as tag_session:
+                while len(tags) < len(untagged):
+                    reserved = AssetTagAllocator.reserve(tag_session, self.tag_prefix, len(untagged) - len(tags))
+                    tags.extend(tag for tag in reserved if tag not in self._seen_tags)
+        except AssetTagAllocationError as e:
+            logger.warning(f"Asset ingest could not allocate tags: {e}")
+            for row in untagged:
+                self._fail(row, 'Could not allocate an asset tag, please enter one manually')
+            return [row for row in rows if row[1].get('asset_tag')]
+
+        for (_, record), tag in zip(untagged, tags):
+            record['asset_tag'] = tag
+            self._seen_tags.add(tag)
+        return rows
+
+    def _insert(self, rows):
+        now = datetime.utcnow()
+        records = [record for _, record in rows]
+        for record in records:
+            record.setdefault('status', AssetStatus.IN_STOCK)
+            record.setdefault('created_at', now)
+
+        # executemany needs the same keys on every row
+        columns = set().union(*records)
+        params = [{column: record.get(column) for column in columns} for record in records]
+
+        with self.engine.begin() as conn:
+            conn.execute(insert(Asset.__table__), params)
+            # Tags suggested by peek_tags (or typed in) must not be handed out again
+            AssetTagAllocator.claim(conn, [record['asset_tag'] for record in records])
+            record_inserted(conn, params)  # Core inserts bypass the facet listeners
+            record_changes(conn, 'assets')  # ... and the autocomplete change log
+            ids = ids_by_tag(conn, [record['asset_tag'] for record in records])
+
+            if self.ticket_id:
+                conn.execute(
+                    insert(ticket_assets),
+                    [{'ticket_id': self.ticket_id, 'asset_id': ids[record['asset_tag']]} for record in records]
+                )
+            conn.execute(insert(AssetHistory.__table__), [
+                {
+                    'asset_id': ids[record['asset_tag']],
+                    'user_id': self.user_id,
+                    'action': 'CREATE',
+                    'changes': {field: {'old': None, 'new': _json_value(record.get(field))} for field in HISTORY_FIELDS},
+                    'notes': self.history_notes,
+                    'created_at': now
+                }
+                for record in records
+            ])
+        announce_inserted(self.engine, ticket_linked=bool(self.ticket_id))
+
+        for row_number, record in rows:
+            self.created.append({
+                'row': row_number,
+                'id': ids[record['asset_tag']],
+                'asset_tag': record['asset_tag'],
+                'serial_num': record.get('serial_num'),
+                'name': record.get('name'),
+                'model': record.get('model')
+            })
+
+    def _fail(self, row, message):
+        row_number, record = row
+        self.errors.append({
+            'row': row_number,
+            'serial_num': record.get('serial_num'),
+            'asset_tag': record.get('asset_tag'),
+            'error': message
+        })
+
+
+def _clean(record):
+    """Keep Asset columns only, stripping strings and dropping empty values"""
+    cleaned = {}
+    for key, value in record.items():
+        if key not in ASSET_COLUMNS:
+            continue
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is None:
+            continue
+        cleaned[key] = value
+    # Mirror Asset.validate_customer, which Core inserts bypass
+    if cleaned.get('customer'):
+        cleaned['customer'] = cleaned['customer'].upper()
+    return cleaned
+
+
+def _json_value(value):
+    if isinstance(value, AssetStatus):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
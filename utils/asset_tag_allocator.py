@@ -0,0 +1,323 @@
+"""
+Asset tag allocator backed by the asset_tag_sequences table.
+
+Each tag prefix ("SG-", "SG-R", ...) has a single counter row. A block of
+numbers is reserved by incrementing the counter in the database
+(last_value = last_value + n) and reading it back in the same short
+transaction of its own, so two users adding assets at the same time can never
+receive the same numbers and a bulk create reserves a contiguous block at once.
+
+Forms only peek at the next tags; numbers are reserved when assets are
+created (reserve for untagged rows, claim for tags the user accepted).
+
+The counter row is created lazily: the first reservation for a prefix scans
+the existing asset tags once to find the highest number in use.
+"""
+import re
+import logging
+from datetime import datetime
+
+from sqlalchemy import select, update, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from models.asset import Asset
+from models.asset_tag_sequence import AssetTagSequence
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single reservation (matches the largest UI batch limit)
+MAX_RESERVATION = 1000
+
+# Give up after this many rounds of skipping manually entered tags
+MAX_COLLISION_ROUNDS = 5
+
+# Trailing number of a tag, e.g. "SG-R007" -> ("SG-R", "007")
+TAG_NUMBER_PATTERN = re.compile(r'^(.*?)(\d+)$')
+
+
+class AssetTagAllocationError(RuntimeError):
+    """Raised when no free block of tags could be found for a prefix"""
+
+
+class AssetTagAllocator:
+    """Utility class for allocating sequential asset tags"""
+
+    @staticmethod
+    def format_tag(prefix, number, width=None):
+        """Format a tag number, e.g. ("SG-R", 7, 3) -> "SG-R007" """
+        if width:
+            return f"{prefix}{number:0{width}d}"
+        return f"{prefix}{number}"
+
+    @staticmethod
+    def peek(db_session, prefix):
+        """
+        Return the next number for a prefix without reserving it.
+
+        Args:
+            db_session: SQLAlchemy session (or engine) for the inventory database
+            prefix: Tag prefix including any separator, e.g. "SG-"
+
+        Returns:
+            int: The number the next reservation would start at
+        """
+        engine = _get_engine(db_session)
+        key = _sequence_key(prefix)
+        _ensure_sequence(engine, key)
+
+        table = AssetTagSequence.__table__
+        with engine.connect() as conn:
+            last_value = conn.execute(
+                select(table.c.last_value).where(table.c.prefix == key)
+            ).scalar_one()
+        return last_value + 1
+
+    @staticmethod
+    def peek_tags(db_session, prefix, count=1, width=None):
+        """
+        Return the next `count` unused tags for a prefix without reserving them.
+
+        This is what forms show as a suggestion; the counter only moves when
+        an asset is actually created (see reserve and claim), so two users can
+        be shown the same suggestion. The second save is then rejected by the
+        duplicate asset tag check, and the user has to take a new suggestion.
+
+        Args:
+            db_session: SQLAlchemy session for the inventory database
+            prefix: Tag prefix including any separator, e.g. "SG-"
+            count: Number of tags needed
+            width: Optional zero-padding width for the numeric part
+
+        Returns:
+            list: Formatted tags in ascending order
+        """
+        count = int(count)
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        if count > MAX_RESERVATION:
+            raise ValueError(f"Cannot reserve more than {MAX_RESERVATION} tags at once")
+
+        tags = []
+        number = AssetTagAllocator.peek(db_session, prefix)
+        for _ in range(MAX_COLLISION_ROUNDS):
+            needed = count - len(tags)
+            candidates = [AssetTagAllocator.format_tag(prefix, n, width) for n in range(number, number + needed)]
+            number += needed
+
+            taken = _existing_tags(db_session, candidates)
+            tags.extend(c for c in candidates if c.lower() not in taken)
+            if len(tags) == count:
+                return tags
+
+        raise AssetTagAllocationError(f"Could not find {count} free asset tags for prefix {prefix}")
+
+    @staticmethod
+    def claim(connection, tags):
+        """
+        Move the counters past tags that are being saved.
+
+        Called from the transaction that inserts the assets, so a tag the user
+        accepted from peek_tags (or typed in) is never handed out again. The
+        counter never moves backwards, and prefixes without a counter row yet
+        are left alone: their first reservation scans the existing tags.
+
+        Args:
+            connection: Connection of the inserting transaction
+            tags: Asset tags being inserted
+        """
+        highest = {}
+        for tag in tags:
+            match = TAG_NUMBER_PATTERN.match((tag or '').strip())
+            if not match or not match.group(1) or len(match.group(1)) > 20:
+                continue
+            key = match.group(1).upper()
+            highest[key] = max(highest.get(key, 0), int(match.group(2)))
+
+        table = AssetTagSequence.__table__
+        for key, number in highest.items():
+            connection.execute(
+                update(table)
+                .where(table.c.prefix == key, table.c.last_value < number)
+                .values(last_value=number, updated_at=datetime.utcnow())
+            )
+
+    @staticmethod
+    def reserve_range(db_session, prefix, count=1):
+        """
+        Atomically reserve a contiguous block of numbers for a prefix.
+
+        The reservation is committed immediately in its own transaction so the
+        counter row is locked only for the duration of the UPDATE. Numbers that
+        end up unused (e.g. the caller's insert fails) are simply skipped.
+
+        Call this before the caller's session has written anything: on SQLite
+        a pending write in the caller's session would block the counter update.
+
+        Args:
+            db_session: SQLAlchemy session (or engine) for the inventory database
+            prefix: Tag prefix including any separator, e.g. "SG-"
+            count: How many numbers to reserve
+
+        Returns:
+            tuple: (first, last) numbers of the reserved block, inclusive
+        """
+        count = int(count)
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        if count > MAX_RESERVATION:
+            raise ValueError(f"Cannot reserve more than {MAX_RESERVATION} tags at once")
+
+        engine = _get_engine(db_session)
+        key = _sequence_key(prefix)
+        _ensure_sequence(engine, key)
+
+        table = AssetTagSequence.__table__
+        with engine.begin() as conn:
+            # The UPDATE takes the row lock; reading back inside the same
+            # transaction sees our own increment and nobody else's.
+            conn.execute(
+                update(table)
+                .where(table.c.prefix == key)
+                .values(last_value=table.c.last_value + count, updated_at=datetime.utcnow())
+            )
+            last_value = conn.execute(
+                select(table.c.last_value).where(table.c.prefix == key)
+            ).scalar_one()
+
+        return last_value - count + 1, last_value
+
+    @staticmethod
+    def reserve(db_session, prefix, count=1, width=None):
+        """
+        Reserve `count` unused asset tags for a prefix.
+
+        Tags typed in by hand can sit ahead of the counter, so the reserved
+        block is checked against existing assets with a single query and any
+        collisions are replaced by reserving further numbers.
+
+        Args:
+            db_session: SQLAlchemy session for the inventory database
+            prefix: Tag prefix including any separator, e.g. "SG-"
+            count: Number of tags needed
+            width: Optional zero-padding width for the numeric part
+
+        Returns:
+            list: Formatted tags in ascending order
+        """
+        tags = []
+        needed = count
+        for _ in range(MAX_COLLISION_ROUNDS):
+            first, last = AssetTagAllocator.reserve_range(db_session, prefix, needed)
+            candidates = [AssetTagAllocator.format_tag(prefix, n, width) for n in range(first, last + 1)]
+
+            taken = _existing_tags(db_session, candidates)
+            if taken:
+                logger.warning(f"Asset tag allocator skipped {len(taken)} existing tag(s) for prefix {prefix}")
+
+            tags.extend(c for c in candidates if c.lower() not in taken)
+            needed = count - len(tags)
+            if needed == 0:
+                return tags
+
+        raise AssetTagAllocationError(f"Could not allocate {count} free asset tags for prefix {prefix}")
+
+    @staticmethod
+    def resync(db_session, prefix):
+        """
+        Move the counter past the highest existing tag for a prefix.
+
+        Useful after importing assets with explicit tags. The counter never
+        moves backwards.
+
+        Returns:
+            int: The counter value after resyncing
+        """
+        engine = _get_engine(db_session)
+        key = _sequence_key(prefix)
+        _ensure_sequence(engine, key)
+
+        highest = _scan_highest_number(engine, prefix)
+        table = AssetTagSequence.__table__
+        with engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.prefix == key, table.c.last_value < highest)
+                .values(last_value=highest, updated_at=datetime.utcnow())
+            )
+            return conn.execute(
+                select(table.c.last_value).where(table.c.prefix == key)
+            ).scalar_one()
+
+
+def _get_engine(db_session):
+    """Accept either a Session or an Engine"""
+    if isinstance(db_session, Engine):
+        return db_session
+    return db_session.get_bind()
+
+
+def _sequence_key(prefix):
+    prefix = (prefix or '').strip()
+    if not prefix:
+        raise ValueError("Asset tag prefix is required")
+    if len(prefix) > 20:
+        raise ValueError("Asset tag prefix is too long")
+    return prefix.upper()
+
+
+def _existing_tags(db_session, candidates):
+    """Lower-cased candidates that are already used by an asset"""
+    return {
+        tag.lower() for (tag,) in db_session.query(Asset.asset_tag).filter(
+            func.lower(Asset.asset_tag).in_([c.lower() for c in candidates])
+        ).all() if tag
+    }
+
+
+def _scan_highest_number(engine, prefix):
+    """Find the highest number in use for a prefix by scanning existing tags"""
+    pattern = re.compile(rf'^{re.escape(prefix)}(\d+)$', re.IGNORECASE)
+    escaped = prefix.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    assets = Asset.__table__
+    highest = 0
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(assets.c.asset_tag).where(
+                func.lower(assets.c.asset_tag).like(f'{escaped}%', escape='\\')
+            )
+        )
+        for (tag,) in rows:
+            if not tag:
+                continue
+            match = pattern.match(tag.strip())
+            if match:
+                highest = max(highest, int(match.group(1)))
+    return highest
+
+
+def _ensure_sequence(engine, key):
+    """Create the counter row for a prefix, backfilling from existing tags"""
+    table = AssetTagSequence.__table__
+    with engine.connect() as conn:
+        exists = conn.execute(
+            select(table.c.prefix).where(table.c.prefix == key)
+        ).first()
+    if exists:
+        return
+
+    highest = _scan_highest_number(engine, key)
+    try:
+        with engine.begin() as conn:
+            conn.execute(table.insert().values(
+                prefix=key,
+                last_value=highest,
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            ))
+        logger.info(f"Initialized asset tag sequence {key} at {highest}")
+    except IntegrityError:
+        # Another worker backfilled the same prefix first
+        pass
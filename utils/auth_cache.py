@@ -0,0 +1,292 @@
+"""
+Auth context cache for the token-authenticated APIs.
+
+mobile_auth_required, require_jwt_auth (/mobile JSON API), dual_auth_required
+(/api/v2) and the inventory API used to load the User, its company, its
+permission row and its countries on every request. They now share this
+cache of immutable UserSnapshot objects keyed by (user_id, token_version):
+
+- Tokens carry the user's token_version as the 'tv' claim (tokens issued
+  before this change have none and count as version 0).
+- A password change, deactivation, role change or company change bumps
+  users.token_version (models/user.py), so every token issued before it is
+  rejected - by the snapshot loader - and the old cache key is never hit
+  again.
+- Other edits of a user, of their country permissions or of a Permission
+  row evict the affected snapshots after commit in this process. Other
+  processes pick them up within AUTH_CACHE_TTL_SECONDS.
+
+Views receive an AuthUser: snapshot fields cost nothing, any other User
+attribute or method (preferences, check_password, get_accessible_queue_ids
+...) loads the full User once per request, detached, as before.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+
+from models.enums import UserType
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+AUTH_CACHE_TTL_SECONDS = 60
+AUTH_CACHE_MAX_ENTRIES = 4096
+
+_cache = OrderedDict()  # (user_id, token_version) -> (expires_at, UserSnapshot)
+_lock = threading.Lock()
+
+
+class PermissionSnapshot:
+    """Read-only copy of a Permission row: permissions.can_edit_assets etc."""
+    __slots__ = ('_values',)
+
+    def __init__(self, values):
+        object.__setattr__(self, '_values', MappingProxyType(dict(values)))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('PermissionSnapshot is read-only')
+
+    def __dir__(self):
+        return list(self._values)
+
+
+@dataclass(frozen=True)
+class CompanyRef:
+    id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """What the API decorators and most views need to know about a user"""
+    id: int
+    username: str
+    email: str
+    user_type: UserType
+    role: str
+    company_id: int
+    company: CompanyRef
+    assigned_country: str
+    assigned_countries: tuple
+    permissions: PermissionSnapshot
+    token_version: int
+
+    @property
+    def full_name(self):
+        return self.username
+
+    @property
+    def is_super_admin(self):
+        return self.user_type == UserType.SUPER_ADMIN
+
+    @property
+    def is_developer(self):
+        return self.user_type == UserType.DEVELOPER
+
+    @property
+    def is_admin(self):
+        return self.user_type in (UserType.SUPER_ADMIN, UserType.DEVELOPER, UserType.COUNTRY_ADMIN)
+
+    @property
+    def is_country_admin(self):
+        return self.user_type == UserType.COUNTRY_ADMIN
+
+    @property
+    def is_supervisor(self):
+        return self.user_type == UserType.SUPERVISOR
+
+    @property
+    def is_client(self):
+        return self.user_type == UserType.CLIENT
+
+
+_SNAPSHOT_ATTRIBUTES = frozenset(
+    [f.name for f in fields(UserSnapshot)]
+    + [name for name, value in vars(UserSnapshot).items() if isinstance(value, property)]
+)
+
+
+class AuthUser:
+    """
+    The authenticated user of one request.
+
+    Snapshot attributes are answered from the shared UserSnapshot; anything
+    else is read from the full User, loaded on first use.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._user = None
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name in _SNAPSHOT_ATTRIBUTES:
+            return getattr(self.snapshot, name)
+        return getattr(self.load_user(), name)
+
+    def load_user(self):
+        """The full User row (detached, company loaded)"""
+        if self._user is None:
+            from utils.db_manager import DatabaseManager
+            from models.user import User
+
+            db_session = DatabaseManager().get_session()
+            try:
+                self._user = db_session.query(User).options(
+                    joinedload(User.company)
+                ).filter(User.id == self.snapshot.id).first()
+            finally:
+                db_session.close()
+            logger.debug(f"Loaded full user {self.snapshot.id} for this request")
+        return self._user
+
+    def __repr__(self):
+        return f'<AuthUser {self.snapshot.username}>'
+
+
+def load_snapshot(db_session, user_id):
+    """
+    Build a UserSnapshot from the database.
+
+    Returns:
+        UserSnapshot, or None for unknown and deleted users
+    """
+    from models.user import User
+    from models.permission import Permission
+    from models.user_country_permission import UserCountryPermission
+
+    user = db_session.query(User).options(
+        joinedload(User.company)
+    ).filter(User.id == user_id).first()
+    if not user or user.is_deleted:
+        return None
+
+    permission = db_session.query(Permission).filter_by(user_type=user.user_type).first()
+    if permission is None:
+        permission = user.permissions  # Creates the defaults for a new user type
+    columns = Permission.__mapper__.column_attrs
+    countries = db_session.query(UserCountryPermission.country).filter(
+        UserCountryPermission.user_id == user.id
+    ).all()
+
+    return UserSnapshot(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        user_type=user.user_type,
+        role=user.role,
+        company_id=user.company_id,
+        company=CompanyRef(user.company.id, user.company.name) if user.company else None,
+        assigned_country=user.assigned_country,
+        assigned_countries=tuple(country for country, in countries),
+        permissions=PermissionSnapshot({c.key: getattr(permission, c.key) for c in columns}) if permission else None,
+        token_version=user.token_version or 0,
+    )
+
+
+def get_auth_user(user_id, token_version=0, db_session=None):
+    """
+    The AuthUser for a verified token.
+
+    Args:
+        user_id: 'user_id' claim of the token
+        token_version: 'tv' claim of the token (0 for older tokens)
+        db_session: Optional existing database session for a cache miss
+
+    Returns:
+        AuthUser, or None if the user is unknown, deleted, or the token was
+        revoked by a later token_version
+    """
+    key = (user_id, token_version or 0)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now:
+            _cache.move_to_end(key)
+            return AuthUser(entry[1])
+
+    session_provided = db_session is not None
+    if not session_provided:
+        from utils.db_manager import DatabaseManager
+        db_session = DatabaseManager().get_session()
+    try:
+        snapshot = load_snapshot(db_session, user_id)
+    finally:
+        if not session_provided:
+            db_session.close()
+
+    if snapshot is None:
+        return None
+    if snapshot.token_version != key[1]:
+        logger.info(f"Rejected token version {key[1]} for user {user_id} (current {snapshot.token_version})")
+        return None
+
+    with _lock:
+        _cache[key] = (now + AUTH_CACHE_TTL_SECONDS, snapshot)
+        _cache.move_to_end(key)
+        while len(_cache) > AUTH_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return AuthUser(snapshot)
+
+
+def invalidate_user(user_id):
+    """Drop every cached snapshot of user_id"""
+    with _lock:
+        for key in [key for key in _cache if key[0] == user_id]:
+            del _cache[key]
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+# Eviction on commit. Bulk query().update() calls bypass the flush and are
+# only picked up when the TTL expires.
+
+def _pending(session):
+    return session.info.setdefault('auth_cache_evict', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table == 'users' and obj.id is not None:
+            _pending(session).add(obj.id)
+        elif table == 'user_country_permissions' and obj.user_id is not None:
+            _pending(session).add(obj.user_id)
+        elif table == 'permissions':
+            _pending(session).add(None)  # Shared by every user of the type
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_changed_users(session):
+    user_ids = session.info.pop('auth_cache_evict', None)
+    if not user_ids:
+        return
+    if None in user_ids:
+        clear()
+        return
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changed_users(session, previous_transaction):
+    # A rolled back savepoint leaves the outer transaction's changes to commit
+    if previous_transaction.parent is None:
+        session.info.pop('auth_cache_evict', None)
@@ -0,0 +1,470 @@
+"""
+In-memory autocomplete index for the typeahead endpoints.
+
+The @mention picker, the user search, the customer picker on the ticket
+form and the header search used to run ILIKE '%term%' over users, groups,
+customers and assets on every keystroke. Each process now keeps a sorted
+(key, id) array per source and answers a prefix with a binary search:
+
+    ids = autocomplete.search(db_session, 'customers', 'ali', limit=5,
+                              allowed=autocomplete.scope(('customers', user.id), load_ids))
+
+Keys are the lowercased values and each of their words, so "ali" finds
+"Alice Tan", "Tan Alice" and "alice.tan@example.com" (word-prefix matching,
+not arbitrary substrings). The index follows the database through the
+autocomplete_changes log (models/autocomplete_change.py): at most every
+POLL_SECONDS a request applies the changes logged since the version it
+last saw, reloading only the touched rows (changes of the last
+SAFETY_SECONDS are read again, in case a slower transaction committed them
+late). It is rebuilt from scratch every FULL_RELOAD_SECONDS, and whenever
+too many changes piled up; the periodic rebuild also prunes change log rows
+older than CHANGE_RETENTION_DAYS.
+
+Permission filters are plain id sets loaded by the caller and cached per
+key until a change to one of the tables they are computed from
+(SCOPE_TABLES) is applied. Set AUTOCOMPLETE_INDEX=0 to keep the routes on
+their SQL queries.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from models.autocomplete_change import AutocompleteChange
+from models.company import Company
+from models.customer_user import CustomerUser
+from models.group import Group
+from models.group_membership import GroupMembership
+from models.user import User
+from models.asset import Asset
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+USE_INDEX = os.environ.get('AUTOCOMPLETE_INDEX', '1') != '0'
+POLL_SECONDS = 2
+FULL_RELOAD_SECONDS = 600
+MAX_CHANGES = 5000  # More pending changes than this: rebuild instead
+SAFETY_SECONDS = 30  # Changes this recent are read again (ids are taken before commit)
+CHANGE_RETENTION_DAYS = 1
+
+_WORD = re.compile(r'[0-9a-z]+')
+
+
+def _keys(*values):
+    """Lowercased values plus their words (one letter words are skipped)"""
+    keys = set()
+    for value in values:
+        if not value:
+            continue
+        value = str(value).lower().strip()
+        keys.add(value)
+        keys.update(word for word in _WORD.findall(value) if len(word) > 1)
+    keys.discard('')
+    return keys
+
+
+def _email_keys(email):
+    """The address and the words of its local part (not the shared domain)"""
+    if not email:
+        return set()
+    return {email.lower().strip()} | _keys(email.split('@')[0])
+
+
+class PrefixIndex:
+    """Sorted (key, id) pairs searched by prefix"""
+
+    def __init__(self):
+        self._pairs = []
+        self._keys_by_id = {}
+
+    def __len__(self):
+        return len(self._keys_by_id)
+
+    def load(self, entries):
+        """
+        Replace the content.
+
+        Args:
+            entries: Iterable of (id, keys)
+        """
+        self._keys_by_id = {row_id: frozenset(keys) for row_id, keys in entries}
+        self._pairs = sorted((key, row_id) for row_id, keys in self._keys_by_id.items() for key in keys)
+
+    def put(self, row_id, keys):
+        keys = frozenset(keys)
+        if self._keys_by_id.get(row_id) == keys:
+            return
+        self.remove(row_id)
+        self._keys_by_id[row_id] = keys
+        for key in keys:
+            insort(self._pairs, (key, row_id))
+
+    def remove(self, row_id):
+        for key in self._keys_by_id.pop(row_id, ()):
+            position = bisect_left(self._pairs, (key, row_id))
+            if position < len(self._pairs) and self._pairs[position] == (key, row_id):
+                del self._pairs[position]
+
+    def search(self, prefix, limit, allowed=None):
+        """
+        Ids with a key starting with prefix, in key order.
+
+        Args:
+            prefix: Lowercased prefix ('' matches everything)
+            limit: Maximum number of ids
+            allowed: Optional set of permitted ids
+
+        Returns:
+            list: Distinct ids
+        """
+        found = []
+        seen = set()
+        pairs = self._pairs
+        for position in range(bisect_left(pairs, (prefix,)), len(pairs)):
+            key, row_id = pairs[position]
+            if not key.startswith(prefix):
+                break
+            if row_id in seen or (allowed is not None and row_id not in allowed):
+                continue
+            seen.add(row_id)
+            found.append(row_id)
+            if len(found) >= limit:
+                break
+        return found
+
+
+def _load_users(db_session, ids=None):
+    query = select(User.id, User.username, User.email, User.is_deleted)
+    if ids is not None:
+        query = query.where(User.id.in_(ids))
+    return {row.id: {'id': row.id, 'username': row.username, 'email': row.email,
+                     'is_deleted': bool(row.is_deleted)}
+            for row in db_session.execute(query)}
+
+
+def _load_groups(db_session, ids=None):
+    members = select(GroupMembership.group_id, func.count(GroupMembership.id).label('members')).where(
+        GroupMembership.is_active == True
+    ).group_by(GroupMembership.group_id).subquery()
+    query = select(Group.id, Group.name, Group.description, func.coalesce(members.c.members, 0)).outerjoin(
+        members, members.c.group_id == Group.id
+    ).where(Group.is_active == True)
+    if ids is not None:
+        query = query.where(Group.id.in_(ids))
+    return {row[0]: {'id': row[0], 'name': row[1], 'description': row[2], 'member_count': row[3]}
+            for row in db_session.execute(query)}
+
+
+def _load_customers(db_session, ids=None):
+    query = select(CustomerUser.id, CustomerUser.name, CustomerUser.email, CustomerUser.contact_number,
+                   CustomerUser.address, Company.name).outerjoin(Company, CustomerUser.company_id == Company.id)
+    if ids is not None:
+        query = query.where(CustomerUser.id.in_(ids))
+    return {row[0]: {'id': row[0], 'name': row[1], 'email': row[2], 'contact_number': row[3],
+                     'address': row[4], 'company': row[5]}
+            for row in db_session.execute(query)}
+
+
+def _load_assets(db_session, ids=None):
+    query = select(Asset.id, Asset.asset_tag, Asset.serial_num, Asset.name, Asset.model)
+    if ids is not None:
+        query = query.where(Asset.id.in_(ids))
+    return {row.id: {'id': row.id, 'asset_tag': row.asset_tag, 'serial_num': row.serial_num,
+                     'name': row.name, 'model': row.model}
+            for row in db_session.execute(query)}
+
+
+# Source -> (loader, keys of a row); a source holds the rows its loader returns
+SOURCES = {
+    # @mentions match usernames only, deleted users included (as before)
+    'usernames': (_load_users, lambda row: _keys(row['username'])),
+    'users': (_load_users, lambda row: set() if row['is_deleted']
+              else _keys(row['username']) | _email_keys(row['email'])),
+    'groups': (_load_groups, lambda row: _keys(row['name'])),
+    'customers': (_load_customers, lambda row: _keys(row['name'], row['contact_number'], row['address'],
+                                                     row['company']) | _email_keys(row['email'])),
+    'assets': (_load_assets, lambda row: _keys(row['asset_tag'], row['serial_num'], row['name'], row['model'])),
+}
+
+# Changed table -> (sources holding its rows, sources reloaded whole)
+TABLE_SOURCES = {
+    'users': (('usernames', 'users'), ()),
+    'groups': (('groups',), ()),
+    'group_memberships': ((), ('groups',)),
+    'customer_users': (('customers',), ()),
+    'companies': ((), ('customers',)),
+    'assets': (('assets',), ()),
+}
+
+# Scope kind (first item of the key) -> tables its id set is computed from;
+# scopes of other kinds are dropped with every change batch
+SCOPE_TABLES = {
+    'mention_users': ('user_mention_permissions',),
+    'mention_groups': ('user_mention_permissions',),
+    'assets': ('assets', 'users', 'companies', 'user_company_permissions', 'user_country_permissions'),
+    'customers': ('customer_users', 'users', 'companies', 'user_company_permissions',
+                  'company_customer_permissions'),
+    'company_customers': ('customer_users',),
+}
+
+
+class AutocompleteIndex:
+    """Per-process prefix indexes over the autocomplete sources"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indexes = {source: PrefixIndex() for source in SOURCES}
+        self._rows = {source: {} for source in SOURCES}
+        self._scopes = {}
+        self.version = None
+        self._recent = set()
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    def reset(self):
+        with self._lock:
+            self.__init__()
+
+    def _put(self, source, rows, ids=None):
+        """Store loaded rows; ids that were asked for but not returned are removed"""
+        index = self._indexes[source]
+        for row_id in (ids or ()):
+            if row_id not in rows:
+                index.remove(row_id)
+                self._rows[source].pop(row_id, None)
+        keys = SOURCES[source][1]
+        for row_id, row in rows.items():
+            index.put(row_id, keys(row))
+            self._rows[source][row_id] = row
+
+    def _load_all(self, db_session):
+        version = db_session.execute(select(func.coalesce(func.max(AutocompleteChange.id), 0))).scalar()
+        for source, (loader, keys) in SOURCES.items():
+            rows = loader(db_session)
+            self._rows[source] = rows
+            self._indexes[source].load((row_id, keys(row)) for row_id, row in rows.items())
+        self._scopes.clear()
+        self.version = version
+        self._recent = set()
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded autocomplete index at version {version}: "
+                    + ", ".join(f"{source}={len(index)}" for source, index in self._indexes.items()))
+
+    def _apply(self, db_session):
+        # A transaction that started earlier can commit a lower id after a
+        # higher one was applied, so recent rows are read until they age out
+        cutoff = datetime.utcnow() - timedelta(seconds=SAFETY_SECONDS)
+        rows = db_session.execute(
+            select(AutocompleteChange.id, AutocompleteChange.table_name, AutocompleteChange.row_id,
+                   AutocompleteChange.created_at)
+            .where(or_(AutocompleteChange.id > self.version, AutocompleteChange.created_at >= cutoff))
+            .order_by(AutocompleteChange.id)
+            .limit(MAX_CHANGES + 1)
+        ).all()
+        if len(rows) > MAX_CHANGES:
+            self._load_all(db_session)
+            return
+        changes = [row for row in rows if row[0] not in self._recent]
+        self._recent = {row[0] for row in rows if row[3] >= cutoff}
+        if not changes:
+            return
+
+        reload_sources = set()
+        changed_ids = {}
+        for _, table_name, row_id, _ in changes:
+            row_sources, whole_sources = TABLE_SOURCES.get(table_name, ((), ()))
+            reload_sources.update(whole_sources)
+            for source in row_sources:
+                if row_id is None:
+                    reload_sources.add(source)
+                else:
+                    changed_ids.setdefault(source, set()).add(row_id)
+
+        loaded = {}
+        for source in reload_sources:
+            loader, keys = SOURCES[source]
+            if loader not in loaded:
+                loaded[loader] = loader(db_session)
+            rows = loaded[loader]
+            self._rows[source] = dict(rows)
+            self._indexes[source].load((row_id, keys(row)) for row_id, row in rows.items())
+        for source, ids in changed_ids.items():
+            if source in reload_sources:
+                continue
+            loader = SOURCES[source][0]
+            rows = loader(db_session, sorted(ids))
+            self._put(source, rows, ids)
+
+        changed_tables = {table_name for _, table_name, _, _ in changes}
+        for key in list(self._scopes):
+            tables = SCOPE_TABLES.get(key[0]) if isinstance(key, tuple) else None
+            if tables is None or changed_tables.intersection(tables):
+                del self._scopes[key]
+        self.version = max(self.version, changes[-1][0])
+        logger.debug(f"Applied {len(changes)} autocomplete changes, now at version {self.version}")
+
+    def refresh(self, db_session, force=False):
+        """
+        Bring the index up to date with the change log.
+
+        Args:
+            db_session: Session used to read the change log and changed rows
+            force: Check for changes even inside POLL_SECONDS
+        """
+        now = time.monotonic()
+        if not force and self.version is not None and now - self._checked_at < POLL_SECONDS:
+            return
+        with self._lock:
+            if self.version is None or now - self._loaded_at >= FULL_RELOAD_SECONDS:
+                periodic = self.version is not None
+                self._load_all(db_session)
+                if periodic:
+                    try:
+                        prune_changes(db_session)
+                    except Exception as e:
+                        logger.warning(f"Could not prune autocomplete changes: {str(e)}")
+            else:
+                self._apply(db_session)
+            self._checked_at = now
+
+    def search(self, db_session, source, prefix, limit=10, allowed=None):
+        """
+        Rows of a source with a key starting with prefix.
+
+        Args:
+            db_session: Session used if the index has to be refreshed
+            source: Key of SOURCES
+            prefix: Typed text (matched case-insensitively)
+            limit: Maximum number of rows
+            allowed: Optional set of permitted ids
+
+        Returns:
+            list: Row dicts, in key order
+        """
+        self.refresh(db_session)
+        with self._lock:
+            ids = self._indexes[source].search((prefix or '').lower().strip(), limit, allowed)
+            return [self._rows[source][row_id] for row_id in ids]
+
+    def scope(self, key, loader):
+        """
+        A cached permission id set, loaded again once one of its SCOPE_TABLES changed.
+
+        Args:
+            key: Hashable cache key, e.g. ('assets', user_id); the first item
+                selects the SCOPE_TABLES
+            loader: Callable returning the id set (None for "no restriction")
+        """
+        with self._lock:
+            if key in self._scopes:
+                return self._scopes[key]
+        ids = loader()
+        if ids is not None:
+            ids = frozenset(ids)
+        with self._lock:
+            self._scopes[key] = ids
+        return ids
+
+
+autocomplete = AutocompleteIndex()
+
+
+def query_ids(query):
+    """Scope loader for a Query whose first column is the id"""
+    return lambda: {row[0] for row in query}
+
+
+def mention_suggestions(db_session, user_id, query):
+    """
+    Users and active groups for the @mention pickers.
+
+    Args:
+        db_session: Database session
+        user_id: Id of the user typing (their mention permissions apply)
+        query: Typed text after the @
+
+    Returns:
+        list: Suggestion dicts (type, id, name, display_name, ...), exact
+        matches first, then prefix matches, at most 20
+    """
+    from models.user_mention_permission import UserMentionPermission
+
+    query = (query or '').lower().strip()
+    filter_enabled = db_session.execute(
+        select(User.mention_filter_enabled).where(User.id == user_id)
+    ).scalar()
+    allowed_user_ids = allowed_group_ids = None
+    if filter_enabled:
+        permissions = db_session.query(UserMentionPermission.target_id).filter_by(user_id=user_id)
+        allowed_user_ids = autocomplete.scope(('mention_users', user_id), query_ids(
+            permissions.filter(UserMentionPermission.target_type == 'user')
+        ))
+        allowed_group_ids = autocomplete.scope(('mention_groups', user_id), query_ids(
+            permissions.filter(UserMentionPermission.target_type == 'group')
+        ))
+
+    suggestions = []
+    for user in autocomplete.search(db_session, 'usernames', query, 10, allowed_user_ids):
+        suggestions.append({
+            'type': 'user',
+            'id': user['id'],
+            'name': user['username'],
+            'display_name': user['username'],
+            'email': user['email'],
+            'avatar': user['username'][0].upper() if user['username'] else 'U'
+        })
+    for group in autocomplete.search(db_session, 'groups', query, 10, allowed_group_ids):
+        suggestions.append({
+            'type': 'group',
+            'id': group['id'],
+            'name': group['name'],
+            'display_name': f"@{group['name']}",
+            'description': group['description'] or f"Group with {group['member_count']} members",
+            'member_count': group['member_count'],
+            'avatar': 'G'
+        })
+
+    def sort_key(item):
+        name = item['name'].lower()
+        if name == query:
+            return (0, name)
+        elif name.startswith(query):
+            return (1, name)
+        else:
+            return (2, name)
+
+    suggestions.sort(key=sort_key)
+    return suggestions[:20]
+
+
+def prune_changes(bind, days=CHANGE_RETENTION_DAYS):
+    """
+    Delete change log rows older than the retention window (processes
+    that fell further behind rebuild their index anyway).
+
+    Runs in a transaction of its own, so the caller's session is left as
+    it was.
+
+    Args:
+        bind: Engine (or Session) of the change log
+        days: Retention window
+
+    Returns:
+        int: Number of rows deleted
+    """
+    engine = bind.get_bind() if isinstance(bind, Session) else bind
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    with engine.begin() as conn:
+        deleted = conn.execute(
+            delete(AutocompleteChange.__table__).where(AutocompleteChange.created_at < cutoff)
+        ).rowcount
+    if deleted:
+        logger.info(f"Pruned {deleted} autocomplete changes older than {days} days")
+    return deleted
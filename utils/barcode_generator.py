@@ -2,6 +2,16 @@
 """
 Barcode Generator for Asset Labels
 Generates barcodes and printable labels for assets with serial numbers and company information.
+
+Rendering is cached at three levels:
+- Fonts and the blank label template are loaded once per process
+- Barcode rasters are kept in an LRU keyed by serial number
+- Finished labels are stored as PNGs under uploads/labels, keyed by a hash
+  of the printed fields, so a label is re-rendered only when the asset's
+  printed data changes
+
+render_label_sheet() lays many labels out on A4 pages (PDF or PNG) and
+renders uncached labels in parallel worker processes.
 """
 
 import barcode
@@ -9,18 +19,358 @@ from barcode.writer import ImageWriter
 from PIL import Image, ImageDraw, ImageFont
 import io
 import base64
+import hashlib
+import logging
+import tempfile
+from functools import lru_cache
 from flask import render_template_string
 import os
 
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Bump when the label layout changes so cached labels are re-rendered
+LABEL_VERSION = '1'
+
+# Label size: 5cm x 9cm (portrait orientation)
+# At ~150 DPI: 5cm = 295px, 9cm = 531px
+LABEL_WIDTH = 295
+LABEL_HEIGHT = 531
+LABEL_DPI = 150
+
+# A4 at LABEL_DPI, with 4 x 3 labels per page
+SHEET_WIDTH = 1240
+SHEET_HEIGHT = 1754
+SHEET_COLUMNS = 4
+SHEET_ROWS = 3
+
+BARCODE_WIDTH = 450
+BARCODE_HEIGHT = 70
+BARCODE_CACHE_SIZE = int(os.environ.get('LABEL_BARCODE_CACHE_SIZE', 2048))
+
+LABEL_CACHE_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads', 'labels'
+)
+LABEL_WORKERS = int(os.environ.get('LABEL_WORKERS', min(4, os.cpu_count() or 1)))
+# Below this many uncached labels, process start-up costs more than it saves
+PARALLEL_THRESHOLD = 24
+
+FONT_PATHS = [
+    "/System/Library/Fonts/Arial.ttf",  # macOS
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Linux
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",  # Linux alt
+    "C:/Windows/Fonts/arial.ttf",  # Windows
+]
+
+
+@lru_cache(maxsize=1)
+def load_fonts():
+    """
+    Resolve and load the label fonts once per process.
+
+    Returns:
+        tuple: (title_font, text_font, label_font)
+    """
+    for font_path in FONT_PATHS:
+        try:
+            return (
+                ImageFont.truetype(font_path, 20),
+                ImageFont.truetype(font_path, 16),
+                ImageFont.truetype(font_path, 14),
+            )
+        except OSError:
+            continue
+    logger.warning("No TrueType font found for labels, using the default bitmap font")
+    default = ImageFont.load_default()
+    return default, default, default
+
+
+@lru_cache(maxsize=1)
+def _label_template():
+    """Blank landscape label canvas with the border drawn"""
+    content_width, content_height = LABEL_HEIGHT, LABEL_WIDTH
+    template = Image.new('RGB', (content_width, content_height), 'white')
+    ImageDraw.Draw(template).rectangle([0, 0, content_width - 1, content_height - 1], outline='black', width=2)
+    return template
+
+
+@lru_cache(maxsize=BARCODE_CACHE_SIZE)
+def barcode_raster(serial_number, width=BARCODE_WIDTH, height=BARCODE_HEIGHT):
+    """
+    Code 128 barcode for a serial number, resized for the label.
+
+    Cached per process; callers must not modify the returned image.
+
+    Returns:
+        PIL.Image or None if the serial can't be encoded
+    """
+    image = _render_barcode(serial_number)
+    if image is None:
+        return None
+    return image.resize((width, height))
+
+
+def _render_barcode(serial_number):
+    try:
+        barcode_class = barcode.get_barcode_class('code128')
+        barcode_instance = barcode_class(serial_number, writer=ImageWriter())
+        # Render straight to a PIL image instead of a PNG round trip
+        return barcode_instance.render(writer_options={
+            'module_width': 0.2,
+            'module_height': 15.0,
+            'quiet_zone': 6.5,
+            'font_size': 10,
+            'text_distance': 5.0,
+            'background': 'white',
+            'foreground': 'black',
+        })
+    except Exception as e:
+        logger.info(f"Error generating barcode for {serial_number}: {str(e)}")
+        return None
+
+
+def label_fields(asset):
+    """
+    The printed fields of an asset's label.
+
+    Plain data, so it can be hashed for the label cache and sent to worker
+    processes.
+    """
+    company_name = "Unknown Company"
+    if hasattr(asset, 'company') and asset.company:
+        company_name = asset.company.grouped_display_name
+    elif hasattr(asset, 'customer') and asset.customer:
+        company_name = asset.customer
+
+    return {
+        'company_name': company_name,
+        'asset_tag': asset.asset_tag or None,
+        'serial_num': asset.serial_num,
+        'name': getattr(asset, 'name', None) or None,
+    }
+
+
+def label_cache_key(fields):
+    """Content hash of the printed fields (changes whenever the label would)"""
+    payload = '\x1f'.join([LABEL_VERSION] + [str(fields.get(key) or '') for key in
+                                              ('company_name', 'asset_tag', 'serial_num', 'name')])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_label(fields):
+    """
+    Draw a label from label_fields().
+    Content is rotated 90° for reading when label is held sideways
+
+    Returns:
+        PIL.Image: Complete label image (portrait orientation with rotated content)
+    """
+    barcode_image = barcode_raster(fields['serial_num'])
+    if not barcode_image:
+        return None
+
+    title_font, text_font, label_font = load_fonts()
+
+    # Create content on a landscape canvas first (height x width swapped)
+    # This will be rotated to fit the portrait label
+    content = _label_template().copy()
+    content_width, content_height = content.size
+    draw = ImageDraw.Draw(content)
+
+    # Calculate positions - content is now wider (531px) and shorter (295px)
+    y_offset = 15
+
+    # Truncate company name if too long
+    company_name = fields['company_name']
+    max_chars = 40  # More chars available in landscape
+    if len(company_name) > max_chars:
+        company_name = company_name[:max_chars-3] + "..."
+
+    # Draw company name (centered)
+    company_bbox = draw.textbbox((0, 0), company_name, font=title_font)
+    company_width = company_bbox[2] - company_bbox[0]
+    draw.text(((content_width - company_width) // 2, y_offset),
+             company_name, fill='black', font=title_font)
+    y_offset += 32
+
+    # Draw a thin separator line
+    draw.line([(30, y_offset), (content_width - 30, y_offset)], fill='gray', width=1)
+    y_offset += 12
+
+    # Add Asset Tag (if exists)
+    if fields['asset_tag']:
+        asset_tag_text = f"Asset Tag: {fields['asset_tag']}"
+        tag_bbox = draw.textbbox((0, 0), asset_tag_text, font=text_font)
+        tag_width = tag_bbox[2] - tag_bbox[0]
+        draw.text(((content_width - tag_width) // 2, y_offset),
+                 asset_tag_text, fill='black', font=text_font)
+        y_offset += 26
+
+    # Add Serial Number text
+    serial_text = f"S/N: {fields['serial_num']}"
+    serial_bbox = draw.textbbox((0, 0), serial_text, font=text_font)
+    serial_width = serial_bbox[2] - serial_bbox[0]
+    draw.text(((content_width - serial_width) // 2, y_offset),
+             serial_text, fill='black', font=text_font)
+    y_offset += 28
+
+    # Add barcode (wider now since content is landscape)
+    barcode_x = (content_width - barcode_image.width) // 2
+    content.paste(barcode_image, (barcode_x, y_offset))
+    y_offset += barcode_image.height + 12
+
+    # Add product name at bottom if space allows
+    if fields['name'] and y_offset < content_height - 25:
+        product_name = fields['name'][:45] + "..." if len(fields['name']) > 45 else fields['name']
+        name_bbox = draw.textbbox((0, 0), product_name, font=label_font)
+        name_width = name_bbox[2] - name_bbox[0]
+        draw.text(((content_width - name_width) // 2, y_offset),
+                 product_name, fill='gray', font=label_font)
+
+    # Rotate content 90 degrees counter-clockwise to fit portrait label
+    # This makes text readable when label is rotated 90° clockwise
+    return content.rotate(90, expand=True)
+
+
+def _label_cache_path(key):
+    return os.path.join(LABEL_CACHE_FOLDER, key[:2], f"{key}.png")
+
+
+def cached_label_png(fields):
+    """
+    PNG bytes of a label, from the label cache or freshly rendered and stored.
+
+    Returns:
+        bytes or None if the label can't be rendered
+    """
+    path = _label_cache_path(label_cache_key(fields))
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    data = _label_png(fields)
+    if data is not None:
+        _store_label(path, data)
+    return data
+
+
+def _label_png(fields):
+    """Render one label to PNG bytes (also the worker function for parallel rendering)"""
+    label = render_label(fields)
+    if label is None:
+        return None
+    buffer = io.BytesIO()
+    label.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _store_label(path, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.label_')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache label {path}: {str(e)}")
+
+
+def render_labels(fields_list, workers=None):
+    """
+    PNG bytes for many labels, in input order (None for labels that failed).
+
+    Cached labels are read directly; uncached ones are rendered in parallel
+    worker processes when there are enough of them.
+    """
+    results = [None] * len(fields_list)
+    missing = []
+    for index, fields in enumerate(fields_list):
+        path = _label_cache_path(label_cache_key(fields))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                results[index] = f.read()
+        else:
+            missing.append(index)
+
+    workers = min(workers or LABEL_WORKERS, len(missing))
+    if workers > 1 and len(missing) >= PARALLEL_THRESHOLD:
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+
+        try:
+            # spawn: never fork a process that holds DB connections and request threads
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                rendered = list(executor.map(_label_png, [fields_list[i] for i in missing],
+                                             chunksize=max(1, len(missing) // (workers * 4))))
+            for index, data in zip(missing, rendered):
+                results[index] = data
+                if data is not None:
+                    _store_label(_label_cache_path(label_cache_key(fields_list[index])), data)
+            return results
+        except Exception as e:
+            logger.warning(f"Parallel label rendering failed ({e}), falling back to serial rendering")
+
+    for index in missing:
+        results[index] = cached_label_png(fields_list[index])
+    return results
+
+
+def render_label_sheet(fields_list, output_format='pdf', workers=None):
+    """
+    Lay labels out on printable A4 sheets (SHEET_COLUMNS x SHEET_ROWS per page).
+
+    Args:
+        fields_list: label_fields() of each asset, in print order
+        output_format: 'pdf' (one multi-page document) or 'png' (one image per page)
+        workers: Max rendering processes (defaults to LABEL_WORKERS)
+
+    Returns:
+        tuple: (bytes for 'pdf' / list of page PNG bytes for 'png',
+                list of indexes in fields_list that could not be rendered)
+    """
+    labels = render_labels(fields_list, workers=workers)
+    failed = [index for index, data in enumerate(labels) if data is None]
+    images = [Image.open(io.BytesIO(data)) for data in labels if data is not None]
+
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+    margin_x = (SHEET_WIDTH - SHEET_COLUMNS * LABEL_WIDTH) // (SHEET_COLUMNS + 1)
+    margin_y = (SHEET_HEIGHT - SHEET_ROWS * LABEL_HEIGHT) // (SHEET_ROWS + 1)
+
+    pages = []
+    for start in range(0, len(images), per_page):
+        page = Image.new('RGB', (SHEET_WIDTH, SHEET_HEIGHT), 'white')
+        for slot, label in enumerate(images[start:start + per_page]):
+            row, column = divmod(slot, SHEET_COLUMNS)
+            x = margin_x + column * (LABEL_WIDTH + margin_x)
+            y = margin_y + row * (LABEL_HEIGHT + margin_y)
+            page.paste(label, (x, y))
+        pages.append(page)
+
+    if output_format == 'png':
+        output = []
+        for page in pages:
+            buffer = io.BytesIO()
+            page.save(buffer, format='PNG', dpi=(LABEL_DPI, LABEL_DPI))
+            output.append(buffer.getvalue())
+        return output, failed
+
+    if not pages:
+        return None, failed
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format='PDF', save_all=True, append_images=pages[1:], resolution=LABEL_DPI)
+    return buffer.getvalue(), failed
+
+
 class AssetBarcodeGenerator:
     """Generate barcodes and labels for assets"""
     
     def __init__(self):
         self.barcode_format = 'code128'  # Using Code 128 format for alphanumeric support
-        # Label size: 5cm x 9cm (portrait orientation)
-        # At ~150 DPI: 5cm = 295px, 9cm = 531px
-        self.label_width = 295
-        self.label_height = 531
+        self.label_width = LABEL_WIDTH
+        self.label_height = LABEL_HEIGHT
     
     def generate_barcode_image(self, serial_number):
         """
@@ -32,29 +382,7 @@ class AssetBarcodeGenerator:
         Returns:
             PIL.Image: Barcode image
         """
-        try:
-            # Create barcode
-            barcode_class = barcode.get_barcode_class(self.barcode_format)
-            barcode_instance = barcode_class(serial_number, writer=ImageWriter())
-            
-            # Generate barcode image in memory
-            buffer = io.BytesIO()
-            barcode_instance.write(buffer, options={
-                'module_width': 0.2,
-                'module_height': 15.0,
-                'quiet_zone': 6.5,
-                'font_size': 10,
-                'text_distance': 5.0,
-                'background': 'white',
-                'foreground': 'black',
-            })
-            buffer.seek(0)
-            
-            return Image.open(buffer)
-            
-        except Exception as e:
-            logger.info("Error generating barcode for {serial_number}: {str(e)}")
-            return None
+        return _render_barcode(serial_number)
     
     def generate_asset_label(self, asset):
         """
@@ -67,118 +395,25 @@ class AssetBarcodeGenerator:
         Returns:
             PIL.Image: Complete label image (portrait orientation with rotated content)
         """
-        try:
-            # Generate barcode using serial number
-            barcode_image = self.generate_barcode_image(asset.serial_num)
-            if not barcode_image:
-                return None
+        label_png = self.generate_label_png(asset)
+        if not label_png:
+            return None
+        return Image.open(io.BytesIO(label_png))
 
-            # Create content on a landscape canvas first (height x width swapped)
-            # This will be rotated to fit the portrait label
-            content_width = self.label_height  # 531px (will become height after rotation)
-            content_height = self.label_width  # 295px (will become width after rotation)
-
-            content = Image.new('RGB', (content_width, content_height), 'white')
-            draw = ImageDraw.Draw(content)
-
-            # Try to load fonts, fall back to default if not available
-            try:
-                # Try different font paths for different systems
-                font_paths = [
-                    "/System/Library/Fonts/Arial.ttf",  # macOS
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Linux
-                    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",  # Linux alt
-                    "C:/Windows/Fonts/arial.ttf",  # Windows
-                ]
-                title_font = None
-                for font_path in font_paths:
-                    try:
-                        title_font = ImageFont.truetype(font_path, 20)
-                        text_font = ImageFont.truetype(font_path, 16)
-                        label_font = ImageFont.truetype(font_path, 14)
-                        break
-                    except:
-                        continue
-
-                if not title_font:
-                    raise Exception("No font found")
-            except:
-                # Fallback to default font
-                title_font = ImageFont.load_default()
-                text_font = ImageFont.load_default()
-                label_font = ImageFont.load_default()
-
-            # Calculate positions - content is now wider (531px) and shorter (295px)
-            y_offset = 15
-
-            # Add company name at the top
-            company_name = "Unknown Company"
-            if hasattr(asset, 'company') and asset.company:
-                company_name = asset.company.grouped_display_name
-            elif hasattr(asset, 'customer') and asset.customer:
-                company_name = asset.customer
-
-            # Truncate company name if too long
-            max_chars = 40  # More chars available in landscape
-            if len(company_name) > max_chars:
-                company_name = company_name[:max_chars-3] + "..."
-
-            # Draw company name (centered)
-            company_bbox = draw.textbbox((0, 0), company_name, font=title_font)
-            company_width = company_bbox[2] - company_bbox[0]
-            draw.text(((content_width - company_width) // 2, y_offset),
-                     company_name, fill='black', font=title_font)
-            y_offset += 32
-
-            # Draw a thin separator line
-            draw.line([(30, y_offset), (content_width - 30, y_offset)], fill='gray', width=1)
-            y_offset += 12
-
-            # Add Asset Tag (if exists)
-            if asset.asset_tag:
-                asset_tag_text = f"Asset Tag: {asset.asset_tag}"
-                tag_bbox = draw.textbbox((0, 0), asset_tag_text, font=text_font)
-                tag_width = tag_bbox[2] - tag_bbox[0]
-                draw.text(((content_width - tag_width) // 2, y_offset),
-                         asset_tag_text, fill='black', font=text_font)
-                y_offset += 26
-
-            # Add Serial Number text
-            serial_text = f"S/N: {asset.serial_num}"
-            serial_bbox = draw.textbbox((0, 0), serial_text, font=text_font)
-            serial_width = serial_bbox[2] - serial_bbox[0]
-            draw.text(((content_width - serial_width) // 2, y_offset),
-                     serial_text, fill='black', font=text_font)
-            y_offset += 28
-
-            # Add barcode (wider now since content is landscape)
-            barcode_width = min(content_width - 60, 450)  # Max 450px wide
-            barcode_height = 70
-            barcode_resized = barcode_image.resize((barcode_width, barcode_height))
-            barcode_x = (content_width - barcode_width) // 2
-            content.paste(barcode_resized, (barcode_x, y_offset))
-            y_offset += barcode_height + 12
-
-            # Add product name at bottom if space allows
-            if hasattr(asset, 'name') and asset.name and y_offset < content_height - 25:
-                product_name = asset.name[:45] + "..." if len(asset.name) > 45 else asset.name
-                name_bbox = draw.textbbox((0, 0), product_name, font=label_font)
-                name_width = name_bbox[2] - name_bbox[0]
-                draw.text(((content_width - name_width) // 2, y_offset),
-                         product_name, fill='gray', font=label_font)
-
-            # Add border
-            draw.rectangle([0, 0, content_width-1, content_height-1],
-                          outline='black', width=2)
-
-            # Rotate content 90 degrees counter-clockwise to fit portrait label
-            # This makes text readable when label is rotated 90° clockwise
-            label = content.rotate(90, expand=True)
-
-            return label
+    def generate_label_png(self, asset):
+        """
+        Generate a complete asset label as PNG bytes (served from the label cache when unchanged)
+
+        Args:
+            asset: Asset object with serial_num, asset_tag, company, etc.
 
+        Returns:
+            bytes: PNG data, or None on failure
+        """
+        try:
+            return cached_label_png(label_fields(asset))
         except Exception as e:
-            print(f"Error generating asset label: {str(e)}")
+            logger.error(f"Error generating asset label: {str(e)}")
             return None
     
     def generate_barcode_base64(self, serial_number):
@@ -205,7 +440,7 @@ class AssetBarcodeGenerator:
             return f"data:image/png;base64,{img_data}"
             
         except Exception as e:
-            logger.info("Error generating base64 barcode: {str(e)}")
+            logger.info(f"Error generating base64 barcode: {str(e)}")
             return None
     
     def generate_label_base64(self, asset):
@@ -218,22 +453,10 @@ class AssetBarcodeGenerator:
         Returns:
             str: Base64 encoded image data
         """
-        try:
-            label_image = self.generate_asset_label(asset)
-            if not label_image:
-                return None
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            label_image.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            img_data = base64.b64encode(buffer.getvalue()).decode()
-            return f"data:image/png;base64,{img_data}"
-            
-        except Exception as e:
-            logger.info("Error generating base64 label: {str(e)}")
+        label_png = self.generate_label_png(asset)
+        if not label_png:
             return None
+        return f"data:image/png;base64,{base64.b64encode(label_png).decode()}"
     
     def save_label_to_file(self, asset, filepath):
         """
@@ -247,19 +470,20 @@ class AssetBarcodeGenerator:
             bool: True if successful, False otherwise
         """
         try:
-            label_image = self.generate_asset_label(asset)
-            if not label_image:
+            label_png = self.generate_label_png(asset)
+            if not label_png:
                 return False
             
             # Ensure directory exists
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
             
-            label_image.save(filepath, format='PNG')
+            with open(filepath, 'wb') as f:
+                f.write(label_png)
             return True
             
         except Exception as e:
-            logger.info("Error saving label to file: {str(e)}")
+            logger.info(f"Error saving label to file: {str(e)}")
             return False
 
 # Global instance
-barcode_generator = AssetBarcodeGenerator() 
\ No newline at end of file
+barcode_generator = AssetBarcodeGenerator()
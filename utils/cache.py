@@ -0,0 +1,384 @@
+"""
+Shared response/query cache with tag-based invalidation.
+
+app.cache used to be a per-process SimpleCache that nothing read from. The
+cache is now shared by every worker on the host (FileSystemCache by default,
+or TwoLevelCache: a per-process SimpleCache in front of the file cache) and
+views and helpers opt in declaratively:
+
+    @cached_view(tags=('tickets', 'users'))            # keyed by path, args, user
+    def get_available_filters(): ...
+
+    @cached_query(timeout=300, tags=('queues', 'tickets'))
+    def queue_grid(): ...
+
+Entries are never deleted one by one. Every entry key embeds the version of
+its tags, and invalidate('tickets') gives the tag a new version, so the old
+entries are simply never looked up again and age out by timeout. Tags are
+hierarchical on ':':
+
+- invalidate('assets:company:12') reaches entries tagged 'assets:company:12'
+  and entries tagged 'assets' (they read every company), but not entries
+  tagged 'assets:company:5'.
+- invalidate('assets') reaches every entry tagged 'assets' or 'assets:...'.
+
+The listeners at the bottom of this module invalidate the tags of the rows
+changed by each committed session, so views only declare what they read.
+
+Configuration (environment):
+    CACHE_TYPE      FileSystemCache (default), TwoLevel, SimpleCache or NullCache
+    CACHE_DIR       Directory of the file cache (default: <tmp>/inventory-cache)
+    CACHE_L1_TIMEOUT  Seconds a TwoLevel worker keeps its local copy (default 5);
+                      also how long another worker's invalidation can take to show
+"""
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+
+from flask import current_app, request, session
+from flask_caching import Cache
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.filesystemcache import FileSystemCache
+from flask_caching.backends.simplecache import SimpleCache
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+CACHE_DEFAULT_TIMEOUT = 60
+
+cache = Cache()
+
+_CACHE_TYPES = {
+    'TwoLevel': 'utils.cache.TwoLevelCache',
+}
+
+
+class TwoLevelCache(BaseCache):
+    """
+    Per-process SimpleCache (L1) in front of the host-wide FileSystemCache (L2).
+
+    L1 copies live at most l1_timeout seconds, which bounds how long a worker
+    can serve a value another worker has replaced or invalidated.
+    """
+
+    def __init__(self, cache_dir, default_timeout=300, threshold=500, l1_timeout=5, l1_threshold=2000):
+        super().__init__(default_timeout=default_timeout)
+        self.l1 = SimpleCache(threshold=l1_threshold, default_timeout=l1_timeout)
+        self.l2 = FileSystemCache(cache_dir, threshold=threshold, default_timeout=default_timeout)
+        self.l1_timeout = l1_timeout
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            cache_dir=config['CACHE_DIR'],
+            threshold=config['CACHE_THRESHOLD'],
+            l1_timeout=config.get('CACHE_L1_TIMEOUT', 5),
+        )
+        return cls(*args, **kwargs)
+
+    def _l1_timeout(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return self.l1_timeout if timeout == 0 else min(timeout, self.l1_timeout)
+
+    def get(self, key):
+        value = self.l1.get(key)
+        if value is None:
+            value = self.l2.get(key)
+            if value is not None:
+                self.l1.set(key, value, timeout=self.l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=None):
+        self.l1.set(key, value, timeout=self._l1_timeout(timeout))
+        return self.l2.set(key, value, timeout=timeout)
+
+    def add(self, key, value, timeout=None):
+        if not self.l2.add(key, value, timeout=timeout):
+            return False
+        self.l1.set(key, value, timeout=self._l1_timeout(timeout))
+        return True
+
+    def delete(self, key):
+        self.l1.delete(key)
+        return self.l2.delete(key)
+
+    def has(self, key):
+        return self.l1.has(key) or self.l2.has(key)
+
+    def clear(self):
+        self.l1.clear()
+        return self.l2.clear()
+
+
+def init_cache(app):
+    """
+    Configure the shared cache from the environment and attach it as app.cache.
+
+    Args:
+        app: Flask application (settings already in app.config win)
+
+    Returns:
+        Cache: The module-level cache object
+    """
+    cache_type = os.environ.get('CACHE_TYPE', 'FileSystemCache')
+    app.config.setdefault('CACHE_TYPE', _CACHE_TYPES.get(cache_type, cache_type))
+    app.config.setdefault('CACHE_DEFAULT_TIMEOUT', CACHE_DEFAULT_TIMEOUT)
+    app.config.setdefault('CACHE_DIR', os.environ.get(
+        'CACHE_DIR', os.path.join(tempfile.gettempdir(), 'inventory-cache')
+    ))
+    app.config.setdefault('CACHE_THRESHOLD', int(os.environ.get('CACHE_THRESHOLD', 5000)))
+    app.config.setdefault('CACHE_L1_TIMEOUT', int(os.environ.get('CACHE_L1_TIMEOUT', 5)))
+    cache.init_app(app)
+    app.cache = cache
+    logger.info(f"Cache backend: {app.config['CACHE_TYPE']}")
+    return cache
+
+
+def _backend():
+    """The configured backend, or None outside an app that ran init_cache"""
+    try:
+        return cache.cache
+    except (AttributeError, KeyError, RuntimeError):
+        return None
+
+
+def _tag_levels(tag):
+    """'a:b:c' -> ['a', 'a:b', 'a:b:c']"""
+    parts = tag.split(':')
+    return [':'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def _version_keys(tags):
+    """Keys whose values version an entry with these tags"""
+    keys = set()
+    for tag in tags:
+        keys.add(f'tag-any:{tag}')  # bumped by tag and its descendants
+        keys.update(f'tag:{level}' for level in _tag_levels(tag))  # bumped by tag and its ancestors
+    return sorted(keys)
+
+
+def _tag_versions(backend, tags):
+    """Current version token of each key in _version_keys(tags), creating missing ones"""
+    keys = _version_keys(tags)
+    versions = dict(zip(keys, backend.get_many(*keys))) if keys else {}
+    for key, version in versions.items():
+        if version is None:
+            # New (or evicted) tag: a fresh token never matches an older entry
+            backend.add(key, uuid.uuid4().hex, timeout=0)
+            versions[key] = backend.get(key)
+    return versions
+
+
+def invalidate(*tags):
+    """
+    Drop every cached entry that depends on one of tags.
+
+    Args:
+        tags: Tag names, e.g. 'tickets', 'assets:company:12'
+    """
+    backend = _backend()
+    if backend is None or not tags:
+        return
+    keys = set()
+    for tag in tags:
+        levels = _tag_levels(tag)
+        keys.add(f'tag:{tag}')
+        keys.update(f'tag-any:{level}' for level in levels)
+    backend.set_many({key: uuid.uuid4().hex for key in keys}, timeout=0)
+    logger.debug(f"Invalidated cache tags: {', '.join(sorted(tags))}")
+
+
+def _entry_key(backend, name, parts, tags):
+    versions = _tag_versions(backend, tags)
+    digest = hashlib.sha1(repr((parts, sorted(versions.items()))).encode()).hexdigest()
+    return f'{name}:{digest}'
+
+
+def _resolve_tags(tags, *args, **kwargs):
+    if callable(tags):
+        tags = tags(*args, **kwargs)
+    return None if tags is None else tuple(tags)
+
+
+def _user_scope():
+    """Cache scope of the logged-in user, None when there is none"""
+    user_id = session.get('user_id') or session.get('_user_id')  # Login form / Flask-Login
+    return None if user_id is None else str(user_id)
+
+
+def _reports_failure(response):
+    """Views here answer some errors with 200 and {'success': False}"""
+    if not response.is_json:
+        return False
+    payload = response.get_json(silent=True)
+    return isinstance(payload, dict) and payload.get('success') is False
+
+
+def cached_view(timeout=None, tags=(), scope='user'):
+    """
+    Cache successful GET responses of a view.
+
+    The key is the endpoint, the path, the sorted query string and the scope.
+    Only 200 responses are stored (body, status, mimetype); anything else -
+    errors, redirects, permission denials, {'success': False} payloads - is
+    recomputed every time.
+
+    Args:
+        timeout: Seconds to keep an entry (CACHE_DEFAULT_TIMEOUT if None)
+        tags: Tag names, or callable(**view_kwargs) returning them; a None
+            return skips the cache for that call
+        scope: 'user' (per logged-in user, skipped when anonymous), 'global',
+            or callable() returning the scope key
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            backend = _backend()
+            if backend is None or request.method != 'GET':
+                return view(*args, **kwargs)
+            entry_tags = _resolve_tags(tags, **kwargs)
+            if entry_tags is None:
+                return view(*args, **kwargs)
+            if scope == 'global':
+                scope_key = None
+            elif scope == 'user':
+                scope_key = _user_scope()
+                if scope_key is None:
+                    return view(*args, **kwargs)
+            else:
+                scope_key = scope()
+
+            key = _entry_key(backend, f'view:{request.endpoint}',
+                             (request.path, sorted(request.args.items(multi=True)), str(scope_key)),
+                             entry_tags)
+            entry = backend.get(key)
+            if entry is not None:
+                body, status, mimetype = entry
+                return current_app.response_class(body, status=status, mimetype=mimetype)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough and not _reports_failure(response):
+                backend.set(key, (response.get_data(), response.status_code, response.mimetype), timeout=timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_query(timeout=None, tags=(), key=None):
+    """
+    Cache the return value of a function (plain, picklable data).
+
+    Args:
+        timeout: Seconds to keep an entry (CACHE_DEFAULT_TIMEOUT if None)
+        tags: Tag names, or callable(*args, **kwargs) returning them
+        key: callable(*args, **kwargs) returning the part of the arguments
+            that identifies the result (default: all of them); use it to
+            leave out sessions and other unpicklable arguments
+    """
+    def decorator(func):
+        name = f'query:{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = _backend()
+            if backend is None:
+                return func(*args, **kwargs)
+            parts = key(*args, **kwargs) if key else (args, sorted(kwargs.items()))
+            entry_tags = _resolve_tags(tags, *args, **kwargs)
+            if entry_tags is None:
+                return func(*args, **kwargs)
+            entry_key = _entry_key(backend, name, parts, entry_tags)
+            entry = backend.get(entry_key)
+            if entry is not None:
+                return entry[0]
+            result = func(*args, **kwargs)
+            backend.set(entry_key, (result,), timeout=timeout)
+            return result
+        return wrapper
+    return decorator
+
+
+# Table -> (tag, attribute whose value refines it)
+TABLE_TAGS = {
+    'tickets': ('tickets', 'queue_id'),
+    'assets': ('assets', 'company_id'),
+    'accessories': ('accessories', None),
+    'queues': ('queues', None),
+    'queue_folders': ('queues', None),
+    'customer_users': ('customers', None),
+    'companies': ('companies', None),
+    'activities': ('activities', None),
+    'audit_sessions': ('audits', None),
+    'users': ('users', 'id'),
+    'user_company_permissions': ('permissions', None),
+    'user_country_permissions': ('permissions', None),
+    'user_queue_permissions': ('permissions', None),
+    'company_queue_permissions': ('permissions', None),
+    'permissions': ('permissions', None),
+}
+_REFINED = {'tickets': 'queue', 'assets': 'company'}
+
+
+def row_tags(obj):
+    """Tags a change to this ORM object invalidates (old and new values)"""
+    table = getattr(obj, '__tablename__', None)
+    if table not in TABLE_TAGS:
+        return set()
+    tag, attribute = TABLE_TAGS[table]
+    if attribute is None:
+        return {tag}
+    history = inspect(obj).attrs[attribute].history
+    values = set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+    label = _REFINED.get(table)
+    prefix = f'{tag}:{label}:' if label else f'{tag}:'
+    return {f'{prefix}{value if value is not None else "none"}' for value in values} or {tag}
+
+
+def _pending(session):
+    return session.info.setdefault('cache_invalidate', set())
+
+
+def invalidate_on_commit(session, *tags):
+    """Invalidate tags once session commits (for changes made with Core statements)"""
+    _pending(session).update(tags)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_tags(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags = row_tags(obj)
+        if tags:
+            _pending(session).update(tags)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_changes(orm_execute_state):
+    """query(...).update()/.delete() bypass the flush: invalidate the whole table tag"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete) or orm_execute_state.bind_mapper is None:
+        return
+    table = orm_execute_state.bind_mapper.local_table.name
+    if table in TABLE_TAGS:
+        _pending(orm_execute_state.session).add(TABLE_TAGS[table][0])
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    tags = session.info.pop('cache_invalidate', None)
+    if tags:
+        try:
+            invalidate(*tags)
+        except Exception as e:
+            logger.error(f"Error invalidating cache tags {sorted(tags)}: {str(e)}")
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changed_tags(session, previous_transaction):
+    # A rolled back savepoint leaves the outer transaction's changes to commit
+    if previous_transaction.parent is None:
+        session.info.pop('cache_invalidate', None)
+
@@ -11,6 +11,61 @@ from models.permission import Permission
 from models.ticket import Ticket
 from datetime import datetime
 import os
+import sys
+import threading
+
+# One engine (and connection pool) per database URL, shared by every
+# DatabaseManager in the process. Route modules each create their own
+# manager at import time; without this a worker booted ~40 engines and ran
+# create_all() ~40 times.
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(db_url):
+    """Shared engine for db_url, creating it (and any missing tables) on first use"""
+    engine = _engines.get(db_url)
+    if engine is not None:
+        return engine
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            # Pool settings for MySQL - match database.py settings
+            # pool_recycle=280 ensures connections are recycled before MySQL's default 300s timeout
+            if 'sqlite' in db_url:
+                engine = create_engine(db_url)
+            else:
+                engine = create_engine(
+                    db_url,
+                    pool_pre_ping=True,
+                    pool_recycle=280,
+                    pool_size=10,
+                    max_overflow=20
+                )
+            Base.metadata.create_all(engine)
+            _engines[db_url] = engine
+    return engine
+
+
+def dispose_engines(close=False):
+    """
+    Drop pooled connections of every engine in this process.
+
+    Called in a child right after fork (gunicorn --preload): the pools were
+    filled by the parent, and two processes must never share a connection.
+    close=False leaves the parent's sockets alone and only forgets them here.
+    """
+    engines = list(_engines.values())
+    database = sys.modules.get('database')
+    if database is not None:
+        engines.append(database.engine)
+    for engine in engines:
+        engine.dispose(close=close)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=dispose_engines)
+
 
 class DatabaseManager:
     def __init__(self, db_url=None):
@@ -18,19 +73,7 @@ class DatabaseManager:
         if db_url is None:
             db_url = os.environ.get('DATABASE_URL', 'sqlite:///inventory.db')
 
-        # Pool settings for MySQL - match database.py settings
-        # pool_recycle=280 ensures connections are recycled before MySQL's default 300s timeout
-        if 'sqlite' in db_url:
-            self.engine = create_engine(db_url)
-        else:
-            self.engine = create_engine(
-                db_url,
-                pool_pre_ping=True,
-                pool_recycle=280,
-                pool_size=10,
-                max_overflow=20
-            )
-        Base.metadata.create_all(self.engine)
+        self.engine = get_engine(db_url)
         self.Session = sessionmaker(bind=self.engine)
         
     def get_session(self):
@@ -0,0 +1,166 @@
+"""
+Delta sync for the mobile app.
+
+Clients keep a local copy of tickets, assets and accessories and ask for the
+rows changed since an opaque cursor instead of re-downloading full pages:
+
+    GET /api/mobile/v1/sync/tickets                 -> first page of everything
+    GET /api/mobile/v1/sync/tickets?cursor=<cursor> -> changes since then
+
+Changes are read in (updated_at, id) keyset order from the
+ix_<table>_updated_at_id indexes; deletes come from sync_tombstones in id
+order. A cursor encodes both positions plus the time it was issued.
+
+A transaction that commits after the cursor moved past its updated_at would
+be missed, so the cursor handed out with the last page never advances beyond
+now - SAFETY_WINDOW_SECONDS; the next pull re-sends those few rows and
+clients upsert them. Tombstones carry no permission scope: a client may see
+ids of deleted rows it never had, which it ignores.
+"""
+import base64
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+from models.sync_tombstone import SyncTombstone
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 500
+SAFETY_WINDOW_SECONDS = 5
+# Cursors older than this may have missed pruned tombstones; clients resync
+TOMBSTONE_RETENTION_DAYS = 30
+
+
+class InvalidCursor(ValueError):
+    """The cursor could not be decoded"""
+
+
+class ExpiredCursor(ValueError):
+    """The cursor predates the tombstone retention window; start a full sync"""
+
+
+def encode_cursor(updated_at, row_id, tombstone_id, issued_at=None):
+    payload = {
+        'u': updated_at.isoformat() if updated_at else None,
+        'i': row_id,
+        't': tombstone_id,
+        's': (issued_at or datetime.utcnow()).isoformat(timespec='seconds'),
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor from encode_cursor.
+
+    Returns:
+        tuple: (updated_at or None, row_id, tombstone_id)
+
+    Raises:
+        InvalidCursor, ExpiredCursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        updated_at = datetime.fromisoformat(payload['u']) if payload['u'] else None
+        row_id, tombstone_id = int(payload['i']), int(payload['t'])
+        issued_at = datetime.fromisoformat(payload['s'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+    if issued_at < datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise ExpiredCursor(f"cursor issued {issued_at.isoformat()}")
+    return updated_at, row_id, tombstone_id
+
+
+def sync_page(db_session, query, model, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of changes and deletes for model since cursor.
+
+    Args:
+        db_session: Database session
+        query: Permission-scoped query over model (options such as
+            selectinload are kept)
+        model: Ticket, Asset or Accessory
+        cursor: Cursor from the previous page, or None for a full sync
+        limit: Maximum changed rows and maximum deleted ids in this page
+
+    Returns:
+        dict: {'changed': [model rows], 'deleted': [ids], 'cursor': str,
+               'has_more': bool}
+
+    Raises:
+        InvalidCursor, ExpiredCursor
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        updated_at, row_id, tombstone_id = decode_cursor(cursor)
+    else:
+        updated_at, row_id, tombstone_id = None, 0, None
+
+    # Changed rows, keyset on (updated_at, id)
+    if updated_at is not None:
+        query = query.filter(or_(
+            model.updated_at > updated_at,
+            and_(model.updated_at == updated_at, model.id > row_id)
+        ))
+    rows = query.order_by(model.updated_at, model.id).limit(limit + 1).all()
+    more_changes = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        updated_at, row_id = rows[-1].updated_at, rows[-1].id
+
+    # Deleted ids; a first sync has nothing to delete and starts at the newest tombstone
+    table = model.__tablename__
+    deleted = []
+    more_deletes = False
+    if tombstone_id is None:
+        latest = db_session.query(SyncTombstone.id).order_by(SyncTombstone.id.desc()).first()
+        tombstone_id = latest[0] if latest else 0
+    else:
+        tombstones = db_session.query(SyncTombstone.id, SyncTombstone.entity_id).filter(
+            SyncTombstone.entity_type == table,
+            SyncTombstone.id > tombstone_id
+        ).order_by(SyncTombstone.id).limit(limit + 1).all()
+        more_deletes = len(tombstones) > limit
+        tombstones = tombstones[:limit]
+        if tombstones:
+            tombstone_id = tombstones[-1].id
+        deleted = [entity_id for _, entity_id in tombstones]
+
+    has_more = more_changes or more_deletes
+    if not has_more:
+        # Re-send the last few seconds next time in case of late commits
+        horizon = datetime.utcnow() - timedelta(seconds=SAFETY_WINDOW_SECONDS)
+        if updated_at is not None and updated_at >= horizon:
+            updated_at, row_id = horizon, 0
+
+    logger.debug(f"Delta sync {table}: {len(rows)} changed, {len(deleted)} deleted, has_more={has_more}")
+    return {
+        'changed': rows,
+        'deleted': deleted,
+        'cursor': encode_cursor(updated_at, row_id, tombstone_id),
+        'has_more': has_more,
+    }
+
+
+def prune_tombstones(db_session, days=TOMBSTONE_RETENTION_DAYS):
+    """
+    Delete tombstones older than the retention window.
+
+    Returns:
+        int: Number of tombstones deleted
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = db_session.query(SyncTombstone).filter(
+        SyncTombstone.deleted_at < cutoff
+    ).delete(synchronize_session=False)
+    db_session.commit()
+    logger.info(f"Pruned {deleted} sync tombstones older than {days} days")
+    return deleted
@@ -0,0 +1,388 @@
+"""
+Local mirror of the SingPost Ezy2ship manifests and shipments.
+
+SingPostEzy2shipClient answers every question with live SOAP calls, and
+get_all_shipments walks the manifests of a date range one getManifest call
+at a time. The mirror keeps the account's manifests and shipments in
+indexed tables (models/ezy2ship_shipment.py) instead:
+
+    flask --app app ezy2ship sync              # incremental, from the watermark
+    flask --app app ezy2ship sync --days 90    # read the last 90 days again
+
+A run lists the manifests from the watermark (the newest mirrored manifest
+date, less OVERLAP_DAYS for manifests that were still being filled) to
+today, WINDOW_DAYS per getManifests call. New manifests, manifests whose
+shipment count or status changed and manifests whose shipments were never
+fetched get their shipments fetched concurrently, on a pool of
+EZY2SHIP_SYNC_WORKERS threads with one SOAP client each. Undelivered
+shipments whose status is older than STATUS_INTERVAL_HOURS then get their
+tracking status from getShipmentsInfo (100 per call, same pool), and
+shipments not linked to a ticket yet are matched against the tickets'
+tracking numbers. Both look at every mirrored shipment, not only the
+manifests read by the run, back to TRACKING_DAYS and MATCH_DAYS. A manifest
+whose getManifest call fails keeps shipments_synced_at NULL and is fetched
+again on the next run.
+
+ticket_shipments() and search_shipments() read the mirror for ticket
+views and reconciliation. A status counts as final by the tracking
+scheduler's rules (tracking_scheduler.is_done).
+"""
+import copy
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, or_
+
+from models.ezy2ship_shipment import Ezy2shipManifest, Ezy2shipShipment
+from models.ticket import Ticket
+from utils.tracking_scheduler import is_done
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Days read on the first run, when nothing is mirrored yet
+INITIAL_DAYS = int(os.environ.get('EZY2SHIP_SYNC_DAYS', 90))
+# Days before the newest mirrored manifest that are read again
+OVERLAP_DAYS = 3
+# Longest date range of one getManifests call
+WINDOW_DAYS = 30
+# Concurrent getManifest / getShipmentsInfo calls
+WORKERS = int(os.environ.get('EZY2SHIP_SYNC_WORKERS', 4))
+# Hours before the status of an undelivered shipment is checked again
+STATUS_INTERVAL_HOURS = int(os.environ.get('EZY2SHIP_STATUS_HOURS', 6))
+# Days after the manifest date an undelivered shipment is still tracked
+TRACKING_DAYS = int(os.environ.get('EZY2SHIP_TRACKING_DAYS', 90))
+# Days after the manifest date an unlinked shipment is still matched to tickets
+MATCH_DAYS = int(os.environ.get('EZY2SHIP_MATCH_DAYS', 365))
+# Tracking numbers per getShipmentsInfo call (service limit)
+INFO_BATCH = 100
+# Values per IN (...) clause
+QUERY_CHUNK = 500
+
+# Manifest shipment fields copied on every fetch; the status is only taken
+# from the manifest for new shipments, after that it comes from tracking
+SHIPMENT_FIELDS = ('docket_number', 'service_code', 'carrier_code', 'weight', 'receiver_name',
+                   'receiver_address', 'receiver_city', 'receiver_postcode', 'receiver_country')
+
+# Ticket columns that hold tracking numbers
+TRACKING_COLUMNS = ('shipping_tracking', 'shipping_tracking_2', 'shipping_tracking_3',
+                    'shipping_tracking_4', 'shipping_tracking_5', 'return_tracking')
+
+
+def parse_date(value) -> Optional[date]:
+    """Date of an Ezy2ship date value ('2026-01-31', '2026-01-31T10:00:00'), None if unreadable"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def watermark(db_session, today: Optional[date] = None) -> date:
+    """
+    First manifest date an incremental sync reads.
+
+    Args:
+        db_session: Database session
+        today: Date of the run (default: today)
+
+    Returns:
+        The newest mirrored manifest date less OVERLAP_DAYS, or INITIAL_DAYS ago
+    """
+    today = today or date.today()
+    newest = db_session.query(func.max(Ezy2shipManifest.manifest_date)).scalar()
+    if newest is None:
+        return today - timedelta(days=INITIAL_DAYS)
+    return min(newest, today) - timedelta(days=OVERLAP_DAYS)
+
+
+class Ezy2shipSync:
+    """One sync run of the Ezy2ship mirror"""
+
+    def __init__(self, db_session, client=None, workers: int = WORKERS, today: Optional[date] = None):
+        if client is None:
+            # zeep is heavy; it is only imported once a sync actually runs
+            from utils.singpost_ezy2ship import get_ezy2ship_client
+            client = get_ezy2ship_client()
+        self.db_session = db_session
+        self.client = client
+        self.workers = max(1, workers)
+        self.today = today or date.today()
+        self._local = threading.local()
+        self.stats = {'manifests': 0, 'manifests_fetched': 0, 'manifests_failed': 0,
+                      'shipments': 0, 'statuses': 0, 'statuses_failed': 0, 'matched': 0}
+
+    def _worker_client(self):
+        """SOAP client of the current worker thread; zeep clients and their sessions are not shared"""
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = copy.copy(self.client)
+            client._client = None
+            self._local.client = client
+        return client
+
+    def run(self, date_from: Optional[date] = None) -> Dict:
+        """
+        Mirror the manifests from date_from (default: the watermark) to today.
+
+        Args:
+            date_from: First manifest date to read
+
+        Returns:
+            The run's counters
+        """
+        date_from = date_from or watermark(self.db_session, self.today)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ezy2ship') as pool:
+            pending = self._sync_manifests(date_from)
+            self._sync_shipments(pool, pending)
+            self._sync_statuses(pool)
+        self._match_tickets()
+        logger.info(f"Ezy2ship mirror synced from {date_from}: {self.stats}")
+        return self.stats
+
+    def _sync_manifests(self, date_from: date) -> List[str]:
+        """Store the listed manifests; returns the numbers whose shipments need fetching"""
+        listed = {}
+        start = date_from
+        while start <= self.today:
+            end = min(start + timedelta(days=WINDOW_DAYS - 1), self.today)
+            for data in self.client.get_manifests(start.isoformat(), end.isoformat(), raise_errors=True):
+                if data['manifest_number']:
+                    listed[data['manifest_number']] = data
+            start = end + timedelta(days=1)
+
+        existing = {}
+        for numbers in _chunks(list(listed), QUERY_CHUNK):
+            for manifest in self.db_session.query(Ezy2shipManifest).filter(
+                    Ezy2shipManifest.manifest_number.in_(numbers)):
+                existing[manifest.manifest_number] = manifest
+
+        now = datetime.utcnow()
+        for number, data in listed.items():
+            manifest = existing.get(number)
+            if manifest is None:
+                manifest = Ezy2shipManifest(manifest_number=number)
+                self.db_session.add(manifest)
+            elif (manifest.shipment_count, manifest.status) != (data['shipment_count'], data['status']):
+                manifest.shipments_synced_at = None
+            manifest.manifest_date = parse_date(data['manifest_date'])
+            manifest.carrier_code = data['carrier_code']
+            manifest.shipment_count = data['shipment_count']
+            manifest.status = data['status']
+            manifest.synced_at = now
+        self.db_session.commit()
+        self.stats['manifests'] = len(listed)
+
+        # Includes manifests of earlier runs whose fetch failed
+        return [number for (number,) in self.db_session.query(Ezy2shipManifest.manifest_number).filter(
+            Ezy2shipManifest.shipments_synced_at.is_(None)).order_by(Ezy2shipManifest.manifest_date)]
+
+    def _fetch_manifest(self, manifest_number: str) -> List[Dict]:
+        return self._worker_client().get_manifest_shipments(manifest_number, raise_errors=True)
+
+    def _sync_shipments(self, pool: ThreadPoolExecutor, manifest_numbers: List[str]):
+        """Fetch the shipments of the manifests on the pool and store them as they arrive"""
+        futures = {pool.submit(self._fetch_manifest, number): number for number in manifest_numbers}
+        for future in as_completed(futures):
+            number = futures[future]
+            try:
+                shipments = future.result()
+            except Exception as e:
+                self.stats['manifests_failed'] += 1
+                logger.warning(f"Ezy2ship manifest {number} not mirrored, retrying next run: {e}")
+                continue
+            self._save_shipments(number, shipments)
+
+    def _save_shipments(self, manifest_number: str, shipments: List[Dict]):
+        shipments = [data for data in shipments if data['tracking_number']]
+        existing = {}
+        for numbers in _chunks([data['tracking_number'] for data in shipments], QUERY_CHUNK):
+            for shipment in self.db_session.query(Ezy2shipShipment).filter(
+                    Ezy2shipShipment.tracking_number.in_(numbers)):
+                existing[shipment.tracking_number] = shipment
+
+        now = datetime.utcnow()
+        for data in shipments:
+            shipment = existing.get(data['tracking_number'])
+            if shipment is None:
+                shipment = Ezy2shipShipment(tracking_number=data['tracking_number'], status=data['status'])
+                self.db_session.add(shipment)
+                existing[shipment.tracking_number] = shipment
+            shipment.manifest_number = manifest_number
+            shipment.manifest_date = parse_date(data['manifest_date'])
+            for field in SHIPMENT_FIELDS:
+                setattr(shipment, field, data[field])
+            shipment.synced_at = now
+
+        self.db_session.query(Ezy2shipManifest).filter_by(manifest_number=manifest_number).update(
+            {Ezy2shipManifest.shipments_synced_at: now}, synchronize_session=False)
+        self.db_session.commit()
+        self.stats['manifests_fetched'] += 1
+        self.stats['shipments'] += len(shipments)
+
+    def _fetch_info(self, tracking_numbers: List[str]):
+        return self._worker_client().get_shipments_info(tracking_numbers, raise_errors=True)
+
+    def _since(self, days: int):
+        """Shipments whose manifest is at most days old (or has no date)"""
+        return or_(Ezy2shipShipment.manifest_date.is_(None),
+                   Ezy2shipShipment.manifest_date >= self.today - timedelta(days=days))
+
+    def _sync_statuses(self, pool: ThreadPoolExecutor):
+        """Refresh the tracking status of undelivered shipments not checked for STATUS_INTERVAL_HOURS"""
+        checked_before = datetime.utcnow() - timedelta(hours=STATUS_INTERVAL_HOURS)
+        tracking_numbers = [
+            tracking_number for tracking_number, status in self.db_session.query(
+                Ezy2shipShipment.tracking_number, Ezy2shipShipment.status
+            ).filter(
+                self._since(TRACKING_DAYS),
+                or_(Ezy2shipShipment.status_checked_at.is_(None),
+                    Ezy2shipShipment.status_checked_at < checked_before)
+            )
+            if not is_done(status)
+        ]
+        futures = [pool.submit(self._fetch_info, batch) for batch in _chunks(tracking_numbers, INFO_BATCH)]
+        for future in as_completed(futures):
+            try:
+                infos = {info.tracking_number: info for info in future.result()}
+            except Exception as e:
+                self.stats['statuses_failed'] += 1
+                logger.warning(f"Ezy2ship tracking status batch failed: {e}")
+                continue
+            if not infos:
+                continue
+
+            now = datetime.utcnow()
+            for shipment in self.db_session.query(Ezy2shipShipment).filter(
+                    Ezy2shipShipment.tracking_number.in_(list(infos))):
+                info = infos[shipment.tracking_number]
+                shipment.status = info.status
+                shipment.events_count = len(info.events)
+                shipment.last_event = info.events[0].event_name if info.events else None
+                shipment.status_checked_at = now
+            self.db_session.commit()
+            self.stats['statuses'] += len(infos)
+
+    def _match_tickets(self):
+        """Link unlinked shipments to the tickets carrying their tracking numbers"""
+        unmatched = self.db_session.query(Ezy2shipShipment).filter(
+            Ezy2shipShipment.ticket_id.is_(None),
+            self._since(MATCH_DAYS)
+        ).all()
+        columns = [getattr(Ticket, name) for name in TRACKING_COLUMNS]
+
+        for shipments in _chunks(unmatched, QUERY_CHUNK):
+            numbers = {shipment.tracking_number for shipment in shipments}
+            ticket_ids = {}
+            rows = self.db_session.query(Ticket.id, *columns).filter(
+                or_(*[column.in_(numbers) for column in columns])
+            ).order_by(Ticket.id)
+            for ticket_id, *tracking_numbers in rows:
+                for tracking_number in tracking_numbers:
+                    if tracking_number in numbers:
+                        ticket_ids.setdefault(tracking_number, ticket_id)
+            for shipment in shipments:
+                if shipment.tracking_number in ticket_ids:
+                    shipment.ticket_id = ticket_ids[shipment.tracking_number]
+                    self.stats['matched'] += 1
+        self.db_session.commit()
+
+
+def ticket_shipments(db_session, ticket) -> List[Dict]:
+    """
+    Mirrored shipments of a ticket's packages.
+
+    Args:
+        db_session: Database session
+        ticket: Ticket
+
+    Returns:
+        Shipment dictionaries, in package order
+    """
+    numbers = [getattr(ticket, name) for name in TRACKING_COLUMNS if getattr(ticket, name)]
+    shipments = db_session.query(Ezy2shipShipment).filter(
+        or_(Ezy2shipShipment.tracking_number.in_(numbers), Ezy2shipShipment.ticket_id == ticket.id)
+    ).all()
+    order = {number: position for position, number in enumerate(numbers)}
+    shipments.sort(key=lambda shipment: order.get(shipment.tracking_number, len(order)))
+    return [shipment.to_dict() for shipment in shipments]
+
+
+def search_shipments(db_session, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                     carrier_code: Optional[str] = None, status: Optional[str] = None,
+                     unmatched: bool = False, query: Optional[str] = None, limit: int = 100) -> List[Dict]:
+    """
+    Mirrored shipments for reconciliation, newest manifests first.
+
+    Args:
+        db_session: Database session
+        date_from: First manifest date
+        date_to: Last manifest date
+        carrier_code: Carrier code (LOG, MAI, QSC)
+        status: Part of the tracking status
+        unmatched: Only shipments no ticket carries
+        query: Tracking or docket number prefix, or part of the receiver name
+        limit: Maximum number of shipments
+
+    Returns:
+        Shipment dictionaries
+    """
+    shipments = db_session.query(Ezy2shipShipment)
+    if date_from:
+        shipments = shipments.filter(Ezy2shipShipment.manifest_date >= date_from)
+    if date_to:
+        shipments = shipments.filter(Ezy2shipShipment.manifest_date <= date_to)
+    if carrier_code:
+        shipments = shipments.filter(Ezy2shipShipment.carrier_code == carrier_code)
+    if status:
+        shipments = shipments.filter(Ezy2shipShipment.status.ilike(f'%{status}%'))
+    if unmatched:
+        shipments = shipments.filter(Ezy2shipShipment.ticket_id.is_(None))
+    if query:
+        shipments = shipments.filter(or_(
+            Ezy2shipShipment.tracking_number.like(f'{query}%'),
+            Ezy2shipShipment.docket_number.like(f'{query}%'),
+            Ezy2shipShipment.receiver_name.ilike(f'%{query}%')
+        ))
+    shipments = shipments.order_by(Ezy2shipShipment.manifest_date.desc(), Ezy2shipShipment.id.desc())
+    return [shipment.to_dict() for shipment in shipments.limit(limit)]
+
+
+ezy2ship_cli = AppGroup('ezy2ship', help='SingPost Ezy2ship manifest mirror.')
+
+
+@ezy2ship_cli.command('sync')
+@click.option('--days', type=int, default=None,
+              help='Read the manifests of the last N days instead of starting at the watermark.')
+@click.option('--workers', type=int, default=WORKERS, show_default=True,
+              help='Concurrent getManifest / getShipmentsInfo calls.')
+def sync_command(days, workers):
+    """Mirror new and changed Ezy2ship manifests and their shipments."""
+    from database import SessionLocal
+    from utils.singpost_ezy2ship import get_ezy2ship_client
+
+    client = get_ezy2ship_client()
+    if not client.is_configured():
+        raise click.ClickException('SingPost Ezy2ship API not configured')
+
+    db_session = SessionLocal()
+    try:
+        date_from = date.today() - timedelta(days=days) if days else None
+        stats = Ezy2shipSync(db_session, client=client, workers=workers).run(date_from)
+    finally:
+        db_session.close()
+    click.echo(' '.join(f"{name}={count}" for name, count in stats.items()))
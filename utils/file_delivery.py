@@ -0,0 +1,116 @@
+"""
+Shared delivery of protected files (ticket attachments, documents, images).
+
+Routes do their permission checks, then return send_protected_file(). The
+response carries a strong ETag and Last-Modified so clients revalidate with
+a 304 instead of downloading again, and supports byte ranges so large PDFs
+and videos can be resumed or scrubbed.
+
+The transfer itself can be handed to the front proxy so a sync worker is
+not tied up for the whole download (FILE_DELIVERY_OFFLOAD):
+
+- ''              Python streams the file (default)
+- 'x-sendfile'    Apache mod_xsendfile / lighttpd: X-Sendfile: <absolute path>
+- 'x-accel'       nginx: X-Accel-Redirect: <FILE_DELIVERY_ACCEL_PREFIX>/<path under
+                  FILE_DELIVERY_ACCEL_ROOT>, served from an `internal` location, e.g.
+
+                      location /_protected/ {
+                          internal;
+                          alias /home/ainventory/inventory/;
+                      }
+
+Conditional requests are still answered in Python when offloading, so a
+304 never reaches the proxy.
+"""
+import os
+import logging
+import mimetypes
+from urllib.parse import quote
+
+from flask import current_app, request
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.utils import send_file
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+OFFLOAD_MODES = ('', 'x-sendfile', 'x-accel')
+
+
+def send_protected_file(path, download_name=None, as_attachment=True, mimetype=None, etag=None):
+    """
+    Serve a file the caller has already authorized.
+
+    Args:
+        path: Absolute path of the file
+        download_name: File name for Content-Disposition
+        as_attachment: False to display inline (PDF viewer, images)
+        mimetype: Content type; guessed from download_name/path when omitted
+        etag: Strong validator, e.g. the content SHA-256 stored by the media
+            pipeline; defaults to one derived from mtime, size and path
+
+    Returns:
+        Response: 200 / 206 with the file (or an offload header), 304 when the
+        client copy is current, 416 for an unsatisfiable range
+    """
+    path = os.path.abspath(path)
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(download_name or path)[0] or 'application/octet-stream'
+
+    mode = (current_app.config.get('FILE_DELIVERY_OFFLOAD') or '').lower()
+    if mode not in OFFLOAD_MODES:
+        logger.warning(f"Unknown FILE_DELIVERY_OFFLOAD '{mode}', serving files from Python")
+        mode = ''
+
+    accel_uri = None
+    if mode == 'x-accel':
+        accel_uri = _accel_uri(path)
+        if accel_uri is None:
+            mode = ''
+
+    environ = request.environ
+    if mode:
+        # The proxy answers Range itself; only If-None-Match / If-Modified-Since
+        # are evaluated here
+        environ = {key: value for key, value in environ.items() if key != 'HTTP_RANGE'}
+
+    try:
+        response = send_file(
+            path,
+            environ,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=True,
+            etag=etag if etag else True,
+            max_age=0,
+            use_x_sendfile=bool(mode),
+            response_class=current_app.response_class
+        )
+    except RequestedRangeNotSatisfiable as e:
+        return e.get_response()
+
+    # Authorized per user: browsers may keep a copy but shared caches may not,
+    # and every reuse is revalidated against the ETag
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.expires = None
+    if response.status_code == 200:
+        response.accept_ranges = 'bytes'  # Lets clients resume interrupted downloads
+
+    if accel_uri and 'X-Sendfile' in response.headers:
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = accel_uri
+    return response
+
+
+def _accel_uri(path):
+    """Internal nginx URI for path, or None if it is outside FILE_DELIVERY_ACCEL_ROOT"""
+    root = os.path.abspath(current_app.config.get('FILE_DELIVERY_ACCEL_ROOT') or current_app.root_path)
+    relative = os.path.relpath(path, root)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        logger.warning(f"{path} is outside FILE_DELIVERY_ACCEL_ROOT, serving it from Python")
+        return None
+    prefix = (current_app.config.get('FILE_DELIVERY_ACCEL_PREFIX') or '/_protected').rstrip('/')
+    return f"{prefix}/{quote(relative.replace(os.sep, '/'))}"
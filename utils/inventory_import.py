@@ -0,0 +1,561 @@
+"""
+Chunked inventory import pipeline.
+
+Rows are processed a chunk at a time so memory stays bounded regardless of
+file size:
+
+1. Normalize - vectorized pandas cleanup of strings, dates, prices and flags
+2. Validate  - required fields, duplicates within the file
+3. Dedupe    - one set-based query per chunk against existing serials/tags
+4. Insert    - one executemany INSERT per chunk, committed per chunk
+
+Progress (rows processed, successes, failures) is written to the
+ImportSession row after every chunk so long imports can be followed from the
+Import Manager.
+"""
+import os
+import logging
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import select, update, or_, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from models.asset import Asset, AssetStatus, ticket_assets
+from models.asset_facet import bump_version, record_inserted
+from models.autocomplete_change import record_changes
+from models.import_session import ImportSession
+from utils.cache import invalidate
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Keep IN (...) lists well below SQLite's bound parameter limit
+LOOKUP_BATCH_SIZE = 500
+
+# Raw spreadsheet headers (sample_inventory.csv layout) -> asset columns
+SPREADSHEET_COLUMNS = {
+    'asset tag': 'asset_tag',
+    'serial number': 'serial_num',
+    'product': 'name',
+    'model': 'model',
+    'asset type': 'category',
+    'hardware type': 'hardware_type',
+    'inventory': 'inventory',
+    'customer': 'customer',
+    'country': 'country',
+    'receiving date': 'receiving_date',
+    'keyboard': 'keyboard',
+    'po': 'po',
+    'erased': 'erased',
+    'condition': 'condition',
+    'diag': 'diag',
+    'cpu type': 'cpu_type',
+    'cpu cores': 'cpu_cores',
+    'gpu cores': 'gpu_cores',
+    'memory': 'memory',
+    'harddrive': 'harddrive',
+    'charger': 'charger',
+    'cost price': 'cost_price',
+    'legal hold': 'legal_hold',
+}
+
+# Keys of the rows shown on the /inventory/import preview page -> asset columns
+PREVIEW_COLUMNS = {
+    'asset tag': 'asset_tag',
+    'serial number': 'serial_num',
+    'product': 'name',
+    'model': 'model',
+    'manufacturer': 'manufacturer',
+    'category': 'category',
+    'asset type': 'asset_type',
+    'hardware type': 'hardware_type',
+    'inventory': 'inventory',
+    'customer': 'customer',
+    'country': 'country',
+    'receiving date': 'receiving_date',
+    'keyboard': 'keyboard',
+    'charger': 'charger',
+    'po': 'po',
+    'notes': 'notes',
+    'tech notes': 'tech_notes',
+    'diagnostic': 'diag',
+    'erased': 'erased',
+    'condition': 'condition',
+    'cpu type': 'cpu_type',
+    'cpu cores': 'cpu_cores',
+    'gpu cores': 'gpu_cores',
+    'memory': 'memory',
+    'hard drive': 'harddrive',
+}
+
+# Display names used in validation messages
+FIELD_LABELS = {
+    'asset_tag': 'Asset Tag',
+    'asset_type': 'Asset Type',
+    'serial_num': 'Serial Number',
+    'category': 'Category',
+    'name': 'Product',
+}
+
+# Spec fields mirrored into the specifications JSON column
+SPECIFICATION_FIELDS = [
+    'cpu_type', 'cpu_cores', 'gpu_cores', 'memory', 'harddrive',
+    'charger', 'keyboard', 'erased', 'condition', 'diag'
+]
+
+# Date layouts seen in customer spreadsheets, tried in order
+DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d', '%d-%b-%y', '%d-%b-%Y', '%d/%m/%y', '%Y-%m-%d %H:%M:%S']
+
+TRUE_VALUES = {'true', 'yes', 'y', '1', 'x'}
+
+CSV_ENCODINGS = ['utf-8-sig', 'utf-8', 'latin1', 'cp1252']
+
+_STRING_LENGTHS = {
+    column.name: column.type.length
+    for column in Asset.__table__.columns
+    if getattr(column.type, 'length', None)
+}
+
+
+class InventoryImporter:
+    """Bulk importer for asset rows from CSV/Excel files or preview data"""
+
+    def __init__(self, bind, chunk_size=DEFAULT_CHUNK_SIZE, column_map=None,
+                 required=('asset_tag',), defaults=None, specifications=False,
+                 import_session_id=None, ticket_id=None):
+        """
+        Args:
+            bind: Engine or Session for the inventory database
+            chunk_size: Rows per INSERT / commit
+            column_map: Lower-cased source header -> asset column
+            required: Asset columns that must be present on every row
+            defaults: Values for asset columns left empty, e.g. {'erased': 'Not completed'}
+            specifications: Also fill the specifications JSON from the spec columns
+            import_session_id: ImportSession to report progress into
+            ticket_id: Link every imported asset to this ticket
+        """
+        self.engine = bind if isinstance(bind, Engine) else bind.get_bind()
+        self.chunk_size = max(1, int(chunk_size))
+        self.column_map = column_map or SPREADSHEET_COLUMNS
+        self.required = tuple(required or ())
+        self.defaults = defaults or {}
+        self.specifications = specifications
+        self.import_session_id = import_session_id
+        self.ticket_id = ticket_id
+
+        self.success_count = 0
+        self.fail_count = 0
+        self.errors = []
+        self.imported = []
+        self._seen_serials = set()
+        self._seen_tags = set()
+
+    # ------------------------------------------------------------------
+    # Entry points
+    # ------------------------------------------------------------------
+
+    def import_file(self, file_path):
+        """Import a CSV or Excel file chunk by chunk"""
+        return self.import_chunks(iter_file_chunks(file_path, self.chunk_size))
+
+    def import_records(self, records, total_rows=None):
+        """Import an iterable of dicts (e.g. the JSON preview rows)"""
+        if isinstance(records, list) and total_rows is None:
+            total_rows = len(records)
+
+        def chunks():
+            batch = []
+            for record in records:
+                batch.append(record)
+                if len(batch) >= self.chunk_size:
+                    yield pd.DataFrame(batch)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch)
+
+        return self.import_chunks(chunks(), total_rows=total_rows)
+
+    def import_chunks(self, chunks, total_rows=None):
+        """
+        Run the pipeline over an iterable of DataFrames.
+
+        Returns:
+            dict: {'success', 'failed', 'errors', 'imported'} where errors are
+            "Row N: ..." strings and imported lists (row, asset_id, tag, serial, name)
+        """
+        row_offset = 0
+        for chunk in chunks:
+            chunk.index = pd.RangeIndex(row_offset + 1, row_offset + 1 + len(chunk))
+            row_offset += len(chunk)
+            self._import_chunk(chunk)
+            self._report_progress(row_offset, total_rows)
+
+        return {
+            'success': self.success_count,
+            'failed': self.fail_count,
+            'errors': self.errors,
+            'imported': self.imported
+        }
+
+    # ------------------------------------------------------------------
+    # Pipeline stages
+    # ------------------------------------------------------------------
+
+    def normalize(self, chunk):
+        """Map source columns onto asset columns and clean every value vectorized"""
+        lookup = {str(col).strip().lower(): col for col in chunk.columns}
+        data = {}
+        for source, target in self.column_map.items():
+            if source in lookup and target not in data:
+                data[target] = chunk[lookup[source]]
+        frame = pd.DataFrame(data, index=chunk.index)
+
+        for column in frame.columns:
+            if column == 'receiving_date':
+                frame[column] = parse_dates(frame[column])
+            elif column == 'cost_price':
+                frame[column] = parse_prices(frame[column])
+            elif column == 'legal_hold':
+                frame[column] = parse_flags(frame[column])
+            else:
+                frame[column] = clean_strings(frame[column], _STRING_LENGTHS.get(column))
+
+        for column, value in self.defaults.items():
+            if column in frame.columns:
+                frame[column] = frame[column].fillna(value)
+            else:
+                frame[column] = value
+        return frame
+
+    def validate(self, frame):
+        """Return a Series of error messages (None for valid rows)"""
+        errors = pd.Series(None, index=frame.index, dtype=object)
+
+        for column in self.required:
+            label = FIELD_LABELS.get(column, column)
+            missing = frame[column].isna() if column in frame.columns else pd.Series(True, index=frame.index)
+            errors = errors.mask(errors.isna() & missing, f"Missing required field: {label}")
+
+        # Repeats of rows accepted so far (earlier in the chunk or in earlier chunks);
+        # a row that already failed does not claim its serial or tag
+        if 'serial_num' in frame.columns:
+            serials = frame['serial_num'].where(errors.isna())
+            repeated = serials.notna() & (serials.duplicated() | serials.isin(self._seen_serials))
+            errors = errors.mask(errors.isna() & repeated,
+                                 "Duplicate serial number '" + serials.fillna('') + "' - repeated in this file")
+        if 'asset_tag' in frame.columns:
+            tags = frame['asset_tag'].where(errors.isna())
+            repeated = tags.notna() & (tags.duplicated() | tags.isin(self._seen_tags))
+            errors = errors.mask(errors.isna() & repeated,
+                                 "Duplicate asset tag '" + tags.fillna('') + "' - repeated in this file")
+        return errors
+
+    def _import_chunk(self, chunk):
+        frame = self.normalize(chunk)
+        errors = self.validate(frame)
+
+        candidates = frame[errors.isna()]
+        if not candidates.empty:
+            existing_serials, existing_tags = find_existing(
+                self.engine,
+                candidates['serial_num'].dropna().tolist() if 'serial_num' in candidates.columns else [],
+                candidates['asset_tag'].dropna().tolist() if 'asset_tag' in candidates.columns else []
+            )
+            if existing_serials and 'serial_num' in frame.columns:
+                serials = frame['serial_num']
+                errors = errors.mask(
+                    errors.isna() & serials.isin(list(existing_serials)),
+                    "Duplicate serial number '" + serials.fillna('') + "' - this asset already exists in the system"
+                )
+            if existing_tags and 'asset_tag' in frame.columns:
+                tags = frame['asset_tag']
+                errors = errors.mask(
+                    errors.isna() & tags.isin(list(existing_tags)),
+                    "Duplicate asset tag '" + tags.fillna('') + "' - this tag is already in use"
+                )
+
+        for row_number, message in errors.dropna().items():
+            self.errors.append(f"Row {row_number}: {message}")
+        self.fail_count += int(errors.notna().sum())
+
+        valid = frame[errors.isna()]
+        if valid.empty:
+            return
+
+        records = self._to_records(valid)
+        try:
+            self._insert(records)
+        except IntegrityError:
+            # Someone inserted a conflicting asset between the lookup and the
+            # insert; retry row by row so only the offending rows fail
+            logger.warning("Bulk insert hit a constraint, retrying chunk row by row")
+            for row_number, record in zip(valid.index, records):
+                try:
+                    self._insert([record], row_numbers=[row_number])
+                except IntegrityError as e:
+                    self.fail_count += 1
+                    self.errors.append(f"Row {row_number}: {str(e.orig)}")
+                else:
+                    self._remember([record])
+            return
+
+        self._remember(records)
+        self._after_insert(valid.index, records)
+
+    def _remember(self, records):
+        """Record the serials and tags of accepted rows so later repeats are rejected"""
+        self._seen_serials.update(r['serial_num'] for r in records if r.get('serial_num'))
+        self._seen_tags.update(r['asset_tag'] for r in records if r.get('asset_tag'))
+
+    def _to_records(self, frame):
+        """Convert a validated frame to insert parameter dicts"""
+        frame = frame.astype(object).where(frame.notna(), None)
+        records = frame.to_dict('records')
+
+        now = datetime.utcnow()
+        for record in records:
+            record.setdefault('status', AssetStatus.IN_STOCK)
+            record['created_at'] = now
+            if record.get('receiving_date') is not None:
+                record['receiving_date'] = record['receiving_date'].to_pydatetime()
+            if self.specifications:
+                record['specifications'] = {field: record.get(field) or '' for field in SPECIFICATION_FIELDS}
+        return records
+
+    def _insert(self, records, row_numbers=None):
+        with self.engine.begin() as conn:
+            conn.execute(insert(Asset.__table__), records)
+            record_inserted(conn, records)  # Core inserts bypass the facet listeners
+            record_changes(conn, 'assets')  # ... and the autocomplete change log
+            if self.ticket_id or row_numbers is not None:
+                ids = ids_by_tag(conn, [r['asset_tag'] for r in records])
+                if self.ticket_id:
+                    conn.execute(
+                        insert(ticket_assets),
+                        [{'ticket_id': self.ticket_id, 'asset_id': ids[r['asset_tag']]} for r in records]
+                    )
+                if row_numbers is not None:
+                    self._record_imported(row_numbers, records, ids)
+        announce_inserted(self.engine, ticket_linked=bool(self.ticket_id))
+
+    def _after_insert(self, row_numbers, records):
+        with self.engine.connect() as conn:
+            ids = ids_by_tag(conn, [r['asset_tag'] for r in records])
+        self._record_imported(row_numbers, records, ids)
+
+    def _record_imported(self, row_numbers, records, ids):
+        self.success_count += len(records)
+        for row_number, record in zip(row_numbers, records):
+            self.imported.append({
+                'row': int(row_number),
+                'type': 'asset',
+                'asset_id': ids.get(record['asset_tag']),
+                'asset_tag': record['asset_tag'],
+                'serial': record.get('serial_num'),
+                'product': record.get('name')
+            })
+
+    def _report_progress(self, processed, total_rows):
+        if not self.import_session_id:
+            return
+        table = ImportSession.__table__
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    update(table)
+                    .where(table.c.id == self.import_session_id)
+                    .values(
+                        status='processing',
+                        total_rows=total_rows or processed,
+                        success_count=self.success_count,
+                        fail_count=self.fail_count
+                    )
+                )
+        except Exception as e:
+            # Progress is informational; never fail the import over it
+            logger.error(f"Failed to update import progress: {str(e)}")
+
+
+def iter_file_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Excel file"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        yield from _iter_excel_chunks(file_path, chunk_size)
+    elif extension == '.xls':
+        df = pd.read_excel(file_path, dtype=str)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+    else:
+        yield from _iter_csv_chunks(file_path, chunk_size)
+
+
+def _iter_csv_chunks(file_path, chunk_size):
+    last_error = None
+    for encoding in CSV_ENCODINGS:
+        try:
+            reader = pd.read_csv(file_path, encoding=encoding, dtype=str, chunksize=chunk_size)
+            first = next(reader, None)
+        except (UnicodeDecodeError, pd.errors.EmptyDataError) as e:
+            last_error = e
+            continue
+        if first is None:
+            return
+        try:
+            yield first
+            yield from reader
+        finally:
+            reader.close()
+        return
+    raise ValueError(f"Failed to read CSV with any encoding: {last_error}")
+
+
+def _iter_excel_chunks(file_path, chunk_size):
+    """Stream an .xlsx sheet in read-only mode instead of loading it whole"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            return
+        header = [str(h).strip() if h is not None else f'column_{i}' for i, h in enumerate(header)]
+        batch = []
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=header, dtype=object)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header, dtype=object)
+    finally:
+        workbook.close()
+
+
+def find_existing(bind, serials, tags):
+    """
+    Look up which serial numbers / asset tags already exist.
+
+    Issues one query per LOOKUP_BATCH_SIZE values (a single query for a
+    normal chunk) rather than one query per row.
+
+    Returns:
+        tuple: ({serial: asset_tag}, {asset_tag: serial}) for the values that exist
+    """
+    serials = list(dict.fromkeys(s for s in serials if s))
+    tags = list(dict.fromkeys(t for t in tags if t))
+    assets = Asset.__table__
+    existing_serials, existing_tags = {}, {}
+    if not serials and not tags:
+        return existing_serials, existing_tags
+
+    engine = bind if isinstance(bind, Engine) else bind.get_bind()
+    with engine.connect() as conn:
+        for start in range(0, max(len(serials), len(tags)), LOOKUP_BATCH_SIZE):
+            serial_batch = serials[start:start + LOOKUP_BATCH_SIZE]
+            tag_batch = tags[start:start + LOOKUP_BATCH_SIZE]
+            conditions = []
+            if serial_batch:
+                conditions.append(assets.c.serial_num.in_(serial_batch))
+            if tag_batch:
+                conditions.append(assets.c.asset_tag.in_(tag_batch))
+            rows = conn.execute(
+                select(assets.c.serial_num, assets.c.asset_tag).where(or_(*conditions))
+            )
+            for serial_num, asset_tag in rows:
+                existing_serials[serial_num] = asset_tag
+                existing_tags[asset_tag] = serial_num
+
+    wanted_serials, wanted_tags = set(serials), set(tags)
+    return (
+        {k: v for k, v in existing_serials.items() if k in wanted_serials},
+        {k: v for k, v in existing_tags.items() if k in wanted_tags}
+    )
+
+
+def announce_inserted(engine, ticket_linked=False):
+    """
+    Publish a committed Core insert of assets.
+
+    Core statements bypass the session listeners, so this bumps the facet
+    version and invalidates the cached views tagged 'assets' (and 'tickets'
+    when the assets were linked to a ticket).
+
+    Args:
+        engine: Engine the insert committed on
+        ticket_linked: ticket_assets rows were inserted too
+    """
+    bump_version(engine)
+    tags = ('assets', 'tickets') if ticket_linked else ('assets',)
+    try:
+        invalidate(*tags)
+    except Exception as e:
+        logger.error(f"Error invalidating cache tags {list(tags)}: {str(e)}")
+
+
+def ids_by_tag(conn, tags):
+    """Map asset tags to asset ids, one query per LOOKUP_BATCH_SIZE tags"""
+    assets = Asset.__table__
+    ids = {}
+    for start in range(0, len(tags), LOOKUP_BATCH_SIZE):
+        rows = conn.execute(
+            select(assets.c.asset_tag, assets.c.id)
+            .where(assets.c.asset_tag.in_(tags[start:start + LOOKUP_BATCH_SIZE]))
+        )
+        ids.update(dict(rows.all()))
+    return ids
+
+
+def clean_strings(series, max_length=None):
+    """Strip values and turn blanks / 'nan' / 'None' into None"""
+    cleaned = series.astype(object).where(series.notna(), None)
+    mask = cleaned.notna()
+    text = cleaned[mask].astype(str).str.strip()
+    # Excel hands back whole numbers as floats ("11.0")
+    text = text.str.replace(r'^(-?\d+)\.0$', r'\1', regex=True)
+    text = text.mask(text.str.lower().isin(['', 'nan', 'none', 'nat']))
+    if max_length:
+        text = text.str.slice(0, max_length)
+    cleaned[mask] = text
+    return cleaned.where(cleaned.notna(), None)
+
+
+def parse_dates(series):
+    """Parse dates trying each known layout; unparseable values become NaT"""
+    text = clean_strings(series)
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    already = series.map(lambda v: isinstance(v, datetime))
+    if already.any():
+        result[already] = pd.to_datetime(series[already], errors='coerce')
+
+    pending = text.notna() & ~already
+    for fmt in DATE_FORMATS:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(text[pending], format=fmt, errors='coerce')
+        result[parsed.index] = result[parsed.index].fillna(parsed)
+        pending &= result.isna()
+
+    if pending.any():
+        # Rare layouts fall back to pandas' per-value inference
+        result[pending] = pd.to_datetime(text[pending], errors='coerce', dayfirst=True)
+    return result
+
+
+def parse_prices(series):
+    """Strip currency symbols / thousands separators and convert to float"""
+    text = clean_strings(series)
+    text = text.where(text.isna(), text.astype(str).str.replace(r'[^\d.\-]', '', regex=True))
+    return pd.to_numeric(text, errors='coerce')
+
+
+def parse_flags(series):
+    """Yes/No, True/False, 1/0 style columns to booleans"""
+    text = clean_strings(series)
+    return text.fillna('').astype(str).str.lower().isin(TRUE_VALUES)
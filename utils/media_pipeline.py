@@ -0,0 +1,309 @@
+"""
+Media pipeline for uploaded attachments and product images.
+
+- stream_to_file() writes an upload to disk in chunks while hashing it, so
+  large files are never held in memory
+- store_content_addressed() keeps one copy of identical product images
+  (file name = SHA-256 of the content); ticket attachments keep one file per
+  attachment, only their renditions are shared
+- queue_renditions() hands the file to a background worker that renders the
+  RENDITION_SIZES JPEGs (PDFs: first page) and records them in
+  media_renditions; renditions are shared by every file with the same hash
+
+Rendition files live outside the static folder and are always served by a
+route that checks the owner: tickets.attachment_rendition for attachments
+(ticket access), inventory.image_rendition for asset and accessory images.
+Listings read rendition URLs from the database (owner.renditions /
+owner.image_renditions) instead of probing the filesystem.
+"""
+import os
+import queue
+import hashlib
+import logging
+import tempfile
+import threading
+
+from sqlalchemy import select, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from models.media_rendition import MediaRendition, RENDITION_SIZES
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Not under static: previews of ticket attachments are as private as the attachment
+RENDITION_FOLDER = os.path.join(PROJECT_ROOT, 'uploads', 'renditions')
+# Renditions of product images (MediaRendition.url), see inventory.image_rendition
+RENDITION_URL_PREFIX = '/inventory/image-renditions'
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp'}
+
+CHUNK_SIZE = 64 * 1024
+JPEG_QUALITY = 82
+
+
+class UploadTooLargeError(Exception):
+    """Raised by stream_to_file when an upload exceeds max_bytes"""
+    pass
+
+
+def source_type_for(extension):
+    """'image' / 'pdf' for files we can render, otherwise None"""
+    extension = (extension or '').lower().lstrip('.')
+    if extension in IMAGE_EXTENSIONS:
+        return 'image'
+    if extension == 'pdf':
+        return 'pdf'
+    return None
+
+
+def stream_to_file(stream, path, max_bytes=None):
+    """
+    Copy a file-like upload to path in chunks, hashing as it goes.
+
+    The data is written to a temp file next to path and renamed into place,
+    so a rejected or interrupted upload never leaves a partial file behind.
+
+    Args:
+        stream: Readable binary stream (e.g. FileStorage.stream)
+        path: Destination path
+        max_bytes: Raise UploadTooLargeError beyond this many bytes
+
+    Returns:
+        tuple: (size in bytes, hex SHA-256)
+    """
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return size, digest.hexdigest()
+
+
+def store_content_addressed(data, folder, extension, url_prefix):
+    """
+    Save image bytes as <sha256>.<extension>, reusing an existing identical file.
+
+    Args:
+        data: File content (bytes)
+        folder: Directory to store the file in
+        extension: File extension without the dot
+        url_prefix: URL of folder, e.g. '/static/uploads/assets'
+
+    Returns:
+        tuple: (url, sha256, path, deduplicated)
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    filename = f"{sha256}.{extension}"
+    path = os.path.join(folder, filename)
+    deduplicated = os.path.exists(path)
+    if not deduplicated:
+        os.makedirs(folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return f"{url_prefix}/{filename}", sha256, path, deduplicated
+
+
+def rendition_path(sha256, size_name):
+    return os.path.join(RENDITION_FOLDER, sha256[:2], f"{sha256}_{size_name}.jpg")
+
+
+def rendition_url(sha256, size_name):
+    return f"{RENDITION_URL_PREFIX}/{sha256}/{size_name}.jpg"
+
+
+def find_rendition(db_session, sha256, size_name):
+    """The MediaRendition of a content hash and size whose file exists, or None"""
+    rendition = db_session.query(MediaRendition).filter(
+        MediaRendition.content_sha256 == sha256,
+        MediaRendition.size_name == size_name
+    ).first()
+    if not rendition or not os.path.exists(rendition.file_path):
+        return None
+    return rendition
+
+
+def existing_renditions(bind, sha256):
+    """Size names already rendered for a content hash"""
+    engine = _get_engine(bind)
+    table = MediaRendition.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(select(table.c.size_name).where(table.c.content_sha256 == sha256))
+        return {size_name for (size_name,) in rows}
+
+
+def render_renditions(bind, source_path, sha256, source_type):
+    """
+    Render any missing RENDITION_SIZES for a file and record them.
+
+    The source is decoded once (for PDFs the first page is rasterized once
+    at the largest size) and every smaller size is derived from it.
+
+    Returns:
+        list: Size names rendered by this call
+    """
+    missing = [name for name in RENDITION_SIZES if name not in existing_renditions(bind, sha256)]
+    if not missing:
+        return []
+
+    from PIL import Image
+
+    largest = max(RENDITION_SIZES[name] for name in missing)
+    if source_type == 'pdf':
+        image = _render_pdf_first_page(source_path, largest)
+    else:
+        image = Image.open(source_path)
+        image.draft('RGB', (largest, largest))  # Let JPEG decode at reduced scale
+        image = _to_rgb(image)
+
+    rows = []
+    try:
+        for name in sorted(missing, key=lambda n: RENDITION_SIZES[n], reverse=True):
+            edge = RENDITION_SIZES[name]
+            rendition = image.copy()
+            rendition.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+
+            path = rendition_path(sha256, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            rendition.save(path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=edge > 400)
+            rows.append({
+                'content_sha256': sha256,
+                'size_name': name,
+                'source_type': source_type,
+                'width': rendition.width,
+                'height': rendition.height,
+                'file_size': os.path.getsize(path),
+                'file_path': path,
+                'url': rendition_url(sha256, name)
+            })
+            # Derive the next (smaller) size from this one
+            image = rendition
+    finally:
+        image.close()
+
+    engine = _get_engine(bind)
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(MediaRendition.__table__), rows)
+    except IntegrityError:
+        # The same content was rendered concurrently; the files are identical
+        logger.info(f"Renditions for {sha256[:12]} already recorded")
+        return []
+
+    logger.info(f"Rendered {', '.join(r['size_name'] for r in rows)} for {sha256[:12]}")
+    return [r['size_name'] for r in rows]
+
+
+def _render_pdf_first_page(pdf_path, edge):
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    doc = fitz.open(pdf_path)
+    try:
+        page = doc[0]
+        zoom = edge / max(page.rect.width, page.rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
+    finally:
+        doc.close()
+
+
+def _to_rgb(image):
+    """Flatten transparency onto white; JPEG has no alpha channel"""
+    from PIL import Image
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def _get_engine(bind):
+    return bind if isinstance(bind, Engine) else bind.get_bind()
+
+
+# ----------------------------------------------------------------------
+# Background worker
+# ----------------------------------------------------------------------
+
+_jobs = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def queue_renditions(bind, source_path, sha256, source_type):
+    """
+    Render renditions for a file in the background worker thread.
+
+    Returns immediately; listings pick the renditions up once they are
+    recorded. Nothing is queued when every size already exists (identical
+    content uploaded before).
+
+    Returns:
+        bool: True if a job was queued
+    """
+    if not source_type or not sha256:
+        return False
+    if len(existing_renditions(bind, sha256)) == len(RENDITION_SIZES):
+        return False
+
+    _ensure_worker()
+    _jobs.put((_get_engine(bind), source_path, sha256, source_type))
+    return True
+
+
+def wait_for_renditions(timeout=None):
+    """Block until the worker has processed every queued job (tests / scripts)"""
+    if timeout is None:
+        _jobs.join()
+        return True
+    done = threading.Event()
+    threading.Thread(target=lambda: (_jobs.join(), done.set()), daemon=True).start()
+    return done.wait(timeout)
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name='media-renditions', daemon=True)
+            _worker.start()
+
+
+def _run_worker():
+    while True:
+        engine, source_path, sha256, source_type = _jobs.get()
+        try:
+            render_renditions(engine, source_path, sha256, source_type)
+        except Exception as e:
+            logger.warning(f"Failed to render {source_type} renditions for {source_path}: {str(e)}")
+        finally:
+            _jobs.task_done()
@@ -0,0 +1,177 @@
+"""
+Cached PDF extraction.
+
+Extracting assets from a packing list can mean OCRing every page, which
+takes seconds per page. Results are stored in pdf_extraction_results keyed
+by the file's SHA-256 and EXTRACTOR_VERSION, so re-opening the same PDF
+(even when it was uploaded again under another name) is a single lookup.
+Bumping EXTRACTOR_VERSION in utils.pdf_extractor invalidates old rows.
+"""
+import json
+import time
+import hashlib
+import logging
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.pdf_extraction_result import PdfExtractionResult
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file's contents, read in 1MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PdfExtractionCache:
+    """Utility class for cached asset / shipping info extraction from PDFs"""
+
+    @staticmethod
+    def get_assets(db_session, pdf_path, refresh=False):
+        """
+        Cached equivalent of pdf_extractor.extract_assets_from_pdf.
+
+        Args:
+            db_session: SQLAlchemy session; only its bind is used, cache rows are
+                written in a separate short transaction so the caller's work is untouched
+            pdf_path: Path to the PDF
+            refresh: Ignore any cached result and extract again
+
+        Returns:
+            Extraction result dict, or None if extraction failed
+        """
+        from utils.pdf_extractor import extract_assets_and_text_from_pdf
+
+        sha256 = file_sha256(pdf_path)
+        if not refresh:
+            cached = PdfExtractionCache._lookup(db_session, sha256, 'assets_json')
+            if cached is not None:
+                return cached
+
+        start = time.time()
+        result, text = extract_assets_and_text_from_pdf(pdf_path)
+        elapsed = time.time() - start
+
+        # Failed or empty (e.g. OCR unavailable) extractions are not cached, so they are retried
+        if result is None or not (text or '').strip():
+            return result
+
+        PdfExtractionCache._store(db_session, sha256, pdf_path, {
+            'text': text,
+            'assets_json': json.dumps(result, default=str),
+            'assets_seconds': elapsed
+        })
+        logger.info(f"Cached assets for PDF {sha256[:12]} ({elapsed:.1f}s extraction)")
+        return result
+
+    @staticmethod
+    def get_shipping_info(db_session, pdf_path, refresh=False):
+        """
+        Cached equivalent of pdf_extractor.extract_shipping_info_from_pdf.
+
+        Args:
+            db_session: SQLAlchemy session (see get_assets)
+            pdf_path: Path to the PDF
+            refresh: Ignore any cached result and extract again
+
+        Returns:
+            Shipping info dict, or None if extraction failed
+        """
+        from utils.pdf_extractor import extract_shipping_info_from_pdf
+
+        sha256 = file_sha256(pdf_path)
+        if not refresh:
+            cached = PdfExtractionCache._lookup(db_session, sha256, 'shipping_json')
+            if cached is not None:
+                return cached
+
+        start = time.time()
+        info = extract_shipping_info_from_pdf(pdf_path)
+        elapsed = time.time() - start
+
+        if not info or not any(info.values()):
+            return info
+
+        PdfExtractionCache._store(db_session, sha256, pdf_path, {
+            'shipping_json': json.dumps(info, default=str),
+            'shipping_seconds': elapsed
+        })
+        logger.info(f"Cached shipping info for PDF {sha256[:12]} ({elapsed:.1f}s extraction)")
+        return info
+
+    @staticmethod
+    def invalidate(db_session, pdf_path):
+        """Drop cached results for a file (all extractor versions)"""
+        sha256 = file_sha256(pdf_path)
+        with Session(bind=db_session.get_bind()) as cache_session:
+            deleted = cache_session.query(PdfExtractionResult).filter(
+                PdfExtractionResult.sha256 == sha256
+            ).delete(synchronize_session=False)
+            cache_session.commit()
+        return deleted
+
+    @staticmethod
+    def _lookup(db_session, sha256, field):
+        """Return the decoded JSON field for sha256 at the current version, or None"""
+        from utils.pdf_extractor import EXTRACTOR_VERSION
+
+        try:
+            with Session(bind=db_session.get_bind()) as cache_session:
+                row = cache_session.query(PdfExtractionResult).filter(
+                    PdfExtractionResult.sha256 == sha256,
+                    PdfExtractionResult.extractor_version == EXTRACTOR_VERSION
+                ).first()
+                if row is None or getattr(row, field) is None:
+                    return None
+                value = json.loads(getattr(row, field))
+                row.hit_count = (row.hit_count or 0) + 1
+                cache_session.commit()
+                logger.info(f"PDF extraction cache hit for {sha256[:12]} ({field})")
+                return value
+        except Exception as e:
+            logger.warning(f"PDF extraction cache lookup failed for {sha256[:12]}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _store(db_session, sha256, pdf_path, values):
+        """Insert or update the cache row for sha256 at the current version"""
+        import os
+        from utils.pdf_extractor import EXTRACTOR_VERSION
+
+        def upsert(cache_session):
+            row = cache_session.query(PdfExtractionResult).filter(
+                PdfExtractionResult.sha256 == sha256,
+                PdfExtractionResult.extractor_version == EXTRACTOR_VERSION
+            ).first()
+            if row is None:
+                row = PdfExtractionResult(
+                    sha256=sha256,
+                    extractor_version=EXTRACTOR_VERSION,
+                    file_size=os.path.getsize(pdf_path),
+                    hit_count=0
+                )
+                cache_session.add(row)
+            for key, value in values.items():
+                setattr(row, key, value)
+            cache_session.commit()
+
+        try:
+            with Session(bind=db_session.get_bind()) as cache_session:
+                try:
+                    upsert(cache_session)
+                except IntegrityError:
+                    # Another request inserted the same file concurrently - update its row
+                    cache_session.rollback()
+                    upsert(cache_session)
+        except Exception as e:
+            # Caching is best-effort; the caller already has its result
+            logger.warning(f"Could not cache PDF extraction for {sha256[:12]}: {str(e)}")
@@ -426,10 +426,33 @@ def get_apple_model_identifier(part_number):
     return None
 
 
-def extract_text_with_ocr(pdf_path):
+# Bump when extraction or parsing changes so cached results are recomputed
+EXTRACTOR_VERSION = '2'
+
+# A page whose text layer has fewer characters than this is treated as scanned
+MIN_PAGE_TEXT_CHARS = 20
+
+# Worker processes used to OCR scanned pages in parallel
+OCR_WORKERS = int(os.environ.get('PDF_OCR_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+def page_needs_ocr(text):
+    """True when a page's text layer is too thin to be useful (scanned page)"""
+    return len((text or '').strip()) < MIN_PAGE_TEXT_CHARS
+
+
+def extract_text_with_ocr(pdf_path, workers=None):
     """
     Extract text from a PDF using OCR (for scanned documents)
     Falls back to regular text extraction if OCR fails or isn't needed
+
+    Pages with a usable text layer are read directly; only the remaining
+    pages are OCRed, fanned out over a process pool when there is more
+    than one of them.
+
+    Args:
+        pdf_path: Path to the PDF
+        workers: Max OCR processes (defaults to OCR_WORKERS)
     """
     import time
     try:
@@ -438,7 +461,6 @@ def extract_text_with_ocr(pdf_path):
         logger.error("PyMuPDF (fitz) not installed")
         return None
 
-    all_text = ""
     start_time = time.time()
 
     try:
@@ -446,27 +468,18 @@ def extract_text_with_ocr(pdf_path):
         total_pages = len(doc)
         logger.info(f"PDF has {total_pages} pages, starting extraction...")
 
-        for page_num, page in enumerate(doc):
-            page_start = time.time()
-
-            # First try regular text extraction (fast)
-            text = page.get_text()
+        # First pass: regular text extraction (fast)
+        page_texts = [page.get_text() for page in doc]
+        doc.close()
 
-            # If no text found, try OCR (slow)
-            if not text.strip():
-                logger.info(f"Page {page_num + 1}/{total_pages}: No text found, attempting OCR...")
-                ocr_text = ocr_page(page)
+        ocr_pages = [num for num, text in enumerate(page_texts) if page_needs_ocr(text)]
+        if ocr_pages:
+            logger.info(f"{len(ocr_pages)}/{total_pages} pages have no usable text, attempting OCR...")
+            for page_num, ocr_text in ocr_pages_parallel(pdf_path, ocr_pages, workers=workers).items():
                 if ocr_text:
-                    text = ocr_text
-                    page_time = time.time() - page_start
-                    logger.info(f"Page {page_num + 1}/{total_pages}: OCR extracted {len(ocr_text)} chars in {page_time:.1f}s")
-            else:
-                page_time = time.time() - page_start
-                logger.info(f"Page {page_num + 1}/{total_pages}: Text extracted ({len(text)} chars) in {page_time:.1f}s")
-
-            all_text += text + "\n"
+                    page_texts[page_num] = ocr_text
 
-        doc.close()
+        all_text = "".join(text + "\n" for text in page_texts)
         total_time = time.time() - start_time
         logger.info(f"PDF extraction complete: {len(all_text)} chars in {total_time:.1f}s")
         return all_text
@@ -476,6 +489,56 @@ def extract_text_with_ocr(pdf_path):
         return None
 
 
+def ocr_pages_parallel(pdf_path, page_numbers, workers=None, dpi=200):
+    """
+    OCR several pages of a PDF, one process per page.
+
+    PyMuPDF pages can't be pickled, so each worker reopens the file and
+    renders its own page. A single page (or workers=1) is OCRed inline to
+    avoid process start-up cost.
+
+    Returns:
+        dict of page number -> OCR text (None for pages that failed)
+    """
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    workers = min(workers or OCR_WORKERS, len(page_numbers))
+    start_time = time.time()
+
+    if workers > 1:
+        try:
+            # spawn: never fork a process that holds DB connections and request threads
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                results = dict(zip(
+                    page_numbers,
+                    executor.map(_ocr_page_worker, [pdf_path] * len(page_numbers), page_numbers, [dpi] * len(page_numbers))
+                ))
+            logger.info(f"OCR of {len(page_numbers)} pages on {workers} processes took {time.time() - start_time:.1f}s")
+            return results
+        except Exception as e:
+            logger.warning(f"Parallel OCR failed ({e}), falling back to serial OCR")
+
+    results = {}
+    for page_num in page_numbers:
+        results[page_num] = _ocr_page_worker(pdf_path, page_num, dpi)
+    logger.info(f"OCR of {len(page_numbers)} pages took {time.time() - start_time:.1f}s")
+    return results
+
+
+def _ocr_page_worker(pdf_path, page_num, dpi=200):
+    """Open the PDF and OCR a single page (runs in a worker process)"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    try:
+        return ocr_page(doc[page_num], dpi=dpi)
+    finally:
+        doc.close()
+
+
 def ocr_page(page, dpi=200):
     """
     Perform OCR on a PDF page using pytesseract
@@ -552,8 +615,8 @@ def extract_shipping_info_from_pdf(pdf_path):
         first_page = doc[0]
         first_page_text = first_page.get_text()
 
-        # If no text found, try OCR on first page
-        if not first_page_text.strip():
+        # If the text layer is empty or too thin, try OCR on first page
+        if page_needs_ocr(first_page_text):
             logger.info("First page has no text, attempting OCR...")
             first_page_text = ocr_page(first_page) or ""
 
@@ -802,6 +865,19 @@ def extract_assets_from_pdf(pdf_path):
             - total_quantity: Total items expected
             - assets: List of extracted assets with serial numbers and details
     """
+    result, _ = extract_assets_and_text_from_pdf(pdf_path)
+    return result
+
+
+def extract_assets_and_text_from_pdf(pdf_path):
+    """
+    Same as extract_assets_from_pdf, but also returns the document text the
+    assets were parsed from (so callers can cache it).
+
+    Returns:
+        tuple (result dict or None, text or None)
+    """
+    all_text = None
     try:
         # First, try direct text extraction (for PDFs with selectable text)
         logger.info("Attempting direct text extraction...")
@@ -813,18 +889,20 @@ def extract_assets_from_pdf(pdf_path):
             # Detect document format and use appropriate parser
             if is_success_tech_delivery_order(all_text):
                 logger.info("Detected Success Tech Delivery Order format")
-                return parse_success_tech_delivery_order(all_text)
+                return parse_success_tech_delivery_order(all_text), all_text
             elif is_asiacloud_delivery_order(all_text):
                 logger.info("Detected AsiaCloud Delivery Order format")
-                return parse_asiacloud_delivery_order(all_text)
+                return parse_asiacloud_delivery_order(all_text), all_text
             else:
                 # Standard packing list format
                 result = parse_packing_list_text(all_text)
                 if result and result.get('assets'):
                     logger.info(f"Direct extraction complete: {len(result['assets'])} assets found")
-                    return result
+                    return result, all_text
                 logger.info("Direct extraction found no assets, trying AI extraction...")
 
+        ocr_text = None
+
         # If direct extraction failed or found no assets, try AI-based extraction
         logger.info("Attempting AI-based PDF extraction...")
         ai_data = extract_pdf_with_ai(pdf_path)
@@ -833,37 +911,38 @@ def extract_assets_from_pdf(pdf_path):
             logger.info("AI extraction successful, converting to asset format...")
             # Use already extracted text if available, or extract again
             if not all_text:
-                all_text = extract_text_with_ocr(pdf_path) or ""
+                ocr_text = extract_text_with_ocr(pdf_path) or ""
+                all_text = ocr_text
             result = convert_ai_data_to_assets(ai_data, all_text)
 
             if result and result.get('assets'):
                 logger.info(f"AI extraction complete: {len(result['assets'])} assets found")
-                return result
+                return result, all_text
             else:
                 logger.warning("AI extraction returned no assets, falling back to OCR")
 
-        # Fall back to OCR-based extraction
+        # Fall back to OCR-based extraction (reuse the OCR pass from above if it ran)
         logger.info("Using OCR-based extraction...")
-        all_text = extract_text_with_ocr(pdf_path)
+        all_text = ocr_text if ocr_text is not None else extract_text_with_ocr(pdf_path)
 
         if not all_text:
             logger.error("Failed to extract text from PDF")
-            return None
+            return None, None
 
         # Detect document format and use appropriate parser
         if is_success_tech_delivery_order(all_text):
             logger.info("Detected Success Tech Delivery Order format")
-            return parse_success_tech_delivery_order(all_text)
+            return parse_success_tech_delivery_order(all_text), all_text
         elif is_asiacloud_delivery_order(all_text):
             logger.info("Detected AsiaCloud Delivery Order format")
-            return parse_asiacloud_delivery_order(all_text)
+            return parse_asiacloud_delivery_order(all_text), all_text
         else:
             # Standard packing list format
-            return parse_packing_list_text(all_text)
+            return parse_packing_list_text(all_text), all_text
 
     except Exception as e:
         logger.error(f"Error extracting PDF: {e}")
-        return None
+        return None, all_text
 
 
 def is_success_tech_delivery_order(text):
@@ -1,16 +1,54 @@
 from datetime import datetime
+from utils.cache import cached_query
 from utils.db_manager import DatabaseManager
 from models.queue import Queue
 from models.queue_folder import QueueFolder
 
 
+@cached_query(tags=('tickets', 'queues'))
+def queue_ticket_counts():
+    """
+    Total and open ticket counts of every queue.
+
+    Returns:
+        dict: {queue_id: {'total': int, 'open': int}}
+    """
+    from utils.ticket_counters import queue_totals
+    db_session = DatabaseManager().get_session()
+    try:
+        return queue_totals(db_session)
+    finally:
+        db_session.close()
+
+
 class QueueStore:
     def __init__(self):
         self.db_manager = DatabaseManager()
-        self.queues = {}
-        self.folders = {}
-        self.load_queues()
-        self.load_folders()
+        self._queues = None
+        self._folders = None
+
+    # Queues and folders are loaded from the database on first use (not at import)
+    @property
+    def queues(self):
+        """{queue_id: Queue}"""
+        if self._queues is None:
+            self.load_queues()
+        return self._queues
+
+    @queues.setter
+    def queues(self, value):
+        self._queues = value
+
+    @property
+    def folders(self):
+        """{folder_id: QueueFolder}"""
+        if self._folders is None:
+            self.load_folders()
+        return self._folders
+
+    @folders.setter
+    def folders(self, value):
+        self._folders = value
 
     def load_queues(self):
         """Load queues from the database"""
@@ -105,6 +143,7 @@ class QueueStore:
         """Get a specific folder"""
         return self.folders.get(folder_id)
 
+    @cached_query(tags=('tickets', 'queues'), key=lambda self: ())
     def get_queues_with_folders(self):
         """Get all queues organized by folders for grid display"""
         db_session = self.db_manager.get_session()
@@ -112,6 +151,7 @@ class QueueStore:
             # Reload to get fresh data
             folders = db_session.query(QueueFolder).order_by(QueueFolder.display_order).all()
             queues = db_session.query(Queue).order_by(Queue.display_order).all()
+            counts = queue_ticket_counts()
 
             folder_data = []
             for folder in folders:
@@ -122,12 +162,12 @@ class QueueStore:
                     'color': folder.color,
                     'icon': folder.icon,
                     'display_order': folder.display_order,
-                    'queues': [self._queue_to_dict(q, db_session) for q in folder_queues],
+                    'queues': [self._queue_to_dict(q, counts) for q in folder_queues],
                     'queue_count': len(folder_queues)
                 })
 
             unfiled_queues = [q for q in queues if q.folder_id is None]
-            unfiled_data = [self._queue_to_dict(q, db_session) for q in unfiled_queues]
+            unfiled_data = [self._queue_to_dict(q, counts) for q in unfiled_queues]
 
             return {
                 'folders': folder_data,
@@ -136,21 +176,15 @@ class QueueStore:
         finally:
             db_session.close()
 
-    def _queue_to_dict(self, queue, db_session):
-        """Convert queue to dict with ticket count"""
-        from models.ticket import Ticket, TicketStatus
-        open_count = db_session.query(Ticket).filter(
-            Ticket.queue_id == queue.id,
-            Ticket.status != TicketStatus.RESOLVED,
-            Ticket.status != TicketStatus.RESOLVED_DELIVERED
-        ).count()
+    def _queue_to_dict(self, queue, counts):
+        """Convert queue to dict with open ticket count"""
         return {
             'id': queue.id,
             'name': queue.name,
             'description': queue.description,
             'folder_id': queue.folder_id,
             'display_order': queue.display_order,
-            'ticket_count': open_count
+            'ticket_count': counts.get(queue.id, {}).get('open', 0)
         }
 
     def add_folder(self, name, color='blue', icon='folder'):
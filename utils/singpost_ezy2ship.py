@@ -186,12 +186,13 @@ class SingPostEzy2shipClient:
 
         return ticket_final
 
-    def get_shipments_info(self, tracking_numbers: List[str]) -> List[ShipmentInfo]:
+    def get_shipments_info(self, tracking_numbers: List[str], raise_errors: bool = False) -> List[ShipmentInfo]:
         """
         Get tracking information for multiple shipments.
 
         Args:
             tracking_numbers: List of tracking numbers (max 100)
+            raise_errors: Raise service errors instead of returning an empty list
 
         Returns:
             List of ShipmentInfo objects with tracking events
@@ -247,6 +248,8 @@ class SingPostEzy2shipClient:
 
         except Exception as e:
             logger.error(f"Error calling getShipmentsInfo: {str(e)}")
+            if raise_errors:
+                raise
             return []
 
     def get_shipment(self, tracking_number: str) -> Optional[Dict]:
@@ -385,7 +388,7 @@ class SingPostEzy2shipClient:
         return carriers.get(carrier_code, carrier_code)
 
     def get_manifests(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
-                      carrier_code: Optional[str] = None) -> List[Dict]:
+                      carrier_code: Optional[str] = None, raise_errors: bool = False) -> List[Dict]:
         """
         Get list of manifests for the account.
 
@@ -393,6 +396,7 @@ class SingPostEzy2shipClient:
             date_from: Start date in YYYY-MM-DD format (default: 30 days ago)
             date_to: End date in YYYY-MM-DD format (default: today)
             carrier_code: Filter by carrier (LOG, MAI, QSC)
+            raise_errors: Raise service errors instead of returning an empty list
 
         Returns:
             List of manifest dictionaries
@@ -439,14 +443,17 @@ class SingPostEzy2shipClient:
 
         except Exception as e:
             logger.error(f"Error calling getManifests: {str(e)}")
+            if raise_errors:
+                raise
             return []
 
-    def get_manifest_shipments(self, manifest_number: str) -> List[Dict]:
+    def get_manifest_shipments(self, manifest_number: str, raise_errors: bool = False) -> List[Dict]:
         """
         Get all shipments for a specific manifest.
 
         Args:
             manifest_number: The manifest number
+            raise_errors: Raise service errors instead of returning an empty list
 
         Returns:
             List of shipment dictionaries
@@ -489,6 +496,8 @@ class SingPostEzy2shipClient:
 
         except Exception as e:
             logger.error(f"Error calling getManifest: {str(e)}")
+            if raise_errors:
+                raise
             return []
 
     def get_all_shipments(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
@@ -496,6 +505,9 @@ class SingPostEzy2shipClient:
         """
         Get all shipments from all manifests within date range.
 
+        Calls getManifest once per manifest, one after the other; screens
+        should read the local mirror (utils/ezy2ship_sync.py) instead.
+
         Args:
             date_from: Start date in YYYY-MM-DD format
             date_to: End date in YYYY-MM-DD format
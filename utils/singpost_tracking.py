@@ -93,6 +93,28 @@ class RateLimiter:
 _rate_limiter = RateLimiter(min_interval_seconds=5.0, global_min_interval=1.0)
 
 
+def get_rate_limiter() -> RateLimiter:
+    """The rate limiter shared by every SingPost API request of this process"""
+    return _rate_limiter
+
+
+def is_singpost_tracking_number(tracking_number: str) -> bool:
+    """Check if a tracking number is a SingPost tracking number"""
+    if not tracking_number:
+        return False
+    upper_tn = tracking_number.upper()
+    # XZ prefixes (XZB, XZD, etc.)
+    if upper_tn.startswith('XZ'):
+        return True
+    # New SPNDD and SPPSD formats
+    if upper_tn.startswith('SPNDD') or upper_tn.startswith('SPPSD'):
+        return True
+    # Other SP prefixes
+    if upper_tn.startswith('SP') or upper_tn.startswith('SG'):
+        return True
+    return False
+
+
 @dataclass
 class TrackingEvent:
     """Represents a single tracking event"""
@@ -449,7 +471,19 @@ class SingPostTrackingClient:
                 'error': 'No response from API'
             }
 
-        result = results[0]
+        return self.format_result(results[0])
+
+    def format_result(self, result: TrackingResult) -> Dict:
+        """
+        Format a TrackingResult as a dictionary for display.
+
+        Args:
+            result: One of the results returned by track()
+
+        Returns:
+            Dictionary with tracking info formatted for display
+        """
+        tracking_number = result.tracking_number
 
         if not result.found:
             return {
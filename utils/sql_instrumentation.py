@@ -0,0 +1,305 @@
+"""
+Per-request SQL instrumentation.
+
+A sampled fraction of requests (SQL_INSTRUMENTATION_SAMPLE_RATE) records
+every statement executed on the request thread via SQLAlchemy cursor events:
+query count, total DB time, the slowest statements and statement shapes that
+repeat (an N+1 pattern such as a lazy relationship loaded inside a loop).
+
+Sampled responses carry a Server-Timing header (visible in the browser's
+network panel) and feed an in-memory per-endpoint histogram shown on
+/admin/performance. Unsampled requests pay one random() call and one
+thread-local lookup per statement.
+
+Stats are per worker process and reset on restart.
+"""
+import heapq
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+SLOWEST_KEPT = 5
+# Histogram bucket upper bounds (the last bucket is open-ended)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+DB_MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_active = threading.local()
+_listeners_installed = False
+_install_lock = threading.Lock()
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)')
+_NUMBER = re.compile(r'(?<![\w.])\d+(?![\w.])')
+
+
+def statement_shape(statement):
+    """
+    Normalize a statement so executions that differ only in values match.
+
+    Whitespace is collapsed, IN lists of any length become (?...) and inline
+    integers (LIMIT/OFFSET) become ?.
+    """
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _PLACEHOLDER_LIST.sub('(?...)', shape)
+    return _NUMBER.sub('?', shape)
+
+
+class RequestRecorder:
+    """Statements executed during one sampled request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.shapes = {}  # shape -> [count, total_ms]
+        self._slowest = []  # min-heap of (ms, sequence, statement)
+
+    def record(self, statement, elapsed_ms):
+        self.query_count += 1
+        self.db_ms += elapsed_ms
+        shape = statement_shape(statement)
+        totals = self.shapes.get(shape)
+        if totals is None:
+            self.shapes[shape] = [1, elapsed_ms]
+        else:
+            totals[0] += 1
+            totals[1] += elapsed_ms
+        entry = (elapsed_ms, self.query_count, shape)
+        if len(self._slowest) < SLOWEST_KEPT:
+            heapq.heappush(self._slowest, entry)
+        elif elapsed_ms > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self):
+        """[(ms, shape)] slowest first"""
+        return [(ms, shape) for ms, _, shape in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold):
+        """[(shape, count, total_ms)] for shapes executed at least threshold times"""
+        return sorted(
+            ((shape, count, total_ms) for shape, (count, total_ms) in self.shapes.items() if count >= threshold),
+            key=lambda item: item[1], reverse=True
+        )
+
+
+def _bucket(value, bounds):
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+
+def _percentile(histogram, bounds, fraction):
+    """Upper bound of the bucket holding the given fraction of samples"""
+    total = sum(histogram)
+    if not total:
+        return 0
+    needed = total * fraction
+    running = 0
+    for index, count in enumerate(histogram):
+        running += count
+        if running >= needed:
+            return bounds[index] if index < len(bounds) else f">{bounds[-1]}"
+    return f">{bounds[-1]}"
+
+
+class EndpointStats:
+    """Rolling aggregate for one endpoint"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.total_ms = 0.0
+        self.max_queries = 0
+        self.n_plus_one_requests = 0
+        self.query_histogram = [0] * (len(QUERY_BUCKETS) + 1)
+        self.db_ms_histogram = [0] * (len(DB_MS_BUCKETS) + 1)
+        self.repeated = {}  # shape -> highest count seen in one request
+        self.slowest = []  # [(ms, shape)] across requests
+        self.worst = None
+
+    def add(self, path, recorder, total_ms, repeated):
+        self.requests += 1
+        self.queries += recorder.query_count
+        self.db_ms += recorder.db_ms
+        self.total_ms += total_ms
+        self.query_histogram[_bucket(recorder.query_count, QUERY_BUCKETS)] += 1
+        self.db_ms_histogram[_bucket(recorder.db_ms, DB_MS_BUCKETS)] += 1
+        if repeated:
+            self.n_plus_one_requests += 1
+            for shape, count, _ in repeated:
+                self.repeated[shape] = max(count, self.repeated.get(shape, 0))
+            if len(self.repeated) > SLOWEST_KEPT:
+                keep = sorted(self.repeated.items(), key=lambda item: item[1], reverse=True)[:SLOWEST_KEPT]
+                self.repeated = dict(keep)
+        self.slowest = sorted(self.slowest + recorder.slowest(), reverse=True)[:SLOWEST_KEPT]
+        if recorder.query_count >= self.max_queries:
+            self.max_queries = recorder.query_count
+            self.worst = {
+                'path': path,
+                'queries': recorder.query_count,
+                'db_ms': round(recorder.db_ms, 1),
+                'at': datetime.utcnow(),
+            }
+
+    def to_dict(self):
+        requests = self.requests or 1
+        return {
+            'endpoint': self.endpoint,
+            'requests': self.requests,
+            'avg_queries': round(self.queries / requests, 1),
+            'p95_queries': _percentile(self.query_histogram, QUERY_BUCKETS, 0.95),
+            'max_queries': self.max_queries,
+            'avg_db_ms': round(self.db_ms / requests, 1),
+            'p50_db_ms': _percentile(self.db_ms_histogram, DB_MS_BUCKETS, 0.5),
+            'p95_db_ms': _percentile(self.db_ms_histogram, DB_MS_BUCKETS, 0.95),
+            'avg_total_ms': round(self.total_ms / requests, 1),
+            'db_share': round(100 * self.db_ms / self.total_ms) if self.total_ms else 0,
+            'n_plus_one_requests': self.n_plus_one_requests,
+            'repeated': sorted(self.repeated.items(), key=lambda item: item[1], reverse=True),
+            'slowest': [(round(ms, 1), shape) for ms, shape in self.slowest],
+            'query_histogram': list(zip([f"<={b}" for b in QUERY_BUCKETS] + [f">{QUERY_BUCKETS[-1]}"],
+                                        self.query_histogram)),
+            'db_ms_histogram': list(zip([f"<={b}" for b in DB_MS_BUCKETS] + [f">{DB_MS_BUCKETS[-1]}"],
+                                        self.db_ms_histogram)),
+            'worst': dict(self.worst) if self.worst else None,
+        }
+
+
+class PerformanceStats:
+    """Per-endpoint aggregates for this process"""
+
+    SORT_KEYS = {
+        'db_ms': lambda stats: stats.db_ms / (stats.requests or 1),
+        'queries': lambda stats: stats.queries / (stats.requests or 1),
+        'n_plus_one': lambda stats: stats.n_plus_one_requests,
+        'requests': lambda stats: stats.requests,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.since = datetime.utcnow()
+
+    def record(self, endpoint, path, recorder, total_ms, repeated):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats(endpoint)
+            stats.add(path, recorder, total_ms, repeated)
+
+    def worst(self, sort='db_ms', limit=50):
+        """Endpoint dicts, worst first by sort ('db_ms', 'queries', 'n_plus_one', 'requests')"""
+        key = self.SORT_KEYS.get(sort, self.SORT_KEYS['db_ms'])
+        with self._lock:
+            ranked = sorted(self._endpoints.values(), key=key, reverse=True)[:limit]
+            return [stats.to_dict() for stats in ranked]
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self.since = datetime.utcnow()
+
+
+performance_stats = PerformanceStats()
+
+
+def current_recorder():
+    """Recorder of the sampled request on this thread, or None"""
+    return getattr(_active, 'recorder', None)
+
+
+def start_recording():
+    """Start recording statements on this thread (also used by tests / scripts)"""
+    _active.recorder = RequestRecorder()
+    return _active.recorder
+
+
+def stop_recording():
+    recorder = getattr(_active, 'recorder', None)
+    _active.recorder = None
+    return recorder
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_active, 'recorder', None) is not None:
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    recorder = getattr(_active, 'recorder', None)
+    if recorder is None:
+        return
+    started = conn.info.get('_query_started')
+    if started:
+        recorder.record(statement, (time.perf_counter() - started.pop()) * 1000)
+
+
+def install_engine_listeners():
+    """Listen on every Engine (database.py, DatabaseManager, Flask-SQLAlchemy) once per process"""
+    global _listeners_installed
+    with _install_lock:
+        if not _listeners_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _listeners_installed = True
+
+
+def init_sql_instrumentation(app):
+    """
+    Sample requests of app and record their SQL.
+
+    Config:
+        SQL_INSTRUMENTATION_SAMPLE_RATE: Fraction of requests recorded (0 disables)
+        SQL_N_PLUS_ONE_THRESHOLD: Executions of one statement shape per request
+            that count as an N+1
+    """
+    app.config.setdefault('SQL_INSTRUMENTATION_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+    app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+    install_engine_listeners()
+
+    @app.before_request
+    def _sample_request():
+        _active.recorder = None
+        rate = app.config['SQL_INSTRUMENTATION_SAMPLE_RATE']
+        if rate and request.endpoint != 'static' and (rate >= 1 or random.random() < rate):
+            start_recording()
+
+    @app.after_request
+    def _report_request(response):
+        recorder = stop_recording()
+        if recorder is None:
+            return response
+
+        total_ms = (time.perf_counter() - recorder.started) * 1000
+        repeated = recorder.repeated(app.config['SQL_N_PLUS_ONE_THRESHOLD'])
+        endpoint = f"{request.method} {request.endpoint or '<unmatched>'}"
+        performance_stats.record(endpoint, request.path, recorder, total_ms, repeated)
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={recorder.db_ms:.1f};desc="{recorder.query_count} queries", app;dur={total_ms:.1f}'
+        )
+        if repeated:
+            shape, count, _ = repeated[0]
+            logger.warning(f"Possible N+1 on {endpoint} ({request.path}): {count}x {shape[:200]}")
+        return response
+
+    @app.teardown_request
+    def _clear_recorder(exc):
+        # after_request is skipped when a view raises
+        _active.recorder = None
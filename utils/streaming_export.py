@@ -0,0 +1,391 @@
+"""
+Streaming export helpers for CSV / XLSX downloads.
+
+Exports used to load every matching ORM row and build the whole file in a
+StringIO before responding. These helpers keep memory flat instead:
+
+- iter_batches() walks a query in keyset-paginated batches
+- csv_response() streams rows to the client as they are produced
+- write_xlsx() / write_xlsx_sheets() use xlsxwriter's constant_memory mode
+  (rows are flushed to disk as soon as the next row starts)
+- start_background_export() writes very large exports to a file in a worker
+  thread; the user downloads it from /exports/<job_id>/download when ready.
+  Starting one also fails lost jobs and deletes files older than
+  EXPORT_RETENTION_HOURS
+
+Row builders passed to the background runner have the signature
+build(db_session, user) -> (header, rows) so they can run outside a request.
+"""
+import os
+import csv
+import logging
+import tempfile
+import threading
+from io import StringIO
+from datetime import datetime, timedelta
+
+from flask import Response, stream_with_context, send_file, url_for
+from markupsafe import Markup
+from sqlalchemy import and_, or_
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Rows fetched per batch query
+EXPORT_BATCH_SIZE = 500
+
+# Rows buffered before a chunk is sent to the client
+CSV_FLUSH_ROWS = 500
+
+# Exports with more rows than this are generated in the background
+BACKGROUND_THRESHOLD = int(os.environ.get('EXPORT_BACKGROUND_THRESHOLD', '20000'))
+
+# Background jobs still unfinished after this long are assumed lost (e.g. the
+# worker process was restarted) and marked as failed
+STALE_JOB_MINUTES = int(os.environ.get('EXPORT_STALE_JOB_MINUTES', '60'))
+
+# Files of background exports are deleted this long after they were written
+EXPORT_RETENTION_HOURS = int(os.environ.get('EXPORT_RETENTION_HOURS', '24'))
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def get_export_folder():
+    """Directory where background exports are written"""
+    from config import UPLOAD_FOLDER
+    folder = os.path.join(os.path.abspath(UPLOAD_FOLDER), 'exports')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def iter_batches(query, key_column, batch_size=EXPORT_BATCH_SIZE, sort_column=None):
+    """
+    Yield lists of at most batch_size rows from a Query, in key order.
+
+    Batches are fetched with keyset pagination (key > last ORDER BY key
+    LIMIT n) rather than one long server-side cursor: each batch is a short
+    query, and the connection stays free for per-batch lookups, which a
+    streamed MySQL result would block until fully read.
+
+    Args:
+        query: Query whose rows expose key_column by name (e.g. includes Asset.id)
+        key_column: Unique, sortable column such as Asset.id
+        batch_size: Rows per batch
+        sort_column: Optional non-null column to order by first (e.g. a name),
+            with key_column breaking ties; the rows must expose it by name too
+    """
+    if sort_column is None:
+        query = query.order_by(None).order_by(key_column)
+    else:
+        query = query.order_by(None).order_by(sort_column, key_column)
+    last_row = None
+    while True:
+        if last_row is None:
+            batch_query = query
+        elif sort_column is None:
+            batch_query = query.filter(key_column > getattr(last_row, key_column.key))
+        else:
+            last_sort = getattr(last_row, sort_column.key)
+            batch_query = query.filter(or_(
+                sort_column > last_sort,
+                and_(sort_column == last_sort, key_column > getattr(last_row, key_column.key))
+            ))
+        batch = batch_query.limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last_row = batch[-1]
+
+
+def iter_csv(header, rows, flush_rows=CSV_FLUSH_ROWS):
+    """Yield CSV text in chunks of flush_rows rows"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % flush_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def csv_response(header, rows, filename, on_close=None):
+    """
+    Stream a CSV download.
+
+    Args:
+        header: List of column names
+        rows: Iterable of row lists (consumed lazily while the response is sent)
+        filename: Download filename
+        on_close: Optional callable run once streaming finishes (e.g. session.close)
+    """
+    def generate():
+        try:
+            for chunk in iter_csv(header, rows):
+                yield chunk.encode('utf-8')
+        finally:
+            if on_close:
+                on_close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Accel-Buffering': 'no'  # Let nginx pass chunks straight through
+        }
+    )
+
+
+def write_csv(path, header, rows):
+    """Write rows to a CSV file, returning the number of data rows"""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_xlsx(path, header, rows, sheet_name='Export'):
+    """Write rows to an XLSX file in constant_memory mode, returning the row count"""
+    return write_xlsx_sheets(path, [(sheet_name, header, rows)])
+
+
+def write_xlsx_sheets(path, sheets):
+    """
+    Write several sheets to an XLSX file in constant_memory mode.
+
+    Each sheet is filled completely before the next one starts, which is the
+    order constant_memory requires.
+
+    Args:
+        path: Output file
+        sheets: Iterable of (sheet name, header, rows)
+
+    Returns:
+        int: Data rows written, over all sheets
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'strings_to_numbers': False,
+        'strings_to_formulas': False,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+    })
+    total = 0
+    try:
+        bold = workbook.add_format({'bold': True})
+        for sheet_name, header, rows in sheets:
+            worksheet = workbook.add_worksheet(sheet_name[:31])
+            worksheet.write_row(0, 0, header, bold)
+            count = 0
+            for count, row in enumerate(rows, start=1):
+                worksheet.write_row(count, 0, ['' if value is None else value for value in row])
+            total += count
+    finally:
+        workbook.close()
+    return total
+
+
+def xlsx_response(header, rows, filename, sheet_name='Export'):
+    """Write an XLSX to a temp file (constant memory) and send it, deleting it afterwards"""
+    return xlsx_sheets_response([(sheet_name, header, rows)], filename)
+
+
+def xlsx_sheets_response(sheets, filename):
+    """Like xlsx_response, for several (sheet name, header, rows) sheets"""
+    fd, path = tempfile.mkstemp(suffix='.xlsx', dir=get_export_folder())
+    os.close(fd)
+    try:
+        write_xlsx_sheets(path, sheets)
+    except Exception:
+        os.remove(path)
+        raise
+
+    response = send_file(path, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
+    response.call_on_close(lambda: os.path.exists(path) and os.remove(path))
+    return response
+
+
+def should_run_in_background(total_rows, requested=None):
+    """Background mode when explicitly requested or when the export is large"""
+    if requested is not None and str(requested).lower() in ('1', 'true', 'yes'):
+        return True
+    return total_rows > BACKGROUND_THRESHOLD
+
+
+def background_export_message(total, label, job_id):
+    """Flash message with a link to the download of a background export"""
+    download_url = url_for('exports.download_export', job_id=job_id)
+    return Markup('Exporting {} {} in the background. <a href="{}">Download the file</a> once it is ready.').format(
+        total, label, download_url
+    )
+
+
+def is_stale_job(job):
+    """Whether a job is still unfinished after STALE_JOB_MINUTES"""
+    cutoff = datetime.utcnow() - timedelta(minutes=STALE_JOB_MINUTES)
+    return not job.is_finished and job.created_at is not None and job.created_at < cutoff
+
+
+def fail_stale_jobs(db_session):
+    """
+    Mark background exports that never finished as failed.
+
+    Jobs run in a thread of the web process, so a restart loses them while
+    their row still says pending/processing.
+
+    Returns:
+        int: Number of jobs marked as failed
+    """
+    from models.export_job import ExportJob
+
+    cutoff = datetime.utcnow() - timedelta(minutes=STALE_JOB_MINUTES)
+    count = db_session.query(ExportJob).filter(
+        ExportJob.status.in_([ExportJob.STATUS_PENDING, ExportJob.STATUS_PROCESSING]),
+        ExportJob.created_at < cutoff
+    ).update({
+        ExportJob.status: ExportJob.STATUS_FAILED,
+        ExportJob.error: 'Export was interrupted (the server restarted). Please start it again.',
+        ExportJob.completed_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db_session.commit()
+    if count:
+        logger.warning(f"Marked {count} interrupted export job(s) as failed")
+    return count
+
+
+def remove_expired_exports(db_session):
+    """
+    Delete background export files older than EXPORT_RETENTION_HOURS.
+
+    Completed jobs keep their row with file_path cleared (the download then
+    answers 410); files in the export folder without a job, e.g. left by a
+    crash, are removed by modification time.
+
+    Returns:
+        int: Number of files removed
+    """
+    from models.export_job import ExportJob
+
+    cutoff = datetime.utcnow() - timedelta(hours=EXPORT_RETENTION_HOURS)
+    removed = 0
+    for job in db_session.query(ExportJob).filter(
+            ExportJob.file_path.isnot(None), ExportJob.completed_at < cutoff):
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+            removed += 1
+        job.file_path = None
+    db_session.commit()
+
+    kept = {os.path.abspath(path) for (path,) in db_session.query(ExportJob.file_path).filter(
+        ExportJob.file_path.isnot(None))}
+    folder = get_export_folder()
+    for name in os.listdir(folder):
+        path = os.path.abspath(os.path.join(folder, name))
+        if path not in kept and os.path.isfile(path) and \
+                datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff:
+            os.remove(path)
+            removed += 1
+
+    if removed:
+        logger.info(f"Removed {removed} expired export file(s)")
+    return removed
+
+
+def start_background_export(export_type, user_id, filename, build, session_factory, file_format='csv'):
+    """
+    Create an ExportJob and generate the file in a worker thread.
+
+    Args:
+        export_type: Short name stored on the job, e.g. 'assets'
+        user_id: Requesting user (also used to apply permission filters in build)
+        filename: Download filename
+        build: Callable (db_session, user) -> (header, rows)
+        session_factory: Callable returning a new SQLAlchemy session
+        file_format: 'csv' or 'xlsx'
+
+    Returns:
+        int: The export job id
+    """
+    from models.export_job import ExportJob
+
+    db_session = session_factory()
+    try:
+        try:
+            fail_stale_jobs(db_session)
+            remove_expired_exports(db_session)
+        except Exception as e:
+            db_session.rollback()
+            logger.warning(f"Export cleanup failed: {str(e)}")
+
+        job = ExportJob(
+            user_id=user_id,
+            export_type=export_type,
+            file_format=file_format,
+            file_name=filename,
+            status=ExportJob.STATUS_PENDING
+        )
+        db_session.add(job)
+        db_session.commit()
+        job_id = job.id
+    finally:
+        db_session.close()
+
+    worker = threading.Thread(
+        target=_run_export_job,
+        args=(job_id, user_id, build, session_factory, file_format),
+        name=f'export-job-{job_id}',
+        daemon=True
+    )
+    worker.start()
+    logger.info(f"Started background {export_type} export job {job_id}")
+    return job_id
+
+
+def _run_export_job(job_id, user_id, build, session_factory, file_format):
+    from models.export_job import ExportJob
+    from models.user import User
+
+    db_session = session_factory()
+    path = os.path.join(get_export_folder(), f'export_{job_id}.{file_format}')
+    try:
+        job = db_session.get(ExportJob, job_id)
+        job.status = ExportJob.STATUS_PROCESSING
+        db_session.commit()
+
+        user = db_session.get(User, user_id)
+        header, rows = build(db_session, user)
+        if file_format == 'xlsx':
+            row_count = write_xlsx(path, header, rows)
+        else:
+            row_count = write_csv(path, header, rows)
+
+        job = db_session.get(ExportJob, job_id)
+        job.status = ExportJob.STATUS_COMPLETED
+        job.file_path = path
+        job.row_count = row_count
+        job.completed_at = datetime.utcnow()
+        db_session.commit()
+        logger.info(f"Export job {job_id} finished with {row_count} rows")
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}")
+        db_session.rollback()
+        if os.path.exists(path):
+            os.remove(path)
+        job = db_session.get(ExportJob, job_id)
+        if job:
+            job.status = ExportJob.STATUS_FAILED
+            job.error = str(e)
+            job.completed_at = datetime.utcnow()
+            db_session.commit()
+    finally:
+        db_session.close()
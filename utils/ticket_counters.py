@@ -0,0 +1,304 @@
+"""
+Ticket counters for the dashboards and queue lists.
+
+The ticket list header, the mobile dashboard and the v2 ticket stats widget
+used to run one COUNT per status bucket, each re-applying the permission
+filter (ten for the SF list header). count_tickets() returns every bucket
+for "all visible" and "assigned to me", optionally per queue, from one
+aggregate:
+
+    counts = count_tickets(db_session, user_id=user.id, queue_ids=queue_ids)
+    counts['open'], counts['mine']['open'], counts['statuses']['IN_PROGRESS']
+
+Filters that only involve queues (and "assigned to me") are answered from
+the ticket_counts table (models/ticket_count.py), which listeners keep
+current on every ticket change; its cells are cached in memory per process
+until the version stamp moves. Set TICKET_COUNTS_TABLE=0 to always use the
+SUM(CASE ...) aggregate over tickets instead. Requester, country and date
+filters always use the aggregate.
+"""
+import functools
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from models.ticket import Ticket, TicketStatus
+from models.ticket_count import STATE_ID, TicketCount, TicketCountState, ticket_cell
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+USE_COUNTS_TABLE = os.environ.get('TICKET_COUNTS_TABLE', '1') != '0'
+
+# Bucket -> (exact status texts, substrings) matched against the lowercased
+# custom status, or the status name when there is none. Buckets can overlap.
+STATUS_BUCKETS = {
+    'open': (('new', 'open'), ('new',)),
+    'in_progress': (('in progress', 'in_progress', 'processing'), ('progress', 'processing')),
+    'resolved': (('resolved',), ('resolved', 'delivered', 'complete')),
+    'on_hold': (('on hold', 'on_hold'), ('hold', 'duplicate', 'cancel')),
+}
+RESOLVED_STATUSES = (TicketStatus.RESOLVED, TicketStatus.RESOLVED_DELIVERED)
+
+_cached = None  # (version, cells)
+_lock = threading.Lock()
+
+
+def empty_counts():
+    """
+    Counters of an empty ticket set.
+
+    Returns:
+        dict: total, one key per STATUS_BUCKETS bucket, unresolved (status
+        not Resolved / Resolved (All Package Delivered)) and statuses
+        ({TicketStatus name: count})
+    """
+    counts = {'total': 0, 'unresolved': 0, 'statuses': {status.name: 0 for status in TicketStatus}}
+    counts.update({bucket: 0 for bucket in STATUS_BUCKETS})
+    return counts
+
+
+def in_bucket(bucket, text):
+    """Python twin of bucket_condition() for a status text"""
+    exact, contains = STATUS_BUCKETS[bucket]
+    return text in exact or any(part in text for part in contains)
+
+
+def status_text_expr():
+    """SQL twin of models.ticket_count.status_text()"""
+    return case(
+        (Ticket.custom_status.isnot(None), func.lower(Ticket.custom_status)),
+        else_=func.lower(Ticket.status)
+    )
+
+
+def bucket_condition(bucket, text=None):
+    """SQL condition for a ticket falling in a status bucket"""
+    text = status_text_expr() if text is None else text
+    exact, contains = STATUS_BUCKETS[bucket]
+    return or_(*[text == value for value in exact], *[text.like(f'%{part}%') for part in contains])
+
+
+def _conditions():
+    """(path, condition) of every counter; a None condition counts every row"""
+    text = status_text_expr()
+    conditions = [(('total',), None)]
+    conditions += [((bucket,), bucket_condition(bucket, text)) for bucket in STATUS_BUCKETS]
+    conditions.append((('unresolved',), Ticket.status.notin_(RESOLVED_STATUSES)))
+    conditions += [(('statuses', status.name), Ticket.status == status) for status in TicketStatus]
+    return conditions
+
+
+def _add(counts, path, value):
+    target = counts
+    for part in path[:-1]:
+        target = target[part]
+    target[path[-1]] += value
+
+
+def _merge(into, counts):
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            _merge(into[key], value)
+        else:
+            into[key] += value
+
+
+def _new_group(user_id):
+    group = empty_counts()
+    if user_id is not None:
+        group['mine'] = empty_counts()
+    return group
+
+
+def _result(groups, user_id, by_queue):
+    counts = _new_group(user_id)
+    for group in groups.values():
+        _merge(counts, group)
+    if by_queue:
+        counts['queues'] = groups
+    return counts
+
+
+def _aggregate(db_session, user_id, queue_ids, visible_to, countries, since, by_queue):
+    """One SUM(CASE ...) query over the filtered tickets"""
+    columns = []
+    paths = []
+    mine = Ticket.assigned_to_id == user_id
+    for path, condition in _conditions():
+        columns.append(func.count(Ticket.id) if condition is None else func.sum(case((condition, 1), else_=0)))
+        paths.append(path)
+        if user_id is not None:
+            mine_condition = mine if condition is None else and_(mine, condition)
+            columns.append(func.sum(case((mine_condition, 1), else_=0)))
+            paths.append(('mine',) + path)
+
+    if by_queue:
+        query = db_session.query(Ticket.queue_id, *columns).group_by(Ticket.queue_id)
+    else:
+        query = db_session.query(*columns)
+    if queue_ids is not None:
+        query = query.filter(Ticket.queue_id.in_(list(queue_ids)))
+    if visible_to is not None:
+        query = query.filter(or_(Ticket.requester_id == visible_to, Ticket.assigned_to_id == visible_to))
+    if countries is not None:
+        query = query.filter(Ticket.country.in_(list(countries)))
+    if since is not None:
+        query = query.filter(Ticket.created_at >= since)
+
+    groups = {}
+    for row in query.all():
+        queue_id, values = (row[0], row[1:]) if by_queue else (None, row)
+        group = groups.setdefault(queue_id, _new_group(user_id))
+        for path, value in zip(paths, values):
+            _add(group, path, value or 0)
+    return groups
+
+
+def rebuild(db_session):
+    """
+    Recount ticket_counts from the tickets table and commit.
+
+    Returns:
+        int: Number of cells written
+    """
+    state = db_session.get(TicketCountState, STATE_ID)
+    if state is None:
+        state = TicketCountState(id=STATE_ID, version=0)
+        db_session.add(state)
+
+    cells = Counter()
+    rows = db_session.query(
+        Ticket.queue_id, Ticket.assigned_to_id, Ticket.status, Ticket.custom_status, func.count(Ticket.id)
+    ).group_by(Ticket.queue_id, Ticket.assigned_to_id, Ticket.status, Ticket.custom_status).all()
+    for queue_id, assigned_to_id, status, custom_status, count in rows:
+        cells[ticket_cell({'queue_id': queue_id, 'assigned_to_id': assigned_to_id,
+                           'status': status, 'custom_status': custom_status})] += count
+
+    db_session.query(TicketCount).delete(synchronize_session=False)
+    db_session.bulk_insert_mappings(TicketCount, [
+        {'queue_id': queue_id, 'assigned_to_id': assigned_to_id, 'status': status,
+         'status_text': text, 'ticket_count': count}
+        for (queue_id, assigned_to_id, status, text), count in cells.items()
+    ])
+    state.version = (state.version or 0) + 1
+    state.stale = False
+    state.rebuilt_at = datetime.utcnow()
+    db_session.commit()
+    logger.info(f"Rebuilt ticket counts: {len(cells)} cells, version {state.version}")
+    return len(cells)
+
+
+def load_cells(db_session):
+    """
+    The current ticket count cells, from memory unless the version moved.
+
+    Returns:
+        tuple: (queue_id, assigned_to_id, status, status_text, count) rows
+    """
+    global _cached
+    state = db_session.query(TicketCountState.version, TicketCountState.stale).filter(
+        TicketCountState.id == STATE_ID
+    ).first()
+    if state is None or state.stale:
+        try:
+            rebuild(db_session)
+        except IntegrityError:
+            db_session.rollback()  # Another request rebuilt it first
+        return load_cells(db_session)
+
+    with _lock:
+        if _cached and _cached[0] == state.version:
+            return _cached[1]
+
+    cells = tuple(db_session.query(
+        TicketCount.queue_id, TicketCount.assigned_to_id, TicketCount.status,
+        TicketCount.status_text, TicketCount.ticket_count
+    ).filter(TicketCount.ticket_count > 0).all())
+    with _lock:
+        _cached = (state.version, cells)
+    return cells
+
+
+@functools.lru_cache(maxsize=1024)
+def _buckets_of(text):
+    return tuple(bucket for bucket in STATUS_BUCKETS if in_bucket(bucket, text))
+
+
+def _expand(statuses):
+    """Counters from {(status, status_text): count}"""
+    counts = empty_counts()
+    resolved = {status.name for status in RESOLVED_STATUSES}
+    for (status, text), count in statuses.items():
+        counts['total'] += count
+        for bucket in _buckets_of(text):
+            counts[bucket] += count
+        if status:
+            counts['statuses'][status] += count
+            if status not in resolved:
+                counts['unresolved'] += count
+    return counts
+
+
+def _from_cells(db_session, user_id, queue_ids):
+    """The same counters summed from the ticket_counts cells"""
+    allowed = None if queue_ids is None else set(queue_ids)
+    everyone, mine = {}, {}
+    for queue_id, assigned_to_id, status, text, count in load_cells(db_session):
+        if allowed is not None and queue_id not in allowed:
+            continue
+        queue_key = queue_id or None
+        everyone.setdefault(queue_key, Counter())[(status, text)] += count
+        if user_id is not None and assigned_to_id == user_id:
+            mine.setdefault(queue_key, Counter())[(status, text)] += count
+
+    groups = {}
+    for queue_key, statuses in everyone.items():
+        groups[queue_key] = _expand(statuses)
+        if user_id is not None:
+            groups[queue_key]['mine'] = _expand(mine.get(queue_key, {}))
+    return groups
+
+
+def count_tickets(db_session, user_id=None, queue_ids=None, visible_to=None,
+                  countries=None, since=None, by_queue=False):
+    """
+    Ticket counters for one permission scope.
+
+    Args:
+        db_session: Database session
+        user_id: Also count the tickets assigned to this user, under 'mine'
+        queue_ids: Only tickets in these queues (None for every queue)
+        visible_to: Only tickets this user requested or is assigned to
+        countries: Only tickets with Ticket.country in countries
+        since: Only tickets created at or after this datetime
+        by_queue: Also return the counters of each queue, under 'queues'
+
+    Returns:
+        dict: empty_counts() for the scope, plus 'mine' and 'queues'
+        ({queue_id or None: counters}) when asked for
+    """
+    if USE_COUNTS_TABLE and visible_to is None and countries is None and since is None:
+        groups = _from_cells(db_session, user_id, queue_ids)
+    else:
+        groups = _aggregate(db_session, user_id, queue_ids, visible_to, countries, since, by_queue)
+    return _result(groups, user_id, by_queue)
+
+
+def queue_totals(db_session, queue_ids=None):
+    """
+    Total and open (unresolved) ticket counts per queue, for the queue cards.
+
+    Returns:
+        dict: {queue_id: {'total': int, 'open': int}} for queues with tickets
+    """
+    queues = count_tickets(db_session, queue_ids=queue_ids, by_queue=True)['queues']
+    return {
+        queue_id: {'total': counts['total'], 'open': counts['unresolved']}
+        for queue_id, counts in queues.items() if queue_id is not None
+    }
@@ -0,0 +1,524 @@
+"""
+Server-side ticket grid for the ticket lists.
+
+tickets/list.html and tickets/list_sf.html used to receive the latest 500
+full Ticket objects (selectinloads of assignee, requester, queue and
+customer) and filter, sort and search them in the browser, so older tickets
+were cut off and the page grew with the ticket count. The pages now render
+an empty virtual-scrolling grid (static/js/ticket_grid.js) that asks for
+windows of rows as the user scrolls:
+
+    GET /tickets/grid?sort=created&dir=desc&status=New&q=macbook
+    GET /tickets/grid?<same filters>&cursor=<cursor>     -> next window
+
+Filters, sort and search run in SQL over a projection of the columns the
+grid shows. Windows are read in (sort key, id) keyset order, so a window
+costs the same however far the user has scrolled, and the SLA badges of a
+window are computed in one batch. The filtered total is only counted for
+the first window.
+
+The charts and the board summarise the whole filtered set, not the windows
+loaded so far:
+
+    GET /tickets/grid/summary?<same filters>   -> counts per status, queue,
+                                                  category and creation day
+"""
+import base64
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import String, and_, case, cast, func, or_
+from sqlalchemy.orm import aliased
+
+from models.customer_user import CustomerUser
+from models.queue import Queue
+from models.ticket import Ticket, TicketCategory, TicketPriority, TicketStatus
+from models.user import User, UserType
+from utils.ticket_counters import RESOLVED_STATUSES, STATUS_BUCKETS, bucket_condition
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = 100
+MAX_WINDOW_SIZE = 500
+TREND_DAYS = 7
+
+KNOWN_CARRIERS = ('singpost', 'dhl', 'fedex', 'ups', 'bluedart', 'dtdc')
+CUSTOM_CATEGORY_PREFIX = '[CUSTOM CATEGORY:'
+STALE_TRACKING_DAYS = 7
+OPEN_TOO_LONG_DAYS = 30
+
+Assignee = aliased(User)
+Requester = aliased(User)
+
+
+class InvalidGridRequest(ValueError):
+    """Unknown sort key or filter value, or a cursor that does not fit the request"""
+
+
+def _priority_rank():
+    return case(*[(Ticket.priority == priority, rank) for rank, priority in enumerate(TicketPriority)], else_=-1)
+
+
+def _iso(value):
+    return datetime.fromisoformat(value)
+
+
+# Sort key -> (SQL expression, cursor value parser). None never appears in the
+# expressions, so the (key, id) keyset comparisons see every row.
+SORT_KEYS = {
+    'id': (lambda: Ticket.id, int),
+    'created': (lambda: Ticket.created_at, _iso),
+    'updated': (lambda: func.coalesce(Ticket.updated_at, Ticket.created_at), _iso),
+    'subject': (lambda: func.lower(Ticket.subject), str),
+    'status': (lambda: func.lower(func.coalesce(Ticket.custom_status, cast(Ticket.status, String), '')), str),
+    'priority': (_priority_rank, int),
+    'category': (lambda: func.coalesce(cast(Ticket.category, String), ''), str),
+    'queue': (lambda: func.lower(func.coalesce(Queue.name, '')), str),
+    'owner': (lambda: func.lower(func.coalesce(Assignee.username, '')), str),
+    'carrier': (lambda: func.lower(func.coalesce(Ticket.shipping_carrier, '')), str),
+}
+
+
+def _columns():
+    """Everything the grid rows show, and nothing else"""
+    return [
+        Ticket.id, Ticket.subject, Ticket.status, Ticket.custom_status, Ticket.priority, Ticket.category,
+        Ticket.queue_id, Queue.name.label('queue_name'),
+        Ticket.assigned_to_id, Assignee.username.label('assignee'),
+        Ticket.requester_id, Requester.company_id.label('company_id'),
+        CustomerUser.name.label('customer_name'),
+        Ticket.created_at, Ticket.updated_at,
+        Ticket.shipping_tracking, Ticket.shipping_carrier, Ticket.shipping_status,
+        Ticket.shipping_tracking_created_at,
+        Ticket.return_tracking, Ticket.return_carrier, Ticket.return_status,
+        Ticket.item_packed, Ticket.item_packed_at,
+        # Custom categories are named at the start of the description
+        case((Ticket.category.is_(None), func.substr(Ticket.description, 1, 150))).label('category_tag'),
+    ]
+
+
+def encode_cursor(sort, direction, value, row_id):
+    payload = {
+        's': sort,
+        'd': direction,
+        'v': value.isoformat() if isinstance(value, datetime) else value,
+        'i': row_id,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort, direction):
+    """
+    Decode a cursor from encode_cursor for the same sort.
+
+    Returns:
+        tuple: (sort key value, row_id)
+
+    Raises:
+        InvalidGridRequest
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if (payload['s'], payload['d']) != (sort, direction):
+            raise InvalidGridRequest('cursor belongs to another sort order')
+        return SORT_KEYS[sort][1](payload['v']), int(payload['i'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidGridRequest(f"invalid cursor: {e}")
+
+
+def _members(enum, values):
+    """Enum members named by their name, value or display value (without ' (claw)')"""
+    wanted = set(values)
+    return [member for member in enum
+            if {member.name, member.value, member.value.replace(' (claw)', '')} & wanted]
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise InvalidGridRequest(f"{name} must be YYYY-MM-DD")
+
+
+def parse_filters(args):
+    """
+    Grid filters from request args. Keys that take several values are
+    repeated (status=New&status=On Hold).
+
+    Args:
+        args: werkzeug MultiDict (request.args)
+
+    Returns:
+        dict: Keyword arguments for grid_window()
+    """
+    filters = {
+        'statuses': args.getlist('status'),
+        'priorities': args.getlist('priority'),
+        'categories': args.getlist('category'),
+        'exclude_categories': args.getlist('exclude_category'),
+        'carriers': [carrier.lower() for carrier in args.getlist('carrier')],
+        'terms': [term.strip() for term in args.getlist('term') if term.strip()],
+        'search': (args.get('q') or '').strip() or None,
+        'bucket': args.get('bucket') or None,
+        'tracking': args.get('tracking') or None,
+        'problem': args.get('problem') or None,
+        'mine': args.get('mine') or None,
+        'open_only': args.get('open', 'false').lower() == 'true',
+    }
+    try:
+        filters['queue_ids'] = [int(queue_id) for queue_id in args.getlist('queue_id')]
+        filters['created_days'] = int(args['days']) if args.get('days') else None
+    except ValueError:
+        raise InvalidGridRequest("queue_id and days must be integers")
+    filters['date_from'] = _parse_date(args['date_from'], 'date_from') if args.get('date_from') else None
+    filters['date_to'] = _parse_date(args['date_to'], 'date_to') if args.get('date_to') else None
+
+    if filters['bucket'] and filters['bucket'] not in STATUS_BUCKETS:
+        raise InvalidGridRequest(f"unknown bucket {filters['bucket']!r}")
+    if filters['mine'] not in (None, 'assigned', 'requested'):
+        raise InvalidGridRequest("mine must be 'assigned' or 'requested'")
+    return filters
+
+
+def scope_condition(db_session, user):
+    """Which tickets the user may list (same rules as TicketStore.get_user_tickets)"""
+    if user.is_super_admin or user.is_developer:
+        return None
+    if user.user_type in (UserType.COUNTRY_ADMIN, UserType.SUPERVISOR):
+        return Ticket.queue_id.in_(list(user.get_accessible_queue_ids(db_session) or ()))
+    return or_(Ticket.requester_id == user.id, Ticket.assigned_to_id == user.id)
+
+
+def can_view_ticket(db_session, user, ticket_id):
+    """Whether the ticket is within scope_condition for the user"""
+    query = db_session.query(Ticket.id).filter(Ticket.id == ticket_id)
+    condition = scope_condition(db_session, user)
+    if condition is not None:
+        query = query.filter(condition)
+    return query.first() is not None
+
+
+def _not_resolved():
+    return or_(Ticket.status.is_(None), Ticket.status.notin_(RESOLVED_STATUSES))
+
+
+def _has_tracking():
+    return and_(Ticket.shipping_tracking.isnot(None), func.trim(Ticket.shipping_tracking) != '')
+
+
+def _tracking_text():
+    return func.lower(func.coalesce(Ticket.shipping_status, 'pending'))
+
+
+def _delivered():
+    text = _tracking_text()
+    return or_(text.like('%delivered%'), text.like('%received%'))
+
+
+def _tracking_condition(tracking):
+    text = _tracking_text()
+    conditions = {
+        'no_tracking': lambda: ~_has_tracking(),
+        'in_transit': lambda: or_(text.like('%transit%'), text.like('%shipped%')),
+        'out_for_delivery': lambda: text.like('%out for delivery%'),
+        'delivered': _delivered,
+        'pending': lambda: text.in_(['pending', '']),
+    }
+    if tracking not in conditions:
+        raise InvalidGridRequest(f"unknown tracking filter {tracking!r}")
+    return conditions[tracking]()
+
+
+def _problem_condition(problem, now):
+    has_carrier = and_(Ticket.shipping_carrier.isnot(None), func.trim(Ticket.shipping_carrier) != '')
+    stale_before = now - timedelta(days=STALE_TRACKING_DAYS)
+    conditions = {
+        'delivered_not_closed': lambda: _delivered(),
+        'no_tracking': lambda: ~_has_tracking(),
+        'stale_tracking': lambda: and_(
+            _has_tracking(), ~_delivered(),
+            func.coalesce(Ticket.updated_at, Ticket.created_at) <= stale_before,
+        ),
+        'open_30_days': lambda: Ticket.created_at <= now - timedelta(days=OPEN_TOO_LONG_DAYS),
+        'no_carrier': lambda: and_(_has_tracking(), ~has_carrier),
+    }
+    if problem not in conditions:
+        raise InvalidGridRequest(f"unknown problem filter {problem!r}")
+    return and_(_not_resolved(), conditions[problem]())
+
+
+def _search_condition(term):
+    """Case number, subject, description, notes, return description or customer"""
+    pattern = f'%{term}%'
+    clauses = [
+        Ticket.subject.ilike(pattern),
+        Ticket.description.ilike(pattern),
+        Ticket.notes.ilike(pattern),
+        Ticket.return_description.ilike(pattern),
+        Ticket.firstbaseorderid.ilike(pattern),
+        CustomerUser.name.ilike(pattern),
+    ]
+    number = term.upper().removeprefix('TICK-').removeprefix('#')
+    if number.isdigit():
+        clauses.append(Ticket.id == int(number))
+    return or_(*clauses)
+
+
+def _conditions(user_id, statuses=(), priorities=(), categories=(), exclude_categories=(), carriers=(),
+                terms=(), search=None, bucket=None, tracking=None, problem=None, mine=None, open_only=False,
+                queue_ids=(), created_days=None, date_from=None, date_to=None):
+    now = datetime.utcnow()
+    conditions = []
+    if statuses:
+        conditions.append(or_(
+            Ticket.custom_status.in_(statuses),
+            and_(Ticket.custom_status.is_(None), Ticket.status.in_(_members(TicketStatus, statuses))),
+        ))
+    if bucket:
+        conditions.append(bucket_condition(bucket))
+    if priorities:
+        conditions.append(Ticket.priority.in_(_members(TicketPriority, priorities)))
+    if categories:
+        clauses = [Ticket.category.in_(_members(TicketCategory, categories))]
+        if 'Custom' in categories:
+            clauses.append(Ticket.category.is_(None))
+        conditions.append(or_(*clauses))
+    if exclude_categories:
+        conditions.append(or_(
+            Ticket.category.is_(None), Ticket.category.notin_(_members(TicketCategory, exclude_categories))
+        ))
+    if carriers:
+        carrier = func.lower(Ticket.shipping_carrier)
+        clauses = [carrier.in_([c for c in carriers if c != 'other'])]
+        if 'other' in carriers:
+            clauses.append(and_(carrier.notin_(KNOWN_CARRIERS), func.trim(carrier) != ''))
+        conditions.append(or_(*clauses))
+    if queue_ids:
+        conditions.append(Ticket.queue_id.in_(queue_ids))
+    if tracking:
+        conditions.append(_tracking_condition(tracking))
+    if problem:
+        conditions.append(_problem_condition(problem, now))
+    if open_only:
+        conditions.append(_not_resolved())
+    if mine == 'assigned':
+        conditions.append(Ticket.assigned_to_id == user_id)
+    elif mine == 'requested':
+        conditions.append(Ticket.requester_id == user_id)
+    if created_days is not None:
+        conditions.append(Ticket.created_at >= now - timedelta(days=created_days))
+    if date_from:
+        conditions.append(Ticket.created_at >= date_from)
+    if date_to:
+        conditions.append(Ticket.created_at < date_to + timedelta(days=1))
+    if terms:
+        conditions.append(or_(*[_search_condition(term) for term in terms]))
+    elif search:
+        conditions.append(_search_condition(search))
+    return conditions
+
+
+def _custom_category_names(db_session, rows):
+    """{category name: display name} for the custom-category tickets in rows"""
+    from models.ticket_category_config import TicketCategoryConfig
+
+    names = {_custom_category(row) for row in rows} - {None}
+    if not names:
+        return {}
+    configs = db_session.query(TicketCategoryConfig.name, TicketCategoryConfig.display_name).filter(
+        TicketCategoryConfig.name.in_(names)
+    ).all()
+    return dict(configs)
+
+
+def _custom_category(row):
+    tag = row.category_tag
+    if not tag or not tag.startswith(CUSTOM_CATEGORY_PREFIX) or ']' not in tag:
+        return None
+    return tag[len(CUSTOM_CATEGORY_PREFIX):tag.find(']')].strip() or None
+
+
+def _category_label(row, custom_names):
+    """Same text as Ticket.get_category_display_name()"""
+    if row.category:
+        return row.category.value.replace(' (claw)', '')
+    name = _custom_category(row)
+    if name is None:
+        return 'Custom'
+    return custom_names.get(name) or name.replace('_', ' ').title()
+
+
+def _status_label(status, custom_status):
+    """Same text as the status column of a grid row"""
+    return custom_status or (status.value if status else 'NEW')
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _row_dict(row, sla, custom_names):
+    return {
+        'id': row.id,
+        'display_id': f'TICK-{row.id:04d}',
+        'subject': (row.subject or '').replace(' (claw)', ''),
+        'status': _status_label(row.status, row.custom_status),
+        'status_name': row.status.name if row.status else None,
+        'custom_status': row.custom_status,
+        'priority': row.priority.value if row.priority else 'Medium',
+        'category': _category_label(row, custom_names),
+        'category_name': row.category.name if row.category else None,
+        'queue_id': row.queue_id,
+        'queue': row.queue_name,
+        'assigned_to_id': row.assigned_to_id,
+        'assignee': row.assignee or '',
+        'requester_id': row.requester_id,
+        'company_id': row.company_id,
+        'customer_name': row.customer_name or '',
+        'created_at': _isoformat(row.created_at),
+        'updated_at': _isoformat(row.updated_at),
+        'shipping_tracking': row.shipping_tracking,
+        'shipping_carrier': row.shipping_carrier,
+        'shipping_status': row.shipping_status,
+        'shipping_tracking_created_at': _isoformat(row.shipping_tracking_created_at),
+        'return_tracking': row.return_tracking,
+        'return_carrier': row.return_carrier,
+        'return_status': row.return_status,
+        'item_packed': row.item_packed or False,
+        'item_packed_at': _isoformat(row.item_packed_at),
+        'sla_status': sla.get('status'),
+        'sla_days_remaining': sla.get('days_remaining'),
+        'sla_due_date': sla.get('due_date'),
+    }
+
+
+def _filter_conditions(db_session, user, filters):
+    conditions = _conditions(user.id, **filters)
+    scope = scope_condition(db_session, user)
+    if scope is not None:
+        conditions.append(scope)
+    return conditions
+
+
+def grid_summary(db_session, user, trend_days=TREND_DAYS, **filters):
+    """
+    Counts over every ticket that matches the grid filters.
+
+    Args:
+        db_session: Database session
+        user: User the list is for (permission scope, "mine" filters)
+        trend_days: Days (ending today, UTC) counted in created_per_day
+        **filters: From parse_filters()
+
+    Returns:
+        dict: {'total': n, 'statuses': {status text: n}, 'queues': {queue
+        name, '' for none: n}, 'categories': {category, 'Custom' for custom
+        categories: n}, 'created_per_day': {'YYYY-MM-DD': n}}
+    """
+    conditions = _filter_conditions(db_session, user, filters)
+
+    def grouped(*columns, where=()):
+        query = db_session.query(*columns, func.count(Ticket.id)).select_from(Ticket)\
+            .outerjoin(Queue, Queue.id == Ticket.queue_id)\
+            .outerjoin(CustomerUser, CustomerUser.id == Ticket.customer_id)\
+            .filter(*conditions, *where)
+        return query.group_by(*columns).all()
+
+    statuses = {}
+    for status, custom_status, count in grouped(Ticket.status, Ticket.custom_status):
+        label = _status_label(status, custom_status)
+        statuses[label] = statuses.get(label, 0) + count
+
+    categories = {}
+    for category, count in grouped(Ticket.category):
+        label = category.value.replace(' (claw)', '') if category else 'Custom'
+        categories[label] = categories.get(label, 0) + count
+
+    since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=trend_days - 1)
+    # func.date() is a 'YYYY-MM-DD' string on SQLite and a date on MySQL
+    created = {str(date): count for date, count in grouped(func.date(Ticket.created_at),
+                                                             where=[Ticket.created_at >= since])}
+    days = [(since + timedelta(days=offset)).date().isoformat() for offset in range(trend_days)]
+
+    return {
+        'total': sum(statuses.values()),
+        'statuses': statuses,
+        'queues': {name or '': count for name, count in grouped(Queue.name)},
+        'categories': categories,
+        'created_per_day': {day: created.get(day, 0) for day in days},
+    }
+
+
+def grid_window(db_session, user, sort='created', direction='desc', cursor=None,
+                limit=DEFAULT_WINDOW_SIZE, **filters):
+    """
+    One window of the ticket grid.
+
+    Args:
+        db_session: Database session
+        user: User the list is for (permission scope, "mine" filters)
+        sort: Key of SORT_KEYS
+        direction: 'asc' or 'desc'
+        cursor: Cursor of the previous window, or None for the first one
+        limit: Rows per window (capped at MAX_WINDOW_SIZE)
+        **filters: From parse_filters()
+
+    Returns:
+        dict: {'tickets': [row dicts], 'cursor': str or None, 'has_more': bool,
+        'total': filtered ticket count (first window only, else None)}
+
+    Raises:
+        InvalidGridRequest
+    """
+    from utils.sla_calculator import get_batch_sla_status
+
+    if sort not in SORT_KEYS:
+        raise InvalidGridRequest(f"unknown sort {sort!r}")
+    if direction not in ('asc', 'desc'):
+        raise InvalidGridRequest("dir must be 'asc' or 'desc'")
+    limit = max(1, min(int(limit), MAX_WINDOW_SIZE))
+
+    conditions = _filter_conditions(db_session, user, filters)
+
+    sort_expr = SORT_KEYS[sort][0]()
+    query = db_session.query(*_columns(), sort_expr.label('sort_key')).select_from(Ticket)\
+        .outerjoin(Queue, Queue.id == Ticket.queue_id)\
+        .outerjoin(Assignee, Assignee.id == Ticket.assigned_to_id)\
+        .outerjoin(Requester, Requester.id == Ticket.requester_id)\
+        .outerjoin(CustomerUser, CustomerUser.id == Ticket.customer_id)\
+        .filter(*conditions)
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort, direction)
+        if direction == 'desc':
+            query = query.filter(or_(sort_expr < value, and_(sort_expr == value, Ticket.id < row_id)))
+        else:
+            query = query.filter(or_(sort_expr > value, and_(sort_expr == value, Ticket.id > row_id)))
+    if direction == 'desc':
+        query = query.order_by(sort_expr.desc(), Ticket.id.desc())
+    else:
+        query = query.order_by(sort_expr.asc(), Ticket.id.asc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    total = None
+    if not cursor:
+        count_query = db_session.query(func.count(Ticket.id)).select_from(Ticket)
+        if filters.get('search') or filters.get('terms'):
+            count_query = count_query.outerjoin(CustomerUser, CustomerUser.id == Ticket.customer_id)
+        total = count_query.filter(*conditions).scalar()
+
+    sla = get_batch_sla_status(rows, db=db_session)
+    custom_names = _custom_category_names(db_session, rows)
+    return {
+        'tickets': [_row_dict(row, sla.get(row.id, {}), custom_names) for row in rows],
+        'cursor': encode_cursor(sort, direction, rows[-1].sort_key, rows[-1].id) if has_more else None,
+        'has_more': has_more,
+        'total': total,
+    }
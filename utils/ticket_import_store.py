@@ -4,7 +4,6 @@ from models.queue import Queue
 from models.customer_user import CustomerUser
 from models.company import Company
 from models.enums import Country
-import pandas as pd
 import csv
 import io
 from datetime import datetime
@@ -0,0 +1,205 @@
+"""
+Automatic ticket status rules.
+
+The Asset Return (Claw) auto-progress / auto-close logic used to live twice
+in routes/tickets.py: view_ticket changed the status of the ticket being
+looked at on every page view, and refresh_all_statuses loaded every open
+ticket as an ORM object to run the same checks in Python. Each rule is now
+a SQL condition that compiles to one SELECT (what would change) and one
+bulk UPDATE per chunk, with a ticket_status_changes row per changed ticket:
+
+    changes = apply_rules(db_session)                   # every ticket
+    changes = apply_rules(db_session, dry_run=True)     # report only
+
+Rules also run automatically, for the affected tickets only, whenever a
+flush changes a ticket's category or shipping/replacement tracking fields
+(the tracking refresh routes, mark-received buttons, imports), so statuses
+follow the tracking updates rather than page views.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import and_, event, func, insert, inspect, not_, or_, select, update
+from sqlalchemy.orm import Session
+
+from models.ticket import Ticket, TicketCategory, TicketStatus
+from models.ticket_count import CHANGED_KEY, TRACKED_COLUMNS, apply_deltas, ticket_cell
+from models.ticket_status_change import TicketStatusChange
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+UPDATE_CHUNK_SIZE = 500
+
+# Ticket columns whose changes can make a rule match
+TRIGGER_COLUMNS = ('category', 'shipping_status', 'shipping_tracking', 'replacement_status', 'replacement_tracking')
+
+UNRESOLVED_STATUSES = (TicketStatus.NEW, TicketStatus.IN_PROGRESS, TicketStatus.PROCESSING, TicketStatus.ON_HOLD)
+
+
+def _received(column):
+    """Tracking status says 'received' or 'delivered' (case-insensitive)"""
+    text = func.lower(column)
+    return or_(text.like('%received%'), text.like('%delivered%'))
+
+
+def _filled(column):
+    return and_(column.isnot(None), func.trim(column) != '')
+
+
+def _claw_return_complete():
+    # No replacement: close when the return is received.
+    # With a replacement: close when both shipments are received.
+    return and_(
+        Ticket.category == TicketCategory.ASSET_RETURN_CLAW,
+        _received(Ticket.shipping_status),
+        or_(not_(_filled(Ticket.replacement_tracking)), _received(Ticket.replacement_status)),
+    )
+
+
+def _claw_return_started():
+    return and_(
+        Ticket.category == TicketCategory.ASSET_RETURN_CLAW,
+        or_(
+            and_(Ticket.shipping_tracking.isnot(None), Ticket.shipping_tracking != ''),  # Return label sent
+            and_(Ticket.shipping_status.isnot(None), Ticket.shipping_status != '',
+                 Ticket.shipping_status.notin_(['Pending', 'Information Received'])),  # Customer shipped
+            _received(Ticket.shipping_status),
+            _received(Ticket.replacement_status),
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class StatusRule:
+    """
+    Move tickets matching condition from one of from_statuses to to_status.
+
+    Args:
+        name: Recorded in ticket_status_changes.rule
+        from_statuses: Statuses the rule applies to
+        to_status: Status it sets (custom_status is cleared)
+        condition: Callable returning the SQL condition on Ticket columns
+        note: Appended to ticket.notes with a timestamp, if set
+    """
+    name: str
+    from_statuses: Tuple[TicketStatus, ...]
+    to_status: TicketStatus
+    condition: Callable
+    note: Optional[str] = None
+
+    def where(self, ticket_ids=None):
+        clauses = [Ticket.status.in_(self.from_statuses), self.condition()]
+        if ticket_ids is not None:
+            clauses.append(Ticket.id.in_(list(ticket_ids)))
+        return and_(*clauses)
+
+
+# Evaluated in order; a ticket changes at most once per run
+RULES = (
+    StatusRule('claw_return_closed', UNRESOLVED_STATUSES, TicketStatus.RESOLVED, _claw_return_complete,
+               note='Ticket auto-closed: Return received at warehouse. Case completed!'),
+    StatusRule('claw_return_in_progress', (TicketStatus.NEW,), TicketStatus.IN_PROGRESS, _claw_return_started),
+)
+
+
+def apply_rules(db_session, ticket_ids=None, dry_run=False, trigger='bulk_refresh', user_id=None, rules=RULES):
+    """
+    Apply the status rules with set-based statements in db_session's transaction.
+
+    Args:
+        db_session: Database session (the caller commits)
+        ticket_ids: Only consider these tickets (None for all)
+        dry_run: Only report what would change
+        trigger: Recorded in ticket_status_changes.trigger
+        user_id: User who triggered the run, if any
+        rules: StatusRules to apply, in order
+
+    Returns:
+        list: {'ticket_id', 'rule', 'old_status', 'new_status'} per change
+    """
+    if ticket_ids is not None and not ticket_ids:
+        return []
+    connection = db_session.connection()
+    table = Ticket.__table__
+    columns = [table.c.id] + [table.c[column] for column in TRACKED_COLUMNS]
+
+    changes = []
+    changed = set()
+    deltas = {}
+    now = datetime.utcnow()
+    for rule in rules:
+        rows = [row for row in connection.execute(select(*columns).where(rule.where(ticket_ids))).mappings()
+                if row['id'] not in changed]
+        if not rows:
+            continue
+        ids = [row['id'] for row in rows]
+        changed.update(ids)
+        for row in rows:
+            changes.append({
+                'ticket_id': row['id'],
+                'rule': rule.name,
+                'old_status': row['status'].name if row['status'] else None,
+                'new_status': rule.to_status.name,
+            })
+        if dry_run:
+            continue
+
+        values = {'status': rule.to_status, 'custom_status': None, 'updated_at': now}
+        if rule.note:
+            line = f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M')}] {rule.note}"
+            values['notes'] = func.coalesce(table.c.notes, '') + line
+        for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+            chunk = ids[start:start + UPDATE_CHUNK_SIZE]
+            connection.execute(
+                update(table).where(table.c.id.in_(chunk), table.c.status.in_(rule.from_statuses)).values(**values)
+            )
+        for row in rows:
+            old_cell = ticket_cell(row)
+            new_cell = ticket_cell(dict(row, status=rule.to_status, custom_status=None))
+            deltas[old_cell] = deltas.get(old_cell, 0) - 1
+            deltas[new_cell] = deltas.get(new_cell, 0) + 1
+        logger.info(f"Rule {rule.name}: {len(ids)} tickets -> {rule.to_status.name} ({trigger})")
+
+    if changes and not dry_run:
+        connection.execute(insert(TicketStatusChange.__table__), [
+            dict(change, trigger=trigger, user_id=user_id, created_at=now) for change in changes
+        ])
+        if apply_deltas(connection, deltas):
+            db_session.info[CHANGED_KEY] = True  # Version bumped after the commit
+        from utils.cache import invalidate_on_commit
+        invalidate_on_commit(db_session, 'tickets')
+        _expire_changed(db_session, changed)
+    return changes
+
+
+def _expire_changed(db_session, ticket_ids):
+    """Reload the status of changed tickets the session already holds"""
+    for obj in list(db_session.identity_map.values()):
+        if isinstance(obj, Ticket) and obj.id in ticket_ids:
+            db_session.expire(obj, ['status', 'custom_status', 'notes', 'updated_at'])
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_tracking_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Ticket):
+            continue
+        state = inspect(obj)
+        if obj in session.new or any(state.attrs[column].history.has_changes() for column in TRIGGER_COLUMNS):
+            session.info.setdefault('ticket_rules_pending', set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _apply_rules_to_flushed_tickets(session, flush_context):
+    ticket_ids = session.info.pop('ticket_rules_pending', None)
+    if ticket_ids:
+        apply_rules(session, ticket_ids=ticket_ids, trigger='tracking')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_tracking_changes(session):
+    session.info.pop('ticket_rules_pending', None)
+
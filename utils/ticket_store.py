@@ -1,8 +1,5 @@
-import json
-import os
 from datetime import datetime
 from models.ticket import Ticket, TicketPriority
-from models.shipment import Shipment
 from models.user import UserType
 from utils.db_manager import DatabaseManager
 from sqlalchemy.orm import selectinload, load_only
@@ -43,95 +40,33 @@ def clear_ticket_cache(user_id=None):
 
 
 class TicketStore:
+    """
+    Tickets and composer templates, read from the database on use. The
+    store used to parse data/tickets.json into transient Ticket objects in
+    every worker at import; nothing is loaded up front any more.
+    """
     def __init__(self):
-        self.tickets = {}
-        self.TICKETS_FILE = 'data/tickets.json'
         self.db_manager = DatabaseManager()
-        self.load_tickets()
-
-    def load_tickets(self):
-        """Load tickets from JSON file"""
-        if os.path.exists(self.TICKETS_FILE):
-            with open(self.TICKETS_FILE, 'r') as f:
-                tickets_data = json.load(f)
-                for ticket_data in tickets_data:
-                    ticket = Ticket(
-                        id=ticket_data['id'],
-                        subject=ticket_data['subject'],
-                        description=ticket_data['description'],
-                        requester_id=ticket_data['requester_id'],
-                        status=ticket_data['status'],
-                        priority=ticket_data['priority'],
-                        category=ticket_data['category'],
-                        created_at=datetime.fromisoformat(ticket_data['created_at']),
-                        updated_at=datetime.fromisoformat(ticket_data['updated_at'])
-                    )
-                    
-                    # Restore additional fields
-                    ticket.assigned_to_id = ticket_data.get('assigned_to_id')
-                    ticket.queue_id = ticket_data.get('queue_id')
-                    ticket.asset_id = ticket_data.get('asset_id')
-                    ticket.accessory_id = ticket_data.get('accessory_id')
-
-                    # Restore shipment if exists
-                    if ticket_data.get('shipment'):
-                        ticket.shipment = Shipment.from_dict(ticket_data['shipment'])
-
-                    ticket.rma_status = ticket_data.get('rma_status')
-                    ticket.warranty_number = ticket_data.get('warranty_number')
-                    ticket.serial_number = ticket_data.get('serial_number')
-                    
-                    if ticket_data.get('return_tracking'):
-                        ticket.return_tracking = Shipment.from_dict(ticket_data['return_tracking'])
-                    if ticket_data.get('replacement_tracking'):
-                        ticket.replacement_tracking = Shipment.from_dict(ticket_data['replacement_tracking'])
-                    
-                    # Load shipping information
-                    ticket.shipping_tracking = ticket_data.get('shipping_tracking')
-                    ticket.shipping_address = ticket_data.get('shipping_address')
-                    ticket.shipping_status = ticket_data.get('shipping_status')
-                    ticket.shipping_history = ticket_data.get('shipping_history', [])
-                    ticket.shipping_carrier = ticket_data.get('shipping_carrier', 'singpost')
-                    ticket.customer_id = ticket_data.get('customer_id')
-
-                    self.tickets[ticket.id] = ticket
-
-    def save_tickets(self):
-        """Save tickets to JSON file"""
-        os.makedirs(os.path.dirname(self.TICKETS_FILE), exist_ok=True)
-        tickets_data = []
-        for ticket in self.tickets.values():
-            ticket_data = {
-                'id': ticket.id,
-                'subject': ticket.subject,
-                'description': ticket.description,
-                'requester_id': ticket.requester_id,
-                'status': ticket.status,
-                'priority': ticket.priority,
-                'category': ticket.category,
-                'created_at': ticket.created_at.isoformat(),
-                'updated_at': ticket.updated_at.isoformat(),
-                'assigned_to_id': ticket.assigned_to_id,
-                'queue_id': ticket.queue_id,
-                'asset_id': ticket.asset_id,
-                'accessory_id': ticket.accessory_id,
-                'shipment': ticket.shipment.to_dict() if ticket.shipment else None,
-                'rma_status': ticket.rma_status,
-                'warranty_number': ticket.warranty_number,
-                'serial_number': ticket.serial_number,
-                'return_tracking': ticket.return_tracking.to_dict() if ticket.return_tracking else None,
-                'replacement_tracking': ticket.replacement_tracking.to_dict() if ticket.replacement_tracking else None,
-                'shipping_tracking': ticket.shipping_tracking,
-                'shipping_address': ticket.shipping_address,
-                'shipping_status': ticket.shipping_status,
-                'shipping_history': getattr(ticket, 'shipping_history', []),
-                'shipping_carrier': getattr(ticket, 'shipping_carrier', 'singpost'),
-                'customer_id': ticket.customer_id
-            }
-            tickets_data.append(ticket_data)
-
-        with open(self.TICKETS_FILE, 'w') as f:
-            json.dump(tickets_data, f, indent=2)
+
+    def save_ticket(self, ticket):
+        """
+        Persist changes made to a ticket returned by get_ticket() (a detached
+        object, so it is merged into a new session).
+
+        Args:
+            ticket: Ticket object
+
+        Returns:
+            Ticket: The persisted ticket
+        """
+        db_session = self.db_manager.get_session()
+        try:
+            ticket = db_session.merge(ticket)
+            db_session.commit()
+            clear_ticket_cache()
+            return ticket
+        finally:
+            db_session.close()
 
     def create_ticket(self, subject, description, requester_id, category=None, priority='Medium',
                      asset_id=None, country=None, damage_description=None, apple_diagnostics=None,
@@ -276,10 +211,12 @@ class TicketStore:
                         Ticket.return_tracking, Ticket.return_carrier, Ticket.return_status,
                         Ticket.item_packed, Ticket.item_packed_at,
                         Ticket.replacement_tracking, Ticket.replacement_status,
+                        # Rendered into data-* attributes for the list's client-side search
+                        Ticket.description, Ticket.notes, Ticket.return_description,
                     )
                 )\
                 .options(selectinload(Ticket.assigned_to).load_only(User.id, User.username))\
-                .options(selectinload(Ticket.requester).load_only(User.id, User.username))\
+                .options(selectinload(Ticket.requester).load_only(User.id, User.username, User.company_id))\
                 .options(selectinload(Ticket.queue).load_only(Queue.id, Queue.name))\
                 .options(selectinload(Ticket.customer).load_only(CustomerUser.id, CustomerUser.name))
 
@@ -335,210 +272,102 @@ class TicketStore:
         Returns:
             dict with keys: total, open, in_progress, resolved, on_hold, my_tickets
         """
-        from models.ticket import Ticket, TicketStatus
-        from sqlalchemy import func, case, or_
+        from utils.ticket_counters import count_tickets
 
         db_session = self.db_manager.get_session()
         try:
-            # Base query - same permission logic as get_user_tickets
-            query = db_session.query(Ticket)
-
-            # Apply user permission filters
+            # Same permission logic as get_user_tickets, all buckets in one pass
             if user_type in [UserType.SUPER_ADMIN, UserType.DEVELOPER]:
-                pass  # Can see all tickets
+                counts = count_tickets(db_session, user_id=user_id)
             elif user_type in [UserType.COUNTRY_ADMIN, UserType.SUPERVISOR]:
-                if queue_ids is not None:
-                    query = query.filter(Ticket.queue_id.in_(queue_ids))
+                counts = count_tickets(db_session, user_id=user_id, queue_ids=queue_ids)
             else:
-                query = query.filter(
-                    (Ticket.requester_id == user_id) |
-                    (Ticket.assigned_to_id == user_id)
-                )
-
-            # Get total count
-            total = query.count()
+                counts = count_tickets(db_session, user_id=user_id, visible_to=user_id)
 
-            # Get counts by status category using CASE statements
-            # Use custom_status if set, otherwise use status
-            status_expr = case(
-                (Ticket.custom_status.isnot(None), func.lower(Ticket.custom_status)),
-                else_=func.lower(Ticket.status)
-            )
-
-            # Count "open" statuses
-            open_count = query.filter(
-                or_(
-                    status_expr == 'new',
-                    status_expr == 'open',
-                    status_expr.like('%new%')
-                )
-            ).count()
-
-            # Count "in progress" statuses
-            in_progress_count = query.filter(
-                or_(
-                    status_expr == 'in progress',
-                    status_expr == 'in_progress',
-                    status_expr == 'processing',
-                    status_expr.like('%progress%'),
-                    status_expr.like('%processing%')
-                )
-            ).count()
-
-            # Count "resolved" statuses
-            resolved_count = query.filter(
-                or_(
-                    status_expr == 'resolved',
-                    status_expr.like('%resolved%'),
-                    status_expr.like('%delivered%'),
-                    status_expr.like('%complete%')
-                )
-            ).count()
-
-            # Count "on hold" statuses
-            on_hold_count = query.filter(
-                or_(
-                    status_expr == 'on hold',
-                    status_expr == 'on_hold',
-                    status_expr.like('%hold%'),
-                    status_expr.like('%duplicate%'),
-                    status_expr.like('%cancel%')
-                )
-            ).count()
-
-            # Get "my tickets" count (assigned to current user)
-            my_tickets_query = query.filter(Ticket.assigned_to_id == user_id)
-            my_total = my_tickets_query.count()
-            my_open = my_tickets_query.filter(
-                or_(
-                    status_expr == 'new',
-                    status_expr == 'open',
-                    status_expr.like('%new%')
-                )
-            ).count()
-            my_in_progress = my_tickets_query.filter(
-                or_(
-                    status_expr == 'in progress',
-                    status_expr == 'in_progress',
-                    status_expr == 'processing',
-                    status_expr.like('%progress%'),
-                    status_expr.like('%processing%')
-                )
-            ).count()
-            my_on_hold = my_tickets_query.filter(
-                or_(
-                    status_expr == 'on hold',
-                    status_expr == 'on_hold',
-                    status_expr.like('%hold%'),
-                    status_expr.like('%duplicate%'),
-                    status_expr.like('%cancel%')
-                )
-            ).count()
-            my_resolved = my_tickets_query.filter(
-                or_(
-                    status_expr == 'resolved',
-                    status_expr.like('%resolved%'),
-                    status_expr.like('%delivered%'),
-                    status_expr.like('%complete%')
-                )
-            ).count()
-
-            return {
-                'total': total,
-                'open': open_count,
-                'in_progress': in_progress_count,
-                'resolved': resolved_count,
-                'on_hold': on_hold_count,
-                'my_tickets': {
-                    'total': my_total,
-                    'open': my_open,
-                    'in_progress': my_in_progress,
-                    'on_hold': my_on_hold,
-                    'resolved': my_resolved
-                }
-            }
+            buckets = ('total', 'open', 'in_progress', 'resolved', 'on_hold')
+            result = {bucket: counts[bucket] for bucket in buckets}
+            result['my_tickets'] = {bucket: counts['mine'][bucket] for bucket in buckets}
+            return result
         finally:
             db_session.close()
 
     def assign_ticket(self, ticket_id, assigned_to_id, queue_id):
         """Assign a ticket to a user and/or queue"""
-        ticket = self.tickets.get(ticket_id)
-        if ticket:
-            if assigned_to_id is not None:
-                ticket.assigned_to_id = assigned_to_id
-            if queue_id is not None:
-                ticket.queue_id = queue_id
-            ticket.updated_at = datetime.now()
-            self.save_tickets()  # Save after updating
-            # Clear ticket cache since a ticket was assigned
-            clear_ticket_cache()
-        return ticket
+        db_session = self.db_manager.get_session()
+        try:
+            ticket = db_session.query(Ticket).get(ticket_id)
+            if ticket:
+                if assigned_to_id is not None:
+                    ticket.assigned_to_id = assigned_to_id
+                if queue_id is not None:
+                    ticket.queue_id = queue_id
+                ticket.updated_at = datetime.now()
+                db_session.commit()
+                # Clear ticket cache since a ticket was assigned
+                clear_ticket_cache()
+            return ticket
+        finally:
+            db_session.close()
 
     def save_template(self, template):
-        """Save a ticket template"""
-        if not hasattr(self, 'templates'):
-            self.templates = []
-        
-        # Generate template ID if new
-        if 'id' not in template:
-            template['id'] = str(len(self.templates) + 1)
-            self.templates.append(template)
-        else:
-            # Update existing template
-            for i, t in enumerate(self.templates):
-                if t['id'] == template['id']:
-                    self.templates[i] = template
-                    break
-        
-        # Save templates to file
-        self._save_templates()
+        """
+        Save a ticket template.
+
+        Args:
+            template: dict with name, subject, description, category,
+                priority and required_fields; with 'id' to update an
+                existing template (the new id is set on it otherwise)
+        """
+        from models.ticket_template import TicketTemplate
+
+        fields = ('name', 'subject', 'description', 'category', 'priority', 'required_fields')
+        db_session = self.db_manager.get_session()
+        try:
+            row = db_session.get(TicketTemplate, int(template['id'])) if template.get('id') else None
+            if row is None:
+                row = TicketTemplate()
+                db_session.add(row)
+            for field in fields:
+                if field in template:
+                    setattr(row, field, template[field])
+            db_session.commit()
+            template['id'] = str(row.id)
+        finally:
+            db_session.close()
 
     def get_templates(self):
         """Get all saved templates"""
-        if not hasattr(self, 'templates'):
-            self._load_templates()
-        return self.templates
-
-    def _save_templates(self):
-        """Save templates to JSON file"""
-        templates_file = os.path.join(os.path.dirname(self.TICKETS_FILE), 'templates.json')
-        with open(templates_file, 'w') as f:
-            json.dump(self.templates, f, indent=2)
-
-    def _load_templates(self):
-        """Load templates from JSON file"""
-        self.templates = []
-        templates_file = os.path.join(os.path.dirname(self.TICKETS_FILE), 'templates.json')
-        if os.path.exists(templates_file):
-            with open(templates_file, 'r') as f:
-                self.templates = json.load(f) 
+        from models.ticket_template import TicketTemplate
+
+        db_session = self.db_manager.get_session()
+        try:
+            return [row.to_dict() for row in db_session.query(TicketTemplate).order_by(TicketTemplate.id)]
+        finally:
+            db_session.close()
 
     def delete_template(self, template_id):
         """Delete a template by ID"""
-        if not hasattr(self, 'templates'):
-            self._load_templates()
-        
-        self.templates = [t for t in self.templates if t['id'] != template_id]
-        self._save_templates() 
+        from models.ticket_template import TicketTemplate
+
+        if not str(template_id).isdigit():
+            return
+        db_session = self.db_manager.get_session()
+        try:
+            db_session.query(TicketTemplate).filter(TicketTemplate.id == int(template_id)).delete()
+            db_session.commit()
+        finally:
+            db_session.close()
 
     def get_asset_tickets(self, asset_id):
         """Get all tickets related to a specific asset"""
+        db_session = self.db_manager.get_session()
         try:
-            # Convert asset_id to string for comparison
-            asset_id = str(asset_id)
-            
-            # Filter tickets where asset_id matches
-            asset_tickets = [
-                ticket for ticket in self.tickets.values()
-                if str(ticket.asset_id) == asset_id
-            ]
-            
-            logger.info("Found {len(asset_tickets)} tickets for asset {asset_id}")  # Debug print
-            return asset_tickets
-            
-        except Exception as e:
-            logger.info("Error getting asset tickets: {str(e)}")
-            return [] 
+            return db_session.query(Ticket).filter(Ticket.asset_id == int(asset_id))\
+                .order_by(Ticket.created_at.desc()).all()
+        except (TypeError, ValueError):
+            return []
+        finally:
+            db_session.close()
 
     def update_ticket(self, ticket_id, **kwargs):
         """Update ticket details"""
@@ -580,25 +409,15 @@ class TicketStore:
             db_session.close()
 
     def clear_all_tickets(self):
-        """Clear all tickets from both database and JSON storage"""
-        # Clear from database
+        """Clear all tickets from the database"""
         db_session = self.db_manager.get_session()
         try:
             db_session.query(Ticket).delete()
             db_session.commit()
+            clear_ticket_cache()
         finally:
             db_session.close()
 
-        # Clear from JSON storage
-        self.tickets = {}
-        if os.path.exists(self.TICKETS_FILE):
-            os.remove(self.TICKETS_FILE)
-        else:
-            # Ensure the directory exists and create an empty tickets file
-            os.makedirs(os.path.dirname(self.TICKETS_FILE), exist_ok=True)
-            with open(self.TICKETS_FILE, 'w') as f:
-                json.dump([], f) 
-
     def _safely_assign_asset_to_ticket(self, ticket, asset, db_session):
         """
         Safely assign an asset to a ticket, checking for existing relationships first
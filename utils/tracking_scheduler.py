@@ -0,0 +1,457 @@
+"""
+Background tracking scheduler.
+
+Package statuses used to be refreshed only when someone opened a ticket,
+clicked "refresh" or ran the bulk refresh (which walks every open ticket
+in one request). The scheduler runs as its own process:
+
+    flask --app app tracking scheduler            # runs until stopped
+    flask --app app tracking scheduler --once     # one round, for cron
+    flask --app app tracking staleness            # staleness percentiles
+
+It keeps a plan of the packages of open tickets, ordered by a priority
+score, and refreshes them as each provider's budget allows:
+
+    score = hours since last check / check interval of the status
+            x status weight x ticket age factor x SLA risk factor
+
+A package is due once its check interval has passed ("Out for Delivery"
+every hour, "In Transit" every 3 hours, "Pending" every 12 hours, others
+every 6 hours). Delivered/received packages (is_done) are never polled. SingPost
+numbers go to the SingPost API in batches of up to 10, behind its rate
+limiter; other carriers go to Ship24 via Oxylabs one at a time. Both have
+an hourly budget (TRACKING_SINGPOST_PER_HOUR, TRACKING_OXYLABS_PER_HOUR).
+The carrier's status is written as is (like the bulk refresh) to the ticket
+status fields and through TrackingCache,
+whose tracking_history.last_updated is the "last checked" time. Failed
+lookups back off exponentially, in memory.
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, func, or_, select
+
+from models.ticket import Ticket, TicketStatus
+from models.tracking_history import TrackingHistory
+from utils.singpost_tracking import (RateLimiter, get_rate_limiter, get_singpost_tracking_client,
+                                     is_singpost_tracking_number)
+from utils.tracking_cache import TrackingCache
+
+# Set up logging for this module
+logger = logging.getLogger(__name__)
+
+# Package slots of a ticket: (tracking column, carrier column, status column, TrackingCache tracking_type)
+SLOTS = (
+    ('shipping_tracking', 'shipping_carrier', 'shipping_status', 'primary'),
+    ('shipping_tracking_2', 'shipping_carrier_2', 'shipping_status_2', 'package_2'),
+    ('shipping_tracking_3', 'shipping_carrier_3', 'shipping_status_3', 'package_3'),
+    ('shipping_tracking_4', 'shipping_carrier_4', 'shipping_status_4', 'package_4'),
+    ('shipping_tracking_5', 'shipping_carrier_5', 'shipping_status_5', 'package_5'),
+    ('return_tracking', 'return_carrier', 'return_status', 'return'),
+)
+
+# (substring of the lowercased status, weight, hours between checks); first match wins
+STATUS_CLASSES = (
+    ('out for delivery', 3.0, 1),
+    ('transit', 2.0, 3),
+    ('information received', 0.5, 12),
+    ('info received', 0.5, 12),
+    ('pending', 0.5, 12),
+)
+DEFAULT_STATUS_CLASS = (1.0, 6)
+# Final states: any "... delivered ..." except the negations, and these
+# exact statuses (returns received at the warehouse). "Information Received"
+# only means the carrier has the label.
+DELIVERED_NEGATIONS = ('undelivered', 'not delivered', 'not be delivered', 'delivery failed')
+RECEIVED_STATUSES = ('received', 'item received', 'received by recipient', 'received by consignee')
+# Lookup results that carry no status
+EMPTY_STATUSES = ('unknown', 'check links below', 'no tracking information found')
+SLA_WEIGHTS = {'breached': 2.0, 'at_risk': 1.5}
+MAX_AGE_DAYS = 30  # Ticket age factor grows from 1 to 2 over this many days
+
+SINGPOST_BATCH = 10
+REPLAN_SECONDS = 300
+IDLE_SECONDS = 60
+BACKOFF_SECONDS = (15 * 60, 24 * 3600)  # First retry, longest retry
+OXYLABS_TIMEOUT = 45
+
+
+@dataclass
+class Package:
+    """One tracked package of an open ticket"""
+    ticket_id: int
+    tracking_number: str
+    carrier: Optional[str]
+    status_field: str
+    tracking_type: str
+    status: Optional[str]
+    last_checked: Optional[datetime]
+    staleness_hours: float
+    score: float = 0.0
+    due: bool = False
+
+    @property
+    def provider(self):
+        if is_singpost_tracking_number(self.tracking_number) or (self.carrier or '').lower() == 'singpost':
+            return 'singpost'
+        return 'oxylabs'
+
+    @property
+    def key(self):
+        return (self.ticket_id, self.tracking_type)
+
+
+class ProviderBudget:
+    """Hourly request budget of one provider, spread evenly, on top of its rate limiter if any"""
+
+    def __init__(self, per_hour: int, limiter: Optional[RateLimiter] = None):
+        self.interval = 3600.0 / max(per_hour, 1)
+        self.limiter = limiter
+        self.next_at = 0.0
+
+    def wait_time(self, now: float) -> float:
+        limiter_wait = self.limiter.get_wait_time('') if self.limiter else 0.0
+        return max(self.next_at - now, limiter_wait, 0.0)
+
+    def spend(self, now: float):
+        self.next_at = now + self.interval
+
+
+def default_budgets() -> Dict[str, ProviderBudget]:
+    return {
+        # Shares the limiter the SingPost client checks before every request
+        'singpost': ProviderBudget(int(os.environ.get('TRACKING_SINGPOST_PER_HOUR', 600)), get_rate_limiter()),
+        # Scrapes are slow and billed per request
+        'oxylabs': ProviderBudget(int(os.environ.get('TRACKING_OXYLABS_PER_HOUR', 120))),
+    }
+
+
+def status_class(status: Optional[str]) -> Tuple[float, float]:
+    """(weight, hours between checks) for a package status"""
+    text = (status or '').lower()
+    for part, weight, hours in STATUS_CLASSES:
+        if part in text:
+            return weight, hours
+    return DEFAULT_STATUS_CLASS
+
+
+def is_done(status: Optional[str]) -> bool:
+    """Whether a package status is final (no more polling)"""
+    text = (status or '').strip().lower()
+    if 'delivered' in text:
+        return not any(negation in text for negation in DELIVERED_NEGATIONS)
+    return text in RECEIVED_STATUSES
+
+
+def normalize_status(status: Optional[str]) -> Optional[str]:
+    """Carrier status as stored on the ticket (None if the lookup gave nothing usable)"""
+    status = (status or '').strip()
+    if not status or status.lower() in EMPTY_STATUSES:
+        return None
+    return status
+
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def load_packages(db_session, now=None) -> List[Package]:
+    """
+    Every package of an open ticket that is not delivered yet, scored.
+
+    Args:
+        db_session: Database session
+        now: Current UTC time (for tests)
+
+    Returns:
+        list: Packages, highest score first
+    """
+    from utils.sla_calculator import get_batch_sla_status
+
+    now = now or datetime.utcnow()
+    columns = [Ticket.id, Ticket.status, Ticket.category, Ticket.queue_id, Ticket.created_at]
+    for tracking, carrier, status, _ in SLOTS:
+        columns += [getattr(Ticket, tracking), getattr(Ticket, carrier), getattr(Ticket, status)]
+    tickets = db_session.execute(select(*columns).where(
+        Ticket.status.notin_([TicketStatus.RESOLVED, TicketStatus.RESOLVED_DELIVERED]),
+        or_(*[and_(getattr(Ticket, tracking).isnot(None), func.trim(getattr(Ticket, tracking)) != '')
+              for tracking, _, _, _ in SLOTS])
+    )).all()
+    if not tickets:
+        return []
+
+    ticket_ids = [ticket.id for ticket in tickets]
+    checked = {}
+    for start in range(0, len(ticket_ids), 500):
+        rows = db_session.execute(
+            select(TrackingHistory.ticket_id, TrackingHistory.tracking_type, TrackingHistory.tracking_number,
+                   func.max(TrackingHistory.last_updated))
+            .where(TrackingHistory.ticket_id.in_(ticket_ids[start:start + 500]))
+            .group_by(TrackingHistory.ticket_id, TrackingHistory.tracking_type, TrackingHistory.tracking_number)
+        )
+        for ticket_id, tracking_type, tracking_number, last_updated in rows:
+            checked[(ticket_id, tracking_type, tracking_number)] = last_updated
+    sla = get_batch_sla_status(tickets, db=db_session)
+
+    packages = []
+    for ticket in tickets:
+        age_days = (now - ticket.created_at).total_seconds() / 86400 if ticket.created_at else 0
+        age_factor = 1 + min(max(age_days, 0), MAX_AGE_DAYS) / MAX_AGE_DAYS
+        sla_factor = SLA_WEIGHTS.get(sla.get(ticket.id, {}).get('status'), 1.0)
+        for tracking, carrier, status_field, tracking_type in SLOTS:
+            tracking_number = (getattr(ticket, tracking) or '').strip()
+            carrier_value = getattr(ticket, carrier)
+            status = getattr(ticket, status_field)
+            if not tracking_number or is_done(status) or (carrier_value or '').lower() == 'no_tracking':
+                continue
+            last_checked = checked.get((ticket.id, tracking_type, tracking_number))
+            since = last_checked or ticket.created_at or now
+            staleness = max((now - since).total_seconds() / 3600, 0.0)
+            weight, hours = status_class(status)
+            packages.append(Package(
+                ticket_id=ticket.id,
+                tracking_number=tracking_number,
+                carrier=carrier_value,
+                status_field=status_field,
+                tracking_type=tracking_type,
+                status=status,
+                last_checked=last_checked,
+                staleness_hours=staleness,
+                score=staleness / hours * weight * age_factor * sla_factor,
+                due=last_checked is None or staleness >= hours,
+            ))
+    packages.sort(key=lambda package: package.score, reverse=True)
+    return packages
+
+
+def staleness_report(packages: List[Package]) -> Dict:
+    """
+    Staleness percentiles (hours since the last check) of the given packages.
+
+    Returns:
+        dict: packages, due, never_checked, p50/p90/p99/max_hours and the
+        same per provider under 'providers'
+    """
+    def summary(group):
+        hours = sorted(package.staleness_hours for package in group)
+        return {
+            'packages': len(group),
+            'due': sum(1 for package in group if package.due),
+            'never_checked': sum(1 for package in group if package.last_checked is None),
+            **{f'{name}_hours': round(value, 1) if value is not None else None
+               for name, value in (('p50', _percentile(hours, 0.5)), ('p90', _percentile(hours, 0.9)),
+                                   ('p99', _percentile(hours, 0.99)), ('max', hours[-1] if hours else None))},
+        }
+
+    report = summary(packages)
+    providers = {}
+    for package in packages:
+        providers.setdefault(package.provider, []).append(package)
+    report['providers'] = {provider: summary(group) for provider, group in sorted(providers.items())}
+    return report
+
+
+class TrackingScheduler:
+    """Refreshes the highest-priority due packages within the provider budgets"""
+
+    def __init__(self, session_factory, singpost_client=None, tracker=None, budgets=None, clock=time.time):
+        """
+        Args:
+            session_factory: Callable returning a new database session
+            singpost_client: SingPostTrackingClient (default: the shared client)
+            tracker: Ship24Tracker (default: the shared tracker)
+            budgets: {provider: ProviderBudget} (default: default_budgets())
+            clock: Time source in seconds (for tests)
+        """
+        self.session_factory = session_factory
+        self.singpost_client = singpost_client or get_singpost_tracking_client()
+        self._tracker = tracker
+        self.budgets = budgets or default_budgets()
+        self.clock = clock
+        self.plan = []
+        self.planned_at = None
+        self.failures = {}  # package key -> (failure count, retry at)
+        self.stats = {'refreshed': 0, 'failed': 0, 'changed': 0}
+
+    @property
+    def tracker(self):
+        if self._tracker is None:
+            from utils.ship24_tracker import get_tracker
+            self._tracker = get_tracker()
+        return self._tracker
+
+    def replan(self, db_session):
+        packages = load_packages(db_session)
+        now = self.clock()
+        self.plan = [package for package in packages
+                     if package.due and self.failures.get(package.key, (0, 0))[1] <= now
+                     and (package.provider != 'singpost' or self.singpost_client.is_configured())]
+        self.planned_at = now
+        report = staleness_report(packages)
+        logger.info(f"Tracking plan: {len(self.plan)} due of {report['packages']} packages, staleness "
+                    f"p50 {report['p50_hours']}h p90 {report['p90_hours']}h p99 {report['p99_hours']}h")
+        return report
+
+    def _take(self, provider, count):
+        taken = [package for package in self.plan if package.provider == provider][:count]
+        for package in taken:
+            self.plan.remove(package)
+        return taken
+
+    def _fetch_singpost(self, packages):
+        results = {}
+        for result in self.singpost_client.track([package.tracking_number for package in packages]):
+            data = self.singpost_client.format_result(result)
+            if not data.get('success'):
+                continue
+            events = [{
+                'date': f"{event.get('date', '')} {event.get('time', '')}".strip(),
+                'status': event.get('description', ''),
+                'location': event.get('location') or 'Singapore',
+                'code': event.get('code', ''),
+            } for event in data.get('events', [])]
+            results[result.tracking_number] = (data.get('status'), events)
+        return {package.key: results.get(package.tracking_number) for package in packages}
+
+    def _fetch_oxylabs(self, packages):
+        import concurrent.futures
+
+        results = {}
+        for package in packages:
+            # Not a `with` block: exiting one waits for the worker, so a hung
+            # lookup would hold up the poll well past OXYLABS_TIMEOUT. A lookup
+            # that times out is abandoned and left to finish in the background.
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='oxylabs')
+            try:
+                result = executor.submit(
+                    self.tracker.track_parcel_sync, package.tracking_number,
+                    carrier=package.carrier or None, method='oxylabs'
+                ).result(timeout=OXYLABS_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                logger.warning(f"Oxylabs tracking timed out after {OXYLABS_TIMEOUT}s for {package.tracking_number}")
+                result = None
+            except Exception as e:
+                logger.warning(f"Oxylabs tracking failed for {package.tracking_number}: {e}")
+                result = None
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+            results[package.key] = (result.get('status'), result.get('events') or []) if result else None
+        return results
+
+    def _save(self, db_session, package, status, events):
+        ticket = db_session.get(Ticket, package.ticket_id)
+        if ticket is None:
+            return False
+        changed = getattr(ticket, package.status_field) != status
+        if changed:
+            setattr(ticket, package.status_field, status)
+            logger.info(f"Ticket {ticket.id} {package.tracking_type} {package.tracking_number}: "
+                        f"{package.status} -> {status}")
+        # Commits the ticket change too (status rules run on that flush)
+        TrackingCache.save_tracking_data(db_session, package.tracking_number, events, status,
+                                         ticket_id=package.ticket_id, tracking_type=package.tracking_type,
+                                         carrier=package.carrier)
+        return changed
+
+    def _failed(self, package):
+        count = self.failures.get(package.key, (0, 0))[0] + 1
+        first, longest = BACKOFF_SECONDS
+        self.failures[package.key] = (count, self.clock() + min(first * 2 ** (count - 1), longest))
+        self.stats['failed'] += 1
+
+    def run_once(self) -> float:
+        """
+        Spend whatever provider budget is available now.
+
+        Returns:
+            float: Seconds until the next request could be made
+        """
+        db_session = self.session_factory()
+        try:
+            if self.planned_at is None or self.clock() - self.planned_at >= REPLAN_SECONDS or not self.plan:
+                self.replan(db_session)
+            waits = []
+            for provider, budget in self.budgets.items():
+                if not any(package.provider == provider for package in self.plan):
+                    continue
+                wait = budget.wait_time(self.clock())
+                if wait > 0:
+                    waits.append(wait)
+                    continue
+                packages = self._take(provider, SINGPOST_BATCH if provider == 'singpost' else 1)
+                budget.spend(self.clock())
+                fetch = self._fetch_singpost if provider == 'singpost' else self._fetch_oxylabs
+                results = fetch(packages)
+                for package in packages:
+                    status, events = results.get(package.key) or (None, [])
+                    status = normalize_status(status)
+                    if status is None:
+                        self._failed(package)
+                        continue
+                    self.failures.pop(package.key, None)
+                    self.stats['refreshed'] += 1
+                    if self._save(db_session, package, status, events):
+                        self.stats['changed'] += 1
+                waits.append(budget.wait_time(self.clock()))
+            if not self.plan:
+                return IDLE_SECONDS
+            return min(waits) if waits else 0.0
+        finally:
+            db_session.close()
+
+    def run(self, max_rounds=None, sleep=time.sleep):
+        """Refresh packages until stopped (or for max_rounds rounds)"""
+        rounds = 0
+        while max_rounds is None or rounds < max_rounds:
+            try:
+                wait = self.run_once()
+            except Exception as e:
+                logger.error(f"Tracking scheduler round failed: {e}")
+                wait = IDLE_SECONDS
+            rounds += 1
+            if max_rounds is None or rounds < max_rounds:
+                sleep(max(wait, 0.5))
+
+
+tracking_cli = AppGroup('tracking', help='Background tracking refresh.')
+
+
+@tracking_cli.command('scheduler')
+@click.option('--once', is_flag=True, help='Refresh what the budgets allow right now, then exit.')
+def scheduler_command(once):
+    """Refresh package tracking continuously, most urgent first."""
+    from database import SessionLocal
+
+    scheduler = TrackingScheduler(SessionLocal)
+    click.echo('Tracking scheduler started')
+    try:
+        scheduler.run(max_rounds=1 if once else None)
+    except KeyboardInterrupt:
+        pass
+    click.echo(f"Tracking scheduler stopped: {scheduler.stats}")
+
+
+@tracking_cli.command('staleness')
+def staleness_command():
+    """Print staleness percentiles of the packages of open tickets."""
+    from database import SessionLocal
+
+    db_session = SessionLocal()
+    try:
+        report = staleness_report(load_packages(db_session))
+    finally:
+        db_session.close()
+    for name, summary in [('all', report)] + list(report['providers'].items()):
+        click.echo(f"{name:<9} packages={summary['packages']} due={summary['due']} "
+                   f"never_checked={summary['never_checked']} p50={summary['p50_hours']}h "
+                   f"p90={summary['p90_hours']}h p99={summary['p99_hours']}h max={summary['max_hours']}h")
@@ -11,8 +11,15 @@ logger = logging.getLogger(__name__)
 
 class UserStore:
     def __init__(self):
-        self.users = {}
-        self.load_users()
+        self._users = None
+
+    @property
+    def users(self):
+        """{user_id: User}, built on first use rather than at import"""
+        if self._users is None:
+            self._users = {}
+            self.load_users()
+        return self._users
 
     def load_users(self):
         try: